@@ -240,7 +240,7 @@ class AuditAlertService:
         Requirements: 32.9
         """
         from datetime import timedelta
-        from prisma import Prisma
+        from infrastructure.prisma_pool import get_prisma
         from prisma.enums import AuditActionType
         from apps.admin.audit_log_views import (
             _detect_failed_logins,
@@ -251,7 +251,7 @@ class AuditAlertService:
         try:
             start_time = datetime.utcnow() - timedelta(hours=hours)
             
-            db = Prisma()
+            db = get_prisma()
             await db.connect()
             
             try:
@@ -16,9 +16,11 @@ import logging
 import json
 from typing import Optional, Dict, Any
 from datetime import datetime
-from prisma import Prisma, Json
+from prisma import Json
 from prisma.enums import AuditActionType, AuditResourceType, AuditResult
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,7 +56,7 @@ class AuditLogService:
             
         Requirements: 32.1, 32.2, 32.3, 32.4, 32.5
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
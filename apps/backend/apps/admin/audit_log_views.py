@@ -19,6 +19,7 @@ from prisma import Prisma
 from prisma.enums import AuditActionType, AuditResourceType, AuditResult
 from apps.admin.audit_alert_service import AuditAlertService
 from apps.core.decorators import async_api_view
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -113,7 +114,7 @@ async def get_audit_logs(request):
             where_conditions['created_at'] = date_filter
         
         # Connect to database
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -196,7 +197,7 @@ async def detect_suspicious_patterns(request):
         hours = int(request.GET.get('hours', 24))
         start_time = datetime.utcnow() - timedelta(hours=hours)
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
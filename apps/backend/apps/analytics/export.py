@@ -0,0 +1,297 @@
+"""
+Streaming analytics export.
+
+Exports are produced a page at a time: each page is read with a keyset
+cursor (never OFFSET), encoded as CSV or NDJSON and, if the client accepts
+it, gzipped on the fly, so memory stays flat however many rows a story has.
+Small exports stream straight into the HTTP response; larger ones
+(ANALYTICS_EXPORT_INLINE_MAX_ROWS) are written to S3 by a Celery task as a
+multipart upload and fetched from a presigned URL.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+import boto3
+from botocore.config import Config
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import compress_sequence
+
+from apps.analytics import rollups
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.s3_multipart import S3MultipartWriter
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = {
+    'metrics': [
+        'story_id', 'title', 'total_views', 'unique_readers', 'total_likes',
+        'total_comments', 'total_saves', 'completion_rate', 'total_chapters', 'published_at'
+    ],
+    'chapters': [
+        'chapter_id', 'chapter_number', 'title', 'views', 'unique_readers',
+        'comments', 'likes', 'published_at'
+    ],
+    'trends': ['date', 'views', 'saves', 'likes', 'comments', 'trending_score'],
+}
+
+# Keyset pages ($1: story, $2: last key of the previous page, $3: page size)
+CHAPTERS_PAGE_SQL = """
+    SELECT
+        cm.chapter_id, cm.chapter_number, c.title, cm.readers AS views,
+        cm.readers AS unique_readers, cm.comments, cm.likes, c.published_at
+    FROM "ChapterMetrics" cm
+    JOIN "Chapter" c ON c.id = cm.chapter_id
+    WHERE cm.story_id = $1 AND cm.chapter_number > $2
+    ORDER BY cm.chapter_number
+    LIMIT $3
+"""
+
+TRENDS_PAGE_SQL = """
+    SELECT
+        date::text AS date, reads_count AS views, saves_count AS saves,
+        likes_count AS likes, whispers_count AS comments, trending_score
+    FROM "StoryStatsDaily"
+    WHERE story_id = $1 AND date > $2::date
+    ORDER BY date
+    LIMIT $3
+"""
+
+CHAPTERS_COUNT_SQL = """
+    SELECT COUNT(*)::int AS total FROM "ChapterMetrics" WHERE story_id = $1
+"""
+
+TRENDS_COUNT_SQL = """
+    SELECT COUNT(*)::int AS total
+    FROM "StoryStatsDaily"
+    WHERE story_id = $1 AND date > $2::date
+"""
+
+# Offloaded export status is kept this long (the presigned URL expires with it)
+EXPORT_STATUS_TTL = 7 * 24 * 3600
+EXPORT_STATUS_KEY = 'analytics_export:{export_id}'
+
+
+def _trends_start(days: int) -> str:
+    """Keyset start for trends: the day before the first day exported."""
+    return (datetime.utcnow().date() - timedelta(days=days + 1)).isoformat()
+
+
+def export_filename(story_id: str, export_type: str, fmt: str) -> str:
+    return f'analytics_{export_type}_{story_id}.{fmt}'
+
+
+async def count_export_rows(db, story_id: str, export_type: str, days: int = 30) -> int:
+    """
+    Count the rows an export will contain, without reading them.
+
+    Used to decide whether an export is streamed inline or offloaded to S3.
+    """
+    if export_type == 'chapters':
+        rows = await db.query_raw(CHAPTERS_COUNT_SQL, story_id)
+    elif export_type == 'trends':
+        rows = await db.query_raw(TRENDS_COUNT_SQL, story_id, _trends_start(days))
+    else:
+        return 1
+    return rows[0]['total'] if rows else 0
+
+
+async def iter_export_pages(
+    story_id: str,
+    export_type: str,
+    days: int = 30,
+    page_size: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield the rows of an export a page at a time.
+
+    The Prisma client is leased per page, so a slow download does not hold
+    a pool slot between pages.
+
+    Args:
+        story_id: Story ID
+        export_type: 'metrics', 'chapters' or 'trends'
+        days: Days of trends to export
+        page_size: Rows per page (defaults to settings.ANALYTICS_EXPORT_PAGE_SIZE)
+    """
+    page_size = page_size or settings.ANALYTICS_EXPORT_PAGE_SIZE
+
+    if export_type in ('metrics', 'chapters'):
+        db = get_prisma()
+        await db.connect()
+        try:
+            # Story and chapter rollups are computed on first read
+            metrics = await rollups.get_story_rollup(db, story_id)
+        finally:
+            await db.disconnect()
+
+        if export_type == 'metrics':
+            if metrics:
+                yield [metrics]
+            return
+
+    if export_type == 'chapters':
+        sql, cursor_column, cursor = CHAPTERS_PAGE_SQL, 'chapter_number', 0
+    else:
+        sql, cursor_column, cursor = TRENDS_PAGE_SQL, 'date', _trends_start(days)
+
+    while True:
+        db = get_prisma()
+        await db.connect()
+        try:
+            rows = await db.query_raw(sql, story_id, cursor, page_size)
+        finally:
+            await db.disconnect()
+
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1][cursor_column]
+
+
+async def _next_page(pages: AsyncIterator[List[Dict[str, Any]]]) -> Optional[List[Dict[str, Any]]]:
+    try:
+        return await pages.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def iter_pages_sync(pages: AsyncIterator[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Step an async page generator from synchronous code.
+
+    Each page is fetched on the async bridge loop as the consumer asks for
+    it (WSGI buffers async iterators handed to StreamingHttpResponse, which
+    would load the whole export into memory).
+    """
+    try:
+        while True:
+            page = run_async(_next_page(pages))
+            if page is None:
+                return
+            yield page
+    finally:
+        run_async(pages.aclose())
+
+
+def _default(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def encode_pages(pages: Iterable[List[Dict[str, Any]]], export_type: str, fmt: str) -> Iterator[bytes]:
+    """
+    Encode pages of rows as CSV (header first) or NDJSON, one chunk per page.
+    """
+    columns = EXPORT_COLUMNS[export_type]
+
+    if fmt == 'ndjson':
+        for page in pages:
+            yield ''.join(
+                json.dumps({column: row.get(column) for column in columns}, default=_default) + '\n'
+                for row in page
+            ).encode('utf-8')
+        return
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate()
+
+
+def stream_export(
+    story_id: str,
+    export_type: str,
+    fmt: str = 'csv',
+    days: int = 30,
+    gzip: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream an export as encoded (and optionally gzipped) chunks.
+
+    Suitable as the body of a StreamingHttpResponse or for writing to S3.
+    """
+    chunks = encode_pages(iter_pages_sync(iter_export_pages(story_id, export_type, days)), export_type, fmt)
+    return compress_sequence(chunks) if gzip else chunks
+
+
+def get_export_status(export_id: str) -> Optional[Dict[str, Any]]:
+    return cache.get(EXPORT_STATUS_KEY.format(export_id=export_id))
+
+
+def set_export_status(export_id: str, **fields) -> Dict[str, Any]:
+    """Merge fields into an offloaded export's status."""
+    status = {**(get_export_status(export_id) or {}), **fields}
+    cache.set(EXPORT_STATUS_KEY.format(export_id=export_id), status, EXPORT_STATUS_TTL)
+    return status
+
+
+def _s3_client():
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        config=Config(signature_version='s3v4')
+    )
+
+
+def export_to_s3(
+    export_id: str,
+    story_id: str,
+    export_type: str,
+    fmt: str = 'csv',
+    days: int = 30,
+    s3_client=None
+) -> str:
+    """
+    Write a gzipped export to S3 as a multipart upload.
+
+    Records progress under the export's status and, once the upload is
+    complete, a presigned download URL valid for EXPORT_STATUS_TTL.
+
+    Returns:
+        Presigned download URL
+    """
+    s3_client = s3_client or _s3_client()
+    bucket = settings.ANALYTICS_EXPORT_BUCKET
+    key = f'analytics-exports/{story_id}/{export_id}.{fmt}.gz'
+    set_export_status(export_id, status='processing')
+
+    try:
+        with S3MultipartWriter(s3_client, bucket, key, FORMATS[fmt], content_encoding='gzip') as writer:
+            for chunk in stream_export(story_id, export_type, fmt, days, gzip=True):
+                writer.write(chunk)
+
+        download_url = s3_client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': bucket,
+                'Key': key,
+                'ResponseContentDisposition': (
+                    f'attachment; filename="{export_filename(story_id, export_type, fmt)}"'
+                )
+            },
+            ExpiresIn=EXPORT_STATUS_TTL
+        )
+    except Exception as e:
+        logger.error(f"Analytics export {export_id} failed: {e}")
+        set_export_status(export_id, status='failed', error=str(e))
+        raise
+
+    set_export_status(export_id, status='completed', download_url=download_url, size=writer.bytes_written)
+    return download_url
@@ -0,0 +1,459 @@
+"""
+Pre-aggregated author analytics.
+
+The author dashboard reads per-story, per-chapter, per-author and platform
+metrics from rollup tables instead of aggregating reading progress, whispers
+and daily stats on every request:
+
+- StoryMetrics: views and saves (StoryStatsDaily), likes and comments
+  (whispers on the story), unique readers and completion rate (readers of
+  the last chapter over unique readers)
+- ChapterMetrics: readers per chapter and the retention funnel (share of a
+  chapter's readers that reached the next chapter), whisper comments/likes
+- AuthorMetrics: totals over the author's published stories
+- PlatformMetrics: averages over all published stories
+
+Each table is refreshed with one set-based statement. rebuild_rollups()
+recomputes everything nightly; refresh_changed_stories() recomputes only
+stories marked as changed by the engagement consumer (and their chapters
+and authors) every few minutes. A story missing from the rollups (e.g.
+published since the last refresh) is computed on first read.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Stories the refresh applies to: $1 is a JSON array of story IDs, or NULL
+# for every published story
+TARGET_STORIES = """
+    SELECT s.id, s.author_id
+    FROM "Story" s
+    WHERE s.published = true AND s.deleted_at IS NULL
+      AND ($1::json IS NULL OR s.id IN (SELECT value FROM json_array_elements_text($1::json)))
+"""
+
+REFRESH_STORIES_SQL = f"""
+    WITH target AS ({TARGET_STORIES}),
+    views AS (
+        SELECT ssd.story_id, SUM(ssd.reads_count) AS views, SUM(ssd.saves_count) AS saves
+        FROM "StoryStatsDaily" ssd
+        JOIN target t ON t.id = ssd.story_id
+        GROUP BY ssd.story_id
+    ), whispers AS (
+        SELECT w.story_id, COUNT(*) AS comments, SUM(w.like_count) AS likes
+        FROM "Whisper" w
+        JOIN target t ON t.id = w.story_id
+        WHERE w.deleted_at IS NULL
+        GROUP BY w.story_id
+    ), chapters AS (
+        SELECT c.story_id, COUNT(*) AS total_chapters,
+               (array_agg(c.id ORDER BY c.chapter_number DESC))[1] AS last_chapter_id
+        FROM "Chapter" c
+        JOIN target t ON t.id = c.story_id
+        WHERE c.deleted_at IS NULL
+        GROUP BY c.story_id
+    ), readers AS (
+        SELECT c.story_id, COUNT(DISTINCT rp.user_id) AS unique_readers
+        FROM "ReadingProgress" rp
+        JOIN "Chapter" c ON c.id = rp.chapter_id
+        JOIN target t ON t.id = c.story_id
+        WHERE c.deleted_at IS NULL
+        GROUP BY c.story_id
+    ), completed AS (
+        SELECT ch.story_id, COUNT(*) AS completed_readers
+        FROM chapters ch
+        JOIN "ReadingProgress" rp ON rp.chapter_id = ch.last_chapter_id
+        GROUP BY ch.story_id
+    ), pruned AS (
+        DELETE FROM "StoryMetrics" sm
+        WHERE ($1::json IS NULL OR sm.story_id IN (SELECT value FROM json_array_elements_text($1::json)))
+          AND NOT EXISTS (SELECT 1 FROM target t WHERE t.id = sm.story_id)
+        RETURNING sm.author_id
+    ), refreshed AS (
+        INSERT INTO "StoryMetrics" (
+            story_id, author_id, total_views, total_saves, total_likes, total_comments,
+            unique_readers, completed_readers, completion_rate, total_chapters, computed_at
+        )
+        SELECT
+            t.id,
+            t.author_id,
+            COALESCE(v.views, 0),
+            COALESCE(v.saves, 0),
+            COALESCE(w.likes, 0),
+            COALESCE(w.comments, 0),
+            COALESCE(r.unique_readers, 0),
+            COALESCE(cp.completed_readers, 0),
+            CASE
+                WHEN COALESCE(r.unique_readers, 0) > 0
+                THEN ROUND(COALESCE(cp.completed_readers, 0) * 100.0 / r.unique_readers, 2)::float8
+                ELSE 0
+            END,
+            COALESCE(ch.total_chapters, 0),
+            NOW()
+        FROM target t
+        LEFT JOIN views v ON v.story_id = t.id
+        LEFT JOIN whispers w ON w.story_id = t.id
+        LEFT JOIN chapters ch ON ch.story_id = t.id
+        LEFT JOIN readers r ON r.story_id = t.id
+        LEFT JOIN completed cp ON cp.story_id = t.id
+        ON CONFLICT (story_id) DO UPDATE SET
+            author_id = EXCLUDED.author_id,
+            total_views = EXCLUDED.total_views,
+            total_saves = EXCLUDED.total_saves,
+            total_likes = EXCLUDED.total_likes,
+            total_comments = EXCLUDED.total_comments,
+            unique_readers = EXCLUDED.unique_readers,
+            completed_readers = EXCLUDED.completed_readers,
+            completion_rate = EXCLUDED.completion_rate,
+            total_chapters = EXCLUDED.total_chapters,
+            computed_at = EXCLUDED.computed_at
+        RETURNING author_id
+    )
+    SELECT author_id FROM refreshed
+    UNION
+    SELECT author_id FROM pruned
+"""
+
+REFRESH_CHAPTERS_SQL = f"""
+    WITH target AS ({TARGET_STORIES}),
+    live AS (
+        SELECT c.id, c.story_id, c.chapter_number
+        FROM "Chapter" c
+        JOIN target t ON t.id = c.story_id
+        WHERE c.deleted_at IS NULL
+    ), readers AS (
+        SELECT rp.chapter_id, COUNT(*) AS readers
+        FROM "ReadingProgress" rp
+        JOIN live l ON l.id = rp.chapter_id
+        GROUP BY rp.chapter_id
+    ), whispers AS (
+        SELECT h.chapter_id, COUNT(*) AS comments, SUM(w.like_count) AS likes
+        FROM "Whisper" w
+        JOIN "Highlight" h ON h.id = w.highlight_id
+        JOIN live l ON l.id = h.chapter_id
+        WHERE w.deleted_at IS NULL
+        GROUP BY h.chapter_id
+    ), funnel AS (
+        SELECT
+            l.id,
+            l.story_id,
+            l.chapter_number,
+            COALESCE(r.readers, 0) AS readers,
+            LEAD(COALESCE(r.readers, 0)) OVER (PARTITION BY l.story_id ORDER BY l.chapter_number) AS next_readers,
+            COALESCE(w.comments, 0) AS comments,
+            COALESCE(w.likes, 0) AS likes
+        FROM live l
+        LEFT JOIN readers r ON r.chapter_id = l.id
+        LEFT JOIN whispers w ON w.chapter_id = l.id
+    ), pruned AS (
+        DELETE FROM "ChapterMetrics" cm
+        WHERE ($1::json IS NULL OR cm.story_id IN (SELECT value FROM json_array_elements_text($1::json)))
+          AND NOT EXISTS (SELECT 1 FROM live l WHERE l.id = cm.chapter_id)
+    )
+    INSERT INTO "ChapterMetrics" (
+        chapter_id, story_id, chapter_number, readers, next_chapter_readers,
+        retention_rate, comments, likes, computed_at
+    )
+    SELECT
+        id,
+        story_id,
+        chapter_number,
+        readers,
+        next_readers,
+        CASE
+            WHEN next_readers IS NULL THEN NULL
+            WHEN readers > 0 THEN ROUND(next_readers * 100.0 / readers, 2)::float8
+            ELSE 0
+        END,
+        comments,
+        likes,
+        NOW()
+    FROM funnel
+    ON CONFLICT (chapter_id) DO UPDATE SET
+        story_id = EXCLUDED.story_id,
+        chapter_number = EXCLUDED.chapter_number,
+        readers = EXCLUDED.readers,
+        next_chapter_readers = EXCLUDED.next_chapter_readers,
+        retention_rate = EXCLUDED.retention_rate,
+        comments = EXCLUDED.comments,
+        likes = EXCLUDED.likes,
+        computed_at = EXCLUDED.computed_at
+"""
+
+# Totals over StoryMetrics; $1 is a JSON array of author IDs, or NULL for all
+REFRESH_AUTHORS_SQL = """
+    WITH totals AS (
+        SELECT
+            sm.author_id,
+            COUNT(*) AS total_stories,
+            SUM(sm.total_views) AS total_views,
+            SUM(sm.total_likes) AS total_likes,
+            SUM(sm.total_comments) AS total_comments
+        FROM "StoryMetrics" sm
+        WHERE $1::json IS NULL OR sm.author_id IN (SELECT value FROM json_array_elements_text($1::json))
+        GROUP BY sm.author_id
+    ), pruned AS (
+        DELETE FROM "AuthorMetrics" am
+        WHERE ($1::json IS NULL OR am.author_id IN (SELECT value FROM json_array_elements_text($1::json)))
+          AND NOT EXISTS (SELECT 1 FROM totals t WHERE t.author_id = am.author_id)
+    )
+    INSERT INTO "AuthorMetrics" (author_id, total_stories, total_views, total_likes, total_comments, computed_at)
+    SELECT author_id, total_stories, total_views, total_likes, total_comments, NOW()
+    FROM totals
+    ON CONFLICT (author_id) DO UPDATE SET
+        total_stories = EXCLUDED.total_stories,
+        total_views = EXCLUDED.total_views,
+        total_likes = EXCLUDED.total_likes,
+        total_comments = EXCLUDED.total_comments,
+        computed_at = EXCLUDED.computed_at
+"""
+
+PLATFORM_SCOPE = 'stories'
+
+REFRESH_PLATFORM_SQL = """
+    INSERT INTO "PlatformMetrics" (scope, story_count, avg_views, avg_likes, avg_completion_rate, computed_at)
+    SELECT
+        $1,
+        COUNT(*),
+        COALESCE(AVG(total_views), 0)::float8,
+        COALESCE(AVG(total_likes), 0)::float8,
+        COALESCE(AVG(completion_rate), 0)::float8,
+        NOW()
+    FROM "StoryMetrics"
+    ON CONFLICT (scope) DO UPDATE SET
+        story_count = EXCLUDED.story_count,
+        avg_views = EXCLUDED.avg_views,
+        avg_likes = EXCLUDED.avg_likes,
+        avg_completion_rate = EXCLUDED.avg_completion_rate,
+        computed_at = EXCLUDED.computed_at
+"""
+
+STORY_COLUMNS = """
+    sm.story_id, s.title, sm.total_views, sm.unique_readers, sm.total_likes,
+    sm.total_comments, sm.total_saves, sm.completion_rate, sm.total_chapters, s.published_at
+"""
+
+STORY_METRICS_SQL = f"""
+    SELECT {STORY_COLUMNS}
+    FROM "StoryMetrics" sm
+    JOIN "Story" s ON s.id = sm.story_id
+    WHERE sm.story_id = $1
+"""
+
+TOP_STORIES_SQL = f"""
+    SELECT {STORY_COLUMNS}
+    FROM "StoryMetrics" sm
+    JOIN "Story" s ON s.id = sm.story_id
+    WHERE sm.author_id = $1
+    ORDER BY sm.total_views DESC, sm.story_id
+    LIMIT $2
+"""
+
+AUTHOR_METRICS_SQL = """
+    SELECT
+        p.follower_count,
+        am.author_id IS NOT NULL AS computed,
+        COALESCE(am.total_stories, 0) AS total_stories,
+        COALESCE(am.total_views, 0) AS total_views,
+        COALESCE(am.total_likes, 0) AS total_likes,
+        COALESCE(am.total_comments, 0) AS total_comments
+    FROM "UserProfile" p
+    LEFT JOIN "AuthorMetrics" am ON am.author_id = p.id
+    WHERE p.id = $1
+"""
+
+CHAPTER_METRICS_SQL = """
+    SELECT
+        cm.chapter_id, cm.chapter_number, c.title, cm.readers, cm.retention_rate,
+        cm.comments, cm.likes, c.published_at
+    FROM "ChapterMetrics" cm
+    JOIN "Chapter" c ON c.id = cm.chapter_id
+    WHERE cm.story_id = $1
+    ORDER BY cm.chapter_number
+"""
+
+# Averages over the author's other stories ($1: story, $2: author)
+AUTHOR_AVERAGES_SQL = """
+    SELECT
+        COALESCE(AVG(total_views), 0)::float8 AS avg_views,
+        COALESCE(AVG(total_likes), 0)::float8 AS avg_likes,
+        COALESCE(AVG(completion_rate), 0)::float8 AS avg_completion_rate
+    FROM "StoryMetrics"
+    WHERE author_id = $2 AND story_id <> $1
+"""
+
+PLATFORM_METRICS_SQL = """
+    SELECT avg_views, avg_likes FROM "PlatformMetrics" WHERE scope = $1
+"""
+
+REFRESH_BATCH_SIZE = 500
+
+
+class ChangedStories:
+    """Valkey set of stories whose rollups are out of date."""
+
+    KEY = 'analytics:changed_stories'
+    REFRESHING_KEY = 'analytics:changed_stories:refreshing'
+
+    def __init__(self, redis_url: Optional[str] = None):
+        """
+        Initialize the set.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def mark(self, story_ids: Iterable[str]) -> None:
+        """
+        Mark stories for the next incremental refresh.
+
+        Never raises; stories missed here are refreshed by the nightly rebuild.
+        """
+        story_ids = list(story_ids)
+        if not story_ids:
+            return
+        try:
+            self.client.sadd(self.KEY, *story_ids)
+        except Exception as e:
+            logger.warning(f"Could not mark {len(story_ids)} stories for analytics refresh: {e}")
+
+    def claim(self) -> Set[str]:
+        """
+        Take the marked stories for refreshing.
+
+        The set is renamed so stories marked during the refresh go to a new
+        set. Stories left behind by a failed refresh are returned again.
+        """
+        if not self.client.exists(self.REFRESHING_KEY):
+            try:
+                self.client.rename(self.KEY, self.REFRESHING_KEY)
+            except redis.ResponseError:
+                # Nothing marked since the last refresh
+                return set()
+        return set(self.client.smembers(self.REFRESHING_KEY))
+
+    def ack(self) -> None:
+        """Drop the claimed stories once refreshed."""
+        self.client.delete(self.REFRESHING_KEY)
+
+
+async def refresh_stories(db, story_ids: Optional[List[str]] = None) -> int:
+    """
+    Recompute story, chapter and author rollups for some or all stories.
+
+    Args:
+        db: Connected Prisma client
+        story_ids: Stories to refresh (None for every published story)
+
+    Returns:
+        Number of authors whose totals were refreshed
+    """
+    stories = json.dumps(story_ids) if story_ids is not None else None
+    rows = await db.query_raw(REFRESH_STORIES_SQL, stories)
+    await db.execute_raw(REFRESH_CHAPTERS_SQL, stories)
+
+    if story_ids is None:
+        await db.execute_raw(REFRESH_AUTHORS_SQL, None)
+        return len(rows)
+    author_ids = sorted({row['author_id'] for row in rows})
+    if author_ids:
+        await db.execute_raw(REFRESH_AUTHORS_SQL, json.dumps(author_ids))
+    return len(author_ids)
+
+
+async def rebuild_rollups(db) -> None:
+    """
+    Recompute every rollup table.
+
+    Args:
+        db: Connected Prisma client
+    """
+    await refresh_stories(db)
+    await db.execute_raw(REFRESH_PLATFORM_SQL, PLATFORM_SCOPE)
+
+
+async def refresh_changed_stories(db, changed: Optional[ChangedStories] = None) -> int:
+    """
+    Recompute rollups for stories marked as changed.
+
+    Args:
+        db: Connected Prisma client
+        changed: Changed story set (defaults to the global one)
+
+    Returns:
+        Number of stories refreshed
+    """
+    changed = changed or get_changed_stories()
+    story_ids = sorted(changed.claim())
+    for start in range(0, len(story_ids), REFRESH_BATCH_SIZE):
+        await refresh_stories(db, story_ids[start:start + REFRESH_BATCH_SIZE])
+    changed.ack()
+    return len(story_ids)
+
+
+async def get_story_rollup(db, story_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a story's metrics, computing them if the story has no rollup yet.
+
+    Drafts and deleted stories never get a rollup, so a miss only triggers a
+    refresh when the story is live; otherwise every read would recompute.
+
+    Returns:
+        Story metrics, or None if the story is not published
+    """
+    rows = await db.query_raw(STORY_METRICS_SQL, story_id)
+    if not rows:
+        story = await db.story.find_unique(where={'id': story_id})
+        if not story or not story.published or story.deleted_at:
+            return None
+        await refresh_stories(db, [story_id])
+        rows = await db.query_raw(STORY_METRICS_SQL, story_id)
+    return dict(rows[0]) if rows else None
+
+
+# Global instance
+_changed_stories: Optional[ChangedStories] = None
+
+
+def get_changed_stories() -> ChangedStories:
+    """
+    Get the process-wide changed story set.
+
+    Returns:
+        Global ChangedStories instance
+    """
+    global _changed_stories
+    if _changed_stories is None:
+        _changed_stories = ChangedStories()
+    return _changed_stories
+
+
+def reset_changed_stories() -> None:
+    """
+    Reset the global changed story set.
+
+    Useful for testing.
+    """
+    global _changed_stories
+    _changed_stories = None
+
+
+def mark_stories_changed(story_ids: Iterable[str]) -> None:
+    """Queue stories for the next incremental analytics refresh."""
+    get_changed_stories().mark(story_ids)
@@ -0,0 +1,65 @@
+"""Celery tasks for author analytics."""
+import logging
+
+from celery import shared_task
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+from . import export, rollups
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def refresh_analytics_rollups():
+    """
+    Recompute analytics rollups for stories with new engagement.
+    
+    Runs every 5 minutes from Celery Beat; stories are marked by the
+    engagement consumer as their daily stats change.
+    """
+    async def _refresh():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await rollups.refresh_changed_stories(db)
+        finally:
+            await db.disconnect()
+    
+    refreshed = run_async(_refresh(), timeout=None)
+    if refreshed:
+        logger.info(f"Refreshed analytics rollups for {refreshed} stories")
+
+
+@shared_task(ignore_result=True)
+def rebuild_analytics_rollups():
+    """
+    Recompute every analytics rollup and the platform averages.
+    
+    Runs nightly; picks up changes the incremental refresh does not see
+    (new chapters, reading progress without a new daily read, unpublished
+    stories).
+    """
+    async def _rebuild():
+        db = get_prisma()
+        await db.connect()
+        try:
+            await rollups.rebuild_rollups(db)
+        finally:
+            await db.disconnect()
+    
+    run_async(_rebuild(), timeout=None)
+    logger.info("Rebuilt analytics rollups")
+
+
+@shared_task(ignore_result=True)
+def export_analytics_to_s3(export_id: str, story_id: str, export_type: str, fmt: str = 'csv', days: int = 30):
+    """
+    Write an analytics export too large to stream inline to S3.
+    
+    Progress and the download URL are recorded under the export's status
+    (see export.get_export_status).
+    """
+    export.export_to_s3(export_id, story_id, export_type, fmt, days)
+    logger.info(f"Exported {export_type} analytics for story {story_id} to S3 ({export_id})")
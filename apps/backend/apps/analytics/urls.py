@@ -6,6 +6,7 @@ urlpatterns = [
     path('dashboard/', views.author_dashboard, name='author-dashboard'),
     path('stories/<str:story_id>/', views.story_analytics, name='story-analytics'),
     path('stories/<str:story_id>/export/', views.export_analytics, name='export-analytics'),
+    path('exports/<str:export_id>/', views.export_status, name='export-status'),
     path('follower-growth/', views.follower_growth, name='follower-growth'),
     path('mobile/', views.mobile_analytics, name='mobile-analytics'),
 ]
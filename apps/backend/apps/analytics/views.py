@@ -1,11 +1,17 @@
 """Views for author analytics dashboard."""
+import uuid
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
 from apps.core.decorators import async_api_view
+from . import export
 from .analytics_service import AnalyticsService
+from .tasks import export_analytics_to_s3
 
 
 @api_view(['GET'])
@@ -27,8 +33,8 @@ async def author_dashboard(request):
         )
     
     # Check if user has published content
-    from prisma import Prisma
-    db = Prisma()
+    from infrastructure.prisma_pool import get_prisma
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -84,8 +90,8 @@ async def story_analytics(request, story_id):
         )
     
     # Verify story belongs to author
-    from prisma import Prisma
-    db = Prisma()
+    from infrastructure.prisma_pool import get_prisma
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -179,13 +185,20 @@ async def follower_growth(request):
 @async_api_view
 async def export_analytics(request, story_id):
     """
-    GET /v1/analytics/stories/{story_id}/export - Export analytics as CSV
+    GET /v1/analytics/stories/{story_id}/export - Export analytics as CSV or NDJSON
     
     Requirements:
         - 26.10: Export analytics data as CSV
     
+    Rows are streamed a page at a time, gzipped when the client accepts it.
+    Exports with more than ANALYTICS_EXPORT_INLINE_MAX_ROWS rows are written
+    to S3 in the background instead: the response is 202 with an export ID
+    to poll at /v1/analytics/exports/{export_id}.
+    
     Query params:
         - type: Type of data to export (metrics, chapters, trends)
+        - format: csv (default) or ndjson
+        - days: Days of trends to export (default: 30)
     """
     if not request.user_profile:
         return Response(
@@ -193,9 +206,24 @@ async def export_analytics(request, story_id):
             status=status.HTTP_401_UNAUTHORIZED
         )
     
+    # Get export type and format
+    export_type = request.query_params.get('type', 'metrics')
+    if export_type not in export.EXPORT_COLUMNS:
+        return Response(
+            {'error': {'code': 'INVALID_TYPE', 'message': 'Invalid export type'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    fmt = request.query_params.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return Response(
+            {'error': {'code': 'INVALID_FORMAT', 'message': 'Format must be csv or ndjson'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    days = int(request.query_params.get('days', 30))
+    
     # Verify story belongs to author
-    from prisma import Prisma
-    db = Prisma()
+    from infrastructure.prisma_pool import get_prisma
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -204,44 +232,75 @@ async def export_analytics(request, story_id):
         )
         
         if not story or story.author_id != request.user_profile.id:
-            await db.disconnect()
             return Response(
                 {'error': {'code': 'FORBIDDEN', 'message': 'Not authorized'}},
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        total_rows = await export.count_export_rows(db, story_id, export_type, days)
+    finally:
         await db.disconnect()
-    except Exception as e:
-        await db.disconnect()
-        raise e
     
-    # Get export type
-    export_type = request.query_params.get('type', 'metrics')
-    
-    # Get data based on type
-    if export_type == 'metrics':
-        data = [await AnalyticsService.get_story_metrics(story_id)]
-    elif export_type == 'chapters':
-        data = await AnalyticsService.get_chapter_metrics(story_id)
-    elif export_type == 'trends':
-        days = int(request.query_params.get('days', 30))
-        data = await AnalyticsService.get_engagement_trends(story_id, days)
-    else:
+    if total_rows > settings.ANALYTICS_EXPORT_INLINE_MAX_ROWS:
+        export_id = str(uuid.uuid4())
+        export.set_export_status(
+            export_id,
+            status='pending',
+            author_id=request.user_profile.id,
+            story_id=story_id,
+            type=export_type,
+            format=fmt
+        )
+        export_analytics_to_s3.delay(export_id, story_id, export_type, fmt, days)
         return Response(
-            {'error': {'code': 'INVALID_TYPE', 'message': 'Invalid export type'}},
-            status=status.HTTP_400_BAD_REQUEST
+            {'export_id': export_id, 'status': 'pending'},
+            status=status.HTTP_202_ACCEPTED
         )
     
-    # Export to CSV
-    csv_content = AnalyticsService.export_to_csv(data)
-    
-    # Return as downloadable file
-    response = HttpResponse(csv_content, content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="analytics_{export_type}_{story_id}.csv"'
+    # Stream the export as a downloadable file
+    gzip = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    response = StreamingHttpResponse(
+        export.stream_export(story_id, export_type, fmt, days, gzip=gzip),
+        content_type=export.FORMATS[fmt]
+    )
+    if gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.export_filename(story_id, export_type, fmt)}"'
+    )
     
     return response
 
 
+@api_view(['GET'])
+def export_status(request, export_id):
+    """
+    GET /v1/analytics/exports/{export_id} - Get the status of an offloaded export
+    
+    Returns the status (pending, processing, completed, failed) and, once
+    completed, a presigned download URL.
+    """
+    if not request.user_profile:
+        return Response(
+            {'error': {'code': 'UNAUTHORIZED', 'message': 'Authentication required'}},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    export_info = export.get_export_status(export_id)
+    if not export_info or export_info.get('author_id') != request.user_profile.id:
+        return Response(
+            {'error': {'code': 'NOT_FOUND', 'message': 'Export not found'}},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'export_id': export_id,
+        'status': export_info['status'],
+        'download_url': export_info.get('download_url'),
+        'error': export_info.get('error')
+    })
+
 
 @api_view(['GET'])
 def mobile_analytics(request):
@@ -14,9 +14,11 @@ from typing import Optional, Dict, Any
 from django.utils import timezone
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from prisma import Prisma
 from prisma.models import APIKey
 
+from apps.core.api_key_cache import get_api_key_cache, get_api_key_usage_tracker, is_usable
+from infrastructure.prisma_pool import get_prisma
+
 
 class APIKeyService:
     """Service for managing API keys"""
@@ -69,7 +71,7 @@ class APIKeyService:
         """
         import json
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -113,7 +115,7 @@ class APIKeyService:
         Raises:
             ValueError: If the API key doesn't exist
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -135,6 +137,11 @@ class APIKeyService:
                 }
             )
             
+            # The old key must stop working everywhere, and its unflushed
+            # uses must not overwrite the reset timestamp
+            get_api_key_cache().invalidate(existing_key.key_hash, key_hash)
+            get_api_key_usage_tracker().discard(api_key_id)
+            
             return updated_key, plain_key
         finally:
             await db.disconnect()
@@ -153,7 +160,7 @@ class APIKeyService:
         Raises:
             ValueError: If the API key doesn't exist
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -165,6 +172,8 @@ class APIKeyService:
             if not api_key:
                 raise ValueError(f"API key with ID {api_key_id} not found")
             
+            get_api_key_cache().invalidate(api_key.key_hash)
+            
             return api_key
         finally:
             await db.disconnect()
@@ -174,37 +183,54 @@ class APIKeyService:
         """
         Validate an API key and return the associated key record.
         
+        Records are served from the API key cache (unknown keys are cached
+        as misses), so repeated calls with the same key do not query the
+        database. The use is recorded in Valkey and written to
+        last_used_at in bulk by the flush_api_key_usage task.
+        
         Args:
             plain_key: The plain text API key to validate
             
         Returns:
             Optional[APIKey]: The API key record if valid, None otherwise
         """
-        db = Prisma()
-        await db.connect()
+        key_hash = APIKeyService.hash_api_key(plain_key)
+        key_cache = get_api_key_cache()
         
-        try:
-            key_hash = APIKeyService.hash_api_key(plain_key)
-            
-            # Find active, non-expired API key
-            api_key = await db.apikey.find_first(
-                where={
-                    'key_hash': key_hash,
-                    'is_active': True,
-                    'expires_at': {'gt': timezone.now()}
-                }
-            )
-            
-            if api_key:
-                # Update last used timestamp and return updated record
-                api_key = await db.apikey.update(
+        hit, api_key = key_cache.get(key_hash)
+        if not hit:
+            db = get_prisma()
+            await db.connect()
+            try:
+                # Find active, non-expired API key
+                api_key = await db.apikey.find_first(
+                    where={
+                        'key_hash': key_hash,
+                        'is_active': True,
+                        'expires_at': {'gt': timezone.now()}
+                    }
+                )
+            finally:
+                await db.disconnect()
+            key_cache.set(key_hash, api_key)
+        
+        if not is_usable(api_key):
+            return None
+        
+        used_at = timezone.now()
+        if not get_api_key_usage_tracker().record(api_key.id, used_at):
+            # Valkey is unavailable; write the timestamp directly
+            db = get_prisma()
+            await db.connect()
+            try:
+                await db.apikey.update(
                     where={'id': api_key.id},
-                    data={'last_used_at': timezone.now()}
+                    data={'last_used_at': used_at}
                 )
-            
-            return api_key
-        finally:
-            await db.disconnect()
+            finally:
+                await db.disconnect()
+        
+        return api_key.model_copy(update={'last_used_at': used_at})
     
     @staticmethod
     async def list_user_api_keys(user_id: str, include_inactive: bool = False) -> list[APIKey]:
@@ -218,7 +244,7 @@ class APIKeyService:
         Returns:
             list[APIKey]: List of API key records
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -231,7 +257,12 @@ class APIKeyService:
                 order={'created_at': 'desc'}
             )
             
-            return api_keys
+            # Include uses that have not been flushed to the database yet
+            pending = get_api_key_usage_tracker().pending(key.id for key in api_keys)
+            return [
+                key.model_copy(update={'last_used_at': pending[key.id]}) if key.id in pending else key
+                for key in api_keys
+            ]
         finally:
             await db.disconnect()
 
@@ -0,0 +1,340 @@
+"""
+API key validation cache and write-behind usage tracking.
+
+APIKeyAuthentication validates a key on every request. This module keeps
+that off the database:
+- APIKeyCache caches the APIKey record by key hash in two layers (per-process
+  LRU and the shared Valkey cache). Unknown hashes are cached too, briefly,
+  so clients retrying a bad key do not reach the database.
+- APIKeyUsageTracker records last_used_at in a Valkey hash (one field per
+  key, so repeated calls coalesce) and flush_api_key_usage() writes the
+  latest timestamps to the APIKey table in bulk from a periodic task.
+
+revoke_api_key() and rotate_api_key() invalidate the key's cache entries.
+The invalidation is broadcast over the CacheManager L1 invalidation channel,
+so other worker processes stop accepting a revoked key right away instead
+of after API_KEY_CACHE_L1_TTL.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from infrastructure.cache_manager import LRUCache, get_invalidation_listener
+
+logger = logging.getLogger(__name__)
+
+
+# Cached in place of a record when no active key has the hash
+_MISSING = 'missing'
+
+
+def is_usable(api_key: Any) -> bool:
+    """Whether a (possibly cached) key record is active and unexpired."""
+    if api_key is None or not api_key.is_active:
+        return False
+    expires_at = api_key.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at > datetime.now(timezone.utc)
+
+
+class APIKeyCache:
+    """Two-layer cache of APIKey records keyed by key hash."""
+
+    KEY_PREFIX = 'api_key:'
+
+    def __init__(
+        self,
+        l1_max_size: int = 10000,
+        l1_ttl: int = 30,
+        l2_ttl: int = 300,
+        negative_ttl: int = 60,
+        l1_invalidation: Optional[bool] = None
+    ):
+        """
+        Initialize the key cache.
+
+        Args:
+            l1_max_size: Maximum records held in process memory
+            l1_ttl: Seconds a record stays in process memory
+            l2_ttl: Seconds a record stays in Valkey
+            negative_ttl: Seconds an unknown hash is remembered
+            l1_invalidation: Broadcast and apply L1 invalidations over Valkey pub/sub
+                (defaults to settings.L1_CACHE_INVALIDATION_ENABLED)
+        """
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self.negative_ttl = negative_ttl
+        self.l1_cache = LRUCache(max_size=l1_max_size, default_ttl=l1_ttl)
+
+        if l1_invalidation is None:
+            l1_invalidation = getattr(settings, 'L1_CACHE_INVALIDATION_ENABLED', True)
+        self.invalidation_listener = get_invalidation_listener() if l1_invalidation else None
+        self.origin = None
+        if self.invalidation_listener is not None:
+            client = redis.from_url(getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0'))
+            self.origin = self.invalidation_listener.register(self.l1_cache, client)
+
+    def _key(self, key_hash: str) -> str:
+        return f'{self.KEY_PREFIX}{key_hash}'
+
+    def get(self, key_hash: str) -> Tuple[bool, Optional[Any]]:
+        """
+        Look up a key record (checks L1 then L2).
+
+        Args:
+            key_hash: SHA-256 hash of the presented key
+
+        Returns:
+            Tuple of (hit, record); a hit with a None record means the hash
+            is known not to belong to an active key
+        """
+        key = self._key(key_hash)
+
+        value = self.l1_cache.get(key)
+        if value is None:
+            try:
+                value = cache.get(key)
+            except Exception as e:
+                logger.warning(f"API key cache L2 get failed: {e}")
+                return False, None
+            if value is None:
+                return False, None
+            self.l1_cache.set(key, value, ttl=self.l1_ttl if value != _MISSING else self.negative_ttl)
+
+        return True, None if value == _MISSING else value
+
+    def set(self, key_hash: str, api_key: Optional[Any]) -> None:
+        """
+        Cache a key record, or remember that the hash is unknown.
+
+        Args:
+            key_hash: SHA-256 hash of the presented key
+            api_key: Active APIKey record, or None
+        """
+        key = self._key(key_hash)
+        if api_key is None:
+            value, l1_ttl, l2_ttl = _MISSING, self.negative_ttl, self.negative_ttl
+        else:
+            # Never serve a key past its expiry
+            expires_at = api_key.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            remaining = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+            if remaining <= 0:
+                return
+            value, l1_ttl, l2_ttl = api_key, min(self.l1_ttl, remaining), min(self.l2_ttl, remaining)
+
+        self.l1_cache.set(key, value, ttl=l1_ttl)
+        try:
+            cache.set(key, value, l2_ttl)
+        except Exception as e:
+            logger.warning(f"API key cache L2 set failed: {e}")
+
+    def invalidate(self, *key_hashes: str) -> None:
+        """
+        Drop key hashes from both layers and from the L1 of other processes.
+
+        Args:
+            key_hashes: Hashes of revoked, rotated or newly issued keys
+        """
+        keys = [self._key(key_hash) for key_hash in key_hashes if key_hash]
+        for key in keys:
+            self.l1_cache.delete(key)
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.warning(f"API key cache L2 delete failed: {e}")
+        if self.origin is not None:
+            self.invalidation_listener.publish(self.origin, keys=keys)
+
+
+class APIKeyUsageTracker:
+    """Coalesces APIKey.last_used_at updates in a Valkey hash."""
+
+    KEY = 'api_key:last_used'
+    FLUSHING_KEY = 'api_key:last_used:flushing'
+
+    def __init__(self, redis_url: Optional[str] = None):
+        """
+        Initialize the tracker.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def record(self, api_key_id: str, used_at: Optional[datetime] = None) -> bool:
+        """
+        Record a key use.
+
+        Args:
+            api_key_id: ID of the key that authenticated a request
+            used_at: Time of use (defaults to now)
+
+        Returns:
+            True if recorded, False if Valkey is unavailable (the caller
+            should write last_used_at itself)
+        """
+        timestamp = used_at.timestamp() if used_at else time.time()
+        try:
+            self.client.hset(self.KEY, api_key_id, timestamp)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not record API key usage: {e}")
+            return False
+
+    def pending(self, api_key_ids: Iterable[str]) -> Dict[str, datetime]:
+        """
+        Uses recorded since the last flush.
+
+        Args:
+            api_key_ids: Key IDs to look up
+
+        Returns:
+            Mapping of key ID to last use, for keys with an unflushed use
+        """
+        api_key_ids = list(api_key_ids)
+        if not api_key_ids:
+            return {}
+        try:
+            values = self.client.hmget(self.KEY, api_key_ids)
+        except Exception as e:
+            logger.warning(f"Could not read pending API key usage: {e}")
+            return {}
+        return {
+            api_key_id: datetime.fromtimestamp(float(value), tz=timezone.utc)
+            for api_key_id, value in zip(api_key_ids, values)
+            if value is not None
+        }
+
+    def discard(self, api_key_id: str) -> None:
+        """Forget unflushed uses of a key (e.g. after rotation resets last_used_at)."""
+        try:
+            self.client.hdel(self.KEY, api_key_id)
+        except Exception as e:
+            logger.warning(f"Could not discard API key usage: {e}")
+
+    def claim(self) -> Dict[str, float]:
+        """
+        Take the recorded uses for flushing.
+
+        The hash is renamed so uses recorded during the flush go to a new
+        hash. A batch left behind by a failed flush is returned again.
+
+        Returns:
+            Mapping of key ID to epoch seconds of the last use
+        """
+        if not self.client.exists(self.FLUSHING_KEY):
+            try:
+                self.client.rename(self.KEY, self.FLUSHING_KEY)
+            except redis.ResponseError:
+                # Nothing recorded since the last flush
+                return {}
+        return {
+            api_key_id: float(value)
+            for api_key_id, value in self.client.hgetall(self.FLUSHING_KEY).items()
+        }
+
+    def ack(self) -> None:
+        """Drop the claimed batch once it has been written."""
+        self.client.delete(self.FLUSHING_KEY)
+
+
+FLUSH_LAST_USED_SQL = """
+    UPDATE "APIKey" AS k
+    SET last_used_at = v.last_used_at
+    FROM (
+        SELECT r.id, to_timestamp(r.ts) AT TIME ZONE 'UTC' AS last_used_at
+        FROM json_to_recordset($1::json) AS r(id text, ts double precision)
+    ) AS v
+    WHERE k.id = v.id
+      AND (k.last_used_at IS NULL OR k.last_used_at < v.last_used_at)
+"""
+
+FLUSH_BATCH_SIZE = 1000
+
+
+async def flush_api_key_usage(db, tracker: Optional['APIKeyUsageTracker'] = None) -> int:
+    """
+    Write recorded key uses to APIKey.last_used_at in bulk.
+
+    Args:
+        db: Connected Prisma client
+        tracker: Usage tracker (defaults to the global one)
+
+    Returns:
+        Number of keys whose uses were flushed
+    """
+    tracker = tracker or get_api_key_usage_tracker()
+    usage = tracker.claim()
+    if not usage:
+        return 0
+
+    rows = [{'id': api_key_id, 'ts': ts} for api_key_id, ts in usage.items()]
+    for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+        await db.execute_raw(FLUSH_LAST_USED_SQL, json.dumps(rows[start:start + FLUSH_BATCH_SIZE]))
+    tracker.ack()
+    return len(rows)
+
+
+# Global instances
+_api_key_cache: Optional[APIKeyCache] = None
+_usage_tracker: Optional[APIKeyUsageTracker] = None
+
+
+def get_api_key_cache() -> APIKeyCache:
+    """
+    Get the process-wide API key cache.
+
+    Returns:
+        Global APIKeyCache instance
+    """
+    global _api_key_cache
+    if _api_key_cache is None:
+        _api_key_cache = APIKeyCache(
+            l1_max_size=getattr(settings, 'API_KEY_CACHE_L1_MAX_SIZE', 10000),
+            l1_ttl=getattr(settings, 'API_KEY_CACHE_L1_TTL', 30),
+            l2_ttl=getattr(settings, 'API_KEY_CACHE_TTL', 300),
+            negative_ttl=getattr(settings, 'API_KEY_NEGATIVE_CACHE_TTL', 60),
+        )
+    return _api_key_cache
+
+
+def get_api_key_usage_tracker() -> APIKeyUsageTracker:
+    """
+    Get the process-wide API key usage tracker.
+
+    Returns:
+        Global APIKeyUsageTracker instance
+    """
+    global _usage_tracker
+    if _usage_tracker is None:
+        _usage_tracker = APIKeyUsageTracker()
+    return _usage_tracker
+
+
+def reset_api_key_cache() -> None:
+    """
+    Reset the global key cache and usage tracker.
+
+    Useful for testing.
+    """
+    global _api_key_cache, _usage_tracker
+    _api_key_cache = None
+    _usage_tracker = None
@@ -1,9 +1,16 @@
 """Cache management utilities."""
 from django.core.cache import cache
 from typing import Optional, Callable, Any
+import functools
 import hashlib
 import json
 
+from infrastructure.cache_manager import CacheStampedeGuard
+
+
+# Shared so concurrent stale reads of a key start one background refresh
+_stampede_guard = CacheStampedeGuard(cache)
+
 
 class CacheManager:
     """
@@ -23,6 +30,13 @@ class CacheManager:
         'user_profile': 300,         # 5 minutes
     }
     
+    # How long past its TTL an entry may be served while it is refreshed
+    STALE_TTL_CONFIG = {
+        'discover_feed': 120,
+        'trending_feed': 300,
+        'whispers_feed': 30,
+    }
+    
     @staticmethod
     def make_key(prefix: str, **params) -> str:
         """
@@ -72,13 +86,34 @@ class CacheManager:
                 story_id='123'
             )
         """
-        cached = cache.get(key)
-        if cached is not None:
-            return cached
+        return CacheManager.get_or_refresh(
+            key, functools.partial(fetch_func, *args, **kwargs), ttl
+        )
+    
+    @staticmethod
+    def get_or_refresh(
+        key: str,
+        fetch_func: Callable[[], Any],
+        ttl: int,
+        stale_ttl: int = 0
+    ) -> Any:
+        """
+        Get from cache or fetch once, with stampede protection.
+        
+        Concurrent misses share one fetch (across instances through a cache
+        lock), hot keys are refreshed early, and for stale_ttl seconds past
+        the TTL the old value is served while a background task refetches.
         
-        result = fetch_func(*args, **kwargs)
-        cache.set(key, result, ttl)
-        return result
+        Args:
+            key: Cache key
+            fetch_func: Zero-argument function called on a miss
+            ttl: Time to live in seconds
+            stale_ttl: Seconds a stale value may be served while refreshing
+            
+        Returns:
+            Cached or fetched data
+        """
+        return _stampede_guard.get_or_compute(key, fetch_func, ttl, stale_ttl=stale_ttl)
     
     @staticmethod
     def invalidate(key: str):
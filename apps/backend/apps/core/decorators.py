@@ -104,13 +104,13 @@ def check_not_blocked(get_target_user_id):
     def decorator(view_func):
         @wraps(view_func)
         async def wrapper(request, *args, **kwargs):
-            from prisma import Prisma
+            from infrastructure.prisma_pool import get_prisma
             
             # Get the target user ID
             target_user_id = get_target_user_id(request, *args, **kwargs)
             
             # Check if current user has blocked the target user
-            db = Prisma()
+            db = get_prisma()
             await db.connect()
             
             try:
@@ -152,18 +152,12 @@ def async_api_view(view_func):
             result = await some_async_operation()
             return Response(result)
     """
-    import asyncio
-    from asgiref.sync import sync_to_async
+    from infrastructure.async_bridge import run_async
     
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         # Run the async view function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(view_func(request, *args, **kwargs))
-        finally:
-            loop.close()
+        return run_async(view_func(request, *args, **kwargs))
     
     return wrapper
 
@@ -235,7 +229,7 @@ def atomic_prisma_view(view_func):
         @atomic_prisma_view
         def block_user_view(request, user_id):
             # All Prisma operations are atomic
-            db = Prisma()
+            db = get_prisma()
             db.connect()
             try:
                 # Remove follow relationships
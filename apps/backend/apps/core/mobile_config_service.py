@@ -14,7 +14,7 @@ Requirements:
 import logging
 from typing import Dict, Any, Optional
 from packaging import version
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +23,7 @@ class MobileConfigService:
     """Service for managing mobile app configuration"""
     
     def __init__(self):
-        self.db = Prisma()
+        self.db = get_prisma()
     
     async def get_config(self, platform: str, app_version: str) -> Dict[str, Any]:
         """
@@ -18,6 +18,7 @@ from rest_framework import status
 
 from .mobile_config_service import MobileConfigService
 from apps.admin.permissions import IsAdministrator
+from infrastructure.async_bridge import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -95,16 +96,10 @@ def get_mobile_config(request):
     try:
         service = MobileConfigService()
         
-        # Run async service method in event loop
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            config = loop.run_until_complete(
-                service.get_config(platform, app_version)
-            )
-        finally:
-            loop.close()
+        # Run async service method on the shared bridge loop
+        config = run_async(
+            service.get_config(platform, app_version)
+        )
         
         # Add cache headers for client-side caching (Requirement 16.4)
         response = Response(config, status=status.HTTP_200_OK)
@@ -270,20 +265,14 @@ def update_mobile_config(request):
     try:
         service = MobileConfigService()
         
-        # Run async service method in event loop
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            config = loop.run_until_complete(
-                service.update_config(
-                    platform=platform,
-                    config_data=config_data,
-                    min_version=min_version
-                )
+        # Run async service method on the shared bridge loop
+        config = run_async(
+            service.update_config(
+                platform=platform,
+                config_data=config_data,
+                min_version=min_version
             )
-        finally:
-            loop.close()
+        )
         
         logger.info(
             f"Mobile configuration updated by admin",
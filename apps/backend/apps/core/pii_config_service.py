@@ -11,9 +11,10 @@ Requirements:
 
 import logging
 from typing import List, Dict, Any, Optional
-from prisma import Prisma
 from prisma.enums import PIIType, PIISensitivity
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +22,7 @@ class PIIConfigService:
     """Service for managing PII detection configuration"""
     
     def __init__(self):
-        self.db = Prisma()
+        self.db = get_prisma()
     
     async def get_config(self, pii_type: PIIType) -> Optional[Dict[str, Any]]:
         """
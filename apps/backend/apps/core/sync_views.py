@@ -17,6 +17,7 @@ from prisma import Prisma
 import asyncio
 from .offline_support_service import OfflineSupportService
 from .sync_conflict_service import SyncConflictService
+from infrastructure.prisma_pool import get_prisma
 
 
 @api_view(['GET'])
@@ -98,7 +99,7 @@ def sync_stories(request):
         limit = 100
     
     # Query database for modified stories
-    db = Prisma()
+    db = get_prisma()
     try:
         db.connect()
         
@@ -290,7 +291,7 @@ def sync_whispers(request):
         where_clause['story_id'] = story_id
     
     # Query database for modified whispers
-    db = Prisma()
+    db = get_prisma()
     try:
         db.connect()
         
@@ -305,7 +306,6 @@ def sync_whispers(request):
                     include={
                         'user': True,
                         'story': True,
-                        'likes': True,
                     }
                 )
             )
@@ -331,7 +331,7 @@ def sync_whispers(request):
                 'highlight_id': whisper.highlight_id,
                 'parent_id': whisper.parent_id,
                 'created_at': whisper.created_at.isoformat(),
-                'likes_count': len(whisper.likes) if whisper.likes else 0,
+                'likes_count': whisper.like_count,
             }
             whispers_data.append(whisper_dict)
         
@@ -448,7 +448,7 @@ def sync_batch(request):
     
     # Process each operation
     results = []
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -810,7 +810,7 @@ def sync_status(request):
             )
     
     # Query database for sync status
-    db = Prisma()
+    db = get_prisma()
     try:
         db.connect()
         
@@ -961,7 +961,7 @@ def resolve_conflict(request):
             )
     
     # Process resolution based on resource type
-    db = Prisma()
+    db = get_prisma()
     try:
         db.connect()
         
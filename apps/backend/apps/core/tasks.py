@@ -0,0 +1,32 @@
+"""Celery tasks for core services."""
+import logging
+
+from celery import shared_task
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+from . import api_key_cache
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_api_key_usage():
+    """
+    Write API key uses recorded in Valkey to APIKey.last_used_at.
+    
+    Runs every minute from Celery Beat; each key gets one UPDATE per flush
+    no matter how many requests it authenticated.
+    """
+    async def _flush():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await api_key_cache.flush_api_key_usage(db)
+        finally:
+            await db.disconnect()
+    
+    flushed = run_async(_flush(), timeout=None)
+    if flushed:
+        logger.info(f"Flushed last_used_at for {flushed} API keys")
@@ -1,9 +1,16 @@
 """Service for content discovery features including trending, recommendations, and filtering."""
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-from prisma import Prisma
 from prisma.models import Story
 
+from apps.social.follow_graph import FollowGraph
+from infrastructure.content_filter_utils import MAX_FEED_BATCHES
+from infrastructure.prisma_pool import get_prisma
+from .leaderboard import decode_cursor, encode_cursor, get_trending_leaderboard
+
+if TYPE_CHECKING:
+    from infrastructure.content_filter_utils import FeedVisibility
+
 
 class DiscoveryService:
     """Service for content discovery and recommendations."""
@@ -16,25 +23,29 @@ class DiscoveryService:
         Requirements:
             - 25.1, 25.2: Calculate trending score based on engagement and recency
         
-        NOTE: Simplified version - returns recently published stories.
-        Full trending calculation requires Like and Comment models which are not yet implemented.
+        Stories are read from the trending leaderboard in score order. Until
+        the first leaderboard has been published, recently published stories
+        are returned instead.
         
         Args:
             limit: Maximum number of stories to return
-            days: Number of days to consider for trending calculation
+            days: Only include stories published within this many days
         
         Returns:
-            List of Story objects sorted by publication date
+            List of Story objects sorted by trending score
         """
-        db = Prisma()
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        page = await DiscoveryService.get_trending_page(
+            page_size=limit,
+            extra_where={'published_at': {'gte': cutoff_date}}
+        )
+        if page is not None:
+            return page[0]
+        
+        db = get_prisma()
         await db.connect()
         
         try:
-            # Calculate cutoff date
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Get published stories with recent activity
-            # Simplified: just return recent stories ordered by publication date
             stories = await db.story.find_many(
                 where={
                     'published': True,
@@ -56,6 +67,96 @@ class DiscoveryService:
             await db.disconnect()
             raise e
     
+    @staticmethod
+    async def get_trending_page(
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        tag_slug: Optional[str] = None,
+        visibility: Optional['FeedVisibility'] = None,
+        extra_where: Optional[Dict] = None
+    ) -> Optional[Tuple[List[Story], Optional[str]]]:
+        """
+        Get one page of trending stories from the trending leaderboard.
+        
+        Leaderboard entries are read in rank order and hydrated in batches;
+        stories that no longer match (unpublished, deleted, hidden author,
+        extra_where) are skipped so every page is filled when possible. At
+        most MAX_FEED_BATCHES batches are read per page; when most entries
+        are skipped the page comes back short with a cursor to the rest.
+        
+        Args:
+            page_size: Number of stories to return
+            cursor: Cursor from a previous page's next_cursor
+            tag_slug: Restrict to stories with this tag
+            visibility: Blocked and shadowbanned authors to skip
+            extra_where: Additional Prisma filters applied to each story
+        
+        Returns:
+            Tuple of (stories, next_cursor), or None if no leaderboard has been published
+        """
+        leaderboard = get_trending_leaderboard()
+        version, offset = decode_cursor(cursor)
+        batch_size = max(page_size * 2, 20)
+        
+        where_clause = {
+            'published': True,
+            'deleted_at': None,
+        }
+        if extra_where:
+            where_clause.update(extra_where)
+        
+        db = get_prisma()
+        await db.connect()
+        
+        try:
+            stories = []
+            exhausted = False
+            for _ in range(MAX_FEED_BATCHES):
+                version_read, entries = leaderboard.get_range(offset, batch_size, tag_slug, version)
+                if version_read is None:
+                    if version is None:
+                        return None
+                    exhausted = True
+                    break
+                if version_read != version:
+                    # Cursor snapshot expired; continue from the same rank in the current one
+                    version = version_read
+                if not entries:
+                    exhausted = True
+                    break
+                
+                story_ids = [story_id for story_id, _ in entries]
+                rows = await db.story.find_many(
+                    where={**where_clause, 'id': {'in': story_ids}},
+                    include={
+                        'author': True,
+                        'tags': {'include': {'tag': True}},
+                    }
+                )
+                by_id = {story.id: story for story in rows}
+                
+                consumed = 0
+                for story_id in story_ids:
+                    consumed += 1
+                    story = by_id.get(story_id)
+                    if story is not None and (visibility is None or visibility.is_visible(story.author_id)):
+                        stories.append(story)
+                        if len(stories) == page_size:
+                            break
+                offset += consumed
+                
+                if len(entries) < batch_size and consumed == len(entries):
+                    exhausted = True
+                    break
+                if len(stories) == page_size:
+                    break
+            
+            next_cursor = None if exhausted else encode_cursor(version, offset)
+            return stories, next_cursor
+            
+        finally:
+            await db.disconnect()
+    
     @staticmethod
     async def get_stories_by_genre(
         genre: str,
@@ -79,7 +180,7 @@ class DiscoveryService:
         Returns:
             Tuple of (stories list, total count)
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -146,7 +247,7 @@ class DiscoveryService:
         Returns:
             List of recommended Story objects
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -159,10 +260,7 @@ class DiscoveryService:
             )
             
             # Get followed authors
-            follows = await db.follow.find_many(
-                where={'follower_id': user_id},
-                include={'following': {'include': {'stories': True}}}
-            )
+            followed_author_ids = await FollowGraph(db).following_ids(user_id)
             
             # Collect genres from reading history
             read_genres = set()
@@ -180,10 +278,21 @@ class DiscoveryService:
             
             # Get stories from followed authors (not already read)
             followed_author_stories = []
-            for follow in follows:
-                for story in follow.following.stories:
-                    if story.id not in read_story_ids and story.published and not story.deleted_at:
-                        followed_author_stories.append(story)
+            if followed_author_ids:
+                followed_author_stories = await db.story.find_many(
+                    where={
+                        'author_id': {'in': list(followed_author_ids)},
+                        'published': True,
+                        'deleted_at': None,
+                        'id': {'notIn': list(read_story_ids)},
+                    },
+                    include={
+                        'author': True,
+                        'tags': {'include': {'tag': True}},
+                    },
+                    order={'published_at': 'desc'},
+                    take=limit
+                )
             
             # Get stories with similar genres (not already read)
             similar_genre_stories = []
@@ -241,7 +350,7 @@ class DiscoveryService:
         Returns:
             List of similar Story objects
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -322,7 +431,7 @@ class DiscoveryService:
         Returns:
             List of Story objects
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -336,7 +445,7 @@ class DiscoveryService:
                     'published_at': {'gte': cutoff_date}
                 },
                 include={
-                    'author': {'include': {'followers': True}},
+                    'author': True,
                     'tags': {'include': {'tag': True}},
                 },
                 order={'published_at': 'desc'},
@@ -367,7 +476,7 @@ class DiscoveryService:
         Returns:
             List of Story objects
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -407,7 +516,7 @@ class DiscoveryService:
         Returns:
             List of author profiles with growth metrics
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -422,7 +531,6 @@ class DiscoveryService:
                     'stories': {
                         'where': {'published': True, 'deleted_at': None}
                     },
-                    'followers': True,
                 },
                 take=limit * 3
             )
@@ -433,7 +541,7 @@ class DiscoveryService:
                 if len(author.stories) == 0:
                     continue  # Skip authors with no published stories
                 
-                follower_count = len(author.followers)
+                follower_count = author.follower_count
                 story_count = len(author.stories)
                 
                 # Calculate growth score
@@ -0,0 +1,385 @@
+"""
+Engagement event ingestion for StoryStatsDaily.
+
+Views emit one lightweight event per read, save, whisper like and whisper
+into a Valkey stream (a single XADD, never failing the request). Reads and
+saves carry the acting user and are counted once per user, story and day.
+
+consume_engagement_events() reads the stream through a consumer group,
+aggregates events per (story, day) in memory and applies each batch with
+one bulk upsert into StoryStatsDaily (marking the stories for the next
+analytics rollup refresh). The statement also advances the last
+applied stream ID in EngagementStreamOffset, and only applies the batch if
+that ID is still the one the consumer started from, so every event is
+counted exactly once:
+
+- entries are acknowledged (XACK) only after the upsert has committed;
+- entries redelivered after a crash between commit and XACK have IDs at or
+  below the stored offset and are acknowledged without being counted again;
+- a concurrent consumer that loses the offset race applies nothing.
+
+The day an event counts towards is taken from its stream ID (the Valkey
+server's clock at XADD, in UTC).
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+from apps.analytics.rollups import mark_stories_changed
+
+logger = logging.getLogger(__name__)
+
+
+READ = 'read'
+SAVE = 'save'
+LIKE = 'like'
+WHISPER = 'whisper'
+
+# Event kind -> delta field of the upsert rows
+COUNTERS = {
+    READ: 'reads',
+    SAVE: 'saves',
+    LIKE: 'likes',
+    WHISPER: 'whispers',
+}
+
+# Kinds counted once per acting user, story and day
+DEDUPLICATED_KINDS = {READ, SAVE}
+
+# Adds the event unless the dedupe key (KEYS[2]) is already set for the day
+EMIT_ONCE_SCRIPT = """
+if not redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'k', ARGV[3], 's', ARGV[4])
+"""
+
+OFFSET_SQL = """
+    SELECT last_id FROM "EngagementStreamOffset" WHERE stream = $1
+"""
+
+# Moves the stream offset from $3 to $4 and, only if that succeeded, adds
+# the aggregated deltas ($1: [{"story_id", "date", "reads", "saves",
+# "likes", "whispers"}]) to StoryStatsDaily
+APPLY_SQL = """
+    WITH advanced AS (
+        INSERT INTO "EngagementStreamOffset" (stream, last_id, updated_at)
+        VALUES ($2, $4, NOW())
+        ON CONFLICT (stream) DO UPDATE
+        SET last_id = EXCLUDED.last_id, updated_at = EXCLUDED.updated_at
+        WHERE "EngagementStreamOffset".last_id = $3
+        RETURNING stream
+    ), applied AS (
+        INSERT INTO "StoryStatsDaily" (id, story_id, date, reads_count, saves_count, likes_count, whispers_count)
+        SELECT gen_random_uuid()::text, d.story_id, d.date::date, d.reads, d.saves, d.likes, d.whispers
+        FROM json_to_recordset($1::json)
+            AS d(story_id text, date text, reads int, saves int, likes int, whispers int)
+        JOIN "Story" s ON s.id = d.story_id
+        WHERE EXISTS (SELECT 1 FROM advanced)
+        ON CONFLICT (story_id, date) DO UPDATE SET
+            reads_count = "StoryStatsDaily".reads_count + EXCLUDED.reads_count,
+            saves_count = "StoryStatsDaily".saves_count + EXCLUDED.saves_count,
+            likes_count = "StoryStatsDaily".likes_count + EXCLUDED.likes_count,
+            whispers_count = "StoryStatsDaily".whispers_count + EXCLUDED.whispers_count
+        RETURNING story_id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM advanced)::int AS advanced,
+        (SELECT COUNT(*) FROM applied)::int AS applied
+"""
+
+START_ID = '0-0'
+
+
+class OffsetConflict(Exception):
+    """Raised when another consumer advanced the stream offset first."""
+    pass
+
+
+def parse_stream_id(stream_id: str) -> Tuple[int, int]:
+    """Split a stream ID ('<ms>-<seq>') into comparable integers."""
+    millis, _, sequence = stream_id.partition('-')
+    return int(millis), int(sequence or 0)
+
+
+def stream_id_date(stream_id: str) -> str:
+    """UTC day (ISO format) an entry was added on."""
+    millis, _ = parse_stream_id(stream_id)
+    return datetime.fromtimestamp(millis / 1000, tz=timezone.utc).date().isoformat()
+
+
+def aggregate(entries: Iterable[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+    """
+    Sum stream entries into per-(story, day) delta rows.
+
+    Args:
+        entries: (stream ID, fields) pairs; fields hold the kind ('k') and
+            story ID ('s'). Unknown kinds and trimmed entries are skipped.
+
+    Returns:
+        Rows for APPLY_SQL, one per story and day
+    """
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for stream_id, fields in entries:
+        counter = COUNTERS.get((fields or {}).get('k'))
+        story_id = (fields or {}).get('s')
+        if not counter or not story_id:
+            continue
+        day = stream_id_date(stream_id)
+        row = rows.get((story_id, day))
+        if row is None:
+            row = rows[(story_id, day)] = {
+                'story_id': story_id,
+                'date': day,
+                'reads': 0,
+                'saves': 0,
+                'likes': 0,
+                'whispers': 0,
+            }
+        row[counter] += 1
+    return list(rows.values())
+
+
+class EngagementStream:
+    """The Valkey stream engagement events are emitted into."""
+
+    KEY = 'engagement:events'
+    GROUP = 'story-stats'
+    # One logical consumer; runs are serialized by LOCK_KEY
+    CONSUMER = 'story-stats-aggregator'
+    LOCK_KEY = 'engagement:events:consumer_lock'
+    SEEN_KEY_PREFIX = 'engagement:seen'
+
+    def __init__(self, redis_url: Optional[str] = None, max_length: Optional[int] = None):
+        """
+        Initialize the stream.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            max_length: Approximate number of entries kept in the stream
+                (defaults to settings.ENGAGEMENT_STREAM_MAX_LENGTH)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.max_length = max_length or getattr(settings, 'ENGAGEMENT_STREAM_MAX_LENGTH', 1000000)
+        self._client = None
+        self._emit_once = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def emit(self, kind: str, story_id: str, actor_id: Optional[str] = None) -> bool:
+        """
+        Add an engagement event to the stream.
+
+        Args:
+            kind: READ, SAVE, LIKE or WHISPER
+            story_id: Story the engagement is counted towards
+            actor_id: Acting user's profile ID; READ and SAVE events with an
+                actor are only added once per actor, story and day
+
+        Returns:
+            True if the event was added, False if it was a repeat or
+            Valkey is unavailable
+        """
+        try:
+            if actor_id and kind in DEDUPLICATED_KINDS:
+                if self._emit_once is None:
+                    self._emit_once = self.client.register_script(EMIT_ONCE_SCRIPT)
+                today = datetime.now(timezone.utc).date().isoformat()
+                seen_key = f'{self.SEEN_KEY_PREFIX}:{kind}:{story_id}:{actor_id}:{today}'
+                # Kept past midnight so clock skew with Valkey can't double count
+                ttl = int(timedelta(days=2).total_seconds())
+                return bool(self._emit_once(
+                    keys=[self.KEY, seen_key],
+                    args=[ttl, self.max_length, kind, story_id]
+                ))
+            self.client.xadd(
+                self.KEY,
+                {'k': kind, 's': story_id},
+                maxlen=self.max_length,
+                approximate=True
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Could not emit {kind} engagement event for story {story_id}: {e}")
+            return False
+
+    def ensure_group(self) -> None:
+        """Create the consumer group (and stream) if missing."""
+        try:
+            self.client.xgroup_create(self.KEY, self.GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def read(self, count: int) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Take the next batch of entries for the consumer.
+
+        Entries delivered earlier but never acknowledged come first, so a
+        batch interrupted by a crash is seen again before any new entry.
+
+        Args:
+            count: Maximum number of entries
+
+        Returns:
+            (stream ID, fields) pairs in stream order; fields are empty for
+            pending entries that were trimmed meanwhile
+        """
+        for start in ('0', '>'):
+            response = self.client.xreadgroup(
+                self.GROUP,
+                self.CONSUMER,
+                {self.KEY: start},
+                count=count
+            )
+            entries = response[0][1] if response else []
+            if entries:
+                return [(stream_id, fields or {}) for stream_id, fields in entries]
+        return []
+
+    def ack(self, stream_ids: List[str]) -> None:
+        """Acknowledge processed entries."""
+        if stream_ids:
+            self.client.xack(self.KEY, self.GROUP, *stream_ids)
+
+    def acquire_lock(self, ttl: int) -> bool:
+        """Claim the consumer for one run (expires after ttl seconds)."""
+        return bool(self.client.set(self.LOCK_KEY, '1', nx=True, ex=ttl))
+
+    def release_lock(self) -> None:
+        self.client.delete(self.LOCK_KEY)
+
+
+async def apply_engagement_batch(
+    db,
+    entries: List[Tuple[str, Dict[str, str]]],
+    last_id: str,
+    stream_key: str = EngagementStream.KEY
+) -> Tuple[str, int]:
+    """
+    Count a batch of stream entries into StoryStatsDaily.
+
+    Entries at or below last_id were counted by an earlier batch and are
+    skipped.
+
+    Args:
+        db: Connected Prisma client
+        entries: (stream ID, fields) pairs in stream order
+        last_id: Stream offset the batch continues from
+        stream_key: Stream the offset belongs to
+
+    Returns:
+        New stream offset and the number of entries counted
+
+    Raises:
+        OffsetConflict: The offset moved since last_id was read
+    """
+    applied_upto = parse_stream_id(last_id)
+    new_entries = [entry for entry in entries if parse_stream_id(entry[0]) > applied_upto]
+    if not new_entries:
+        return last_id, 0
+
+    new_last_id = new_entries[-1][0]
+    deltas = aggregate(new_entries)
+    rows = await db.query_raw(
+        APPLY_SQL,
+        json.dumps(deltas),
+        stream_key,
+        last_id,
+        new_last_id
+    )
+    if not rows or not rows[0]['advanced']:
+        raise OffsetConflict(f"Stream offset for {stream_key} moved past {last_id}")
+    mark_stories_changed({row['story_id'] for row in deltas})
+    return new_last_id, sum(row[counter] for row in deltas for counter in COUNTERS.values())
+
+
+async def consume_engagement_events(
+    db,
+    stream: Optional[EngagementStream] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None
+) -> int:
+    """
+    Drain engagement events from the stream into StoryStatsDaily.
+
+    Args:
+        db: Connected Prisma client
+        stream: Event stream (defaults to the global one)
+        batch_size: Entries aggregated per upsert
+            (defaults to settings.ENGAGEMENT_BATCH_SIZE)
+        max_batches: Upper bound on batches per run
+            (defaults to settings.ENGAGEMENT_MAX_BATCHES_PER_RUN)
+
+    Returns:
+        Number of events counted
+    """
+    stream = stream or get_engagement_stream()
+    batch_size = batch_size or getattr(settings, 'ENGAGEMENT_BATCH_SIZE', 10000)
+    max_batches = max_batches or getattr(settings, 'ENGAGEMENT_MAX_BATCHES_PER_RUN', 50)
+
+    stream.ensure_group()
+    rows = await db.query_raw(OFFSET_SQL, stream.KEY)
+    last_id = rows[0]['last_id'] if rows else START_ID
+
+    counted = 0
+    for _ in range(max_batches):
+        entries = stream.read(batch_size)
+        if not entries:
+            break
+        last_id, applied = await apply_engagement_batch(db, entries, last_id, stream.KEY)
+        counted += applied
+        stream.ack([stream_id for stream_id, _ in entries])
+    return counted
+
+
+# Global instance
+_engagement_stream: Optional[EngagementStream] = None
+
+
+def get_engagement_stream() -> EngagementStream:
+    """
+    Get the process-wide engagement stream.
+
+    Returns:
+        Global EngagementStream instance
+    """
+    global _engagement_stream
+    if _engagement_stream is None:
+        _engagement_stream = EngagementStream()
+    return _engagement_stream
+
+
+def reset_engagement_stream() -> None:
+    """
+    Reset the global engagement stream.
+
+    Useful for testing.
+    """
+    global _engagement_stream
+    _engagement_stream = None
+
+
+def emit_engagement(kind: str, story_id: Optional[str], actor_id: Optional[str] = None) -> None:
+    """
+    Record an engagement with a story for its daily stats.
+
+    Never raises; an unavailable Valkey only loses the event.
+
+    Args:
+        kind: READ, SAVE, LIKE or WHISPER
+        story_id: Story engaged with (events without a story are ignored)
+        actor_id: Acting user's profile ID (dedupes READ and SAVE)
+    """
+    if story_id:
+        get_engagement_stream().emit(kind, story_id, actor_id)
@@ -0,0 +1,198 @@
+"""
+Trending leaderboard stored in Valkey sorted sets.
+
+TrendingCalculator publishes a snapshot of all trending scores after each
+recompute: one global sorted set plus one sorted set per tag. Each snapshot
+is versioned and kept alive for TRENDING_LEADERBOARD_TTL seconds, so a
+pagination cursor keeps reading the snapshot it started on while newer
+snapshots are published.
+
+Key layout:
+    trending:leaderboard:seq                  -> snapshot version counter
+    trending:leaderboard:current              -> current snapshot version
+    trending:leaderboard:<version>:global     -> story_id scored by trending_score
+    trending:leaderboard:<version>:tag:<slug> -> same, restricted to one tag
+"""
+
+import base64
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TrendingLeaderboard:
+    """Versioned trending leaderboard snapshots in Valkey."""
+
+    KEY_PREFIX = 'trending:leaderboard'
+    ZADD_CHUNK_SIZE = 1000
+
+    def __init__(self, redis_url: Optional[str] = None, snapshot_ttl: Optional[int] = None):
+        """
+        Initialize the leaderboard.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            snapshot_ttl: Seconds each snapshot is kept (defaults to settings.TRENDING_LEADERBOARD_TTL)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.snapshot_ttl = snapshot_ttl or getattr(settings, 'TRENDING_LEADERBOARD_TTL', 3600)
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    @property
+    def current_version_key(self) -> str:
+        return f'{self.KEY_PREFIX}:current'
+
+    def _key(self, version: str, tag_slug: Optional[str] = None) -> str:
+        if tag_slug:
+            return f'{self.KEY_PREFIX}:{version}:tag:{tag_slug}'
+        return f'{self.KEY_PREFIX}:{version}:global'
+
+    def publish(self, entries: Iterable[Tuple[str, float, Sequence[str]]]) -> Optional[str]:
+        """
+        Publish a new leaderboard snapshot and make it current.
+
+        Args:
+            entries: (story_id, trending_score, tag_slugs) for every trending-eligible story
+
+        Returns:
+            The new snapshot version, or None if Valkey is unavailable
+        """
+        global_scores: Dict[str, float] = {}
+        tag_scores: Dict[str, Dict[str, float]] = {}
+        for story_id, score, tag_slugs in entries:
+            global_scores[story_id] = float(score)
+            for slug in tag_slugs:
+                tag_scores.setdefault(slug, {})[story_id] = float(score)
+
+        try:
+            version = str(self.client.incr(f'{self.KEY_PREFIX}:seq'))
+            pipe = self.client.pipeline(transaction=False)
+            self._queue_zadd(pipe, self._key(version), global_scores)
+            for slug, scores in tag_scores.items():
+                self._queue_zadd(pipe, self._key(version, slug), scores)
+            pipe.execute()
+
+            # Switch readers over only once the whole snapshot is written
+            self.client.set(self.current_version_key, version, ex=self.snapshot_ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to publish trending leaderboard: {e}")
+            return None
+
+        logger.info(
+            f"Published trending leaderboard {version}: "
+            f"{len(global_scores)} stories, {len(tag_scores)} tags"
+        )
+        return version
+
+    def _queue_zadd(self, pipe, key: str, scores: Dict[str, float]) -> None:
+        """Queue a chunked ZADD plus expiry for one snapshot key."""
+        items = list(scores.items())
+        for start in range(0, len(items), self.ZADD_CHUNK_SIZE):
+            pipe.zadd(key, dict(items[start:start + self.ZADD_CHUNK_SIZE]))
+        if items:
+            pipe.expire(key, self.snapshot_ttl)
+
+    def current_version(self) -> Optional[str]:
+        """
+        Get the current snapshot version.
+
+        Returns:
+            Version string, or None if no snapshot exists or Valkey is unavailable
+        """
+        try:
+            return self.client.get(self.current_version_key)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read trending leaderboard version: {e}")
+            return None
+
+    def get_range(
+        self,
+        offset: int,
+        count: int,
+        tag_slug: Optional[str] = None,
+        version: Optional[str] = None
+    ) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """
+        Read a slice of a snapshot, highest score first.
+
+        Falls back to the current snapshot when the requested version has expired.
+
+        Args:
+            offset: Rank to start from
+            count: Maximum number of entries
+            tag_slug: Restrict to one tag (None reads the global leaderboard)
+            version: Snapshot version from a pagination cursor
+
+        Returns:
+            Tuple of (version read, [(story_id, score), ...]); version is None
+            when no leaderboard is available
+        """
+        try:
+            if version and not self.client.exists(self._key(version)):
+                version = None
+            if not version:
+                version = self.client.get(self.current_version_key)
+                if not version:
+                    return None, []
+
+            entries = self.client.zrevrange(
+                self._key(version, tag_slug),
+                offset,
+                offset + count - 1,
+                withscores=True
+            )
+            return version, [(story_id, float(score)) for story_id, score in entries]
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read trending leaderboard: {e}")
+            return None, []
+
+
+def encode_cursor(version: str, offset: int) -> str:
+    """Encode a leaderboard position as an opaque pagination cursor."""
+    payload = json.dumps({'v': version, 'o': offset})
+    return base64.b64encode(payload.encode('utf-8')).decode('utf-8')
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+    """
+    Decode a pagination cursor.
+
+    Returns:
+        Tuple of (version, offset); (None, 0) for a missing or malformed cursor
+    """
+    if not cursor:
+        return None, 0
+    try:
+        decoded = json.loads(base64.b64decode(cursor).decode('utf-8'))
+        return str(decoded['v']), max(int(decoded['o']), 0)
+    except (ValueError, KeyError, TypeError):
+        return None, 0
+
+
+# Global leaderboard instance
+_leaderboard: Optional[TrendingLeaderboard] = None
+
+
+def get_trending_leaderboard() -> TrendingLeaderboard:
+    """
+    Get the process-wide trending leaderboard.
+
+    Returns:
+        Global TrendingLeaderboard instance
+    """
+    global _leaderboard
+    if _leaderboard is None:
+        _leaderboard = TrendingLeaderboard()
+    return _leaderboard
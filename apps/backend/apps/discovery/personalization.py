@@ -1,8 +1,12 @@
 """Personalization engine for For You feed."""
-from datetime import datetime
-from prisma import Prisma
-from typing import List, Dict
-import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from infrastructure.prisma_pool import get_prisma
 
 
 class PersonalizationEngine:
@@ -26,6 +30,37 @@ class PersonalizationEngine:
     
     DAILY_DECAY = 0.98
     
+    # Weights of the combined For You score
+    SCORE_WEIGHTS = {
+        'interest': 0.5,
+        'trending': 0.3,
+        'freshness': 0.2,
+    }
+    
+    # Freshness decays as exp(-rate * days since publication)
+    FRESHNESS_DECAY_RATE = 0.1
+    
+    # Minimum number of interest rows before personalization kicks in
+    MIN_INTERESTS = 3
+    
+    # Number of ranked stories kept in the per-user feed cache
+    RANKED_CACHE_SIZE = 200
+    
+    FEED_CACHE_PREFIX = 'for_you_ranked'
+    
+    @classmethod
+    def feed_cache_key(cls, user_id: str) -> str:
+        """Cache key of a user's ranked For You candidates."""
+        return f'{cls.FEED_CACHE_PREFIX}:{user_id}'
+    
+    @classmethod
+    def invalidate_feed_cache(cls, user_id: str) -> None:
+        """Drop a user's cached ranking so the next feed load re-scores."""
+        try:
+            cache.delete(cls.feed_cache_key(user_id))
+        except Exception:
+            pass
+    
     async def update_interests(self, user_id: str, event: str, story_id: str):
         """
         Update user interest scores based on behavioral signals.
@@ -41,7 +76,7 @@ class PersonalizationEngine:
             - 10.3: Increment Interest_Score when user likes a whisper
             - 10.4: Increment Interest_Score when user follows an author
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -108,12 +143,148 @@ class PersonalizationEngine:
                 }
             )
             
+            self.invalidate_feed_cache(user_id)
+            
         finally:
             await db.disconnect()
     
+    @staticmethod
+    def build_interest_maps(interests: Iterable) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Split a user's interest rows into tag and author score maps.
+        
+        Args:
+            interests: UserInterest rows
+            
+        Returns:
+            Tuple of (tag_id -> score, author_id -> score)
+        """
+        tag_scores = {}
+        author_scores = {}
+        for interest in interests:
+            if interest.tag_id:
+                tag_scores[interest.tag_id] = interest.score
+            if interest.author_id:
+                author_scores[interest.author_id] = interest.score
+        return tag_scores, author_scores
+    
+    def score_candidates(
+        self,
+        candidates: List[Dict],
+        tag_scores: Dict[str, float],
+        author_scores: Dict[str, float],
+        now: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Score candidate stories in one vectorized pass.
+        
+        Tag affinity sums the user's tag interest over (candidate, tag) index
+        pairs with np.bincount, so no candidate x tag matrix is built; author
+        affinity, trending score and freshness decay are computed as arrays
+        over all candidates at once.
+        
+        Args:
+            candidates: Story dictionaries (as built by get_for_you_feed)
+            tag_scores: User's tag_id -> interest score
+            author_scores: User's author_id -> interest score
+            now: Reference time for freshness (defaults to the current time)
+            
+        Returns:
+            Array of personalized scores aligned with candidates
+            
+        Requirements:
+            - 10.5: Weighted combination of Interest_Score, Trending_Score, freshness
+        """
+        count = len(candidates)
+        if count == 0:
+            return np.zeros(0)
+        
+        # Tag affinity: one (candidate, tag) pair per distinct tag of each story
+        tag_index = {}
+        rows = []
+        cols = []
+        for row, story in enumerate(candidates):
+            for tag_id in dict.fromkeys(tag.get('tag_id') or tag.get('id') for tag in story.get('tags', [])):
+                rows.append(row)
+                cols.append(tag_index.setdefault(tag_id, len(tag_index)))
+        
+        tag_affinity = np.zeros(count)
+        if tag_index:
+            tag_weights = np.fromiter(
+                (tag_scores.get(tag_id, 0.0) for tag_id in tag_index),
+                dtype=float,
+                count=len(tag_index)
+            )
+            tag_affinity = np.bincount(rows, weights=tag_weights[cols], minlength=count)
+        
+        author_affinity = np.fromiter(
+            (author_scores.get(story['author_id'], 0.0) for story in candidates),
+            dtype=float,
+            count=count
+        )
+        
+        trending = np.fromiter(
+            (story.get('trending_score') or 0.0 for story in candidates),
+            dtype=float,
+            count=count
+        )
+        
+        # Freshness: exp decay over whole days since publication, 0 if unpublished
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        published_ts = np.fromiter(
+            (
+                story['published_at'].timestamp() if story.get('published_at') else np.nan
+                for story in candidates
+            ),
+            dtype=float,
+            count=count
+        )
+        days_old = np.floor((now_ts - published_ts) / 86400.0)
+        freshness = np.where(
+            np.isnan(published_ts),
+            0.0,
+            np.exp(-self.FRESHNESS_DECAY_RATE * np.nan_to_num(days_old))
+        )
+        
+        return (
+            self.SCORE_WEIGHTS['interest'] * (tag_affinity + author_affinity) +
+            self.SCORE_WEIGHTS['trending'] * trending +
+            self.SCORE_WEIGHTS['freshness'] * freshness
+        )
+    
+    def rank_candidates(
+        self,
+        candidates: List[Dict],
+        tag_scores: Dict[str, float],
+        author_scores: Dict[str, float],
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Rank candidate stories by personalized score, highest first.
+        
+        Ties keep candidate order, matching a stable descending sort.
+        
+        Args:
+            candidates: Story dictionaries
+            tag_scores: User's tag_id -> interest score
+            author_scores: User's author_id -> interest score
+            limit: Maximum number of stories to return
+            
+        Returns:
+            Ranked story dictionaries
+        """
+        scores = self.score_candidates(candidates, tag_scores, author_scores)
+        order = np.argsort(-scores, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return [candidates[i] for i in order]
+    
     async def calculate_story_score(self, user_id: str, story: Dict) -> float:
         """
-        Calculate personalized score for a story.
+        Calculate personalized score for a single story.
+        
+        Feeds should use score_candidates instead, which loads interests
+        once for the whole candidate set.
         
         Args:
             user_id: ID of the user
@@ -125,68 +296,34 @@ class PersonalizationEngine:
         Requirements:
             - 10.5: Weighted combination of Interest_Score, Trending_Score, freshness
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
-            # Get user interests
             interests = await db.userinterest.find_many(
                 where={'user_id': user_id}
             )
-            
-            interest_map = {}
-            for i in interests:
-                if i.tag_id:
-                    interest_map[f"tag_{i.tag_id}"] = i.score
-                if i.author_id:
-                    interest_map[f"author_{i.author_id}"] = i.score
-            
-            # Calculate interest score
-            interest_score = 0.0
-            
-            # Tag affinity
-            for tag in story.get('tags', []):
-                tag_id = tag.get('tag_id') or tag.get('id')
-                interest_score += interest_map.get(f"tag_{tag_id}", 0)
-            
-            # Author affinity
-            author_score = interest_map.get(f"author_{story['author_id']}", 0)
-            interest_score += author_score
-            
-            # Get trending score
-            trending_score = story.get('trending_score', 0)
-            
-            # Freshness score (days since publication)
-            if story.get('published_at'):
-                days_old = (datetime.now() - story['published_at']).days
-                freshness_score = math.exp(-0.1 * days_old)
-            else:
-                freshness_score = 0
-            
-            # Combined score with weights
-            final_score = (
-                0.5 * interest_score +
-                0.3 * trending_score +
-                0.2 * freshness_score
-            )
-            
-            return final_score
-            
         finally:
             await db.disconnect()
+        
+        tag_scores, author_scores = self.build_interest_maps(interests)
+        return float(self.score_candidates([story], tag_scores, author_scores)[0])
     
     async def get_for_you_feed(
         self,
         user_id: str,
-        blocked_user_ids: List[str],
+        blocked_user_ids: Iterable[str],
         limit: int = 20
     ) -> List[Dict]:
         """
         Generate personalized For You feed.
         
+        Candidates are scored in one vectorized pass and the ranking is
+        cached per user until it expires or update_interests invalidates it.
+        
         Args:
             user_id: ID of the user
-            blocked_user_ids: List of blocked user IDs to exclude
+            blocked_user_ids: Author IDs to exclude (blocked or shadowbanned)
             limit: Number of stories to return
             
         Returns:
@@ -197,29 +334,38 @@ class PersonalizationEngine:
             - 2.5: Cold start fallback to trending
             - 10.7: Exclude blocked authors and soft-deleted content
         """
-        db = Prisma()
+        blocked = frozenset(blocked_user_ids or ())
+        
+        # Serve the cached ranking; re-check blocks made since it was computed
+        try:
+            ranked = cache.get(self.feed_cache_key(user_id))
+        except Exception:
+            ranked = None
+        if ranked is not None:
+            return [story for story in ranked if story['author_id'] not in blocked][:limit]
+        
+        db = get_prisma()
         await db.connect()
         
         try:
-            # Check if user has sufficient interaction history
-            interest_count = await db.userinterest.count(
+            # Load the user's interests once for the whole candidate set
+            interests = await db.userinterest.find_many(
                 where={'user_id': user_id}
             )
             
-            # Cold start: return empty to signal fallback needed
-            if interest_count < 3:
+            # Cold start: return None to signal fallback needed
+            if len(interests) < self.MIN_INTERESTS:
                 return None
             
-            # Get candidate stories (published, not deleted, not blocked)
+            # Get candidate stories (published, not deleted); blocked authors
+            # are dropped below, so over-fetch by up to the number of them
             today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            pool_size = getattr(settings, 'FOR_YOU_CANDIDATE_POOL_SIZE', 500)
             
             stories = await db.story.find_many(
                 where={
                     'published': True,
                     'deleted_at': None,
-                    'author_id': {
-                        'not_in': blocked_user_ids
-                    } if blocked_user_ids else {}
                 },
                 include={
                     'tags': {
@@ -235,38 +381,45 @@ class PersonalizationEngine:
                         'take': 1
                     }
                 },
-                take=100  # Get larger candidate set for scoring
+                take=pool_size + min(len(blocked), pool_size)
             )
-            
-            # Score each story
-            scored_stories = []
-            for story in stories:
-                # Convert story to dict format
-                story_dict = {
-                    'id': story.id,
-                    'slug': story.slug,
-                    'title': story.title,
-                    'blurb': story.blurb,
-                    'cover_key': story.cover_key,
-                    'author_id': story.author_id,
-                    'published': story.published,
-                    'published_at': story.published_at,
-                    'created_at': story.created_at,
-                    'updated_at': story.updated_at,
-                    'tags': [{'tag_id': st.tag.id, 'name': st.tag.name} for st in story.tags],
-                    'trending_score': story.stats[0].trending_score if story.stats else 0
-                }
-                
-                score = await self.calculate_story_score(user_id, story_dict)
-                scored_stories.append((score, story_dict))
-            
-            # Sort by score descending
-            scored_stories.sort(key=lambda x: x[0], reverse=True)
-            
-            # Return top N stories
-            result = [story for score, story in scored_stories[:limit]]
-            
-            return result
-            
         finally:
             await db.disconnect()
+        
+        candidates = [
+            {
+                'id': story.id,
+                'slug': story.slug,
+                'title': story.title,
+                'blurb': story.blurb,
+                'cover_key': story.cover_key,
+                'author_id': story.author_id,
+                'published': story.published,
+                'published_at': story.published_at,
+                'created_at': story.created_at,
+                'updated_at': story.updated_at,
+                'tags': [{'tag_id': st.tag.id, 'name': st.tag.name} for st in story.tags],
+                'trending_score': story.stats[0].trending_score if story.stats else 0
+            }
+            for story in stories
+            if story.author_id not in blocked
+        ]
+        
+        tag_scores, author_scores = self.build_interest_maps(interests)
+        ranked = self.rank_candidates(
+            candidates,
+            tag_scores,
+            author_scores,
+            limit=max(limit, self.RANKED_CACHE_SIZE)
+        )
+        
+        try:
+            cache.set(
+                self.feed_cache_key(user_id),
+                ranked,
+                getattr(settings, 'CACHE_TTL', {}).get('recommendations', 600)
+            )
+        except Exception:
+            pass
+        
+        return ranked[:limit]
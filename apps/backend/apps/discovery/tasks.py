@@ -1,44 +1,16 @@
 """Celery tasks for discovery system."""
+import logging
+
 from celery import shared_task
+from django.conf import settings
+
+from . import engagement
 from .trending import TrendingCalculator
 from .personalization import PersonalizationEngine
-from prisma import Prisma
-import asyncio
-import threading
-
-
-def _run_async(coro):
-    """Run async code from sync context, even inside active event loops."""
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-
-    try:
-        import nest_asyncio
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
-        nest_asyncio.apply()
-        return loop.run_until_complete(coro)
-    except Exception:
-        pass
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
+logger = logging.getLogger(__name__)
 
 
 @shared_task
@@ -54,7 +26,7 @@ def update_trending_scores():
         - 19.2: Run every 10-30 minutes
     """
     calculator = TrendingCalculator()
-    _run_async(calculator.update_all_trending_scores())
+    run_async(calculator.update_all_trending_scores(), timeout=None)
 
 
 @shared_task
@@ -70,11 +42,48 @@ def apply_daily_decay():
         - 19.4: Run every 24 hours
     """
     async def _apply_decay_async():
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         try:
             await db.execute_raw('UPDATE "UserInterest" SET score = score * 0.98')
         finally:
             await db.disconnect()
 
-    _run_async(_apply_decay_async())
+    run_async(_apply_decay_async(), timeout=None)
+
+
+@shared_task(ignore_result=True)
+def consume_engagement_events():
+    """
+    Count engagement events from the Valkey stream into StoryStatsDaily.
+    
+    Runs every 10 seconds from Celery Beat. Runs never overlap: a run that
+    finds the consumer busy exits, and events are picked up by the next one.
+    """
+    stream = engagement.get_engagement_stream()
+    lock_ttl = getattr(settings, 'ENGAGEMENT_CONSUMER_LOCK_TTL', 300)
+    try:
+        if not stream.acquire_lock(lock_ttl):
+            return
+    except Exception as e:
+        logger.warning(f"Engagement stream unavailable: {e}")
+        return
+
+    async def _consume():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await engagement.consume_engagement_events(db, stream)
+        finally:
+            await db.disconnect()
+
+    try:
+        counted = run_async(_consume(), timeout=None)
+    except engagement.OffsetConflict as e:
+        logger.warning(f"Engagement batch skipped: {e}")
+        return
+    finally:
+        stream.release_lock()
+
+    if counted:
+        logger.info(f"Counted {counted} engagement events into daily story stats")
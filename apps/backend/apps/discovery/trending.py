@@ -1,6 +1,10 @@
 """Trending score calculation for stories."""
+import logging
 from datetime import datetime, timedelta
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
+from .leaderboard import get_trending_leaderboard
+
+logger = logging.getLogger(__name__)
 
 
 class TrendingCalculator:
@@ -23,6 +27,43 @@ class TrendingCalculator:
     
     HOURLY_DECAY = 0.98
     
+    # Decay is applied assuming uniform engagement over 24h (average of 12 hours elapsed)
+    AVERAGE_HOURS_ELAPSED = 12
+    
+    # Scores every published story for one day in a single statement: today's
+    # counts are weighted, decayed and upserted into StoryStatsDaily, and the
+    # new scores are returned together with each story's tag slugs
+    RECOMPUTE_SCORES_SQL = """
+        WITH scored AS (
+            INSERT INTO "StoryStatsDaily" (id, story_id, date, trending_score)
+            SELECT
+                gen_random_uuid()::text,
+                s.id,
+                $1::date,
+                COALESCE(
+                    (
+                        ssd.saves_count * $2::float8
+                        + ssd.reads_count * $3::float8
+                        + ssd.likes_count * $4::float8
+                        + ssd.whispers_count * $5::float8
+                    ) * $6::float8,
+                    0
+                )
+            FROM "Story" s
+            LEFT JOIN "StoryStatsDaily" ssd
+                ON ssd.story_id = s.id AND ssd.date = $1::date
+            WHERE s.published = true AND s.deleted_at IS NULL
+            ON CONFLICT (story_id, date)
+            DO UPDATE SET trending_score = EXCLUDED.trending_score
+            RETURNING story_id, trending_score
+        )
+        SELECT scored.story_id, scored.trending_score, string_agg(t.slug, ',') AS tag_slugs
+        FROM scored
+        LEFT JOIN "StoryTag" st ON st.story_id = scored.story_id
+        LEFT JOIN "Tag" t ON t.id = st.tag_id
+        GROUP BY scored.story_id, scored.trending_score
+    """
+    
     async def calculate_trending_score(self, story_id: str) -> float:
         """
         Calculate trending score for a story based on 24h engagement.
@@ -37,7 +78,7 @@ class TrendingCalculator:
             - 16.1: Weighted combination of saves, reads, likes, whispers
             - 16.2: Apply time decay factor
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -64,58 +105,55 @@ class TrendingCalculator:
             )
             
             # Apply time decay (assuming uniform distribution over 24h)
-            # Use average of 12 hours elapsed
-            hours_elapsed = 12
-            decayed_score = raw_score * (self.HOURLY_DECAY ** hours_elapsed)
+            decayed_score = raw_score * self.decay_multiplier()
             
             return decayed_score
             
         finally:
             await db.disconnect()
     
-    async def update_all_trending_scores(self):
+    def decay_multiplier(self) -> float:
+        """Time decay applied to a day's raw engagement score."""
+        return self.HOURLY_DECAY ** self.AVERAGE_HOURS_ELAPSED
+    
+    async def update_all_trending_scores(self) -> int:
         """
         Background task to recompute all trending scores.
         
+        Scores are computed and written in one set-based statement, then
+        published to the Valkey trending leaderboard read by the feeds.
+        
+        Returns:
+            Number of stories scored
+        
         Requirements:
             - 16.3: Recompute trending scores as background job
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
-            # Get all published, non-deleted stories
-            stories = await db.story.find_many(
-                where={
-                    'published': True,
-                    'deleted_at': None
-                }
-            )
-            
             today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            for story in stories:
-                score = await self.calculate_trending_score(story.id)
-                
-                # Update or create today's stats
-                await db.storystatsdaily.upsert(
-                    where={
-                        'story_id_date': {
-                            'story_id': story.id,
-                            'date': today
-                        }
-                    },
-                    data={
-                        'create': {
-                            'story_id': story.id,
-                            'date': today,
-                            'trending_score': score
-                        },
-                        'update': {
-                            'trending_score': score
-                        }
-                    }
-                )
-                
+            rows = await db.query_raw(
+                self.RECOMPUTE_SCORES_SQL,
+                today.date().isoformat(),
+                self.ENGAGEMENT_WEIGHTS['save'],
+                self.ENGAGEMENT_WEIGHTS['read'],
+                self.ENGAGEMENT_WEIGHTS['like'],
+                self.ENGAGEMENT_WEIGHTS['whisper'],
+                self.decay_multiplier(),
+            )
         finally:
             await db.disconnect()
+        
+        get_trending_leaderboard().publish(
+            (
+                row['story_id'],
+                row['trending_score'],
+                row['tag_slugs'].split(',') if row.get('tag_slugs') else [],
+            )
+            for row in rows
+        )
+        
+        logger.info(f"Recomputed trending scores for {len(rows)} stories")
+        return len(rows)
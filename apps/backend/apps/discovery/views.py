@@ -3,7 +3,6 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from datetime import datetime
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
@@ -13,35 +12,24 @@ from apps.stories.serializers import StoryListSerializer
 from .trending import TrendingCalculator
 from .personalization import PersonalizationEngine
 from .serializers import DiscoverFeedQuerySerializer, GenreQuerySerializer, SimilarStoriesQuerySerializer
-import asyncio
+from infrastructure.content_filter_utils import FeedVisibility, fetch_visible_page
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 
-def get_blocked_user_ids(request):
+async def get_feed_visibility(request):
     """
-    Get list of blocked user IDs for the current user.
+    Get the authors hidden from the current user's feeds.
     
     Args:
         request: DRF request object
         
     Returns:
-        List of blocked user IDs
+        FeedVisibility for the requesting user (anonymous users only skip
+        shadowbanned authors)
     """
-    if not hasattr(request, 'user_profile') or not request.user_profile:
-        return []
-    
-    async def fetch_blocked():
-        db = Prisma()
-        await db.connect()
-        try:
-            blocks = await db.block.find_many(
-                where={'blocker_id': request.user_profile.id},
-                select={'blocked_id': True}
-            )
-            return [b.blocked_id for b in blocks]
-        finally:
-            await db.disconnect()
-    
-    return asyncio.run(fetch_blocked())
+    user_profile = getattr(request, 'user_profile', None)
+    return await FeedVisibility.for_viewer(user_profile.id if user_profile else None)
 
 
 @extend_schema(
@@ -165,6 +153,7 @@ def discover_feed(request):
     tag_slug = validated_data.get('tag')
     search_query = validated_data.get('q')
     cursor = validated_data.get('cursor')
+    page_size = validated_data.get('page_size', 20)
     
     # For You feed requires authentication
     if tab == 'for-you':
@@ -174,38 +163,35 @@ def discover_feed(request):
                 status=status.HTTP_401_UNAUTHORIZED
             )
     
-    # Generate cache key
+    # Pages are cached after filtering, so viewers share an entry only when
+    # they hide the same authors (For You results are per user)
+    visibility = run_async(get_feed_visibility(request))
+    user_id = request.user_profile.id if tab == 'for-you' else None
     cache_key = CacheManager.make_key(
         'discover_feed',
         tab=tab,
         tag=tag_slug or '',
         q=search_query or '',
-        cursor=cursor or ''
-    )
-    
-    # Try to get from cache
-    cached_response = CacheManager.get_or_set(
-        cache_key,
-        lambda: None,  # Will be replaced with actual fetch
-        CacheManager.TTL_CONFIG['discover_feed']
+        cursor=cursor or '',
+        page_size=page_size,
+        hidden=visibility.fingerprint,
+        user=user_id or ''
     )
     
-    if cached_response is not None:
-        return Response(cached_response)
-    
-    # Fetch data based on tab
-    if tab == 'trending':
-        response_data = asyncio.run(fetch_trending_feed(request, tag_slug, search_query))
-    elif tab == 'new':
-        response_data = asyncio.run(fetch_new_feed(request, tag_slug, search_query))
-    elif tab == 'for-you':
-        response_data = asyncio.run(fetch_for_you_feed(request, tag_slug, search_query))
+    def fetch_feed():
+        # Fetch data based on tab
+        if tab == 'trending':
+            return run_async(fetch_trending_feed(visibility, page_size, cursor, tag_slug, search_query))
+        elif tab == 'new':
+            return run_async(fetch_new_feed(visibility, page_size, tag_slug, search_query))
+        return run_async(fetch_for_you_feed(user_id, visibility, page_size, cursor, tag_slug, search_query))
     
-    # Cache the response
-    CacheManager.get_or_set(
+    # Concurrent misses share one fetch; a stale feed is served while it refreshes
+    response_data = CacheManager.get_or_refresh(
         cache_key,
-        lambda: response_data,
-        CacheManager.TTL_CONFIG['discover_feed']
+        fetch_feed,
+        CacheManager.TTL_CONFIG['discover_feed'],
+        stale_ttl=CacheManager.STALE_TTL_CONFIG['discover_feed']
     )
     
     # Add cache headers for offline support (Requirements 9.1, 9.4)
@@ -239,30 +225,51 @@ def discover_feed(request):
     return response
 
 
-async def fetch_trending_feed(request, tag_slug=None, search_query=None):
+async def fetch_trending_feed(visibility, page_size=20, cursor=None, tag_slug=None, search_query=None):
     """
     Fetch trending feed stories.
     
+    Args:
+        visibility: FeedVisibility of the requesting user
+        page_size: Number of stories per page
+        cursor: Leaderboard cursor of the previous page
+        tag_slug: Tag to filter by
+        search_query: Text to search titles and blurbs for
+    
     Requirements:
         - 2.2: Order by Trending_Score within last 24 hours
         - 16.7: Exclude soft-deleted stories
     """
-    db = Prisma()
+    # Serve from the precomputed trending leaderboard when one is published.
+    # Free-text search cannot be answered from the leaderboard and falls
+    # through to the database query below.
+    if not search_query:
+        from .discovery_service import DiscoveryService
+        
+        page = await DiscoveryService.get_trending_page(
+            page_size=page_size,
+            cursor=cursor,
+            tag_slug=tag_slug,
+            visibility=visibility
+        )
+        if page is not None:
+            stories, next_cursor = page
+            serializer = StoryListSerializer(stories, many=True)
+            return {
+                'data': serializer.data,
+                'next_cursor': next_cursor
+            }
+    
+    db = get_prisma()
     await db.connect()
     
     try:
-        # Get blocked user IDs
-        blocked_ids = get_blocked_user_ids(request)
-        
         # Build where clause
         where_clause = {
             'published': True,
             'deleted_at': None
         }
         
-        if blocked_ids:
-            where_clause['author_id'] = {'not_in': blocked_ids}
-        
         # Add tag filter
         if tag_slug:
             tag = await db.tag.find_unique(where={'slug': tag_slug})
@@ -297,21 +304,18 @@ async def fetch_trending_feed(request, tag_slug=None, search_query=None):
                     }
                 }
             },
-            take=100  # Get more for sorting
+            take=100 + min(len(visibility), 100)  # Get more for sorting
         )
         
         # Sort by trending score
         stories_with_scores = [
             (story.stats[0].trending_score if story.stats else 0, story)
             for story in stories
+            if visibility.is_visible(story.author_id)
         ]
         stories_with_scores.sort(key=lambda x: x[0], reverse=True)
         
-        # Apply pagination manually
-        page_size = min(int(request.query_params.get('page_size', 20)), 100)
-        cursor = request.query_params.get('cursor')
-        
-        # Simple pagination without cursor for now
+        # Simple pagination without cursor for the database fallback
         sorted_stories = [story for score, story in stories_with_scores]
         paginated_stories = sorted_stories[:page_size]
         
@@ -327,30 +331,30 @@ async def fetch_trending_feed(request, tag_slug=None, search_query=None):
         await db.disconnect()
 
 
-async def fetch_new_feed(request, tag_slug=None, search_query=None):
+async def fetch_new_feed(visibility, page_size=20, tag_slug=None, search_query=None):
     """
     Fetch new feed stories.
     
+    Args:
+        visibility: FeedVisibility of the requesting user
+        page_size: Number of stories per page
+        tag_slug: Tag to filter by
+        search_query: Text to search titles and blurbs for
+    
     Requirements:
         - 2.3: Order by published_at descending
         - 21.1: Cache with TTL 3-5 minutes
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
-        # Get blocked user IDs
-        blocked_ids = get_blocked_user_ids(request)
-        
         # Build where clause
         where_clause = {
             'published': True,
             'deleted_at': None
         }
         
-        if blocked_ids:
-            where_clause['author_id'] = {'not_in': blocked_ids}
-        
         # Add tag filter
         if tag_slug:
             tag = await db.tag.find_unique(where={'slug': tag_slug})
@@ -369,19 +373,29 @@ async def fetch_new_feed(request, tag_slug=None, search_query=None):
             ]
         
         # Fetch stories ordered by published_at
-        page_size = min(int(request.query_params.get('page_size', 20)), 100)
-        
-        stories = await db.story.find_many(
-            where=where_clause,
-            include={
-                'tags': {
-                    'include': {
-                        'tag': True
+        async def fetch_batch(after_id, take):
+            query_args = {
+                'where': where_clause,
+                'include': {
+                    'tags': {
+                        'include': {
+                            'tag': True
+                        }
                     }
-                }
-            },
-            order={'published_at': 'desc'},
-            take=page_size
+                },
+                'order': {'published_at': 'desc'},
+                'take': take
+            }
+            if after_id:
+                query_args['cursor'] = {'id': after_id}
+                query_args['skip'] = 1
+            return await db.story.find_many(**query_args)
+        
+        stories, _ = await fetch_visible_page(
+            fetch_batch,
+            page_size,
+            visibility,
+            lambda story: story.author_id
         )
         
         # Serialize
@@ -396,30 +410,35 @@ async def fetch_new_feed(request, tag_slug=None, search_query=None):
         await db.disconnect()
 
 
-async def fetch_for_you_feed(request, tag_slug=None, search_query=None):
+async def fetch_for_you_feed(user_id, visibility, page_size=20, cursor=None, tag_slug=None, search_query=None):
     """
     Fetch personalized For You feed.
     
+    Args:
+        user_id: Requesting user's profile ID
+        visibility: FeedVisibility of the requesting user
+        page_size: Number of stories per page of the trending fallback
+        cursor: Leaderboard cursor of the trending fallback
+        tag_slug: Tag to filter by
+        search_query: Text to search titles and blurbs for
+    
     Requirements:
         - 2.4: Personalized recommendations based on Interest_Score
         - 2.5: Cold start fallback to trending
         - 10.7: Exclude blocked authors
         - 21.6: Cache with TTL 1-6 hours
     """
-    user_id = request.user_profile.id
-    blocked_ids = get_blocked_user_ids(request)
-    
     # Get personalized feed
     engine = PersonalizationEngine()
-    stories = await engine.get_for_you_feed(user_id, blocked_ids, limit=20)
+    stories = await engine.get_for_you_feed(user_id, visibility.hidden_ids, limit=20)
     
     # Cold start: fallback to trending
     if stories is None:
-        return await fetch_trending_feed(request, tag_slug, search_query)
+        return await fetch_trending_feed(visibility, page_size, cursor, tag_slug, search_query)
     
     # Apply tag filter if provided
     if tag_slug:
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         try:
             tag = await db.tag.find_unique(where={'slug': tag_slug})
@@ -470,7 +489,7 @@ def trending_stories_v2(request):
     limit = int(request.query_params.get('limit', 20))
     days = int(request.query_params.get('days', 7))
     
-    stories = asyncio.run(DiscoveryService.get_trending_stories(limit=limit, days=days))
+    stories = run_async(DiscoveryService.get_trending_stories(limit=limit, days=days))
     
     serializer = StoryListSerializer(stories, many=True)
     response_data = serializer.data
@@ -518,7 +537,7 @@ def stories_by_genre(request, genre):
     if 'status' in request.query_params:
         filters['status'] = request.query_params['status']
     
-    stories, total = asyncio.run(DiscoveryService.get_stories_by_genre(
+    stories, total = run_async(DiscoveryService.get_stories_by_genre(
         genre=genre,
         limit=limit,
         offset=offset,
@@ -576,7 +595,7 @@ def recommended_stories(request):
     
     limit = int(request.query_params.get('limit', 10))
     
-    stories = asyncio.run(DiscoveryService.get_recommended_stories(
+    stories = run_async(DiscoveryService.get_recommended_stories(
         user_id=request.user_profile.id,
         limit=limit
     ))
@@ -621,7 +640,7 @@ def similar_stories(request, story_id):
     
     limit = int(request.query_params.get('limit', 5))
     
-    stories = asyncio.run(DiscoveryService.get_similar_stories(
+    stories = run_async(DiscoveryService.get_similar_stories(
         story_id=story_id,
         limit=limit
     ))
@@ -667,7 +686,7 @@ def new_and_noteworthy(request):
     limit = int(request.query_params.get('limit', 10))
     days = int(request.query_params.get('days', 30))
     
-    stories = asyncio.run(DiscoveryService.get_new_and_noteworthy(limit=limit, days=days))
+    stories = run_async(DiscoveryService.get_new_and_noteworthy(limit=limit, days=days))
     
     serializer = StoryListSerializer(stories, many=True)
     response_data = serializer.data
@@ -709,7 +728,7 @@ def staff_picks(request):
     
     limit = int(request.query_params.get('limit', 10))
     
-    stories = asyncio.run(DiscoveryService.get_staff_picks(limit=limit))
+    stories = run_async(DiscoveryService.get_staff_picks(limit=limit))
     
     serializer = StoryListSerializer(stories, many=True)
     response_data = serializer.data
@@ -751,7 +770,7 @@ def rising_authors(request):
     limit = int(request.query_params.get('limit', 10))
     days = int(request.query_params.get('days', 30))
     
-    authors = asyncio.run(DiscoveryService.get_rising_authors(limit=limit, days=days))
+    authors = run_async(DiscoveryService.get_rising_authors(limit=limit, days=days))
     
     # Format response
     author_data = [
@@ -18,9 +18,12 @@ Requirements:
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-from prisma import Prisma
 from prisma.enums import DeletionStatus
 
+from apps.social.follow_graph import FollowGraph
+from apps.users.profile_cache import invalidate_cached_profile
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,7 +31,7 @@ class AccountDeletionService:
     """Service for managing account deletion requests and anonymization"""
     
     def __init__(self):
-        self.db = Prisma()
+        self.db = get_prisma()
     
     async def create_deletion_request(self, user_id: str) -> Dict[str, Any]:
         """
@@ -188,6 +191,7 @@ class AccountDeletionService:
                     'handle': f'deleted_{user_id[:8]}'  # Keep unique but anonymized
                 }
             )
+            invalidate_cached_profile(profile.clerk_user_id)
             
             # Delete sensitive data
             deleted_counts = {
@@ -292,16 +296,8 @@ class AccountDeletionService:
             )
             deleted_counts['whispers'] = whispers_result
             
-            # Delete follows (as follower)
-            follows_follower_result = await self.db.follow.delete_many(
-                where={'follower_id': user_id}
-            )
-            
-            # Delete follows (as following)
-            follows_following_result = await self.db.follow.delete_many(
-                where={'following_id': user_id}
-            )
-            deleted_counts['follows'] = follows_follower_result + follows_following_result
+            # Delete follows (both directions), keeping other users' counters in step
+            deleted_counts['follows'] = await FollowGraph(self.db).remove_all(user_id)
             
             # Delete reading progress
             progress_result = await self.db.readingprogress.delete_many(
@@ -359,10 +355,12 @@ class AccountDeletionService:
             deleted_counts['stories'] = stories_result
             
             # Finally, delete the user profile
-            await self.db.userprofile.delete(
+            deleted_profile = await self.db.userprofile.delete(
                 where={'id': user_id}
             )
             deleted_counts['profile'] = 1
+            if deleted_profile:
+                invalidate_cached_profile(deleted_profile.clerk_user_id)
             
             logger.info(
                 f"Account permanently deleted",
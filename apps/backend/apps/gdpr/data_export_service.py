@@ -4,6 +4,12 @@ Data Export Service
 Generates comprehensive user data exports for GDPR compliance.
 Implements data_export functionality for user data portability.
 
+The export is a ZIP archive streamed to S3 as a multipart upload: the
+profile and export info are JSON members and every other section is an
+NDJSON member (one record per line). Sections are read concurrently in
+keyset-paginated batches and written as they arrive, so memory is bounded
+by DATA_EXPORT_BATCH_SIZE rather than by how much data the user has.
+
 Requirements:
 - 10.1: Provide "Download My Data" feature
 - 10.2: Generate comprehensive JSON file with all user data
@@ -12,14 +18,19 @@ Requirements:
 - 10.5: Expire download links after 7 days
 """
 
+import asyncio
 import json
 import logging
+import zipfile
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from prisma import Prisma
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from prisma.enums import DataExportStatus
 import boto3
 from botocore.exceptions import ClientError
+from django.conf import settings
+
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.s3_multipart import S3MultipartWriter
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +38,16 @@ logger = logging.getLogger(__name__)
 class DataExportService:
     """Service for generating and managing user data exports"""
     
-    def __init__(self):
-        self.db = Prisma()
-        self.s3_client = boto3.client('s3')
-        self.bucket_name = 'muejam-data-exports'  # Configure via environment variable
+    FORMAT_VERSION = '2.0'
+    
+    # Batches fetched ahead of the writer per section
+    PREFETCH_BATCHES = 2
+    
+    def __init__(self, s3_client=None):
+        self.db = get_prisma()
+        self.s3_client = s3_client or boto3.client('s3')
+        self.bucket_name = settings.DATA_EXPORT_BUCKET
+        self.batch_size = settings.DATA_EXPORT_BATCH_SIZE
     
     async def create_export_request(self, user_id: str) -> Dict[str, Any]:
         """
@@ -76,6 +93,8 @@ class DataExportService:
         Generate comprehensive data export for a user.
         
         This method should be called asynchronously (e.g., via Celery task).
+        Progress (percentage of sections written and records exported) is
+        recorded on the export request as each section completes.
         
         Args:
             export_request_id: ID of the export request
@@ -98,43 +117,19 @@ class DataExportService:
             # Update status to processing
             await self.db.dataexportrequest.update(
                 where={'id': export_request_id},
-                data={'status': DataExportStatus.PROCESSING}
+                data={
+                    'status': DataExportStatus.PROCESSING,
+                    'progress': 0,
+                    'records_exported': 0
+                }
             )
             
             user_id = export_request.user_id
             
             try:
-                # Gather all user data
-                data = {
-                    'export_info': {
-                        'generated_at': datetime.utcnow().isoformat(),
-                        'user_id': user_id,
-                        'format_version': '1.0'
-                    },
-                    'profile': await self._export_profile(user_id),
-                    'stories': await self._export_stories(user_id),
-                    'chapters': await self._export_chapters(user_id),
-                    'whispers': await self._export_whispers(user_id),
-                    'likes': await self._export_likes(user_id),
-                    'follows': await self._export_follows(user_id),
-                    'reading_progress': await self._export_reading_progress(user_id),
-                    'bookmarks': await self._export_bookmarks(user_id),
-                    'highlights': await self._export_highlights(user_id),
-                    'notifications': await self._export_notifications(user_id),
-                    'consent_records': await self._export_consent_records(user_id)
-                }
-                
-                # Generate JSON file
-                json_data = json.dumps(data, indent=2, default=str)
-                
-                # Upload to S3
-                s3_key = f'exports/{user_id}/{export_request_id}.json'
-                self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=s3_key,
-                    Body=json_data.encode('utf-8'),
-                    ContentType='application/json'
-                )
+                # Stream the archive to S3
+                s3_key = f'exports/{user_id}/{export_request_id}.zip'
+                data_size, records = await self._write_archive(user_id, export_request_id, s3_key)
                 
                 # Generate presigned URL (7 day expiration)
                 download_url = self.s3_client.generate_presigned_url(
@@ -155,7 +150,9 @@ class DataExportService:
                         'status': DataExportStatus.COMPLETED,
                         'completed_at': datetime.utcnow(),
                         'download_url': download_url,
-                        'expires_at': expires_at
+                        'expires_at': expires_at,
+                        'progress': 100,
+                        'records_exported': records
                     }
                 )
                 
@@ -164,7 +161,8 @@ class DataExportService:
                     extra={
                         'user_id': user_id,
                         'request_id': export_request_id,
-                        'data_size': len(json_data)
+                        'data_size': data_size,
+                        'records': records
                     }
                 )
                 
@@ -228,11 +226,139 @@ class DataExportService:
                 'completed_at': export_request.completed_at.isoformat() if export_request.completed_at else None,
                 'download_url': export_request.download_url,
                 'expires_at': export_request.expires_at.isoformat() if export_request.expires_at else None,
-                'error_message': export_request.error_message
+                'error_message': export_request.error_message,
+                'progress': export_request.progress,
+                'records_exported': export_request.records_exported
             }
         finally:
             await self.db.disconnect()
     
+    async def _write_archive(self, user_id: str, export_request_id: str, s3_key: str) -> Tuple[int, int]:
+        """
+        Write the export archive to S3.
+        
+        Every section has a producer filling a small queue of batches, so
+        the next sections are being read while the current one is written.
+        Writes (which may upload a part) run in a worker thread to keep the
+        event loop free for the producers.
+        
+        Returns:
+            Archive size in bytes and number of records exported
+        """
+        sections = self._sections(user_id)
+        semaphore = asyncio.Semaphore(settings.DATA_EXPORT_CONCURRENCY)
+        queues = {name: asyncio.Queue(maxsize=self.PREFETCH_BATCHES) for name in sections}
+        producers = [
+            asyncio.create_task(self._produce_section(queues[name], model, where, serialize, semaphore))
+            for name, (model, where, serialize) in sections.items()
+        ]
+        records = 0
+        
+        try:
+            export_info = {
+                'generated_at': datetime.utcnow().isoformat(),
+                'user_id': user_id,
+                'format_version': self.FORMAT_VERSION,
+                'sections': ['profile', *sections]
+            }
+            async with semaphore:
+                profile = await self._export_profile(user_id)
+            
+            with S3MultipartWriter(self.s3_client, self.bucket_name, s3_key, 'application/zip') as writer:
+                with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                    await asyncio.to_thread(archive.writestr, 'export_info.json', json.dumps(export_info, indent=2))
+                    await asyncio.to_thread(archive.writestr, 'profile.json', json.dumps(profile, indent=2, default=str))
+                    
+                    for done, name in enumerate(sections, start=1):
+                        member = await asyncio.to_thread(archive.open, f'{name}.ndjson', 'w', force_zip64=True)
+                        try:
+                            while (batch := await queues[name].get()) is not None:
+                                if isinstance(batch, Exception):
+                                    raise batch
+                                data = ''.join(json.dumps(record, default=str) + '\n' for record in batch)
+                                await asyncio.to_thread(member.write, data.encode('utf-8'))
+                                records += len(batch)
+                        finally:
+                            await asyncio.to_thread(member.close)
+                        
+                        await self.db.dataexportrequest.update(
+                            where={'id': export_request_id},
+                            data={
+                                'progress': done * 99 // len(sections),
+                                'records_exported': records
+                            }
+                        )
+                    
+                    await asyncio.to_thread(archive.close)
+                await asyncio.to_thread(writer.close)
+            
+            return writer.bytes_written, records
+        finally:
+            for producer in producers:
+                producer.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+    
+    async def _produce_section(
+        self,
+        queue: asyncio.Queue,
+        model,
+        where: Dict[str, Any],
+        serialize: Callable[[Any], Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> None:
+        """Fill a section's queue with batches, then None (or the error)."""
+        try:
+            async for batch in self._iter_batches(model, where, serialize, semaphore):
+                await queue.put(batch)
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+    
+    async def _iter_batches(
+        self,
+        model,
+        where: Dict[str, Any],
+        serialize: Callable[[Any], Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Read a section in id order, a keyset page at a time."""
+        after_id = None
+        while True:
+            page_where = {**where, 'id': {'gt': after_id}} if after_id else where
+            async with semaphore:
+                rows = await model.find_many(
+                    where=page_where,
+                    order={'id': 'asc'},
+                    take=self.batch_size
+                )
+            
+            if rows:
+                yield [serialize(row) for row in rows]
+            if len(rows) < self.batch_size:
+                return
+            after_id = rows[-1].id
+    
+    def _sections(self, user_id: str) -> Dict[str, Tuple[Any, Dict[str, Any], Callable[[Any], Dict[str, Any]]]]:
+        """
+        NDJSON members of the archive, in order.
+        
+        Returns:
+            Section name -> (Prisma model, filter, record serializer)
+        """
+        return {
+            'stories': (self.db.story, {'author_id': user_id}, self._serialize_story),
+            'chapters': (self.db.chapter, {'story': {'is': {'author_id': user_id}}}, self._serialize_chapter),
+            'whispers': (self.db.whisper, {'user_id': user_id}, self._serialize_whisper),
+            'likes': (self.db.whisperlike, {'user_id': user_id}, self._serialize_like),
+            'following': (self.db.follow, {'follower_id': user_id}, self._serialize_following),
+            'followers': (self.db.follow, {'following_id': user_id}, self._serialize_follower),
+            'reading_progress': (self.db.readingprogress, {'user_id': user_id}, self._serialize_reading_progress),
+            'bookmarks': (self.db.bookmark, {'user_id': user_id}, self._serialize_bookmark),
+            'highlights': (self.db.highlight, {'user_id': user_id}, self._serialize_highlight),
+            'notifications': (self.db.notification, {'user_id': user_id}, self._serialize_notification),
+            'consent_records': (self.db.userconsent, {'user_id': user_id}, self._serialize_consent),
+        }
+    
     async def _export_profile(self, user_id: str) -> Dict[str, Any]:
         """Export user profile information"""
         profile = await self.db.userprofile.find_unique(
@@ -255,206 +381,119 @@ class DataExportService:
             'updated_at': profile.updated_at.isoformat()
         }
     
-    async def _export_stories(self, user_id: str) -> list:
-        """Export user's stories"""
-        stories = await self.db.story.find_many(
-            where={'author_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'id': story.id,
-                'slug': story.slug,
-                'title': story.title,
-                'blurb': story.blurb,
-                'cover_key': story.cover_key,
-                'published': story.published,
-                'published_at': story.published_at.isoformat() if story.published_at else None,
-                'created_at': story.created_at.isoformat(),
-                'updated_at': story.updated_at.isoformat()
-            }
-            for story in stories
-        ]
+    @staticmethod
+    def _serialize_story(story) -> Dict[str, Any]:
+        """Export one of the user's stories"""
+        return {
+            'id': story.id,
+            'slug': story.slug,
+            'title': story.title,
+            'blurb': story.blurb,
+            'cover_key': story.cover_key,
+            'published': story.published,
+            'published_at': story.published_at.isoformat() if story.published_at else None,
+            'created_at': story.created_at.isoformat(),
+            'updated_at': story.updated_at.isoformat()
+        }
     
-    async def _export_chapters(self, user_id: str) -> list:
-        """Export chapters from user's stories"""
-        # Get user's stories first
-        stories = await self.db.story.find_many(
-            where={'author_id': user_id},
-            select={'id': True}
-        )
-        
-        story_ids = [story.id for story in stories]
-        
-        if not story_ids:
-            return []
-        
-        chapters = await self.db.chapter.find_many(
-            where={'story_id': {'in': story_ids}},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'id': chapter.id,
-                'story_id': chapter.story_id,
-                'chapter_number': chapter.chapter_number,
-                'title': chapter.title,
-                'content': chapter.content,
-                'published': chapter.published,
-                'published_at': chapter.published_at.isoformat() if chapter.published_at else None,
-                'created_at': chapter.created_at.isoformat(),
-                'updated_at': chapter.updated_at.isoformat()
-            }
-            for chapter in chapters
-        ]
+    @staticmethod
+    def _serialize_chapter(chapter) -> Dict[str, Any]:
+        """Export a chapter from one of the user's stories"""
+        return {
+            'id': chapter.id,
+            'story_id': chapter.story_id,
+            'chapter_number': chapter.chapter_number,
+            'title': chapter.title,
+            'content': chapter.content,
+            'published': chapter.published,
+            'published_at': chapter.published_at.isoformat() if chapter.published_at else None,
+            'created_at': chapter.created_at.isoformat(),
+            'updated_at': chapter.updated_at.isoformat()
+        }
     
-    async def _export_whispers(self, user_id: str) -> list:
-        """Export user's whispers"""
-        whispers = await self.db.whisper.find_many(
-            where={'user_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'id': whisper.id,
-                'content': whisper.content,
-                'media_key': whisper.media_key,
-                'scope': whisper.scope,
-                'story_id': whisper.story_id,
-                'highlight_id': whisper.highlight_id,
-                'parent_id': whisper.parent_id,
-                'created_at': whisper.created_at.isoformat()
-            }
-            for whisper in whispers
-        ]
+    @staticmethod
+    def _serialize_whisper(whisper) -> Dict[str, Any]:
+        """Export one of the user's whispers"""
+        return {
+            'id': whisper.id,
+            'content': whisper.content,
+            'media_key': whisper.media_key,
+            'scope': whisper.scope,
+            'story_id': whisper.story_id,
+            'highlight_id': whisper.highlight_id,
+            'parent_id': whisper.parent_id,
+            'created_at': whisper.created_at.isoformat()
+        }
     
-    async def _export_likes(self, user_id: str) -> list:
-        """Export user's whisper likes"""
-        likes = await self.db.whisperlike.find_many(
-            where={'user_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'whisper_id': like.whisper_id,
-                'created_at': like.created_at.isoformat()
-            }
-            for like in likes
-        ]
+    @staticmethod
+    def _serialize_like(like) -> Dict[str, Any]:
+        """Export one of the user's whisper likes"""
+        return {
+            'whisper_id': like.whisper_id,
+            'created_at': like.created_at.isoformat()
+        }
     
-    async def _export_follows(self, user_id: str) -> Dict[str, list]:
-        """Export user's follows (following and followers)"""
-        following = await self.db.follow.find_many(
-            where={'follower_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        followers = await self.db.follow.find_many(
-            where={'following_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
+    @staticmethod
+    def _serialize_following(follow) -> Dict[str, Any]:
+        """Export a user the user follows"""
         return {
-            'following': [
-                {
-                    'user_id': follow.following_id,
-                    'created_at': follow.created_at.isoformat()
-                }
-                for follow in following
-            ],
-            'followers': [
-                {
-                    'user_id': follow.follower_id,
-                    'created_at': follow.created_at.isoformat()
-                }
-                for follow in followers
-            ]
+            'user_id': follow.following_id,
+            'created_at': follow.created_at.isoformat()
         }
     
-    async def _export_reading_progress(self, user_id: str) -> list:
-        """Export user's reading progress"""
-        progress = await self.db.readingprogress.find_many(
-            where={'user_id': user_id},
-            order={'updated_at': 'desc'}
-        )
-        
-        return [
-            {
-                'chapter_id': p.chapter_id,
-                'offset': p.offset,
-                'updated_at': p.updated_at.isoformat()
-            }
-            for p in progress
-        ]
+    @staticmethod
+    def _serialize_follower(follow) -> Dict[str, Any]:
+        """Export one of the user's followers"""
+        return {
+            'user_id': follow.follower_id,
+            'created_at': follow.created_at.isoformat()
+        }
     
-    async def _export_bookmarks(self, user_id: str) -> list:
-        """Export user's bookmarks"""
-        bookmarks = await self.db.bookmark.find_many(
-            where={'user_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'chapter_id': bookmark.chapter_id,
-                'offset': bookmark.offset,
-                'created_at': bookmark.created_at.isoformat()
-            }
-            for bookmark in bookmarks
-        ]
+    @staticmethod
+    def _serialize_reading_progress(progress) -> Dict[str, Any]:
+        """Export the user's reading progress in a chapter"""
+        return {
+            'chapter_id': progress.chapter_id,
+            'offset': progress.offset,
+            'updated_at': progress.updated_at.isoformat()
+        }
     
-    async def _export_highlights(self, user_id: str) -> list:
-        """Export user's highlights"""
-        highlights = await self.db.highlight.find_many(
-            where={'user_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'chapter_id': highlight.chapter_id,
-                'start_offset': highlight.start_offset,
-                'end_offset': highlight.end_offset,
-                'created_at': highlight.created_at.isoformat()
-            }
-            for highlight in highlights
-        ]
+    @staticmethod
+    def _serialize_bookmark(bookmark) -> Dict[str, Any]:
+        """Export one of the user's bookmarks"""
+        return {
+            'chapter_id': bookmark.chapter_id,
+            'offset': bookmark.offset,
+            'created_at': bookmark.created_at.isoformat()
+        }
     
-    async def _export_notifications(self, user_id: str) -> list:
-        """Export user's notifications"""
-        notifications = await self.db.notification.find_many(
-            where={'user_id': user_id},
-            order={'created_at': 'desc'}
-        )
-        
-        return [
-            {
-                'type': notification.type,
-                'actor_id': notification.actor_id,
-                'whisper_id': notification.whisper_id,
-                'read_at': notification.read_at.isoformat() if notification.read_at else None,
-                'created_at': notification.created_at.isoformat()
-            }
-            for notification in notifications
-        ]
+    @staticmethod
+    def _serialize_highlight(highlight) -> Dict[str, Any]:
+        """Export one of the user's highlights"""
+        return {
+            'chapter_id': highlight.chapter_id,
+            'start_offset': highlight.start_offset,
+            'end_offset': highlight.end_offset,
+            'created_at': highlight.created_at.isoformat()
+        }
     
-    async def _export_consent_records(self, user_id: str) -> list:
-        """Export user's consent records"""
-        consents = await self.db.userconsent.find_many(
-            where={'user_id': user_id},
-            order={'consented_at': 'desc'}
-        )
-        
-        return [
-            {
-                'document_id': consent.document_id,
-                'consented_at': consent.consented_at.isoformat(),
-                'ip_address': consent.ip_address,
-                'user_agent': consent.user_agent
-            }
-            for consent in consents
-        ]
+    @staticmethod
+    def _serialize_notification(notification) -> Dict[str, Any]:
+        """Export one of the user's notifications"""
+        return {
+            'type': notification.type,
+            'actor_id': notification.actor_id,
+            'whisper_id': notification.whisper_id,
+            'read_at': notification.read_at.isoformat() if notification.read_at else None,
+            'created_at': notification.created_at.isoformat()
+        }
+    
+    @staticmethod
+    def _serialize_consent(consent) -> Dict[str, Any]:
+        """Export one of the user's consent records"""
+        return {
+            'document_id': consent.document_id,
+            'consented_at': consent.consented_at.isoformat(),
+            'ip_address': consent.ip_address,
+            'user_agent': consent.user_agent
+        }
@@ -14,9 +14,10 @@ Requirements:
 """
 
 import logging
-from prisma import Prisma
 from prisma.enums import VisibilityLevel, CommentPermission, FollowerApproval
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,7 +35,7 @@ class PrivacyEnforcement:
         Returns:
             Privacy settings dictionary or None if not found
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -255,7 +256,7 @@ class PrivacyEnforcement:
         Returns:
             True if following relationship exists, False otherwise
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
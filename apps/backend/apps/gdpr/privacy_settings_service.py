@@ -16,6 +16,8 @@ from prisma import Prisma
 from prisma.models import PrivacySettings, UserConsent, LegalDocument
 from prisma.enums import VisibilityLevel, CommentPermission, FollowerApproval
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,7 +36,7 @@ class PrivacySettingsService:
             
         Requirements: 11.1
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -75,7 +77,7 @@ class PrivacySettingsService:
             
         Requirements: 11.1-11.8, 11.10
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -132,7 +134,7 @@ class PrivacySettingsService:
             
         Requirements: 11.11
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -169,7 +171,7 @@ class PrivacySettingsService:
             
         Requirements: 11.12, 11.13
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -6,6 +6,7 @@ Async tasks for processing data exports and account deletions.
 
 import logging
 from celery import shared_task
+from infrastructure.async_bridge import run_async
 from .data_export_service import DataExportService
 from .account_deletion_service import AccountDeletionService
 from .email_service import send_export_ready_email, send_deletion_complete_email
@@ -26,13 +27,12 @@ def generate_data_export(self, export_request_id: str):
     try:
         service = DataExportService()
         
-        # Generate export (this is an async function, so we need to run it)
-        import asyncio
-        result = asyncio.run(service.generate_export(export_request_id))
+        # Generate export on the bridge loop, which owns the shared Prisma client
+        result = run_async(service.generate_export(export_request_id), timeout=None)
         
         # Send email notification
         if result['status'] == 'COMPLETED':
-            asyncio.run(send_export_ready_email(
+            run_async(send_export_ready_email(
                 user_id=result['user_id'],
                 download_url=result['download_url'],
                 expires_at=result['expires_at']
@@ -1,8 +1,9 @@
 from datetime import datetime
 from typing import List, Optional
-from prisma import Prisma
 from prisma.models import HelpArticle, HelpSearchQuery, HelpArticleFeedback, SupportRequest
 
+from infrastructure.prisma_pool import get_prisma
+
 
 class HelpService:
     """Service for managing help articles and support"""
@@ -10,7 +11,7 @@ class HelpService:
     @staticmethod
     async def get_articles_by_category(category: str, published_only: bool = True) -> List[HelpArticle]:
         """Get all articles in a category"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -29,7 +30,7 @@ class HelpService:
     @staticmethod
     async def get_article_by_slug(slug: str) -> Optional[HelpArticle]:
         """Get article by slug and increment view count"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -55,7 +56,7 @@ class HelpService:
     @staticmethod
     async def get_most_viewed_articles(limit: int = 10) -> List[HelpArticle]:
         """Get most viewed published articles"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -71,7 +72,7 @@ class HelpService:
     @staticmethod
     async def search_articles(query: str, user_id: Optional[str] = None) -> List[HelpArticle]:
         """Search articles by title and content"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -111,7 +112,7 @@ class HelpService:
         excerpt: Optional[str] = None
     ) -> HelpArticle:
         """Create a new help article"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -139,7 +140,7 @@ class HelpService:
         excerpt: Optional[str] = None
     ) -> HelpArticle:
         """Update a help article"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -164,7 +165,7 @@ class HelpService:
     @staticmethod
     async def publish_article(article_id: str) -> HelpArticle:
         """Publish a help article"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -182,7 +183,7 @@ class HelpService:
     @staticmethod
     async def delete_article(article_id: str) -> bool:
         """Delete a help article"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -201,7 +202,7 @@ class HelpService:
         comment: Optional[str] = None
     ) -> HelpArticleFeedback:
         """Submit feedback for an article"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -245,7 +246,7 @@ class HelpService:
         user_id: Optional[str] = None
     ) -> SupportRequest:
         """Create a support request"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -265,7 +266,7 @@ class HelpService:
     @staticmethod
     async def get_popular_searches(limit: int = 10) -> List[dict]:
         """Get most popular search queries"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
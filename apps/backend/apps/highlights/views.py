@@ -3,12 +3,12 @@ import logging
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 
 from .serializers import (
     HighlightSerializer,
     HighlightCreateSerializer,
 )
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -117,7 +117,7 @@ def _create_highlight(request, chapter_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -217,7 +217,7 @@ def _list_highlights(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -300,7 +300,7 @@ def user_highlights(request):
     cursor = request.query_params.get('cursor')
     page_size = min(int(request.query_params.get('page_size', 20)), 100)
 
-    db = Prisma()
+    db = get_prisma()
 
     try:
         db.connect()
@@ -400,7 +400,7 @@ def delete_highlight(request, highlight_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
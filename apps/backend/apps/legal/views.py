@@ -3,7 +3,6 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from datetime import datetime
 from .serializers import (
     LegalDocumentSerializer,
@@ -13,35 +12,9 @@ from .serializers import (
     CookieConsentSerializer,
     AgeVerificationSerializer
 )
-import asyncio
-
-
-def _run_async(coro):
-    """Run async code from sync legal views."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    import threading
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
+from apps.users.profile_cache import invalidate_cached_profile
 
 
 def get_client_ip(request):
@@ -97,7 +70,7 @@ def get_legal_document(request, document_type):
         )
     
     try:
-        document_data = _run_async(
+        document_data = run_async(
             fetch_legal_document(document_type_upper)
         )
         
@@ -130,7 +103,7 @@ async def fetch_legal_document(document_type):
         - 1.1: Display Terms of Service
         - 1.2: Display Privacy Policy
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -175,7 +148,7 @@ def get_consent_status(request):
     user_id = request.user_profile.id
     
     try:
-        consent_status = _run_async(
+        consent_status = run_async(
             fetch_consent_status(user_id)
         )
         
@@ -201,7 +174,7 @@ async def fetch_consent_status(user_id):
     Requirements:
         - 1.7: Store user consent records with timestamps
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -269,7 +242,7 @@ def record_consent(request):
     user_agent = request.META.get('HTTP_USER_AGENT', '')
     
     try:
-        consent_data = _run_async(
+        consent_data = run_async(
             create_consent(user_id, document_id, ip_address, user_agent)
         )
         
@@ -305,7 +278,7 @@ async def create_consent(user_id, document_id, ip_address, user_agent):
         - 1.7: Store user consent records with timestamps
         - 1.8: Record consent changes with timestamp
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -395,7 +368,7 @@ def update_cookie_consent(request):
     session_id = request.session.session_key or 'anonymous'
     
     try:
-        consent_data = _run_async(
+        consent_data = run_async(
             update_cookie_consent_record(user_id, session_id, analytics, marketing)
         )
         
@@ -425,7 +398,7 @@ async def update_cookie_consent_record(user_id, session_id, analytics, marketing
         - 1.6: Display Cookie Consent banner with granular consent options
         - 1.8: Record consent changes with timestamp
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -513,7 +486,7 @@ def verify_age(request):
     user_id = request.user_profile.id
     
     try:
-        result = _run_async(
+        result = run_async(
             update_age_verification(user_id, age)
         )
         
@@ -553,7 +526,7 @@ async def update_age_verification(user_id, age):
     Requirements:
         - 1.4: Store age verification status
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -565,6 +538,7 @@ async def update_age_verification(user_id, age):
                 'age_verified_at': datetime.now()
             }
         )
+        invalidate_cached_profile(updated_profile.clerk_user_id)
         
         return {
             'age_verified': updated_profile.age_verified,
@@ -613,7 +587,7 @@ def submit_dmca_takedown(request):
     validated_data = serializer.validated_data
     
     try:
-        takedown_data = _run_async(
+        takedown_data = run_async(
             create_dmca_takedown(validated_data)
         )
         
@@ -626,10 +600,10 @@ def submit_dmca_takedown(request):
         email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', contact_info)
         if email_match:
             requester_email = email_match.group(0)
-            _run_async(email_service.send_dmca_confirmation(requester_email, takedown_data['id']))
+            run_async(email_service.send_dmca_confirmation(requester_email, takedown_data['id']))
         
         # Notify designated DMCA agent (Requirement 31.5)
-        _run_async(email_service.send_dmca_agent_notification(takedown_data))
+        run_async(email_service.send_dmca_agent_notification(takedown_data))
         
         return Response(takedown_data, status=status.HTTP_201_CREATED)
         
@@ -654,7 +628,7 @@ async def create_dmca_takedown(data):
         - 31.1: Store DMCA takedown requests
         - 31.2: Store all required fields
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -720,7 +694,7 @@ def get_dmca_requests(request):
     status_filter = request.GET.get('status', None)
     
     try:
-        requests_data = _run_async(
+        requests_data = run_async(
             fetch_dmca_requests(status_filter)
         )
         
@@ -746,7 +720,7 @@ async def fetch_dmca_requests(status_filter=None):
     Requirements:
         - 31.6: Provide DMCA agent dashboard
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -829,7 +803,7 @@ def review_dmca_request(request, request_id):
     
     try:
         # Update the DMCA request
-        updated_request = _run_async(
+        updated_request = run_async(
             update_dmca_request_status(request_id, action, reviewer_id, reason)
         )
         
@@ -841,7 +815,7 @@ def review_dmca_request(request, request_id):
         
         # If approved, take down the content (Requirement 31.7)
         if action == 'approve':
-            content_taken_down = _run_async(
+            content_taken_down = run_async(
                 takedown_content(updated_request['infringing_url'])
             )
             
@@ -850,7 +824,7 @@ def review_dmca_request(request, request_id):
                 email_service = LegalEmailService()
                 author_email = content_taken_down.get('author_email')
                 if author_email:
-                    _run_async(
+                    run_async(
                         email_service.send_dmca_takedown_notification(
                             author_email,
                             updated_request['infringing_url'],
@@ -883,7 +857,7 @@ async def update_dmca_request_status(request_id, action, reviewer_id, reason):
     Requirements:
         - 31.6: Update DMCA request status
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -938,7 +912,7 @@ async def takedown_content(infringing_url):
     Requirements:
         - 31.7: Implement content takedown on approval
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -3,7 +3,6 @@ import logging
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 
 from .serializers import (
     ShelfSerializer,
@@ -13,6 +12,8 @@ from .serializers import (
     ShelfItemCreateSerializer,
     ShelfWithStoriesSerializer,
 )
+from apps.discovery.engagement import SAVE, emit_engagement
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +61,7 @@ def _list_shelves(request):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -140,7 +141,7 @@ def _create_shelf(request):
     validated_data = serializer.validated_data
     
     # Create shelf in database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -228,7 +229,7 @@ def update_shelf(request, shelf_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -320,7 +321,7 @@ def delete_shelf(request, shelf_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -404,7 +405,7 @@ def get_library(request):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -522,7 +523,7 @@ def add_story_to_shelf(request, shelf_id):
     story_id = validated_data['story_id']
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -600,6 +601,8 @@ def add_story_to_shelf(request, shelf_id):
         
         db.disconnect()
         
+        emit_engagement(SAVE, story_id, user_profile.id)
+        
         # Serialize response
         response_serializer = ShelfItemSerializer(shelf_item)
         
@@ -654,7 +657,7 @@ def remove_story_from_shelf(request, shelf_id, story_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
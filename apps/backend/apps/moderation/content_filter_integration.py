@@ -10,6 +10,7 @@ from typing import Dict, Optional
 from prisma import Prisma
 from .content_filters import ContentFilterPipeline
 from .filter_config_service import FilterConfigService
+from .queue_service import sync_report_in_queue
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,8 @@ class ContentFilterIntegration:
         self,
         content: str,
         content_type: str,
-        content_id: Optional[str] = None
+        content_id: Optional[str] = None,
+        defer_url_reputation: bool = False
     ) -> Dict:
         """
         Filter content and return validation result.
@@ -56,6 +58,9 @@ class ContentFilterIntegration:
             content: Text content to filter
             content_type: Type of content (story, chapter, whisper)
             content_id: Optional ID of the content (for logging flags)
+            defer_url_reputation: Skip the Safe Browsing API call; URLs that
+                still need it are returned in 'deferred_urls' for the
+                post-write moderation stage
             
         Returns:
             Dictionary with validation results:
@@ -65,7 +70,8 @@ class ContentFilterIntegration:
                 'error_message': str,  # User-friendly error message if blocked
                 'flags': list,  # List of detected issues
                 'auto_actions': list,  # Automated actions to take
-                'details': dict  # Detailed filter results
+                'details': dict,  # Detailed filter results
+                'deferred_urls': list  # URLs awaiting a reputation check
             }
             
         Requirements:
@@ -82,7 +88,11 @@ class ContentFilterIntegration:
             pipeline = ContentFilterPipeline()
         
         # Run filters
-        filter_result = pipeline.filter_content(content, content_type)
+        filter_result = pipeline.filter_content(
+            content,
+            content_type,
+            check_url_reputation=not defer_url_reputation
+        )
         
         # Determine if content should be blocked
         blocked = not filter_result['allowed']
@@ -106,7 +116,8 @@ class ContentFilterIntegration:
             'error_message': error_message,
             'flags': filter_result['flags'],
             'auto_actions': filter_result.get('auto_actions', []),
-            'details': filter_result.get('details', {})
+            'details': filter_result.get('details', {}),
+            'deferred_urls': filter_result.get('deferred_urls', [])
         }
     
     async def handle_auto_actions(
@@ -177,6 +188,8 @@ class ContentFilterIntegration:
                 flags.append('profanity')
             if 'spam' in filter_details:
                 flags.append('spam')
+            if 'malicious_url' in filter_details:
+                flags.append('malicious URL')
             
             reason = f"Automated detection: {', '.join(flags)}"
             
@@ -214,8 +227,19 @@ class ContentFilterIntegration:
             else:
                 report_data['reporter_id'] = system_user.id
             
+            # Post-write moderation jobs can be retried; file each report once
+            existing_report = await self.db.report.find_first(
+                where={k: v for k, v in report_data.items() if k != 'reason'}
+            )
+            if existing_report:
+                logger.info(
+                    f"Automated report already exists for {content_type} {content_id}"
+                )
+                return
+            
             # Create report
             report = await self.db.report.create(data=report_data)
+            await sync_report_in_queue(self.db, report)
             
             logger.info(
                 f"Created automated report {report.id} for {content_type} {content_id}"
@@ -7,8 +7,10 @@ and malicious URLs in user-generated content according to requirements 4.1,
 """
 
 import re
-from typing import Dict, List, Optional, Set
-from dataclasses import dataclass
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 from .url_validator import URLValidator
 
 
@@ -21,6 +23,191 @@ class FilterResult:
     confidence: float
 
 
+# Leetspeak digits/symbols and look-alike letters from other scripts, mapped
+# to the ASCII letter they imitate. Zero-width characters are dropped.
+MATCH_TRANSLATION = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
+    '@': 'a', '$': 's',
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'і': 'i', 'ј': 'j',
+    'ѕ': 's', 'ԁ': 'd',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o',
+    'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x',
+    # Invisible separators used to split words
+    '\u00ad': None, '\u200b': None, '\u200c': None, '\u200d': None,
+    '\u2060': None, '\ufeff': None,
+})
+
+
+def normalize_for_matching(content: str) -> str:
+    """
+    Normalize text for keyword matching.
+    
+    Applies NFKC (folds full-width and stylized letters), lowercases, and
+    maps leetspeak and homoglyphs to plain letters, so 'Sh1t' and 'ѕhit'
+    match 'shit'.
+    """
+    if not content.isascii():
+        content = unicodedata.normalize('NFKC', content)
+    return content.lower().translate(MATCH_TRANSLATION)
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a keyword trie node; longer keywords are tried first."""
+    alternatives = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items()) if char
+    ]
+    if not alternatives:
+        return ''
+    if len(alternatives) == 1:
+        body = alternatives[0]
+        if '' in node and len(body) > 1:
+            body = f'(?:{body})'
+    else:
+        body = '(?:' + '|'.join(alternatives) + ')'
+    return body + '?' if '' in node else body
+
+
+@lru_cache(maxsize=32)
+def _compile_keywords(keywords: FrozenSet[str]) -> Tuple[re.Pattern, Dict[str, Tuple[str, ...]]]:
+    """
+    Compile keywords into one regex over a keyword trie.
+    
+    The pattern is a zero-width lookahead, so finditer reports the longest
+    keyword starting at every position in a single left-to-right pass.
+    Each matched keyword maps to all keywords that are prefixes of it, so
+    shorter keywords sharing the start are reported too.
+    
+    Returns:
+        Tuple of (compiled pattern, matched keyword -> keywords it contains as a prefix)
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    pattern = re.compile('(?=(' + _trie_pattern(trie) + '))')
+    prefixes = {
+        keyword: tuple(k for k in keywords if keyword.startswith(k))
+        for keyword in keywords
+    }
+    return pattern, prefixes
+
+
+@dataclass
+class ModerationScan:
+    """Keyword hits from one ModerationEngine pass, by category, in text order."""
+    hits: Dict[str, List[str]] = field(default_factory=dict)
+    
+    def terms(self, category: str) -> List[str]:
+        """Matched keywords for a category, one entry per occurrence."""
+        return self.hits.get(category, [])
+    
+    def distinct_terms(self, category: str) -> List[str]:
+        """Matched keywords for a category, each once."""
+        return list(dict.fromkeys(self.hits.get(category, [])))
+
+
+class ModerationEngine:
+    """
+    Single-pass keyword matcher for all moderation categories.
+    
+    All keyword lists (profanity, spam phrases, hate keywords and the
+    ContentFilterConfig blacklists) are compiled into one trie-shaped
+    regex, applied once to the normalized text. Categories listed in
+    whole_word_categories only count matches on word boundaries; the
+    others match anywhere, as substring checks did before.
+    """
+    
+    def __init__(
+        self,
+        keyword_sets: Dict[str, Iterable[str]],
+        whole_word_categories: Iterable[str] = ()
+    ):
+        """
+        Initialize the engine.
+        
+        Args:
+            keyword_sets: Category name -> keywords
+            whole_word_categories: Categories that only match whole words
+        """
+        self.categories: Dict[str, Set[str]] = {}
+        for category, keywords in keyword_sets.items():
+            normalized = {normalize_for_matching(k) for k in keywords if k and k.strip()}
+            self.categories[category] = normalized
+        self.whole_word_categories = frozenset(whole_word_categories)
+        
+        self._keyword_categories: Dict[str, Tuple[str, ...]] = {}
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                self._keyword_categories[keyword] = self._keyword_categories.get(keyword, ()) + (category,)
+        
+        if self._keyword_categories:
+            self._pattern, self._prefixes = _compile_keywords(frozenset(self._keyword_categories))
+        else:
+            self._pattern, self._prefixes = None, {}
+    
+    def scan(self, content: str) -> ModerationScan:
+        """
+        Find every keyword of every category in one pass.
+        
+        Args:
+            content: Text content to scan
+            
+        Returns:
+            ModerationScan with hits per category
+        """
+        scan = ModerationScan(hits={category: [] for category in self.categories})
+        if not content or self._pattern is None:
+            return scan
+        
+        text = normalize_for_matching(content)
+        text_length = len(text)
+        whole_word = self.whole_word_categories
+        
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            for keyword in self._prefixes[match.group(1)]:
+                end = start + len(keyword)
+                bounded = None
+                for category in self._keyword_categories[keyword]:
+                    if category in whole_word:
+                        if bounded is None:
+                            bounded = (
+                                (start == 0 or not _is_word_char(text[start - 1]))
+                                and (end == text_length or not _is_word_char(text[end]))
+                            )
+                        if not bounded:
+                            continue
+                    scan.hits[category].append(keyword)
+        
+        return scan
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _leading_letters(patterns: Iterable[str]) -> Optional[str]:
+    """
+    First letters of patterns shaped like r'\b(word|word)...' or r'\bword...'.
+    
+    Returns None if any pattern starts some other way.
+    """
+    letters = set()
+    for pattern in patterns:
+        match = re.match(r'\\b\(?([a-z|]+)', pattern)
+        if not match:
+            return None
+        letters.update(word[0] for word in match.group(1).split('|') if word)
+    return ''.join(sorted(letters))
+
+
 class ProfanityFilter:
     """
     Service for detecting profanity in content with configurable word lists.
@@ -64,17 +251,24 @@ class ProfanityFilter:
         """
         self.profanity_words = self.DEFAULT_PROFANITY_LIST.copy()
         if custom_words:
-            self.profanity_words.update(custom_words)
+            self.profanity_words.update(w.lower() for w in custom_words)
         
-        self.whitelist = whitelist or set()
+        self.whitelist = {w.lower() for w in whitelist} if whitelist else set()
         self.sensitivity = sensitivity
+        self._engine: Optional[ModerationEngine] = None
+    
+    @property
+    def keywords(self) -> Set[str]:
+        """Words this filter flags (whitelisted words removed)."""
+        return self.profanity_words - self.whitelist
     
-    def check(self, content: str) -> FilterResult:
+    def check(self, content: str, scan: Optional[ModerationScan] = None) -> FilterResult:
         """
         Check content for profanity.
         
         Args:
             content: Text content to check
+            scan: Result of a shared ModerationEngine pass (scanned here if omitted)
             
         Returns:
             FilterResult with detection status and details
@@ -87,23 +281,19 @@ class ProfanityFilter:
                 confidence=0.0
             )
         
-        # Normalize content for checking
-        normalized = content.lower()
-        words = re.findall(r'\b\w+\b', normalized)
+        if scan is None:
+            if self._engine is None:
+                self._engine = ModerationEngine({'profanity': self.keywords}, ('profanity',))
+            scan = self._engine.scan(content)
         
         # Find matches
-        matched = []
+        matched = scan.terms('profanity')
         max_severity = 'low'
         
-        for word in words:
-            if word in self.whitelist:
-                continue
-            
-            if word in self.profanity_words:
-                matched.append(word)
-                word_severity = self.SEVERITY_MAP.get(word, 'medium')
-                if self._compare_severity(word_severity, max_severity) > 0:
-                    max_severity = word_severity
+        for word in matched:
+            word_severity = self.SEVERITY_MAP.get(word, 'medium')
+            if self._compare_severity(word_severity, max_severity) > 0:
+                max_severity = word_severity
         
         # Apply sensitivity threshold
         detected = self._should_flag(matched, max_severity)
@@ -150,22 +340,39 @@ class SpamDetector:
         'discount', 'special offer', 'prize', 'winner', 'congratulations',
         'claim your', 'click below', 'visit now', 'order now'
     }
+    URL_PATTERN = re.compile(r'https?://\S+|www\.\S+', re.IGNORECASE)
     
-    def __init__(self, sensitivity: str = 'MODERATE'):
+    def __init__(
+        self,
+        custom_keywords: Optional[Set[str]] = None,
+        sensitivity: str = 'MODERATE'
+    ):
         """
         Initialize the spam detector.
         
         Args:
+            custom_keywords: Additional promotional phrases to detect
             sensitivity: Detection sensitivity level
         """
+        self.promotional_keywords = set(self.PROMOTIONAL_KEYWORDS)
+        if custom_keywords:
+            self.promotional_keywords.update(k.lower() for k in custom_keywords)
+        
         self.sensitivity = sensitivity
+        self._engine: Optional[ModerationEngine] = None
+    
+    @property
+    def keywords(self) -> Set[str]:
+        """Promotional phrases this detector looks for."""
+        return self.promotional_keywords
     
-    def check(self, content: str) -> FilterResult:
+    def check(self, content: str, scan: Optional[ModerationScan] = None) -> FilterResult:
         """
         Check content for spam patterns.
         
         Args:
             content: Text content to check
+            scan: Result of a shared ModerationEngine pass (scanned here if omitted)
             
         Returns:
             FilterResult with detection status and details
@@ -182,8 +389,7 @@ class SpamDetector:
         confidence = 0.0
         
         # Check for excessive links
-        url_pattern = r'https?://\S+|www\.\S+'
-        urls = re.findall(url_pattern, content, re.IGNORECASE)
+        urls = self.URL_PATTERN.findall(content)
         if len(urls) >= self.EXCESSIVE_LINKS_THRESHOLD:
             spam_indicators.append('excessive_links')
             confidence += 0.4
@@ -195,8 +401,11 @@ class SpamDetector:
             confidence += 0.3
         
         # Check for promotional keywords
-        normalized = content.lower()
-        promotional_matches = [kw for kw in self.PROMOTIONAL_KEYWORDS if kw in normalized]
+        if scan is None:
+            if self._engine is None:
+                self._engine = ModerationEngine({'spam': self.keywords})
+            scan = self._engine.scan(content)
+        promotional_matches = scan.distinct_terms('spam')
         if promotional_matches:
             spam_indicators.append('promotional_content')
             confidence += min(len(promotional_matches) * 0.15, 0.5)
@@ -285,17 +494,31 @@ class HateSpeechDetector:
         """
         self.hate_keywords = self.HATE_KEYWORDS.copy()
         if custom_keywords:
-            self.hate_keywords.update(custom_keywords)
+            self.hate_keywords.update(k.lower() for k in custom_keywords)
         
         self.sensitivity = sensitivity
         self.compiled_patterns = [re.compile(p, re.IGNORECASE) for p in self.HATE_PATTERNS]
+        # All patterns in one alternation, used to skip content matching none
+        alternation = '|'.join(f'(?:{p})' for p in self.HATE_PATTERNS)
+        leading = _leading_letters(self.HATE_PATTERNS)
+        if leading:
+            # Only try the alternation where one of its first words can start
+            alternation = f'(?=[{re.escape(leading)}])(?:{alternation})'
+        self.combined_pattern = re.compile(alternation, re.IGNORECASE)
+        self._engine: Optional[ModerationEngine] = None
     
-    def check(self, content: str) -> FilterResult:
+    @property
+    def keywords(self) -> Set[str]:
+        """Keywords this detector looks for."""
+        return self.hate_keywords
+    
+    def check(self, content: str, scan: Optional[ModerationScan] = None) -> FilterResult:
         """
         Check content for hate speech.
         
         Args:
             content: Text content to check
+            scan: Result of a shared ModerationEngine pass (scanned here if omitted)
             
         Returns:
             FilterResult with detection status and details
@@ -308,21 +531,27 @@ class HateSpeechDetector:
                 confidence=0.0
             )
         
-        normalized = content.lower()
+        if scan is None:
+            if self._engine is None:
+                self._engine = ModerationEngine({'hate_speech': self.keywords})
+            scan = self._engine.scan(content)
+        
         matched_terms = []
         confidence = 0.0
         
         # Check for hate keywords
-        for keyword in self.hate_keywords:
-            if keyword in normalized:
-                matched_terms.append(keyword)
-                confidence += 0.3
+        for keyword in scan.distinct_terms('hate_speech'):
+            matched_terms.append(keyword)
+            confidence += 0.3
         
-        # Check for hate patterns
-        for pattern in self.compiled_patterns:
-            if pattern.search(content):
-                matched_terms.append('hate_pattern')
-                confidence += 0.4
+        # Check for hate patterns (each pattern counts once). The alternation
+        # finds a match whenever any pattern matches, so clean text takes a
+        # single pass; patterns can overlap, so each is then searched on its own
+        if self.combined_pattern.search(content):
+            for pattern in self.compiled_patterns:
+                if pattern.search(content):
+                    matched_terms.append('hate_pattern')
+                    confidence += 0.4
         
         confidence = min(confidence, 1.0)
         detected = confidence > self._get_threshold()
@@ -385,14 +614,32 @@ class ContentFilterPipeline:
         self.url_validator = URLValidator(
             **(url_validator_config or {})
         )
+        
+        # One pass over the content finds keywords for every filter
+        self.engine = ModerationEngine(
+            {
+                'profanity': self.profanity_filter.keywords,
+                'spam': self.spam_detector.keywords,
+                'hate_speech': self.hate_speech_detector.keywords,
+            },
+            whole_word_categories=('profanity',)
+        )
     
-    def filter_content(self, content: str, content_type: str) -> Dict:
+    def filter_content(
+        self,
+        content: str,
+        content_type: str,
+        check_url_reputation: bool = True
+    ) -> Dict:
         """
         Run all filters on content and return aggregated results.
         
         Args:
             content: Text content to filter
             content_type: Type of content (story, chapter, whisper, etc.)
+            check_url_reputation: Query the Safe Browsing API inline. If False,
+                only local URL checks run and URLs still needing the API check
+                are returned under 'deferred_urls'
             
         Returns:
             Dictionary with filtering results and recommended actions
@@ -411,8 +658,10 @@ class ContentFilterPipeline:
             'details': {}
         }
         
+        scan = self.engine.scan(content)
+        
         # Run profanity check
-        profanity_result = self.profanity_filter.check(content)
+        profanity_result = self.profanity_filter.check(content, scan)
         if profanity_result.detected:
             results['flags'].append('profanity')
             results['details']['profanity'] = {
@@ -423,7 +672,7 @@ class ContentFilterPipeline:
                 results['allowed'] = False
         
         # Run spam detection
-        spam_result = self.spam_detector.check(content)
+        spam_result = self.spam_detector.check(content, scan)
         if spam_result.detected:
             results['flags'].append('spam')
             results['details']['spam'] = {
@@ -433,7 +682,7 @@ class ContentFilterPipeline:
             results['allowed'] = False
         
         # Run hate speech detection
-        hate_speech_result = self.hate_speech_detector.check(content)
+        hate_speech_result = self.hate_speech_detector.check(content, scan)
         if hate_speech_result.detected:
             results['flags'].append('hate_speech')
             results['details']['hate_speech'] = {
@@ -442,7 +691,8 @@ class ContentFilterPipeline:
             results['auto_actions'].append('create_high_priority_report')
         
         # Run URL validation
-        url_result = self.url_validator.check_content(content)
+        urls = self.url_validator.extract_urls(content)
+        url_result = self.url_validator.validate_urls(urls, use_api=check_url_reputation)
         if not url_result.is_safe:
             results['flags'].append('malicious_url')
             results['details']['malicious_url'] = {
@@ -453,4 +703,9 @@ class ContentFilterPipeline:
             results['allowed'] = False
             results['auto_actions'].append('log_blocked_url_attempt')
         
+        if not check_url_reputation and self.url_validator.api_key:
+            deferred = [url for url in urls if not self.url_validator.is_whitelisted(url)]
+            if deferred:
+                results['deferred_urls'] = deferred
+        
         return results
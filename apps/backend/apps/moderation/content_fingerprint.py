@@ -0,0 +1,375 @@
+"""
+Content fingerprint index for cross-account duplicate detection.
+
+Every whisper and chapter gets one ContentFingerprint row when it is written
+(by the post-write moderation stage):
+- exact_hash: SHA-256 of the normalized text, for identical copies
+- simhash: 64-bit SimHash of the text's character shingles; near-duplicates
+  differ in only a few bits
+- lsh_buckets: MinHash signature split into LSH bands; two texts with a
+  Jaccard similarity of about 0.6 or more share at least one bucket with
+  high probability
+
+Looking up duplicates takes two indexed probes, exact copies first (B-tree on
+exact_hash) and then LSH candidates (GIN on lsh_buckets), followed by a
+SimHash distance check on the few candidates, so callers never scan or
+rehash other users' content.
+
+The spam check in the post-write stage and SuspiciousActivityDetector both
+use ContentFingerprintIndex.
+"""
+
+import hashlib
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+logger = logging.getLogger(__name__)
+
+
+SHINGLE_SIZE = 5  # Characters per shingle
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Texts shorter than this (after normalization) are too generic to fingerprint
+MIN_FINGERPRINT_LENGTH = 20
+
+# Fixed seed so signatures are comparable across processes and deploys
+_rng = np.random.RandomState(0x5EED)
+_PERM_A = _rng.randint(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64) << np.uint64(1) | np.uint64(1)
+_PERM_B = _rng.randint(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64) << np.uint64(1)
+_SHIFT = np.uint64(32)
+_CHUNK = 4096
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def normalize_content(content: str) -> str:
+    """
+    Normalize text for fingerprinting.
+
+    Strips HTML tags, folds case and compatibility characters, drops
+    punctuation and collapses whitespace, so trivial edits do not change
+    the fingerprint.
+    """
+    text = _TAG_RE.sub(' ', content or '')
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = ''.join(c for c in text if c.isalnum() or c.isspace())
+    return ' '.join(text.split())
+
+
+def exact_hash(content: str) -> str:
+    """SHA-256 hex digest of the normalized content."""
+    return hashlib.sha256(normalize_content(content).encode('utf-8')).hexdigest()
+
+
+def _shingle_hashes(normalized: str) -> np.ndarray:
+    """64-bit hashes of the distinct character shingles of normalized text."""
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray:
+    """
+    MinHash signature of a set of shingle hashes.
+
+    Each permutation is a multiply-shift hash (random odd 64-bit multiplier,
+    wrapping arithmetic, top 32 bits kept) of the shingle's low 32 bits.
+    """
+    values = hashes & np.uint64(0xFFFFFFFF)
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(values), _CHUNK):
+        chunk = values[start:start + _CHUNK]
+        permuted = (_PERM_A[:, None] * chunk[None, :] + _PERM_B[:, None]) >> _SHIFT
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature
+
+
+def lsh_buckets(signature: np.ndarray) -> List[str]:
+    """Split a MinHash signature into banded bucket keys ('<band>:<digest>')."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=6).hexdigest()
+        buckets.append(f'{band:x}:{digest}')
+    return buckets
+
+
+def simhash(hashes: np.ndarray) -> int:
+    """
+    64-bit SimHash of a set of shingle hashes, as a signed integer
+    (the range of a Postgres BIGINT).
+    """
+    bits = np.unpackbits(hashes.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1)
+    majority = (bits.sum(axis=0) * 2 > len(hashes)).astype(np.uint8)
+    value = int.from_bytes(np.packbits(majority).tobytes(), 'big')
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two 64-bit SimHashes."""
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+@dataclass
+class Fingerprint:
+    """Fingerprint of one piece of content."""
+    exact_hash: str
+    simhash: int
+    lsh_buckets: List[str]
+
+
+@dataclass
+class DuplicateMatch:
+    """Another account's content that duplicates a probed fingerprint."""
+    content_type: str
+    content_id: str
+    user_id: str
+    exact: bool
+    distance: int
+
+
+def fingerprint(content: str) -> Optional[Fingerprint]:
+    """
+    Fingerprint content.
+
+    Args:
+        content: Raw text (HTML is stripped)
+
+    Returns:
+        Fingerprint, or None if the text is too short to fingerprint
+    """
+    normalized = normalize_content(content)
+    if len(normalized) < MIN_FINGERPRINT_LENGTH:
+        return None
+    hashes = _shingle_hashes(normalized)
+    return Fingerprint(
+        exact_hash=hashlib.sha256(normalized.encode('utf-8')).hexdigest(),
+        simhash=simhash(hashes),
+        lsh_buckets=lsh_buckets(minhash_signature(hashes))
+    )
+
+
+class ContentFingerprintIndex:
+    """Maintains and probes the ContentFingerprint table."""
+
+    def __init__(self, db, max_distance: Optional[int] = None):
+        """
+        Initialize the index.
+
+        Args:
+            db: Connected Prisma client
+            max_distance: Largest SimHash distance that counts as a
+                near-duplicate (defaults to settings.CONTENT_FINGERPRINT_MAX_DISTANCE)
+        """
+        self.db = db
+        self.max_distance = (
+            max_distance if max_distance is not None
+            else getattr(settings, 'CONTENT_FINGERPRINT_MAX_DISTANCE', 10)
+        )
+
+    async def index_content(
+        self,
+        content_type: str,
+        content_id: str,
+        user_id: str,
+        content: str
+    ) -> Optional[Fingerprint]:
+        """
+        Create or refresh the fingerprint of a whisper or chapter.
+
+        Args:
+            content_type: 'whisper' or 'chapter'
+            content_id: Content ID
+            user_id: Author's user profile ID
+            content: Current text of the content
+
+        Returns:
+            The stored fingerprint, or None if the content is too short
+            (any previous fingerprint is removed)
+        """
+        fp = fingerprint(content)
+        if fp is None:
+            await self.remove(content_type, content_id)
+            return None
+
+        data = {
+            'user_id': user_id,
+            'exact_hash': fp.exact_hash,
+            'simhash': fp.simhash,
+            'lsh_buckets': fp.lsh_buckets,
+        }
+        await self.db.contentfingerprint.upsert(
+            where={'content_type_content_id': {'content_type': content_type, 'content_id': content_id}},
+            data={
+                'create': {'content_type': content_type, 'content_id': content_id, **data},
+                'update': data,
+            }
+        )
+        return fp
+
+    async def remove(self, content_type: str, content_id: str):
+        """Drop the fingerprint of deleted content."""
+        await self.db.contentfingerprint.delete_many(
+            where={'content_type': content_type, 'content_id': content_id}
+        )
+
+    async def find_duplicates(
+        self,
+        fingerprints: Iterable[Fingerprint],
+        exclude_user_id: Optional[str] = None,
+        limit: int = 100
+    ) -> List[DuplicateMatch]:
+        """
+        Find content that duplicates any of the given fingerprints.
+
+        Args:
+            fingerprints: Fingerprints to probe
+            exclude_user_id: Ignore content by this user (usually the author)
+            limit: Maximum number of candidate rows to read, exact copies
+                taking precedence over LSH candidates
+
+        Returns:
+            Exact and near-duplicate matches, exact ones first
+        """
+        fingerprints = [fp for fp in fingerprints if fp is not None]
+        if not fingerprints:
+            return []
+
+        hashes = list({fp.exact_hash for fp in fingerprints})
+        buckets = list({bucket for fp in fingerprints for bucket in fp.lsh_buckets})
+        scope: Dict = {'user_id': {'not': exclude_user_id}} if exclude_user_id else {}
+        order = [{'created_at': 'asc'}, {'id': 'asc'}]
+
+        # Exact copies are read first so LSH candidates never crowd them out
+        candidates = await self.db.contentfingerprint.find_many(
+            where={**scope, 'exact_hash': {'in': hashes}},
+            order=order,
+            take=limit
+        )
+        if len(candidates) < limit:
+            candidates += await self.db.contentfingerprint.find_many(
+                where={
+                    **scope,
+                    'lsh_buckets': {'has_some': buckets},
+                    'NOT': {'exact_hash': {'in': hashes}},
+                },
+                order=order,
+                take=limit - len(candidates)
+            )
+
+        exact_hashes = set(hashes)
+        matches = []
+        for candidate in candidates:
+            if candidate.exact_hash in exact_hashes:
+                matches.append(DuplicateMatch(
+                    candidate.content_type, candidate.content_id, candidate.user_id, True, 0
+                ))
+                continue
+            distance = min(hamming_distance(candidate.simhash, fp.simhash) for fp in fingerprints)
+            if distance <= self.max_distance:
+                matches.append(DuplicateMatch(
+                    candidate.content_type, candidate.content_id, candidate.user_id, False, distance
+                ))
+
+        matches.sort(key=lambda match: (not match.exact, match.distance))
+        return matches
+
+    async def find_cross_account_duplicates(
+        self,
+        user_id: str,
+        recent: int = 50
+    ) -> List[DuplicateMatch]:
+        """
+        Find other accounts' copies of a user's recent content.
+
+        Args:
+            user_id: User whose content to check
+            recent: Number of the user's latest fingerprints to probe
+
+        Returns:
+            Duplicate matches from other accounts
+        """
+        rows = await self.db.contentfingerprint.find_many(
+            where={'user_id': user_id},
+            order={'created_at': 'desc'},
+            take=recent
+        )
+        fingerprints = [
+            Fingerprint(row.exact_hash, row.simhash, list(row.lsh_buckets))
+            for row in rows
+        ]
+        return await self.find_duplicates(fingerprints, exclude_user_id=user_id)
+
+    async def backfill(
+        self,
+        content_type: str,
+        after_id: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Optional[str]:
+        """
+        Fingerprint one batch of existing whispers or chapters, in ID order.
+
+        Args:
+            content_type: 'whisper' or 'chapter'
+            after_id: Last ID of the previous batch
+            batch_size: Rows per batch
+
+        Returns:
+            Last ID of this batch, or None when there is nothing left
+        """
+        where: Dict = {'deleted_at': None}
+        if after_id:
+            where['id'] = {'gt': after_id}
+
+        if content_type == 'whisper':
+            rows = await self.db.whisper.find_many(where=where, order={'id': 'asc'}, take=batch_size)
+            authored = [(row, row.user_id) for row in rows]
+        else:
+            rows = await self.db.chapter.find_many(
+                where=where, include={'story': True}, order={'id': 'asc'}, take=batch_size
+            )
+            authored = [(row, row.story.author_id) for row in rows]
+
+        for row, user_id in authored:
+            await self.index_content(content_type, row.id, user_id, row.content)
+        return rows[-1].id if rows else None
+
+
+def remove_content_fingerprint(content_type: str, content_id: str):
+    """
+    Drop the fingerprint of deleted content from a synchronous view.
+
+    Failures are logged and never raised; the content is already deleted.
+    """
+    async def _remove():
+        db = get_prisma()
+        await db.connect()
+        try:
+            await ContentFingerprintIndex(db).remove(content_type, content_id)
+        finally:
+            await db.disconnect()
+
+    try:
+        run_async(_remove())
+    except Exception as e:
+        logger.warning(f"Could not remove fingerprint for {content_type}:{content_id}: {e}")
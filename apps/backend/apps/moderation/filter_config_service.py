@@ -5,10 +5,18 @@ This module provides functionality to load and manage filter configurations
 from the database, implementing requirement 4.8.
 """
 
+import time
 from typing import Dict, Optional, Set
+from django.conf import settings
 from prisma import Prisma
 from prisma.enums import FilterType, FilterSensitivity
 from .content_filters import ContentFilterPipeline
+from .filter_pipeline_cache import (
+    _pipeline_cache,
+    bump_config_version,
+    get_config_version,
+)
+from infrastructure.prisma_pool import get_prisma
 
 
 class FilterConfigService:
@@ -26,7 +34,7 @@ class FilterConfigService:
         Args:
             db: Prisma database client instance
         """
-        self.db = db or Prisma()
+        self.db = db or get_prisma()
     
     async def get_filter_config(self, filter_type: FilterType) -> Optional[Dict]:
         """
@@ -99,6 +107,8 @@ class FilterConfigService:
             }
         )
         
+        bump_config_version()
+        
         return {
             'id': config.id,
             'filter_type': config.filter_type,
@@ -110,6 +120,36 @@ class FilterConfigService:
         }
     
     async def get_pipeline(self) -> ContentFilterPipeline:
+        """
+        Get the ContentFilterPipeline for the current database configurations.
+        
+        The compiled pipeline is cached per process. The config version in
+        Valkey is re-read at most every FILTER_PIPELINE_VERSION_CHECK_INTERVAL
+        seconds, and the pipeline is rebuilt only when it has changed, so
+        steady-state moderation runs no database queries. If Valkey is
+        unavailable the cached pipeline keeps being used.
+        
+        Returns:
+            Configured ContentFilterPipeline instance
+        """
+        interval = getattr(settings, 'FILTER_PIPELINE_VERSION_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        pipeline = _pipeline_cache['pipeline']
+        
+        if pipeline is not None and now - _pipeline_cache['checked_at'] < interval:
+            return pipeline
+        
+        # Read the version before loading so a concurrent bump forces another rebuild
+        version = get_config_version()
+        if pipeline is not None and (version is None or version == _pipeline_cache['version']):
+            _pipeline_cache['checked_at'] = now
+            return pipeline
+        
+        pipeline = await self.build_pipeline()
+        _pipeline_cache.update(version=version, pipeline=pipeline, checked_at=now)
+        return pipeline
+    
+    async def build_pipeline(self) -> ContentFilterPipeline:
         """
         Create a ContentFilterPipeline with current database configurations.
         
@@ -133,7 +173,8 @@ class FilterConfigService:
         spam_kwargs = {}
         if spam_config and spam_config['enabled']:
             spam_kwargs = {
-                'sensitivity': spam_config['sensitivity']
+                'sensitivity': spam_config['sensitivity'],
+                'custom_keywords': spam_config['blacklist']
             }
         
         hate_speech_kwargs = {}
@@ -174,12 +215,14 @@ class FilterConfigService:
             }
         ]
         
+        created = False
         for config in default_configs:
             existing = await self.db.contentfilterconfig.find_unique(
                 where={'filter_type': config['filter_type']}
             )
             
             if not existing:
+                created = True
                 await self.db.contentfilterconfig.create(
                     data={
                         'filter_type': config['filter_type'],
@@ -190,6 +233,9 @@ class FilterConfigService:
                         'updated_by': 'system'
                     }
                 )
+        
+        if created:
+            bump_config_version()
     
     async def log_automated_flag(
         self,
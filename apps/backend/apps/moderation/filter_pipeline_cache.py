@@ -0,0 +1,58 @@
+"""
+Version stamp for content filter configurations.
+
+FilterConfigService caches the compiled ContentFilterPipeline per process.
+Every change to a ContentFilterConfig publishes a new version token in
+Valkey, and each process rebuilds its pipeline when it sees a new token.
+This module has no Prisma imports so views can bump the version cheaply.
+"""
+
+import logging
+import uuid
+from typing import Optional
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Valkey key holding the current filter config version. The value is a random
+# token rather than a counter so an evicted key can never repeat a version.
+PIPELINE_VERSION_KEY = 'moderation:filter_config:version'
+
+# Compiled pipeline for this process, tagged with the version it was built from
+_pipeline_cache = {
+    'version': None,
+    'pipeline': None,
+    'checked_at': 0.0,
+}
+
+
+def reset_pipeline_cache():
+    """Drop this process's compiled pipeline (mainly for testing)."""
+    _pipeline_cache.update(version=None, pipeline=None, checked_at=0.0)
+
+
+def get_config_version() -> Optional[str]:
+    """
+    Get the current filter config version from Valkey, creating one if missing.
+    
+    Returns:
+        Version token, or None if Valkey is unavailable
+    """
+    try:
+        version = cache.get(PIPELINE_VERSION_KEY)
+        if version is None:
+            cache.add(PIPELINE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(PIPELINE_VERSION_KEY)
+        return version
+    except Exception as e:
+        logger.warning(f"Could not read filter config version: {e}")
+        return None
+
+
+def bump_config_version():
+    """Publish a new filter config version so every worker rebuilds its pipeline."""
+    reset_pipeline_cache()
+    try:
+        cache.set(PIPELINE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump filter config version: {e}")
@@ -6,15 +6,15 @@ This should be run once during deployment or when setting up a new environment.
 """
 
 import asyncio
-from prisma import Prisma
 from apps.moderation.filter_config_service import FilterConfigService
+from infrastructure.prisma_pool import get_prisma
 
 
 async def initialize_filters():
     """Initialize default content filter configurations."""
     print("Initializing content filter configurations...")
     
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
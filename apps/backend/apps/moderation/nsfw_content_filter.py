@@ -1,10 +1,10 @@
 """Service for filtering NSFW content based on user preferences."""
-from prisma import Prisma
 from prisma.enums import NSFWContentType, NSFWPreference
 from typing import List, Dict, Any, Optional
 import logging
 
 from apps.moderation.nsfw_service import get_nsfw_service
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +14,7 @@ class NSFWContentFilter:
     
     def __init__(self):
         """Initialize the NSFW content filter."""
-        self.db = Prisma()
+        self.db = get_prisma()
         self.nsfw_service = get_nsfw_service()
     
     async def filter_stories(
@@ -1,9 +1,10 @@
 """Service for managing NSFW flags and content preferences."""
-from prisma import Prisma
 from prisma.enums import NSFWContentType, NSFWDetectionMethod, NSFWPreference
 from typing import Optional, Dict, List
 import logging
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,7 +13,7 @@ class NSFWService:
     
     def __init__(self):
         """Initialize the NSFW service."""
-        self.db = Prisma()
+        self.db = get_prisma()
     
     async def create_nsfw_flag(
         self,
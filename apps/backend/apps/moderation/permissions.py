@@ -2,8 +2,9 @@
 from functools import wraps
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
-import asyncio
+from infrastructure.async_bridge import run_async
+
+from infrastructure.prisma_pool import get_prisma
 
 
 async def get_user_moderator_role(user_id: str):
@@ -19,7 +20,7 @@ async def get_user_moderator_role(user_id: str):
     Requirements:
         - 3.1: Support role types: ADMINISTRATOR, SENIOR_MODERATOR, MODERATOR
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -74,7 +75,7 @@ def require_moderator_role(allowed_roles=None):
             
             # Get user's moderator role
             user_id = request.user_profile.id
-            moderator_role = asyncio.run(get_user_moderator_role(user_id))
+            moderator_role = run_async(get_user_moderator_role(user_id))
             
             # Check if user has a moderator role
             if not moderator_role:
@@ -214,10 +215,10 @@ def check_action_permission(view_func):
         
         if action_type == 'DISMISS' and report_id:
             # Fetch report priority
-            report_priority = asyncio.run(get_report_priority(report_id))
+            report_priority = run_async(get_report_priority(report_id))
         
         # Check if user can perform this action
-        can_perform, error_message = asyncio.run(
+        can_perform, error_message = run_async(
             can_perform_action(user_id, action_type, report_priority)
         )
         
@@ -245,7 +246,7 @@ async def get_report_priority(report_id: str) -> str:
     """
     from .queue_service import ModerationQueueService
     
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -0,0 +1,597 @@
+"""
+Post-write moderation stage.
+
+Content filters that decide whether a write is accepted (profanity, spam,
+local URL checks) run inline in the request. Everything that only needs the
+saved content's ID runs here, after the 201 has been returned:
+- AutomatedFlag logging for detected issues
+- automated high-priority reports
+- user-marked NSFW flags
+- Safe Browsing reputation checks for URLs in the content
+- NSFW image analysis of attached media
+- content fingerprinting, and a spam flag for text already posted by other
+  accounts (see content_fingerprint.py)
+
+Views call schedule_post_write_moderation(). Jobs are appended to a Valkey
+list and the process_post_write_moderation Celery task drains it in batches.
+A batch is moved into the worker's own processing list rather than popped,
+and only removed once processed; processing lists of workers that stopped
+heartbeating are put back on the queue by the next drain, so a killed
+worker does not lose jobs. Every job is idempotent (keyed by content type,
+ID and, for edits, the edit's version), so retries and duplicate deliveries
+are harmless while each edit is still checked. When the queue is longer than
+MODERATION_STAGE_MAX_PENDING, or Valkey is unavailable, the job runs inline
+instead, which pushes back on writers rather than dropping moderation work.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import redis
+from django.conf import settings
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+logger = logging.getLogger(__name__)
+
+
+def merge_filter_results(*results: Optional[Dict]) -> Dict:
+    """
+    Combine filter results for several fields of one piece of content.
+
+    Args:
+        results: Results from ContentFilterIntegration.filter_and_validate_content
+
+    Returns:
+        Dictionary with the union of flags, auto_actions and deferred_urls,
+        and the details of every result (later fields win on conflicts)
+    """
+    merged = {'flags': [], 'auto_actions': [], 'details': {}, 'deferred_urls': []}
+    for result in results:
+        if not result:
+            continue
+        for key in ('flags', 'auto_actions', 'deferred_urls'):
+            for item in result.get(key, []):
+                if item not in merged[key]:
+                    merged[key].append(item)
+        merged['details'].update(result.get('details', {}))
+    return merged
+
+
+@dataclass
+class PostWriteJob:
+    """Deferred moderation work for one newly created piece of content."""
+    content_type: str  # 'story', 'chapter' or 'whisper'
+    content_id: str
+    user_id: Optional[str] = None
+    flags: List[str] = field(default_factory=list)
+    auto_actions: List[str] = field(default_factory=list)
+    details: Dict = field(default_factory=dict)
+    urls: List[str] = field(default_factory=list)
+    mark_nsfw: bool = False
+    media_key: Optional[str] = None
+    fingerprint: bool = False
+    version: Optional[str] = None  # Set for edits, so each edit is a new job
+    attempts: int = 0
+
+    @property
+    def job_id(self) -> str:
+        job_id = f'{self.content_type}:{self.content_id}'
+        return f'{job_id}@{self.version}' if self.version else job_id
+
+    @property
+    def has_work(self) -> bool:
+        return bool(
+            self.flags or self.auto_actions or self.urls or self.mark_nsfw
+            or self.media_key or self.fingerprint
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def from_json(cls, data) -> 'PostWriteJob':
+        return cls(**json.loads(data))
+
+
+class PostWriteModerationQueue:
+    """Bounded Valkey list of pending PostWriteJobs."""
+
+    KEY_PREFIX = 'moderation:post_write'
+    DONE_TTL = 86400  # Completed job IDs are remembered for a day
+    # A worker's processing list is requeued after this long without a batch
+    WORKER_TTL = 600
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_pending: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            max_pending: Queue length above which enqueue refuses jobs
+                (defaults to settings.MODERATION_STAGE_MAX_PENDING)
+            worker_id: Name of this consumer's processing list (defaults to
+                host, process and thread)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.max_pending = max_pending or getattr(settings, 'MODERATION_STAGE_MAX_PENDING', 10000)
+        self._worker_id = worker_id
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    @property
+    def worker_id(self) -> str:
+        # Resolved per call, so forked processes and threads get their own list
+        return self._worker_id or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+    @property
+    def queue_key(self) -> str:
+        return f'{self.KEY_PREFIX}:queue'
+
+    @property
+    def workers_key(self) -> str:
+        return f'{self.KEY_PREFIX}:workers'
+
+    def processing_key(self, worker_id: Optional[str] = None) -> str:
+        return f'{self.KEY_PREFIX}:processing:{worker_id or self.worker_id}'
+
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return f'{self.KEY_PREFIX}:worker:{worker_id}'
+
+    def _done_key(self, job_id: str) -> str:
+        return f'{self.KEY_PREFIX}:done:{job_id}'
+
+    def enqueue(self, job: PostWriteJob) -> Optional[int]:
+        """
+        Append a job unless the queue is full.
+
+        Args:
+            job: Job to append
+
+        Returns:
+            Queue length after the push, or None if the queue is full or
+            Valkey is unavailable (the caller should run the job itself)
+        """
+        try:
+            if self.client.llen(self.queue_key) >= self.max_pending:
+                logger.warning(
+                    f"Post-write moderation queue is full ({self.max_pending}), "
+                    f"running {job.job_id} inline"
+                )
+                return None
+            return self.client.rpush(self.queue_key, job.to_json())
+        except Exception as e:
+            logger.warning(f"Could not enqueue post-write moderation job {job.job_id}: {e}")
+            return None
+
+    def pop_batch(self, size: int) -> List[PostWriteJob]:
+        """
+        Move up to size jobs from the head of the queue to this worker's
+        processing list and return them.
+
+        The jobs stay in the processing list until ack(), so they are
+        requeued by requeue_stale() if the worker dies before finishing.
+
+        Args:
+            size: Maximum number of jobs to take
+
+        Returns:
+            List of jobs (unreadable entries are logged and dropped)
+        """
+        worker_id = self.worker_id
+        processing_key = self.processing_key(worker_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self._heartbeat_key(worker_id), 1, ex=self.WORKER_TTL)
+        pipe.sadd(self.workers_key, worker_id)
+        for _ in range(size):
+            pipe.lmove(self.queue_key, processing_key, 'LEFT', 'RIGHT')
+        entries = [entry for entry in pipe.execute()[2:] if entry is not None]
+
+        jobs = []
+        for entry in entries:
+            try:
+                jobs.append(PostWriteJob.from_json(entry))
+            except (TypeError, ValueError) as e:
+                logger.error(f"Dropping malformed post-write moderation job: {e}")
+                self.client.lrem(processing_key, 1, entry)
+        return jobs
+
+    def ack(self):
+        """Drop this worker's processing list once its batch is done."""
+        self.client.delete(self.processing_key())
+
+    def requeue_stale(self) -> int:
+        """
+        Put jobs left in processing lists back at the head of the queue.
+
+        Covers this worker's own list, which holds nothing in flight
+        between batches, and the lists of workers whose heartbeat expired.
+        A slow worker that is requeued by mistake only causes duplicate
+        deliveries, which jobs tolerate.
+
+        Returns:
+            Number of jobs requeued
+        """
+        requeued = 0
+        for worker_id in self.client.smembers(self.workers_key):
+            if worker_id != self.worker_id and self.client.exists(self._heartbeat_key(worker_id)):
+                continue
+            processing_key = self.processing_key(worker_id)
+            # Tail first onto the head, so the jobs keep their order
+            while self.client.lmove(processing_key, self.queue_key, 'RIGHT', 'LEFT') is not None:
+                requeued += 1
+            self.client.srem(self.workers_key, worker_id)
+        if requeued:
+            logger.warning(f"Requeued {requeued} post-write moderation jobs from stopped workers")
+        return requeued
+
+    def pending(self) -> int:
+        """Number of queued jobs."""
+        return self.client.llen(self.queue_key)
+
+    def completed(self, job_ids: Iterable[str]) -> List[bool]:
+        """Whether each job has already been processed."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return []
+        values = self.client.mget([self._done_key(job_id) for job_id in job_ids])
+        return [value is not None for value in values]
+
+    def mark_completed(self, job_ids: Iterable[str]):
+        """Remember processed jobs so duplicate deliveries are skipped."""
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.set(self._done_key(job_id), 1, ex=self.DONE_TTL)
+        pipe.execute()
+
+
+class PostWriteModerationStage:
+    """Runs PostWriteJobs against the database and external services."""
+
+    def __init__(self, queue: Optional[PostWriteModerationQueue] = None):
+        """
+        Initialize the stage.
+
+        Args:
+            queue: Job queue (defaults to a PostWriteModerationQueue)
+        """
+        self.queue = queue or PostWriteModerationQueue()
+        self.batch_size = getattr(settings, 'MODERATION_STAGE_BATCH_SIZE', 100)
+        self.max_attempts = getattr(settings, 'MODERATION_STAGE_MAX_ATTEMPTS', 3)
+
+    def schedule(self, job: PostWriteJob):
+        """
+        Queue a job for the Celery stage, or run it inline if the queue refuses it.
+
+        Args:
+            job: Job to schedule
+        """
+        if not job.has_work:
+            return
+
+        if not getattr(settings, 'MODERATION_STAGE_ENABLED', True):
+            self.run_inline(job)
+            return
+
+        length = self.queue.enqueue(job)
+        if length is None:
+            self.run_inline(job)
+            return
+
+        # The first job in an empty queue starts a drain; the drain keeps
+        # going while jobs remain, and the beat schedule catches lost kicks
+        if length == 1:
+            self._kick()
+
+    def run_inline(self, job: PostWriteJob):
+        """Process one job in the calling thread."""
+        try:
+            failed = run_async(self.process_batch([job]))
+        except Exception as e:
+            logger.error(f"Inline post-write moderation failed for {job.job_id}: {e}")
+            failed = [job]
+        for failed_job in failed:
+            self._retry(failed_job)
+
+    def _kick(self, countdown: Optional[int] = None):
+        from .tasks import process_post_write_moderation
+        try:
+            process_post_write_moderation.apply_async(countdown=countdown)
+        except Exception as e:
+            logger.warning(f"Could not start post-write moderation drain: {e}")
+
+    def drain(self, max_batches: int = 10) -> int:
+        """
+        Process queued jobs in batches.
+
+        Args:
+            max_batches: Batches to process before handing off to a new task
+
+        Returns:
+            Number of jobs processed
+        """
+        self.queue.requeue_stale()
+
+        processed = 0
+        for _ in range(max_batches):
+            jobs = self.queue.pop_batch(self.batch_size)
+            if not jobs:
+                return processed
+
+            done = self.queue.completed(job.job_id for job in jobs)
+            jobs = [job for job, is_done in zip(jobs, done) if not is_done]
+
+            try:
+                failed = run_async(self.process_batch(jobs), timeout=None) if jobs else []
+            except Exception as e:
+                # Could not even connect; retry the whole batch
+                logger.error(f"Post-write moderation batch failed: {e}")
+                failed = jobs
+            failed_ids = {job.job_id for job in failed}
+            self.queue.mark_completed(job.job_id for job in jobs if job.job_id not in failed_ids)
+            for job in failed:
+                self._retry(job)
+            self.queue.ack()
+            processed += len(jobs)
+
+        if self.queue.pending():
+            self._kick()
+        return processed
+
+    def _retry(self, job: PostWriteJob):
+        job.attempts += 1
+        if job.attempts >= self.max_attempts:
+            logger.error(
+                f"Post-write moderation job {job.job_id} failed {job.attempts} times, giving up"
+            )
+            return
+
+        from .tasks import requeue_post_write_job
+        # Exponential backoff: 60s, 120s, 240s...
+        countdown = 60 * (2 ** (job.attempts - 1))
+        try:
+            requeue_post_write_job.apply_async(args=[job.to_json()], countdown=countdown)
+        except Exception as e:
+            logger.error(f"Could not schedule retry for {job.job_id}: {e}")
+
+    async def process_batch(self, jobs: List[PostWriteJob]) -> List[PostWriteJob]:
+        """
+        Run a batch of jobs on one database connection.
+
+        Args:
+            jobs: Jobs to run
+
+        Returns:
+            Jobs that failed and should be retried
+        """
+        from .content_filter_integration import ContentFilterIntegration
+
+        db = get_prisma()
+        await db.connect()
+        failed = []
+        try:
+            integration = ContentFilterIntegration(db)
+            for job in jobs:
+                try:
+                    await self.process_job(job, db, integration)
+                except Exception as e:
+                    logger.error(f"Post-write moderation failed for {job.job_id}: {e}")
+                    failed.append(job)
+        finally:
+            await db.disconnect()
+        return failed
+
+    async def process_job(self, job: PostWriteJob, db, integration):
+        """
+        Run every step of one job. Each step is safe to repeat.
+
+        Args:
+            job: Job to run
+            db: Connected Prisma client
+            integration: ContentFilterIntegration bound to db
+        """
+        details = dict(job.details)
+        flags = list(job.flags)
+        auto_actions = list(job.auto_actions)
+
+        if job.fingerprint:
+            duplicates = await self._index_fingerprint(job, db)
+            if duplicates:
+                flags.append('spam')
+                details['spam'] = {**details.get('spam', {}), **duplicates}
+
+        if job.urls:
+            url_result = await self._check_url_reputation(job.urls)
+            if url_result and not url_result.is_safe:
+                flags.append('malicious_url')
+                details['malicious_url'] = {
+                    'malicious_urls': url_result.malicious_urls,
+                    'total_urls': url_result.total_urls,
+                    'threat_details': url_result.details,
+                    'confidence': 1.0
+                }
+                auto_actions.append('create_high_priority_report')
+
+        for flag_type in dict.fromkeys(flags):
+            existing = await db.automatedflag.find_first(
+                where={
+                    'content_type': job.content_type,
+                    'content_id': job.content_id,
+                    'flag_type': flag_type
+                }
+            )
+            if not existing:
+                await integration.config_service.log_automated_flag(
+                    content_type=job.content_type,
+                    content_id=job.content_id,
+                    flag_type=flag_type,
+                    confidence=details.get(flag_type, {}).get('confidence', 0.0)
+                )
+
+        if auto_actions:
+            await integration.handle_auto_actions(
+                content_type=job.content_type,
+                content_id=job.content_id,
+                auto_actions=list(dict.fromkeys(auto_actions)),
+                filter_details=details,
+                user_id=job.user_id
+            )
+
+        if job.mark_nsfw or job.media_key:
+            await self._apply_nsfw(job)
+
+    async def _index_fingerprint(self, job: PostWriteJob, db) -> Optional[Dict]:
+        """
+        Store the content's fingerprint and probe for copies by other accounts.
+
+        Returns:
+            Spam details if enough other accounts posted the same text, else None
+        """
+        from .content_fingerprint import ContentFingerprintIndex
+
+        index = ContentFingerprintIndex(db)
+        if job.content_type == 'whisper':
+            content = await db.whisper.find_unique(where={'id': job.content_id})
+            user_id = content.user_id if content else job.user_id
+        else:
+            content = await db.chapter.find_unique(where={'id': job.content_id})
+            user_id = job.user_id
+
+        if not content or content.deleted_at:
+            await index.remove(job.content_type, job.content_id)
+            return None
+
+        fp = await index.index_content(job.content_type, job.content_id, user_id, content.content)
+        if fp is None:
+            return None
+
+        matches = await index.find_duplicates([fp], exclude_user_id=user_id)
+        accounts = {match.user_id for match in matches}
+        if len(accounts) < getattr(settings, 'CONTENT_FINGERPRINT_SPAM_MIN_ACCOUNTS', 2):
+            return None
+        return {
+            'cross_account_duplicates': [
+                f'{match.content_type}:{match.content_id}' for match in matches[:10]
+            ],
+            'duplicate_accounts': len(accounts),
+            'confidence': 1.0 if matches[0].exact else 0.8
+        }
+
+    async def _check_url_reputation(self, urls: List[str]):
+        from .url_validator import URLValidator
+
+        validator = URLValidator()
+        if not validator.api_key:
+            return None
+        return await asyncio.to_thread(validator.validate_urls, urls)
+
+    async def _apply_nsfw(self, job: PostWriteJob):
+        from prisma.enums import NSFWContentType, NSFWDetectionMethod
+        from .nsfw_service import get_nsfw_service
+
+        nsfw_service = get_nsfw_service()
+        content_type = getattr(NSFWContentType, job.content_type.upper())
+
+        if job.mark_nsfw:
+            await nsfw_service.mark_content_as_nsfw(
+                content_type=content_type,
+                content_id=job.content_id,
+                user_id=job.user_id,
+                is_manual=False  # USER_MARKED
+            )
+            return
+
+        bucket = getattr(settings, 'AWS_S3_BUCKET', None)
+        if not bucket:
+            return
+
+        from .nsfw_detector import get_nsfw_detector
+        analysis = await asyncio.to_thread(
+            get_nsfw_detector().analyze_image, f's3://{bucket}/{job.media_key}'
+        )
+        if analysis.get('error'):
+            raise RuntimeError(analysis['error'])
+        if analysis['is_nsfw']:
+            await nsfw_service.create_nsfw_flag(
+                content_type=content_type,
+                content_id=job.content_id,
+                is_nsfw=True,
+                detection_method=NSFWDetectionMethod.AUTOMATIC,
+                confidence=analysis['confidence'],
+                labels=analysis['labels']
+            )
+
+
+# Singleton instance
+_stage_instance: Optional[PostWriteModerationStage] = None
+
+
+def get_post_write_stage() -> PostWriteModerationStage:
+    """Get or create the singleton PostWriteModerationStage instance."""
+    global _stage_instance
+    if _stage_instance is None:
+        _stage_instance = PostWriteModerationStage()
+    return _stage_instance
+
+
+def schedule_post_write_moderation(
+    content_type: str,
+    content_id: str,
+    user_id: Optional[str] = None,
+    filter_results: Iterable[Optional[Dict]] = (),
+    mark_nsfw: bool = False,
+    media_key: Optional[str] = None,
+    fingerprint: bool = False,
+    version: Optional[str] = None
+):
+    """
+    Schedule deferred moderation for newly written or edited content.
+
+    Args:
+        content_type: 'story', 'chapter' or 'whisper'
+        content_id: ID of the created content
+        user_id: Author's user profile ID
+        filter_results: Inline filter results for the content's fields
+        mark_nsfw: The author marked the content as NSFW
+        media_key: S3 key of attached media to analyze for NSFW content
+        fingerprint: Index the text for duplicate detection (whispers and chapters)
+        version: Version of edited content (e.g. its updated_at), so the edit
+            is not skipped as a repeat of the job for the original write
+    """
+    merged = merge_filter_results(*filter_results)
+    job = PostWriteJob(
+        content_type=content_type,
+        content_id=content_id,
+        user_id=user_id,
+        flags=merged['flags'],
+        auto_actions=merged['auto_actions'],
+        details=merged['details'],
+        urls=merged['deferred_urls'],
+        mark_nsfw=mark_nsfw,
+        media_key=media_key,
+        fingerprint=fingerprint,
+        version=version
+    )
+    try:
+        get_post_write_stage().schedule(job)
+    except Exception as e:
+        # The content is already saved; never fail the write over moderation bookkeeping
+        logger.error(f"Could not schedule post-write moderation for {job.job_id}: {e}")
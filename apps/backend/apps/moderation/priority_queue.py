@@ -0,0 +1,247 @@
+"""
+Materialized moderation priority queue stored in Valkey.
+
+ModerationQueueService scores pending reports and writes them here, so the
+moderator dashboard pages through a precomputed order instead of scoring
+the whole backlog on every request. Entries are updated incrementally when
+reports are created or resolved, and the whole queue is rebuilt
+periodically so the age component of the score stays current.
+
+Key layout:
+    moderation:queue:index    -> sorted set, all scores 0, members are sort keys
+                                 '<inverted priority>:<created ms>:<report id>'
+                                 so ZRANGEBYLEX yields priority desc, oldest first
+    moderation:queue:entries  -> hash report_id -> JSON {'sort_key', 'entry'}
+    moderation:queue:built_at -> timestamp of the last full rebuild
+"""
+
+import base64
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Priorities are stored to two decimals, inverted so higher sorts first
+PRIORITY_SCALE = 100
+PRIORITY_CEILING = 10 ** 12
+
+
+def sort_key(priority_score: float, created_at: str, report_id: str) -> str:
+    """
+    Build the lexicographic sort key for a queue entry.
+
+    Args:
+        priority_score: Report priority (higher first)
+        created_at: ISO creation timestamp (older first among equal priority)
+        report_id: Report ID (final tie-break)
+
+    Returns:
+        Fixed-width sort key string
+    """
+    inverted = PRIORITY_CEILING - min(int(round(priority_score * PRIORITY_SCALE)), PRIORITY_CEILING)
+    created = datetime.fromisoformat(created_at)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    created_ms = int(created.timestamp() * 1000)
+    return f'{inverted:013d}:{created_ms:015d}:{report_id}'
+
+
+def encode_cursor(key: str) -> str:
+    """Encode the last sort key of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Decode a pagination cursor.
+
+    Returns:
+        Sort key to continue after, or None for a missing or malformed cursor
+    """
+    if not cursor:
+        return None
+    try:
+        key = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (ValueError, UnicodeError):
+        return None
+    return key if key.count(':') >= 2 else None
+
+
+class ModerationPriorityQueue:
+    """Precomputed moderation queue order in Valkey."""
+
+    KEY_PREFIX = 'moderation:queue'
+
+    def __init__(self, redis_url: Optional[str] = None):
+        """
+        Initialize the queue.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    @property
+    def index_key(self) -> str:
+        return f'{self.KEY_PREFIX}:index'
+
+    @property
+    def entries_key(self) -> str:
+        return f'{self.KEY_PREFIX}:entries'
+
+    @property
+    def built_at_key(self) -> str:
+        return f'{self.KEY_PREFIX}:built_at'
+
+    @staticmethod
+    def _entry_sort_key(entry: Dict) -> str:
+        return sort_key(entry['priority_score'], entry['created_at'], entry['id'])
+
+    def is_built(self) -> bool:
+        """Whether a full rebuild has been published."""
+        return bool(self.client.exists(self.built_at_key))
+
+    def replace(self, entries: Iterable[Dict]) -> int:
+        """
+        Replace the whole queue with freshly scored entries.
+
+        The new queue is written under temporary keys and swapped in with
+        RENAME, so readers never see a half-built queue.
+
+        Args:
+            entries: Report dicts from ModerationQueueService (with priority_score)
+
+        Returns:
+            Number of entries written
+        """
+        token = f'{int(time.time() * 1000)}'
+        tmp_index = f'{self.index_key}:tmp:{token}'
+        tmp_entries = f'{self.entries_key}:tmp:{token}'
+
+        index = {}
+        records = {}
+        for entry in entries:
+            key = self._entry_sort_key(entry)
+            index[key] = 0
+            records[entry['id']] = json.dumps({'sort_key': key, 'entry': entry})
+
+        pipe = self.client.pipeline(transaction=True)
+        if index:
+            pipe.zadd(tmp_index, index)
+            pipe.hset(tmp_entries, mapping=records)
+            pipe.rename(tmp_index, self.index_key)
+            pipe.rename(tmp_entries, self.entries_key)
+        else:
+            pipe.delete(self.index_key, self.entries_key)
+        pipe.set(self.built_at_key, token)
+        pipe.execute()
+        return len(index)
+
+    def upsert(self, entries: List[Dict]) -> None:
+        """
+        Insert or re-score entries.
+
+        Args:
+            entries: Report dicts from ModerationQueueService (with priority_score)
+        """
+        if not entries:
+            return
+        old = self._sort_keys([entry['id'] for entry in entries])
+
+        pipe = self.client.pipeline(transaction=True)
+        stale = [key for key in old.values() if key]
+        if stale:
+            pipe.zrem(self.index_key, *stale)
+        index = {}
+        records = {}
+        for entry in entries:
+            key = self._entry_sort_key(entry)
+            index[key] = 0
+            records[entry['id']] = json.dumps({'sort_key': key, 'entry': entry})
+        pipe.zadd(self.index_key, index)
+        pipe.hset(self.entries_key, mapping=records)
+        pipe.execute()
+
+    def remove(self, report_ids: List[str]) -> None:
+        """
+        Remove entries (e.g. once their reports are resolved).
+
+        Args:
+            report_ids: Report IDs to remove
+        """
+        if not report_ids:
+            return
+        old = self._sort_keys(report_ids)
+
+        pipe = self.client.pipeline(transaction=True)
+        stale = [key for key in old.values() if key]
+        if stale:
+            pipe.zrem(self.index_key, *stale)
+        pipe.hdel(self.entries_key, *report_ids)
+        pipe.execute()
+
+    def _sort_keys(self, report_ids: List[str]) -> Dict[str, Optional[str]]:
+        raw = self.client.hmget(self.entries_key, report_ids)
+        return {
+            report_id: json.loads(value)['sort_key'] if value else None
+            for report_id, value in zip(report_ids, raw)
+        }
+
+    def page(self, after: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Read one page of the queue in priority order.
+
+        Args:
+            after: Sort key of the last entry on the previous page
+            limit: Maximum number of entries
+
+        Returns:
+            Tuple of (entries, sort key to continue after or None on the last page)
+        """
+        start = f'({after}' if after else '-'
+        keys = self.client.zrangebylex(self.index_key, start, '+', start=0, num=limit + 1)
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        if not keys:
+            return [], None
+
+        report_ids = [key.rsplit(':', 1)[1] for key in keys]
+        raw = self.client.hmget(self.entries_key, report_ids)
+        entries = [json.loads(value)['entry'] for value in raw if value]
+        return entries, keys[-1] if has_more else None
+
+    def count(self) -> int:
+        """Number of queued reports."""
+        return self.client.zcard(self.index_key)
+
+
+# Global queue instance
+_priority_queue: Optional[ModerationPriorityQueue] = None
+
+
+def get_priority_queue() -> ModerationPriorityQueue:
+    """
+    Get the process-wide materialized moderation queue.
+
+    Returns:
+        Global ModerationPriorityQueue instance
+    """
+    global _priority_queue
+    if _priority_queue is None:
+        _priority_queue = ModerationPriorityQueue()
+    return _priority_queue
@@ -1,36 +1,83 @@
 """Moderation queue service with priority calculation."""
-from typing import List, Dict, Any, Optional
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from datetime import datetime, timezone
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
+from .priority_queue import decode_cursor, encode_cursor, get_priority_queue, sort_key
+
+logger = logging.getLogger(__name__)
+
+# Report fields identifying the reported content, in precedence order
+CONTENT_FIELDS = (
+    ('story_id', 'story'),
+    ('chapter_id', 'chapter'),
+    ('whisper_id', 'whisper'),
+    ('reported_user_id', 'user'),
+)
+
+
+def report_content_key(report) -> Optional[Tuple[str, str]]:
+    """
+    Identify the content a report is about.
+    
+    Args:
+        report: Report object
+        
+    Returns:
+        Tuple of (report field, content ID), or None if the report has no target
+    """
+    for field, _ in CONTENT_FIELDS:
+        value = getattr(report, field, None)
+        if value:
+            return field, value
+    return None
 
 
 class ModerationQueueService:
     """
     Service for managing the moderation queue with priority-based sorting.
     
+    Priorities are computed for whole sets of reports with grouped queries,
+    so scoring the queue takes a constant number of round trips. The
+    moderator dashboard pages through a materialized copy of the queue in
+    Valkey (see priority_queue.py), kept current by on_report_created,
+    on_report_resolved and a periodic rebuild.
+    
     Requirements:
         - 2.1: Display all pending reports in moderation queue
         - 2.2: Sort reports by priority and creation date
     """
     
-    def __init__(self):
-        self.db = None
+    def __init__(self, db=None):
+        """
+        Initialize the service.
+        
+        Args:
+            db: Connected Prisma client to reuse (the service connects its own otherwise)
+        """
+        self.db = db
+        self._owns_db = db is None
     
     async def __aenter__(self):
         """Async context manager entry."""
-        self.db = Prisma()
-        await self.db.connect()
+        if self._owns_db:
+            self.db = get_prisma()
+            await self.db.connect()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
-        if self.db:
+        if self._owns_db and self.db:
             await self.db.disconnect()
     
     async def get_queue(self) -> List[Dict[str, Any]]:
         """
         Get all pending reports sorted by priority and creation date.
         
+        Scores are computed live from the database in three queries: the
+        pending reports, and resolved/valid report counts per reporter.
+        
         Returns:
             List of reports with priority scores, sorted by priority (desc) and created_at (asc)
             
@@ -38,40 +85,203 @@ class ModerationQueueService:
             - 2.1: Display all pending reports
             - 2.2: Sort by priority and creation date
         """
-        # Fetch all pending reports with related data
         reports = await self.db.report.find_many(
             where={'status': 'PENDING'},
-            include={
-                'reporter': True,
-                'reported_user': True,
-                'story': True,
-                'chapter': True,
-                'whisper': True
-            }
+            include={'reporter': True}
         )
         
-        # Calculate priority for each report
-        reports_with_priority = []
+        reports_with_priority = await self._score_reports(reports)
+        
+        # Sort by priority (descending) then by creation date (ascending - older first)
+        reports_with_priority.sort(
+            key=lambda x: (-x['priority_score'], x['created_at'])
+        )
+        
+        return reports_with_priority
+    
+    async def get_queue_page(
+        self,
+        cursor: Optional[str] = None,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Get one page of the moderation queue from the materialized queue.
+        
+        The materialized queue is built on first use. If Valkey is
+        unavailable the page is cut from a live get_queue() instead.
+        
+        Args:
+            cursor: Cursor from the previous page's next_cursor
+            page_size: Maximum reports per page
+            
+        Returns:
+            Dictionary with 'reports', 'count' (total pending) and 'next_cursor'
+        """
+        after = decode_cursor(cursor)
+        queue = get_priority_queue()
+        
+        try:
+            if not queue.is_built():
+                await self.rebuild_queue()
+            entries, last_key = queue.page(after, page_size)
+            total = queue.count()
+        except Exception as e:
+            logger.warning(f"Materialized moderation queue unavailable, computing live: {e}")
+            return await self._live_page(after, page_size)
+        
+        return {
+            'reports': entries,
+            'count': total,
+            'next_cursor': encode_cursor(last_key) if last_key else None
+        }
+    
+    async def _live_page(self, after: Optional[str], page_size: int) -> Dict[str, Any]:
+        entries = await self.get_queue()
+        keyed = [
+            (sort_key(e['priority_score'], e['created_at'], e['id']), e)
+            for e in entries
+        ]
+        keyed.sort(key=lambda item: item[0])
+        if after:
+            keyed = [item for item in keyed if item[0] > after]
+        page = keyed[:page_size]
+        has_more = len(keyed) > page_size
+        return {
+            'reports': [entry for _, entry in page],
+            'count': len(entries),
+            'next_cursor': encode_cursor(page[-1][0]) if has_more and page else None
+        }
+    
+    async def rebuild_queue(self) -> int:
+        """
+        Rescore every pending report and replace the materialized queue.
+        
+        Returns:
+            Number of reports in the queue
+        """
+        entries = await self.get_queue()
+        return get_priority_queue().replace(entries)
+    
+    async def on_report_created(self, report) -> None:
+        """
+        Add a new report to the materialized queue.
+        
+        Other pending reports for the same content gain a duplicate, so
+        they are rescored too.
+        
+        Args:
+            report: The created Report
+        """
+        await self._refresh_entries(content_keys=[report_content_key(report)])
+    
+    async def on_report_resolved(self, report) -> None:
+        """
+        Remove a resolved report from the materialized queue.
+        
+        Pending reports for the same content lose a duplicate and the
+        reporter's accuracy changes, so both sets are rescored.
+        
+        Args:
+            report: The resolved Report
+        """
+        get_priority_queue().remove([report.id])
+        await self._refresh_entries(
+            content_keys=[report_content_key(report)],
+            reporter_ids=[report.reporter_id]
+        )
+    
+    async def _refresh_entries(
+        self,
+        content_keys: Iterable[Optional[Tuple[str, str]]] = (),
+        reporter_ids: Iterable[str] = ()
+    ) -> None:
+        """Rescore pending reports for some content and reporters in the materialized queue."""
+        queue = get_priority_queue()
+        if not queue.is_built():
+            # The first page request builds the whole queue
+            return
+        
+        keys = {key for key in content_keys if key}
+        reporter_ids = list(reporter_ids)
+        if reporter_ids:
+            by_reporter = await self.db.report.find_many(
+                where={'status': 'PENDING', 'reporter_id': {'in': reporter_ids}}
+            )
+            keys.update(key for key in map(report_content_key, by_reporter) if key)
+        if not keys:
+            return
+        
+        # All pending reports for these content keys, so duplicate counts are complete
+        reports = await self.db.report.find_many(
+            where={
+                'status': 'PENDING',
+                'OR': [{field: value} for field, value in keys]
+            },
+            include={'reporter': True}
+        )
+        queue.upsert(await self._score_reports(reports))
+    
+    async def calculate_priority(self, report) -> float:
+        """
+        Calculate the priority score of a single report.
+        
+        Args:
+            report: Report object
+            
+        Returns:
+            Priority score (float)
+        """
+        key = report_content_key(report)
+        duplicate_count = 0
+        if key:
+            duplicate_count = await self.db.report.count(
+                where={'status': 'PENDING', 'id': {'not': report.id}, key[0]: key[1]}
+            )
+        accuracy = await self._get_reporter_accuracies([report.reporter_id])
+        return self._priority_score(
+            duplicate_count,
+            accuracy.get(report.reporter_id, 0.5),
+            bool(report.reported_user_id),
+            report.created_at
+        )
+    
+    async def _score_reports(self, reports) -> List[Dict[str, Any]]:
+        """
+        Score a set of pending reports.
+        
+        Duplicate counts are taken from the set itself, so it must contain
+        every pending report for each content key it covers.
+        
+        Args:
+            reports: Pending Report objects (with reporter included)
+            
+        Returns:
+            Queue entries with priority_score and priority_level
+        """
+        content_counts = Counter(report_content_key(report) for report in reports)
+        accuracies = await self._get_reporter_accuracies({report.reporter_id for report in reports})
+        now = datetime.now(timezone.utc)
+        
+        entries = []
         for report in reports:
-            priority_score = await self._calculate_priority(report)
+            key = report_content_key(report)
+            duplicate_count = content_counts[key] - 1 if key else 0
+            priority_score = self._priority_score(
+                duplicate_count,
+                accuracies.get(report.reporter_id, 0.5),
+                bool(report.reported_user_id),
+                report.created_at,
+                now
+            )
             
             # Determine content type
             content_type = None
             content_id = None
-            if report.story_id:
-                content_type = 'story'
-                content_id = report.story_id
-            elif report.chapter_id:
-                content_type = 'chapter'
-                content_id = report.chapter_id
-            elif report.whisper_id:
-                content_type = 'whisper'
-                content_id = report.whisper_id
-            elif report.reported_user_id:
-                content_type = 'user'
-                content_id = report.reported_user_id
+            if key:
+                content_type = dict(CONTENT_FIELDS)[key[0]]
+                content_id = key[1]
             
-            reports_with_priority.append({
+            entries.append({
                 'id': report.id,
                 'reporter_id': report.reporter_id,
                 'reporter_handle': report.reporter.handle if report.reporter else None,
@@ -83,15 +293,16 @@ class ModerationQueueService:
                 'priority_score': priority_score,
                 'priority_level': self._get_priority_level(priority_score)
             })
-        
-        # Sort by priority (descending) then by creation date (ascending - older first)
-        reports_with_priority.sort(
-            key=lambda x: (-x['priority_score'], x['created_at'])
-        )
-        
-        return reports_with_priority
+        return entries
     
-    async def _calculate_priority(self, report) -> float:
+    def _priority_score(
+        self,
+        duplicate_count: int,
+        reporter_accuracy: float,
+        is_user_report: bool,
+        created_at: datetime,
+        now: Optional[datetime] = None
+    ) -> float:
         """
         Calculate priority score for a report based on multiple factors.
         
@@ -102,19 +313,12 @@ class ModerationQueueService:
         - Content type: +30 for user reports
         - Age: +2 per hour (capped at 100)
         
-        Args:
-            report: Report object with related data
-            
-        Returns:
-            Priority score (float)
-            
         Requirements:
             - 2.2: Priority algorithm based on multiple factors
         """
         priority_score = 0.0
         
         # 1. Base priority by duplicate report count
-        duplicate_count = await self._count_duplicate_reports(report)
         priority_score += duplicate_count * 10
         
         # 2. Automated detection flags (placeholder - will be implemented in Phase 3)
@@ -124,92 +328,59 @@ class ModerationQueueService:
             priority_score += 50
         
         # 3. Reporter reputation/accuracy
-        reporter_accuracy = await self._get_reporter_accuracy(report.reporter_id)
         priority_score += reporter_accuracy * 20
         
         # 4. Content type priority (user reports are higher priority)
-        if report.reported_user_id:
+        if is_user_report:
             priority_score += 30
         
         # 5. Age of report (older = higher priority)
-        now = datetime.now(timezone.utc)
-        hours_old = (now - report.created_at.replace(tzinfo=timezone.utc)).total_seconds() / 3600
+        now = now or datetime.now(timezone.utc)
+        hours_old = (now - created_at.replace(tzinfo=timezone.utc)).total_seconds() / 3600
         priority_score += min(hours_old * 2, 100)
         
         return priority_score
     
-    async def _count_duplicate_reports(self, report) -> int:
-        """
-        Count duplicate reports for the same content.
-        
-        Args:
-            report: Report object
-            
-        Returns:
-            Number of duplicate reports (excluding the current one)
-        """
-        where_clause = {
-            'status': 'PENDING',
-            'id': {'not': report.id}
-        }
-        
-        # Add content-specific filter
-        if report.story_id:
-            where_clause['story_id'] = report.story_id
-        elif report.chapter_id:
-            where_clause['chapter_id'] = report.chapter_id
-        elif report.whisper_id:
-            where_clause['whisper_id'] = report.whisper_id
-        elif report.reported_user_id:
-            where_clause['reported_user_id'] = report.reported_user_id
-        else:
-            return 0
-        
-        count = await self.db.report.count(where=where_clause)
-        return count
-    
-    async def _get_reporter_accuracy(self, reporter_id: str) -> float:
+    async def _get_reporter_accuracies(self, reporter_ids: Iterable[str]) -> Dict[str, float]:
         """
-        Calculate reporter accuracy based on historical reports.
+        Calculate accuracy for many reporters with two grouped queries.
         
         Accuracy = (valid reports) / (total resolved reports)
-        Valid reports are those that resulted in action (not dismissed)
+        Valid reports are those that resulted in action (not dismissed).
+        Reporters without resolved reports get a neutral 0.5.
         
         Args:
-            reporter_id: ID of the reporter
+            reporter_ids: IDs of the reporters
             
         Returns:
-            Accuracy score between 0 and 1
+            Dictionary of reporter ID -> accuracy between 0 and 1
         """
-        # Get all resolved reports from this reporter
-        resolved_reports = await self.db.report.find_many(
+        reporter_ids = list(reporter_ids)
+        if not reporter_ids:
+            return {}
+        
+        resolved_where = {'reporter_id': {'in': reporter_ids}, 'status': 'RESOLVED'}
+        resolved = await self.db.report.group_by(
+            by=['reporter_id'],
+            where=resolved_where,
+            count=True
+        )
+        valid = await self.db.report.group_by(
+            by=['reporter_id'],
             where={
-                'reporter_id': reporter_id,
-                'status': 'RESOLVED'
+                **resolved_where,
+                'moderation_actions': {'some': {'action_type': {'not': 'DISMISS'}}}
             },
-            include={
-                'moderation_actions': True
-            }
+            count=True
         )
         
-        if not resolved_reports:
-            # New reporter - give neutral score
-            return 0.5
-        
-        # Count valid reports (those with non-DISMISS actions)
-        valid_count = 0
-        for report in resolved_reports:
-            if report.moderation_actions:
-                # Check if any action was not DISMISS
-                has_action = any(
-                    action.action_type != 'DISMISS' 
-                    for action in report.moderation_actions
-                )
-                if has_action:
-                    valid_count += 1
-        
-        accuracy = valid_count / len(resolved_reports)
-        return accuracy
+        valid_counts = {row['reporter_id']: row['_count']['_all'] for row in valid}
+        accuracies = {reporter_id: 0.5 for reporter_id in reporter_ids}
+        for row in resolved:
+            total = row['_count']['_all']
+            if total:
+                accuracies[row['reporter_id']] = valid_counts.get(row['reporter_id'], 0) / total
+        return accuracies
     
     def _get_priority_level(self, priority_score: float) -> str:
         """
@@ -227,3 +398,25 @@ class ModerationQueueService:
             return 'medium'
         else:
             return 'low'
+
+
+async def sync_report_in_queue(db, report, resolved: bool = False) -> None:
+    """
+    Apply a created or resolved report to the materialized moderation queue.
+    
+    Failures are logged and swallowed: the periodic rebuild repairs the
+    queue, and a report action must never fail because of it.
+    
+    Args:
+        db: Connected Prisma client
+        report: The created or resolved Report
+        resolved: Whether the report left the PENDING state
+    """
+    try:
+        service = ModerationQueueService(db)
+        if resolved:
+            await service.on_report_resolved(report)
+        else:
+            await service.on_report_created(report)
+    except Exception as e:
+        logger.warning(f"Could not update moderation queue for report {report.id}: {e}")
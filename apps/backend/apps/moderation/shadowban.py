@@ -9,15 +9,70 @@ This service handles:
 - Checking shadowban status
 - Filtering content from shadowbanned users
 
+The IDs of all actively shadowbanned users are cached in each process and
+reloaded at most every SHADOWBAN_CACHE_TTL seconds, so filtering content
+does not query the Shadowban table. apply_shadowban() and remove_shadowban()
+refresh the local copy immediately; other processes pick the change up
+within the TTL.
+
 Requirements: 5.12
 """
 import logging
-from typing import Optional, Dict, Any, List
-from prisma import Prisma
+import time
+from typing import Optional, Dict, Any, FrozenSet, List
+from django.conf import settings
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
 
+# Process-local cache of active shadowbans
+_shadowbanned_user_ids: Optional[FrozenSet[str]] = None
+_shadowbanned_loaded_at = 0.0
+
+
+async def get_shadowbanned_user_ids() -> FrozenSet[str]:
+    """
+    Get the IDs of all actively shadowbanned users.
+    
+    Returns:
+        Set of user IDs (empty if the table cannot be read)
+    """
+    global _shadowbanned_user_ids, _shadowbanned_loaded_at
+    
+    ttl = getattr(settings, 'SHADOWBAN_CACHE_TTL', 60)
+    if _shadowbanned_user_ids is not None and time.monotonic() - _shadowbanned_loaded_at < ttl:
+        return _shadowbanned_user_ids
+    
+    db = get_prisma()
+    await db.connect()
+    
+    try:
+        shadowbans = await db.shadowban.find_many(
+            where={'is_active': True}
+        )
+    except Exception as e:
+        logger.warning(f"Could not load active shadowbans: {e}")
+        return _shadowbanned_user_ids or frozenset()
+    finally:
+        await db.disconnect()
+    
+    _shadowbanned_user_ids = frozenset(sb.user_id for sb in shadowbans)
+    _shadowbanned_loaded_at = time.monotonic()
+    return _shadowbanned_user_ids
+
+
+def reset_shadowban_cache() -> None:
+    """
+    Drop this process's cached shadowban set.
+    
+    Called when a shadowban is applied or removed; also useful for testing.
+    """
+    global _shadowbanned_user_ids, _shadowbanned_loaded_at
+    _shadowbanned_user_ids = None
+    _shadowbanned_loaded_at = 0.0
+
+
 class ShadowbanService:
     """
     Service for managing shadowbans.
@@ -47,7 +102,7 @@ class ShadowbanService:
             
         Requirements: 5.12
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -70,6 +125,8 @@ class ShadowbanService:
                 }
             )
             
+            reset_shadowban_cache()
+            
             logger.info(
                 f"Shadowban applied: user_id={user_id}, "
                 f"applied_by={applied_by}, "
@@ -103,7 +160,7 @@ class ShadowbanService:
             
         Requirements: 5.12
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -162,7 +219,7 @@ class ShadowbanService:
         Returns:
             True if shadowban was removed, False if no active shadowban
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -176,6 +233,7 @@ class ShadowbanService:
             )
             
             if result > 0:
+                reset_shadowban_cache()
                 logger.info(
                     f"Shadowban removed for user {user_id} by {removed_by}"
                 )
@@ -210,71 +268,53 @@ class ShadowbanService:
         if not content_list:
             return []
         
-        db = Prisma()
-        await db.connect()
+        shadowbanned_user_ids = await get_shadowbanned_user_ids()
+        if not shadowbanned_user_ids:
+            return content_list
         
-        try:
-            # Get all unique user IDs from content
-            user_ids = set()
-            for item in content_list:
-                # Handle different field names for user ID
-                user_id = item.get('user_id') or item.get('author_id')
-                if user_id:
-                    user_ids.add(user_id)
-            
-            if not user_ids:
-                return content_list
-            
-            # Get all active shadowbans for these users
-            shadowbans = await db.shadowban.find_many(
-                where={
-                    'user_id': {'in': list(user_ids)},
-                    'is_active': True
-                }
-            )
-            
-            shadowbanned_user_ids = {sb.user_id for sb in shadowbans}
-            
-            if not shadowbanned_user_ids:
-                # No shadowbanned users in content
-                return content_list
+        # Only content by shadowbanned users other than the requester is affected
+        if not any(
+            (item.get('user_id') or item.get('author_id')) in shadowbanned_user_ids and
+            (item.get('user_id') or item.get('author_id')) != requesting_user_id
+            for item in content_list
+        ):
+            return content_list
+        
+        # Check if requesting user is admin/moderator
+        if requesting_user_id:
+            db = get_prisma()
+            await db.connect()
             
-            # Check if requesting user is admin/moderator
-            is_moderator = False
-            if requesting_user_id:
+            try:
                 moderator_role = await db.moderatorrole.find_first(
                     where={
                         'user_id': requesting_user_id,
                         'is_active': True
                     }
                 )
-                is_moderator = moderator_role is not None
-            
-            # Filter content
-            filtered_content = []
-            for item in content_list:
-                user_id = item.get('user_id') or item.get('author_id')
-                
-                # Include content if:
-                # 1. User is not shadowbanned
-                # 2. Requesting user is the shadowbanned user themselves
-                # 3. Requesting user is a moderator
-                if (
-                    user_id not in shadowbanned_user_ids or
-                    user_id == requesting_user_id or
-                    is_moderator
-                ):
-                    filtered_content.append(item)
+            finally:
+                await db.disconnect()
             
-            logger.debug(
-                f"Filtered {len(content_list) - len(filtered_content)} "
-                f"shadowbanned content items"
-            )
-            
-            return filtered_content
+            if moderator_role is not None:
+                return content_list
+        
+        # Filter content
+        filtered_content = []
+        for item in content_list:
+            user_id = item.get('user_id') or item.get('author_id')
             
-        finally:
-            await db.disconnect()
+            # Include content if:
+            # 1. User is not shadowbanned
+            # 2. Requesting user is the shadowbanned user themselves
+            if user_id not in shadowbanned_user_ids or user_id == requesting_user_id:
+                filtered_content.append(item)
+        
+        logger.debug(
+            f"Filtered {len(content_list) - len(filtered_content)} "
+            f"shadowbanned content items"
+        )
+        
+        return filtered_content
     
     async def get_shadowban_history(
         self,
@@ -289,7 +329,7 @@ class ShadowbanService:
         Returns:
             List of shadowban records
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
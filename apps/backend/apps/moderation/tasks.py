@@ -0,0 +1,93 @@
+"""Celery tasks for the moderation system."""
+import logging
+
+from celery import shared_task
+
+from infrastructure.async_bridge import run_async
+
+from .post_write import PostWriteJob, get_post_write_stage
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def process_post_write_moderation():
+    """
+    Drain the post-write moderation queue in batches.
+    
+    Started when a job lands in an empty queue, and periodically by Celery
+    Beat so jobs are never stranded if a start message is lost.
+    """
+    processed = get_post_write_stage().drain()
+    if processed:
+        logger.info(f"Processed {processed} post-write moderation jobs")
+
+
+@shared_task(ignore_result=True)
+def requeue_post_write_job(job_json: str):
+    """
+    Put a failed post-write moderation job back on the queue.
+    
+    Scheduled with an exponential backoff countdown after a failure.
+    
+    Args:
+        job_json: Serialized PostWriteJob
+    """
+    job = PostWriteJob.from_json(job_json)
+    stage = get_post_write_stage()
+    length = stage.queue.enqueue(job)
+    if length is None:
+        stage.run_inline(job)
+    elif length == 1:
+        process_post_write_moderation.delay()
+
+
+@shared_task(ignore_result=True)
+def rebuild_moderation_queue():
+    """
+    Rescore all pending reports and replace the materialized moderation queue.
+    
+    Incremental updates keep duplicate counts and reporter accuracy current;
+    this periodic rebuild refreshes the age component of every score.
+    """
+    from .queue_service import ModerationQueueService
+    
+    async def _rebuild():
+        async with ModerationQueueService() as queue_service:
+            return await queue_service.rebuild_queue()
+    
+    count = run_async(_rebuild(), timeout=None)
+    logger.info(f"Rebuilt moderation queue with {count} reports")
+
+
+@shared_task(ignore_result=True)
+def backfill_content_fingerprints(content_type: str = 'whisper', after_id: str = None, batch_size: int = 500):
+    """
+    Fingerprint content written before the fingerprint index existed.
+    
+    Processes one batch and chains itself until every whisper (then every
+    chapter) has been indexed. Start it once with backfill_content_fingerprints.delay().
+    
+    Args:
+        content_type: 'whisper' or 'chapter'
+        after_id: Last ID processed by the previous batch
+        batch_size: Rows per batch
+    """
+    from .content_fingerprint import ContentFingerprintIndex
+    from infrastructure.prisma_pool import get_prisma
+    
+    async def _backfill():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await ContentFingerprintIndex(db).backfill(content_type, after_id, batch_size)
+        finally:
+            await db.disconnect()
+    
+    last_id = run_async(_backfill(), timeout=None)
+    if last_id:
+        backfill_content_fingerprints.delay(content_type, last_id, batch_size)
+    elif content_type == 'whisper':
+        backfill_content_fingerprints.delay('chapter', None, batch_size)
+    else:
+        logger.info("Content fingerprint backfill complete")
@@ -148,12 +148,14 @@ class URLValidator:
         
         return False
     
-    def validate_urls(self, urls: List[str]) -> URLValidationResult:
+    def validate_urls(self, urls: List[str], use_api: bool = True) -> URLValidationResult:
         """
         Validate a list of URLs against threat databases.
         
         Args:
             urls: List of URLs to validate
+            use_api: Query the Safe Browsing API; if False only cached
+                verdicts and heuristic checks are used (no network call)
             
         Returns:
             URLValidationResult with validation status and details
@@ -198,7 +200,7 @@ class URLValidator:
         
         # Validate remaining URLs
         if urls_to_check:
-            if self.api_key:
+            if self.api_key and use_api:
                 # Use Google Safe Browsing API
                 api_results = self._check_safe_browsing_api(urls_to_check)
                 malicious_urls.extend(api_results['malicious_urls'])
@@ -331,7 +333,7 @@ class URLValidator:
             'details': details
         }
     
-    def check_content(self, content: str) -> URLValidationResult:
+    def check_content(self, content: str, use_api: bool = True) -> URLValidationResult:
         """
         Extract and validate all URLs in content.
         
@@ -339,6 +341,7 @@ class URLValidator:
         
         Args:
             content: Text content to check
+            use_api: Query the Safe Browsing API (see validate_urls)
             
         Returns:
             URLValidationResult with validation status
@@ -348,7 +351,7 @@ class URLValidator:
             - 4.7: Detect malicious URLs for blocking
         """
         urls = self.extract_urls(content)
-        return self.validate_urls(urls)
+        return self.validate_urls(urls, use_api=use_api)
     
     def log_blocked_attempt(
         self,
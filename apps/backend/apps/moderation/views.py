@@ -3,16 +3,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from datetime import datetime
 from .serializers import ReportCreateSerializer, ReportSerializer
-from .queue_service import ModerationQueueService
+from .queue_service import ModerationQueueService, sync_report_in_queue
 from .permissions import (
     require_moderator_role,
     require_administrator,
     check_action_permission
 )
-import asyncio
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 
 @api_view(['POST'])
@@ -56,7 +56,7 @@ def submit_report(request):
     
     # Create report
     try:
-        report_data = asyncio.run(
+        report_data = run_async(
             create_report(reporter_id, content_type, content_id, reason)
         )
         
@@ -98,7 +98,7 @@ async def create_report(reporter_id, content_type, content_id, reason):
         - 13.5: Store report with status PENDING
         - 13.6: Prevent duplicate reports
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -158,6 +158,7 @@ async def create_report(reporter_id, content_type, content_id, reason):
         
         # Create new report
         report = await db.report.create(data=report_data)
+        await sync_report_in_queue(db, report)
         
         # Return report data
         return {
@@ -182,12 +183,17 @@ async def create_report(reporter_id, content_type, content_id, reason):
 @require_moderator_role()
 def get_moderation_queue(request):
     """
-    Get all pending reports sorted by priority and creation date.
+    Get pending reports sorted by priority and creation date, one page at a time.
     
     Requires any active moderator role.
     
+    Query Parameters:
+        - cursor: next_cursor from the previous page
+        - page_size: Reports per page (default: 50, max: 200)
+    
     Returns:
-        List of reports with priority scores and levels
+        Page of reports with priority scores and levels, the total pending
+        count and next_cursor (None on the last page)
         
     Requirements:
         - 2.1: Display all pending reports in moderation queue
@@ -196,13 +202,18 @@ def get_moderation_queue(request):
         - 3.6: Return 403 for unauthorized access
     """
     try:
-        # Get the moderation queue
-        queue = asyncio.run(fetch_moderation_queue())
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 50)), 1), 200)
+        except ValueError:
+            page_size = 50
         
-        return Response({
-            'reports': queue,
-            'count': len(queue)
-        }, status=status.HTTP_200_OK)
+        # Get one page of the moderation queue
+        page = run_async(fetch_moderation_queue(
+            cursor=request.query_params.get('cursor'),
+            page_size=page_size
+        ))
+        
+        return Response(page, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response(
@@ -211,19 +222,26 @@ def get_moderation_queue(request):
         )
 
 
-async def fetch_moderation_queue():
+async def fetch_moderation_queue(cursor: str = None, page_size: int = None):
     """
     Fetch the moderation queue using the ModerationQueueService.
     
+    Args:
+        cursor: Pagination cursor (used with page_size)
+        page_size: Reports per page; None returns the whole queue, scored live
+    
     Returns:
-        List of reports with priority information
+        List of reports with priority information, or a page dict with
+        'reports', 'count' and 'next_cursor' when page_size is given
         
     Requirements:
         - 2.1: Display all pending reports
         - 2.2: Sort by priority and creation date
     """
     async with ModerationQueueService() as queue_service:
-        return await queue_service.get_queue()
+        if page_size is None:
+            return await queue_service.get_queue()
+        return await queue_service.get_queue_page(cursor=cursor, page_size=page_size)
 
 
 @api_view(['GET'])
@@ -248,7 +266,7 @@ def get_report_details(request, report_id):
         - 3.6: Return 403 for unauthorized access
     """
     try:
-        report_data = asyncio.run(fetch_report_details(report_id))
+        report_data = run_async(fetch_report_details(report_id))
         
         if report_data is None:
             return Response(
@@ -278,7 +296,7 @@ async def fetch_report_details(report_id: str):
     Requirements:
         - 2.3: Display full report context
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -461,7 +479,7 @@ def take_moderation_action(request):
     moderator_id = request.user_profile.id
     
     try:
-        action_data = asyncio.run(
+        action_data = run_async(
             execute_moderation_action(report_id, moderator_id, action_type, reason)
         )
         
@@ -506,7 +524,7 @@ async def execute_moderation_action(report_id: str, moderator_id: str, action_ty
     # Initialize structured logger
     structured_logger = get_logger(__name__)
     
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -704,6 +722,7 @@ async def execute_moderation_action(report_id: str, moderator_id: str, action_ty
             where={'id': report_id},
             data={'status': 'RESOLVED'}
         )
+        await sync_report_in_queue(db, report, resolved=True)
         
         # Return action data
         return {
@@ -741,7 +760,7 @@ def get_moderation_stats(request):
         - 3.6: Return 403 for unauthorized access
     """
     try:
-        stats = asyncio.run(fetch_moderation_stats())
+        stats = run_async(fetch_moderation_stats())
         return Response(stats, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -761,7 +780,7 @@ async def fetch_moderation_stats():
     Requirements:
         - 2.9: Display performance metrics
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -840,7 +859,7 @@ def list_moderators(request):
         - 3.8: Display list of all moderators with their roles and activity statistics
     """
     try:
-        moderators = asyncio.run(fetch_moderators())
+        moderators = run_async(fetch_moderators())
         return Response({
             'moderators': moderators,
             'count': len(moderators)
@@ -863,7 +882,7 @@ async def fetch_moderators():
     Requirements:
         - 3.8: Display list with roles and activity statistics
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -960,7 +979,7 @@ def assign_moderator_role(request):
     assigned_by = request.user_profile.id
     
     try:
-        role_data = asyncio.run(
+        role_data = run_async(
             create_moderator_role(user_id, role, assigned_by)
         )
         
@@ -996,7 +1015,7 @@ async def create_moderator_role(user_id: str, role: str, assigned_by: str):
         - 3.2: Grant access to moderation dashboard
         - 3.7: Log role assignment
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1079,7 +1098,7 @@ def remove_moderator_role(request, moderator_id):
         - 3.7: Log all role assignments and permission changes
     """
     try:
-        success = asyncio.run(deactivate_moderator_role(moderator_id))
+        success = run_async(deactivate_moderator_role(moderator_id))
         
         if not success:
             return Response(
@@ -1112,7 +1131,7 @@ async def deactivate_moderator_role(moderator_id: str) -> bool:
     Requirements:
         - 3.7: Log permission changes
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1153,7 +1172,7 @@ def list_filter_configs(request):
         - 4.9: Maintain a whitelist for false positive terms
     """
     try:
-        configs = asyncio.run(fetch_filter_configs())
+        configs = run_async(fetch_filter_configs())
         return Response({
             'configs': configs,
             'count': len(configs)
@@ -1176,7 +1195,7 @@ async def fetch_filter_configs():
     Requirements:
         - 4.8: Allow administrators to configure filter sensitivity levels
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1231,7 +1250,7 @@ def get_filter_config(request, filter_type):
         )
     
     try:
-        config = asyncio.run(fetch_filter_config(filter_type_upper))
+        config = run_async(fetch_filter_config(filter_type_upper))
         
         if config is None:
             return Response(
@@ -1261,7 +1280,7 @@ async def fetch_filter_config(filter_type: str):
     Requirements:
         - 4.8: Allow administrators to configure filter sensitivity levels
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1338,7 +1357,7 @@ def update_filter_config(request, filter_type):
     admin_id = request.user_profile.id
     
     try:
-        config = asyncio.run(
+        config = run_async(
             update_filter_configuration(
                 filter_type_upper,
                 admin_id,
@@ -1378,7 +1397,7 @@ async def update_filter_configuration(filter_type: str, admin_id: str, updates:
         - 4.9: Maintain a whitelist for false positive terms
         - 4.10: Log all automated filtering actions
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1411,6 +1430,10 @@ async def update_filter_configuration(filter_type: str, admin_id: str, updates:
             data=update_data
         )
         
+        # Workers rebuild their cached filter pipelines on the next check
+        from .filter_pipeline_cache import bump_config_version
+        bump_config_version()
+        
         return {
             'id': config.id,
             'filter_type': config.filter_type,
@@ -1441,7 +1464,7 @@ def get_nsfw_preference(request):
     user_id = request.user_profile.id
     
     try:
-        preference = asyncio.run(fetch_nsfw_preference(user_id))
+        preference = run_async(fetch_nsfw_preference(user_id))
         return Response({'nsfw_preference': preference}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response(
@@ -1503,7 +1526,7 @@ def update_nsfw_preference(request):
         )
     
     try:
-        preference_data = asyncio.run(
+        preference_data = run_async(
             update_user_nsfw_preference(user_id, nsfw_preference)
         )
         return Response(preference_data, status=status.HTTP_200_OK)
@@ -1597,7 +1620,7 @@ def override_nsfw_flag(request):
         )
     
     try:
-        flag_data = asyncio.run(
+        flag_data = run_async(
             execute_nsfw_override(content_type, content_id, is_nsfw, moderator_id)
         )
         
@@ -6,9 +6,10 @@ Implements Requirements 21.9, 21.10.
 """
 import logging
 from typing import Dict, Any, Optional
-from prisma import Prisma
 from datetime import datetime
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,7 +47,7 @@ class NotificationPreferenceService:
         Returns:
             Dict containing preference settings or None if not found
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -90,7 +91,7 @@ class NotificationPreferenceService:
         Returns:
             Dict containing created preference settings
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -146,7 +147,7 @@ class NotificationPreferenceService:
         Returns:
             Dict containing updated preference settings
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -5,29 +5,128 @@ This service manages push notifications to mobile devices using:
 - Firebase Cloud Messaging (FCM) for Android
 - Apple Push Notification service (APNs) for iOS
 
+Delivery to a set of devices is one concurrent pass: Android tokens go out
+in FCM multicast requests of up to PUSH_FCM_BATCH_SIZE tokens, iOS tokens
+as individual APNs requests multiplexed over a pooled HTTP/2 connection,
+with at most PUSH_MAX_CONCURRENCY requests in flight. Nothing sleeps in
+the request: transient failures are handed to retry_push_delivery (Celery)
+with an exponential backoff countdown. Invalid tokens are deactivated and
+delivery logs written in one statement each per pass.
+
+FCM_URL and APNS_URL can point the service at a local FCM/APNs stand-in.
+
 Implements Requirements 4.1, 4.2, 5.1, 5.2 from mobile-backend-integration spec.
 """
 
 import asyncio
 import json
 import logging
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 import httpx
 from django.conf import settings
 
-from prisma import Prisma
 from apps.analytics.mobile_analytics_service import get_mobile_analytics_service
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
 
+SENT = 'sent'
+FAILED = 'failed'
+INVALID_TOKEN = 'invalid_token'
+
+# FCM per-token errors that mean the token will never work again
+FCM_INVALID_TOKEN_ERRORS = {'InvalidRegistration', 'NotRegistered', 'MismatchSenderId'}
+# FCM per-token errors worth retrying later
+FCM_RETRYABLE_ERRORS = {'Unavailable', 'InternalServerError', 'DeviceMessageRateExceeded'}
+
+
 class InvalidTokenException(Exception):
     """Exception raised when a device token is invalid."""
     pass
 
 
+@dataclass(frozen=True)
+class PushTarget:
+    """One device to deliver to."""
+    device_id: str
+    token: str
+    platform: str
+    user_id: Optional[str] = None
+    
+    @classmethod
+    def from_record(cls, device) -> 'PushTarget':
+        """Build a target from a DeviceToken row."""
+        return cls(device.id, device.token, device.platform, device.user_id)
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one delivery attempt to one device."""
+    target: PushTarget
+    status: str
+    error: Optional[str] = None
+    retryable: bool = False
+    retry_scheduled: bool = False
+    
+    def to_dict(self) -> Dict:
+        result = {
+            'device_id': self.target.device_id,
+            'platform': self.target.platform,
+            'status': self.status,
+        }
+        if self.error:
+            result['error'] = self.error
+        if self.retry_scheduled:
+            result['retry_scheduled'] = True
+        return result
+
+
+# Pooled HTTP client, bound to the event loop it was created on
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_push_http_client() -> httpx.AsyncClient:
+    """
+    Get the pooled FCM/APNs HTTP client for the running event loop.
+    
+    Connections are kept alive between deliveries; APNs requests share
+    HTTP/2 connections. A client created on another loop is replaced.
+    
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        max_connections = getattr(settings, 'PUSH_MAX_CONCURRENCY', 50)
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=getattr(settings, 'PUSH_HTTP_TIMEOUT', 10.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+def reset_push_http_client() -> None:
+    """
+    Drop the pooled HTTP client.
+    
+    Useful for testing.
+    """
+    global _http_client, _http_client_loop
+    _http_client = None
+    _http_client_loop = None
+
+
 class PushNotificationService:
     """
     Service for managing push notifications to mobile devices.
@@ -35,11 +134,16 @@ class PushNotificationService:
     Integrates with FCM (Android) and APNs (iOS) for notification delivery.
     """
     
-    def __init__(self):
-        """Initialize push notification service with FCM and APNs clients."""
-        self.prisma = Prisma()
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize push notification service with FCM and APNs clients.
+        
+        Args:
+            http_client: HTTP client to send with (defaults to the pooled one)
+        """
+        self.prisma = get_prisma()
         self.fcm_server_key = getattr(settings, 'FCM_SERVER_KEY', None)
-        self.fcm_url = 'https://fcm.googleapis.com/fcm/send'
+        self.fcm_url = getattr(settings, 'FCM_URL', None) or 'https://fcm.googleapis.com/fcm/send'
         
         # APNs configuration
         self.apns_key_id = getattr(settings, 'APNS_KEY_ID', None)
@@ -49,18 +153,30 @@ class PushNotificationService:
         self.apns_use_sandbox = getattr(settings, 'APNS_USE_SANDBOX', True)
         
         # APNs endpoint
-        if self.apns_use_sandbox:
+        if getattr(settings, 'APNS_URL', None):
+            self.apns_url = settings.APNS_URL
+        elif self.apns_use_sandbox:
             self.apns_url = 'https://api.sandbox.push.apple.com'
         else:
             self.apns_url = 'https://api.push.apple.com'
         
-        # Retry configuration
+        # Delivery configuration
+        self.max_concurrency = getattr(settings, 'PUSH_MAX_CONCURRENCY', 50)
+        self.fcm_batch_size = getattr(settings, 'PUSH_FCM_BATCH_SIZE', 500)
+        self._http_client = http_client
+        
+        # Retry configuration (attempts are spread out by retry_push_delivery)
         self.max_retries = 5
         self.retry_delays = [1, 2, 4, 8, 16]  # Exponential backoff in seconds
         
         # Analytics service
         self.analytics_service = get_mobile_analytics_service()
     
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """HTTP client used for FCM and APNs requests."""
+        return self._http_client or get_push_http_client()
+    
     async def _ensure_connected(self):
         """Ensure Prisma client is connected."""
         if not self.prisma.is_connected():
@@ -81,10 +197,10 @@ class PushNotificationService:
             token: Device token from FCM/APNs
             platform: 'ios' or 'android'
             app_version: Optional app version string
-            
+        
         Returns:
             Device token record
-            
+        
         Raises:
             ValueError: If platform is not 'ios' or 'android'
         """
@@ -146,7 +262,7 @@ class PushNotificationService:
         
         Args:
             token: Device token to unregister
-            
+        
         Returns:
             True if successful
         """
@@ -178,7 +294,7 @@ class PushNotificationService:
         
         Args:
             user_id: User ID
-            
+        
         Returns:
             List of device token records
         """
@@ -207,6 +323,7 @@ class PushNotificationService:
             logger.error(f"Error getting user devices: {str(e)}")
             raise
     
+    
     async def send_notification(
         self,
         user_id: str,
@@ -222,9 +339,10 @@ class PushNotificationService:
             title: Notification title
             body: Notification body text
             data: Optional additional data payload
-            
+        
         Returns:
-            Delivery status summary
+            Delivery status summary (devices whose first attempt failed
+            transiently are counted as failed and retried in the background)
         """
         await self._ensure_connected()
         
@@ -241,169 +359,167 @@ class PushNotificationService:
                 'results': []
             }
         
-        results = []
-        sent_count = 0
-        failed_count = 0
-        
-        # Send to each device
-        for device in devices:
-            platform = device['platform']
-            token = device['token']
-            
-            payload = {
-                'title': title,
-                'body': body,
-                'data': data or {}
-            }
-            
-            try:
-                # Send with retry logic
-                success = await self._send_with_retry(token, platform, payload, device['id'])
-                
-                if success:
-                    sent_count += 1
-                    status = 'sent'
-                else:
-                    failed_count += 1
-                    status = 'failed'
-                
-                # Log the notification
-                await self._log_notification(
-                    device_token_id=device['id'],
-                    payload=payload,
-                    status=status
-                )
-                
-                # Track notification delivery in analytics
-                self.analytics_service.track_notification_delivery(
-                    status=status,
-                    platform=platform,
-                    user_id=user_id
-                )
-                
-                results.append({
-                    'device_id': device['id'],
-                    'platform': platform,
-                    'status': status
-                })
-            
-            except Exception as e:
-                logger.error(f"Error sending notification to device {device['id']}: {str(e)}")
-                failed_count += 1
-                
-                await self._log_notification(
-                    device_token_id=device['id'],
-                    payload=payload,
-                    status='failed',
-                    error_message=str(e)
-                )
-                
-                # Track notification failure in analytics
-                self.analytics_service.track_notification_delivery(
-                    status='failed',
-                    platform=platform,
-                    user_id=user_id
-                )
-                
-                results.append({
-                    'device_id': device['id'],
-                    'platform': platform,
-                    'status': 'failed',
-                    'error': str(e)
-                })
+        payload = {
+            'title': title,
+            'body': body,
+            'data': data or {}
+        }
+        targets = [
+            PushTarget(device['id'], device['token'], device['platform'], user_id)
+            for device in devices
+        ]
+        results = await self.deliver(targets, payload)
+        sent_count = sum(1 for result in results if result.status == SENT)
         
         return {
             'user_id': user_id,
             'total_devices': len(devices),
             'sent': sent_count,
-            'failed': failed_count,
-            'results': results
+            'failed': len(results) - sent_count,
+            'results': [result.to_dict() for result in results]
         }
     
-    async def _send_with_retry(
+    async def send_to_users(
         self,
-        token: str,
-        platform: str,
+        user_ids: Iterable[str],
+        title: str,
+        body: str,
+        data: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Send the same push notification to every device of several users.
+        
+        Devices are loaded in one query and delivered to in one pass.
+        
+        Args:
+            user_ids: User IDs to send notification to
+            title: Notification title
+            body: Notification body text
+            data: Optional additional data payload
+        
+        Returns:
+            Delivery status summary across all devices
+        """
+        await self._ensure_connected()
+        
+        devices = await self.prisma.devicetoken.find_many(
+            where={'user_id': {'in': list(set(user_ids))}, 'is_active': True}
+        )
+        payload = {
+            'title': title,
+            'body': body,
+            'data': data or {}
+        }
+        results = await self.deliver([PushTarget.from_record(device) for device in devices], payload)
+        sent_count = sum(1 for result in results if result.status == SENT)
+        
+        return {
+            'total_devices': len(devices),
+            'sent': sent_count,
+            'failed': len(results) - sent_count
+        }
+    
+    async def deliver(
+        self,
+        targets: List[PushTarget],
         payload: Dict,
-        device_id: str
-    ) -> bool:
+        attempt: int = 1
+    ) -> List[DeliveryResult]:
         """
-        Send notification with exponential backoff retry logic.
+        Deliver a payload to devices concurrently and record the outcomes.
+        
+        Transient failures are scheduled for another attempt (up to
+        max_retries); invalid tokens are deactivated; one delivery log row
+        is written per device once its outcome is final.
         
         Args:
-            token: Device token
-            platform: Platform ('ios' or 'android')
-            payload: Notification payload
-            device_id: Device ID for logging
-            
+            targets: Devices to deliver to
+            payload: Notification payload ('title', 'body', 'data')
+            attempt: Attempt number of this pass (1 for the first)
+        
         Returns:
-            True if successful, False otherwise
+            One DeliveryResult per target, in target order
         """
-        last_error = None
+        if not targets:
+            return []
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        android = [target for target in targets if target.platform == 'android']
+        ios = [target for target in targets if target.platform == 'ios']
+        
+        jobs = [
+            self._deliver_fcm_batch(android[start:start + self.fcm_batch_size], payload, semaphore)
+            for start in range(0, len(android), self.fcm_batch_size)
+        ]
+        jobs.extend(self._deliver_apns(target, payload, semaphore) for target in ios)
         
-        for attempt in range(self.max_retries):
+        by_device = {}
+        for batch in await asyncio.gather(*jobs):
+            for result in batch:
+                by_device[result.target.device_id] = result
+        
+        results = []
+        for target in targets:
+            result = by_device.get(target.device_id)
+            if result is None:
+                logger.error(f"Unknown platform: {target.platform}")
+                result = DeliveryResult(target, FAILED, error=f'Unknown platform: {target.platform}')
+            results.append(result)
+        
+        await self._record_results(results, payload, attempt)
+        return results
+    
+    async def _deliver_fcm_batch(
+        self,
+        targets: List[PushTarget],
+        payload: Dict,
+        semaphore: asyncio.Semaphore
+    ) -> List[DeliveryResult]:
+        """Send one FCM multicast request, mapping each token's outcome back to its device."""
+        async with semaphore:
             try:
-                if platform == 'android':
-                    success = await self._send_to_fcm(token, payload)
-                elif platform == 'ios':
-                    success = await self._send_to_apns(token, payload)
-                else:
-                    logger.error(f"Unknown platform: {platform}")
-                    return False
-                
-                if success:
-                    if attempt > 0:
-                        logger.info(f"Notification sent successfully on attempt {attempt + 1}")
-                    return True
-                
-                # If not the last attempt, wait before retrying
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delays[attempt]
-                    logger.warning(
-                        f"Notification delivery failed (attempt {attempt + 1}/{self.max_retries}), "
-                        f"retrying in {delay}s"
-                    )
-                    await asyncio.sleep(delay)
-            
-            except InvalidTokenException as e:
-                # Token is invalid, don't retry
-                logger.info(f"Token is invalid, stopping retries: {str(e)}")
-                
-                # Track invalid token in analytics
-                await self._track_invalid_token_analytics(device_id)
-                
-                return False
-                
+                outcomes = await self._send_to_fcm([target.token for target in targets], payload)
             except Exception as e:
-                last_error = str(e)
-                logger.error(f"Error on attempt {attempt + 1}: {str(e)}")
-                
-                # If not the last attempt, wait before retrying
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delays[attempt]
-                    logger.warning(f"Retrying in {delay}s after error")
-                    await asyncio.sleep(delay)
-        
-        logger.error(
-            f"Failed to send notification after {self.max_retries} attempts. "
-            f"Last error: {last_error}"
-        )
-        return False
+                logger.error(f"Error sending FCM notification: {str(e)}")
+                outcomes = [(FAILED, str(e), True)] * len(targets)
+        return [
+            DeliveryResult(target, status, error, retryable)
+            for target, (status, error, retryable) in zip(targets, outcomes)
+        ]
     
-    async def _send_to_fcm(self, token: str, payload: Dict) -> bool:
+    async def _deliver_apns(
+        self,
+        target: PushTarget,
+        payload: Dict,
+        semaphore: asyncio.Semaphore
+    ) -> List[DeliveryResult]:
+        """Send one APNs request."""
+        async with semaphore:
+            try:
+                status, error, retryable = await self._send_to_apns(target.token, payload)
+            except Exception as e:
+                logger.error(f"Error sending APNs notification: {str(e)}")
+                status, error, retryable = FAILED, str(e), True
+        return [DeliveryResult(target, status, error, retryable)]
+    
+    async def _send_to_fcm(self, tokens: List[str], payload: Dict) -> List[tuple]:
         """
-        Send notification via Firebase Cloud Messaging.
+        Send notification to several tokens via one FCM multicast request.
         
         Args:
-            token: FCM device token
+            tokens: FCM device tokens (at most 1000)
             payload: Notification payload
-            
+        
         Returns:
-            True if successful, False otherwise
+            Per token, a (status, error, retryable) tuple
+        
+        Raises:
+            httpx.TimeoutException, httpx.NetworkError: Transport failures
+                (retryable for every token)
         """
         if not self.fcm_server_key:
             logger.error("FCM_SERVER_KEY not configured")
-            return False
+            return [(FAILED, 'FCM_SERVER_KEY not configured', False)] * len(tokens)
         
         headers = {
             'Authorization': f'Bearer {self.fcm_server_key}',
@@ -411,7 +527,7 @@ class PushNotificationService:
         }
         
         fcm_payload = {
-            'to': token,
+            'registration_ids': tokens,
             'notification': {
                 'title': payload['title'],
                 'body': payload['body']
@@ -419,62 +535,44 @@ class PushNotificationService:
             'data': payload.get('data', {})
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.fcm_url,
-                    headers=headers,
-                    json=fcm_payload,
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('success') == 1:
-                        logger.info(f"FCM notification sent successfully")
-                        return True
-                    else:
-                        error = result.get('results', [{}])[0].get('error', 'Unknown error')
-                        logger.error(f"FCM notification failed: {error}")
-                        
-                        # Handle invalid token - mark as inactive and don't retry
-                        if error in ['InvalidRegistration', 'NotRegistered', 'MismatchSenderId']:
-                            logger.warning(f"Invalid FCM token detected: {error}")
-                            await self._handle_invalid_token(token)
-                            raise InvalidTokenException(f"FCM token is invalid: {error}")
-                        
-                        return False
-                else:
-                    logger.error(f"FCM request failed with status {response.status_code}")
-                    return False
-        
-        except httpx.TimeoutException as e:
-            logger.error(f"FCM request timeout: {str(e)}")
-            raise  # Re-raise to trigger retry
-        except httpx.NetworkError as e:
-            logger.error(f"FCM network error: {str(e)}")
-            raise  # Re-raise to trigger retry
-        except InvalidTokenException:
-            # Re-raise to stop retries
-            raise
-        except Exception as e:
-            logger.error(f"Error sending FCM notification: {str(e)}")
-            return False
+        response = await self.http_client.post(self.fcm_url, headers=headers, json=fcm_payload)
+        
+        if response.status_code != 200:
+            logger.error(f"FCM request failed with status {response.status_code}")
+            retryable = response.status_code == 429 or response.status_code >= 500
+            return [(FAILED, f'FCM status {response.status_code}', retryable)] * len(tokens)
+        
+        outcomes = []
+        results = response.json().get('results', [])
+        for i in range(len(tokens)):
+            error = results[i].get('error') if i < len(results) else 'Missing result'
+            if not error:
+                outcomes.append((SENT, None, False))
+            elif error in FCM_INVALID_TOKEN_ERRORS:
+                logger.warning(f"Invalid FCM token detected: {error}")
+                outcomes.append((INVALID_TOKEN, error, False))
+            else:
+                outcomes.append((FAILED, error, error in FCM_RETRYABLE_ERRORS))
+        return outcomes
     
-    async def _send_to_apns(self, token: str, payload: Dict) -> bool:
+    async def _send_to_apns(self, token: str, payload: Dict) -> tuple:
         """
         Send notification via Apple Push Notification service.
         
         Args:
             token: APNs device token
             payload: Notification payload
-            
+        
         Returns:
-            True if successful, False otherwise
+            (status, error, retryable) tuple
+        
+        Raises:
+            httpx.TimeoutException, httpx.NetworkError: Transport failures
+                (retryable)
         """
         if not all([self.apns_key_id, self.apns_team_id, self.apns_bundle_id]):
             logger.error("APNs configuration incomplete")
-            return False
+            return FAILED, 'APNs configuration incomplete', False
         
         # APNs payload format
         apns_payload = {
@@ -500,141 +598,136 @@ class PushNotificationService:
         # Note: In production, you would need to implement JWT authentication
         # for APNs using the key file. For now, this is a simplified version.
         
+        response = await self.http_client.post(
+            f'{self.apns_url}/3/device/{token}',
+            headers=headers,
+            json=apns_payload
+        )
+        
+        if response.status_code == 200:
+            return SENT, None, False
+        
+        logger.error(f"APNs request failed with status {response.status_code}: {response.text}")
+        
+        # 400: Bad request (invalid token format)
+        # 410: Token no longer active
+        if response.status_code in [400, 410]:
+            logger.warning(f"Invalid APNs token detected: status {response.status_code}")
+            return INVALID_TOKEN, f'APNs status {response.status_code}', False
+        
+        retryable = response.status_code == 429 or response.status_code >= 500
+        return FAILED, f'APNs status {response.status_code}', retryable
+    
+    async def _record_results(self, results: List[DeliveryResult], payload: Dict, attempt: int):
+        """
+        Schedule retries, deactivate invalid tokens and log final outcomes in bulk.
+        
+        Args:
+            results: Outcomes of one delivery pass
+            payload: Notification payload
+            attempt: Attempt number of the pass
+        """
+        retry = [result for result in results if result.retryable and attempt < self.max_retries]
+        if retry and self._schedule_retry([result.target.device_id for result in retry], payload, attempt):
+            for result in retry:
+                result.retry_scheduled = True
+        elif retry:
+            logger.error(f"Could not schedule push retry for {len(retry)} devices")
+        
+        final = [result for result in results if not result.retry_scheduled]
+        for result in final:
+            self.analytics_service.track_notification_delivery(
+                status=result.status,
+                platform=result.target.platform,
+                user_id=result.target.user_id
+            )
+        
+        invalid_tokens = [result.target.token for result in final if result.status == INVALID_TOKEN]
+        if invalid_tokens:
+            await self._deactivate_tokens(invalid_tokens)
+        
+        await self._log_notifications([
+            {
+                'device_token_id': result.target.device_id,
+                'payload': json.dumps(payload),
+                'status': result.status,
+                'error_message': result.error
+            }
+            for result in final
+        ])
+    
+    def _schedule_retry(self, device_ids: List[str], payload: Dict, attempt: int) -> bool:
+        """
+        Queue another delivery attempt for devices after the backoff delay.
+        
+        Returns:
+            True if the retry was scheduled
+        """
+        from .tasks import retry_push_delivery
+        
+        delay = self.retry_delays[min(attempt - 1, len(self.retry_delays) - 1)]
+        logger.warning(
+            f"Push delivery failed for {len(device_ids)} devices "
+            f"(attempt {attempt}/{self.max_retries}), retrying in {delay}s"
+        )
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f'{self.apns_url}/3/device/{token}',
-                    headers=headers,
-                    json=apns_payload,
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"APNs notification sent successfully")
-                    return True
-                else:
-                    logger.error(f"APNs request failed with status {response.status_code}: {response.text}")
-                    
-                    # Handle invalid token - mark as inactive and don't retry
-                    # 400: Bad request (invalid token format)
-                    # 410: Token no longer active
-                    if response.status_code in [400, 410]:
-                        logger.warning(f"Invalid APNs token detected: status {response.status_code}")
-                        await self._handle_invalid_token(token)
-                        raise InvalidTokenException(f"APNs token is invalid: status {response.status_code}")
-                    
-                    return False
-        
-        except httpx.TimeoutException as e:
-            logger.error(f"APNs request timeout: {str(e)}")
-            raise  # Re-raise to trigger retry
-        except httpx.NetworkError as e:
-            logger.error(f"APNs network error: {str(e)}")
-            raise  # Re-raise to trigger retry
-        except InvalidTokenException:
-            # Re-raise to stop retries
-            raise
+            retry_push_delivery.apply_async(args=[device_ids, payload, attempt + 1], countdown=delay)
+            return True
         except Exception as e:
-            logger.error(f"Error sending APNs notification: {str(e)}")
+            logger.error(f"Error scheduling push retry: {str(e)}")
             return False
     
-    async def _handle_invalid_token(self, token: str):
+    async def retry_delivery(self, device_ids: List[str], payload: Dict, attempt: int) -> List[DeliveryResult]:
         """
-        Mark device token as inactive when delivery fails due to invalid token.
+        Run a scheduled retry for devices that are still active.
         
         Args:
-            token: Device token to mark as inactive
+            device_ids: Device token IDs to retry
+            payload: Notification payload
+            attempt: Attempt number of this pass
+        
+        Returns:
+            Delivery results
         """
-        try:
-            await self._ensure_connected()
-            
-            # Find the device token
-            device_token = await self.prisma.devicetoken.find_unique(
-                where={'token': token}
-            )
-            
-            if device_token and device_token.is_active:
-                # Mark as inactive
-                await self.prisma.devicetoken.update(
-                    where={'token': token},
-                    data={'is_active': False}
-                )
-                logger.info(f"Marked invalid token as inactive: {token[:20]}...")
-                
-                # Log the invalid token event
-                await self._log_notification(
-                    device_token_id=device_token.id,
-                    payload={'reason': 'invalid_token'},
-                    status='invalid_token',
-                    error_message='Token marked as invalid by push service'
-                )
-                
-                # Track in analytics
-                self.analytics_service.track_notification_delivery(
-                    status='invalid_token',
-                    platform=device_token.platform,
-                    user_id=device_token.user_id
-                )
-            else:
-                logger.warning(f"Token not found or already inactive: {token[:20]}...")
-                
-        except Exception as e:
-            logger.error(f"Error handling invalid token: {str(e)}")
+        await self._ensure_connected()
+        
+        devices = await self.prisma.devicetoken.find_many(
+            where={'id': {'in': device_ids}, 'is_active': True}
+        )
+        return await self.deliver([PushTarget.from_record(device) for device in devices], payload, attempt)
     
-    async def _track_invalid_token_analytics(self, device_id: str):
+    async def _deactivate_tokens(self, tokens: List[str]):
         """
-        Track invalid token in analytics.
+        Mark device tokens rejected by FCM/APNs as inactive.
         
         Args:
-            device_id: Device ID
+            tokens: Device tokens to mark as inactive
         """
         try:
             await self._ensure_connected()
-            
-            # Get device info for analytics
-            device = await self.prisma.devicetoken.find_unique(
-                where={'id': device_id}
+            count = await self.prisma.devicetoken.update_many(
+                where={'token': {'in': tokens}, 'is_active': True},
+                data={'is_active': False}
             )
-            
-            if device:
-                self.analytics_service.track_notification_delivery(
-                    status='invalid_token',
-                    platform=device.platform,
-                    user_id=device.user_id
-                )
+            logger.info(f"Marked {count} invalid tokens as inactive")
         except Exception as e:
-            logger.error(f"Error tracking invalid token analytics: {str(e)}")
+            logger.error(f"Error handling invalid tokens: {str(e)}")
     
-    async def _log_notification(
-        self,
-        device_token_id: str,
-        payload: Dict,
-        status: str,
-        notification_id: Optional[str] = None,
-        error_message: Optional[str] = None
-    ):
+    async def _log_notifications(self, rows: List[Dict]):
         """
-        Log push notification delivery attempt.
+        Log push notification delivery outcomes in one insert.
         
         Args:
-            device_token_id: Device token ID
-            payload: Notification payload
-            status: Delivery status ('sent', 'failed', 'invalid_token')
-            notification_id: Optional notification ID
-            error_message: Optional error message
+            rows: PushNotificationLog rows (device_token_id, payload,
+                status, error_message and optionally notification_id)
         """
+        if not rows:
+            return
         try:
-            await self.prisma.pushnotificationlog.create(
-                data={
-                    'device_token_id': device_token_id,
-                    'notification_id': notification_id,
-                    'payload': json.dumps(payload),
-                    'status': status,
-                    'error_message': error_message
-                }
-            )
+            await self._ensure_connected()
+            await self.prisma.pushnotificationlog.create_many(data=rows)
         except Exception as e:
-            logger.error(f"Error logging notification: {str(e)}")
+            logger.error(f"Error logging notifications: {str(e)}")
     
     async def close(self):
         """Close Prisma connection."""
@@ -3,11 +3,13 @@ import os
 import hashlib
 from celery import shared_task
 from celery.schedules import crontab
-from prisma import Prisma
 from datetime import datetime, timedelta
 import resend
 import logging
 
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
+
 logger = logging.getLogger(__name__)
 
 # Configure Resend API key
@@ -153,12 +155,10 @@ def send_daily_digests():
     This task runs daily at 9 AM and sends digest emails to users who have
     notifications queued with daily_digest frequency.
     """
-    import asyncio
-    
     async def process_daily_digests():
         from .email_service import EmailNotificationService
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -258,12 +258,7 @@ def send_daily_digests():
             raise
     
     # Run async function
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(process_daily_digests())
-    loop.close()
-    
-    return result
+    return run_async(process_daily_digests(), timeout=None)
 
 
 @shared_task
@@ -276,12 +271,10 @@ def send_weekly_digests():
     This task runs weekly on Monday at 9 AM and sends digest emails to users
     who have notifications queued with weekly_digest frequency.
     """
-    import asyncio
-    
     async def process_weekly_digests():
         from .email_service import EmailNotificationService
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -380,12 +373,7 @@ def send_weekly_digests():
             raise
     
     # Run async function
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(process_weekly_digests())
-    loop.close()
-    
-    return result
+    return run_async(process_weekly_digests(), timeout=None)
 
 
 @shared_task
@@ -405,13 +393,11 @@ def queue_notification(user_id: str, notification_type: str, data: dict):
     Returns:
         Dict with status and details
     """
-    import asyncio
-    
     async def process_queue():
         from .preference_service import NotificationPreferenceService
         from .email_service import EmailNotificationService
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -475,9 +461,25 @@ def queue_notification(user_id: str, notification_type: str, data: dict):
             raise
     
     # Run async function
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(process_queue())
-    loop.close()
+    return run_async(process_queue(), timeout=None)
+
+
+@shared_task(ignore_result=True)
+def retry_push_delivery(device_ids: list, payload: dict, attempt: int):
+    """
+    Retry push delivery to devices whose previous attempt failed transiently.
+    
+    Scheduled by PushNotificationService with an exponential backoff
+    countdown; schedules the next attempt itself until max_retries.
+    
+    Args:
+        device_ids: Device token IDs to retry
+        payload: Notification payload
+        attempt: Attempt number of this retry
+    """
+    from .push_service import PushNotificationService, SENT
     
-    return result
+    service = PushNotificationService()
+    results = run_async(service.retry_delivery(device_ids, payload, attempt), timeout=None)
+    sent = sum(1 for result in results if result.status == SENT)
+    logger.info(f"Push retry attempt {attempt}: sent to {sent} of {len(results)} devices")
@@ -2,40 +2,30 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from datetime import datetime
 from .serializers import NotificationSerializer
-
-
-def _run_async(coro):
-    """Run an async coroutine in an isolated event loop."""
-    import asyncio
-
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 
 def sync_get_notifications(user_id: str, cursor: str = None, page_size: int = 20):
     """Synchronous wrapper for get_notifications."""
-    return _run_async(get_notifications(user_id, cursor, page_size))
+    return run_async(get_notifications(user_id, cursor, page_size))
 
 
 def sync_mark_notification_read(notification_id: str, user_id: str):
     """Synchronous wrapper for mark_notification_read."""
-    return _run_async(mark_notification_read(notification_id, user_id))
+    return run_async(mark_notification_read(notification_id, user_id))
 
 
 def sync_mark_all_notifications_read(user_id: str):
     """Synchronous wrapper for mark_all_notifications_read."""
-    return _run_async(mark_all_notifications_read(user_id))
+    return run_async(mark_all_notifications_read(user_id))
 
 
 def sync_create_notification(user_id: str, notification_type: str, actor_id: str, whisper_id: str = None):
     """Synchronous wrapper for create_notification."""
-    return _run_async(create_notification(user_id, notification_type, actor_id, whisper_id))
+    return run_async(create_notification(user_id, notification_type, actor_id, whisper_id))
 
 
 @api_view(['GET'])
@@ -149,7 +139,7 @@ async def get_notifications(user_id: str, cursor: str = None, page_size: int = 2
     Requirements:
         - 12.3: List notifications ordered by creation time descending
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -207,7 +197,7 @@ async def mark_notification_read(notification_id: str, user_id: str):
     Requirements:
         - 12.4: Update read_at timestamp
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -247,7 +237,7 @@ async def mark_all_notifications_read(user_id: str):
     Requirements:
         - 12.4: Mark all notifications as read
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -285,7 +275,7 @@ async def create_notification(user_id: str, notification_type: str, actor_id: st
         - 12.1: Create notification on reply
         - 12.2: Create notification on follow
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -312,15 +302,13 @@ async def create_notification(user_id: str, notification_type: str, actor_id: st
 def sync_get_preferences(user_id: str):
     """Synchronous wrapper for get_preferences."""
     from .preference_service import NotificationPreferenceService
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(NotificationPreferenceService.get_or_create_preferences(user_id))
+    return run_async(NotificationPreferenceService.get_or_create_preferences(user_id))
 
 
 def sync_update_preferences(user_id: str, updates: dict):
     """Synchronous wrapper for update_preferences."""
     from .preference_service import NotificationPreferenceService
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(NotificationPreferenceService.update_preferences(user_id, updates))
+    return run_async(NotificationPreferenceService.update_preferences(user_id, updates))
 
 
 @api_view(['GET'])
@@ -420,25 +408,22 @@ def update_notification_preferences(request):
 def sync_register_device(user_id: str, token: str, platform: str, app_version: str = None):
     """Synchronous wrapper for register_device."""
     from .push_service import PushNotificationService
-    loop = asyncio.get_event_loop()
     service = PushNotificationService()
-    return loop.run_until_complete(service.register_device(user_id, token, platform, app_version))
+    return run_async(service.register_device(user_id, token, platform, app_version))
 
 
 def sync_unregister_device(token: str):
     """Synchronous wrapper for unregister_device."""
     from .push_service import PushNotificationService
-    loop = asyncio.get_event_loop()
     service = PushNotificationService()
-    return loop.run_until_complete(service.unregister_device(token))
+    return run_async(service.unregister_device(token))
 
 
 def sync_get_user_devices(user_id: str):
     """Synchronous wrapper for get_user_devices."""
     from .push_service import PushNotificationService
-    loop = asyncio.get_event_loop()
     service = PushNotificationService()
-    return loop.run_until_complete(service.get_user_devices(user_id))
+    return run_async(service.get_user_devices(user_id))
 
 
 @api_view(['POST'])
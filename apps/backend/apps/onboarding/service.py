@@ -1,7 +1,8 @@
 from datetime import datetime
-from prisma import Prisma
 from prisma.models import OnboardingProgress
 
+from infrastructure.prisma_pool import get_prisma
+
 
 class OnboardingService:
     """Service for managing user onboarding progress"""
@@ -9,7 +10,7 @@ class OnboardingService:
     @staticmethod
     async def get_or_create_progress(user_id: str) -> OnboardingProgress:
         """Get or create onboarding progress for a user"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -29,7 +30,7 @@ class OnboardingService:
     @staticmethod
     async def update_step(user_id: str, step: str) -> OnboardingProgress:
         """Update a specific onboarding step"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -65,7 +66,7 @@ class OnboardingService:
     @staticmethod
     async def check_completion(user_id: str) -> bool:
         """Check if onboarding is complete and update if so"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -102,7 +103,7 @@ class OnboardingService:
     @staticmethod
     async def skip_onboarding(user_id: str) -> OnboardingProgress:
         """Mark onboarding as complete (user skipped)"""
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -1,7 +1,7 @@
 from celery import shared_task
 from datetime import datetime, timedelta
-from prisma import Prisma
 from apps.notifications.email_service import EmailNotificationService
+from infrastructure.prisma_pool import get_prisma
 
 
 @shared_task
@@ -16,7 +16,7 @@ def send_onboarding_followup_emails():
 
 async def _send_onboarding_followup_emails():
     """Async implementation of onboarding follow-up emails"""
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
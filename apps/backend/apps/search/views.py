@@ -11,41 +11,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from datetime import datetime
-import asyncio
-from prisma import Prisma
 
 from infrastructure.search_service import search_service, SearchFilters
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 from apps.core.rate_limiting import rate_limit
 
 
-def _run_async(coro):
-    """Run async code from sync views, even with active event loop."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    import threading
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 class LegacySearchView(APIView):
     """Backward-compatible search endpoint for /v1/search/."""
 
@@ -53,7 +25,7 @@ class LegacySearchView(APIView):
     RESULTS_PER_PAGE = 20
 
     async def _search_stories(self, query: str, page: int):
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
 
         where = {
@@ -94,7 +66,7 @@ class LegacySearchView(APIView):
             page = 1
 
         try:
-            stories, total = _run_async(self._search_stories(query, page))
+            stories, total = run_async(self._search_stories(query, page))
 
             formatted = []
             for story in stories:
@@ -139,7 +111,7 @@ class LegacySuggestView(APIView):
     permission_classes = [AllowAny]
 
     async def _fetch_suggestions(self, query: str, limit: int):
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
 
         try:
@@ -211,7 +183,7 @@ class LegacySuggestView(APIView):
             limit = 50
 
         try:
-            suggestions = _run_async(self._fetch_suggestions(query, limit))
+            suggestions = run_async(self._fetch_suggestions(query, limit))
             return Response(suggestions, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
@@ -235,6 +207,8 @@ class SearchStoriesView(APIView):
     - updated_after: Filter by update date (ISO format, optional)
     - updated_before: Filter by update date (ISO format, optional)
     - page: Page number (default: 1)
+    - cursor: next_cursor from the previous page (optional, preferred over page)
+    - count: 'estimated' or 'exact' total (optional)
     
     Requirements: 35.3, 35.4, 35.5, 35.8
     """
@@ -302,11 +276,14 @@ class SearchStoriesView(APIView):
         
         # Perform search
         try:
+            count_mode = request.query_params.get('count')
             results = search_service.search_stories(
                 query=query,
                 filters=filters,
                 page=page,
-                user_id=user_id
+                user_id=user_id,
+                cursor=request.query_params.get('cursor'),
+                count_mode=count_mode if count_mode in ('estimated', 'exact') else None
             )
             
             return Response(results, status=status.HTTP_200_OK)
@@ -13,10 +13,11 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
 from collections import defaultdict
-import hashlib
 
 from prisma import Prisma
+from apps.moderation.content_fingerprint import ContentFingerprintIndex, exact_hash
 from apps.security.mobile_security_logger import MobileSecurityLogger
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +74,7 @@ class SuspiciousActivityDetector:
         """
         flags = []
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -272,7 +273,9 @@ class SuspiciousActivityDetector:
         """
         Check if user has posted duplicate content that exists under other accounts.
         
-        Uses content hashing to detect identical or near-identical content.
+        Probes the content fingerprint index with the user's 50 most recent
+        fingerprints, which finds identical and near-identical whispers and
+        chapters in two indexed queries.
         
         Args:
             db: Prisma database client
@@ -281,47 +284,16 @@ class SuspiciousActivityDetector:
         Returns:
             True if duplicate content detected
         """
-        # Get user's recent whispers (most likely to be duplicated)
-        user_whispers = await db.whisper.find_many(
-            where={
-                'user_id': user_id,
-                'deleted_at': None
-            },
-            take=50,  # Check last 50 whispers
-            order_by={'created_at': 'desc'}
+        matches = await ContentFingerprintIndex(db).find_cross_account_duplicates(
+            user_id, recent=50
         )
         
-        if not user_whispers:
-            return False
-        
-        # Create content hashes for user's whispers
-        user_content_hashes = set()
-        for whisper in user_whispers:
-            content_hash = self._hash_content(whisper.content)
-            user_content_hashes.add(content_hash)
-        
-        # Check if any other users have the same content hashes
-        # Get whispers from other users with similar content
-        for content_hash in user_content_hashes:
-            # Search for whispers with similar content from other users
-            # Note: This is a simplified check - in production, you might want
-            # to use a more sophisticated similarity algorithm
-            similar_whispers = await db.whisper.find_many(
-                where={
-                    'user_id': {'not': user_id},
-                    'deleted_at': None
-                },
-                take=100
+        if matches:
+            logger.debug(
+                f"Found duplicate content: user {user_id} content matches "
+                f"{matches[0].content_type} {matches[0].content_id} from user {matches[0].user_id}"
             )
-            
-            for whisper in similar_whispers:
-                other_hash = self._hash_content(whisper.content)
-                if other_hash == content_hash:
-                    logger.debug(
-                        f"Found duplicate content: user {user_id} whisper matches "
-                        f"whisper from user {whisper.user_id}"
-                    )
-                    return True
+            return True
         
         return False
     
@@ -434,13 +406,7 @@ class SuspiciousActivityDetector:
         Returns:
             SHA256 hash of normalized content
         """
-        # Normalize: lowercase, strip whitespace, remove punctuation
-        normalized = content.lower().strip()
-        normalized = ''.join(c for c in normalized if c.isalnum() or c.isspace())
-        normalized = ' '.join(normalized.split())  # Normalize whitespace
-        
-        # Create hash
-        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return exact_hash(content)
     
     async def get_activity_summary(
         self,
@@ -455,7 +421,7 @@ class SuspiciousActivityDetector:
         Returns:
             Dictionary with activity metrics
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -0,0 +1,129 @@
+"""
+Per-user blocked set cache.
+
+Every authenticated feed and list request needs the IDs of the users the
+viewer has blocked. BlockedUserCache keeps each user's set in Valkey
+(social:blocked:<user_id>) so that lookup is one SMEMBERS instead of a
+database round trip. A marker member is always stored so that "blocks
+nobody" is cached too.
+
+block_user() and unblock_user() drop the blocker's set; the next read
+reloads it from the Block table.
+"""
+
+import logging
+from typing import FrozenSet, Iterable, Optional
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedUserCache:
+    """Valkey-backed cache of the user IDs each user has blocked."""
+
+    KEY_PREFIX = 'social:blocked:'
+    # Stored in every set so an empty block list is distinguishable from a miss
+    # (never a valid user ID)
+    MARKER = '*'
+
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            ttl: Seconds a cached set is kept
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.ttl = ttl
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def _key(self, user_id: str) -> str:
+        return f'{self.KEY_PREFIX}{user_id}'
+
+    def get(self, user_id: str) -> Optional[FrozenSet[str]]:
+        """
+        Get a user's cached blocked set.
+
+        Args:
+            user_id: ID of the blocking user
+
+        Returns:
+            Blocked user IDs, or None on a miss or if Valkey is unavailable
+        """
+        try:
+            members = self.client.smembers(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Blocked set cache get failed: {e}")
+            return None
+        if not members:
+            return None
+        return frozenset(members) - {self.MARKER}
+
+    def set(self, user_id: str, blocked_ids: Iterable[str]) -> None:
+        """
+        Cache a user's blocked set, replacing any cached one.
+
+        Args:
+            user_id: ID of the blocking user
+            blocked_ids: IDs of every user they have blocked
+        """
+        key = self._key(user_id)
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.sadd(key, self.MARKER, *blocked_ids)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Blocked set cache set failed: {e}")
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Drop a user's cached blocked set after they block or unblock someone.
+
+        Args:
+            user_id: ID of the blocking user
+        """
+        try:
+            self.client.delete(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Blocked set cache delete failed: {e}")
+
+
+# Global instance
+_blocked_user_cache: Optional[BlockedUserCache] = None
+
+
+def get_blocked_user_cache() -> BlockedUserCache:
+    """
+    Get the process-wide blocked set cache.
+
+    Returns:
+        Global BlockedUserCache instance
+    """
+    global _blocked_user_cache
+    if _blocked_user_cache is None:
+        _blocked_user_cache = BlockedUserCache(
+            ttl=getattr(settings, 'BLOCKED_USERS_CACHE_TTL', 3600)
+        )
+    return _blocked_user_cache
+
+
+def reset_blocked_user_cache() -> None:
+    """
+    Reset the global blocked set cache.
+
+    Useful for testing.
+    """
+    global _blocked_user_cache
+    _blocked_user_cache = None
@@ -0,0 +1,607 @@
+"""
+Follow graph: denormalized counters, cached adjacency lists and bulk lookups.
+
+UserProfile.follower_count and following_count are kept in step with the
+Follow table by the same SQL statement that inserts or deletes the edge, so
+profile and feed rendering never COUNT follows.
+
+Each user's followers and following lists are cached in Valkey as sorted
+sets (social:followers:<id>, social:following:<id>) scored by the follow's
+created_at in milliseconds. A marker member with score 0 is always stored,
+so a cached empty list is distinguishable from a miss. Lists are loaded on
+first read when they are no longer than FOLLOW_GRAPH_CACHE_MAX_SIZE; longer
+ones are paged from the database (indexed on (following_id, created_at) and
+(follower_id, created_at)). Writes update cached lists in place and never
+create partial ones.
+
+Pages are ordered newest first (created_at, then user ID, descending) with
+an opaque cursor that is valid for both the cached and the database path.
+
+is_following_many() answers "does the viewer follow each of these users"
+for a whole page of rows in one round trip, for serializers.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis
+from django.conf import settings
+from redis.exceptions import NoScriptError
+
+logger = logging.getLogger(__name__)
+
+
+FOLLOWERS = 'followers'
+FOLLOWING = 'following'
+
+# Inserts the edge and bumps both counters; a no-op for an existing follow
+FOLLOW_SQL = """
+    WITH inserted AS (
+        INSERT INTO "Follow" (id, follower_id, following_id, created_at)
+        VALUES ($1, $2, $3, $4::timestamp(3))
+        ON CONFLICT (follower_id, following_id) DO NOTHING
+        RETURNING follower_id, following_id
+    ), counted AS (
+        UPDATE "UserProfile" AS p
+        SET following_count = p.following_count + CASE WHEN p.id = i.follower_id THEN 1 ELSE 0 END,
+            follower_count = p.follower_count + CASE WHEN p.id = i.following_id THEN 1 ELSE 0 END
+        FROM inserted AS i
+        WHERE p.id IN (i.follower_id, i.following_id)
+        RETURNING p.id
+    )
+    SELECT COUNT(*)::int AS inserted FROM inserted
+"""
+
+# Deletes edges and decrements counters (each profile row is updated once,
+# even when a user loses edges in both directions)
+UNFOLLOW_SQL_TEMPLATE = """
+    WITH deleted AS (
+        DELETE FROM "Follow"
+        WHERE {condition}
+        RETURNING follower_id, following_id
+    ), deltas AS (
+        SELECT id, SUM(following_delta) AS following_delta, SUM(follower_delta) AS follower_delta
+        FROM (
+            SELECT follower_id AS id, 1 AS following_delta, 0 AS follower_delta FROM deleted
+            UNION ALL
+            SELECT following_id AS id, 0 AS following_delta, 1 AS follower_delta FROM deleted
+        ) AS d
+        GROUP BY id
+    ), counted AS (
+        UPDATE "UserProfile" AS p
+        SET following_count = GREATEST(p.following_count - d.following_delta, 0),
+            follower_count = GREATEST(p.follower_count - d.follower_delta, 0)
+        FROM deltas AS d
+        WHERE p.id = d.id
+        RETURNING p.id
+    )
+    SELECT follower_id, following_id FROM deleted
+"""
+
+UNFOLLOW_SQL = UNFOLLOW_SQL_TEMPLATE.format(
+    condition='follower_id = $1 AND following_id = $2'
+)
+UNFOLLOW_BETWEEN_SQL = UNFOLLOW_SQL_TEMPLATE.format(
+    condition='(follower_id = $1 AND following_id = $2) OR (follower_id = $2 AND following_id = $1)'
+)
+UNFOLLOW_ALL_SQL = UNFOLLOW_SQL_TEMPLATE.format(
+    condition='follower_id = $1 OR following_id = $1'
+)
+
+# Recomputes every counter from the Follow table (for drift repair)
+RECOUNT_SQL = """
+    UPDATE "UserProfile" AS p
+    SET follower_count = COALESCE(f.followers, 0),
+        following_count = COALESCE(g.following, 0)
+    FROM "UserProfile" AS u
+    LEFT JOIN (
+        SELECT following_id AS id, COUNT(*) AS followers FROM "Follow" GROUP BY following_id
+    ) AS f ON f.id = u.id
+    LEFT JOIN (
+        SELECT follower_id AS id, COUNT(*) AS following FROM "Follow" GROUP BY follower_id
+    ) AS g ON g.id = u.id
+    WHERE p.id = u.id
+      AND (p.follower_count <> COALESCE(f.followers, 0) OR p.following_count <> COALESCE(g.following, 0))
+"""
+
+# Adds a member to each cached list that exists (never creates partial lists)
+ADD_EDGE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', key, ARGV[1], ARGV[i + 1])
+    end
+end
+return 1
+"""
+ADD_EDGE_SCRIPT_SHA = hashlib.sha1(ADD_EDGE_SCRIPT.encode('utf-8')).hexdigest()
+
+
+def to_millis(value: datetime) -> int:
+    """Epoch milliseconds of a (naive UTC or aware) datetime."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def from_millis(millis: int) -> datetime:
+    """Aware UTC datetime from epoch milliseconds."""
+    return datetime.fromtimestamp(millis / 1000, tz=timezone.utc)
+
+
+def encode_cursor(millis: int, user_id: str) -> str:
+    """Opaque cursor for the position after (millis, user_id)."""
+    return base64.urlsafe_b64encode(json.dumps({'t': millis, 'id': user_id}).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    Decode a list cursor.
+
+    Returns:
+        Tuple of (millis, user_id), or None for the first page (also for
+        malformed or outdated cursors)
+    """
+    if not cursor:
+        return None
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(decoded['t']), str(decoded['id'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class FollowGraphCache:
+    """Valkey sorted-set cache of followers and following lists."""
+
+    KEY_PREFIX = 'social:'
+    # Score 0 member stored in every cached list (never a valid user ID)
+    MARKER = '*'
+
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            ttl: Seconds a cached list is kept
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.ttl = ttl
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def _key(self, direction: str, user_id: str) -> str:
+        return f'{self.KEY_PREFIX}{direction}:{user_id}'
+
+    def store(self, direction: str, user_id: str, edges: Iterable[Tuple[str, int]]) -> None:
+        """
+        Cache a complete list, replacing any cached one.
+
+        Args:
+            direction: FOLLOWERS or FOLLOWING
+            user_id: Owner of the list
+            edges: (other user ID, created_at millis) for every edge
+        """
+        key = self._key(direction, user_id)
+        mapping = {self.MARKER: 0}
+        mapping.update({other_id: millis for other_id, millis in edges})
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.zadd(key, mapping)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Follow graph cache store failed: {e}")
+
+    def page(
+        self,
+        direction: str,
+        user_id: str,
+        after: Optional[Tuple[int, str]],
+        limit: int
+    ) -> Optional[List[Tuple[str, int]]]:
+        """
+        Read up to limit edges of a cached list, newest first.
+
+        Args:
+            direction: FOLLOWERS or FOLLOWING
+            user_id: Owner of the list
+            after: (millis, user_id) position to start after, or None
+            limit: Maximum number of edges
+
+        Returns:
+            List of (other user ID, millis), or None if the list is not cached
+        """
+        key = self._key(direction, user_id)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(key)
+            if after is None:
+                pipe.zrevrangebyscore(key, '+inf', '(0', start=0, num=limit, withscores=True)
+            else:
+                millis, last_id = after
+                # Ties at the cursor's timestamp continue below its user ID
+                pipe.zrevrangebyscore(key, millis, millis, withscores=True)
+                pipe.zrevrangebyscore(key, f'({millis}', '(0', start=0, num=limit, withscores=True)
+            results = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Follow graph cache page failed: {e}")
+            return None
+
+        if not results[0]:
+            return None
+        if after is None:
+            rows = results[1]
+        else:
+            rows = [row for row in results[1] if row[0] < last_id] + results[2]
+        return [(other_id, int(score)) for other_id, score in rows[:limit]]
+
+    def members(self, direction: str, user_id: str) -> Optional[Set[str]]:
+        """
+        All user IDs in a cached list.
+
+        Returns:
+            Set of user IDs, or None if the list is not cached
+        """
+        try:
+            members = self.client.zrange(self._key(direction, user_id), 0, -1)
+        except Exception as e:
+            logger.warning(f"Follow graph cache read failed: {e}")
+            return None
+        if not members:
+            return None
+        return set(members) - {self.MARKER}
+
+    def contains_many(self, direction: str, user_id: str, other_ids: List[str]) -> Optional[Set[str]]:
+        """
+        Which of other_ids are in a cached list.
+
+        Returns:
+            Subset of other_ids present, or None if the list is not cached
+        """
+        key = self._key(direction, user_id)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.zmscore(key, other_ids)
+            exists, scores = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Follow graph cache lookup failed: {e}")
+            return None
+        if not exists:
+            return None
+        return {other_id for other_id, score in zip(other_ids, scores) if score is not None}
+
+    def add_edge(self, follower_id: str, following_id: str, millis: int) -> None:
+        """Add a new follow to both users' cached lists, where cached."""
+        keys = [self._key(FOLLOWING, follower_id), self._key(FOLLOWERS, following_id)]
+        args = [millis, following_id, follower_id]
+        try:
+            try:
+                self.client.evalsha(ADD_EDGE_SCRIPT_SHA, len(keys), *keys, *args)
+            except NoScriptError:
+                self.client.eval(ADD_EDGE_SCRIPT, len(keys), *keys, *args)
+        except Exception as e:
+            logger.warning(f"Follow graph cache add failed: {e}")
+            self.invalidate(follower_id, following_id)
+
+    def remove_edges(self, edges: Iterable[Tuple[str, str]]) -> None:
+        """Remove deleted follows (follower_id, following_id) from cached lists."""
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for follower_id, following_id in edges:
+                pipe.zrem(self._key(FOLLOWING, follower_id), following_id)
+                pipe.zrem(self._key(FOLLOWERS, following_id), follower_id)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Follow graph cache remove failed: {e}")
+            self.invalidate(*{user_id for edge in edges for user_id in edge})
+
+    def invalidate(self, *user_ids: str) -> None:
+        """Drop both cached lists of each user."""
+        keys = [self._key(direction, user_id) for user_id in user_ids for direction in (FOLLOWERS, FOLLOWING)]
+        if not keys:
+            return
+        try:
+            self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Follow graph cache delete failed: {e}")
+
+
+class FollowGraph:
+    """Follow edges, counters and lists on a connected Prisma client."""
+
+    def __init__(self, db, cache: Optional[FollowGraphCache] = None, max_cached: Optional[int] = None):
+        """
+        Initialize the follow graph.
+
+        Args:
+            db: Connected Prisma client
+            cache: Adjacency list cache (defaults to the global one)
+            max_cached: Longest list kept in Valkey (defaults to
+                settings.FOLLOW_GRAPH_CACHE_MAX_SIZE)
+        """
+        self.db = db
+        self.cache = cache or get_follow_graph_cache()
+        self.max_cached = (
+            max_cached if max_cached is not None
+            else getattr(settings, 'FOLLOW_GRAPH_CACHE_MAX_SIZE', 10000)
+        )
+
+    async def follow(self, follower_id: str, following_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Create a follow edge and update both counters in one statement.
+
+        Returns:
+            The new Follow as a dict, or None if it already existed
+        """
+        follow_id = str(uuid.uuid4())
+        # Millisecond precision, as stored (TIMESTAMP(3)) and cached
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        rows = await self.db.query_raw(
+            FOLLOW_SQL,
+            follow_id,
+            follower_id,
+            following_id,
+            now.replace(tzinfo=None).isoformat()
+        )
+        if not rows or not rows[0]['inserted']:
+            return None
+
+        self.cache.add_edge(follower_id, following_id, to_millis(now))
+        return {
+            'id': follow_id,
+            'follower_id': follower_id,
+            'following_id': following_id,
+            'created_at': now,
+        }
+
+    async def unfollow(self, follower_id: str, following_id: str) -> bool:
+        """
+        Delete a follow edge and update both counters in one statement.
+
+        Returns:
+            True if the edge existed
+        """
+        deleted = await self._delete(UNFOLLOW_SQL, follower_id, following_id)
+        return bool(deleted)
+
+    async def remove_between(self, user_a: str, user_b: str) -> int:
+        """
+        Delete follows in both directions between two users (on block).
+
+        Returns:
+            Number of edges deleted
+        """
+        return len(await self._delete(UNFOLLOW_BETWEEN_SQL, user_a, user_b))
+
+    async def remove_all(self, user_id: str) -> int:
+        """
+        Delete every follow to or from a user (on account deletion).
+
+        Returns:
+            Number of edges deleted
+        """
+        deleted = await self._delete(UNFOLLOW_ALL_SQL, user_id)
+        self.cache.invalidate(user_id)
+        return len(deleted)
+
+    async def _delete(self, sql: str, *params: str) -> List[Tuple[str, str]]:
+        rows = await self.db.query_raw(sql, *params)
+        edges = [(row['follower_id'], row['following_id']) for row in rows]
+        if edges:
+            self.cache.remove_edges(edges)
+        return edges
+
+    async def recount(self) -> int:
+        """
+        Repair counters that drifted from the Follow table.
+
+        Returns:
+            Number of profiles corrected
+        """
+        return await self.db.execute_raw(RECOUNT_SQL)
+
+    async def page(
+        self,
+        direction: str,
+        user_id: str,
+        count: int,
+        cursor: Optional[str] = None,
+        page_size: int = 20
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Get one page of a user's followers or following.
+
+        Args:
+            direction: FOLLOWERS or FOLLOWING
+            user_id: Owner of the list
+            count: The list's length from the profile counter (decides
+                whether the list is cached)
+            cursor: Cursor from a previous page's next_cursor
+            page_size: Number of user IDs to return
+
+        Returns:
+            Tuple of (user IDs, next_cursor)
+        """
+        after = decode_cursor(cursor)
+        edges = None
+        if count <= self.max_cached:
+            edges = self.cache.page(direction, user_id, after, page_size + 1)
+            if edges is None:
+                await self._load(direction, user_id)
+                edges = self.cache.page(direction, user_id, after, page_size + 1)
+        if edges is None:
+            edges = await self._page_from_db(direction, user_id, after, page_size + 1)
+
+        next_cursor = None
+        if len(edges) > page_size:
+            edges = edges[:page_size]
+            next_cursor = encode_cursor(edges[-1][1], edges[-1][0])
+        return [other_id for other_id, _ in edges], next_cursor
+
+    async def following_ids(self, user_id: str) -> Set[str]:
+        """
+        Users a user follows (from the cached list when available).
+
+        At most FOLLOW_GRAPH_CACHE_MAX_SIZE + 1 of the most recent follows
+        are returned for users who follow more than that.
+        """
+        members = self.cache.members(FOLLOWING, user_id)
+        if members is not None:
+            return members
+        edges = await self._read_edges(FOLLOWING, user_id, {})
+        if len(edges) <= self.max_cached:
+            self.cache.store(FOLLOWING, user_id, edges)
+        return {other_id for other_id, _ in edges}
+
+    async def follower_batches(self, user_id: str, batch_size: int = 1000) -> AsyncIterator[List[str]]:
+        """
+        Yield every follower ID of a user, in batches.
+
+        Served from the cached list when available, otherwise read from the
+        database in follower ID order.
+        """
+        members = self.cache.members(FOLLOWERS, user_id)
+        if members is not None:
+            members = sorted(members)
+            for start in range(0, len(members), batch_size):
+                yield members[start:start + batch_size]
+            return
+
+        last_id = None
+        while True:
+            where: Dict[str, Any] = {'following_id': user_id}
+            if last_id is not None:
+                where['follower_id'] = {'gt': last_id}
+            follows = await self.db.follow.find_many(
+                where=where,
+                order={'follower_id': 'asc'},
+                take=batch_size
+            )
+            if not follows:
+                return
+            yield [follow.follower_id for follow in follows]
+            if len(follows) < batch_size:
+                return
+            last_id = follows[-1].follower_id
+
+    async def is_following_many(self, viewer_id: Optional[str], user_ids: Iterable[str]) -> Set[str]:
+        """
+        Which of user_ids the viewer follows.
+
+        Args:
+            viewer_id: Requesting user's profile ID (None for anonymous)
+            user_ids: IDs rendered on the current page
+
+        Returns:
+            Subset of user_ids followed by the viewer
+        """
+        user_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        if not viewer_id or not user_ids:
+            return set()
+
+        followed = self.cache.contains_many(FOLLOWING, viewer_id, user_ids)
+        if followed is not None:
+            return followed
+
+        follows = await self.db.follow.find_many(
+            where={'follower_id': viewer_id, 'following_id': {'in': user_ids}}
+        )
+        return {follow.following_id for follow in follows}
+
+    async def _load(self, direction: str, user_id: str) -> None:
+        edges = await self._read_edges(direction, user_id, {})
+        if len(edges) <= self.max_cached:
+            self.cache.store(direction, user_id, edges)
+
+    async def _page_from_db(
+        self,
+        direction: str,
+        user_id: str,
+        after: Optional[Tuple[int, str]],
+        limit: int
+    ) -> List[Tuple[str, int]]:
+        other_field = 'follower_id' if direction == FOLLOWERS else 'following_id'
+        where: Dict[str, Any] = {}
+        if after is not None:
+            millis, last_id = after
+            created_at = from_millis(millis)
+            where['OR'] = [
+                {'created_at': {'lt': created_at}},
+                {'created_at': created_at, other_field: {'lt': last_id}},
+            ]
+        return await self._read_edges(direction, user_id, where, take=limit)
+
+    async def _read_edges(
+        self,
+        direction: str,
+        user_id: str,
+        where: Dict[str, Any],
+        take: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        owner_field, other_field = (
+            ('following_id', 'follower_id') if direction == FOLLOWERS
+            else ('follower_id', 'following_id')
+        )
+        follows = await self.db.follow.find_many(
+            where={owner_field: user_id, **where},
+            order=[{'created_at': 'desc'}, {other_field: 'desc'}],
+            take=take if take is not None else self.max_cached + 1
+        )
+        return [(getattr(follow, other_field), to_millis(follow.created_at)) for follow in follows]
+
+
+async def load_profiles(db, user_ids: List[str]) -> List[Any]:
+    """
+    Fetch profiles in one query, in the order of user_ids.
+
+    IDs without a profile are skipped.
+    """
+    if not user_ids:
+        return []
+    profiles = await db.userprofile.find_many(where={'id': {'in': user_ids}})
+    by_id = {profile.id: profile for profile in profiles}
+    return [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+
+# Global instance
+_follow_graph_cache: Optional[FollowGraphCache] = None
+
+
+def get_follow_graph_cache() -> FollowGraphCache:
+    """
+    Get the process-wide follow graph cache.
+
+    Returns:
+        Global FollowGraphCache instance
+    """
+    global _follow_graph_cache
+    if _follow_graph_cache is None:
+        _follow_graph_cache = FollowGraphCache(
+            ttl=getattr(settings, 'FOLLOW_GRAPH_CACHE_TTL', 3600)
+        )
+    return _follow_graph_cache
+
+
+def reset_follow_graph_cache() -> None:
+    """
+    Reset the global follow graph cache.
+
+    Useful for testing.
+    """
+    global _follow_graph_cache
+    _follow_graph_cache = None
@@ -1,5 +1,24 @@
 """Serializers for social features (follow/block)."""
 from rest_framework import serializers
+from apps.stories.serializers import ChapterListSerializer
+from apps.whispers.serializers import WhisperSerializer
+
+
+class FollowStateMixin:
+    """
+    Adds is_following: whether the requesting user follows the listed user.
+    
+    Views resolve the whole page at once (FollowGraph.is_following_many) and
+    pass the result as context['following_ids']; it is None for anonymous
+    requests, which render is_following as null.
+    """
+    
+    def get_is_following(self, obj):
+        following_ids = self.context.get('following_ids')
+        if following_ids is None:
+            return None
+        user_id = obj.get('id') if isinstance(obj, dict) else obj.id
+        return user_id in following_ids
 
 
 class FollowSerializer(serializers.Serializer):
@@ -18,11 +37,12 @@ class FollowSerializer(serializers.Serializer):
     created_at = serializers.DateTimeField(read_only=True)
 
 
-class FollowerListSerializer(serializers.Serializer):
+class FollowerListSerializer(FollowStateMixin, serializers.Serializer):
     """
     Serializer for listing followers (returns user profile info).
     
-    Returns: User profile information for each follower
+    Returns: User profile information for each follower, with whether the
+    requesting user follows them
     
     Requirements:
         - 11.1: List followers for a user
@@ -32,13 +52,16 @@ class FollowerListSerializer(serializers.Serializer):
     display_name = serializers.CharField(read_only=True)
     avatar_key = serializers.CharField(read_only=True, allow_null=True)
     created_at = serializers.DateTimeField(read_only=True)
+    follower_count = serializers.IntegerField(read_only=True)
+    is_following = serializers.SerializerMethodField()
 
 
-class FollowingListSerializer(serializers.Serializer):
+class FollowingListSerializer(FollowStateMixin, serializers.Serializer):
     """
     Serializer for listing following (returns user profile info).
     
-    Returns: User profile information for each followed user
+    Returns: User profile information for each followed user, with whether
+    the requesting user follows them
     
     Requirements:
         - 11.1: List following for a user
@@ -48,6 +71,8 @@ class FollowingListSerializer(serializers.Serializer):
     display_name = serializers.CharField(read_only=True)
     avatar_key = serializers.CharField(read_only=True, allow_null=True)
     created_at = serializers.DateTimeField(read_only=True)
+    follower_count = serializers.IntegerField(read_only=True)
+    is_following = serializers.SerializerMethodField()
 
 
 class BlockSerializer(serializers.Serializer):
@@ -64,3 +89,27 @@ class BlockSerializer(serializers.Serializer):
     blocker_id = serializers.CharField(read_only=True)
     blocked_id = serializers.CharField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
+
+
+class TimelineItemSerializer(serializers.Serializer):
+    """
+    Serializer for home timeline items (HomeTimeline.page).
+    
+    Returns: type ('chapter' or 'whisper'), published_at, and the chapter
+    (with its story's id, slug and title) or whisper under data
+    """
+    type = serializers.CharField(read_only=True)
+    published_at = serializers.DateTimeField(read_only=True)
+    data = serializers.SerializerMethodField()
+    
+    def get_data(self, obj):
+        item = obj['item']
+        if obj['type'] == 'whisper':
+            return WhisperSerializer(item, context=self.context).data
+        data = dict(ChapterListSerializer(item, context=self.context).data)
+        data['story'] = {
+            'id': item.story.id,
+            'slug': item.story.slug,
+            'title': item.story.title,
+        }
+        return data
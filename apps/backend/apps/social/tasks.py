@@ -0,0 +1,55 @@
+"""Celery tasks for social features."""
+import logging
+
+from celery import shared_task
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+from .follow_graph import FollowGraph
+from .timeline import HomeTimeline, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def recount_follow_counters():
+    """
+    Repair UserProfile follower/following counters that drifted from Follow.
+    
+    The counters are updated with every follow and unfollow; this daily pass
+    only corrects rows changed outside those paths (e.g. manual data fixes).
+    """
+    async def _recount():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await FollowGraph(db).recount()
+        finally:
+            await db.disconnect()
+    
+    corrected = run_async(_recount(), timeout=None)
+    if corrected:
+        logger.warning(f"Corrected follow counters for {corrected} profiles")
+
+
+@shared_task(ignore_result=True)
+def fan_out_timeline_entry(content_type, content_id, author_id, millis):
+    """
+    Add a newly published chapter or whisper to the author's followers' timelines.
+    
+    Scheduled by schedule_timeline_fanout; authors above
+    TIMELINE_FANOUT_MAX_FOLLOWERS only get the entry in their outbox.
+    """
+    entry = TimelineEntry(content_type, content_id, author_id, int(millis))
+    
+    async def _fan_out():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await HomeTimeline(db).fan_out(entry)
+        finally:
+            await db.disconnect()
+    
+    fanned_out = run_async(_fan_out(), timeout=None)
+    logger.debug(f"Fanned out {content_type} {content_id} to {fanned_out} timelines")
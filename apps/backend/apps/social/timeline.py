@@ -0,0 +1,457 @@
+"""
+Home timeline: new chapters and whispers from the authors a user follows.
+
+Entries are precomputed per reader (fan-out-on-write). When a chapter is
+first published or a whisper is posted, fan_out_timeline_entry (Celery)
+adds it to the timeline of every follower: a Valkey sorted set
+(social:timeline:<user_id>) scored by publication time in milliseconds,
+with members '<type>:<content_id>:<author_id>', trimmed to the newest
+TIMELINE_MAX_LENGTH entries. Like the follow graph lists, a timeline holds
+a score 0 marker and is only ever updated in place: it is built from the
+database on its owner's first read and expires after TIMELINE_TTL, so
+readers who never open the timeline cost no memory.
+
+Authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers are not
+fanned out (fan-out-on-read). Their entries are kept once, in their own
+outbox (social:outbox:<author_id>), and merged into each follower's
+timeline page when it is read.
+
+Pages are ordered newest first with the same cursor format as the follow
+graph lists; blocked and shadowbanned authors are dropped before the
+page's chapters and whispers are loaded (two queries per page).
+"""
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import redis
+from django.conf import settings
+from redis.exceptions import NoScriptError
+
+from infrastructure.content_filter_utils import FeedVisibility, fetch_visible_page
+from .follow_graph import FollowGraph, decode_cursor, encode_cursor, from_millis, to_millis
+
+logger = logging.getLogger(__name__)
+
+
+CHAPTER = 'chapter'
+WHISPER = 'whisper'
+
+# Adds an entry to each timeline that exists and trims it to ARGV[3]
+# entries (rank 0 is the marker, which is never trimmed)
+ADD_ENTRY_SCRIPT = """
+local cap = tonumber(ARGV[3])
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', key, ARGV[1], ARGV[2])
+        local extra = redis.call('ZCARD', key) - 1 - cap
+        if extra > 0 then
+            redis.call('ZREMRANGEBYRANK', key, 1, extra)
+        end
+    end
+end
+return 1
+"""
+ADD_ENTRY_SCRIPT_SHA = hashlib.sha1(ADD_ENTRY_SCRIPT.encode('utf-8')).hexdigest()
+
+
+@dataclass(frozen=True)
+class TimelineEntry:
+    """One timeline position; id is the cursor for the position after it."""
+    content_type: str
+    content_id: str
+    author_id: str
+    millis: int
+
+    @property
+    def member(self) -> str:
+        return f'{self.content_type}:{self.content_id}:{self.author_id}'
+
+    @property
+    def id(self) -> str:
+        return encode_cursor(self.millis, self.member)
+
+    @classmethod
+    def from_member(cls, member: str, millis: int) -> Optional['TimelineEntry']:
+        parts = member.split(':', 2)
+        if len(parts) != 3:
+            return None
+        return cls(parts[0], parts[1], parts[2], millis)
+
+
+class TimelineCache:
+    """Valkey sorted sets holding timelines and fan-out-on-read outboxes."""
+
+    TIMELINE_PREFIX = 'social:timeline:'
+    OUTBOX_PREFIX = 'social:outbox:'
+    # Score 0 member stored in every timeline (never a valid entry)
+    MARKER = '*'
+
+    def __init__(self, redis_url: Optional[str] = None, ttl: int = 86400, max_length: int = 500):
+        """
+        Initialize the cache.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+            ttl: Seconds a timeline is kept after it was built
+            max_length: Entries kept per timeline
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self.ttl = ttl
+        self.max_length = max_length
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def timeline_key(self, user_id: str) -> str:
+        return f'{self.TIMELINE_PREFIX}{user_id}'
+
+    def outbox_key(self, author_id: str) -> str:
+        return f'{self.OUTBOX_PREFIX}{author_id}'
+
+    def store(self, key: str, entries: Iterable[TimelineEntry]) -> None:
+        """Cache a complete timeline (newest max_length entries), replacing any cached one."""
+        mapping = {self.MARKER: 0}
+        mapping.update({entry.member: entry.millis for entry in _newest(entries, None, self.max_length)})
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.zadd(key, mapping)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Timeline cache store failed: {e}")
+
+    def page_many(
+        self,
+        keys: List[str],
+        after: Optional[Tuple[int, str]],
+        limit: int
+    ) -> List[Optional[List[TimelineEntry]]]:
+        """
+        Read up to limit entries of each timeline, newest first, in one round trip.
+
+        Args:
+            keys: Timeline or outbox keys
+            after: (millis, member) position to start after, or None
+            limit: Maximum number of entries per key
+
+        Returns:
+            Per key, a list of entries, or None if the key is not cached
+            (None for every key when Valkey is unavailable)
+        """
+        if not keys:
+            return []
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+                if after is None:
+                    pipe.zrevrangebyscore(key, '+inf', '(0', start=0, num=limit, withscores=True)
+                else:
+                    millis, last_member = after
+                    # Ties at the cursor's timestamp continue below its member
+                    pipe.zrevrangebyscore(key, millis, millis, withscores=True)
+                    pipe.zrevrangebyscore(key, f'({millis}', '(0', start=0, num=limit, withscores=True)
+            results = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Timeline cache page failed: {e}")
+            return [None] * len(keys)
+
+        step = 2 if after is None else 3
+        pages: List[Optional[List[TimelineEntry]]] = []
+        for i in range(len(keys)):
+            chunk = results[i * step:(i + 1) * step]
+            if not chunk[0]:
+                pages.append(None)
+                continue
+            rows = chunk[1] if after is None else [row for row in chunk[1] if row[0] < last_member] + chunk[2]
+            entries = (TimelineEntry.from_member(member, int(score)) for member, score in rows[:limit])
+            pages.append([entry for entry in entries if entry is not None])
+        return pages
+
+    def add(self, keys: List[str], entry: TimelineEntry) -> None:
+        """Add an entry to each of keys that is cached, keeping the newest max_length."""
+        if not keys:
+            return
+        args = [entry.millis, entry.member, self.max_length]
+        try:
+            try:
+                self.client.evalsha(ADD_ENTRY_SCRIPT_SHA, len(keys), *keys, *args)
+            except NoScriptError:
+                self.client.eval(ADD_ENTRY_SCRIPT, len(keys), *keys, *args)
+        except Exception as e:
+            logger.warning(f"Timeline cache add failed: {e}")
+
+    def invalidate(self, *user_ids: str) -> None:
+        """Drop the timelines of the given users (rebuilt on their next read)."""
+        keys = [self.timeline_key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        try:
+            self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Timeline cache delete failed: {e}")
+
+
+# Process-local set of fan-out-on-read authors, refreshed periodically
+_fanout_on_read_ids: Optional[FrozenSet[str]] = None
+_fanout_on_read_expires = 0.0
+
+
+async def get_fanout_on_read_author_ids(db) -> FrozenSet[str]:
+    """
+    IDs of authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers.
+
+    Cached per process for TIMELINE_FANOUT_AUTHORS_TTL seconds.
+    """
+    global _fanout_on_read_ids, _fanout_on_read_expires
+    now = time.monotonic()
+    if _fanout_on_read_ids is not None and now < _fanout_on_read_expires:
+        return _fanout_on_read_ids
+
+    threshold = getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 10000)
+    profiles = await db.userprofile.find_many(where={'follower_count': {'gt': threshold}})
+    _fanout_on_read_ids = frozenset(profile.id for profile in profiles)
+    _fanout_on_read_expires = now + getattr(settings, 'TIMELINE_FANOUT_AUTHORS_TTL', 300)
+    return _fanout_on_read_ids
+
+
+def reset_fanout_on_read_author_ids() -> None:
+    """
+    Clear the cached fan-out-on-read author set.
+
+    Useful for testing.
+    """
+    global _fanout_on_read_ids, _fanout_on_read_expires
+    _fanout_on_read_ids = None
+    _fanout_on_read_expires = 0.0
+
+
+class HomeTimeline:
+    """Timeline fan-out and reads on a connected Prisma client."""
+
+    def __init__(self, db, cache: Optional[TimelineCache] = None):
+        """
+        Initialize the timeline.
+
+        Args:
+            db: Connected Prisma client
+            cache: Timeline cache (defaults to the global one)
+        """
+        self.db = db
+        self.cache = cache or get_timeline_cache()
+        self.max_followers = getattr(settings, 'TIMELINE_FANOUT_MAX_FOLLOWERS', 10000)
+        self.batch_size = getattr(settings, 'TIMELINE_FANOUT_BATCH_SIZE', 1000)
+
+    async def fan_out(self, entry: TimelineEntry) -> int:
+        """
+        Add a new entry to the author's outbox and their followers' timelines.
+
+        Followers of fan-out-on-read authors are skipped; the entry reaches
+        them through the outbox.
+
+        Returns:
+            Number of followers fanned out to
+        """
+        self.cache.add([self.cache.outbox_key(entry.author_id)], entry)
+
+        author = await self.db.userprofile.find_unique(where={'id': entry.author_id})
+        if author is None or author.follower_count > self.max_followers:
+            return 0
+
+        fanned_out = 0
+        async for follower_ids in FollowGraph(self.db).follower_batches(entry.author_id, self.batch_size):
+            self.cache.add([self.cache.timeline_key(user_id) for user_id in follower_ids], entry)
+            fanned_out += len(follower_ids)
+        return fanned_out
+
+    async def page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        visibility: Optional[FeedVisibility] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of a user's timeline.
+
+        Args:
+            user_id: Reader's profile ID
+            cursor: Cursor from a previous page's next_cursor
+            page_size: Number of entries to return
+            visibility: Authors hidden from the reader (loaded when omitted)
+
+        Returns:
+            Tuple of (items, next_cursor); each item is
+            {'type', 'published_at', 'item'} with the Chapter (story
+            included) or Whisper
+        """
+        if visibility is None:
+            visibility = await FeedVisibility.for_viewer(user_id)
+
+        following = await FollowGraph(self.db).following_ids(user_id)
+        pulled = following & await get_fanout_on_read_author_ids(self.db)
+        pushed = following - pulled
+
+        async def fetch_batch(after_id: Optional[str], take: int) -> List[TimelineEntry]:
+            return await self._read(user_id, pushed, pulled, decode_cursor(after_id), take)
+
+        entries, next_cursor = await fetch_visible_page(
+            fetch_batch,
+            page_size,
+            visibility,
+            lambda entry: entry.author_id,
+            cursor
+        )
+        return await self._hydrate(entries), next_cursor
+
+    async def _read(
+        self,
+        user_id: str,
+        pushed: Set[str],
+        pulled: Set[str],
+        after: Optional[Tuple[int, str]],
+        limit: int
+    ) -> List[TimelineEntry]:
+        """Merge the user's timeline with the outboxes of followed fan-out-on-read authors."""
+        pulled = sorted(pulled)
+        keys = [self.cache.timeline_key(user_id)] + [self.cache.outbox_key(author_id) for author_id in pulled]
+        pages = self.cache.page_many(keys, after, limit)
+
+        # Build whatever is missing from the database and read it back
+        # (sliced locally when Valkey is unavailable)
+        built = {}
+        for i, page in enumerate(pages):
+            if page is None:
+                built[i] = await self._recent_entries(pushed if i == 0 else {pulled[i - 1]})
+                self.cache.store(keys[i], built[i])
+        if built:
+            reread = self.cache.page_many([keys[i] for i in built], after, limit)
+            for i, page in zip(built, reread):
+                pages[i] = page if page is not None else _newest(built[i], after, limit)
+
+        merged = {entry.member: entry for page in pages for entry in page}
+        return _newest(merged.values(), after, limit)
+
+    async def _recent_entries(self, author_ids: Iterable[str]) -> List[TimelineEntry]:
+        """The newest chapters and whispers of the given authors, from the database."""
+        author_ids = list(author_ids)
+        if not author_ids:
+            return []
+
+        chapters = await self.db.chapter.find_many(
+            where={
+                'published': True,
+                'deleted_at': None,
+                'story': {'is': {'author_id': {'in': author_ids}, 'published': True, 'deleted_at': None}},
+            },
+            include={'story': True},
+            order={'published_at': 'desc'},
+            take=self.cache.max_length
+        )
+        whispers = await self.db.whisper.find_many(
+            where={'user_id': {'in': author_ids}, 'parent_id': None, 'deleted_at': None},
+            order={'created_at': 'desc'},
+            take=self.cache.max_length
+        )
+        entries = [
+            TimelineEntry(CHAPTER, chapter.id, chapter.story.author_id, to_millis(chapter.published_at))
+            for chapter in chapters if chapter.published_at
+        ]
+        entries.extend(
+            TimelineEntry(WHISPER, whisper.id, whisper.user_id, to_millis(whisper.created_at))
+            for whisper in whispers
+        )
+        return entries
+
+    async def _hydrate(self, entries: List[TimelineEntry]) -> List[Dict[str, Any]]:
+        """Load a page's chapters and whispers; deleted or unpublished content is skipped."""
+        chapter_ids = [entry.content_id for entry in entries if entry.content_type == CHAPTER]
+        whisper_ids = [entry.content_id for entry in entries if entry.content_type == WHISPER]
+
+        chapters = {}
+        if chapter_ids:
+            rows = await self.db.chapter.find_many(
+                where={'id': {'in': chapter_ids}, 'published': True, 'deleted_at': None},
+                include={'story': True}
+            )
+            chapters = {row.id: row for row in rows if row.story.published and not row.story.deleted_at}
+        whispers = {}
+        if whisper_ids:
+            rows = await self.db.whisper.find_many(
+                where={'id': {'in': whisper_ids}, 'deleted_at': None}
+            )
+            whispers = {row.id: row for row in rows}
+
+        items = []
+        for entry in entries:
+            item = (chapters if entry.content_type == CHAPTER else whispers).get(entry.content_id)
+            if item is not None:
+                items.append({
+                    'type': entry.content_type,
+                    'published_at': from_millis(entry.millis),
+                    'item': item,
+                })
+        return items
+
+
+def _newest(entries: Iterable[TimelineEntry], after: Optional[Tuple[int, str]], limit: int) -> List[TimelineEntry]:
+    """Up to limit entries after the cursor position, newest first."""
+    entries = sorted(entries, key=lambda entry: (entry.millis, entry.member), reverse=True)
+    if after is not None:
+        entries = [entry for entry in entries if (entry.millis, entry.member) < after]
+    return entries[:limit]
+
+
+def schedule_timeline_fanout(content_type: str, content_id: str, author_id: str, published_at: datetime) -> None:
+    """
+    Queue a new chapter or whisper for fan-out to the author's followers.
+
+    A broker outage only delays the entry until the affected timelines are
+    rebuilt; it never fails the write.
+    """
+    from .tasks import fan_out_timeline_entry
+    try:
+        fan_out_timeline_entry.delay(content_type, content_id, author_id, to_millis(published_at))
+    except Exception as e:
+        logger.warning(f"Could not schedule timeline fan-out for {content_type} {content_id}: {e}")
+
+
+# Global instance
+_timeline_cache: Optional[TimelineCache] = None
+
+
+def get_timeline_cache() -> TimelineCache:
+    """
+    Get the process-wide timeline cache.
+
+    Returns:
+        Global TimelineCache instance
+    """
+    global _timeline_cache
+    if _timeline_cache is None:
+        _timeline_cache = TimelineCache(
+            ttl=getattr(settings, 'TIMELINE_TTL', 86400),
+            max_length=getattr(settings, 'TIMELINE_MAX_LENGTH', 500)
+        )
+    return _timeline_cache
+
+
+def reset_timeline_cache() -> None:
+    """
+    Reset the global timeline cache.
+
+    Useful for testing.
+    """
+    global _timeline_cache
+    _timeline_cache = None
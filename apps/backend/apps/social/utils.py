@@ -1,50 +1,58 @@
 """Utility functions for social features."""
-from prisma import Prisma
+from typing import FrozenSet
 
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
+from .block_cache import get_blocked_user_cache
 
-async def get_blocked_user_ids(user_id: str):
+
+async def get_blocked_user_ids(user_id: str) -> FrozenSet[str]:
     """
-    Get list of user IDs that the given user has blocked.
-    
+    Get the IDs of users that the given user has blocked.
+
+    Served from the blocked set cache; on a miss the Block table is read
+    and the result cached.
+
     Args:
         user_id: ID of the user
-        
+
     Returns:
-        List of blocked user IDs
-        
+        Set of blocked user IDs
+
     Requirements:
         - 11.5: Exclude blocked users from content feeds
         - 11.6: Exclude blocked users from search results
     """
-    db = Prisma()
+    block_cache = get_blocked_user_cache()
+    cached = block_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    db = get_prisma()
     await db.connect()
-    
+
     try:
         blocks = await db.block.find_many(
             where={'blocker_id': user_id},
             select={'blocked_id': True}
         )
-        
-        blocked_ids = [b.blocked_id for b in blocks]
-        
+
+        blocked_ids = frozenset(b.blocked_id for b in blocks)
+
         await db.disconnect()
-        return blocked_ids
-        
+
     except Exception:
         await db.disconnect()
-        return []
+        return frozenset()
+
+    block_cache.set(user_id, blocked_ids)
+    return blocked_ids
 
 
-def sync_get_blocked_user_ids(user_id: str):
+def sync_get_blocked_user_ids(user_id: str) -> FrozenSet[str]:
     """Synchronous wrapper for get_blocked_user_ids."""
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import nest_asyncio
-            nest_asyncio.apply()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(get_blocked_user_ids(user_id))
+    # Cache hits need no event loop
+    cached = get_blocked_user_cache().get(user_id)
+    if cached is not None:
+        return cached
+    return run_async(get_blocked_user_ids(user_id))
@@ -2,56 +2,60 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from apps.core.pagination import CursorPagination
 from .serializers import (
     FollowSerializer,
     FollowerListSerializer,
     FollowingListSerializer,
-    BlockSerializer
+    BlockSerializer,
+    TimelineItemSerializer
 )
 from apps.notifications.views import sync_create_notification
-
-
-def _run_async(coro):
-    """Run an async coroutine in an isolated event loop."""
-    import asyncio
-
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
+from .block_cache import get_blocked_user_cache
+from .follow_graph import FOLLOWERS, FOLLOWING, FollowGraph, load_profiles
+from .timeline import HomeTimeline, get_timeline_cache
 
 
 def sync_follow_user(follower_id: str, following_id: str):
     """Synchronous wrapper for follow_user."""
-    return _run_async(follow_user(follower_id, following_id))
+    return run_async(follow_user(follower_id, following_id))
 
 
 def sync_unfollow_user(follower_id: str, following_id: str):
     """Synchronous wrapper for unfollow_user."""
-    return _run_async(unfollow_user(follower_id, following_id))
+    return run_async(unfollow_user(follower_id, following_id))
 
 
 def sync_get_followers(user_id: str, cursor: str = None, page_size: int = 20):
     """Synchronous wrapper for get_followers."""
-    return _run_async(get_followers(user_id, cursor, page_size))
+    return run_async(get_followers(user_id, cursor, page_size))
 
 
 def sync_get_following(user_id: str, cursor: str = None, page_size: int = 20):
     """Synchronous wrapper for get_following."""
-    return _run_async(get_following(user_id, cursor, page_size))
+    return run_async(get_following(user_id, cursor, page_size))
+
+
+def sync_get_following_ids(viewer_id, user_ids):
+    """Synchronous wrapper for get_following_ids."""
+    return run_async(get_following_ids(viewer_id, user_ids))
+
+
+def sync_get_home_timeline(user_id: str, cursor: str = None, page_size: int = 20):
+    """Synchronous wrapper for get_home_timeline."""
+    return run_async(get_home_timeline(user_id, cursor, page_size))
 
 
 def sync_block_user(blocker_id: str, blocked_id: str):
     """Synchronous wrapper for block_user."""
-    return _run_async(block_user(blocker_id, blocked_id))
+    return run_async(block_user(blocker_id, blocked_id))
 
 
 def sync_unblock_user(blocker_id: str, blocked_id: str):
     """Synchronous wrapper for unblock_user."""
-    return _run_async(unblock_user(blocker_id, blocked_id))
+    return run_async(unblock_user(blocker_id, blocked_id))
 
 
 @api_view(['POST', 'DELETE'])
@@ -146,7 +150,18 @@ def followers(request, id):
         )
     
     followers_list, next_cursor = result
-    serializer = FollowerListSerializer(followers_list, many=True)
+    
+    # Resolve "followed by me" for the whole page at once
+    viewer = getattr(request, 'user_profile', None)
+    following_ids = sync_get_following_ids(
+        viewer.id if viewer else None,
+        [profile.id for profile in followers_list]
+    )
+    serializer = FollowerListSerializer(
+        followers_list,
+        many=True,
+        context={'following_ids': following_ids if viewer else None}
+    )
     
     return Response({
         'data': serializer.data,
@@ -174,7 +189,46 @@ def following(request, id):
         )
     
     following_list, next_cursor = result
-    serializer = FollowingListSerializer(following_list, many=True)
+    
+    # Resolve "followed by me" for the whole page at once
+    viewer = getattr(request, 'user_profile', None)
+    following_ids = sync_get_following_ids(
+        viewer.id if viewer else None,
+        [profile.id for profile in following_list]
+    )
+    serializer = FollowingListSerializer(
+        following_list,
+        many=True,
+        context={'following_ids': following_ids if viewer else None}
+    )
+    
+    return Response({
+        'data': serializer.data,
+        'next_cursor': next_cursor
+    })
+
+
+@api_view(['GET'])
+def home_timeline(request):
+    """
+    GET /v1/timeline - New chapters and whispers from followed authors
+    
+    Query parameters:
+        - cursor: Pagination cursor
+        - page_size: Number of results (default 20, max 100)
+    """
+    if not request.clerk_user_id or not request.user_profile:
+        return Response(
+            {'error': {'code': 'UNAUTHORIZED', 'message': 'Authentication required'}},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    cursor = request.query_params.get('cursor')
+    page_size = min(int(request.query_params.get('page_size', 20)), 100)
+    
+    items, next_cursor = sync_get_home_timeline(request.user_profile.id, cursor, page_size)
+    
+    serializer = TimelineItemSerializer(items, many=True, context={'request': request})
     
     return Response({
         'data': serializer.data,
@@ -256,7 +310,7 @@ async def follow_user(follower_id: str, following_id: str):
         - 11.7: Prevent following blocked users
         - 11.8: Prevent duplicate follows
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -281,27 +335,15 @@ async def follow_user(follower_id: str, following_id: str):
             await db.disconnect()
             return 'blocked'
         
-        # Check for duplicate follow
-        existing_follow = await db.follow.find_first(
-            where={
-                'follower_id': follower_id,
-                'following_id': following_id
-            }
-        )
-        
-        if existing_follow:
-            await db.disconnect()
-            return 'duplicate'
-        
-        # Create follow relationship
-        follow = await db.follow.create(
-            data={
-                'follower_id': follower_id,
-                'following_id': following_id
-            }
-        )
+        # Create follow relationship and update both counters
+        # (None if the follow already exists)
+        follow = await FollowGraph(db).follow(follower_id, following_id)
         
         await db.disconnect()
+        if follow is None:
+            return 'duplicate'
+        # Rebuilt with the new author's entries on the next read
+        get_timeline_cache().invalidate(follower_id)
         return follow
         
     except Exception as e:
@@ -323,28 +365,17 @@ async def unfollow_user(follower_id: str, following_id: str):
     Requirements:
         - 11.2: Delete Follow record
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
-        # Find and delete follow relationship
-        follow = await db.follow.find_first(
-            where={
-                'follower_id': follower_id,
-                'following_id': following_id
-            }
-        )
-        
-        if not follow:
-            await db.disconnect()
-            return False
-        
-        await db.follow.delete(
-            where={'id': follow.id}
-        )
+        # Delete follow relationship and update both counters
+        deleted = await FollowGraph(db).unfollow(follower_id, following_id)
         
         await db.disconnect()
-        return True
+        if deleted:
+            get_timeline_cache().invalidate(follower_id)
+        return deleted
         
     except Exception:
         await db.disconnect()
@@ -366,7 +397,7 @@ async def get_followers(user_id: str, cursor: str = None, page_size: int = 20):
     Requirements:
         - 11.1: List followers with pagination
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -379,41 +410,12 @@ async def get_followers(user_id: str, cursor: str = None, page_size: int = 20):
             await db.disconnect()
             return None
         
-        # Build query
-        where_clause = {'following_id': user_id}
-        
-        # Apply cursor if provided
-        if cursor:
-            import json
-            import base64
-            decoded = json.loads(base64.b64decode(cursor))
-            where_clause['id'] = {'lt': decoded['id']}
-        
-        # Fetch followers with one extra to check if there are more
-        follows = await db.follow.find_many(
-            where=where_clause,
-            include={'follower': True},
-            order={'id': 'desc'},
-            take=page_size + 1
+        # Page the cached adjacency list, then load the page's profiles
+        graph = FollowGraph(db)
+        user_ids, next_cursor = await graph.page(
+            FOLLOWERS, user_id, user.follower_count, cursor, page_size
         )
-        
-        # Check if there are more results
-        has_next = len(follows) > page_size
-        if has_next:
-            follows = follows[:-1]
-        
-        # Extract follower profiles
-        followers = [f.follower for f in follows]
-        
-        # Generate next cursor
-        next_cursor = None
-        if has_next and follows:
-            import json
-            import base64
-            last_follow = follows[-1]
-            next_cursor = base64.b64encode(
-                json.dumps({'id': last_follow.id}).encode()
-            ).decode()
+        followers = await load_profiles(db, user_ids)
         
         await db.disconnect()
         return (followers, next_cursor)
@@ -438,7 +440,7 @@ async def get_following(user_id: str, cursor: str = None, page_size: int = 20):
     Requirements:
         - 11.1: List following with pagination
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -451,41 +453,12 @@ async def get_following(user_id: str, cursor: str = None, page_size: int = 20):
             await db.disconnect()
             return None
         
-        # Build query
-        where_clause = {'follower_id': user_id}
-        
-        # Apply cursor if provided
-        if cursor:
-            import json
-            import base64
-            decoded = json.loads(base64.b64decode(cursor))
-            where_clause['id'] = {'lt': decoded['id']}
-        
-        # Fetch following with one extra to check if there are more
-        follows = await db.follow.find_many(
-            where=where_clause,
-            include={'following': True},
-            order={'id': 'desc'},
-            take=page_size + 1
+        # Page the cached adjacency list, then load the page's profiles
+        graph = FollowGraph(db)
+        user_ids, next_cursor = await graph.page(
+            FOLLOWING, user_id, user.following_count, cursor, page_size
         )
-        
-        # Check if there are more results
-        has_next = len(follows) > page_size
-        if has_next:
-            follows = follows[:-1]
-        
-        # Extract following profiles
-        following = [f.following for f in follows]
-        
-        # Generate next cursor
-        next_cursor = None
-        if has_next and follows:
-            import json
-            import base64
-            last_follow = follows[-1]
-            next_cursor = base64.b64encode(
-                json.dumps({'id': last_follow.id}).encode()
-            ).decode()
+        following = await load_profiles(db, user_ids)
         
         await db.disconnect()
         return (following, next_cursor)
@@ -510,7 +483,7 @@ async def block_user(blocker_id: str, blocked_id: str):
         - 11.3: Create Block record
         - 11.9: Remove follow relationship on block
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -536,14 +509,8 @@ async def block_user(blocker_id: str, blocked_id: str):
             return 'duplicate'
         
         # Remove any existing follow relationships (both directions)
-        await db.follow.delete_many(
-            where={
-                'OR': [
-                    {'follower_id': blocker_id, 'following_id': blocked_id},
-                    {'follower_id': blocked_id, 'following_id': blocker_id}
-                ]
-            }
-        )
+        if await FollowGraph(db).remove_between(blocker_id, blocked_id):
+            get_timeline_cache().invalidate(blocker_id, blocked_id)
         
         # Create block relationship
         block = await db.block.create(
@@ -554,6 +521,7 @@ async def block_user(blocker_id: str, blocked_id: str):
         )
         
         await db.disconnect()
+        get_blocked_user_cache().invalidate(blocker_id)
         return block
         
     except Exception as e:
@@ -575,7 +543,7 @@ async def unblock_user(blocker_id: str, blocked_id: str):
     Requirements:
         - 11.4: Delete Block record
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -596,8 +564,53 @@ async def unblock_user(blocker_id: str, blocked_id: str):
         )
         
         await db.disconnect()
+        get_blocked_user_cache().invalidate(blocker_id)
         return True
         
     except Exception:
         await db.disconnect()
         return False
+
+
+async def get_following_ids(viewer_id, user_ids):
+    """
+    Get which of the given users the viewer follows.
+    
+    Args:
+        viewer_id: ID of the requesting user (None for anonymous)
+        user_ids: IDs of the users on the current page
+        
+    Returns:
+        Set of followed user IDs
+    """
+    if not viewer_id or not user_ids:
+        return set()
+    
+    db = get_prisma()
+    await db.connect()
+    
+    try:
+        return await FollowGraph(db).is_following_many(viewer_id, user_ids)
+    finally:
+        await db.disconnect()
+
+
+async def get_home_timeline(user_id: str, cursor: str = None, page_size: int = 20):
+    """
+    Get one page of a user's home timeline.
+    
+    Args:
+        user_id: ID of the reader
+        cursor: Pagination cursor
+        page_size: Number of results per page
+        
+    Returns:
+        Tuple of (timeline items, next_cursor)
+    """
+    db = get_prisma()
+    await db.connect()
+    
+    try:
+        return await HomeTimeline(db).page(user_id, cursor, page_size)
+    finally:
+        await db.disconnect()
@@ -1,13 +1,10 @@
 """Views for story and chapter management."""
 import logging
-import asyncio
-import threading
 import inspect
 from datetime import datetime
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
@@ -26,8 +23,15 @@ from apps.core.rate_limiting import rate_limit, require_captcha
 from apps.core.content_sanitizer import ContentSanitizer
 from apps.core.pii_middleware import detect_pii_in_content
 from apps.social.utils import sync_get_blocked_user_ids
+from apps.social.timeline import schedule_timeline_fanout
+from apps.discovery.engagement import READ, emit_engagement
 from apps.moderation.content_filter_integration import ContentFilterIntegration
+from apps.moderation.post_write import schedule_post_write_moderation
+from apps.moderation.content_fingerprint import remove_content_fingerprint
 from infrastructure.cache_manager import CacheManager
+from infrastructure.content_filter_utils import FeedVisibility, fetch_visible_page
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -35,36 +39,6 @@ logger = logging.getLogger(__name__)
 cache_manager = CacheManager()
 
 
-def _run_async(coro):
-    """Run async Prisma calls from sync DRF views."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 async def _maybe_await(value):
     """Await value when needed, otherwise return directly."""
     if inspect.isawaitable(value):
@@ -222,7 +196,7 @@ def _create_story(request):
     slug = base_slug
     
     # Create story in database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -231,17 +205,13 @@ def _create_story(request):
         filter_integration = ContentFilterIntegration(db)
         
         # Filter title
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            title_filter_result = loop.run_until_complete(
-                filter_integration.filter_and_validate_content(
-                    content=validated_data['title'],
-                    content_type='story'
-                )
+        title_filter_result = run_async(
+            filter_integration.filter_and_validate_content(
+                content=validated_data['title'],
+                content_type='story',
+                defer_url_reputation=True
             )
-        finally:
-            loop.close()
+        )
         
         # Block if title is problematic
         if title_filter_result['blocked']:
@@ -258,17 +228,13 @@ def _create_story(request):
             )
         
         # Filter blurb
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            blurb_filter_result = loop.run_until_complete(
-                filter_integration.filter_and_validate_content(
-                    content=sanitized_blurb,
-                    content_type='story'
-                )
+        blurb_filter_result = run_async(
+            filter_integration.filter_and_validate_content(
+                content=sanitized_blurb,
+                content_type='story',
+                defer_url_reputation=True
             )
-        finally:
-            loop.close()
+        )
         
         # Block if blurb is problematic
         if blurb_filter_result['blocked']:
@@ -305,57 +271,16 @@ def _create_story(request):
             }
         )
         
-        # Handle manual NSFW marking (Requirement 8.3)
-        if validated_data.get('mark_as_nsfw', False):
-            from apps.moderation.nsfw_service import get_nsfw_service
-            from prisma.enums import NSFWContentType
-            
-            nsfw_service = get_nsfw_service()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    nsfw_service.mark_content_as_nsfw(
-                        content_type=NSFWContentType.STORY,
-                        content_id=story.id,
-                        user_id=user_profile.id,
-                        is_manual=False  # USER_MARKED
-                    )
-                )
-            finally:
-                loop.close()
-        
-        # Handle automated actions for title
-        if title_filter_result.get('auto_actions'):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    filter_integration.handle_auto_actions(
-                        content_type='story',
-                        content_id=story.id,
-                        auto_actions=title_filter_result['auto_actions'],
-                        filter_details=title_filter_result['details']
-                    )
-                )
-            finally:
-                loop.close()
-        
-        # Handle automated actions for blurb
-        if blurb_filter_result.get('auto_actions'):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    filter_integration.handle_auto_actions(
-                        content_type='story',
-                        content_id=story.id,
-                        auto_actions=blurb_filter_result['auto_actions'],
-                        filter_details=blurb_filter_result['details']
-                    )
-                )
-            finally:
-                loop.close()
+        # NSFW marking, flag logging, automated reports, URL reputation
+        # and cover image analysis run after the response
+        schedule_post_write_moderation(
+            content_type='story',
+            content_id=story.id,
+            user_id=user_profile.id,
+            filter_results=[title_filter_result, blurb_filter_result],
+            mark_nsfw=validated_data.get('mark_as_nsfw', False),
+            media_key=validated_data.get('cover_key')
+        )
         
         db.disconnect()
         
@@ -417,36 +342,36 @@ def _list_stories(request):
     if author_id:
         where['author_id'] = author_id
     
-    # Exclude blocked users if authenticated
+    # Blocked and shadowbanned authors are dropped after fetching
     user_profile = getattr(request, 'user_profile', None)
-    if user_profile:
-        blocked_ids = sync_get_blocked_user_ids(user_profile.id)
-        if blocked_ids:
-            where['author_id'] = {'notIn': blocked_ids}
     
-    db = Prisma()
+    db = get_prisma()
 
     try:
         async def _fetch_stories():
+            visibility = await FeedVisibility.for_viewer(user_profile.id if user_profile else None)
             await _maybe_await(db.connect())
             try:
-                query_args = {
-                    'where': where,
-                    'order': {'created_at': 'desc'},
-                    'take': page_size + 1,
-                }
-
-                if cursor:
-                    query_args['cursor'] = {'id': cursor}
-                    query_args['skip'] = 1
+                async def _fetch_batch(after_id, take):
+                    query_args = {
+                        'where': where,
+                        'order': {'created_at': 'desc'},
+                        'take': take,
+                    }
 
-                fetched_stories = await _maybe_await(db.story.find_many(**query_args))
+                    if after_id:
+                        query_args['cursor'] = {'id': after_id}
+                        query_args['skip'] = 1
 
-                has_next_local = len(fetched_stories) > page_size
-                if has_next_local:
-                    fetched_stories = fetched_stories[:page_size]
+                    return await _maybe_await(db.story.find_many(**query_args))
 
-                next_cursor_local = fetched_stories[-1].id if has_next_local and fetched_stories else None
+                fetched_stories, next_cursor_local = await fetch_visible_page(
+                    _fetch_batch,
+                    page_size,
+                    visibility,
+                    lambda story: story.author_id,
+                    cursor=cursor
+                )
                 last_modified_local = max(
                     (story.updated_at for story in fetched_stories),
                     default=datetime.now()
@@ -456,7 +381,7 @@ def _list_stories(request):
             finally:
                 await _maybe_await(db.disconnect())
 
-        stories, next_cursor, last_modified = _run_async(_fetch_stories())
+        stories, next_cursor, last_modified = run_async(_fetch_stories())
         
         # Serialize response
         serializer = StoryListSerializer(stories, many=True)
@@ -556,7 +481,7 @@ def get_story_by_slug(request, slug):
         OfflineSupportService.add_cache_headers(response, cached_last_modified, cached_etag)
         return response
     
-    db = Prisma()
+    db = get_prisma()
 
     try:
         async def _fetch_story():
@@ -569,7 +494,7 @@ def get_story_by_slug(request, slug):
             finally:
                 await _maybe_await(db.disconnect())
 
-        story = _run_async(_fetch_story())
+        story = run_async(_fetch_story())
         
         if not story or story.deleted_at:
             return Response(
@@ -695,7 +620,7 @@ def update_story(request, story_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -763,32 +688,27 @@ def update_story(request, story_id):
             from prisma.enums import NSFWContentType
             
             nsfw_service = get_nsfw_service()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                if validated_data['mark_as_nsfw']:
-                    # Mark as NSFW
-                    loop.run_until_complete(
-                        nsfw_service.mark_content_as_nsfw(
-                            content_type=NSFWContentType.STORY,
-                            content_id=story_id,
-                            user_id=user_profile.id,
-                            is_manual=False  # USER_MARKED
-                        )
+            if validated_data['mark_as_nsfw']:
+                # Mark as NSFW
+                run_async(
+                    nsfw_service.mark_content_as_nsfw(
+                        content_type=NSFWContentType.STORY,
+                        content_id=story_id,
+                        user_id=user_profile.id,
+                        is_manual=False  # USER_MARKED
                     )
-                else:
-                    # Remove NSFW flag if user unmarked it
-                    loop.run_until_complete(
-                        nsfw_service.create_nsfw_flag(
-                            content_type=NSFWContentType.STORY,
-                            content_id=story_id,
-                            is_nsfw=False,
-                            detection_method='USER_MARKED',
-                            flagged_by=user_profile.id
-                        )
+                )
+            else:
+                # Remove NSFW flag if user unmarked it
+                run_async(
+                    nsfw_service.create_nsfw_flag(
+                        content_type=NSFWContentType.STORY,
+                        content_id=story_id,
+                        is_nsfw=False,
+                        detection_method='USER_MARKED',
+                        flagged_by=user_profile.id
                     )
-            finally:
-                loop.close()
+                )
         
         db.disconnect()
         
@@ -843,7 +763,7 @@ def delete_story(request, story_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -936,7 +856,7 @@ def publish_story(request, story_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1024,7 +944,7 @@ def list_chapters(request, story_id):
     cursor = request.query_params.get('cursor')
     page_size = min(int(request.query_params.get('page_size', 20)), 100)
     
-    db = Prisma()
+    db = get_prisma()
 
     try:
         async def _fetch_chapters():
@@ -1064,7 +984,7 @@ def list_chapters(request, story_id):
             finally:
                 await db.disconnect()
 
-        chapters, next_cursor, last_modified = _run_async(_fetch_chapters())
+        chapters, next_cursor, last_modified = run_async(_fetch_chapters())
 
         if chapters is None:
             return Response(
@@ -1126,7 +1046,7 @@ def get_chapter(request, chapter_id):
         - 9.2: Support conditional requests
         - 9.3: Return 304 Not Modified when appropriate
     """
-    db = Prisma()
+    db = get_prisma()
 
     try:
         async def _fetch_chapter():
@@ -1139,7 +1059,7 @@ def get_chapter(request, chapter_id):
             finally:
                 await db.disconnect()
 
-        chapter = _run_async(_fetch_chapter())
+        chapter = run_async(_fetch_chapter())
         
         if not chapter or chapter.deleted_at:
             return Response(
@@ -1152,6 +1072,10 @@ def get_chapter(request, chapter_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        if chapter.published:
+            user_profile = getattr(request, 'user_profile', None)
+            emit_engagement(READ, chapter.story_id, user_profile.id if user_profile else None)
+        
         # Serialize response
         serializer = ChapterDetailSerializer(chapter)
         chapter_data = serializer.data
@@ -1256,7 +1180,7 @@ def create_chapter(request, story_id):
     sanitized_content = ContentSanitizer.sanitize_rich_content(validated_data['content'])
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1314,17 +1238,13 @@ def create_chapter(request, story_id):
         filter_integration = ContentFilterIntegration(db)
         
         # Filter title
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            title_filter_result = loop.run_until_complete(
-                filter_integration.filter_and_validate_content(
-                    content=validated_data['title'],
-                    content_type='chapter'
-                )
+        title_filter_result = run_async(
+            filter_integration.filter_and_validate_content(
+                content=validated_data['title'],
+                content_type='chapter',
+                defer_url_reputation=True
             )
-        finally:
-            loop.close()
+        )
         
         # Block if title is problematic
         if title_filter_result['blocked']:
@@ -1341,17 +1261,13 @@ def create_chapter(request, story_id):
             )
         
         # Filter content
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            content_filter_result = loop.run_until_complete(
-                filter_integration.filter_and_validate_content(
-                    content=sanitized_content,
-                    content_type='chapter'
-                )
+        content_filter_result = run_async(
+            filter_integration.filter_and_validate_content(
+                content=sanitized_content,
+                content_type='chapter',
+                defer_url_reputation=True
             )
-        finally:
-            loop.close()
+        )
         
         # Block if content is problematic
         if content_filter_result['blocked']:
@@ -1378,57 +1294,16 @@ def create_chapter(request, story_id):
             }
         )
         
-        # Handle manual NSFW marking (Requirement 8.3)
-        if validated_data.get('mark_as_nsfw', False):
-            from apps.moderation.nsfw_service import get_nsfw_service
-            from prisma.enums import NSFWContentType
-            
-            nsfw_service = get_nsfw_service()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    nsfw_service.mark_content_as_nsfw(
-                        content_type=NSFWContentType.CHAPTER,
-                        content_id=chapter.id,
-                        user_id=user_profile.id,
-                        is_manual=False  # USER_MARKED
-                    )
-                )
-            finally:
-                loop.close()
-        
-        # Handle automated actions for title
-        if title_filter_result.get('auto_actions'):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    filter_integration.handle_auto_actions(
-                        content_type='chapter',
-                        content_id=chapter.id,
-                        auto_actions=title_filter_result['auto_actions'],
-                        filter_details=title_filter_result['details']
-                    )
-                )
-            finally:
-                loop.close()
-        
-        # Handle automated actions for content
-        if content_filter_result.get('auto_actions'):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    filter_integration.handle_auto_actions(
-                        content_type='chapter',
-                        content_id=chapter.id,
-                        auto_actions=content_filter_result['auto_actions'],
-                        filter_details=content_filter_result['details']
-                    )
-                )
-            finally:
-                loop.close()
+        # NSFW marking, flag logging, automated reports, URL reputation and
+        # content fingerprinting run after the response
+        schedule_post_write_moderation(
+            content_type='chapter',
+            content_id=chapter.id,
+            user_id=user_profile.id,
+            filter_results=[title_filter_result, content_filter_result],
+            mark_nsfw=validated_data.get('mark_as_nsfw', False),
+            fingerprint=True
+        )
         
         db.disconnect()
         
@@ -1510,7 +1385,7 @@ def update_chapter(request, chapter_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1561,38 +1436,43 @@ def update_chapter(request, chapter_id):
             data=update_data
         )
         
+        # Re-fingerprint edited text for duplicate detection
+        if 'content' in update_data:
+            schedule_post_write_moderation(
+                content_type='chapter',
+                content_id=chapter_id,
+                user_id=user_profile.id,
+                fingerprint=True,
+                version=updated_chapter.updated_at.isoformat()
+            )
+        
         # Handle manual NSFW marking (Requirement 8.3)
         if 'mark_as_nsfw' in validated_data:
             from apps.moderation.nsfw_service import get_nsfw_service
             from prisma.enums import NSFWContentType
             
             nsfw_service = get_nsfw_service()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                if validated_data['mark_as_nsfw']:
-                    # Mark as NSFW
-                    loop.run_until_complete(
-                        nsfw_service.mark_content_as_nsfw(
-                            content_type=NSFWContentType.CHAPTER,
-                            content_id=chapter_id,
-                            user_id=user_profile.id,
-                            is_manual=False  # USER_MARKED
-                        )
+            if validated_data['mark_as_nsfw']:
+                # Mark as NSFW
+                run_async(
+                    nsfw_service.mark_content_as_nsfw(
+                        content_type=NSFWContentType.CHAPTER,
+                        content_id=chapter_id,
+                        user_id=user_profile.id,
+                        is_manual=False  # USER_MARKED
                     )
-                else:
-                    # Remove NSFW flag if user unmarked it
-                    loop.run_until_complete(
-                        nsfw_service.create_nsfw_flag(
-                            content_type=NSFWContentType.CHAPTER,
-                            content_id=chapter_id,
-                            is_nsfw=False,
-                            detection_method='USER_MARKED',
-                            flagged_by=user_profile.id
-                        )
+                )
+            else:
+                # Remove NSFW flag if user unmarked it
+                run_async(
+                    nsfw_service.create_nsfw_flag(
+                        content_type=NSFWContentType.CHAPTER,
+                        content_id=chapter_id,
+                        is_nsfw=False,
+                        detection_method='USER_MARKED',
+                        flagged_by=user_profile.id
                     )
-            finally:
-                loop.close()
+                )
         
         db.disconnect()
         
@@ -1647,7 +1527,7 @@ def delete_chapter(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1691,6 +1571,8 @@ def delete_chapter(request, chapter_id):
         
         db.disconnect()
         
+        remove_content_fingerprint('chapter', chapter_id)
+        
         return Response(status=status.HTTP_204_NO_CONTENT)
         
     except Exception as e:
@@ -1743,7 +1625,7 @@ def publish_chapter(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1790,6 +1672,13 @@ def publish_chapter(request, chapter_id):
         
         db.disconnect()
         
+        # Followers see the chapter in their home timeline (first publish of
+        # a chapter in a published story only)
+        if not chapter.published and chapter.story.published and not chapter.story.deleted_at:
+            schedule_timeline_fanout(
+                'chapter', chapter_id, chapter.story.author_id, updated_chapter.published_at
+            )
+        
         # Serialize response
         serializer = ChapterDetailSerializer(updated_chapter)
         
@@ -1878,7 +1767,7 @@ def _update_reading_progress(request, chapter_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -1920,6 +1809,9 @@ def _update_reading_progress(request, chapter_id):
         
         db.disconnect()
         
+        # Counted once per reader and day, together with chapter fetches
+        emit_engagement(READ, chapter.story_id, user_profile.id)
+        
         # Serialize response
         from .serializers import ReadingProgressSerializer
         response_serializer = ReadingProgressSerializer(progress)
@@ -1970,7 +1862,7 @@ def _get_reading_progress(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -2099,7 +1991,7 @@ def _create_bookmark(request, chapter_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -2192,7 +2084,7 @@ def get_reading_progress(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -2306,7 +2198,7 @@ def _create_bookmark(request, chapter_id):
     validated_data = serializer.validated_data
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -2390,7 +2282,7 @@ def _list_bookmarks(request, chapter_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -2473,7 +2365,7 @@ def delete_bookmark(request, bookmark_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
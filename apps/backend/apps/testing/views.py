@@ -15,6 +15,7 @@ from django.views.decorators.csrf import csrf_exempt
 
 from apps.core.deep_link_service import DeepLinkService
 from apps.notifications.push_service import PushNotificationService
+from infrastructure.async_bridge import run_async
 from .test_mode_service import TestModeService
 
 logger = logging.getLogger(__name__)
@@ -134,14 +135,11 @@ def test_push_notification(request):
         data = body.get('data', {})
         
         # Send test notification
-        import asyncio
         push_service = PushNotificationService()
         
         try:
-            # Run async function in sync context
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            delivery_status = loop.run_until_complete(
+            # Run async function on the shared bridge loop
+            delivery_status = run_async(
                 push_service.send_notification(
                     user_id=user_id,
                     title=title,
@@ -149,8 +147,7 @@ def test_push_notification(request):
                     data=data
                 )
             )
-            loop.run_until_complete(push_service.close())
-            loop.close()
+            run_async(push_service.close())
             
             logger.info(
                 f"Test push notification sent to user {user_id}",
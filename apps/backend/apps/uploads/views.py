@@ -3,7 +3,6 @@ from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
-from prisma import Prisma
 from .s3 import S3UploadManager
 from .serializers import (
     PresignUploadRequestSerializer,
@@ -13,9 +12,9 @@ from .serializers import (
     ChunkedUploadCompleteSerializer
 )
 from .mobile_upload_service import MobileUploadService
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 import logging
-import asyncio
-import threading
 
 logger = logging.getLogger(__name__)
 
@@ -23,36 +22,6 @@ logger = logging.getLogger(__name__)
 request = None
 
 
-def _run_async(coro):
-    """Run async code safely from sync DRF views."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 def _extract_user_id(request):
     """Extract user identifier from request across auth contexts."""
     user = getattr(request, 'user', None)
@@ -257,7 +226,7 @@ def chunked_upload_init(request):
     
     try:
         async def _init_upload_session():
-            db = Prisma()
+            db = get_prisma()
             await db.connect()
             try:
                 upload_service = MobileUploadService(prisma_client=db)
@@ -269,7 +238,7 @@ def chunked_upload_init(request):
             finally:
                 await db.disconnect()
 
-        session_info = _run_async(_init_upload_session())
+        session_info = run_async(_init_upload_session())
         return Response(session_info, status=status.HTTP_200_OK)
         
     except ValueError as e:
@@ -327,7 +296,7 @@ def chunked_upload_chunk(request):
         chunk_data = chunk_file.read()
 
         async def _upload_chunk():
-            db = Prisma()
+            db = get_prisma()
             await db.connect()
             try:
                 upload_service = MobileUploadService(prisma_client=db)
@@ -339,7 +308,7 @@ def chunked_upload_chunk(request):
             finally:
                 await db.disconnect()
 
-        chunk_status = _run_async(_upload_chunk())
+        chunk_status = run_async(_upload_chunk())
         return Response(chunk_status, status=status.HTTP_200_OK)
         
     except ValueError as e:
@@ -389,7 +358,7 @@ def chunked_upload_complete(request):
     
     try:
         async def _complete_upload():
-            db = Prisma()
+            db = get_prisma()
             await db.connect()
             try:
                 upload_service = MobileUploadService(prisma_client=db)
@@ -399,7 +368,7 @@ def chunked_upload_complete(request):
             finally:
                 await db.disconnect()
 
-        result = _run_async(_complete_upload())
+        result = run_async(_complete_upload())
         return Response(result, status=status.HTTP_200_OK)
         
     except ValueError as e:
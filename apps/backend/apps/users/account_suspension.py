@@ -12,7 +12,7 @@ Requirements: 5.13, 5.14
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +48,7 @@ class AccountSuspensionService:
             
         Requirements: 5.13
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -109,7 +109,7 @@ class AccountSuspensionService:
             
         Requirements: 5.14
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -171,7 +171,7 @@ class AccountSuspensionService:
         Returns:
             True if suspension was lifted, False if no active suspension
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -208,7 +208,7 @@ class AccountSuspensionService:
         Returns:
             List of suspension records
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -15,7 +15,7 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import resend
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +68,7 @@ class EmailVerificationService:
             
         Requirements: 5.1, 5.2
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -231,7 +231,7 @@ class EmailVerificationService:
             
         Requirements: 5.1
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -279,7 +279,7 @@ class EmailVerificationService:
             
         Requirements: 5.3
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -311,7 +311,7 @@ class EmailVerificationService:
             
         Requirements: 5.3
         """
-        db = Prisma()
+        db = get_prisma()
         db.connect()
         
         try:
@@ -345,7 +345,7 @@ class EmailVerificationService:
             
         Requirements: 5.2
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
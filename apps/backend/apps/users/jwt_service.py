@@ -6,6 +6,8 @@ fixing the critical security vulnerability where tokens were decoded
 without signature verification.
 """
 
+import hashlib
+import time
 import jwt
 import requests
 import logging
@@ -14,6 +16,8 @@ from typing import Dict, Optional
 from django.conf import settings
 from django.core.cache import cache
 
+from infrastructure.cache_manager import LRUCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +52,7 @@ class JWTVerificationService:
     - Token expiration validation
     - Audience validation
     - JWKS caching with TTL
+    - Verified-token caching until the token's exp (no repeat RSA verification)
     - Comprehensive error handling
     """
     
@@ -55,6 +60,9 @@ class JWTVerificationService:
     JWKS_CACHE_TTL = 3600  # 1 hour
     JWKS_TIMEOUT = 5  # 5 seconds timeout for JWKS fetch
     
+    # Per-process cache of verified claims keyed by token hash
+    _verified_tokens: Optional[LRUCache] = None
+    
     @staticmethod
     @lru_cache(maxsize=1)
     def get_clerk_jwks_url() -> str:
@@ -139,6 +147,11 @@ class JWTVerificationService:
             InvalidTokenError: If token is invalid
             JWTVerificationError: For other verification errors
         """
+        token_hash = cls._token_hash(token)
+        cached_claims = cls._get_verified_tokens().get(token_hash)
+        if cached_claims is not None:
+            return dict(cached_claims)
+        
         try:
             # Decode header to get key ID (kid)
             try:
@@ -183,6 +196,7 @@ class JWTVerificationService:
             )
             
             logger.debug(f"Successfully verified token for user: {decoded.get('sub')}")
+            cls._cache_verified_token(token_hash, decoded)
             return decoded
             
         except jwt.ExpiredSignatureError:
@@ -211,9 +225,44 @@ class JWTVerificationService:
         Clear cached JWKS.
         
         Useful for testing or when JWKS needs to be refreshed immediately.
+        Tokens verified against the old keys are dropped as well.
         """
         cache.delete(cls.JWKS_CACHE_KEY)
+        cls.clear_verified_token_cache()
         logger.info("Cleared JWKS cache")
+    
+    @classmethod
+    def clear_verified_token_cache(cls):
+        """Clear cached verified-token claims."""
+        if cls._verified_tokens is not None:
+            cls._verified_tokens.clear()
+    
+    @classmethod
+    def _get_verified_tokens(cls) -> LRUCache:
+        """Get the per-process verified-token cache, creating it on first use."""
+        if cls._verified_tokens is None:
+            cls._verified_tokens = LRUCache(
+                max_size=getattr(settings, 'JWT_VERIFICATION_CACHE_MAX_SIZE', 10000),
+                default_ttl=60
+            )
+        return cls._verified_tokens
+    
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        """Hash a token so raw credentials are never used as cache keys."""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _cache_verified_token(cls, token_hash: str, claims: Dict) -> None:
+        """Cache verified claims until the token expires."""
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        
+        # Round down so a cached token never outlives its exp claim
+        ttl = int(exp - time.time())
+        if ttl > 0:
+            cls._get_verified_tokens().set(token_hash, dict(claims), ttl=ttl)
 
 
 # Singleton instance for convenience
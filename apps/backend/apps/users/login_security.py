@@ -11,10 +11,11 @@ from typing import Optional, Dict, Any
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from prisma import Prisma
 from prisma.enums import AuthEventType
 import httpx
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +31,7 @@ class LoginSecurityMonitor:
     """
     
     def __init__(self):
-        self.db = Prisma()
+        self.db = get_prisma()
     
     async def check_login(self, user_id: str, request) -> Dict[str, Any]:
         """
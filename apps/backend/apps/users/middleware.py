@@ -1,6 +1,5 @@
 """Clerk authentication middleware with proper JWT verification."""
 import logging
-import asyncio
 import os
 import hashlib
 import jwt
@@ -9,7 +8,9 @@ from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from .jwt_service import JWTVerificationService, TokenExpiredError, InvalidTokenError
 from .utils import get_or_create_profile
+from .profile_cache import get_profile_cache
 from infrastructure.logging_config import get_logger, log_authentication_event
+from infrastructure.async_bridge import run_async
 
 logger = logging.getLogger(__name__)
 structured_logger = get_logger(__name__)
@@ -30,46 +31,24 @@ class AuthenticatedRequestUser:
         self.sub = clerk_user_id
 
 
-def _run_async(coro):
-    """Run async code from sync middleware context."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    import threading
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 def get_or_create_profile_sync(clerk_user_id: str):
     """
     Synchronous version of get_or_create_profile.
     
     This replaces the async version to avoid the nest_asyncio anti-pattern
     that was causing performance issues and potential deadlocks.
+    
+    Profiles are served from the profile cache when possible so that
+    steady-state authentication does not touch the database.
     """
-    return _run_async(get_or_create_profile(clerk_user_id))
+    profile_cache = get_profile_cache()
+    profile = profile_cache.get(clerk_user_id)
+    if profile is not None:
+        return profile
+    
+    profile = run_async(get_or_create_profile(clerk_user_id))
+    profile_cache.set(clerk_user_id, profile)
+    return profile
 
 
 def create_mobile_session_if_needed(request, user_profile):
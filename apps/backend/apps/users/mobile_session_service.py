@@ -14,9 +14,10 @@ import secrets
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
-from prisma import Prisma
 from django.conf import settings
 
+from infrastructure.prisma_pool import get_prisma
+
 logger = logging.getLogger(__name__)
 
 
@@ -85,7 +86,7 @@ class MobileSessionService:
             
         Validates: Requirements 17.1, 17.5
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -142,7 +143,7 @@ class MobileSessionService:
             
         Validates: Requirement 17.2
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -221,7 +222,7 @@ class MobileSessionService:
             
         Validates: Requirement 17.4
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -267,7 +268,7 @@ class MobileSessionService:
             
         Validates: Requirement 17.4
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -315,7 +316,7 @@ class MobileSessionService:
             
         Validates: Requirement 17.5
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -353,7 +354,7 @@ class MobileSessionService:
         Returns:
             Number of sessions cleaned up
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
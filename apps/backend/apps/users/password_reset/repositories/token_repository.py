@@ -7,6 +7,7 @@ from typing import Optional
 from datetime import datetime
 from prisma import Prisma
 from ..types import Token
+from infrastructure.prisma_pool import get_prisma
 
 
 class TokenRepository:
@@ -24,7 +25,7 @@ class TokenRepository:
         Args:
             db: Optional Prisma client instance. If not provided, a new one will be created.
         """
-        self.db = db or Prisma()
+        self.db = db or get_prisma()
     
     async def create(self, token: Token) -> Token:
         """
@@ -9,6 +9,8 @@ import bcrypt
 from prisma import Prisma
 from prisma.models import User
 
+from infrastructure.prisma_pool import get_prisma
+
 
 class UserRepository:
     """
@@ -25,7 +27,7 @@ class UserRepository:
         Args:
             db: Optional Prisma client instance. If not provided, creates a new one.
         """
-        self.db = db or Prisma()
+        self.db = db or get_prisma()
     
     async def find_by_email(self, email: str) -> Optional[dict]:
         """
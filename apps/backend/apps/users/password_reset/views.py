@@ -12,6 +12,8 @@ from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
+from infrastructure.async_bridge import run_async
+
 from .serializers import (
     ForgotPasswordRequestSerializer,
     ForgotPasswordResponseSerializer,
@@ -143,18 +145,8 @@ def forgot_password(request):
     service = get_password_reset_service()
     
     # Request password reset (async operation)
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import nest_asyncio
-            nest_asyncio.apply()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
     try:
-        result = loop.run_until_complete(
+        result = run_async(
             service.request_password_reset(email, ip_address)
         )
         
@@ -226,18 +218,8 @@ def validate_token(request, token):
     service = get_password_reset_service()
     
     # Validate token (async operation)
-    import asyncio
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import nest_asyncio
-            nest_asyncio.apply()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    try:
-        validation_result = loop.run_until_complete(
+        validation_result = run_async(
             service.validate_token(token)
         )
         
@@ -360,18 +342,8 @@ def reset_password(request):
     service = get_password_reset_service()
     
     # Reset password (async operation)
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import nest_asyncio
-            nest_asyncio.apply()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
     try:
-        result = loop.run_until_complete(
+        result = run_async(
             service.reset_password(token, password, confirm_password, ip_address)
         )
         
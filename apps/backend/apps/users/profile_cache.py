@@ -0,0 +1,171 @@
+"""
+Authenticated profile cache.
+
+ClerkAuthMiddleware resolves a UserProfile for every authenticated request.
+This module caches that lookup by clerk_user_id in two layers:
+- L1: per-process LRU with a short TTL (no network round trip)
+- L2: the shared Valkey cache, so a profile loaded by one worker is reused by all
+
+Every code path that changes or deletes a UserProfile must call
+invalidate_cached_profile() with the profile's clerk_user_id. L1 entries in
+other worker processes expire on their own within PROFILE_CACHE_L1_TTL.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from infrastructure.cache_manager import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileCache:
+    """Two-layer cache of UserProfile records keyed by clerk_user_id."""
+
+    KEY_PREFIX = 'auth_profile:'
+
+    def __init__(
+        self,
+        l1_max_size: int = 10000,
+        l1_ttl: int = 30,
+        l2_ttl: int = 300
+    ):
+        """
+        Initialize the profile cache.
+
+        Args:
+            l1_max_size: Maximum profiles held in process memory
+            l1_ttl: Seconds a profile stays in process memory
+            l2_ttl: Seconds a profile stays in Valkey
+        """
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self.l1_cache = LRUCache(max_size=l1_max_size, default_ttl=l1_ttl)
+        self.l2_hits = 0
+        self.l2_errors = 0
+
+    def _key(self, clerk_user_id: str) -> str:
+        return f'{self.KEY_PREFIX}{clerk_user_id}'
+
+    def get(self, clerk_user_id: str) -> Optional[Any]:
+        """
+        Get a cached profile (checks L1 then L2).
+
+        Args:
+            clerk_user_id: Clerk user ID from the verified token
+
+        Returns:
+            Cached UserProfile, or None on a miss
+        """
+        key = self._key(clerk_user_id)
+
+        profile = self.l1_cache.get(key)
+        if profile is not None:
+            return profile
+
+        try:
+            profile = cache.get(key)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Profile cache L2 get failed: {e}")
+            return None
+
+        if profile is not None:
+            self.l2_hits += 1
+            self.l1_cache.set(key, profile, ttl=self.l1_ttl)
+        return profile
+
+    def set(self, clerk_user_id: str, profile: Any) -> None:
+        """
+        Cache a profile in both layers.
+
+        Args:
+            clerk_user_id: Clerk user ID from the verified token
+            profile: UserProfile to cache (None is never cached)
+        """
+        if profile is None:
+            return
+
+        key = self._key(clerk_user_id)
+        self.l1_cache.set(key, profile, ttl=self.l1_ttl)
+        try:
+            cache.set(key, profile, self.l2_ttl)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Profile cache L2 set failed: {e}")
+
+    def invalidate(self, clerk_user_id: str) -> None:
+        """
+        Drop a profile from both layers.
+
+        Args:
+            clerk_user_id: Clerk user ID of the changed profile
+        """
+        key = self._key(clerk_user_id)
+        self.l1_cache.delete(key)
+        try:
+            cache.delete(key)
+        except Exception as e:
+            self.l2_errors += 1
+            logger.warning(f"Profile cache L2 delete failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with L1 stats and L2 hit/error counters
+        """
+        l1_stats = self.l1_cache.get_stats()
+        return {
+            'l1_hits': l1_stats.hits,
+            'l1_misses': l1_stats.misses,
+            'l1_size': l1_stats.size,
+            'l2_hits': self.l2_hits,
+            'l2_errors': self.l2_errors,
+        }
+
+
+# Global profile cache instance
+_profile_cache: Optional[ProfileCache] = None
+
+
+def get_profile_cache() -> ProfileCache:
+    """
+    Get the process-wide profile cache.
+
+    Returns:
+        Global ProfileCache instance
+    """
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ProfileCache(
+            l1_max_size=getattr(settings, 'PROFILE_CACHE_L1_MAX_SIZE', 10000),
+            l1_ttl=getattr(settings, 'PROFILE_CACHE_L1_TTL', 30),
+            l2_ttl=getattr(settings, 'CACHE_TTL', {}).get('user_profile', 300),
+        )
+    return _profile_cache
+
+
+def invalidate_cached_profile(clerk_user_id: Optional[str]) -> None:
+    """
+    Invalidate the cached profile for a Clerk user after a profile write.
+
+    Args:
+        clerk_user_id: Clerk user ID of the changed profile (None is ignored)
+    """
+    if clerk_user_id:
+        get_profile_cache().invalidate(clerk_user_id)
+
+
+def reset_profile_cache() -> None:
+    """
+    Reset the global profile cache.
+
+    Useful for testing.
+    """
+    global _profile_cache
+    _profile_cache = None
@@ -1,9 +1,10 @@
 """Service for enhanced profile features including statistics and badges."""
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from prisma import Prisma
 from prisma.models import UserProfile, UserBadge
 
+from infrastructure.prisma_pool import get_prisma
+
 
 class ProfileService:
     """Service for managing enhanced profile features."""
@@ -25,7 +26,7 @@ class ProfileService:
             - follower_count: Number of followers
             - following_count: Number of users following
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -35,8 +36,6 @@ class ProfileService:
                 include={
                     'stories': {'where': {'published': True, 'deleted_at': None}},
                     'whispers': True,
-                    'followers': True,
-                    'following': True,
                 }
             )
             
@@ -63,17 +62,15 @@ class ProfileService:
                 likes = await db.like.count(where={'story_id': story.id})
                 story_likes += likes
             
-            whisper_likes = await db.whisperlike.count(
-                where={'whisper_id': {'in': [w.id for w in profile.whispers]}}
-            )
+            whisper_likes = sum(w.like_count for w in profile.whispers)
             
             stats = {
                 'total_stories': len(profile.stories),
                 'total_chapters': total_chapters,
                 'total_whispers': len(profile.whispers),
                 'total_likes_received': story_likes + whisper_likes,
-                'follower_count': len(profile.followers),
-                'following_count': len(profile.following),
+                'follower_count': profile.follower_count,
+                'following_count': profile.following_count,
             }
             
             await db.disconnect()
@@ -94,7 +91,7 @@ class ProfileService:
         Returns:
             List of story objects for pinned stories (up to 3)
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -152,7 +149,7 @@ class ProfileService:
         Returns:
             List of UserBadge objects
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -184,7 +181,7 @@ class ProfileService:
         Returns:
             Created UserBadge object
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -226,7 +223,7 @@ class ProfileService:
         Requirements:
             - 24.6: Automatic badge awarding based on achievements
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -234,7 +231,6 @@ class ProfileService:
                 where={'id': user_id},
                 include={
                     'stories': {'where': {'published': True, 'deleted_at': None}},
-                    'followers': True,
                 }
             )
             
@@ -251,7 +247,7 @@ class ProfileService:
                 await ProfileService.award_badge(user_id, 'PROLIFIC_WRITER')
             
             # Popular Author: 100+ followers
-            if len(profile.followers) >= 100:
+            if profile.follower_count >= 100:
                 await ProfileService.award_badge(user_id, 'POPULAR_AUTHOR')
             
             # Top Contributor: 50+ stories or 500+ whispers
@@ -1,8 +1,8 @@
 """Serializers for user profile management."""
 import re
 from rest_framework import serializers
-from prisma import Prisma
 from apps.core.deep_link_service import DeepLinkService
+from infrastructure.prisma_pool import get_prisma
 
 
 class UserProfileReadSerializer(serializers.Serializer):
@@ -178,7 +178,7 @@ class UserProfileWriteSerializer(serializers.Serializer):
         Requirements:
             - 1.3: Validate handle uniqueness
         """
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -8,15 +8,15 @@ Requirements: 7.1, 7.2, 7.3, 7.5, 7.6
 
 import io
 import secrets
-import asyncio
 import bcrypt
 import pyotp
 import qrcode
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
-from prisma import Prisma
 from apps.core.encryption import encrypt, decrypt
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 
 class TwoFactorAuthService:
@@ -31,7 +31,7 @@ class TwoFactorAuthService:
     """
     
     def __init__(self):
-        self.prisma = Prisma()
+        self.prisma = get_prisma()
     
     async def setup_2fa(self, user_id: str, user_email: str) -> Dict:
         """
@@ -366,34 +366,7 @@ class TwoFactorAuthService:
         Returns:
             True if user has a confirmed TOTP device, False otherwise
         """
-        try:
-            asyncio.get_running_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            try:
-                return loop.run_until_complete(self.has_2fa_enabled(user_id))
-            finally:
-                loop.close()
-
-        result = {}
-        error = {}
-
-        def _runner():
-            try:
-                result['value'] = asyncio.run(self.has_2fa_enabled(user_id))
-            except Exception as exc:
-                error['value'] = exc
-
-        import threading
-
-        thread = threading.Thread(target=_runner)
-        thread.start()
-        thread.join()
-
-        if 'value' in error:
-            raise error['value']
-
-        return result.get('value', False)
+        return run_async(self.has_2fa_enabled(user_id))
 
     
     async def disable_2fa(self, user_id: str) -> bool:
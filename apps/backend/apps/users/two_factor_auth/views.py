@@ -5,8 +5,6 @@ Requirements: 7.1, 7.2, 7.3, 7.4, 7.5, 7.7, 7.8
 """
 import logging
 import json
-import asyncio
-import threading
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -27,6 +25,7 @@ from .serializers import (
     Disable2FAResponseSerializer,
     RegenerateBackupCodesResponseSerializer,
 )
+from infrastructure.async_bridge import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -34,32 +33,6 @@ logger = logging.getLogger(__name__)
 clerk = Clerk(bearer_auth=settings.CLERK_SECRET_KEY)
 
 
-def _run_async(coro):
-    """Run coroutine safely from sync request handlers."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 def _get_authenticated_user_id(request):
     user_id = getattr(request, 'clerk_user_id', None)
     if user_id:
@@ -138,14 +111,14 @@ def setup_2fa(request):
         
         # Check if 2FA is already enabled
         service = TwoFactorAuthService()
-        if _run_async(service.has_2fa_enabled(user_id)):
+        if run_async(service.has_2fa_enabled(user_id)):
             return Response(
                 {'error': '2FA is already enabled for this account'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Setup 2FA
-        result = _run_async(service.setup_2fa(user_id, user_email))
+        result = run_async(service.setup_2fa(user_id, user_email))
         
         # Add success message
         result['message'] = '2FA setup initialized. Please scan the QR code with your authenticator app and verify with a code.'
@@ -208,7 +181,7 @@ def verify_setup_2fa(request):
         service = TwoFactorAuthService()
         
         # Verify the setup token
-        verified = _run_async(service.verify_2fa_setup(user_id, token))
+        verified = run_async(service.verify_2fa_setup(user_id, token))
         
         if verified:
             # Get user email from Clerk for notification
@@ -223,7 +196,7 @@ def verify_setup_2fa(request):
                 # Send email notification (Requirement 7.9)
                 if user_email:
                     email_service = TwoFactorEmailService()
-                    _run_async(email_service.send_2fa_enabled_notification(user_email))
+                    run_async(email_service.send_2fa_enabled_notification(user_email))
             except Exception as e:
                 logger.error(f"Failed to send 2FA enabled notification: {str(e)}")
                 # Don't fail the request if email fails
@@ -296,14 +269,14 @@ def verify_2fa(request):
         service = TwoFactorAuthService()
         
         # Check if 2FA is enabled
-        if not _run_async(service.has_2fa_enabled(user_id)):
+        if not run_async(service.has_2fa_enabled(user_id)):
             return Response(
                 {'error': '2FA is not enabled for this account'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Verify the TOTP token
-        verified = _run_async(service.verify_totp(user_id, token))
+        verified = run_async(service.verify_totp(user_id, token))
         
         if verified:
             # Set session flag to indicate 2FA is verified (Requirement 7.4)
@@ -381,14 +354,14 @@ def verify_backup_code(request):
         service = TwoFactorAuthService()
         
         # Check if 2FA is enabled
-        if not _run_async(service.has_2fa_enabled(user_id)):
+        if not run_async(service.has_2fa_enabled(user_id)):
             return Response(
                 {'error': '2FA is not enabled for this account'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Verify the backup code
-        verified, remaining_codes = _run_async(service.verify_backup_code(user_id, code))
+        verified, remaining_codes = run_async(service.verify_backup_code(user_id, code))
         
         if verified:
             # Set session flag to indicate 2FA is verified (Requirement 7.4)
@@ -451,14 +424,14 @@ def disable_2fa(request):
         service = TwoFactorAuthService()
         
         # Check if 2FA is enabled
-        if not _run_async(service.has_2fa_enabled(user_id)):
+        if not run_async(service.has_2fa_enabled(user_id)):
             return Response(
                 {'error': '2FA is not enabled for this account'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Disable 2FA
-        disabled = _run_async(service.disable_2fa(user_id))
+        disabled = run_async(service.disable_2fa(user_id))
         
         if disabled:
             # Get user email from Clerk for notification
@@ -473,7 +446,7 @@ def disable_2fa(request):
                 # Send email notification (Requirement 7.9)
                 if user_email:
                     email_service = TwoFactorEmailService()
-                    _run_async(email_service.send_2fa_disabled_notification(user_email))
+                    run_async(email_service.send_2fa_disabled_notification(user_email))
             except Exception as e:
                 logger.error(f"Failed to send 2FA disabled notification: {str(e)}")
                 # Don't fail the request if email fails
@@ -530,14 +503,14 @@ def regenerate_backup_codes(request):
         service = TwoFactorAuthService()
         
         # Check if 2FA is enabled
-        if not _run_async(service.has_2fa_enabled(user_id)):
+        if not run_async(service.has_2fa_enabled(user_id)):
             return Response(
                 {'error': '2FA is not enabled for this account'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Regenerate backup codes
-        backup_codes = _run_async(service.regenerate_backup_codes(user_id))
+        backup_codes = run_async(service.regenerate_backup_codes(user_id))
         
         response_data = {
             'message': 'Backup codes regenerated successfully. Store these codes in a safe place.',
@@ -586,7 +559,7 @@ def check_2fa_status(request):
         service = TwoFactorAuthService()
         
         # Check if 2FA is enabled
-        has_2fa = _run_async(service.has_2fa_enabled(user_id))
+        has_2fa = run_async(service.has_2fa_enabled(user_id))
         
         # Check if 2FA is verified in the current session
         is_verified = False
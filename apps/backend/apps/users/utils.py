@@ -1,6 +1,6 @@
 """Utility functions for user management."""
 import logging
-from prisma import Prisma
+from infrastructure.prisma_pool import get_prisma
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ async def get_or_create_profile(clerk_user_id: str):
         - 1.2: Create or retrieve UserProfile using clerk_user_id
         - 1.5: Enforce handle format (alphanumeric with underscores, 3-30 chars)
     """
-    db = Prisma()
+    db = get_prisma()
     await db.connect()
     
     try:
@@ -1,57 +1,27 @@
 """Views for user profile management."""
-import asyncio
-import threading
 from datetime import datetime
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from apps.core.exceptions import DuplicateResource
 from apps.core.content_sanitizer import ContentSanitizer
 from apps.core.pii_middleware import check_profile_pii
 from infrastructure.cache_manager import CacheManager
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 from .serializers import (
     UserProfileReadSerializer,
     UserProfileWriteSerializer,
     PublicUserProfileSerializer
 )
+from .profile_cache import invalidate_cached_profile
 
 # Initialize cache manager
 cache_manager = CacheManager()
 
 
-def _run_async(coro):
-    """Run async Prisma operations safely from sync views."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 def sync_update_profile(user_id: str, update_data: dict):
     """
     Synchronous version of update_profile.
@@ -60,7 +30,7 @@ def sync_update_profile(user_id: str, update_data: dict):
     that was causing performance issues and potential deadlocks.
     """
     async def _update_profile():
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
 
         try:
@@ -79,12 +49,13 @@ def sync_update_profile(user_id: str, update_data: dict):
 
             cache_manager.invalidate(f'user_profile:{user_id}')
             cache_manager.invalidate(f'user_profile_by_handle:{updated_profile.handle}')
+            invalidate_cached_profile(updated_profile.clerk_user_id)
 
             return updated_profile
         finally:
             await db.disconnect()
 
-    return _run_async(_update_profile())
+    return run_async(_update_profile())
 
 
 def sync_get_profile_by_handle(handle: str):
@@ -103,7 +74,7 @@ def sync_get_profile_by_handle(handle: str):
         return type('UserProfile', (), cached_profile)
     
     async def _get_profile():
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
 
         try:
@@ -132,7 +103,7 @@ def sync_get_profile_by_handle(handle: str):
         finally:
             await db.disconnect()
 
-    return _run_async(_get_profile())
+    return run_async(_get_profile())
 
 
 @api_view(['GET'])
@@ -0,0 +1,372 @@
+"""
+Whisper like and reply counters.
+
+Whisper.like_count and Whisper.reply_count (non-deleted direct replies)
+replace loading every WhisperLike and reply row to count them, so whisper
+lists read one row per whisper.
+
+Likes and unlikes insert or delete the WhisperLike row and update the
+counter in the same SQL statement; replies and reply deletions update the
+parent's counter with an atomic increment. Whispers whose counter has
+reached WHISPER_COUNTER_BUFFER_THRESHOLD are hot: their increments are
+added to a Valkey hash instead of updating the contended row, and
+flush_whisper_counters() applies the accumulated deltas in one statement
+per batch from a periodic task.
+
+reconcile_whisper_counters() recomputes counters from the WhisperLike and
+Whisper tables to repair drift (e.g. a crash between a reply insert and its
+increment, or a lost buffer).
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+LIKES = 'like_count'
+REPLIES = 'reply_count'
+
+# Inserts the like and, unless buffered ($5), bumps the counter; a no-op
+# for an existing like
+LIKE_SQL = """
+    WITH inserted AS (
+        INSERT INTO "WhisperLike" (id, user_id, whisper_id, created_at)
+        VALUES ($1, $2, $3, $4::timestamp(3))
+        ON CONFLICT (user_id, whisper_id) DO NOTHING
+        RETURNING whisper_id
+    ), counted AS (
+        UPDATE "Whisper" AS w
+        SET like_count = w.like_count + 1
+        FROM inserted AS i
+        WHERE w.id = i.whisper_id AND NOT $5::boolean
+        RETURNING w.id
+    )
+    SELECT COUNT(*)::int AS inserted FROM inserted
+"""
+
+# Deletes the like and, unless buffered ($3), decrements the counter
+UNLIKE_SQL = """
+    WITH deleted AS (
+        DELETE FROM "WhisperLike"
+        WHERE user_id = $1 AND whisper_id = $2
+        RETURNING whisper_id
+    ), counted AS (
+        UPDATE "Whisper" AS w
+        SET like_count = GREATEST(w.like_count - 1, 0)
+        FROM deleted AS d
+        WHERE w.id = d.whisper_id AND NOT $3::boolean
+        RETURNING w.id
+    )
+    SELECT COUNT(*)::int AS deleted FROM deleted
+"""
+
+INCREMENT_REPLIES_SQL = """
+    UPDATE "Whisper" SET reply_count = reply_count + 1 WHERE id = $1
+"""
+
+# Soft-deletes a whisper and decrements its parent's reply counter
+DELETE_SQL = """
+    WITH deleted AS (
+        UPDATE "Whisper"
+        SET deleted_at = $2::timestamp(3)
+        WHERE id = $1 AND deleted_at IS NULL
+        RETURNING parent_id
+    ), counted AS (
+        UPDATE "Whisper" AS w
+        SET reply_count = GREATEST(w.reply_count - 1, 0)
+        FROM deleted AS d
+        WHERE w.id = d.parent_id
+        RETURNING w.id
+    )
+    SELECT COUNT(*)::int AS deleted FROM deleted
+"""
+
+# Applies buffered deltas ($1: [{"id", "likes", "replies"}])
+FLUSH_SQL = """
+    UPDATE "Whisper" AS w
+    SET like_count = GREATEST(w.like_count + d.likes, 0),
+        reply_count = GREATEST(w.reply_count + d.replies, 0)
+    FROM json_to_recordset($1::json) AS d(id text, likes int, replies int)
+    WHERE w.id = d.id
+"""
+
+# Recomputes counters that drifted, skipping whispers with buffered deltas ($1)
+RECOUNT_SQL = """
+    UPDATE "Whisper" AS w
+    SET like_count = COALESCE(l.likes, 0),
+        reply_count = COALESCE(r.replies, 0)
+    FROM "Whisper" AS x
+    LEFT JOIN (
+        SELECT whisper_id AS id, COUNT(*) AS likes FROM "WhisperLike" GROUP BY whisper_id
+    ) AS l ON l.id = x.id
+    LEFT JOIN (
+        SELECT parent_id AS id, COUNT(*) AS replies
+        FROM "Whisper"
+        WHERE parent_id IS NOT NULL AND deleted_at IS NULL
+        GROUP BY parent_id
+    ) AS r ON r.id = x.id
+    WHERE w.id = x.id
+      AND x.id NOT IN (SELECT value FROM json_array_elements_text($1::json))
+      AND (w.like_count <> COALESCE(l.likes, 0) OR w.reply_count <> COALESCE(r.replies, 0))
+"""
+
+FLUSH_BATCH_SIZE = 1000
+
+
+class WhisperCounterBuffer:
+    """Accumulates counter deltas for hot whispers in a Valkey hash."""
+
+    KEY = 'whispers:counter_deltas'
+    FLUSHING_KEY = 'whispers:counter_deltas:flushing'
+
+    def __init__(self, redis_url: Optional[str] = None):
+        """
+        Initialize the buffer.
+
+        Args:
+            redis_url: Valkey connection URL (defaults to settings.VALKEY_URL)
+        """
+        self.redis_url = redis_url or getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0')
+        self._client = None
+
+    @property
+    def client(self):
+        """Lazily created Valkey client."""
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def record(self, whisper_id: str, counter: str, delta: int) -> bool:
+        """
+        Add a delta to a whisper's buffered counter.
+
+        Args:
+            whisper_id: Whisper ID
+            counter: LIKES or REPLIES
+            delta: Amount to add (negative to subtract)
+
+        Returns:
+            True if recorded, False if Valkey is unavailable (the caller
+            should update the row itself)
+        """
+        try:
+            self.client.hincrby(self.KEY, f'{whisper_id}:{counter}', delta)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not buffer whisper counter: {e}")
+            return False
+
+    def whisper_ids(self) -> Set[str]:
+        """IDs of whispers with buffered or claimed deltas."""
+        fields = self.client.hkeys(self.KEY) + self.client.hkeys(self.FLUSHING_KEY)
+        return {field.rsplit(':', 1)[0] for field in fields}
+
+    def claim(self) -> Dict[Tuple[str, str], int]:
+        """
+        Take the buffered deltas for flushing.
+
+        The hash is renamed so deltas recorded during the flush go to a new
+        hash. A batch left behind by a failed flush is returned again.
+
+        Returns:
+            Mapping of (whisper ID, counter) to delta
+        """
+        if not self.client.exists(self.FLUSHING_KEY):
+            try:
+                self.client.rename(self.KEY, self.FLUSHING_KEY)
+            except redis.ResponseError:
+                # Nothing recorded since the last flush
+                return {}
+        deltas = {}
+        for field, value in self.client.hgetall(self.FLUSHING_KEY).items():
+            whisper_id, counter = field.rsplit(':', 1)
+            deltas[(whisper_id, counter)] = int(value)
+        return deltas
+
+    def ack(self) -> None:
+        """Drop the claimed batch once it has been written."""
+        self.client.delete(self.FLUSHING_KEY)
+
+
+class WhisperCounters:
+    """Counted like, unlike, reply and delete writes on a connected Prisma client."""
+
+    def __init__(self, db, buffer: Optional[WhisperCounterBuffer] = None):
+        """
+        Initialize the counters.
+
+        Args:
+            db: Connected Prisma client
+            buffer: Delta buffer for hot whispers (defaults to the global one)
+        """
+        self.db = db
+        self.buffer = buffer or get_whisper_counter_buffer()
+        self.buffer_threshold = getattr(settings, 'WHISPER_COUNTER_BUFFER_THRESHOLD', 1000)
+
+    def _is_hot(self, count: int) -> bool:
+        return count >= self.buffer_threshold
+
+    async def like(self, user_id: str, whisper: Any) -> Optional[Dict[str, Any]]:
+        """
+        Like a whisper and count the like.
+
+        Args:
+            user_id: Profile ID of the user liking
+            whisper: Whisper being liked (its like_count decides buffering)
+
+        Returns:
+            The new like (id, user_id, whisper_id, created_at), or None if
+            the user already liked the whisper
+        """
+        like_id = str(uuid.uuid4())
+        # Millisecond precision, as stored
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        hot = self._is_hot(whisper.like_count)
+        rows = await self.db.query_raw(
+            LIKE_SQL,
+            like_id,
+            user_id,
+            whisper.id,
+            now.replace(tzinfo=None).isoformat(),
+            hot
+        )
+        if not rows or not rows[0]['inserted']:
+            return None
+        if hot:
+            await self._buffer(whisper.id, LIKES, 1)
+        return {
+            'id': like_id,
+            'user_id': user_id,
+            'whisper_id': whisper.id,
+            'created_at': now,
+        }
+
+    async def unlike(self, user_id: str, whisper: Any) -> bool:
+        """
+        Remove a user's like from a whisper and uncount it.
+
+        Returns:
+            True if a like was removed
+        """
+        hot = self._is_hot(whisper.like_count)
+        rows = await self.db.query_raw(UNLIKE_SQL, user_id, whisper.id, hot)
+        if not rows or not rows[0]['deleted']:
+            return False
+        if hot:
+            await self._buffer(whisper.id, LIKES, -1)
+        return True
+
+    async def count_reply(self, parent: Any) -> None:
+        """Count a new reply on its parent whisper."""
+        if self._is_hot(parent.reply_count):
+            await self._buffer(parent.id, REPLIES, 1)
+        else:
+            await self.db.execute_raw(INCREMENT_REPLIES_SQL, parent.id)
+
+    async def delete(self, whisper_id: str) -> bool:
+        """
+        Soft-delete a whisper, uncounting it from its parent's replies.
+
+        Returns:
+            True if the whisper was deleted (False if already deleted)
+        """
+        rows = await self.db.query_raw(
+            DELETE_SQL,
+            whisper_id,
+            datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        )
+        return bool(rows and rows[0]['deleted'])
+
+    async def _buffer(self, whisper_id: str, counter: str, delta: int) -> None:
+        if not self.buffer.record(whisper_id, counter, delta):
+            await self.db.execute_raw(
+                FLUSH_SQL,
+                json.dumps([{
+                    'id': whisper_id,
+                    'likes': delta if counter == LIKES else 0,
+                    'replies': delta if counter == REPLIES else 0,
+                }])
+            )
+
+
+async def flush_whisper_counters(db, buffer: Optional[WhisperCounterBuffer] = None) -> int:
+    """
+    Apply buffered counter deltas to the Whisper table in bulk.
+
+    Args:
+        db: Connected Prisma client
+        buffer: Delta buffer (defaults to the global one)
+
+    Returns:
+        Number of whispers whose deltas were flushed
+    """
+    buffer = buffer or get_whisper_counter_buffer()
+    deltas = buffer.claim()
+    if not deltas:
+        return 0
+
+    by_whisper: Dict[str, Dict[str, Any]] = {}
+    for (whisper_id, counter), delta in deltas.items():
+        row = by_whisper.setdefault(whisper_id, {'id': whisper_id, 'likes': 0, 'replies': 0})
+        row['likes' if counter == LIKES else 'replies'] += delta
+
+    rows = [row for row in by_whisper.values() if row['likes'] or row['replies']]
+    for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+        await db.execute_raw(FLUSH_SQL, json.dumps(rows[start:start + FLUSH_BATCH_SIZE]))
+    buffer.ack()
+    return len(rows)
+
+
+async def reconcile_whisper_counters(db, buffer: Optional[WhisperCounterBuffer] = None) -> int:
+    """
+    Repair like and reply counters that drifted from the underlying rows.
+
+    Buffered deltas are flushed first; whispers that receive new deltas
+    meanwhile are left for the next run.
+
+    Args:
+        db: Connected Prisma client
+        buffer: Delta buffer (defaults to the global one)
+
+    Returns:
+        Number of whispers corrected
+    """
+    buffer = buffer or get_whisper_counter_buffer()
+    await flush_whisper_counters(db, buffer)
+    pending = sorted(buffer.whisper_ids())
+    return await db.execute_raw(RECOUNT_SQL, json.dumps(pending))
+
+
+# Global instance
+_whisper_counter_buffer: Optional[WhisperCounterBuffer] = None
+
+
+def get_whisper_counter_buffer() -> WhisperCounterBuffer:
+    """
+    Get the process-wide whisper counter buffer.
+
+    Returns:
+        Global WhisperCounterBuffer instance
+    """
+    global _whisper_counter_buffer
+    if _whisper_counter_buffer is None:
+        _whisper_counter_buffer = WhisperCounterBuffer()
+    return _whisper_counter_buffer
+
+
+def reset_whisper_counter_buffer() -> None:
+    """
+    Reset the global whisper counter buffer.
+
+    Useful for testing.
+    """
+    global _whisper_counter_buffer
+    _whisper_counter_buffer = None
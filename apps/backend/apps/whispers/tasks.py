@@ -0,0 +1,53 @@
+"""Celery tasks for whispers."""
+import logging
+
+from celery import shared_task
+
+from infrastructure.async_bridge import run_async
+from infrastructure.prisma_pool import get_prisma
+
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_whisper_counters():
+    """
+    Apply like and reply counts buffered in Valkey for hot whispers.
+    
+    Runs every 10 seconds from Celery Beat; each hot whisper gets one UPDATE
+    per flush no matter how many likes and replies it received.
+    """
+    async def _flush():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await counters.flush_whisper_counters(db)
+        finally:
+            await db.disconnect()
+    
+    flushed = run_async(_flush(), timeout=None)
+    if flushed:
+        logger.info(f"Flushed buffered counters for {flushed} whispers")
+
+
+@shared_task(ignore_result=True)
+def reconcile_whisper_counters():
+    """
+    Repair Whisper like/reply counters that drifted from the underlying rows.
+    
+    The counters are updated with every like, unlike, reply and deletion;
+    this daily pass only corrects rows changed outside those paths.
+    """
+    async def _reconcile():
+        db = get_prisma()
+        await db.connect()
+        try:
+            return await counters.reconcile_whisper_counters(db)
+        finally:
+            await db.disconnect()
+    
+    corrected = run_async(_reconcile(), timeout=None)
+    if corrected:
+        logger.warning(f"Corrected like/reply counters for {corrected} whispers")
@@ -1,12 +1,9 @@
 """Views for whispers micro-posting system."""
 import logging
-import asyncio
-import threading
 from datetime import datetime
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from prisma import Prisma
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
@@ -16,51 +13,38 @@ from .serializers import (
     WhisperReplySerializer,
     WhisperLikeSerializer,
 )
+from .counters import WhisperCounters
 from apps.core.rate_limiting import rate_limit, require_captcha
 from apps.core.content_sanitizer import ContentSanitizer
 from apps.core.pii_middleware import detect_pii_in_content
-from apps.social.utils import sync_get_blocked_user_ids
 from apps.notifications.views import sync_create_notification
 from apps.moderation.content_filter_integration import ContentFilterIntegration
+from apps.moderation.post_write import schedule_post_write_moderation
+from apps.moderation.content_fingerprint import remove_content_fingerprint
+from apps.social.timeline import schedule_timeline_fanout
+from apps.discovery.engagement import LIKE, WHISPER, emit_engagement
+from infrastructure.content_filter_utils import FeedVisibility, fetch_visible_page
+from infrastructure.prisma_pool import get_prisma
+from infrastructure.async_bridge import run_async
 
 logger = logging.getLogger(__name__)
 
 
-def _run_async(coro):
-    """Run async Prisma calls from sync DRF views."""
-    try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-    result = {}
-    error = {}
-
-    def _runner():
-        try:
-            result['value'] = asyncio.run(coro)
-        except Exception as exc:
-            error['value'] = exc
-
-    thread = threading.Thread(target=_runner)
-    thread.start()
-    thread.join()
-
-    if 'value' in error:
-        raise error['value']
-
-    return result.get('value')
-
-
 def sanitize_whisper_content(content: str) -> str:
     """Sanitize whisper HTML/text payloads."""
     return ContentSanitizer.sanitize_simple_content(content)
 
 
+async def _counted(operation):
+    """Run a WhisperCounters write on a leased Prisma client."""
+    db = get_prisma()
+    await db.connect()
+    try:
+        return await operation(WhisperCounters(db))
+    finally:
+        await db.disconnect()
+
+
 @extend_schema(
     tags=['Whispers'],
     summary='List whispers or create new whisper',
@@ -213,7 +197,7 @@ def _create_whisper(request):
     sanitized_content = ContentSanitizer.sanitize_simple_content(validated_data['content'])
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -221,18 +205,14 @@ def _create_whisper(request):
         # Run content filters (Requirement 4.1, 4.2, 4.3, 4.4)
         filter_integration = ContentFilterIntegration(db)
         
-        # Use asyncio to run the async filter method
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            filter_result = loop.run_until_complete(
-                filter_integration.filter_and_validate_content(
-                    content=sanitized_content,
-                    content_type='whisper'
-                )
+        # Run the async filter method on the shared bridge loop
+        filter_result = run_async(
+            filter_integration.filter_and_validate_content(
+                content=sanitized_content,
+                content_type='whisper',
+                defer_url_reputation=True
             )
-        finally:
-            loop.close()
+        )
         
         # Block content if filters detected issues (Requirement 4.3)
         if filter_result['blocked']:
@@ -290,45 +270,24 @@ def _create_whisper(request):
             }
         )
         
-        # Handle manual NSFW marking (Requirement 8.3)
-        if validated_data.get('mark_as_nsfw', False):
-            from apps.moderation.nsfw_service import get_nsfw_service
-            from prisma.enums import NSFWContentType
-            
-            nsfw_service = get_nsfw_service()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    nsfw_service.mark_content_as_nsfw(
-                        content_type=NSFWContentType.WHISPER,
-                        content_id=whisper.id,
-                        user_id=user_profile.id,
-                        is_manual=False  # USER_MARKED
-                    )
-                )
-            finally:
-                loop.close()
-        
-        # Handle automated actions (e.g., create reports for hate speech)
-        # Requirement 4.4: Create high-priority reports for hate speech
-        if filter_result.get('auto_actions'):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    filter_integration.handle_auto_actions(
-                        content_type='whisper',
-                        content_id=whisper.id,
-                        auto_actions=filter_result['auto_actions'],
-                        filter_details=filter_result['details']
-                    )
-                )
-            finally:
-                loop.close()
+        # NSFW marking, flag logging, automated reports (Requirement 4.4),
+        # URL reputation, image analysis and content fingerprinting run
+        # after the response
+        schedule_post_write_moderation(
+            content_type='whisper',
+            content_id=whisper.id,
+            user_id=user_profile.id,
+            filter_results=[filter_result],
+            mark_nsfw=validated_data.get('mark_as_nsfw', False),
+            media_key=validated_data.get('media_key'),
+            fingerprint=True
+        )
         
         db.disconnect()
         
+        schedule_timeline_fanout('whisper', whisper.id, user_profile.id, whisper.created_at)
+        emit_engagement(WHISPER, whisper.story_id)
+        
         # Serialize response
         response_serializer = WhisperSerializer(whisper)
         
@@ -388,39 +347,36 @@ def _list_whispers(request):
     if story_id:
         where['story_id'] = story_id
     
-    # Exclude blocked users if authenticated
+    # Blocked and shadowbanned authors are dropped after fetching
     user_profile = getattr(request, 'user_profile', None)
-    if user_profile:
-        blocked_ids = sync_get_blocked_user_ids(user_profile.id)
-        if blocked_ids:
-            where['user_id'] = {'notIn': blocked_ids}
     
-    db = Prisma()
+    db = get_prisma()
 
     try:
         async def _fetch_whispers():
+            visibility = await FeedVisibility.for_viewer(user_profile.id if user_profile else None)
             await db.connect()
             try:
-                query_args = {
-                    'where': where,
-                    'order': {'created_at': 'desc'},
-                    'take': page_size + 1,
-                    'include': {
-                        'likes': True,
-                        'replies': {'where': {'deleted_at': None}}
+                async def _fetch_batch(after_id, take):
+                    query_args = {
+                        'where': where,
+                        'order': {'created_at': 'desc'},
+                        'take': take
                     }
-                }
 
-                if cursor:
-                    query_args['cursor'] = {'id': cursor}
-                    query_args['skip'] = 1
+                    if after_id:
+                        query_args['cursor'] = {'id': after_id}
+                        query_args['skip'] = 1
 
-                fetched_whispers = await db.whisper.find_many(**query_args)
-                has_next_local = len(fetched_whispers) > page_size
-                if has_next_local:
-                    fetched_whispers = fetched_whispers[:page_size]
+                    return await db.whisper.find_many(**query_args)
 
-                next_cursor_local = fetched_whispers[-1].id if has_next_local and fetched_whispers else None
+                fetched_whispers, next_cursor_local = await fetch_visible_page(
+                    _fetch_batch,
+                    page_size,
+                    visibility,
+                    lambda whisper: whisper.user_id,
+                    cursor=cursor
+                )
                 last_modified_local = max(
                     (whisper.created_at for whisper in fetched_whispers),
                     default=datetime.now()
@@ -430,7 +386,7 @@ def _list_whispers(request):
             finally:
                 await db.disconnect()
 
-        whispers, next_cursor, last_modified = _run_async(_fetch_whispers())
+        whispers, next_cursor, last_modified = run_async(_fetch_whispers())
         
         # Add counts to whispers
         whispers_data = []
@@ -446,8 +402,8 @@ def _list_whispers(request):
                 'parent_id': whisper.parent_id,
                 'deleted_at': whisper.deleted_at,
                 'created_at': whisper.created_at,
-                'reply_count': len(whisper.replies) if hasattr(whisper, 'replies') else 0,
-                'like_count': len(whisper.likes) if hasattr(whisper, 'likes') else 0,
+                'reply_count': whisper.reply_count,
+                'like_count': whisper.like_count,
             }
             whispers_data.append(whisper_dict)
         
@@ -515,7 +471,7 @@ def delete_whisper(request, whisper_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -548,14 +504,13 @@ def delete_whisper(request, whisper_id):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Soft delete whisper
-        db.whisper.update(
-            where={'id': whisper_id},
-            data={'deleted_at': datetime.now()}
-        )
-        
         db.disconnect()
         
+        # Soft delete whisper (uncounted from its parent's replies)
+        run_async(_counted(lambda counters: counters.delete(whisper_id)))
+        
+        remove_content_fingerprint('whisper', whisper_id)
+        
         return Response(status=status.HTTP_204_NO_CONTENT)
         
     except Exception as e:
@@ -648,7 +603,7 @@ def _create_reply(request, whisper_id):
     sanitized_content = ContentSanitizer.sanitize_simple_content(validated_data['content'])
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -683,6 +638,16 @@ def _create_reply(request, whisper_id):
         
         db.disconnect()
         
+        run_async(_counted(lambda counters: counters.count_reply(parent_whisper)))
+        
+        # Fingerprint the reply for duplicate detection after the response
+        schedule_post_write_moderation(
+            content_type='whisper',
+            content_id=reply.id,
+            user_id=user_profile.id,
+            fingerprint=True
+        )
+        
         # Create notification for parent whisper author (if not replying to self)
         if parent_whisper.user_id != user_profile.id:
             sync_create_notification(
@@ -736,7 +701,7 @@ def _list_replies(request, whisper_id):
     page_size = min(int(request.query_params.get('page_size', 20)), 100)
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -763,11 +728,7 @@ def _list_replies(request, whisper_id):
                 'deleted_at': None
             },
             'order': {'created_at': 'asc'},  # Chronological order for replies
-            'take': page_size + 1,
-            'include': {
-                'likes': True,
-                'replies': {'where': {'deleted_at': None}}
-            }
+            'take': page_size + 1
         }
         
         if cursor:
@@ -800,8 +761,8 @@ def _list_replies(request, whisper_id):
                 'parent_id': reply.parent_id,
                 'deleted_at': reply.deleted_at,
                 'created_at': reply.created_at,
-                'reply_count': len(reply.replies) if hasattr(reply, 'replies') else 0,
-                'like_count': len(reply.likes) if hasattr(reply, 'likes') else 0,
+                'reply_count': reply.reply_count,
+                'like_count': reply.like_count,
             }
             replies_data.append(reply_dict)
         
@@ -859,7 +820,7 @@ def like_whisper(request, whisper_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -879,18 +840,12 @@ def like_whisper(request, whisper_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check if already liked
-        existing_like = db.whisperlike.find_unique(
-            where={
-                'user_id_whisper_id': {
-                    'user_id': user_profile.id,
-                    'whisper_id': whisper_id
-                }
-            }
-        )
+        db.disconnect()
         
-        if existing_like:
-            db.disconnect()
+        # Create like and count it (None if already liked)
+        like = run_async(_counted(lambda counters: counters.like(user_profile.id, whisper)))
+        
+        if like is None:
             return Response(
                 {
                     'error': {
@@ -901,15 +856,7 @@ def like_whisper(request, whisper_id):
                 status=status.HTTP_409_CONFLICT
             )
         
-        # Create like
-        like = db.whisperlike.create(
-            data={
-                'user_id': user_profile.id,
-                'whisper_id': whisper_id
-            }
-        )
-        
-        db.disconnect()
+        emit_engagement(LIKE, whisper.story_id)
         
         # Serialize response
         serializer = WhisperLikeSerializer(like)
@@ -964,7 +911,7 @@ def unlike_whisper(request, whisper_id):
         )
     
     # Query database
-    db = Prisma()
+    db = get_prisma()
     
     try:
         db.connect()
@@ -984,18 +931,12 @@ def unlike_whisper(request, whisper_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Find like
-        like = db.whisperlike.find_unique(
-            where={
-                'user_id_whisper_id': {
-                    'user_id': user_profile.id,
-                    'whisper_id': whisper_id
-                }
-            }
-        )
+        db.disconnect()
         
-        if not like:
-            db.disconnect()
+        # Delete like and uncount it
+        deleted = run_async(_counted(lambda counters: counters.unlike(user_profile.id, whisper)))
+        
+        if not deleted:
             return Response(
                 {
                     'error': {
@@ -1006,11 +947,6 @@ def unlike_whisper(request, whisper_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Delete like
-        db.whisperlike.delete(where={'id': like.id})
-        
-        db.disconnect()
-        
         return Response(status=status.HTTP_204_NO_CONTENT)
         
     except Exception as e:
@@ -23,10 +23,46 @@ app.conf.beat_schedule = {
         'task': 'apps.discovery.tasks.update_trending_scores',
         'schedule': 1800.0,  # Every 30 minutes
     },
+    'consume-engagement-events': {
+        'task': 'apps.discovery.tasks.consume_engagement_events',
+        'schedule': 10.0,  # Every 10 seconds
+    },
+    'refresh-analytics-rollups': {
+        'task': 'apps.analytics.tasks.refresh_analytics_rollups',
+        'schedule': 300.0,  # Every 5 minutes
+    },
+    'rebuild-analytics-rollups': {
+        'task': 'apps.analytics.tasks.rebuild_analytics_rollups',
+        'schedule': 86400.0,  # Every 24 hours
+    },
     'apply-daily-decay': {
         'task': 'apps.discovery.tasks.apply_daily_decay',
         'schedule': 86400.0,  # Every 24 hours
     },
+    'rebuild-moderation-queue': {
+        'task': 'apps.moderation.tasks.rebuild_moderation_queue',
+        'schedule': 300.0,  # Every 5 minutes
+    },
+    'drain-post-write-moderation': {
+        'task': 'apps.moderation.tasks.process_post_write_moderation',
+        'schedule': 30.0,  # Every 30 seconds
+    },
+    'flush-api-key-usage': {
+        'task': 'apps.core.tasks.flush_api_key_usage',
+        'schedule': 60.0,  # Every minute
+    },
+    'recount-follow-counters': {
+        'task': 'apps.social.tasks.recount_follow_counters',
+        'schedule': 86400.0,  # Every 24 hours
+    },
+    'flush-whisper-counters': {
+        'task': 'apps.whispers.tasks.flush_whisper_counters',
+        'schedule': 10.0,  # Every 10 seconds
+    },
+    'reconcile-whisper-counters': {
+        'task': 'apps.whispers.tasks.reconcile_whisper_counters',
+        'schedule': 86400.0,  # Every 24 hours
+    },
 }
 
 @app.task(bind=True, ignore_result=True)
@@ -101,6 +101,11 @@ MIDDLEWARE = [
 # Request timeout configuration (seconds)
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
 
+# Sync-to-async bridge (infrastructure/async_bridge.py)
+# One background event loop per worker runs coroutines for sync views/tasks
+ASYNC_BRIDGE_MAX_CONCURRENCY = int(os.getenv('ASYNC_BRIDGE_MAX_CONCURRENCY', '64'))
+ASYNC_BRIDGE_TIMEOUT = float(os.getenv('ASYNC_BRIDGE_TIMEOUT', str(REQUEST_TIMEOUT)))  # seconds
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -158,6 +163,13 @@ DB_POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN_CONNECTIONS', '10'))
 DB_POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX_CONNECTIONS', '50'))
 DB_POOL_IDLE_TIMEOUT = int(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))  # seconds
 
+# Shared Prisma Client Settings
+# One lazily connected Prisma client per worker process (infrastructure/prisma_pool.py)
+PRISMA_HEALTH_CHECK_INTERVAL = float(os.getenv('PRISMA_HEALTH_CHECK_INTERVAL', '30'))  # seconds, 0 disables
+PRISMA_CONNECT_TIMEOUT = int(os.getenv('PRISMA_CONNECT_TIMEOUT', '10'))  # seconds
+# Query engine pool size; defaults to connection_limit in DATABASE_URL
+PRISMA_CONNECTION_LIMIT = int(os.getenv('PRISMA_CONNECTION_LIMIT', '0')) or None
+
 # Workload Isolation Settings
 # Controls query routing between primary and replicas
 MAX_REPLICA_LAG = float(os.getenv('MAX_REPLICA_LAG', '5.0'))  # seconds
@@ -391,6 +403,100 @@ CACHE_TTL = {
 # L1 Cache Configuration (in-memory LRU cache)
 L1_CACHE_MAX_SIZE = int(os.getenv('L1_CACHE_MAX_SIZE', '1000'))
 L1_CACHE_DEFAULT_TTL = int(os.getenv('L1_CACHE_DEFAULT_TTL', '60'))  # 60 seconds
+L1_CACHE_MAX_BYTES = int(os.getenv('L1_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # 64 MB, 0 disables
+# Lock shards per process; unset sizes it from L1_CACHE_MAX_SIZE (up to 16)
+L1_CACHE_SHARDS = int(os.getenv('L1_CACHE_SHARDS')) if os.getenv('L1_CACHE_SHARDS') else None
+# Other instances drop their L1 copies when a key or tag is invalidated (Valkey pub/sub)
+L1_CACHE_INVALIDATION_ENABLED = os.getenv('L1_CACHE_INVALIDATION_ENABLED', 'True') == 'True'
+L1_CACHE_INVALIDATION_CHANNEL = os.getenv('L1_CACHE_INVALIDATION_CHANNEL', 'cache:l1:invalidate')
+
+# Cache stampede protection (CacheStampedeGuard)
+CACHE_FILL_LOCK_TIMEOUT = int(os.getenv('CACHE_FILL_LOCK_TIMEOUT', '10'))  # seconds one instance may hold a fill
+CACHE_FILL_WAIT_TIMEOUT = float(os.getenv('CACHE_FILL_WAIT_TIMEOUT', '5'))  # seconds others wait before computing
+CACHE_EARLY_REFRESH_BETA = float(os.getenv('CACHE_EARLY_REFRESH_BETA', '1.0'))  # 0 disables early refresh
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '4'))  # background refresh threads
+
+# Authentication caches (ClerkAuthMiddleware)
+# Profiles are cached per process (short TTL) and in Valkey (CACHE_TTL['user_profile'])
+PROFILE_CACHE_L1_MAX_SIZE = int(os.getenv('PROFILE_CACHE_L1_MAX_SIZE', '10000'))
+PROFILE_CACHE_L1_TTL = int(os.getenv('PROFILE_CACHE_L1_TTL', '30'))  # 30 seconds
+# Verified JWT claims are cached per process until the token's exp
+JWT_VERIFICATION_CACHE_MAX_SIZE = int(os.getenv('JWT_VERIFICATION_CACHE_MAX_SIZE', '10000'))
+# Validated API keys are cached per process and in Valkey; unknown keys are
+# cached as misses. last_used_at is written in bulk by flush_api_key_usage
+API_KEY_CACHE_L1_MAX_SIZE = int(os.getenv('API_KEY_CACHE_L1_MAX_SIZE', '10000'))
+API_KEY_CACHE_L1_TTL = int(os.getenv('API_KEY_CACHE_L1_TTL', '30'))  # 30 seconds
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', '300'))  # 5 minutes
+API_KEY_NEGATIVE_CACHE_TTL = int(os.getenv('API_KEY_NEGATIVE_CACHE_TTL', '60'))  # 1 minute
+
+# Content filters: each process caches its compiled pipeline and re-reads the
+# config version from Valkey at most this often (seconds, 0 checks every call)
+FILTER_PIPELINE_VERSION_CHECK_INTERVAL = float(os.getenv('FILTER_PIPELINE_VERSION_CHECK_INTERVAL', '5'))
+
+# Post-write moderation stage (flag logging, automated reports, URL reputation
+# and NSFW image analysis run in Celery after the write is accepted)
+MODERATION_STAGE_ENABLED = os.getenv('MODERATION_STAGE_ENABLED', 'True') == 'True'
+MODERATION_STAGE_BATCH_SIZE = int(os.getenv('MODERATION_STAGE_BATCH_SIZE', '100'))
+# Above this many queued jobs, writers run moderation inline (backpressure)
+MODERATION_STAGE_MAX_PENDING = int(os.getenv('MODERATION_STAGE_MAX_PENDING', '10000'))
+MODERATION_STAGE_MAX_ATTEMPTS = int(os.getenv('MODERATION_STAGE_MAX_ATTEMPTS', '3'))
+
+# Content fingerprints (cross-account duplicate detection)
+# Largest SimHash distance (of 64 bits) that counts as a near-duplicate
+CONTENT_FINGERPRINT_MAX_DISTANCE = int(os.getenv('CONTENT_FINGERPRINT_MAX_DISTANCE', '10'))
+# New content duplicated by at least this many other accounts is flagged as spam
+CONTENT_FINGERPRINT_SPAM_MIN_ACCOUNTS = int(os.getenv('CONTENT_FINGERPRINT_SPAM_MIN_ACCOUNTS', '2'))
+
+# Feed exclusion: per-user blocked sets live in Valkey (dropped on block/unblock),
+# active shadowbans in each process (reloaded at most this often, seconds)
+BLOCKED_USERS_CACHE_TTL = int(os.getenv('BLOCKED_USERS_CACHE_TTL', '3600'))  # 1 hour
+SHADOWBAN_CACHE_TTL = int(os.getenv('SHADOWBAN_CACHE_TTL', '60'))  # 1 minute
+
+# Follow graph: followers/following lists cached in Valkey (sorted sets); lists
+# longer than FOLLOW_GRAPH_CACHE_MAX_SIZE are paged from the database instead
+FOLLOW_GRAPH_CACHE_TTL = int(os.getenv('FOLLOW_GRAPH_CACHE_TTL', '3600'))  # 1 hour
+FOLLOW_GRAPH_CACHE_MAX_SIZE = int(os.getenv('FOLLOW_GRAPH_CACHE_MAX_SIZE', '10000'))
+
+# Whisper like/reply counters: increments for whispers at or above this count
+# are buffered in Valkey and flushed by flush_whisper_counters
+WHISPER_COUNTER_BUFFER_THRESHOLD = int(os.getenv('WHISPER_COUNTER_BUFFER_THRESHOLD', '1000'))
+
+# Home timeline: new chapters and whispers fanned out to followers' Valkey
+# sorted sets; authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers
+# are merged in at read time instead
+TIMELINE_MAX_LENGTH = int(os.getenv('TIMELINE_MAX_LENGTH', '500'))
+TIMELINE_TTL = int(os.getenv('TIMELINE_TTL', '86400'))  # 24 hours
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv('TIMELINE_FANOUT_MAX_FOLLOWERS', '10000'))
+TIMELINE_FANOUT_BATCH_SIZE = int(os.getenv('TIMELINE_FANOUT_BATCH_SIZE', '1000'))
+TIMELINE_FANOUT_AUTHORS_TTL = int(os.getenv('TIMELINE_FANOUT_AUTHORS_TTL', '300'))  # 5 minutes
+
+# Push delivery: requests in flight per delivery pass and Android tokens per
+# FCM multicast request (FCM accepts up to 1000). FCM_URL / APNS_URL override
+# the provider endpoints (e.g. a local stand-in server)
+PUSH_MAX_CONCURRENCY = int(os.getenv('PUSH_MAX_CONCURRENCY', '50'))
+PUSH_FCM_BATCH_SIZE = int(os.getenv('PUSH_FCM_BATCH_SIZE', '500'))
+PUSH_HTTP_TIMEOUT = float(os.getenv('PUSH_HTTP_TIMEOUT', '10'))
+FCM_URL = os.getenv('FCM_URL')
+APNS_URL = os.getenv('APNS_URL')
+
+# Trending leaderboard (Valkey sorted sets published by update_trending_scores)
+# Each snapshot is kept this long so pagination cursors stay stable across refreshes
+TRENDING_LEADERBOARD_TTL = int(os.getenv('TRENDING_LEADERBOARD_TTL', '3600'))  # 1 hour
+
+# Engagement events (reads, saves, likes, whispers) are streamed through Valkey
+# and counted into StoryStatsDaily by consume_engagement_events in batches of
+# ENGAGEMENT_BATCH_SIZE. The stream is trimmed to about
+# ENGAGEMENT_STREAM_MAX_LENGTH entries, so it must cover any consumer outage
+ENGAGEMENT_STREAM_MAX_LENGTH = int(os.getenv('ENGAGEMENT_STREAM_MAX_LENGTH', '1000000'))
+ENGAGEMENT_BATCH_SIZE = int(os.getenv('ENGAGEMENT_BATCH_SIZE', '10000'))
+ENGAGEMENT_MAX_BATCHES_PER_RUN = int(os.getenv('ENGAGEMENT_MAX_BATCHES_PER_RUN', '50'))
+ENGAGEMENT_CONSUMER_LOCK_TTL = int(os.getenv('ENGAGEMENT_CONSUMER_LOCK_TTL', '300'))  # 5 minutes
+
+# For You feed: candidates scored per feed build (ranking cached for CACHE_TTL['recommendations'])
+FOR_YOU_CANDIDATE_POOL_SIZE = int(os.getenv('FOR_YOU_CANDIDATE_POOL_SIZE', '500'))
+
+# Story search totals: 'estimated' (query planner row estimate) or 'exact' (COUNT(*))
+SEARCH_COUNT_MODE = os.getenv('SEARCH_COUNT_MODE', 'estimated')
 
 # Rate Limiting Configuration
 # Distributed rate limiting using Redis/Valkey
@@ -409,6 +515,15 @@ RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', '60'))
 # Admin users bypass rate limits
 RATE_LIMIT_ADMIN_BYPASS = os.getenv('RATE_LIMIT_ADMIN_BYPASS', 'True') == 'True'
 
+# Global limit is counted across this many Valkey keys (each holds GLOBAL / SHARDS)
+RATE_LIMIT_GLOBAL_SHARDS = int(os.getenv('RATE_LIMIT_GLOBAL_SHARDS', '8'))
+
+# In-process pre-check: admit requests locally while a user is far from the limit
+# and record them in Valkey on the next check (approximate across processes)
+RATE_LIMIT_LOCAL_PRECHECK = os.getenv('RATE_LIMIT_LOCAL_PRECHECK', 'False') == 'True'
+RATE_LIMIT_LOCAL_SHARE = float(os.getenv('RATE_LIMIT_LOCAL_SHARE', '0.1'))  # of remaining requests
+RATE_LIMIT_LOCAL_TTL = float(os.getenv('RATE_LIMIT_LOCAL_TTL', '1.0'))  # seconds
+
 # django-ratelimit configuration
 # Use Redis cache backend for distributed rate limiting
 RATELIMIT_USE_CACHE = 'default'
@@ -427,6 +542,21 @@ AWS_ACCESS_KEY_ID = get_secret_value('api-keys/aws', 'access_key_id', 'AWS_ACCES
 AWS_SECRET_ACCESS_KEY = get_secret_value('api-keys/aws', 'secret_access_key', 'AWS_SECRET_ACCESS_KEY', '')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 AWS_S3_BUCKET = os.getenv('AWS_S3_BUCKET', 'muejam-media')
+# Multipart uploads (exports) are sent in parts of this size; S3's minimum is 5 MB
+S3_MULTIPART_PART_SIZE = int(os.getenv('S3_MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))
+
+# Analytics exports are read in keyset pages of ANALYTICS_EXPORT_PAGE_SIZE rows.
+# Exports with more than ANALYTICS_EXPORT_INLINE_MAX_ROWS rows are written to
+# ANALYTICS_EXPORT_BUCKET by a Celery task instead of streamed in the response
+ANALYTICS_EXPORT_PAGE_SIZE = int(os.getenv('ANALYTICS_EXPORT_PAGE_SIZE', '1000'))
+ANALYTICS_EXPORT_INLINE_MAX_ROWS = int(os.getenv('ANALYTICS_EXPORT_INLINE_MAX_ROWS', '50000'))
+ANALYTICS_EXPORT_BUCKET = os.getenv('ANALYTICS_EXPORT_BUCKET', AWS_S3_BUCKET)
+
+# GDPR data exports: each section of the archive is read in keyset batches of
+# DATA_EXPORT_BATCH_SIZE rows, with at most DATA_EXPORT_CONCURRENCY queries in flight
+DATA_EXPORT_BUCKET = os.getenv('DATA_EXPORT_BUCKET', 'muejam-data-exports')
+DATA_EXPORT_BATCH_SIZE = int(os.getenv('DATA_EXPORT_BATCH_SIZE', '500'))
+DATA_EXPORT_CONCURRENCY = int(os.getenv('DATA_EXPORT_CONCURRENCY', '4'))
 
 # Resend Email Configuration
 RESEND_API_KEY = get_secret_value('api-keys/resend', 'api_key', 'RESEND_API_KEY', '')
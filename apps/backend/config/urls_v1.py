@@ -7,6 +7,7 @@ Current stable API endpoints for both web and mobile clients.
 from django.urls import path, include
 from apps.stories import views as story_views
 from apps.highlights import views as highlight_views
+from apps.social import views as social_views
 from apps.notifications import urls as notification_urls
 from apps.core import urls as core_urls
 
@@ -16,6 +17,8 @@ urlpatterns = [
         # Social endpoints under users
         path('', include('apps.social.urls')),
     ])),
+    # Home timeline (followed authors' chapters and whispers)
+    path('timeline', social_views.home_timeline, name='home_timeline'),
     # Password reset endpoints
     path('', include('apps.users.password_reset.urls')),
     path('stories/', include('apps.stories.urls')),
@@ -0,0 +1,380 @@
+"""
+Sync-to-Async Bridge
+
+This module runs coroutines from synchronous code (DRF views, middleware,
+Celery tasks) on a single long-lived background event loop per worker
+process, replacing per-call ``asyncio.new_event_loop()`` / ``asyncio.run()``
+and thread-spawning helpers.
+
+Keeping one loop alive means loop-bound resources such as the shared Prisma
+client's HTTP session (see ``infrastructure.prisma_pool``) are reused across
+calls instead of being rebuilt for every database round trip.
+
+Usage:
+    from infrastructure.async_bridge import run_async
+
+    profile = run_async(get_or_create_profile(clerk_user_id))
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Sentinel for "use the bridge's default timeout" (None means wait forever)
+DEFAULT_TIMEOUT: Any = object()
+
+
+class AsyncBridge:
+    """
+    Runs coroutines on a dedicated event loop thread.
+
+    Submissions are bounded by a semaphore on the bridge loop so a burst of
+    slow calls cannot pile up unbounded work, and every blocking ``run`` call
+    is subject to a timeout.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        default_timeout: Optional[float] = 30.0,
+        thread_name: str = 'async-bridge'
+    ):
+        """
+        Initialize the bridge (the loop thread starts on first use).
+
+        Args:
+            max_concurrency: Maximum coroutines running on the bridge loop at once
+            default_timeout: Seconds to wait for a result (None waits forever)
+            thread_name: Name of the background loop thread
+        """
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.thread_name = thread_name
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        """Reset submission counters."""
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._reentrant_calls = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_queue_time = 0.0
+        self._total_run_time = 0.0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The bridge event loop, started on first access."""
+        self._ensure_process()
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            loop = self._start()
+        return loop
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = DEFAULT_TIMEOUT) -> T:
+        """
+        Run a coroutine on the bridge loop and block until it finishes.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait (defaults to ``default_timeout``; None waits forever)
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            TimeoutError: If the coroutine does not finish in time (it is cancelled)
+            Exception: Whatever the coroutine raised
+        """
+        if self._in_bridge_thread():
+            # Blocking the bridge loop on itself would deadlock; run this call
+            # on a private loop in a helper thread instead
+            with self._lock:
+                self._reentrant_calls += 1
+            return self._run_in_helper_thread(coro)
+
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise TimeoutError(f"Async bridge call timed out after {timeout}s")
+
+    def submit(self, coro: Awaitable[T]) -> 'concurrent.futures.Future[T]':
+        """
+        Schedule a coroutine on the bridge loop without waiting for it.
+
+        The caller's context variables (request-scoped tracing/logging state)
+        are copied into the task, as they would be with ``asyncio.run``.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            concurrent.futures.Future resolving to the coroutine's result
+        """
+        loop = self.loop
+        context = contextvars.copy_context()
+        future: 'concurrent.futures.Future[T]' = concurrent.futures.Future()
+        guarded = self._guarded(coro, time.monotonic())
+
+        def _copy_result(task: asyncio.Task) -> None:
+            # The future stays pending while the task runs so that
+            # future.cancel() from a timed-out caller still succeeds
+            if not future.set_running_or_notify_cancel():
+                return
+            if task.cancelled():
+                future.set_exception(concurrent.futures.CancelledError())
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def _schedule() -> None:
+            if future.cancelled():
+                guarded.close()
+                if hasattr(coro, 'close'):
+                    coro.close()
+                return
+            task = loop.create_task(guarded, context=context)
+            task.add_done_callback(_copy_result)
+            future.add_done_callback(
+                lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel)
+            )
+
+        with self._lock:
+            self._submitted += 1
+        loop.call_soon_threadsafe(_schedule)
+        return future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get bridge statistics.
+
+        Returns:
+            Dictionary of submission counters and average timings in milliseconds
+        """
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'running': self._loop is not None and self._loop.is_running(),
+                'max_concurrency': self.max_concurrency,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'timed_out': self._timed_out,
+                'reentrant_calls': self._reentrant_calls,
+                'in_flight': self._in_flight,
+                'peak_in_flight': self._peak_in_flight,
+                'avg_queue_time_ms': (self._total_queue_time / finished * 1000) if finished else 0.0,
+                'avg_run_time_ms': (self._total_run_time / finished * 1000) if finished else 0.0,
+            }
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop the bridge loop and join its thread.
+
+        Args:
+            timeout: Seconds to wait for the loop thread to exit
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+            self._semaphore = None
+
+        if loop is None:
+            return
+
+        if loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_cancel_pending_tasks(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Error cancelling async bridge tasks on shutdown: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+    async def _guarded(self, coro: Awaitable[T], submitted_at: float) -> T:
+        """Run a coroutine under the concurrency limit, recording timings."""
+        async with self._semaphore:
+            started_at = time.monotonic()
+            with self._lock:
+                self._in_flight += 1
+                self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+                self._total_queue_time += started_at - submitted_at
+
+            success = False
+            try:
+                result = await coro
+                success = True
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._total_run_time += time.monotonic() - started_at
+                    if success:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        """Create the loop and its thread if they are not running yet."""
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run_loop, name=self.thread_name, daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+            self._thread = thread
+
+            logger.info(
+                f"Started async bridge loop: max_concurrency={self.max_concurrency}, "
+                f"default_timeout={self.default_timeout}s"
+            )
+            return loop
+
+    def _in_bridge_thread(self) -> bool:
+        """Check whether the caller is running on the bridge loop thread."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    @staticmethod
+    def _run_in_helper_thread(coro: Awaitable[T]) -> T:
+        """Run a coroutine with ``asyncio.run`` on a short-lived helper thread."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    def _ensure_process(self) -> None:
+        """Reset state if we are running in a forked child (fallback when fork hooks are unavailable)."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+    def _reset_after_fork(self) -> None:
+        """Drop the parent's loop; its thread does not exist in the child."""
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._reset_stats()
+
+
+async def _cancel_pending_tasks() -> None:
+    """Cancel every other task on the running loop and wait for them to finish."""
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global async bridge instance
+_async_bridge: Optional[AsyncBridge] = None
+_async_bridge_lock = threading.Lock()
+
+
+def get_async_bridge() -> AsyncBridge:
+    """
+    Get the process-wide async bridge.
+
+    Returns:
+        Global AsyncBridge instance
+    """
+    global _async_bridge
+    if _async_bridge is None:
+        with _async_bridge_lock:
+            if _async_bridge is None:
+                from django.conf import settings
+                _async_bridge = AsyncBridge(
+                    max_concurrency=getattr(settings, 'ASYNC_BRIDGE_MAX_CONCURRENCY', 64),
+                    default_timeout=getattr(settings, 'ASYNC_BRIDGE_TIMEOUT', 30.0),
+                )
+    return _async_bridge
+
+
+def run_async(coro: Awaitable[T], timeout: Optional[float] = DEFAULT_TIMEOUT) -> T:
+    """
+    Run a coroutine from synchronous code on the shared bridge loop.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait (defaults to ASYNC_BRIDGE_TIMEOUT; None waits
+            forever, e.g. for long-running Celery tasks)
+
+    Returns:
+        The coroutine's result
+    """
+    return get_async_bridge().run(coro, timeout=timeout)
+
+
+def get_async_bridge_stats() -> Dict[str, Any]:
+    """
+    Get stats for this process's bridge without starting it.
+
+    Returns:
+        Bridge counters, or an empty dict if the bridge was never used
+    """
+    bridge = _async_bridge
+    if bridge is None:
+        return {}
+    return bridge.get_stats()
+
+
+def reset_async_bridge() -> None:
+    """
+    Shut down and reset the global async bridge.
+
+    Useful for testing.
+    """
+    global _async_bridge
+    if _async_bridge is not None:
+        _async_bridge.shutdown()
+    _async_bridge = None
+
+
+def _reset_async_bridge_after_fork() -> None:
+    """Fork hook: the parent's loop thread is not copied into the child."""
+    global _async_bridge_lock
+    _async_bridge_lock = threading.Lock()
+    if _async_bridge is not None:
+        _async_bridge._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_async_bridge_after_fork)
@@ -7,18 +7,38 @@ This module implements a two-tier caching strategy:
 
 The cache manager checks L1 first, then L2, and populates both layers
 on cache misses. Invalidation affects both layers to maintain consistency.
+
+L2 values carry their expiry inside the payload, so an L1 miss costs a
+single GET (or one MGET for get_many); writes and tag bookkeeping are
+pipelined. Invalidations are broadcast over Valkey pub/sub so other app
+instances drop their L1 copies too; one subscriber per process serves every
+L1 cache in it and is restarted after a fork.
 """
 
 import json
+import math
+import os
+import random
+import struct
+import sys
 import time
+import uuid
+import weakref
 from collections import OrderedDict
-from datetime import datetime, timedelta
-from threading import Lock
-from typing import Any, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
 import redis
 from redis.exceptions import RedisError
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
 try:
     from django.conf import settings
     DJANGO_AVAILABLE = True
@@ -26,7 +46,132 @@ except ImportError:
     DJANGO_AVAILABLE = False
     settings = None
 
-from .models import CacheEntry, CacheStats, CacheWarmQuery
+from .models import CacheStats, CacheWarmQuery
+
+
+# L2 payload: marker, absolute expiry (unix seconds, big-endian double), body.
+# 0xC1 never starts valid UTF-8, so legacy plain-JSON values are still readable.
+PAYLOAD_MARKER = b'\xc1\x01'
+PAYLOAD_HEADER = struct.Struct('>d')
+PAYLOAD_OFFSET = len(PAYLOAD_MARKER) + PAYLOAD_HEADER.size
+
+
+def dumps_value(value: Any) -> bytes:
+    """
+    Serialize a cache value (orjson when installed, json otherwise).
+
+    Non-string dict keys are stringified as json.dumps does; anything orjson
+    still rejects (e.g. integers wider than 64 bits) falls back to json.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(value).encode('utf-8')
+
+
+def loads_value(data: bytes) -> Any:
+    """Deserialize a value written by dumps_value."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_payload(value: Any, ttl: int) -> bytes:
+    """Pack a value with its expiry so readers need no separate TTL call."""
+    return PAYLOAD_MARKER + PAYLOAD_HEADER.pack(time.time() + ttl) + dumps_value(value)
+
+
+def decode_payload(data: bytes, default_ttl: int) -> tuple:
+    """
+    Unpack an L2 payload.
+    
+    Returns:
+        Tuple of (value, remaining TTL in seconds)
+    """
+    if data[:len(PAYLOAD_MARKER)] != PAYLOAD_MARKER:
+        # Written before TTLs were embedded
+        return loads_value(data), default_ttl
+    expires_at, = PAYLOAD_HEADER.unpack_from(data, len(PAYLOAD_MARKER))
+    value = loads_value(data[PAYLOAD_OFFSET:])
+    return value, max(0, int(expires_at - time.time()))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Estimate the memory footprint of a cached value in bytes.
+    
+    Walks containers a few levels deep; anything deeper is counted with
+    sys.getsizeof only. The estimate is meant for capacity limits, not
+    exact accounting.
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _L1Entry:
+    """Cached value with its monotonic expiry deadline."""
+    
+    __slots__ = ('value', 'expires_at', 'tags', 'size')
+    
+    def __init__(self, value: Any, expires_at: float, tags: tuple, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+        self.size = size
+
+
+class _LRUShard:
+    """One independently locked LRU segment of an LRUCache."""
+    
+    __slots__ = (
+        'lock', 'entries', 'tag_index', 'max_size', 'max_bytes',
+        'bytes', 'hits', 'misses', 'evictions'
+    )
+    
+    def __init__(self, max_size: int, max_bytes: int):
+        self.lock = Lock()
+        self.entries: 'OrderedDict[str, _L1Entry]' = OrderedDict()
+        self.tag_index: Dict[str, Set[str]] = {}
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def remove(self, key: str) -> Optional[_L1Entry]:
+        """Remove an entry and its tag index references. Caller holds the lock."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry.size
+        for tag in entry.tags:
+            keys = self.tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tag_index[tag]
+        return entry
+    
+    def evict_over_capacity(self) -> None:
+        """Drop least recently used entries until within limits. Caller holds the lock."""
+        entries = self.entries
+        while entries and (
+            len(entries) > self.max_size
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        ):
+            self.remove(next(iter(entries)))
+            self.evictions += 1
 
 
 class LRUCache:
@@ -35,23 +180,56 @@ class LRUCache:
     
     Implements Least Recently Used eviction policy with a maximum size
     of 1000 entries and default TTL of 60 seconds.
+    
+    Keys are spread over independently locked shards so threads working on
+    different keys rarely wait on each other; recency and capacity are kept
+    per shard. Expiry uses time.monotonic(), tags are indexed so tag
+    invalidation only touches the tagged keys, and an optional byte budget
+    bounds memory in addition to the entry count.
     """
     
-    def __init__(self, max_size: int = 1000, default_ttl: int = 60):
+    # Shards are only worth it once each one still holds a useful LRU window
+    MIN_ENTRIES_PER_SHARD = 64
+    
+    def __init__(
+        self,
+        max_size: int = 1000,
+        default_ttl: int = 60,
+        max_bytes: int = 0,
+        shards: Optional[int] = None
+    ):
         """
         Initialize LRU cache.
         
         Args:
             max_size: Maximum number of entries (default: 1000)
             default_ttl: Default time-to-live in seconds (default: 60)
+            max_bytes: Approximate memory budget in bytes (0 for no limit)
+            shards: Number of lock shards (default: up to 16, at least
+                MIN_ENTRIES_PER_SHARD entries each)
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
-        self.lock = Lock()
-        self.hits = 0
-        self.misses = 0
-        self.evictions = 0
+        self.max_bytes = max_bytes
+        
+        if shards is None:
+            shards = min(16, max_size // self.MIN_ENTRIES_PER_SHARD)
+        shard_count = max(1, min(shards, max_size))
+        
+        # Split the limits so the shards add up to exactly the configured totals
+        size_base, size_extra = divmod(max_size, shard_count)
+        bytes_base, bytes_extra = divmod(max_bytes, shard_count)
+        self._shards = [
+            _LRUShard(
+                size_base + (1 if i < size_extra else 0),
+                bytes_base + (1 if i < bytes_extra else 0) if max_bytes else 0
+            )
+            for i in range(shard_count)
+        ]
+        self._shard_count = shard_count
+    
+    def _shard(self, key: str) -> _LRUShard:
+        return self._shards[hash(key) % self._shard_count]
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -63,25 +241,22 @@ class LRUCache:
         Returns:
             Cached value if found and not expired, None otherwise
         """
-        with self.lock:
-            if key not in self.cache:
-                self.misses += 1
+        shard = self._shards[hash(key) % self._shard_count]
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.misses += 1
                 return None
             
-            entry = self.cache[key]
-            
-            # Check if entry has expired
-            age = (datetime.now() - entry.created_at).total_seconds()
-            if age > entry.ttl:
+            if entry.expires_at <= time.monotonic():
                 # Entry expired, remove it
-                del self.cache[key]
-                self.misses += 1
+                shard.remove(key)
+                shard.misses += 1
                 return None
             
             # Move to end (most recently used)
-            self.cache.move_to_end(key)
-            entry.access_count += 1
-            self.hits += 1
+            shard.entries.move_to_end(key)
+            shard.hits += 1
             return entry.value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None) -> None:
@@ -94,32 +269,47 @@ class LRUCache:
             ttl: Time-to-live in seconds (uses default if not specified)
             tags: Optional tags for tag-based invalidation
         """
-        with self.lock:
-            # Use default TTL if not specified
-            actual_ttl = ttl if ttl is not None else self.default_ttl
+        # Use default TTL if not specified
+        actual_ttl = ttl if ttl is not None else self.default_ttl
+        tags = tuple(tags) if tags else ()
+        # Sizing walks the value, so do it before taking the lock
+        size = estimate_size(value) if self.max_bytes else 0
+        entry = _L1Entry(value, time.monotonic() + actual_ttl, tags, size)
+        
+        shard = self._shard(key)
+        with shard.lock:
+            shard.remove(key)
             
-            # Create cache entry
-            entry = CacheEntry(
-                key=key,
-                value=value,
-                ttl=actual_ttl,
-                tags=tags or [],
-                created_at=datetime.now(),
-                access_count=0
-            )
+            if shard.max_bytes and size > shard.max_bytes:
+                # Larger than the whole shard; caching it would flush everything else
+                return
             
-            # If key exists, update it
-            if key in self.cache:
-                self.cache[key] = entry
-                self.cache.move_to_end(key)
-            else:
-                # Check if we need to evict
-                if len(self.cache) >= self.max_size:
-                    # Remove least recently used item
-                    self.cache.popitem(last=False)
-                    self.evictions += 1
-                
-                self.cache[key] = entry
+            shard.entries[key] = entry
+            shard.bytes += size
+            for tag in tags:
+                shard.tag_index.setdefault(tag, set()).add(key)
+            
+            shard.evict_over_capacity()
+    
+    def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Set value only if the key is absent or expired.
+        
+        Returns:
+            True if the value was stored
+        """
+        actual_ttl = ttl if ttl is not None else self.default_ttl
+        size = estimate_size(value) if self.max_bytes else 0
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                return False
+            shard.remove(key)
+            shard.entries[key] = _L1Entry(value, time.monotonic() + actual_ttl, (), size)
+            shard.bytes += size
+            shard.evict_over_capacity()
+            return True
     
     def delete(self, key: str) -> bool:
         """
@@ -131,11 +321,9 @@ class LRUCache:
         Returns:
             True if key was found and deleted, False otherwise
         """
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                return True
-            return False
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.remove(key) is not None
     
     def delete_by_tags(self, tags: List[str]) -> int:
         """
@@ -147,23 +335,45 @@ class LRUCache:
         Returns:
             Number of entries deleted
         """
-        with self.lock:
-            tag_set = set(tags)
-            keys_to_delete = []
-            
-            for key, entry in self.cache.items():
-                if any(tag in tag_set for tag in entry.tags):
-                    keys_to_delete.append(key)
-            
-            for key in keys_to_delete:
-                del self.cache[key]
-            
-            return len(keys_to_delete)
+        deleted = 0
+        for shard in self._shards:
+            with shard.lock:
+                for tag in tags:
+                    keys = shard.tag_index.get(tag)
+                    if not keys:
+                        continue
+                    for key in list(keys):
+                        if shard.remove(key) is not None:
+                            deleted += 1
+        return deleted
     
     def clear(self) -> None:
         """Clear all entries from cache."""
-        with self.lock:
-            self.cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.tag_index.clear()
+                shard.bytes = 0
+    
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+    
+    @property
+    def hits(self) -> int:
+        return sum(shard.hits for shard in self._shards)
+    
+    @property
+    def misses(self) -> int:
+        return sum(shard.misses for shard in self._shards)
+    
+    @property
+    def evictions(self) -> int:
+        return sum(shard.evictions for shard in self._shards)
+    
+    @property
+    def size_bytes(self) -> int:
+        """Estimated bytes held (0 when no byte budget is configured)."""
+        return sum(shard.bytes for shard in self._shards)
     
     def get_stats(self) -> CacheStats:
         """
@@ -172,18 +382,453 @@ class LRUCache:
         Returns:
             CacheStats object with current statistics
         """
-        with self.lock:
-            total_requests = self.hits + self.misses
-            hit_rate = self.hits / total_requests if total_requests > 0 else 0.0
+        hits = misses = evictions = size = 0
+        for shard in self._shards:
+            with shard.lock:
+                hits += shard.hits
+                misses += shard.misses
+                evictions += shard.evictions
+                size += len(shard.entries)
+        
+        total_requests = hits + misses
+        hit_rate = hits / total_requests if total_requests > 0 else 0.0
+        
+        return CacheStats(
+            hits=hits,
+            misses=misses,
+            hit_rate=hit_rate,
+            evictions=evictions,
+            size=size,
+            max_size=self.max_size
+        )
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key within this process.
+    
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and receive the same result (or exception).
+    """
+    
+    class _Call:
+        __slots__ = ('event', 'result', 'error')
+        
+        def __init__(self):
+            self.event = Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[str, 'SingleFlight._Call'] = {}
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run func for key unless a call for key is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+_default_flight = SingleFlight()
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_executor_lock = Lock()
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    """Shared pool for stale-while-revalidate refreshes."""
+    global _refresh_executor
+    if _refresh_executor is None:
+        with _refresh_executor_lock:
+            if _refresh_executor is None:
+                workers = getattr(settings, 'CACHE_REFRESH_WORKERS', 4) if DJANGO_AVAILABLE and settings else 4
+                _refresh_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-refresh')
+    return _refresh_executor
+
+
+def _close_thread_connections() -> None:
+    """Release DB connections opened by a refresh on a pool thread."""
+    if DJANGO_AVAILABLE:
+        try:
+            from django.db import connections
+            connections.close_all()
+        except Exception:
+            pass
+
+
+class CacheStampedeGuard:
+    """
+    Stampede protection for a cache with get/set/add/delete.
+    
+    Works over CacheManager or Django's cache. Values are stored in an
+    envelope with their freshness deadline and recompute time:
+    - Misses are filled once per key: in-process via SingleFlight and
+      across instances via an add() lock; other instances wait for the
+      value instead of querying themselves.
+    - Entries are refreshed early with probability rising towards expiry
+      (XFetch), so hot keys are rarely seen expired.
+    - Entries are kept stale_ttl seconds past freshness and served while a
+      background task recomputes them.
+    """
+    
+    ENVELOPE_MARKER = '__swr__'
+    LOCK_PREFIX = 'lock:fill:'
+    POLL_INTERVAL = 0.05
+    
+    def __init__(
+        self,
+        cache: Any,
+        lock_timeout: Optional[float] = None,
+        wait_timeout: Optional[float] = None,
+        beta: Optional[float] = None,
+        flight: Optional[SingleFlight] = None,
+        executor: Any = None
+    ):
+        """
+        Initialize the guard.
+        
+        Args:
+            cache: Cache with get(key), set(key, value, ttl), add(key, value, ttl), delete(key)
+            lock_timeout: Seconds a fill lock is held at most (defaults to settings.CACHE_FILL_LOCK_TIMEOUT)
+            wait_timeout: Seconds to wait for another instance's fill (defaults to settings.CACHE_FILL_WAIT_TIMEOUT)
+            beta: Early refresh aggressiveness, 0 disables (defaults to settings.CACHE_EARLY_REFRESH_BETA)
+            flight: In-process coalescing (defaults to a shared SingleFlight)
+            executor: Runs background refreshes (defaults to a shared thread pool)
+        """
+        use_settings = DJANGO_AVAILABLE and settings
+        self.cache = cache
+        self.lock_timeout = lock_timeout if lock_timeout is not None else (
+            getattr(settings, 'CACHE_FILL_LOCK_TIMEOUT', 10) if use_settings else 10
+        )
+        self.wait_timeout = wait_timeout if wait_timeout is not None else (
+            getattr(settings, 'CACHE_FILL_WAIT_TIMEOUT', 5) if use_settings else 5
+        )
+        self.beta = beta if beta is not None else (
+            getattr(settings, 'CACHE_EARLY_REFRESH_BETA', 1.0) if use_settings else 1.0
+        )
+        self.flight = flight or _default_flight
+        self.executor = executor
+        self._refreshing: Set[str] = set()
+        self._refreshing_lock = Lock()
+    
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        stale_ttl: int = 0,
+        **set_kwargs
+    ) -> Any:
+        """
+        Return the cached value for key, computing it at most once per fill.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value
+            ttl: Seconds the value is fresh
+            stale_ttl: Extra seconds a stale value may be served while refreshing
+            **set_kwargs: Passed to cache.set (e.g. tags for CacheManager)
             
-            return CacheStats(
-                hits=self.hits,
-                misses=self.misses,
-                hit_rate=hit_rate,
-                evictions=self.evictions,
-                size=len(self.cache),
-                max_size=self.max_size
-            )
+        Returns:
+            Cached or computed value
+        """
+        entry = self._read(key)
+        if entry is not None:
+            value, fresh_until, delta = entry
+            if not self._should_refresh(fresh_until, delta):
+                return value
+            # Serve what we have; one background task recomputes it
+            self._refresh_in_background(key, compute, ttl, stale_ttl, set_kwargs)
+            return value
+        
+        return self.flight.do(key, lambda: self._fill(key, compute, ttl, stale_ttl, set_kwargs))
+    
+    def _read(self, key: str) -> Optional[tuple]:
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        if isinstance(cached, dict) and cached.get(self.ENVELOPE_MARKER):
+            return cached['value'], cached['fresh_until'], cached['delta']
+        # Plain value written without the guard; treat as fresh
+        return cached, math.inf, 0.0
+    
+    def _should_refresh(self, fresh_until: float, delta: float) -> bool:
+        now = time.time()
+        if now >= fresh_until:
+            return True
+        if self.beta <= 0 or delta <= 0:
+            return False
+        # XFetch: expected recompute time scaled by -ln(U) pulls the deadline forward
+        return now - delta * self.beta * math.log(1.0 - random.random()) >= fresh_until
+    
+    def _fill(self, key: str, compute: Callable[[], Any], ttl: int, stale_ttl: int, set_kwargs: dict) -> Any:
+        # Another thread may have filled the key while we queued for it
+        entry = self._read(key)
+        if entry is not None:
+            return entry[0]
+        
+        token = self._acquire_lock(key)
+        if token is None:
+            value = self._wait_for_fill(key)
+            if value is not None:
+                return value
+            # Gave up waiting; compute without the lock rather than fail
+            return self._compute_and_store(key, compute, ttl, stale_ttl, set_kwargs)
+        
+        try:
+            return self._compute_and_store(key, compute, ttl, stale_ttl, set_kwargs)
+        finally:
+            self._release_lock(key, token)
+    
+    def _compute_and_store(self, key: str, compute: Callable[[], Any], ttl: int, stale_ttl: int, set_kwargs: dict) -> Any:
+        start = time.time()
+        value = compute()
+        now = time.time()
+        if value is not None:
+            envelope = {
+                self.ENVELOPE_MARKER: 1,
+                'value': value,
+                'fresh_until': now + ttl,
+                'delta': now - start,
+            }
+            self.cache.set(key, envelope, ttl + stale_ttl, **set_kwargs)
+        return value
+    
+    def _acquire_lock(self, key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            if self.cache.add(self.LOCK_PREFIX + key, token, math.ceil(self.lock_timeout)):
+                return token
+            return None
+        except Exception as e:
+            print(f"Warning: Fill lock unavailable for key {key}: {e}")
+            return token
+    
+    def _release_lock(self, key: str, token: str) -> None:
+        lock_key = self.LOCK_PREFIX + key
+        try:
+            # Only drop our own lock; it may have expired and been taken over
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+        except Exception as e:
+            print(f"Warning: Fill lock release failed for key {key}: {e}")
+    
+    def _wait_for_fill(self, key: str) -> Optional[Any]:
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+            entry = self._read(key)
+            if entry is not None:
+                return entry[0]
+        return None
+    
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: int, stale_ttl: int, set_kwargs: dict) -> None:
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                token = self._acquire_lock(key)
+                if token is None:
+                    # Another instance is already refreshing
+                    return
+                try:
+                    self._compute_and_store(key, compute, ttl, stale_ttl, set_kwargs)
+                finally:
+                    self._release_lock(key, token)
+            except Exception as e:
+                print(f"Warning: Background refresh failed for key {key}: {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+                _close_thread_connections()
+        
+        try:
+            (self.executor or _get_refresh_executor()).submit(refresh)
+        except RuntimeError:
+            # Executor shut down (interpreter exit); the stale value is still served
+            with self._refreshing_lock:
+                self._refreshing.discard(key)
+
+
+class L1InvalidationListener:
+    """
+    Process-wide Valkey pub/sub subscriber for L1 invalidations.
+    
+    Every L1 cache in the process registers here, so one connection and one
+    thread serve them all. A message is applied to every registered cache
+    except the one that published it. Forked children (Celery prefork,
+    gunicorn workers) do not inherit the parent's thread, so the subscriber
+    is restarted in the child.
+    """
+    
+    def __init__(self, channel: str):
+        """
+        Initialize the listener (the subscriber starts on first registration).
+        
+        Args:
+            channel: Pub/sub channel invalidations are published on
+        """
+        self.channel = channel
+        self.client = None
+        self._caches = weakref.WeakValueDictionary()
+        self._thread = None
+        self._lock = Lock()
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def register(self, l1_cache: 'LRUCache', client) -> Optional[str]:
+        """
+        Apply invalidations published by other caches to l1_cache.
+        
+        Args:
+            l1_cache: L1 cache to keep in sync
+            client: Valkey client, used if the subscriber is not running yet
+            
+        Returns:
+            Origin ID to publish this cache's invalidations under, or None
+            if the subscriber could not be started
+        """
+        with self._lock:
+            if self._thread is None:
+                self.client = client
+                self._start()
+            if self._thread is None:
+                return None
+            origin = uuid.uuid4().hex
+            self._caches[origin] = l1_cache
+            return origin
+    
+    def unregister(self, origin: Optional[str]) -> None:
+        """Stop applying invalidations to a registered cache."""
+        with self._lock:
+            self._caches.pop(origin, None)
+    
+    def publish(self, origin: str, keys: Optional[List[str]] = None, tags: Optional[List[str]] = None) -> None:
+        """Tell the other registered caches, here and on other instances, to drop entries."""
+        if self._thread is None:
+            return
+        try:
+            message = dumps_value({
+                'origin': origin,
+                'keys': keys or [],
+                'tags': tags or [],
+            })
+            self.client.publish(self.channel, message)
+        except Exception as e:
+            print(f"Warning: L1 invalidation broadcast failed: {e}")
+    
+    def dispatch(self, message: dict) -> None:
+        """Apply a published invalidation to every cache but its origin."""
+        try:
+            payload = loads_value(message['data'])
+        except (KeyError, TypeError, ValueError):
+            return
+        origin = payload.get('origin')
+        keys = payload.get('keys') or ()
+        tags = payload.get('tags')
+        for cache_origin, l1_cache in list(self._caches.items()):
+            if cache_origin == origin:
+                continue
+            for key in keys:
+                l1_cache.delete(key)
+            if tags:
+                l1_cache.delete_by_tags(tags)
+    
+    def stop(self) -> None:
+        """Stop the subscriber thread."""
+        with self._lock:
+            if self._thread is not None:
+                self._thread.stop()
+                self._thread = None
+    
+    def _start(self) -> None:
+        try:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self.dispatch})
+            self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception as e:
+            print(f"Warning: L1 invalidation listener failed to start: {e}")
+    
+    def _after_fork(self) -> None:
+        # The parent's thread is gone; its connection pool resets itself on
+        # the first command from the new pid
+        self._lock = Lock()
+        self._thread = None
+        if self.client is not None and len(self._caches):
+            self._start()
+
+
+_invalidation_listeners: Dict[str, L1InvalidationListener] = {}
+_invalidation_listeners_lock = Lock()
+
+
+def get_invalidation_listener(channel: Optional[str] = None) -> L1InvalidationListener:
+    """
+    Get the process-wide L1 invalidation listener for a channel.
+    
+    Args:
+        channel: Pub/sub channel (defaults to settings.L1_CACHE_INVALIDATION_CHANNEL)
+        
+    Returns:
+        Shared L1InvalidationListener
+    """
+    if channel is None:
+        channel = (
+            getattr(settings, 'L1_CACHE_INVALIDATION_CHANNEL', 'cache:l1:invalidate')
+            if DJANGO_AVAILABLE and settings else 'cache:l1:invalidate'
+        )
+    with _invalidation_listeners_lock:
+        listener = _invalidation_listeners.get(channel)
+        if listener is None:
+            listener = _invalidation_listeners[channel] = L1InvalidationListener(channel)
+        return listener
+
+
+def reset_invalidation_listeners() -> None:
+    """
+    Stop and forget the process-wide invalidation listeners.
+    
+    Useful for testing.
+    """
+    with _invalidation_listeners_lock:
+        for listener in _invalidation_listeners.values():
+            listener.stop()
+        _invalidation_listeners.clear()
+
+
+def _restart_invalidation_listeners() -> None:
+    global _invalidation_listeners_lock
+    _invalidation_listeners_lock = Lock()
+    for listener in _invalidation_listeners.values():
+        listener._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_invalidation_listeners)
 
 
 class CacheManager:
@@ -202,7 +847,9 @@ class CacheManager:
         self,
         redis_url: Optional[str] = None,
         l1_max_size: Optional[int] = None,
-        l1_default_ttl: Optional[int] = None
+        l1_default_ttl: Optional[int] = None,
+        l1_max_bytes: Optional[int] = None,
+        l1_invalidation: Optional[bool] = None
     ):
         """
         Initialize cache manager.
@@ -211,6 +858,9 @@ class CacheManager:
             redis_url: Redis connection URL (defaults to settings.VALKEY_URL)
             l1_max_size: Maximum size of L1 cache (defaults to settings.L1_CACHE_MAX_SIZE)
             l1_default_ttl: Default TTL for L1 cache in seconds (defaults to settings.L1_CACHE_DEFAULT_TTL)
+            l1_max_bytes: Memory budget for L1 cache in bytes (defaults to settings.L1_CACHE_MAX_BYTES)
+            l1_invalidation: Broadcast and apply L1 invalidations over Valkey pub/sub
+                (defaults to settings.L1_CACHE_INVALIDATION_ENABLED)
         """
         # Use settings values if not provided and Django is available
         if redis_url is None:
@@ -231,7 +881,20 @@ class CacheManager:
             else:
                 l1_default_ttl = 60
         
-        self.l1_cache = LRUCache(max_size=l1_max_size, default_ttl=l1_default_ttl)
+        if l1_max_bytes is None:
+            if DJANGO_AVAILABLE and settings:
+                l1_max_bytes = getattr(settings, 'L1_CACHE_MAX_BYTES', 0)
+            else:
+                l1_max_bytes = 0
+        
+        l1_shards = getattr(settings, 'L1_CACHE_SHARDS', None) if DJANGO_AVAILABLE and settings else None
+        
+        self.l1_cache = LRUCache(
+            max_size=l1_max_size,
+            default_ttl=l1_default_ttl,
+            max_bytes=l1_max_bytes,
+            shards=l1_shards
+        )
         
         # Initialize Redis client
         try:
@@ -247,6 +910,18 @@ class CacheManager:
         # Tag tracking for Redis (store tag -> keys mapping)
         self.tag_prefix = "cache:tag:"
         self.key_prefix = "cache:data:"
+        
+        # L1 invalidation broadcast between app instances
+        if l1_invalidation is None:
+            if DJANGO_AVAILABLE and settings:
+                l1_invalidation = getattr(settings, 'L1_CACHE_INVALIDATION_ENABLED', True)
+            else:
+                l1_invalidation = True
+        self.stampede_guard = CacheStampedeGuard(self)
+        self.invalidation_listener = None
+        self.instance_id = None
+        if l1_invalidation and self.redis_available:
+            self.start_invalidation_listener()
     
     def get_ttl_for_type(self, cache_type: str) -> int:
         """
@@ -283,27 +958,57 @@ class CacheManager:
         # Check L2 cache if available
         if self.redis_available and self.l2_cache:
             try:
-                redis_key = self.key_prefix + key
-                data = self.l2_cache.get(redis_key)
-                
+                data = self.l2_cache.get(self.key_prefix + key)
                 if data is not None:
-                    # Deserialize value
-                    value = json.loads(data)
-                    
-                    # Get TTL from Redis
-                    ttl = self.l2_cache.ttl(redis_key)
-                    if ttl < 0:
-                        ttl = self.l1_cache.default_ttl
-                    
-                    # Populate L1 cache
-                    self.l1_cache.set(key, value, ttl=ttl)
-                    
-                    return value
-            except (RedisError, json.JSONDecodeError) as e:
+                    return self._populate_l1(key, data)
+            except (RedisError, ValueError) as e:
                 print(f"Warning: Redis get failed for key {key}: {e}")
         
         return None
     
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get several values, fetching all L1 misses with one MGET.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Dict of key -> value for the keys found in either layer
+        """
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in keys:
+            value = self.l1_cache.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        
+        if missing and self.redis_available and self.l2_cache:
+            try:
+                payloads = self.l2_cache.mget([self.key_prefix + key for key in missing])
+            except RedisError as e:
+                print(f"Warning: Redis get_many failed: {e}")
+                return found
+            
+            for key, data in zip(missing, payloads):
+                if data is None:
+                    continue
+                try:
+                    found[key] = self._populate_l1(key, data)
+                except ValueError as e:
+                    print(f"Warning: Cached value for key {key} is unreadable: {e}")
+        
+        return found
+    
+    def _populate_l1(self, key: str, data: bytes) -> Any:
+        """Decode an L2 payload and copy it into L1 for its remaining TTL."""
+        value, ttl = decode_payload(data, self.l1_cache.default_ttl)
+        if ttl > 0:
+            self.l1_cache.set(key, value, ttl=ttl)
+        return value
+    
     def set(self, key: str, value: Any, ttl: int, tags: Optional[List[str]] = None) -> None:
         """
         Set value in both cache layers.
@@ -314,29 +1019,102 @@ class CacheManager:
             ttl: Time-to-live in seconds
             tags: Optional tags for tag-based invalidation
         """
+        self.set_many({key: value}, ttl, tags=tags)
+    
+    def set_many(self, items: Dict[str, Any], ttl: int, tags: Optional[List[str]] = None) -> None:
+        """
+        Set several values in both layers with one pipelined L2 round trip.
+        
+        Args:
+            items: Dict of key -> value
+            ttl: Time-to-live in seconds
+            tags: Optional tags applied to every key
+        """
+        if not items:
+            return
+        
         # Set in L1 cache
-        self.l1_cache.set(key, value, ttl=ttl, tags=tags)
+        for key, value in items.items():
+            self.l1_cache.set(key, value, ttl=ttl, tags=tags)
         
         # Set in L2 cache if available
         if self.redis_available and self.l2_cache:
             try:
-                redis_key = self.key_prefix + key
-                
-                # Serialize value
-                data = json.dumps(value)
-                
-                # Set with TTL
-                self.l2_cache.setex(redis_key, ttl, data)
+                pipe = self.l2_cache.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.set(self.key_prefix + key, encode_payload(value, ttl), ex=ttl)
                 
                 # Store tag associations
-                if tags:
-                    for tag in tags:
-                        tag_key = self.tag_prefix + tag
-                        self.l2_cache.sadd(tag_key, key)
-                        # Set expiration on tag set (use max TTL to avoid premature deletion)
-                        self.l2_cache.expire(tag_key, ttl * 2)
+                for tag in tags or ():
+                    tag_key = self.tag_prefix + tag
+                    pipe.sadd(tag_key, *items.keys())
+                    # Set expiration on tag set (use max TTL to avoid premature deletion)
+                    pipe.expire(tag_key, ttl * 2)
+                
+                pipe.execute()
             except Exception as e:
-                print(f"Warning: Redis set failed for key {key}: {e}")
+                print(f"Warning: Redis set failed for keys {list(items)[:5]}: {e}")
+    
+    def add(self, key: str, value: Any, ttl: int) -> bool:
+        """
+        Set a value only if the key is absent (atomic in L2).
+        
+        Used for short-lived locks, so the value is not copied into L1.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Time-to-live in seconds
+            
+        Returns:
+            True if the value was stored, False if the key already existed
+        """
+        if self.redis_available and self.l2_cache:
+            try:
+                return bool(self.l2_cache.set(self.key_prefix + key, encode_payload(value, ttl), nx=True, ex=ttl))
+            except RedisError as e:
+                print(f"Warning: Redis add failed for key {key}: {e}")
+        return self.l1_cache.add(key, value, ttl=ttl)
+    
+    def delete(self, key: str) -> None:
+        """
+        Delete a key from this instance's L1 and from L2 without broadcasting.
+        
+        Args:
+            key: Cache key
+        """
+        self.l1_cache.delete(key)
+        if self.redis_available and self.l2_cache:
+            try:
+                self.l2_cache.delete(self.key_prefix + key)
+            except RedisError as e:
+                print(f"Warning: Redis delete failed for key {key}: {e}")
+    
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        tags: Optional[List[str]] = None,
+        stale_ttl: int = 0
+    ) -> Any:
+        """
+        Get a value, computing it once per fill with stampede protection.
+        
+        See CacheStampedeGuard. Keys filled this way hold an envelope, so
+        read them through get_or_compute rather than get.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value
+            ttl: Seconds the value is fresh
+            tags: Optional tags for tag-based invalidation
+            stale_ttl: Extra seconds a stale value may be served while refreshing
+            
+        Returns:
+            Cached or computed value
+        """
+        return self.stampede_guard.get_or_compute(key, compute, ttl, stale_ttl=stale_ttl, tags=tags)
     
     def invalidate(self, key: str) -> None:
         """
@@ -345,16 +1123,30 @@ class CacheManager:
         Args:
             key: Cache key to invalidate
         """
+        self.invalidate_many([key])
+    
+    def invalidate_many(self, keys: Iterable[str]) -> None:
+        """
+        Invalidate several entries in both layers and on other instances.
+        
+        Args:
+            keys: Cache keys to invalidate
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        
         # Invalidate in L1
-        self.l1_cache.delete(key)
+        for key in keys:
+            self.l1_cache.delete(key)
         
         # Invalidate in L2 if available
         if self.redis_available and self.l2_cache:
             try:
-                redis_key = self.key_prefix + key
-                self.l2_cache.delete(redis_key)
+                self.l2_cache.delete(*[self.key_prefix + key for key in keys])
             except Exception as e:
-                print(f"Warning: Redis delete failed for key {key}: {e}")
+                print(f"Warning: Redis delete failed for keys {keys[:5]}: {e}")
+            self._broadcast_invalidation(keys=keys)
     
     def invalidate_by_tags(self, tags: List[str]) -> None:
         """
@@ -367,23 +1159,44 @@ class CacheManager:
         self.l1_cache.delete_by_tags(tags)
         
         # Invalidate in L2 if available
-        if self.redis_available and self.l2_cache:
+        if self.redis_available and self.l2_cache and tags:
             try:
-                for tag in tags:
-                    tag_key = self.tag_prefix + tag
-                    
-                    # Get all keys with this tag
-                    keys = self.l2_cache.smembers(tag_key)
-                    
-                    if keys:
-                        # Delete all associated cache entries
-                        redis_keys = [self.key_prefix + k.decode() if isinstance(k, bytes) else self.key_prefix + k for k in keys]
-                        self.l2_cache.delete(*redis_keys)
-                        
-                        # Delete the tag set itself
-                        self.l2_cache.delete(tag_key)
+                tag_keys = [self.tag_prefix + tag for tag in tags]
+                
+                # Read every tag set in one round trip
+                pipe = self.l2_cache.pipeline(transaction=False)
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                members = pipe.execute()
+                
+                redis_keys = {
+                    self.key_prefix + (k.decode() if isinstance(k, bytes) else k)
+                    for keys in members if keys
+                    for k in keys
+                }
+                # Delete the cache entries and the tag sets themselves
+                self.l2_cache.delete(*redis_keys, *tag_keys)
             except Exception as e:
                 print(f"Warning: Redis tag-based invalidation failed: {e}")
+            self._broadcast_invalidation(tags=tags)
+    
+    def _broadcast_invalidation(self, keys: Optional[List[str]] = None, tags: Optional[List[str]] = None) -> None:
+        """Tell other caches to drop the same entries from their L1."""
+        if self.instance_id is not None:
+            self.invalidation_listener.publish(self.instance_id, keys=keys, tags=tags)
+    
+    def start_invalidation_listener(self) -> None:
+        """Register this L1 with the process-wide invalidation listener."""
+        if self.instance_id is not None:
+            return
+        self.invalidation_listener = get_invalidation_listener()
+        self.instance_id = self.invalidation_listener.register(self.l1_cache, self.l2_cache)
+    
+    def stop_invalidation_listener(self) -> None:
+        """Stop applying invalidations from other caches to this L1."""
+        if self.instance_id is not None:
+            self.invalidation_listener.unregister(self.instance_id)
+            self.instance_id = None
     
     def warm_cache(self, queries: List[CacheWarmQuery]) -> None:
         """
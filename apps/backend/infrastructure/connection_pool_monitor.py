@@ -16,6 +16,8 @@ from dataclasses import dataclass, asdict
 from django.db import connections, connection
 from django.core.cache import cache
 
+from infrastructure.prisma_pool import get_prisma_pool_stats
+
 logger = logging.getLogger(__name__)
 
 
@@ -160,6 +162,15 @@ class ConnectionPoolMonitor:
             logger.error(f"Failed to get max_connections: {e}")
             return 100  # Default PostgreSQL value
     
+    def get_prisma_pool_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics for the shared Prisma client pool of this process.
+        
+        Returns:
+            Dictionary with pool stats and counters (empty if the pool was never used)
+        """
+        return get_prisma_pool_stats()
+    
     def check_health(self) -> Dict[str, Any]:
         """
         Check connection pool health and return status.
@@ -168,12 +179,14 @@ class ConnectionPoolMonitor:
             Dictionary with health status and alerts
         """
         stats = self.get_current_stats()
+        prisma_stats = self.get_prisma_pool_stats()
         
         health = {
             'healthy': True,
             'status': 'healthy',
             'alerts': [],
-            'stats': stats.to_dict()
+            'stats': stats.to_dict(),
+            'prisma_pool': prisma_stats
         }
         
         # Check for high utilization
@@ -206,6 +219,17 @@ class ConnectionPoolMonitor:
                 'recommendation': 'Enable connection pooling by setting CONN_MAX_AGE > 0'
             })
         
+        # Check shared Prisma client pool saturation
+        if prisma_stats and prisma_stats['utilization_percent'] >= self.HIGH_UTILIZATION_THRESHOLD:
+            health['alerts'].append({
+                'severity': 'warning',
+                'message': f'Prisma client pool at HIGH utilization: '
+                          f'{prisma_stats["utilization_percent"]:.1f}% '
+                          f'({prisma_stats["active_leases"]} leases / '
+                          f'connection_limit {prisma_stats["connection_limit"]})',
+                'recommendation': 'Raise connection_limit in DATABASE_URL (PRISMA_CONNECTION_LIMIT)'
+            })
+        
         # Check for high error rate
         if stats.query_count > 0:
             error_rate = (stats.error_count / stats.query_count) * 100
@@ -235,6 +259,19 @@ class ConnectionPoolMonitor:
             f"avg_query_time={stats.avg_query_time_ms:.1f}ms"
         )
         
+        prisma_stats = self.get_prisma_pool_stats()
+        if prisma_stats:
+            logger.info(
+                f"Prisma Client Pool Stats: "
+                f"connected={prisma_stats['connected']}, "
+                f"leases={prisma_stats['active_leases']} (peak {prisma_stats['peak_leases']})"
+                f"/{prisma_stats['connection_limit']}, "
+                f"acquisitions={prisma_stats['total_acquisitions']}, "
+                f"reconnects={prisma_stats['reconnects']}, "
+                f"errors={prisma_stats['connection_errors']}, "
+                f"avg_acquire_time={prisma_stats['wait_time_avg']:.1f}ms"
+            )
+        
         # Log warnings if needed
         if stats.utilization_percent >= self.HIGH_UTILIZATION_THRESHOLD:
             logger.warning(
@@ -373,6 +410,17 @@ def print_connection_pool_report():
     print(f"  Errors: {stats['error_count']}")
     print(f"  Avg Query Time: {stats['avg_query_time_ms']:.1f}ms")
     
+    prisma_stats = health['prisma_pool']
+    if prisma_stats:
+        print(f"\nShared Prisma Client (pid {prisma_stats['pid']}):")
+        print(f"  Connected: {prisma_stats['connected']}")
+        print(f"  Leases: {prisma_stats['active_leases']} active, {prisma_stats['peak_leases']} peak "
+              f"(connection_limit {prisma_stats['connection_limit']})")
+        print(f"  Acquisitions: {prisma_stats['total_acquisitions']} "
+              f"(avg {prisma_stats['wait_time_avg']:.1f}ms)")
+        print(f"  Connects: {prisma_stats['connects']}, Reconnects: {prisma_stats['reconnects']}, "
+              f"Errors: {prisma_stats['connection_errors']}")
+    
     # Print alerts
     if health['alerts']:
         print(f"\nAlerts ({len(health['alerts'])}):")
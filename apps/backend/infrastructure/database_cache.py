@@ -73,11 +73,17 @@ def generate_cache_key(prefix: str, *args, **kwargs) -> str:
 def cache_query(
     ttl: int = DEFAULT_QUERY_TTL,
     tags: Optional[List[str]] = None,
-    key_prefix: Optional[str] = None
+    key_prefix: Optional[str] = None,
+    stale_ttl: int = 0
 ):
     """
     Decorator to cache database query results.
     
+    Concurrent misses for the same arguments run the query once (per
+    process and, through a Valkey lock, across instances). Hot entries are
+    refreshed shortly before they expire, and with stale_ttl the previous
+    result keeps being served while a background task refreshes it.
+    
     Usage:
         @cache_query(ttl=300, tags=['user', 'profile'])
         def get_user_profile(user_id):
@@ -87,6 +93,7 @@ def cache_query(
         ttl: Time-to-live in seconds (default: 300 = 5 minutes)
         tags: Tags for cache invalidation
         key_prefix: Custom cache key prefix (defaults to function name)
+        stale_ttl: Seconds a stale result may be served while refreshing
         
     Returns:
         Decorated function
@@ -98,20 +105,13 @@ def cache_query(
             prefix = key_prefix or func.__name__
             cache_key = generate_cache_key(prefix, *args, **kwargs)
             
-            # Try to get from cache
-            cached_value = cache_manager.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit for {cache_key}")
-                return cached_value
-            
-            # Cache miss - execute function
-            logger.debug(f"Cache miss for {cache_key}")
-            result = func(*args, **kwargs)
-            
-            # Cache the result
-            cache_manager.set(cache_key, result, ttl=ttl, tags=tags)
+            def compute():
+                logger.debug(f"Cache miss for {cache_key}")
+                return func(*args, **kwargs)
             
-            return result
+            return cache_manager.get_or_compute(
+                cache_key, compute, ttl, tags=tags, stale_ttl=stale_ttl
+            )
         
         return wrapper
     return decorator
@@ -120,12 +120,14 @@ def cache_query(
 def cache_queryset(
     ttl: int = DEFAULT_QUERY_TTL,
     tags: Optional[List[str]] = None,
-    key_prefix: Optional[str] = None
+    key_prefix: Optional[str] = None,
+    stale_ttl: int = 0
 ):
     """
     Decorator to cache Django QuerySet results.
     
     Converts QuerySet to list before caching to avoid lazy evaluation issues.
+    Has the same stampede protection as cache_query.
     
     Usage:
         @cache_queryset(ttl=300, tags=['story', 'listing'])
@@ -136,6 +138,7 @@ def cache_queryset(
         ttl: Time-to-live in seconds (default: 300 = 5 minutes)
         tags: Tags for cache invalidation
         key_prefix: Custom cache key prefix (defaults to function name)
+        stale_ttl: Seconds a stale result may be served while refreshing
         
     Returns:
         Decorated function
@@ -147,24 +150,17 @@ def cache_queryset(
             prefix = key_prefix or func.__name__
             cache_key = generate_cache_key(prefix, *args, **kwargs)
             
-            # Try to get from cache
-            cached_value = cache_manager.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit for {cache_key}")
-                return cached_value
-            
-            # Cache miss - execute function
-            logger.debug(f"Cache miss for {cache_key}")
-            result = func(*args, **kwargs)
-            
-            # Convert QuerySet to list for caching
-            if isinstance(result, QuerySet):
-                result_list = list(result)
-                cache_manager.set(cache_key, result_list, ttl=ttl, tags=tags)
-                return result_list
-            else:
-                cache_manager.set(cache_key, result, ttl=ttl, tags=tags)
+            def compute():
+                logger.debug(f"Cache miss for {cache_key}")
+                result = func(*args, **kwargs)
+                # Convert QuerySet to list for caching
+                if isinstance(result, QuerySet):
+                    return list(result)
                 return result
+            
+            return cache_manager.get_or_compute(
+                cache_key, compute, ttl, tags=tags, stale_ttl=stale_ttl
+            )
         
         return wrapper
     return decorator
@@ -245,24 +241,15 @@ class CachedQueryMixin:
         # Generate cache key
         cache_key = f"db_query:{cls.__name__}:{key_suffix}"
         
-        # Try to get from cache
-        cached_value = cache_manager.get(cache_key)
-        if cached_value is not None:
-            logger.debug(f"Cache hit for {cache_key}")
-            return cached_value
-        
-        # Cache miss - execute query
-        logger.debug(f"Cache miss for {cache_key}")
-        result = query_func()
-        
-        # Convert QuerySet to list if needed
-        if isinstance(result, QuerySet):
-            result = list(result)
-        
-        # Cache the result
-        cache_manager.set(cache_key, result, ttl=actual_ttl, tags=actual_tags)
+        def compute():
+            logger.debug(f"Cache miss for {cache_key}")
+            result = query_func()
+            # Convert QuerySet to list if needed
+            if isinstance(result, QuerySet):
+                return list(result)
+            return result
         
-        return result
+        return cache_manager.get_or_compute(cache_key, compute, actual_ttl, tags=actual_tags)
     
     @classmethod
     def invalidate_cache_by_tags(cls, tags: Optional[List[str]] = None):
@@ -29,10 +29,11 @@ class Command(BaseCommand):
             ))
             self.stdout.write('')
             self.stdout.write('Search indexes created:')
-            self.stdout.write('  - stories.search_vector (title, description, content)')
-            self.stdout.write('  - user_profiles.search_vector (display_name, username, bio)')
-            self.stdout.write('  - tags.search_vector (name, description)')
-            self.stdout.write('  - Filter indexes (genre, completion_status, word_count, updated_at)')
+            self.stdout.write('  - Story.search_vector (title, blurb)')
+            self.stdout.write('  - Story.title trigram index (autocomplete)')
+            self.stdout.write('  - UserProfile.search_vector (display_name, handle, bio)')
+            self.stdout.write('  - Tag.search_vector (name)')
+            self.stdout.write('  - Filter indexes (updated_at)')
             self.stdout.write('  - search_queries table for analytics')
             self.stdout.write('')
             self.stdout.write(self.style.SUCCESS('Search indexes are ready to use!'))
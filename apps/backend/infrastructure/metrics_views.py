@@ -12,6 +12,7 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 
 from .metrics_collector import get_metrics_collector
+from .async_bridge import get_async_bridge_stats
 
 
 @csrf_exempt
@@ -51,6 +52,7 @@ def metrics_json_view(request):
     
     collector = get_metrics_collector()
     metrics = collector.get_all_metrics()
+    metrics['async_bridge'] = get_async_bridge_stats()
     
     return JsonResponse(metrics)
 
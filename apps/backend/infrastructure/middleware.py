@@ -358,15 +358,11 @@ class RateLimitMiddleware(MiddlewareMixin):
         request._rate_limit_user_id = user_id
         request._rate_limit_is_admin = is_admin
         
-        # Check rate limits
-        user_result = RateLimitMiddleware._rate_limiter.check_user_limit(user_id)
-        
-        # Skip rate limiting for admins
-        if is_admin and RateLimitMiddleware._rate_limiter.admin_bypass:
-            # Store result for headers but don't enforce
-            request._rate_limit_result = user_result
-            request.rate_limiter = RateLimitMiddleware._rate_limiter
-            return None
+        # Check and record the request against the per-user (or per-IP for
+        # anonymous requests) and global limits in one atomic round trip;
+        # admins get an allowed result without being counted
+        rate_limiter = RateLimitMiddleware._rate_limiter
+        user_result = rate_limiter.check_request(user_id, is_admin)
         
         # Store result for adding headers in process_response
         request._rate_limit_result = user_result
@@ -387,7 +383,10 @@ class RateLimitMiddleware(MiddlewareMixin):
                 logger=structured_logger,
                 ip_address=ip_address,
                 endpoint=request.path,
-                limit_type='user' if not user_id.startswith('anon:') else 'ip',
+                limit_type=(
+                    'global' if user_result.limit == rate_limiter.GLOBAL_LIMIT
+                    else 'ip' if user_id.startswith('anon:') else 'user'
+                ),
                 limit_exceeded=f'{user_result.limit}/minute',
             )
             
@@ -413,7 +412,7 @@ class RateLimitMiddleware(MiddlewareMixin):
             return response
         
         # Attach rate limiter to request
-        request.rate_limiter = RateLimitMiddleware._rate_limiter
+        request.rate_limiter = rate_limiter
         
         return None
     
@@ -0,0 +1,560 @@
+"""
+Shared Prisma Client Pool
+
+This module provides a process-wide Prisma client that views and services
+share instead of constructing ``Prisma()`` and calling ``connect()`` /
+``disconnect()`` on every request. Each ``connect()`` on a fresh client spawns
+a query-engine process and opens new PostgreSQL connections, which dominated
+request latency.
+
+The pool connects lazily once per worker process, re-validates the engine
+with a periodic health check, reconnects after failures, and resets itself in
+forked children (gunicorn/Celery prefork) so a child never talks to its
+parent's engine.
+
+Usage:
+    from infrastructure.prisma_pool import get_prisma
+
+    db = get_prisma()
+    await db.connect()      # leases the shared, already-connected client
+    try:
+        story = await db.story.find_unique(where={'id': story_id})
+    finally:
+        await db.disconnect()   # returns the lease, engine stays up
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+from prisma._async_http import HTTP
+from prisma.errors import ClientNotConnectedError
+
+from infrastructure.models import PoolStats
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLocalHTTP(HTTP):
+    """
+    Prisma engine HTTP transport that keeps one httpx client per event loop.
+
+    httpx connection pools are bound to the event loop that created them, so
+    a single engine session cannot be shared by requests running on different
+    loops (per-thread loops, short-lived bridge loops). Keeping a client per
+    loop lets every loop reuse the same query-engine process.
+    """
+
+    __slots__ = ('_loop_sessions', '_sessions_lock', '_closed')
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._loop_sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = (
+            weakref.WeakKeyDictionary()
+        )
+        self._sessions_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._loop_sessions.get(loop)
+            if session is None or session.is_closed:
+                session = httpx.AsyncClient(**self.session_kwargs)
+                self._loop_sessions[loop] = session
+            return session
+
+    @session.setter
+    def session(self, value: Optional[httpx.AsyncClient]) -> None:
+        # Prisma assigns None when closing; per-loop clients are managed here
+        if value is None:
+            self._closed = True
+
+    def open(self) -> None:
+        self._closed = False
+
+    async def close(self) -> None:
+        """Close the client owned by the running loop and mark the transport closed."""
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._loop_sessions.pop(loop, None)
+        if session is not None:
+            await session.aclose()
+
+    def session_count(self) -> int:
+        """Number of event loops currently holding an httpx client."""
+        with self._sessions_lock:
+            return len(self._loop_sessions)
+
+
+async def _bind_loop_local_http(client: Any) -> None:
+    """
+    Swap the engine's HTTP session for a loop-local one after connecting.
+
+    Relies on the generated client's ``_engine.session`` attribute; clients
+    without it (test doubles, other engine types) are left untouched.
+    """
+    engine = getattr(client, '_engine', None)
+    session = getattr(engine, 'session', None)
+    if session is None or isinstance(session, LoopLocalHTTP):
+        return
+
+    engine.session = LoopLocalHTTP(**getattr(session, 'session_kwargs', {}))
+    try:
+        await session.close()
+    except Exception as e:
+        logger.debug(f"Failed to close original Prisma engine session: {e}")
+
+
+def _default_client_factory() -> Any:
+    """Create an unconnected Prisma client (imported lazily so the pool loads without a generated client)."""
+    from prisma import Prisma
+    return Prisma()
+
+
+def _engine_connection_limit() -> int:
+    """
+    Resolve the query engine's PostgreSQL pool size.
+
+    Uses ``connection_limit`` from DATABASE_URL when present, otherwise
+    Prisma's default of ``num_cpus * 2 + 1``.
+    """
+    url = os.getenv('DATABASE_URL', '')
+    try:
+        values = parse_qs(urlparse(url).query).get('connection_limit')
+        if values:
+            return max(1, int(values[0]))
+    except ValueError:
+        pass
+    return (os.cpu_count() or 1) * 2 + 1
+
+
+class PrismaClientPool:
+    """
+    Process-wide pool around a single lazily connected Prisma client.
+
+    The query engine multiplexes concurrent queries over its own PostgreSQL
+    connection pool, so one connected client per process is shared by every
+    caller. The pool tracks leases (callers between ``acquire`` and
+    ``release``) so utilization can be compared with the engine's
+    ``connection_limit`` when sizing.
+    """
+
+    # Poll interval while waiting for another thread to finish connecting
+    CONNECT_LOCK_POLL_INTERVAL = 0.005
+
+    def __init__(
+        self,
+        health_check_interval: float = 30.0,
+        connect_timeout: int = 10,
+        connection_limit: Optional[int] = None,
+        client_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize the Prisma client pool.
+
+        Args:
+            health_check_interval: Seconds between engine health checks (0 disables)
+            connect_timeout: Seconds to wait for the query engine to start
+            connection_limit: Engine PostgreSQL pool size used for utilization
+                (defaults to the DATABASE_URL ``connection_limit``)
+            client_factory: Callable that creates unconnected Prisma clients
+        """
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.connection_limit = connection_limit or _engine_connection_limit()
+        self._client_factory = client_factory or _default_client_factory
+
+        self._client: Optional[Any] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        # Clients inherited across fork are kept referenced so their
+        # finalizers never stop the parent's engine process
+        self._orphaned_clients: List[Any] = []
+
+        self._reset_stats()
+
+        logger.info(
+            f"Initialized Prisma client pool: health_check_interval={health_check_interval}s, "
+            f"connection_limit={self.connection_limit}"
+        )
+
+    def _reset_stats(self) -> None:
+        """Reset lease and connection counters."""
+        self._active_leases = 0
+        self._peak_leases = 0
+        self._total_acquisitions = 0
+        self._total_wait_time = 0.0
+        self._connect_count = 0
+        self._reconnect_count = 0
+        self._connection_errors = 0
+        self._health_check_failures = 0
+        self._connected_at: Optional[float] = None
+        self._last_health_check = 0.0
+
+    @property
+    def client(self) -> Any:
+        """
+        The shared client, for callers that already hold a lease.
+
+        Raises:
+            ClientNotConnectedError: If the pool has not connected yet
+        """
+        self._ensure_process()
+        client = self._client
+        if client is None:
+            raise ClientNotConnectedError()
+        return client
+
+    def is_connected(self) -> bool:
+        """Check whether the shared client is connected in this process."""
+        self._ensure_process()
+        client = self._client
+        return client is not None and client.is_connected()
+
+    async def acquire(self) -> Any:
+        """
+        Lease the shared client, connecting or reconnecting it when needed.
+
+        Returns:
+            Connected Prisma client
+
+        Raises:
+            Exception: Propagates the engine error if connecting fails
+        """
+        start_time = time.monotonic()
+        self._ensure_process()
+
+        client = self._client
+        if client is None or not client.is_connected():
+            client = await self._connect()
+        elif self._health_check_due():
+            client = await self._verify(client)
+
+        with self._lock:
+            self._active_leases += 1
+            self._peak_leases = max(self._peak_leases, self._active_leases)
+            self._total_acquisitions += 1
+            self._total_wait_time += time.monotonic() - start_time
+
+        return client
+
+    def release(self) -> None:
+        """Return a lease obtained from ``acquire``."""
+        with self._lock:
+            if self._active_leases > 0:
+                self._active_leases -= 1
+
+    async def health_check(self) -> bool:
+        """
+        Run a trivial query against the engine.
+
+        Returns:
+            True if the engine answered, False otherwise
+        """
+        client = self._client
+        if client is None or not client.is_connected():
+            return False
+
+        self._last_health_check = time.monotonic()
+        try:
+            await client.query_raw('SELECT 1')
+            return True
+        except Exception as e:
+            self._health_check_failures += 1
+            logger.warning(f"Prisma engine health check failed: {e}")
+            return False
+
+    async def close(self) -> None:
+        """Disconnect the shared client (worker shutdown)."""
+        await self._acquire_connect_lock()
+        try:
+            client = self._client
+            self._client = None
+            self._connected_at = None
+            if client is not None and client.is_connected():
+                await client.disconnect()
+                logger.info("Disconnected shared Prisma client")
+        finally:
+            self._connect_lock.release()
+
+    def get_stats(self) -> PoolStats:
+        """
+        Get current pool statistics.
+
+        Active connections are the leases in flight, capped at the engine's
+        connection limit; leases beyond it queue inside the engine.
+
+        Returns:
+            PoolStats object with current metrics
+        """
+        with self._lock:
+            total = self.connection_limit if self.is_connected() else 0
+            active = min(self._active_leases, total)
+            utilization = (self._active_leases / self.connection_limit * 100) if self.connection_limit > 0 else 0
+            avg_wait = (
+                (self._total_wait_time / self._total_acquisitions * 1000)
+                if self._total_acquisitions > 0 else 0
+            )
+
+            return PoolStats(
+                total_connections=total,
+                active_connections=active,
+                idle_connections=total - active,
+                utilization_percent=utilization,
+                wait_time_avg=avg_wait,
+                connection_errors=self._connection_errors
+            )
+
+    def get_pool_info(self) -> Dict[str, Any]:
+        """
+        Get detailed pool counters for monitoring and sizing.
+
+        Returns:
+            Dictionary of pool counters
+        """
+        with self._lock:
+            connected_for = (
+                time.monotonic() - self._connected_at
+                if self._connected_at is not None else None
+            )
+            return {
+                'pid': self._pid,
+                'connected': self._client is not None and self._client.is_connected(),
+                'connected_seconds': connected_for,
+                'connection_limit': self.connection_limit,
+                'active_leases': self._active_leases,
+                'peak_leases': self._peak_leases,
+                'total_acquisitions': self._total_acquisitions,
+                'connects': self._connect_count,
+                'reconnects': self._reconnect_count,
+                'connection_errors': self._connection_errors,
+                'health_check_failures': self._health_check_failures,
+            }
+
+    def _health_check_due(self) -> bool:
+        """Check whether the health check interval has elapsed."""
+        if self.health_check_interval <= 0:
+            return False
+        return time.monotonic() - self._last_health_check >= self.health_check_interval
+
+    async def _verify(self, client: Any) -> Any:
+        """Health check the client and reconnect if the engine stopped answering."""
+        if await self.health_check():
+            return client
+        return await self._connect(stale_client=client)
+
+    async def _acquire_connect_lock(self) -> None:
+        """
+        Acquire the cross-thread connect lock without blocking the event loop.
+
+        A threading lock is used because callers may run on different loops in
+        different threads; polling keeps other tasks on this loop running.
+        """
+        while not self._connect_lock.acquire(blocking=False):
+            await asyncio.sleep(self.CONNECT_LOCK_POLL_INTERVAL)
+
+    async def _connect(self, stale_client: Optional[Any] = None) -> Any:
+        """
+        Connect a new shared client, replacing a stale one if given.
+
+        Args:
+            stale_client: Client that failed its health check
+
+        Returns:
+            Connected Prisma client
+        """
+        await self._acquire_connect_lock()
+        try:
+            client = self._client
+            # Another caller may have connected while we waited for the lock
+            if client is not None and client is not stale_client and client.is_connected():
+                return client
+
+            if client is not None:
+                await self._discard(client)
+
+            client = self._client_factory()
+            try:
+                await client.connect(timeout=self.connect_timeout)
+                await _bind_loop_local_http(client)
+            except Exception as e:
+                self._connection_errors += 1
+                logger.error(f"Failed to connect shared Prisma client: {e}")
+                raise
+
+            reconnect = self._connect_count > 0
+            self._client = client
+            self._connect_count += 1
+            if reconnect:
+                self._reconnect_count += 1
+            self._connected_at = time.monotonic()
+            self._last_health_check = time.monotonic()
+
+            logger.info(
+                f"{'Reconnected' if reconnect else 'Connected'} shared Prisma client "
+                f"(pid={self._pid})"
+            )
+            return client
+        finally:
+            self._connect_lock.release()
+
+    async def _discard(self, client: Any) -> None:
+        """Best-effort disconnect of a client being replaced."""
+        self._client = None
+        try:
+            if client.is_connected():
+                await client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting stale Prisma client: {e}")
+
+    def _ensure_process(self) -> None:
+        """Reset state if we are running in a forked child (fallback when fork hooks are unavailable)."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+    def _reset_after_fork(self) -> None:
+        """Drop the parent's client and locks in a forked child."""
+        if self._client is not None:
+            self._orphaned_clients.append(self._client)
+        self._client = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._reset_stats()
+
+
+class SharedPrismaClient:
+    """
+    Per-call handle onto the process-wide Prisma client.
+
+    Keeps the ``connect()``/``disconnect()`` calling convention of a plain
+    ``Prisma()`` instance so call sites only change how they obtain the
+    client: ``connect()`` leases the shared client and ``disconnect()``
+    returns the lease without stopping the query engine. Every other
+    attribute (model actions, ``tx``, ``batch_``, raw queries) is delegated
+    to the shared client.
+    """
+
+    __slots__ = ('_pool', '_leased')
+
+    def __init__(self, pool: PrismaClientPool):
+        self._pool = pool
+        self._leased = False
+
+    async def connect(self, timeout: Any = None) -> None:
+        """Lease the shared client, connecting it on first use."""
+        if not self._leased:
+            await self._pool.acquire()
+            self._leased = True
+
+    async def disconnect(self, timeout: Any = None) -> None:
+        """Return the lease; the shared engine stays connected."""
+        if self._leased:
+            self._leased = False
+            self._pool.release()
+
+    def is_connected(self) -> bool:
+        """Check whether this handle holds a lease on a connected client."""
+        return self._leased and self._pool.is_connected()
+
+    async def __aenter__(self) -> 'SharedPrismaClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.disconnect()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool.client, name)
+
+
+# Global Prisma client pool instance
+_prisma_pool: Optional[PrismaClientPool] = None
+_prisma_pool_lock = threading.Lock()
+
+
+def get_prisma_pool() -> PrismaClientPool:
+    """
+    Get the process-wide Prisma client pool.
+
+    Returns:
+        Global PrismaClientPool instance
+    """
+    global _prisma_pool
+    if _prisma_pool is None:
+        with _prisma_pool_lock:
+            if _prisma_pool is None:
+                from django.conf import settings
+                _prisma_pool = PrismaClientPool(
+                    health_check_interval=getattr(settings, 'PRISMA_HEALTH_CHECK_INTERVAL', 30.0),
+                    connect_timeout=getattr(settings, 'PRISMA_CONNECT_TIMEOUT', 10),
+                    connection_limit=getattr(settings, 'PRISMA_CONNECTION_LIMIT', None),
+                )
+    return _prisma_pool
+
+
+def get_prisma() -> SharedPrismaClient:
+    """
+    Get a handle onto the shared Prisma client.
+
+    Drop-in replacement for ``Prisma()`` in views and services.
+
+    Returns:
+        SharedPrismaClient bound to the process-wide pool
+    """
+    return SharedPrismaClient(get_prisma_pool())
+
+
+def get_prisma_pool_stats() -> Dict[str, Any]:
+    """
+    Get stats for this process's pool without creating it.
+
+    Returns:
+        PoolStats fields merged with pool counters, or an empty dict if no
+        caller has used the pool yet
+    """
+    pool = _prisma_pool
+    if pool is None:
+        return {}
+    return {
+        **asdict(pool.get_stats()),
+        **pool.get_pool_info(),
+    }
+
+
+def reset_prisma_pool() -> None:
+    """
+    Reset the global Prisma client pool instance.
+
+    Useful for testing.
+    """
+    global _prisma_pool
+    _prisma_pool = None
+
+
+def _reset_prisma_pool_after_fork() -> None:
+    """Fork hook: children must never reuse the parent's query engine."""
+    global _prisma_pool_lock
+    _prisma_pool_lock = threading.Lock()
+    if _prisma_pool is not None:
+        _prisma_pool._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_prisma_pool_after_fork)
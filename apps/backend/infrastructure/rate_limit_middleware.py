@@ -84,11 +84,11 @@ class RateLimitMiddleware:
         # Get client type from request (set by ClientTypeMiddleware)
         client_type = getattr(request, 'client_type', 'web')
         
-        # Check rate limit with client type
-        if not self.rate_limiter.allow_request(user_id, is_admin, client_type):
-            # Rate limit exceeded - get details for response
-            user_result = self.rate_limiter.check_user_limit(user_id, client_type)
-            
+        # Check and record the request in one round trip; the same result
+        # drives both the 429 decision and the rate limit headers
+        result = self.rate_limiter.check_request(user_id, is_admin, client_type)
+        
+        if not result.allowed:
             logger.warning(
                 f"Rate limit exceeded for {user_id}",
                 extra={
@@ -96,8 +96,8 @@ class RateLimitMiddleware:
                     'client_type': client_type,
                     'path': request.path,
                     'method': request.method,
-                    'limit': user_result.limit,
-                    'retry_after': user_result.retry_after
+                    'limit': result.limit,
+                    'retry_after': result.retry_after
                 }
             )
             
@@ -105,18 +105,18 @@ class RateLimitMiddleware:
             response = JsonResponse(
                 {
                     'error': 'Rate limit exceeded',
-                    'message': f'Too many requests. Limit: {user_result.limit} requests per minute.',
-                    'limit': user_result.limit,
-                    'retry_after': user_result.retry_after
+                    'message': f'Too many requests. Limit: {result.limit} requests per minute.',
+                    'limit': result.limit,
+                    'retry_after': result.retry_after
                 },
                 status=429
             )
             
             # Add rate limit headers
-            response['Retry-After'] = str(user_result.retry_after)
-            response['X-RateLimit-Limit'] = str(user_result.limit)
+            response['Retry-After'] = str(result.retry_after)
+            response['X-RateLimit-Limit'] = str(result.limit)
             response['X-RateLimit-Remaining'] = '0'
-            response['X-RateLimit-Reset'] = user_result.reset_at.isoformat()
+            response['X-RateLimit-Reset'] = result.reset_at.isoformat()
             
             return response
         
@@ -124,10 +124,9 @@ class RateLimitMiddleware:
         response = self.get_response(request)
         
         # Add rate limit headers to response
-        user_result = self.rate_limiter.check_user_limit(user_id, client_type)
-        response['X-RateLimit-Limit'] = str(user_result.limit)
-        response['X-RateLimit-Remaining'] = str(user_result.remaining)
-        response['X-RateLimit-Reset'] = user_result.reset_at.isoformat()
+        response['X-RateLimit-Limit'] = str(result.limit)
+        response['X-RateLimit-Remaining'] = str(result.remaining)
+        response['X-RateLimit-Reset'] = result.reset_at.isoformat()
         
         return response
     
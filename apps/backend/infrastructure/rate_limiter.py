@@ -9,14 +9,26 @@ This module implements rate limiting at multiple levels:
 
 The sliding window algorithm provides accurate rate limiting by tracking
 requests within a moving time window, preventing burst traffic at window boundaries.
+
+Each check runs as a single Lua script in Valkey, so the user and global
+limits are evaluated and recorded atomically in one round trip. The user
+limit keeps an exact sliding log (sorted set of request timestamps). The
+global limit uses a sliding window counter spread over
+RATE_LIMIT_GLOBAL_SHARDS keys, so no single key takes every request.
 """
 
+import hashlib
+import itertools
+import math
+import random
+import threading
 import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import redis
-from redis.exceptions import RedisError
+from redis.exceptions import NoScriptError, RedisError
 
 try:
     from django.conf import settings
@@ -28,6 +40,162 @@ except ImportError:
 from .models import RateLimitResult, LimitInfo
 
 
+# Sliding window check for one request.
+#
+# KEYS[1]: user sorted set (score = request timestamp)
+# KEYS[2]: global shard counter for the current fixed window
+# KEYS[3]: global shard counter for the previous fixed window
+# ARGV[1]: now, ARGV[2]: window size, ARGV[3]: user limit, ARGV[4]: shard limit,
+# ARGV[5]: elapsed fraction of the current fixed window, ARGV[6]: 'u', 'g' or 'ug',
+# ARGV[7]: member for this request, ARGV[8..]: timestamps of hits admitted locally
+#
+# Returns {status, user_count, oldest_user_timestamp, global_estimate} where
+# status is 1 (allowed), 0 (user limit exceeded) or 2 (global limit exceeded).
+SLIDING_WINDOW_SCRIPT = """
+local user_key = KEYS[1]
+local global_key = KEYS[2]
+local previous_global_key = KEYS[3]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local user_limit = tonumber(ARGV[3])
+local shard_limit = tonumber(ARGV[4])
+local elapsed = tonumber(ARGV[5])
+local check_user = string.find(ARGV[6], 'u', 1, true) ~= nil
+local check_global = string.find(ARGV[6], 'g', 1, true) ~= nil
+local member = ARGV[7]
+local pending = #ARGV - 7
+
+local user_count = 0
+if check_user then
+    for i = 8, #ARGV do
+        redis.call('ZADD', user_key, ARGV[i], member .. ':' .. i)
+    end
+    redis.call('ZREMRANGEBYSCORE', user_key, 0, now - window)
+    user_count = redis.call('ZCARD', user_key)
+end
+
+local global_estimate = 0
+if check_global then
+    if pending > 0 then
+        redis.call('INCRBY', global_key, pending)
+        redis.call('EXPIRE', global_key, window * 2)
+    end
+    local current = tonumber(redis.call('GET', global_key) or '0')
+    local previous = tonumber(redis.call('GET', previous_global_key) or '0')
+    global_estimate = previous * (1 - elapsed) + current
+end
+
+if check_user and user_count >= user_limit then
+    if pending > 0 then
+        redis.call('EXPIRE', user_key, window * 2)
+    end
+    local oldest = redis.call('ZRANGE', user_key, 0, 0, 'WITHSCORES')
+    return {0, user_count, oldest[2] or '', tostring(global_estimate)}
+end
+
+if check_global and global_estimate >= shard_limit then
+    return {2, user_count, '', tostring(global_estimate)}
+end
+
+if check_user then
+    redis.call('ZADD', user_key, now, member)
+    redis.call('EXPIRE', user_key, window * 2)
+    user_count = user_count + 1
+end
+
+if check_global then
+    redis.call('INCR', global_key)
+    redis.call('EXPIRE', global_key, window * 2)
+    global_estimate = global_estimate + 1
+end
+
+return {1, user_count, '', tostring(global_estimate)}
+"""
+
+SLIDING_WINDOW_SCRIPT_SHA = hashlib.sha1(SLIDING_WINDOW_SCRIPT.encode('utf-8')).hexdigest()
+
+STATUS_USER_LIMITED = 0
+STATUS_ALLOWED = 1
+STATUS_GLOBAL_LIMITED = 2
+
+
+class LocalRateBudget:
+    """
+    In-process pre-check that admits requests without a Valkey round trip.
+    
+    After each Valkey check a key is granted a small local budget: a share
+    of its remaining requests, valid for a short time. Requests admitted
+    from the budget are remembered and recorded in Valkey on the key's next
+    check, so other processes see them at most `ttl` seconds late. A key
+    near its limit gets no budget, so every request goes to Valkey.
+    """
+    
+    def __init__(self, share: float = 0.1, ttl: float = 1.0, max_keys: int = 10000):
+        """
+        Initialize local budget tracking.
+        
+        Args:
+            share: Fraction of the remaining requests a key may use locally
+            ttl: Seconds a granted budget stays valid
+            max_keys: Maximum number of keys tracked at once
+        """
+        self.share = share
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [tokens, remaining, expires_at, pending timestamps]
+        self._entries: Dict[str, list] = {}
+    
+    def acquire(self, key: str, now: float) -> Optional[int]:
+        """
+        Admit one request from the key's local budget.
+        
+        Returns:
+            Estimated remaining requests, or None if Valkey must be consulted
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= 0 or entry[2] <= now:
+                return None
+            entry[0] -= 1
+            entry[1] -= 1
+            entry[3].append(now)
+            return entry[1]
+    
+    def take_pending(self, key: str) -> List[float]:
+        """Remove and return the timestamps of locally admitted requests."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return []
+            pending = entry[3]
+            entry[3] = []
+            return pending
+    
+    def grant(self, key: str, remaining: int, now: float) -> None:
+        """Grant a key a fresh budget after a Valkey check."""
+        tokens = int(remaining * self.share)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if tokens <= 0:
+                    return
+                if len(self._entries) >= self.max_keys:
+                    self._prune(now)
+                    if len(self._entries) >= self.max_keys:
+                        return
+                entry = [0, 0, 0.0, []]
+                self._entries[key] = entry
+            entry[0] = tokens
+            entry[1] = remaining
+            entry[2] = now + self.ttl
+    
+    def _prune(self, now: float) -> None:
+        """Drop expired entries with no unrecorded requests."""
+        for key in [k for k, e in self._entries.items() if e[2] <= now and not e[3]]:
+            del self._entries[key]
+
+
 class RateLimiter:
     """
     Multi-layer rate limiter with sliding window algorithm.
@@ -52,7 +220,7 @@ class RateLimiter:
         # Load configuration from settings if Django is available
         if redis_url is None:
             if DJANGO_AVAILABLE and settings:
-                redis_url = getattr(settings, 'RATE_LIMIT_REDIS_URL', 
+                redis_url = getattr(settings, 'RATE_LIMIT_REDIS_URL',
                                   getattr(settings, 'VALKEY_URL', 'redis://localhost:6379/0'))
             else:
                 redis_url = 'redis://localhost:6379/0'
@@ -61,15 +229,25 @@ class RateLimiter:
             self.PER_USER_LIMIT = getattr(settings, 'RATE_LIMIT_PER_USER', 100)
             self.GLOBAL_LIMIT = getattr(settings, 'RATE_LIMIT_GLOBAL', 10000)
             self.WINDOW_SIZE = getattr(settings, 'RATE_LIMIT_WINDOW', 60)
+            self.GLOBAL_SHARDS = max(1, getattr(settings, 'RATE_LIMIT_GLOBAL_SHARDS', 8))
             self.enabled = getattr(settings, 'RATE_LIMIT_ENABLED', True)
             self.admin_bypass = getattr(settings, 'RATE_LIMIT_ADMIN_BYPASS', True)
+            local_precheck = getattr(settings, 'RATE_LIMIT_LOCAL_PRECHECK', False)
+            local_share = getattr(settings, 'RATE_LIMIT_LOCAL_SHARE', 0.1)
+            local_ttl = getattr(settings, 'RATE_LIMIT_LOCAL_TTL', 1.0)
         else:
             # Default values when Django is not available
             self.PER_USER_LIMIT = 100
             self.GLOBAL_LIMIT = 10000
             self.WINDOW_SIZE = 60
+            self.GLOBAL_SHARDS = 8
             self.enabled = True
             self.admin_bypass = True
+            local_precheck = False
+            local_share = 0.1
+            local_ttl = 1.0
+        
+        self.local_budget = LocalRateBudget(local_share, local_ttl) if local_precheck else None
         
         # Initialize Redis client
         try:
@@ -85,168 +263,209 @@ class RateLimiter:
         # Key prefixes for Redis
         self.user_prefix = "ratelimit:user:"
         self.global_key = "ratelimit:global"
+        
+        # Unique request members across processes and threads
+        self._member_prefix = uuid.uuid4().hex[:12]
+        self._member_counter = itertools.count()
     
-    def check_user_limit(self, user_id: str) -> RateLimitResult:
+    def _user_key(self, user_id: str) -> str:
+        """Redis key of a user's sliding window."""
+        return self.user_prefix + user_id
+    
+    def _allowed_result(self, limit: int) -> RateLimitResult:
+        """Result for requests that are not counted (Redis unavailable, bypass)."""
+        return RateLimitResult(
+            allowed=True,
+            limit=limit,
+            remaining=limit,
+            reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
+        )
+    
+    def _eval_script(self, keys: List[str], args: List) -> list:
+        """Run the sliding window script, loading it on first use."""
+        try:
+            return self.redis_client.evalsha(SLIDING_WINDOW_SCRIPT_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            return self.redis_client.eval(SLIDING_WINDOW_SCRIPT, len(keys), *keys, *args)
+    
+    def _check(
+        self,
+        user_key: Optional[str],
+        user_limit: int,
+        check_global: bool = True
+    ) -> Tuple[Optional[RateLimitResult], Optional[RateLimitResult]]:
         """
-        Check per-user rate limit using sliding window algorithm.
+        Check and record one request against the user and/or global limit.
         
         Args:
-            user_id: User identifier
-            
+            user_key: User sliding window key (None to check only the global limit)
+            user_limit: Requests allowed per window for the user
+            check_global: Whether to check the global limit
+        
         Returns:
-            RateLimitResult with limit status
-        """
-        if not self.redis_available:
-            # If Redis is unavailable, allow all requests
-            return RateLimitResult(
-                allowed=True,
-                limit=self.PER_USER_LIMIT,
-                remaining=self.PER_USER_LIMIT,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
+            Tuple of (user result, global result); a result is None when that
+            limit was not checked
         
-        key = self.user_prefix + user_id
+        Raises:
+            RedisError: If the script cannot be run
+        """
         current_time = time.time()
-        window_start = current_time - self.WINDOW_SIZE
         
-        try:
-            # Use Redis sorted set for sliding window
-            # Score is timestamp, value is unique request ID
-            
-            # Remove old entries outside the window
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count requests in current window
-            request_count = self.redis_client.zcard(key)
-            
-            # Check if limit exceeded
-            if request_count >= self.PER_USER_LIMIT:
-                # Get the oldest request timestamp to calculate reset time
-                oldest_requests = self.redis_client.zrange(key, 0, 0, withscores=True)
-                if oldest_requests:
-                    oldest_timestamp = oldest_requests[0][1]
+        # Serve from the local budget while the user is far from the limit
+        if user_key and self.local_budget:
+            remaining = self.local_budget.acquire(user_key, current_time)
+            if remaining is not None:
+                user_result = RateLimitResult(
+                    allowed=True,
+                    limit=user_limit,
+                    remaining=max(0, remaining),
+                    reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
+                )
+                return user_result, self._allowed_result(self.GLOBAL_LIMIT) if check_global else None
+        
+        pending = self.local_budget.take_pending(user_key) if user_key and self.local_budget else []
+        
+        shard = random.randrange(self.GLOBAL_SHARDS)
+        window_index = int(current_time // self.WINDOW_SIZE)
+        elapsed = (current_time % self.WINDOW_SIZE) / self.WINDOW_SIZE
+        shard_limit = math.ceil(self.GLOBAL_LIMIT / self.GLOBAL_SHARDS)
+        flags = ('u' if user_key else '') + ('g' if check_global else '')
+        member = f"{current_time}:{self._member_prefix}:{next(self._member_counter)}"
+        
+        status, user_count, oldest, global_estimate = self._eval_script(
+            [
+                user_key or self.global_key,
+                f"{self.global_key}:{shard}:{window_index}",
+                f"{self.global_key}:{shard}:{window_index - 1}",
+            ],
+            [current_time, self.WINDOW_SIZE, user_limit, shard_limit, elapsed, flags, member, *pending]
+        )
+        status = int(status)
+        user_count = int(user_count)
+        
+        user_result = None
+        if user_key:
+            if status == STATUS_USER_LIMITED:
+                if oldest:
+                    oldest_timestamp = float(oldest)
                     reset_at = datetime.fromtimestamp(oldest_timestamp + self.WINDOW_SIZE)
                     retry_after = int((oldest_timestamp + self.WINDOW_SIZE) - current_time)
                 else:
                     reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
                     retry_after = self.WINDOW_SIZE
-                
-                return RateLimitResult(
+                user_result = RateLimitResult(
                     allowed=False,
-                    limit=self.PER_USER_LIMIT,
+                    limit=user_limit,
                     remaining=0,
                     reset_at=reset_at,
                     retry_after=max(1, retry_after)
                 )
-            
-            # Add current request
-            request_id = f"{current_time}:{id(self)}"
-            self.redis_client.zadd(key, {request_id: current_time})
-            
-            # Set expiration on the key to clean up inactive users
-            self.redis_client.expire(key, self.WINDOW_SIZE * 2)
-            
-            # Calculate remaining requests
-            remaining = self.PER_USER_LIMIT - (request_count + 1)
-            
-            # Calculate reset time (end of current window)
-            reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            
-            return RateLimitResult(
-                allowed=True,
-                limit=self.PER_USER_LIMIT,
-                remaining=remaining,
-                reset_at=reset_at
-            )
-            
+            else:
+                # A global rejection leaves the user's own window untouched
+                user_result = RateLimitResult(
+                    allowed=True,
+                    limit=user_limit,
+                    remaining=max(0, user_limit - user_count),
+                    reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
+                )
+                if status == STATUS_ALLOWED and self.local_budget:
+                    self.local_budget.grant(user_key, user_result.remaining, current_time)
+        
+        global_result = None
+        if check_global:
+            if status == STATUS_GLOBAL_LIMITED:
+                # The sliding counter drops below the limit as the window moves on
+                retry_after = int(self.WINDOW_SIZE * (1 - elapsed))
+                global_result = RateLimitResult(
+                    allowed=False,
+                    limit=self.GLOBAL_LIMIT,
+                    remaining=0,
+                    reset_at=datetime.now() + timedelta(seconds=max(1, retry_after)),
+                    retry_after=max(1, retry_after)
+                )
+            else:
+                # Each shard sees ~1/GLOBAL_SHARDS of the traffic
+                used = int(float(global_estimate) * self.GLOBAL_SHARDS)
+                global_result = RateLimitResult(
+                    allowed=status == STATUS_ALLOWED,
+                    limit=self.GLOBAL_LIMIT,
+                    remaining=max(0, self.GLOBAL_LIMIT - used),
+                    reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
+                )
+        
+        return user_result, global_result
+    
+    def check_user_limit(self, user_id: str) -> RateLimitResult:
+        """
+        Check per-user rate limit using sliding window algorithm.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            RateLimitResult with limit status
+        """
+        if not self.redis_available:
+            # If Redis is unavailable, allow all requests
+            return self._allowed_result(self.PER_USER_LIMIT)
+        
+        try:
+            user_result, _ = self._check(self._user_key(user_id), self.PER_USER_LIMIT, check_global=False)
+            return user_result
         except RedisError as e:
             print(f"Warning: Redis error in check_user_limit: {e}")
             # Fail open - allow request if Redis fails
-            return RateLimitResult(
-                allowed=True,
-                limit=self.PER_USER_LIMIT,
-                remaining=self.PER_USER_LIMIT,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
+            return self._allowed_result(self.PER_USER_LIMIT)
     
     def check_global_limit(self) -> RateLimitResult:
         """
-        Check global rate limit using sliding window algorithm.
+        Check global rate limit using a sharded sliding window counter.
         
         Returns:
             RateLimitResult with global limit status
         """
         if not self.redis_available:
             # If Redis is unavailable, allow all requests
-            return RateLimitResult(
-                allowed=True,
-                limit=self.GLOBAL_LIMIT,
-                remaining=self.GLOBAL_LIMIT,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
-        
-        key = self.global_key
-        current_time = time.time()
-        window_start = current_time - self.WINDOW_SIZE
+            return self._allowed_result(self.GLOBAL_LIMIT)
         
         try:
-            # Use Redis sorted set for sliding window
-            
-            # Remove old entries outside the window
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count requests in current window
-            request_count = self.redis_client.zcard(key)
-            
-            # Check if limit exceeded
-            if request_count >= self.GLOBAL_LIMIT:
-                # Get the oldest request timestamp to calculate reset time
-                oldest_requests = self.redis_client.zrange(key, 0, 0, withscores=True)
-                if oldest_requests:
-                    oldest_timestamp = oldest_requests[0][1]
-                    reset_at = datetime.fromtimestamp(oldest_timestamp + self.WINDOW_SIZE)
-                    retry_after = int((oldest_timestamp + self.WINDOW_SIZE) - current_time)
-                else:
-                    reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-                    retry_after = self.WINDOW_SIZE
-                
-                return RateLimitResult(
-                    allowed=False,
-                    limit=self.GLOBAL_LIMIT,
-                    remaining=0,
-                    reset_at=reset_at,
-                    retry_after=max(1, retry_after)
-                )
-            
-            # Add current request
-            request_id = f"{current_time}:{id(self)}"
-            self.redis_client.zadd(key, {request_id: current_time})
-            
-            # Set expiration on the key
-            self.redis_client.expire(key, self.WINDOW_SIZE * 2)
-            
-            # Calculate remaining requests
-            remaining = self.GLOBAL_LIMIT - (request_count + 1)
-            
-            # Calculate reset time (end of current window)
-            reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            
-            return RateLimitResult(
-                allowed=True,
-                limit=self.GLOBAL_LIMIT,
-                remaining=remaining,
-                reset_at=reset_at
-            )
-            
+            _, global_result = self._check(None, 0)
+            return global_result
         except RedisError as e:
             print(f"Warning: Redis error in check_global_limit: {e}")
             # Fail open - allow request if Redis fails
-            return RateLimitResult(
-                allowed=True,
-                limit=self.GLOBAL_LIMIT,
-                remaining=self.GLOBAL_LIMIT,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
+            return self._allowed_result(self.GLOBAL_LIMIT)
+    
+    def check_request(self, user_id: str, is_admin: bool = False) -> RateLimitResult:
+        """
+        Check and record a request against both limits in one round trip.
+        
+        Args:
+            user_id: User identifier
+            is_admin: Whether user has admin privileges
+        
+        Returns:
+            The global result if the global limit rejected the request,
+            otherwise the per-user result
+        """
+        return self._check_request(self._user_key(user_id), self.PER_USER_LIMIT, is_admin)
+    
+    def _check_request(self, user_key: str, user_limit: int, is_admin: bool) -> RateLimitResult:
+        """Combined user + global check shared with MobileRateLimiter."""
+        # Check if rate limiting is enabled; admins bypass if configured
+        if not self.enabled or (is_admin and self.admin_bypass) or not self.redis_available:
+            return self._allowed_result(user_limit)
+        
+        try:
+            user_result, global_result = self._check(user_key, user_limit)
+        except RedisError as e:
+            print(f"Warning: Redis error in check_request: {e}")
+            # Fail open - allow request if Redis fails
+            return self._allowed_result(user_limit)
+        
+        if user_result.allowed and not global_result.allowed:
+            return global_result
+        return user_result
     
     def allow_request(self, user_id: str, is_admin: bool = False) -> bool:
         """
@@ -258,29 +477,11 @@ class RateLimiter:
         Args:
             user_id: User identifier
             is_admin: Whether user has admin privileges
-            
+        
         Returns:
             True if request is allowed, False if rate limited
         """
-        # Check if rate limiting is enabled
-        if not self.enabled:
-            return True
-        
-        # Admin bypass
-        if is_admin and self.admin_bypass:
-            return True
-        
-        # Check per-user limit
-        user_result = self.check_user_limit(user_id)
-        if not user_result.allowed:
-            return False
-        
-        # Check global limit
-        global_result = self.check_global_limit()
-        if not global_result.allowed:
-            return False
-        
-        return True
+        return self.check_request(user_id, is_admin).allowed
     
     def get_limit_info(self, user_id: str) -> LimitInfo:
         """
@@ -288,47 +489,47 @@ class RateLimiter:
         
         Args:
             user_id: User identifier
-            
+        
         Returns:
             LimitInfo with current limit status
         """
+        return self._get_limit_info(user_id, self._user_key(user_id), self.PER_USER_LIMIT)
+    
+    def _get_limit_info(self, user_id: str, key: str, limit: int) -> LimitInfo:
+        """Read a user's window without recording a request."""
         if not self.redis_available:
             # If Redis is unavailable, return default info
             now = datetime.now()
             return LimitInfo(
                 user_id=user_id,
                 requests_made=0,
-                limit=self.PER_USER_LIMIT,
+                limit=limit,
                 window_start=now,
                 window_end=now + timedelta(seconds=self.WINDOW_SIZE)
             )
         
-        key = self.user_prefix + user_id
         current_time = time.time()
         window_start = current_time - self.WINDOW_SIZE
         
         try:
-            # Remove old entries
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count current requests
-            request_count = self.redis_client.zcard(key)
+            # Count requests in the current window
+            request_count = self.redis_client.zcount(key, f"({window_start}", "+inf")
             
             return LimitInfo(
                 user_id=user_id,
                 requests_made=request_count,
-                limit=self.PER_USER_LIMIT,
+                limit=limit,
                 window_start=datetime.fromtimestamp(window_start),
                 window_end=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
             )
-            
+        
         except RedisError as e:
             print(f"Warning: Redis error in get_limit_info: {e}")
             now = datetime.now()
             return LimitInfo(
                 user_id=user_id,
                 requests_made=0,
-                limit=self.PER_USER_LIMIT,
+                limit=limit,
                 window_start=now,
                 window_end=now + timedelta(seconds=self.WINDOW_SIZE)
             )
@@ -362,7 +563,7 @@ class MobileRateLimiter(RateLimiter):
         
         Args:
             client_type: Client type string (web, mobile-ios, mobile-android)
-            
+        
         Returns:
             Requests per minute limit for the client type
         """
@@ -373,14 +574,18 @@ class MobileRateLimiter(RateLimiter):
                 'RATE_LIMIT_MOBILE_PER_USER',
                 self.RATE_LIMITS['mobile-ios']
             )
-
+            
             if client_type in ('mobile-ios', 'mobile-android'):
                 return mobile_limit
-
+            
             return web_limit
-
+        
         return self.RATE_LIMITS.get(client_type, self.RATE_LIMITS['default'])
     
+    def _client_key(self, user_id: str, client_type: str) -> str:
+        """Redis key of a user's sliding window for one client type."""
+        return f"{self.user_prefix}{user_id}:{client_type}"
+    
     def check_user_limit(self, user_id: str, client_type: str = 'web') -> RateLimitResult:
         """
         Check per-user rate limit with client-type-specific limits.
@@ -388,7 +593,7 @@ class MobileRateLimiter(RateLimiter):
         Args:
             user_id: User identifier
             client_type: Client type for rate limit selection
-            
+        
         Returns:
             RateLimitResult with limit status
         """
@@ -397,74 +602,38 @@ class MobileRateLimiter(RateLimiter):
         
         if not self.redis_available:
             # If Redis is unavailable, allow all requests
-            return RateLimitResult(
-                allowed=True,
-                limit=per_user_limit,
-                remaining=per_user_limit,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
-        
-        key = f"{self.user_prefix}{user_id}:{client_type}"
-        current_time = time.time()
-        window_start = current_time - self.WINDOW_SIZE
+            return self._allowed_result(per_user_limit)
         
         try:
-            # Use Redis sorted set for sliding window
-            # Remove old entries outside the window
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count requests in current window
-            request_count = self.redis_client.zcard(key)
-            
-            # Check if limit exceeded
-            if request_count >= per_user_limit:
-                # Get the oldest request timestamp to calculate reset time
-                oldest_requests = self.redis_client.zrange(key, 0, 0, withscores=True)
-                if oldest_requests:
-                    oldest_timestamp = oldest_requests[0][1]
-                    reset_at = datetime.fromtimestamp(oldest_timestamp + self.WINDOW_SIZE)
-                    retry_after = int((oldest_timestamp + self.WINDOW_SIZE) - current_time)
-                else:
-                    reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-                    retry_after = self.WINDOW_SIZE
-                
-                return RateLimitResult(
-                    allowed=False,
-                    limit=per_user_limit,
-                    remaining=0,
-                    reset_at=reset_at,
-                    retry_after=max(1, retry_after)
-                )
-            
-            # Add current request
-            request_id = f"{current_time}:{id(self)}"
-            self.redis_client.zadd(key, {request_id: current_time})
-            
-            # Set expiration on the key to clean up inactive users
-            self.redis_client.expire(key, self.WINDOW_SIZE * 2)
-            
-            # Calculate remaining requests
-            remaining = per_user_limit - (request_count + 1)
-            
-            # Calculate reset time (end of current window)
-            reset_at = datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            
-            return RateLimitResult(
-                allowed=True,
-                limit=per_user_limit,
-                remaining=remaining,
-                reset_at=reset_at
+            user_result, _ = self._check(
+                self._client_key(user_id, client_type),
+                per_user_limit,
+                check_global=False
             )
-            
+            return user_result
         except RedisError as e:
             print(f"Warning: Redis error in check_user_limit: {e}")
             # Fail open - allow request if Redis fails
-            return RateLimitResult(
-                allowed=True,
-                limit=per_user_limit,
-                remaining=per_user_limit,
-                reset_at=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
+            return self._allowed_result(per_user_limit)
+    
+    def check_request(self, user_id: str, is_admin: bool = False, client_type: str = 'web') -> RateLimitResult:
+        """
+        Check and record a request against both limits in one round trip.
+        
+        Args:
+            user_id: User identifier
+            is_admin: Whether user has admin privileges
+            client_type: Client type for rate limit selection
+        
+        Returns:
+            The global result if the global limit rejected the request,
+            otherwise the per-user result
+        """
+        return self._check_request(
+            self._client_key(user_id, client_type),
+            self.get_rate_limit(client_type),
+            is_admin
+        )
     
     def allow_request(self, user_id: str, is_admin: bool = False, client_type: str = 'web') -> bool:
         """
@@ -477,29 +646,11 @@ class MobileRateLimiter(RateLimiter):
             user_id: User identifier
             is_admin: Whether user has admin privileges
             client_type: Client type for rate limit selection
-            
+        
         Returns:
             True if request is allowed, False if rate limited
         """
-        # Check if rate limiting is enabled
-        if not self.enabled:
-            return True
-        
-        # Admin bypass
-        if is_admin and self.admin_bypass:
-            return True
-        
-        # Check per-user limit with client type
-        user_result = self.check_user_limit(user_id, client_type)
-        if not user_result.allowed:
-            return False
-        
-        # Check global limit
-        global_result = self.check_global_limit()
-        if not global_result.allowed:
-            return False
-        
-        return True
+        return self.check_request(user_id, is_admin, client_type).allowed
     
     def get_limit_info(self, user_id: str, client_type: str = 'web') -> LimitInfo:
         """
@@ -508,50 +659,12 @@ class MobileRateLimiter(RateLimiter):
         Args:
             user_id: User identifier
             client_type: Client type for rate limit selection
-            
+        
         Returns:
             LimitInfo with current limit status
         """
-        # Get client-specific rate limit
-        per_user_limit = self.get_rate_limit(client_type)
-        
-        if not self.redis_available:
-            # If Redis is unavailable, return default info
-            now = datetime.now()
-            return LimitInfo(
-                user_id=user_id,
-                requests_made=0,
-                limit=per_user_limit,
-                window_start=now,
-                window_end=now + timedelta(seconds=self.WINDOW_SIZE)
-            )
-        
-        key = f"{self.user_prefix}{user_id}:{client_type}"
-        current_time = time.time()
-        window_start = current_time - self.WINDOW_SIZE
-        
-        try:
-            # Remove old entries
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count current requests
-            request_count = self.redis_client.zcard(key)
-            
-            return LimitInfo(
-                user_id=user_id,
-                requests_made=request_count,
-                limit=per_user_limit,
-                window_start=datetime.fromtimestamp(window_start),
-                window_end=datetime.now() + timedelta(seconds=self.WINDOW_SIZE)
-            )
-            
-        except RedisError as e:
-            print(f"Warning: Redis error in get_limit_info: {e}")
-            now = datetime.now()
-            return LimitInfo(
-                user_id=user_id,
-                requests_made=0,
-                limit=per_user_limit,
-                window_start=now,
-                window_end=now + timedelta(seconds=self.WINDOW_SIZE)
-            )
+        return self._get_limit_info(
+            user_id,
+            self._client_key(user_id, client_type),
+            self.get_rate_limit(client_type)
+        )
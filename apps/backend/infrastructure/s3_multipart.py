@@ -0,0 +1,157 @@
+"""
+Streaming S3 Uploads
+
+Writes an object to S3 as a multipart upload so large files (exports,
+archives) never have to be held in memory: data is buffered only up to one
+part (S3_MULTIPART_PART_SIZE, at least the 5 MB S3 minimum) before the part
+is uploaded.
+
+Usage:
+    from infrastructure.s3_multipart import S3MultipartWriter
+
+    with S3MultipartWriter(s3_client, bucket, key, 'text/csv') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+The upload is completed when the block exits normally and aborted (so no
+orphaned parts are billed) when it raises. The writer is file-like enough
+for zipfile.ZipFile and gzip.GzipFile (write, tell, flush).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects non-final parts smaller than this
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """Write-only file object backed by an S3 multipart upload."""
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key: str,
+        content_type: str = 'application/octet-stream',
+        part_size: Optional[int] = None,
+        content_encoding: Optional[str] = None
+    ):
+        """
+        Start a multipart upload.
+
+        Args:
+            s3_client: boto3 S3 client
+            bucket: Target bucket
+            key: Target object key
+            content_type: Content-Type of the object
+            part_size: Bytes per uploaded part (defaults to settings.S3_MULTIPART_PART_SIZE)
+            content_encoding: Content-Encoding of the object (e.g. 'gzip')
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(
+            part_size or getattr(settings, 'S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024),
+            MIN_PART_SIZE
+        )
+        self._buffer = bytearray()
+        self._parts: List[Dict[str, Any]] = []
+        self._position = 0
+        self.closed = False
+
+        extra = {'ContentType': content_type}
+        if content_encoding:
+            extra['ContentEncoding'] = content_encoding
+        response = self.s3_client.create_multipart_upload(Bucket=bucket, Key=key, **extra)
+        self.upload_id = response['UploadId']
+
+    @property
+    def bytes_written(self) -> int:
+        """Total bytes written so far."""
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        # Parts are uploaded as they fill up; the rest goes out on close()
+        pass
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        """Buffer data, uploading a part whenever a full part is buffered."""
+        if self.closed:
+            raise ValueError('write to closed S3MultipartWriter')
+        self._buffer.extend(data)
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes) -> None:
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def close(self) -> None:
+        """Upload the remaining buffer and complete the upload."""
+        if self.closed:
+            return
+        try:
+            # The last part may be smaller than the minimum (or empty for an
+            # empty object)
+            if self._buffer or not self._parts:
+                self._upload_part(bytes(self._buffer))
+                self._buffer.clear()
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        except Exception:
+            self.abort()
+            raise
+        self.closed = True
+
+    def abort(self) -> None:
+        """Abandon the upload and discard uploaded parts."""
+        if self.closed:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload of {self.key}: {e}")
+        self._buffer.clear()
+        self.closed = True
+
+    def __enter__(self) -> 'S3MultipartWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
@@ -2,7 +2,13 @@
 Full-Text Search Indexes for PostgreSQL
 
 This module provides SQL statements to create full-text search indexes
-for stories, authors, and tags using PostgreSQL's built-in full-text search.
+for stories, authors, and tags using PostgreSQL's built-in full-text search,
+plus the pg_trgm index used by search autocomplete.
+
+The search_vector columns are maintained by triggers and are declared in
+the Prisma schema as Unsupported("tsvector"); the 20261017030000_add_search_vectors
+migration creates them, and every statement here is idempotent so the
+create_search_indexes command can still be run against any database.
 
 Requirements: 35.1, 35.2, 35.13
 """
@@ -12,73 +18,78 @@ Requirements: 35.1, 35.2, 35.13
 
 SEARCH_INDEXES = [
     # Story full-text search index
-    # Combines title (weight A), description (weight B), and content preview (weight C)
+    # Combines title (weight A) and blurb (weight B)
     """
-    -- Create text search configuration for English
-    CREATE TEXT SEARCH CONFIGURATION IF NOT EXISTS english_unaccent (COPY = english);
-    
     -- Add tsvector column for story search
-    ALTER TABLE stories 
+    ALTER TABLE "Story" 
     ADD COLUMN IF NOT EXISTS search_vector tsvector;
     
     -- Create index on search vector
-    CREATE INDEX IF NOT EXISTS idx_stories_search_vector 
-    ON stories USING GIN(search_vector);
+    CREATE INDEX IF NOT EXISTS idx_story_search_vector 
+    ON "Story" USING GIN(search_vector);
     
-    -- Create trigger to automatically update search vector
-    CREATE OR REPLACE FUNCTION stories_search_vector_trigger() RETURNS trigger AS $$
+    -- Create trigger to keep the search vector in sync with title and blurb
+    CREATE OR REPLACE FUNCTION story_search_vector_trigger() RETURNS trigger AS $$
     BEGIN
         NEW.search_vector :=
             setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
-            setweight(to_tsvector('english', COALESCE(NEW.description, '')), 'B') ||
-            setweight(to_tsvector('english', COALESCE(NEW.content_preview, '')), 'C');
+            setweight(to_tsvector('english', COALESCE(NEW.blurb, '')), 'B');
         RETURN NEW;
     END
     $$ LANGUAGE plpgsql;
     
-    DROP TRIGGER IF EXISTS stories_search_vector_update ON stories;
-    CREATE TRIGGER stories_search_vector_update
-    BEFORE INSERT OR UPDATE ON stories
-    FOR EACH ROW EXECUTE FUNCTION stories_search_vector_trigger();
+    DROP TRIGGER IF EXISTS story_search_vector_update ON "Story";
+    CREATE TRIGGER story_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, blurb ON "Story"
+    FOR EACH ROW EXECUTE FUNCTION story_search_vector_trigger();
     
     -- Update existing rows
-    UPDATE stories SET search_vector = 
+    UPDATE "Story" SET search_vector = 
         setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
-        setweight(to_tsvector('english', COALESCE(description, '')), 'B') ||
-        setweight(to_tsvector('english', COALESCE(content_preview, '')), 'C')
+        setweight(to_tsvector('english', COALESCE(blurb, '')), 'B')
     WHERE search_vector IS NULL;
     """,
     
+    # Story title trigram index for autocomplete
+    # Serves both prefix LIKE and similarity (%) lookups on lower(title)
+    """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    
+    CREATE INDEX IF NOT EXISTS idx_story_title_trgm 
+    ON "Story" USING GIN (lower(title) gin_trgm_ops) 
+    WHERE published = true AND deleted_at IS NULL;
+    """,
+    
     # Author full-text search index
     """
     -- Add tsvector column for author search
-    ALTER TABLE user_profiles 
+    ALTER TABLE "UserProfile" 
     ADD COLUMN IF NOT EXISTS search_vector tsvector;
     
     -- Create index on search vector
-    CREATE INDEX IF NOT EXISTS idx_user_profiles_search_vector 
-    ON user_profiles USING GIN(search_vector);
+    CREATE INDEX IF NOT EXISTS idx_user_profile_search_vector 
+    ON "UserProfile" USING GIN(search_vector);
     
     -- Create trigger to automatically update search vector
-    CREATE OR REPLACE FUNCTION user_profiles_search_vector_trigger() RETURNS trigger AS $$
+    CREATE OR REPLACE FUNCTION user_profile_search_vector_trigger() RETURNS trigger AS $$
     BEGIN
         NEW.search_vector :=
             setweight(to_tsvector('english', COALESCE(NEW.display_name, '')), 'A') ||
-            setweight(to_tsvector('english', COALESCE(NEW.username, '')), 'A') ||
+            setweight(to_tsvector('english', COALESCE(NEW.handle, '')), 'A') ||
             setweight(to_tsvector('english', COALESCE(NEW.bio, '')), 'B');
         RETURN NEW;
     END
     $$ LANGUAGE plpgsql;
     
-    DROP TRIGGER IF EXISTS user_profiles_search_vector_update ON user_profiles;
-    CREATE TRIGGER user_profiles_search_vector_update
-    BEFORE INSERT OR UPDATE ON user_profiles
-    FOR EACH ROW EXECUTE FUNCTION user_profiles_search_vector_trigger();
+    DROP TRIGGER IF EXISTS user_profile_search_vector_update ON "UserProfile";
+    CREATE TRIGGER user_profile_search_vector_update
+    BEFORE INSERT OR UPDATE OF display_name, handle, bio ON "UserProfile"
+    FOR EACH ROW EXECUTE FUNCTION user_profile_search_vector_trigger();
     
     -- Update existing rows
-    UPDATE user_profiles SET search_vector = 
+    UPDATE "UserProfile" SET search_vector = 
         setweight(to_tsvector('english', COALESCE(display_name, '')), 'A') ||
-        setweight(to_tsvector('english', COALESCE(username, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(handle, '')), 'A') ||
         setweight(to_tsvector('english', COALESCE(bio, '')), 'B')
     WHERE search_vector IS NULL;
     """,
@@ -86,57 +97,38 @@ SEARCH_INDEXES = [
     # Tag full-text search index
     """
     -- Add tsvector column for tag search
-    ALTER TABLE tags 
+    ALTER TABLE "Tag" 
     ADD COLUMN IF NOT EXISTS search_vector tsvector;
     
     -- Create index on search vector
-    CREATE INDEX IF NOT EXISTS idx_tags_search_vector 
-    ON tags USING GIN(search_vector);
+    CREATE INDEX IF NOT EXISTS idx_tag_search_vector 
+    ON "Tag" USING GIN(search_vector);
     
     -- Create trigger to automatically update search vector
-    CREATE OR REPLACE FUNCTION tags_search_vector_trigger() RETURNS trigger AS $$
+    CREATE OR REPLACE FUNCTION tag_search_vector_trigger() RETURNS trigger AS $$
     BEGIN
         NEW.search_vector :=
-            setweight(to_tsvector('english', COALESCE(NEW.name, '')), 'A') ||
-            setweight(to_tsvector('english', COALESCE(NEW.description, '')), 'B');
+            setweight(to_tsvector('english', COALESCE(NEW.name, '')), 'A');
         RETURN NEW;
     END
     $$ LANGUAGE plpgsql;
     
-    DROP TRIGGER IF EXISTS tags_search_vector_update ON tags;
-    CREATE TRIGGER tags_search_vector_update
-    BEFORE INSERT OR UPDATE ON tags
-    FOR EACH ROW EXECUTE FUNCTION tags_search_vector_trigger();
+    DROP TRIGGER IF EXISTS tag_search_vector_update ON "Tag";
+    CREATE TRIGGER tag_search_vector_update
+    BEFORE INSERT OR UPDATE OF name ON "Tag"
+    FOR EACH ROW EXECUTE FUNCTION tag_search_vector_trigger();
     
     -- Update existing rows
-    UPDATE tags SET search_vector = 
-        setweight(to_tsvector('english', COALESCE(name, '')), 'A') ||
-        setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+    UPDATE "Tag" SET search_vector = 
+        setweight(to_tsvector('english', COALESCE(name, '')), 'A')
     WHERE search_vector IS NULL;
     """,
     
     # Additional indexes for search filters
     """
-    -- Index for genre filter
-    CREATE INDEX IF NOT EXISTS idx_stories_genre 
-    ON stories(genre) WHERE published = true;
-    
-    -- Index for completion status filter
-    CREATE INDEX IF NOT EXISTS idx_stories_completion_status 
-    ON stories(completion_status) WHERE published = true;
-    
-    -- Index for word count filter
-    CREATE INDEX IF NOT EXISTS idx_stories_word_count 
-    ON stories(word_count) WHERE published = true;
-    
     -- Index for update date filter
-    CREATE INDEX IF NOT EXISTS idx_stories_updated_at 
-    ON stories(updated_at DESC) WHERE published = true;
-    
-    -- Composite index for filtered search
-    CREATE INDEX IF NOT EXISTS idx_stories_search_filters 
-    ON stories(published, genre, completion_status, updated_at DESC) 
-    WHERE published = true;
+    CREATE INDEX IF NOT EXISTS idx_story_search_updated_at 
+    ON "Story" (updated_at DESC) WHERE published = true AND deleted_at IS NULL;
     """,
     
     # Search query tracking table
@@ -7,17 +7,28 @@ built-in full-text search capabilities.
 Requirements: 35.1, 35.2, 35.3, 35.4, 35.5, 35.6, 35.7, 35.8, 35.9, 35.10, 35.11, 35.12
 """
 
+import base64
+import json
+import logging
+import re
 import time
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from django.db import connection
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
 from django.db.models import Q, F, Count
 from django.core.cache import cache
 
+from .cache_manager import CacheStampedeGuard
 from .database_cache import cache_query, invalidate_by_tags
 
+logger = logging.getLogger(__name__)
+
+# Shared so concurrent stale reads of a query start one background refresh
+_stampede_guard = CacheStampedeGuard(cache)
+
 
 @dataclass
 class SearchResult:
@@ -57,6 +68,9 @@ class SearchService:
     # Cache TTL for search results (5 minutes per Requirement 35.7)
     CACHE_TTL = 300
     
+    # Seconds an expired results page may be served while it is refreshed
+    CACHE_STALE_TTL = 60
+    
     # Results per page (Requirement 35.8)
     RESULTS_PER_PAGE = 20
     
@@ -72,55 +86,82 @@ class SearchService:
         query: str,
         filters: Optional[SearchFilters] = None,
         page: int = 1,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count_mode: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Search stories with full-text search and filters.
         
+        Matches the query against the GIN-indexed Story.search_vector column
+        (see infrastructure/search_indexes.py) and ranks by ts_rank_cd.
+        Pages are read by keyset on (rank, updated_at, id): pass the
+        next_cursor of one page to get the next. Page numbers still work
+        for the first pages but fall back to OFFSET.
+        
         Args:
-            query: Search query string
+            query: Search query string (websearch syntax: "phrase", OR, -word)
             filters: Optional search filters
-            page: Page number (1-indexed)
+            page: Page number (1-indexed), ignored when cursor is given
             user_id: Optional user ID for analytics
+            cursor: Opaque cursor from a previous page's next_cursor
+            count_mode: 'estimated' (planner estimate) or 'exact' (COUNT(*));
+                defaults to settings.SEARCH_COUNT_MODE
             
         Returns:
-            Dictionary with results, total count, and metadata
+            Dictionary with results, total count, next cursor, and metadata
             
         Requirements: 35.3, 35.4, 35.5, 35.7, 35.8, 35.9
         """
         start_time = time.time()
         
+        count_mode = count_mode or getattr(settings, 'SEARCH_COUNT_MODE', 'estimated')
+        after = self._decode_cursor(cursor)
+        if after:
+            page = 1
+        
         # Generate cache key
         cache_key = self._generate_cache_key('stories', query, filters, page)
+        cache_key += f":{count_mode}:{cursor or ''}"
         
-        # Try to get from cache
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
-            # Track cache hit
-            self._track_search_query(
-                query, user_id, cached_result['total'], 
-                int((time.time() - start_time) * 1000), from_cache=True
-            )
-            return cached_result
+        # Concurrent misses for a hot query share one database round trip,
+        # and an expiring page keeps being served while it is refreshed
+        computed = []
+        
+        def compute():
+            computed.append(True)
+            return self._query_stories(query, filters, page, after, count_mode)
         
+        result = _stampede_guard.get_or_compute(
+            cache_key, compute, self.CACHE_TTL, stale_ttl=self.CACHE_STALE_TTL
+        )
+        
+        # Track search query
+        response_time_ms = int((time.time() - start_time) * 1000)
+        self._track_search_query(
+            query, user_id, result['total'], response_time_ms, from_cache=not computed
+        )
+        
+        return result
+    
+    def _query_stories(
+        self,
+        query: str,
+        filters: Optional[SearchFilters],
+        page: int,
+        after: Optional[Dict[str, Any]],
+        count_mode: str
+    ) -> Dict[str, Any]:
+        """Run the story search against PostgreSQL (uncached)."""
         # Build search query
         search_query = self._build_search_query(query)
         
-        # Build SQL query - simplified version without full-text search
-        # TODO: Add search_vector column and full-text search indexes
-        sql = """
-            SELECT 
-                id, title, blurb as description, author_id, updated_at,
-                1.0 AS rank,
-                LEFT(blurb, 200) AS snippet
-            FROM "Story"
-            WHERE (title ILIKE %s OR blurb ILIKE %s)
-                AND published = true
-                AND deleted_at IS NULL
+        where_sql = """
+            s.search_vector @@ websearch_to_tsquery('english', %s)
+                AND s.published = true
+                AND s.deleted_at IS NULL
         """
-        
-        search_pattern = f"%{query}%"
-        params = [search_pattern, search_pattern]
+        where_params = [search_query]
         
         # Add filters (only for fields that exist in the Story model)
         if filters:
@@ -128,46 +169,59 @@ class SearchService:
             # TODO: Add these fields to the Story model in Prisma schema
             
             if filters.updated_after:
-                sql += " AND updated_at >= %s"
-                params.append(filters.updated_after)
+                where_sql += " AND s.updated_at >= %s"
+                where_params.append(filters.updated_after)
             
             if filters.updated_before:
-                sql += " AND updated_at <= %s"
-                params.append(filters.updated_before)
-        
-        # Add ordering
-        sql += " ORDER BY rank DESC, updated_at DESC"
-        
-        # Build count query
-        count_sql = """
-            SELECT COUNT(*)
-            FROM "Story"
-            WHERE (title ILIKE %s OR blurb ILIKE %s)
-                AND published = true
-                AND deleted_at IS NULL
+                where_sql += " AND s.updated_at <= %s"
+                where_params.append(filters.updated_before)
+        
+        # Rank is cast to float8 so cursor values round-trip exactly
+        sql = f"""
+            SELECT id, title, description, author_id, updated_at, rank, snippet
+            FROM (
+                SELECT 
+                    s.id, s.title, s.blurb AS description, s.author_id, s.updated_at,
+                    ts_rank_cd(s.search_vector, websearch_to_tsquery('english', %s))::float8 AS rank,
+                    LEFT(s.blurb, 200) AS snippet
+                FROM "Story" s
+                WHERE {where_sql}
+            ) ranked
         """
-        
-        # Add same filters to count query
-        if filters:
-            if filters.updated_after:
-                count_sql += " AND updated_at >= %s"
-            
-            if filters.updated_before:
-                count_sql += " AND updated_at <= %s"
-        
-        with connection.cursor() as cursor:
-            # Get total count
-            cursor.execute(count_sql, params)
-            total = int(cursor.fetchone()[0])  # Convert to int
-            
-            # Add pagination
-            offset = (page - 1) * self.RESULTS_PER_PAGE
-            sql += f" LIMIT {self.RESULTS_PER_PAGE} OFFSET {offset}"
+        params = [search_query] + where_params
+        
+        if after:
+            sql += " WHERE (rank, updated_at, id) < (%s::float8, %s, %s)"
+            params.extend([after['rank'], after['updated_at'], after['id']])
+        
+        # Fetch one extra row to know whether another page exists
+        sql += " ORDER BY rank DESC, updated_at DESC, id DESC LIMIT %s"
+        params.append(self.RESULTS_PER_PAGE + 1)
+        if not after and page > 1:
+            sql += " OFFSET %s"
+            params.append((page - 1) * self.RESULTS_PER_PAGE)
+        
+        count_sql = f'SELECT COUNT(*) FROM "Story" s WHERE {where_sql}'
+        
+        with connection.cursor() as db_cursor:
+            if count_mode == 'exact':
+                db_cursor.execute(count_sql, where_params)
+                total = int(db_cursor.fetchone()[0])
+            else:
+                total = self._estimate_count(
+                    db_cursor,
+                    f'SELECT 1 FROM "Story" s WHERE {where_sql}',
+                    where_params
+                )
             
             # Execute search
-            cursor.execute(sql, params)
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            db_cursor.execute(sql, params)
+            columns = [col[0] for col in db_cursor.description]
+            results = [dict(zip(columns, row)) for row in db_cursor.fetchall()]
+        
+        has_next = len(results) > self.RESULTS_PER_PAGE
+        results = results[:self.RESULTS_PER_PAGE]
+        next_cursor = self._encode_cursor(results[-1]) if has_next else None
         
         # Format results
         formatted_results = [
@@ -193,21 +247,66 @@ class SearchService:
         result = {
             'results': formatted_results,
             'total': total,
+            'total_is_estimate': count_mode != 'exact',
             'page': page,
             'per_page': self.RESULTS_PER_PAGE,
             'total_pages': total_pages,
-            'has_next': page < total_pages,
-            'has_prev': page > 1
+            'has_next': has_next,
+            'has_prev': page > 1 or after is not None,
+            'next_cursor': next_cursor
         }
         
-        # Cache result
-        cache.set(cache_key, result, self.CACHE_TTL)
+        return result
+    
+    def _estimate_count(self, db_cursor, match_sql: str, params: List[Any]) -> int:
+        """
+        Estimate the number of matching rows from the query planner.
         
-        # Track search query
-        response_time_ms = int((time.time() - start_time) * 1000)
-        self._track_search_query(query, user_id, total, response_time_ms)
+        Avoids running COUNT(*) over every match on broad queries.
         
-        return result
+        Args:
+            db_cursor: Open database cursor
+            match_sql: Query selecting one row per match
+            params: Query parameters
+            
+        Returns:
+            Planner row estimate (0 if unavailable)
+        """
+        db_cursor.execute(f"EXPLAIN (FORMAT JSON) {match_sql}", params)
+        plan = db_cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan'].get('Plan Rows', 0))
+    
+    @staticmethod
+    def _encode_cursor(row: Dict[str, Any]) -> str:
+        """Encode the last row of a page as an opaque keyset cursor."""
+        payload = json.dumps({
+            'r': float(row['rank']),
+            'u': row['updated_at'].isoformat() if row['updated_at'] else None,
+            'i': row['id'],
+        })
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('utf-8')
+    
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Decode a keyset cursor.
+        
+        Returns:
+            Dict with rank, updated_at and id, or None for a missing or malformed cursor
+        """
+        if not cursor:
+            return None
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')).decode('utf-8'))
+            return {
+                'rank': float(decoded['r']),
+                'updated_at': datetime.fromisoformat(decoded['u']) if decoded['u'] else None,
+                'id': str(decoded['i']),
+            }
+        except (ValueError, KeyError, TypeError):
+            return None
     
     def search_authors(
         self,
@@ -321,6 +420,12 @@ class SearchService:
         """
         Get autocomplete suggestions for search query.
         
+        Prefix matches on story titles come first, then fuzzy (trigram
+        similarity) matches, both served by the pg_trgm index on
+        lower(title). The query runs under a statement timeout of
+        AUTOCOMPLETE_TIMEOUT_MS; a timed-out lookup returns no suggestions
+        rather than holding up the request.
+        
         Args:
             query: Partial search query
             limit: Maximum number of suggestions
@@ -330,8 +435,12 @@ class SearchService:
             
         Requirements: 35.6
         """
+        normalized = ' '.join(query.lower().split())
+        if not normalized:
+            return []
+        
         # Cache key for autocomplete
-        cache_key = f"{self.cache_prefix}autocomplete:{query.lower()}"
+        cache_key = f"{self.cache_prefix}autocomplete:{normalized}:{limit}"
         
         # Try to get from cache
         cached_suggestions = cache.get(cache_key)
@@ -340,24 +449,45 @@ class SearchService:
         
         # Get suggestions from story titles
         sql = """
-            SELECT DISTINCT title
-            FROM "Story"
-            WHERE published = true
-                AND deleted_at IS NULL
-                AND title ILIKE %s
-            ORDER BY title
+            SELECT title
+            FROM (
+                SELECT DISTINCT ON (lower(title))
+                    title,
+                    lower(title) LIKE %s AS is_prefix,
+                    similarity(lower(title), %s) AS sim
+                FROM "Story"
+                WHERE published = true
+                    AND deleted_at IS NULL
+                    AND (lower(title) LIKE %s OR lower(title) %% %s)
+                ORDER BY lower(title), title
+            ) matches
+            ORDER BY is_prefix DESC, sim DESC, title
             LIMIT %s
         """
-        
-        with connection.cursor() as cursor:
-            cursor.execute(sql, [f"{query}%", limit])
-            suggestions = [row[0] for row in cursor.fetchall()]
-        
-        # Cache suggestions for 5 minutes
+        prefix = self._escape_like(normalized) + '%'
+        
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "SET LOCAL statement_timeout = %s",
+                    [self.AUTOCOMPLETE_TIMEOUT_MS]
+                )
+                cursor.execute(sql, [prefix, normalized, prefix, normalized, limit])
+                suggestions = [row[0] for row in cursor.fetchall()]
+        except OperationalError as e:
+            logger.warning(f"Autocomplete query for '{normalized}' timed out: {e}")
+            return []
+        
+        # Cache suggestions
         cache.set(cache_key, suggestions, self.CACHE_TTL)
         
         return suggestions
     
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        """Escape LIKE wildcards in user input."""
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    
     def get_popular_searches(
         self,
         days: int = 7,
@@ -438,53 +568,29 @@ class SearchService:
     
     def _build_search_query(self, query: str) -> str:
         """
-        Build PostgreSQL tsquery from user query.
+        Build a websearch_to_tsquery input from a user query.
         
-        Handles:
+        websearch_to_tsquery never raises on malformed input, so user text
+        is passed through it rather than to_tsquery. Handles:
         - Multiple words (AND by default)
         - OR operator
-        - NOT operator
+        - NOT operator (rewritten to websearch "-word")
         - Phrase search (quotes)
         
         Args:
             query: User search query
             
         Returns:
-            PostgreSQL tsquery string
+            Query string for websearch_to_tsquery
             
         Requirements: 35.12
         """
         # Remove extra whitespace
         query = ' '.join(query.split())
         
-        # Handle phrase search (quotes)
-        if '"' in query:
-            # Extract phrases
-            import re
-            phrases = re.findall(r'"([^"]*)"', query)
-            non_phrases = re.sub(r'"[^"]*"', '', query).strip()
-            
-            # Build query
-            parts = []
-            for phrase in phrases:
-                parts.append(f"'{phrase.replace(' ', ' <-> ')}'")
-            
-            if non_phrases:
-                # Split non-phrase words and join with &
-                words = non_phrases.split()
-                parts.extend(words)
-            
-            return ' & '.join(parts)
-        
-        # Handle boolean operators
-        query = query.replace(' OR ', ' | ')
-        query = query.replace(' AND ', ' & ')
-        query = query.replace(' NOT ', ' !')
-        
-        # If no operators, join words with &
-        if '&' not in query and '|' not in query:
-            words = query.split()
-            query = ' & '.join(words)
+        # AND is the default; NOT becomes a negated term
+        query = re.sub(r'\bAND\s+', '', query)
+        query = re.sub(r'\bNOT\s+', '-', query)
         
         return query
     
@@ -507,6 +613,10 @@ class SearchService:
                 key_parts.append(f"min:{str(filters.min_word_count)}")
             if filters.max_word_count:
                 key_parts.append(f"max:{str(filters.max_word_count)}")
+            if filters.updated_after:
+                key_parts.append(f"after:{filters.updated_after.isoformat()}")
+            if filters.updated_before:
+                key_parts.append(f"before:{filters.updated_before.isoformat()}")
         
         return ':'.join(key_parts)
     
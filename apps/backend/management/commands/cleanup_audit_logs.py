@@ -9,9 +9,10 @@ Usage:
 from django.core.management.base import BaseCommand
 from datetime import datetime, timedelta
 import asyncio
-from prisma import Prisma
 from prisma.enums import AuditActionType
 
+from infrastructure.prisma_pool import get_prisma
+
 
 class Command(BaseCommand):
     help = 'Clean up old audit logs based on retention policy'
@@ -116,7 +117,7 @@ class Command(BaseCommand):
         self.stdout.write(f'Dry run: {dry_run}')
         self.stdout.write(f'Archive: {archive}\n')
         
-        db = Prisma()
+        db = get_prisma()
         await db.connect()
         
         try:
@@ -0,0 +1,26 @@
+-- CreateTable
+CREATE TABLE "ContentFingerprint" (
+    "id" TEXT NOT NULL,
+    "content_type" TEXT NOT NULL,
+    "content_id" TEXT NOT NULL,
+    "user_id" TEXT NOT NULL,
+    "exact_hash" TEXT NOT NULL,
+    "simhash" BIGINT NOT NULL,
+    "lsh_buckets" TEXT[],
+    "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ContentFingerprint_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "ContentFingerprint_content_type_content_id_key" ON "ContentFingerprint"("content_type", "content_id");
+
+-- CreateIndex
+CREATE INDEX "ContentFingerprint_exact_hash_idx" ON "ContentFingerprint"("exact_hash");
+
+-- CreateIndex
+CREATE INDEX "ContentFingerprint_user_id_created_at_idx" ON "ContentFingerprint"("user_id", "created_at");
+
+-- CreateIndex
+CREATE INDEX "ContentFingerprint_lsh_buckets_idx" ON "ContentFingerprint" USING GIN ("lsh_buckets");
@@ -0,0 +1,23 @@
+-- AlterTable
+ALTER TABLE "UserProfile" ADD COLUMN "follower_count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "following_count" INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill counters from existing follows
+UPDATE "UserProfile" AS p
+SET follower_count = f.followers
+FROM (SELECT following_id AS id, COUNT(*) AS followers FROM "Follow" GROUP BY following_id) AS f
+WHERE p.id = f.id;
+
+UPDATE "UserProfile" AS p
+SET following_count = g.following
+FROM (SELECT follower_id AS id, COUNT(*) AS following FROM "Follow" GROUP BY follower_id) AS g
+WHERE p.id = g.id;
+
+-- DropIndex
+DROP INDEX "Follow_following_id_idx";
+
+-- CreateIndex
+CREATE INDEX "Follow_following_id_created_at_idx" ON "Follow"("following_id", "created_at");
+
+-- CreateIndex
+CREATE INDEX "Follow_follower_id_created_at_idx" ON "Follow"("follower_id", "created_at");
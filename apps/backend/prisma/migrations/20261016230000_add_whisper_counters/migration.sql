@@ -0,0 +1,19 @@
+-- AlterTable
+ALTER TABLE "Whisper" ADD COLUMN "like_count" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "reply_count" INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill counters from existing likes and replies
+UPDATE "Whisper" AS w
+SET like_count = l.likes
+FROM (SELECT whisper_id AS id, COUNT(*) AS likes FROM "WhisperLike" GROUP BY whisper_id) AS l
+WHERE w.id = l.id;
+
+UPDATE "Whisper" AS w
+SET reply_count = r.replies
+FROM (
+    SELECT parent_id AS id, COUNT(*) AS replies
+    FROM "Whisper"
+    WHERE parent_id IS NOT NULL AND deleted_at IS NULL
+    GROUP BY parent_id
+) AS r
+WHERE w.id = r.id;
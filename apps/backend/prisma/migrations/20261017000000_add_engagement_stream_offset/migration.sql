@@ -0,0 +1,8 @@
+-- CreateTable
+CREATE TABLE "EngagementStreamOffset" (
+    "stream" TEXT NOT NULL,
+    "last_id" TEXT NOT NULL,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "EngagementStreamOffset_pkey" PRIMARY KEY ("stream")
+);
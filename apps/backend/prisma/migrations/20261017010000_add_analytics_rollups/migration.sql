@@ -0,0 +1,61 @@
+-- CreateTable
+CREATE TABLE "StoryMetrics" (
+    "story_id" TEXT NOT NULL,
+    "author_id" TEXT NOT NULL,
+    "total_views" INTEGER NOT NULL DEFAULT 0,
+    "total_saves" INTEGER NOT NULL DEFAULT 0,
+    "total_likes" INTEGER NOT NULL DEFAULT 0,
+    "total_comments" INTEGER NOT NULL DEFAULT 0,
+    "unique_readers" INTEGER NOT NULL DEFAULT 0,
+    "completed_readers" INTEGER NOT NULL DEFAULT 0,
+    "completion_rate" DOUBLE PRECISION NOT NULL DEFAULT 0,
+    "total_chapters" INTEGER NOT NULL DEFAULT 0,
+    "computed_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "StoryMetrics_pkey" PRIMARY KEY ("story_id")
+);
+
+-- CreateTable
+CREATE TABLE "ChapterMetrics" (
+    "chapter_id" TEXT NOT NULL,
+    "story_id" TEXT NOT NULL,
+    "chapter_number" INTEGER NOT NULL,
+    "readers" INTEGER NOT NULL DEFAULT 0,
+    "next_chapter_readers" INTEGER,
+    "retention_rate" DOUBLE PRECISION,
+    "comments" INTEGER NOT NULL DEFAULT 0,
+    "likes" INTEGER NOT NULL DEFAULT 0,
+    "computed_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ChapterMetrics_pkey" PRIMARY KEY ("chapter_id")
+);
+
+-- CreateTable
+CREATE TABLE "AuthorMetrics" (
+    "author_id" TEXT NOT NULL,
+    "total_stories" INTEGER NOT NULL DEFAULT 0,
+    "total_views" INTEGER NOT NULL DEFAULT 0,
+    "total_likes" INTEGER NOT NULL DEFAULT 0,
+    "total_comments" INTEGER NOT NULL DEFAULT 0,
+    "computed_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "AuthorMetrics_pkey" PRIMARY KEY ("author_id")
+);
+
+-- CreateTable
+CREATE TABLE "PlatformMetrics" (
+    "scope" TEXT NOT NULL,
+    "story_count" INTEGER NOT NULL DEFAULT 0,
+    "avg_views" DOUBLE PRECISION NOT NULL DEFAULT 0,
+    "avg_likes" DOUBLE PRECISION NOT NULL DEFAULT 0,
+    "avg_completion_rate" DOUBLE PRECISION NOT NULL DEFAULT 0,
+    "computed_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "PlatformMetrics_pkey" PRIMARY KEY ("scope")
+);
+
+-- CreateIndex
+CREATE INDEX "StoryMetrics_author_id_total_views_idx" ON "StoryMetrics"("author_id", "total_views");
+
+-- CreateIndex
+CREATE INDEX "ChapterMetrics_story_id_chapter_number_idx" ON "ChapterMetrics"("story_id", "chapter_number");
@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "DataExportRequest" ADD COLUMN     "progress" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "records_exported" INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,93 @@
+-- Full-text search columns declared as Unsupported("tsvector") in schema.prisma.
+-- Kept in step with infrastructure/search_indexes.py, which stays idempotent
+-- (IF NOT EXISTS / CREATE OR REPLACE) so create_search_indexes can still be run.
+
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- AlterTable
+ALTER TABLE "Story" ADD COLUMN IF NOT EXISTS "search_vector" tsvector;
+
+-- AlterTable
+ALTER TABLE "UserProfile" ADD COLUMN IF NOT EXISTS "search_vector" tsvector;
+
+-- AlterTable
+ALTER TABLE "Tag" ADD COLUMN IF NOT EXISTS "search_vector" tsvector;
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_story_search_vector" ON "Story" USING GIN ("search_vector");
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_user_profile_search_vector" ON "UserProfile" USING GIN ("search_vector");
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_tag_search_vector" ON "Tag" USING GIN ("search_vector");
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "idx_story_title_trgm" ON "Story" USING GIN (lower("title") gin_trgm_ops) WHERE "published" = true AND "deleted_at" IS NULL;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION story_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.blurb, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION user_profile_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.display_name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.handle, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.bio, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- CreateFunction
+CREATE OR REPLACE FUNCTION tag_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.name, '')), 'A');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+DROP TRIGGER IF EXISTS story_search_vector_update ON "Story";
+CREATE TRIGGER story_search_vector_update
+BEFORE INSERT OR UPDATE OF title, blurb ON "Story"
+FOR EACH ROW EXECUTE FUNCTION story_search_vector_trigger();
+
+-- CreateTrigger
+DROP TRIGGER IF EXISTS user_profile_search_vector_update ON "UserProfile";
+CREATE TRIGGER user_profile_search_vector_update
+BEFORE INSERT OR UPDATE OF display_name, handle, bio ON "UserProfile"
+FOR EACH ROW EXECUTE FUNCTION user_profile_search_vector_trigger();
+
+-- CreateTrigger
+DROP TRIGGER IF EXISTS tag_search_vector_update ON "Tag";
+CREATE TRIGGER tag_search_vector_update
+BEFORE INSERT OR UPDATE OF name ON "Tag"
+FOR EACH ROW EXECUTE FUNCTION tag_search_vector_trigger();
+
+-- Backfill
+UPDATE "Story" SET "search_vector" =
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(blurb, '')), 'B')
+WHERE "search_vector" IS NULL;
+
+-- Backfill
+UPDATE "UserProfile" SET "search_vector" =
+    setweight(to_tsvector('english', COALESCE(display_name, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(handle, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(bio, '')), 'B')
+WHERE "search_vector" IS NULL;
+
+-- Backfill
+UPDATE "Tag" SET "search_vector" =
+    setweight(to_tsvector('english', COALESCE(name, '')), 'A')
+WHERE "search_vector" IS NULL;
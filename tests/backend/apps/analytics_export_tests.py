@@ -0,0 +1,196 @@
+"""
+Tests for streaming analytics exports.
+
+Prisma is mocked to serve keyset pages and S3 is replaced with a client that
+records multipart uploads, so paging, encoding, gzip and the offloaded S3
+export can be checked without external services.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.conf import settings
+
+from apps.analytics import export
+from apps.analytics.export import TRENDS_PAGE_SQL, encode_pages, iter_export_pages
+from infrastructure import s3_multipart
+from infrastructure.s3_multipart import S3MultipartWriter
+
+
+def trend_row(day):
+    return {
+        'date': f'2026-10-{day:02d}',
+        'views': day,
+        'saves': 0,
+        'likes': 1,
+        'comments': 0,
+        'trending_score': 0.5,
+    }
+
+
+def make_db(rows):
+    """Prisma mock serving TRENDS_PAGE_SQL pages from rows."""
+    db = MagicMock()
+    db.connect = AsyncMock()
+    db.disconnect = AsyncMock()
+
+    async def query_raw(sql, story_id, cursor, limit):
+        assert sql == TRENDS_PAGE_SQL
+        return [row for row in rows if row['date'] > cursor][:limit]
+
+    db.query_raw = AsyncMock(side_effect=query_raw)
+    return db
+
+
+class FakeS3:
+    """Records multipart uploads in memory."""
+
+    def __init__(self, fail_on_part=None):
+        self.parts = {}
+        self.objects = {}
+        self.aborted = []
+        self.fail_on_part = fail_on_part
+
+    def create_multipart_upload(self, Bucket, Key, **extra):
+        self.parts[Key] = []
+        return {'UploadId': f'upload-{Key}'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == self.fail_on_part:
+            raise Exception('S3 down')
+        self.parts[Key].append(Body)
+        return {'ETag': f'etag-{PartNumber}'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        assert [part['PartNumber'] for part in MultipartUpload['Parts']] == list(range(1, len(self.parts[Key]) + 1))
+        self.objects[Key] = b''.join(self.parts[Key])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(Key)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.example.com/{Params['Key']}"
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.values[key] = value
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    fake_cache = FakeCache()
+    monkeypatch.setattr(export, 'cache', fake_cache)
+    return fake_cache
+
+
+class TestPaging:
+    @pytest.mark.asyncio
+    async def test_pages_follow_the_keyset_cursor(self):
+        db = make_db([trend_row(day) for day in range(1, 6)])
+
+        with patch('apps.analytics.export.get_prisma', return_value=db):
+            pages = [page async for page in iter_export_pages('story-1', 'trends', page_size=2)]
+
+        assert [[row['date'] for row in page] for page in pages] == [
+            ['2026-10-01', '2026-10-02'], ['2026-10-03', '2026-10-04'], ['2026-10-05']
+        ]
+        cursors = [call.args[2] for call in db.query_raw.await_args_list]
+        assert cursors[1:] == ['2026-10-02', '2026-10-04']
+        # A lease per page, returned after each one
+        assert db.connect.await_count == db.disconnect.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_full_last_page_needs_one_empty_read(self):
+        db = make_db([trend_row(day) for day in range(1, 5)])
+
+        with patch('apps.analytics.export.get_prisma', return_value=db):
+            pages = [page async for page in iter_export_pages('story-1', 'trends', page_size=2)]
+
+        assert len(pages) == 2
+        assert db.query_raw.await_count == 3
+
+
+class TestEncoding:
+    def test_csv_has_one_header_and_a_chunk_per_page(self):
+        pages = [[trend_row(1), trend_row(2)], [trend_row(3)]]
+
+        chunks = list(encode_pages(pages, 'trends', 'csv'))
+
+        assert len(chunks) == 2
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        assert [row['date'] for row in rows] == ['2026-10-01', '2026-10-02', '2026-10-03']
+        assert rows[0]['views'] == '1'
+
+    def test_ndjson_has_one_object_per_row(self):
+        pages = [[trend_row(1)], [trend_row(2)]]
+
+        lines = b''.join(encode_pages(pages, 'trends', 'ndjson')).decode().splitlines()
+
+        assert [json.loads(line) for line in lines] == [trend_row(1), trend_row(2)]
+
+    def test_gzipped_stream_round_trips(self, monkeypatch):
+        async def pages(story_id, export_type, days):
+            for day in range(1, 4):
+                yield [trend_row(day)]
+
+        monkeypatch.setattr(export, 'iter_export_pages', pages)
+
+        body = b''.join(export.stream_export('story-1', 'trends', 'ndjson', gzip=True))
+
+        assert len(gzip.decompress(body).decode().splitlines()) == 3
+
+
+class TestS3Export:
+    def test_export_is_uploaded_in_parts(self, monkeypatch, fake_cache):
+        async def pages(story_id, export_type, days):
+            for day in range(1, 29):
+                # Random values so the gzipped export spans several parts
+                yield [dict(trend_row(day), trending_score=os.urandom(200).hex()) for _ in range(10)]
+
+        monkeypatch.setattr(export, 'iter_export_pages', pages)
+        monkeypatch.setattr(s3_multipart, 'MIN_PART_SIZE', 1024)
+        monkeypatch.setattr(settings, 'S3_MULTIPART_PART_SIZE', 4096, raising=False)
+        s3 = FakeS3()
+
+        url = export.export_to_s3('export-1', 'story-1', 'trends', 'csv', s3_client=s3)
+
+        key = 'analytics-exports/story-1/export-1.csv.gz'
+        assert url == f'https://s3.example.com/{key}'
+        assert len(s3.parts[key]) > 1
+        assert all(len(part) == 4096 for part in s3.parts[key][:-1])
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(s3.objects[key]).decode())))
+        assert len(rows) == 28 * 10
+        assert export.get_export_status('export-1')['status'] == 'completed'
+
+    def test_failed_upload_is_aborted(self, monkeypatch, fake_cache):
+        async def pages(story_id, export_type, days):
+            yield [trend_row(1)]
+
+        monkeypatch.setattr(export, 'iter_export_pages', pages)
+        s3 = FakeS3(fail_on_part=1)
+
+        with pytest.raises(Exception):
+            export.export_to_s3('export-1', 'story-1', 'trends', 'csv', s3_client=s3)
+
+        assert s3.aborted == ['analytics-exports/story-1/export-1.csv.gz']
+        assert export.get_export_status('export-1') == {'status': 'failed', 'error': 'S3 down'}
+
+    def test_empty_object_is_a_single_empty_part(self):
+        s3 = FakeS3()
+
+        with S3MultipartWriter(s3, 'bucket', 'empty') as writer:
+            writer.write(b'')
+
+        assert s3.parts['empty'] == [b'']
+        assert s3.objects['empty'] == b''
@@ -0,0 +1,467 @@
+"""
+Tests for pre-aggregated author analytics.
+
+Valkey is replaced with fakeredis and Prisma with in-memory source and
+rollup tables that each rollup statement reads and writes as Postgres
+would, so the tests check the aggregated numbers an author sees: totals,
+unique readers, completion and retention rates, pruning of unpublished
+stories, incremental refreshes and how many queries a dashboard read takes.
+"""
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import redis
+
+from apps.analytics import rollups
+from apps.analytics.analytics_service import AnalyticsService
+from apps.analytics.rollups import (
+    AUTHOR_AVERAGES_SQL,
+    AUTHOR_METRICS_SQL,
+    CHAPTER_METRICS_SQL,
+    PLATFORM_METRICS_SQL,
+    REFRESH_AUTHORS_SQL,
+    REFRESH_CHAPTERS_SQL,
+    REFRESH_PLATFORM_SQL,
+    REFRESH_STORIES_SQL,
+    STORY_METRICS_SQL,
+    TOP_STORIES_SQL,
+    ChangedStories,
+    refresh_changed_stories,
+    refresh_stories,
+)
+
+
+def selected(ids_json, value):
+    """A $1::json IS NULL OR value IN json_array_elements_text($1) filter."""
+    return ids_json is None or value in json.loads(ids_json)
+
+
+class FakeAnalyticsDb:
+    """Source and rollup tables in memory, updated the way each rollup statement does."""
+
+    def __init__(self):
+        self.stories = {}
+        self.chapters = {}
+        self.progress = set()
+        self.daily_stats = []
+        self.whispers = []
+        self.followers = {}
+        self.story_metrics = {}
+        self.chapter_metrics = {}
+        self.author_metrics = {}
+        self.platform_metrics = {}
+        self.fail_refresh = False
+
+        self.connect = AsyncMock()
+        self.disconnect = AsyncMock()
+        self.query_raw = AsyncMock(side_effect=self._query_raw)
+        self.execute_raw = AsyncMock(side_effect=self._execute_raw)
+        self.story = MagicMock()
+        self.story.find_many = AsyncMock(side_effect=self._find_stories)
+        self.story.find_unique = AsyncMock(side_effect=lambda where: self.stories.get(where['id']))
+
+    def add_story(self, story_id, author_id='author-1', chapters=2, published=True):
+        self.followers.setdefault(author_id, 0)
+        self.stories[story_id] = SimpleNamespace(
+            id=story_id, author_id=author_id, title=story_id.title(), published=published,
+            deleted_at=None, published_at='2026-10-01T00:00:00'
+        )
+        for number in range(1, chapters + 1):
+            chapter_id = f'{story_id}-ch{number}'
+            self.chapters[chapter_id] = SimpleNamespace(
+                id=chapter_id, story_id=story_id, chapter_number=number,
+                title=f'Chapter {number}', deleted_at=None, published_at=None
+            )
+
+    def read(self, user_id, story_id, chapters):
+        """Record reading progress on a story's first chapters."""
+        for number in range(1, chapters + 1):
+            self.progress.add((user_id, f'{story_id}-ch{number}'))
+
+    def add_stats(self, story_id, reads=0, saves=0):
+        self.daily_stats.append((story_id, reads, saves))
+
+    def add_whisper(self, story_id, like_count=0, chapter_id=None, deleted=False):
+        self.whispers.append(SimpleNamespace(
+            story_id=story_id, chapter_id=chapter_id, like_count=like_count, deleted=deleted
+        ))
+
+    def _live_chapters(self, story_id):
+        return sorted(
+            (c for c in self.chapters.values() if c.story_id == story_id and not c.deleted_at),
+            key=lambda c: c.chapter_number
+        )
+
+    def _targets(self, ids_json):
+        return [
+            story for story in self.stories.values()
+            if story.published and not story.deleted_at and selected(ids_json, story.id)
+        ]
+
+    def _refresh_stories(self, ids_json):
+        if self.fail_refresh:
+            raise Exception('DB down')
+        targets = self._targets(ids_json)
+        target_ids = {story.id for story in targets}
+        authors = set()
+
+        for story_id in [s for s in self.story_metrics if selected(ids_json, s) and s not in target_ids]:
+            authors.add(self.story_metrics.pop(story_id)['author_id'])
+
+        for story in targets:
+            chapters = self._live_chapters(story.id)
+            chapter_ids = {chapter.id for chapter in chapters}
+            readers = {user for user, chapter_id in self.progress if chapter_id in chapter_ids}
+            completed = sum(
+                1 for _, chapter_id in self.progress if chapters and chapter_id == chapters[-1].id
+            )
+            whispers = [w for w in self.whispers if w.story_id == story.id and not w.deleted]
+            self.story_metrics[story.id] = {
+                'story_id': story.id,
+                'author_id': story.author_id,
+                'total_views': sum(reads for s, reads, _ in self.daily_stats if s == story.id),
+                'total_saves': sum(saves for s, _, saves in self.daily_stats if s == story.id),
+                'total_likes': sum(w.like_count for w in whispers),
+                'total_comments': len(whispers),
+                'unique_readers': len(readers),
+                'completed_readers': completed,
+                'completion_rate': round(completed * 100.0 / len(readers), 2) if readers else 0,
+                'total_chapters': len(chapters),
+            }
+            authors.add(story.author_id)
+        return [{'author_id': author_id} for author_id in authors]
+
+    def _refresh_chapters(self, ids_json):
+        live = {}
+        for story in self._targets(ids_json):
+            live[story.id] = self._live_chapters(story.id)
+        live_ids = {chapter.id for chapters in live.values() for chapter in chapters}
+
+        for chapter_id, row in list(self.chapter_metrics.items()):
+            if selected(ids_json, row['story_id']) and chapter_id not in live_ids:
+                del self.chapter_metrics[chapter_id]
+
+        for chapters in live.values():
+            readers = [sum(1 for _, c in self.progress if c == chapter.id) for chapter in chapters]
+            for i, chapter in enumerate(chapters):
+                next_readers = readers[i + 1] if i + 1 < len(readers) else None
+                if next_readers is None:
+                    retention = None
+                elif readers[i] > 0:
+                    retention = round(next_readers * 100.0 / readers[i], 2)
+                else:
+                    retention = 0
+                whispers = [w for w in self.whispers if w.chapter_id == chapter.id and not w.deleted]
+                self.chapter_metrics[chapter.id] = {
+                    'chapter_id': chapter.id,
+                    'story_id': chapter.story_id,
+                    'chapter_number': chapter.chapter_number,
+                    'readers': readers[i],
+                    'retention_rate': retention,
+                    'comments': len(whispers),
+                    'likes': sum(w.like_count for w in whispers),
+                }
+
+    def _refresh_authors(self, ids_json):
+        totals = {}
+        for row in self.story_metrics.values():
+            if not selected(ids_json, row['author_id']):
+                continue
+            author = totals.setdefault(row['author_id'], {
+                'total_stories': 0, 'total_views': 0, 'total_likes': 0, 'total_comments': 0
+            })
+            author['total_stories'] += 1
+            for column in ('total_views', 'total_likes', 'total_comments'):
+                author[column] += row[column]
+        for author_id in [a for a in self.author_metrics if selected(ids_json, a) and a not in totals]:
+            del self.author_metrics[author_id]
+        self.author_metrics.update(totals)
+
+    def _refresh_platform(self, scope):
+        rows = list(self.story_metrics.values())
+
+        def average(column):
+            return sum(row[column] for row in rows) / len(rows) if rows else 0.0
+
+        self.platform_metrics[scope] = {
+            'story_count': len(rows),
+            'avg_views': average('total_views'),
+            'avg_likes': average('total_likes'),
+            'avg_completion_rate': average('completion_rate'),
+        }
+
+    def _story_row(self, row):
+        story = self.stories[row['story_id']]
+        return {
+            'story_id': row['story_id'],
+            'title': story.title,
+            'total_views': row['total_views'],
+            'unique_readers': row['unique_readers'],
+            'total_likes': row['total_likes'],
+            'total_comments': row['total_comments'],
+            'total_saves': row['total_saves'],
+            'completion_rate': row['completion_rate'],
+            'total_chapters': row['total_chapters'],
+            'published_at': story.published_at,
+        }
+
+    async def _query_raw(self, sql, *args):
+        if sql == REFRESH_STORIES_SQL:
+            return self._refresh_stories(args[0])
+        if sql == STORY_METRICS_SQL:
+            row = self.story_metrics.get(args[0])
+            return [self._story_row(row)] if row else []
+        if sql == TOP_STORIES_SQL:
+            author_id, limit = args
+            rows = [row for row in self.story_metrics.values() if row['author_id'] == author_id]
+            rows.sort(key=lambda row: (-row['total_views'], row['story_id']))
+            return [self._story_row(row) for row in rows[:limit]]
+        if sql == AUTHOR_METRICS_SQL:
+            author_id = args[0]
+            if author_id not in self.followers:
+                return []
+            totals = self.author_metrics.get(author_id)
+            return [{
+                'follower_count': self.followers[author_id],
+                'computed': totals is not None,
+                **(totals or {'total_stories': 0, 'total_views': 0, 'total_likes': 0, 'total_comments': 0}),
+            }]
+        if sql == CHAPTER_METRICS_SQL:
+            rows = sorted(
+                (row for row in self.chapter_metrics.values() if row['story_id'] == args[0]),
+                key=lambda row: row['chapter_number']
+            )
+            return [
+                {**row, 'title': self.chapters[row['chapter_id']].title,
+                 'published_at': self.chapters[row['chapter_id']].published_at}
+                for row in rows
+            ]
+        if sql == AUTHOR_AVERAGES_SQL:
+            story_id, author_id = args
+            rows = [
+                row for row in self.story_metrics.values()
+                if row['author_id'] == author_id and row['story_id'] != story_id
+            ]
+
+            def average(column):
+                return sum(row[column] for row in rows) / len(rows) if rows else 0.0
+
+            return [{
+                'avg_views': average('total_views'),
+                'avg_likes': average('total_likes'),
+                'avg_completion_rate': average('completion_rate'),
+            }]
+        assert sql == PLATFORM_METRICS_SQL, sql
+        row = self.platform_metrics.get(args[0])
+        return [{'avg_views': row['avg_views'], 'avg_likes': row['avg_likes']}] if row else []
+
+    async def _execute_raw(self, sql, *args):
+        if sql == REFRESH_CHAPTERS_SQL:
+            self._refresh_chapters(args[0])
+        elif sql == REFRESH_AUTHORS_SQL:
+            self._refresh_authors(args[0])
+        else:
+            assert sql == REFRESH_PLATFORM_SQL, sql
+            self._refresh_platform(args[0])
+        return 0
+
+    async def _find_stories(self, where):
+        return [
+            story for story in self.stories.values()
+            if story.author_id == where['author_id'] and story.published and not story.deleted_at
+        ]
+
+
+def make_db():
+    """Author-1 with a three chapter story and a smaller one, plus a draft."""
+    db = FakeAnalyticsDb()
+    db.add_story('story-1', chapters=3)
+    db.add_story('story-2', chapters=1)
+    db.add_story('draft', chapters=1, published=False)
+    db.followers['author-1'] = 7
+
+    db.read('reader-1', 'story-1', 3)
+    db.read('reader-2', 'story-1', 2)
+    db.read('reader-3', 'story-1', 1)
+    db.read('reader-1', 'story-2', 1)
+    db.read('reader-1', 'draft', 1)
+
+    db.add_stats('story-1', reads=10, saves=1)
+    db.add_stats('story-1', reads=5, saves=2)
+    db.add_stats('story-2', reads=4)
+    db.add_stats('draft', reads=100)
+
+    db.add_whisper('story-1', like_count=3, chapter_id='story-1-ch1')
+    db.add_whisper('story-1', like_count=1, chapter_id='story-1-ch1')
+    db.add_whisper('story-1', like_count=9, chapter_id='story-1-ch2', deleted=True)
+    db.add_whisper('story-2', like_count=2)
+    return db
+
+
+@pytest.fixture
+def changed(valkey):
+    changed = ChangedStories()
+    changed._client = valkey
+    return changed
+
+
+@pytest.fixture
+def db():
+    db = make_db()
+    with patch('apps.analytics.analytics_service.get_prisma', return_value=db):
+        yield db
+
+
+class TestRefresh:
+    @pytest.mark.asyncio
+    async def test_story_rollup_aggregates_its_sources(self, db):
+        refreshed = await refresh_stories(db, ['story-1'])
+
+        assert refreshed == 1
+        metrics = db.story_metrics['story-1']
+        assert metrics['total_views'] == 15
+        assert metrics['total_saves'] == 3
+        # Deleted whispers are not counted
+        assert (metrics['total_comments'], metrics['total_likes']) == (2, 4)
+        assert metrics['unique_readers'] == 3
+        # One of three readers reached the last chapter
+        assert metrics['completion_rate'] == 33.33
+        assert metrics['total_chapters'] == 3
+        assert set(db.story_metrics) == {'story-1'}
+
+    @pytest.mark.asyncio
+    async def test_rebuild_covers_published_stories_only(self, db):
+        await rollups.rebuild_rollups(db)
+
+        assert set(db.story_metrics) == {'story-1', 'story-2'}
+        assert db.author_metrics['author-1'] == {
+            'total_stories': 2, 'total_views': 19, 'total_likes': 6, 'total_comments': 3
+        }
+        platform = db.platform_metrics[rollups.PLATFORM_SCOPE]
+        assert platform['story_count'] == 2
+        assert platform['avg_views'] == 9.5
+
+    @pytest.mark.asyncio
+    async def test_unpublished_story_is_pruned_with_its_author_totals(self, db):
+        await rollups.rebuild_rollups(db)
+
+        db.stories['story-2'].published = False
+        refreshed = await refresh_stories(db, ['story-2'])
+
+        assert refreshed == 1
+        assert 'story-2' not in db.story_metrics
+        assert 'story-2-ch1' not in db.chapter_metrics
+        assert db.author_metrics['author-1']['total_stories'] == 1
+        assert db.author_metrics['author-1']['total_views'] == 15
+
+    @pytest.mark.asyncio
+    async def test_only_changed_stories_are_refreshed(self, db, changed, monkeypatch):
+        monkeypatch.setattr(rollups, 'REFRESH_BATCH_SIZE', 1)
+        await rollups.rebuild_rollups(db)
+        db.add_stats('story-1', reads=5)
+        db.add_stats('story-2', reads=5)
+
+        changed.mark(['story-1'])
+        refreshed = await refresh_changed_stories(db, changed)
+
+        assert refreshed == 1
+        assert db.story_metrics['story-1']['total_views'] == 20
+        # Not marked, so left for the nightly rebuild
+        assert db.story_metrics['story-2']['total_views'] == 4
+        assert db.author_metrics['author-1']['total_views'] == 24
+        assert changed.claim() == set()
+
+    @pytest.mark.asyncio
+    async def test_changed_stories_are_refreshed_in_batches(self, db, changed, monkeypatch):
+        monkeypatch.setattr(rollups, 'REFRESH_BATCH_SIZE', 1)
+        changed.mark(['story-2', 'story-1', 'draft'])
+
+        assert await refresh_changed_stories(db, changed) == 3
+
+        assert set(db.story_metrics) == {'story-1', 'story-2'}
+        assert db.author_metrics['author-1']['total_stories'] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_is_retried(self, db, changed):
+        changed.mark(['story-1'])
+        db.fail_refresh = True
+
+        with pytest.raises(Exception):
+            await refresh_changed_stories(db, changed)
+        changed.mark(['story-2'])
+
+        assert changed.claim() == {'story-1'}
+
+    def test_marking_never_raises(self):
+        class BrokenValkey:
+            def sadd(self, *args):
+                raise redis.ConnectionError('down')
+
+        changed = ChangedStories()
+        changed._client = BrokenValkey()
+
+        changed.mark(['story-1'])
+
+
+class TestReads:
+    @pytest.mark.asyncio
+    async def test_dashboard_reads_rollups_in_two_queries(self, db):
+        await rollups.rebuild_rollups(db)
+        db.query_raw.reset_mock()
+
+        dashboard = await AnalyticsService.get_author_dashboard('author-1')
+
+        assert db.query_raw.await_count == 2
+        assert dashboard['total_stories'] == 2
+        assert dashboard['total_views'] == 19
+        assert dashboard['follower_count'] == 7
+        assert dashboard['most_popular_story']['story_id'] == 'story-1'
+        assert [story['story_id'] for story in dashboard['stories']] == ['story-1', 'story-2']
+
+    @pytest.mark.asyncio
+    async def test_dashboard_computes_missing_rollups(self, db):
+        dashboard = await AnalyticsService.get_author_dashboard('author-1')
+
+        assert dashboard['total_stories'] == 2
+        assert dashboard['total_views'] == 19
+        assert dashboard['total_comments'] == 3
+
+    @pytest.mark.asyncio
+    async def test_story_metrics_are_computed_on_first_read(self, db):
+        metrics = await AnalyticsService.get_story_metrics('story-2')
+
+        assert metrics['total_views'] == 4
+        assert metrics['completion_rate'] == 100.0
+        assert set(db.story_metrics) == {'story-2'}
+        assert await AnalyticsService.get_story_metrics('draft') == {}
+
+    @pytest.mark.asyncio
+    async def test_draft_metrics_do_not_trigger_a_refresh(self, db):
+        assert await AnalyticsService.get_story_metrics('draft') == {}
+        assert await AnalyticsService.get_story_metrics('missing') == {}
+
+        db.execute_raw.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_retention_funnel_comes_from_chapter_rollups(self, db):
+        retention = await AnalyticsService.get_reader_retention('story-1')
+
+        assert retention == {'chapters': [
+            {'chapter_number': 1, 'chapter_title': 'Chapter 1', 'readers': 3, 'retention_rate': 66.67},
+            {'chapter_number': 2, 'chapter_title': 'Chapter 2', 'readers': 2, 'retention_rate': 50.0},
+            {'chapter_number': 3, 'chapter_title': 'Chapter 3', 'readers': 1, 'retention_rate': None},
+        ]}
+        chapters = await AnalyticsService.get_chapter_metrics('story-1')
+        assert [(c['comments'], c['likes']) for c in chapters] == [(2, 4), (0, 0), (0, 0)]
+
+    @pytest.mark.asyncio
+    async def test_comparative_metrics_use_other_stories_and_platform(self, db):
+        await rollups.rebuild_rollups(db)
+
+        comparison = await AnalyticsService.get_comparative_metrics('story-1', 'author-1')
+
+        assert comparison['author_averages']['avg_views'] == 4
+        assert comparison['platform_averages']['avg_views'] == 9.5
+        assert comparison['performance_vs_author']['views'] == 375.0
@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the app tests.
+"""
+
+import fakeredis
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+@pytest.fixture
+def valkey():
+    """In-memory Valkey client, decoding responses like the app's clients."""
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+
+
+@pytest.fixture
+def prisma():
+    """Prisma client mock with awaitable connect, disconnect and raw queries."""
+    db = MagicMock()
+    db.connect = AsyncMock()
+    db.disconnect = AsyncMock()
+    db.query_raw = AsyncMock(return_value=[])
+    db.execute_raw = AsyncMock(return_value=0)
+    return db
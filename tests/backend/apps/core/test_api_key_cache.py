@@ -0,0 +1,222 @@
+"""
+Tests for the API key validation cache and write-behind usage tracking.
+
+Valkey is replaced with fakeredis and Prisma with mocks, so cache hits,
+negative caching, invalidation and bulk flushing can be checked without
+external services.
+"""
+
+import json
+import time
+import pytest
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from apps.core import api_key_cache
+from apps.core.api_key_cache import APIKeyCache, APIKeyUsageTracker, flush_api_key_usage
+from infrastructure.cache_manager import reset_invalidation_listeners
+
+
+class FakeAPIKey(SimpleNamespace):
+    """Picklable stand-in for the Prisma APIKey model."""
+
+    def model_copy(self, update):
+        return FakeAPIKey(**{**vars(self), **update})
+
+
+def make_key(key_id='key-1', key_hash='hash-1', days=30, is_active=True):
+    return FakeAPIKey(
+        id=key_id,
+        key_hash=key_hash,
+        user_id='user-1',
+        is_active=is_active,
+        expires_at=timezone.now() + timedelta(days=days),
+        last_used_at=None,
+        permissions='{}',
+    )
+
+
+@pytest.fixture(autouse=True)
+def invalidation_channel(valkey):
+    """Run the L1 invalidation listener against fakeredis."""
+    reset_invalidation_listeners()
+    with patch.object(api_key_cache.redis, 'from_url', return_value=valkey):
+        yield
+    reset_invalidation_listeners()
+
+
+@pytest.fixture
+def l2_cache():
+    store = LocMemCache('api-key-cache-tests', {})
+    store.clear()
+    with patch.object(api_key_cache, 'cache', store):
+        yield store
+
+
+@pytest.fixture
+def tracker(valkey):
+    tracker = APIKeyUsageTracker()
+    tracker._client = valkey
+    return tracker
+
+
+class TestAPIKeyCache:
+    def test_miss_then_hit(self, l2_cache):
+        key_cache = APIKeyCache()
+        api_key = make_key()
+
+        assert key_cache.get('hash-1') == (False, None)
+        key_cache.set('hash-1', api_key)
+
+        assert key_cache.get('hash-1') == (True, api_key)
+
+    def test_unknown_hash_is_cached_as_miss(self, l2_cache):
+        key_cache = APIKeyCache()
+
+        key_cache.set('unknown', None)
+
+        assert key_cache.get('unknown') == (True, None)
+
+    def test_l2_hit_from_another_process(self, l2_cache):
+        api_key = make_key()
+        APIKeyCache().set('hash-1', api_key)
+
+        hit, cached = APIKeyCache().get('hash-1')
+
+        assert hit and cached.id == 'key-1'
+
+    def test_invalidate_drops_both_layers(self, l2_cache):
+        key_cache = APIKeyCache()
+        key_cache.set('hash-1', make_key())
+
+        key_cache.invalidate('hash-1')
+
+        assert key_cache.get('hash-1') == (False, None)
+        assert l2_cache.get('api_key:hash-1') is None
+
+    def test_invalidation_reaches_other_processes(self, l2_cache):
+        revoking, other = APIKeyCache(), APIKeyCache()
+        api_key = make_key()
+        revoking.set('hash-1', api_key)
+        assert other.get('hash-1') == (True, api_key)
+
+        revoking.invalidate('hash-1')
+
+        deadline = time.monotonic() + 5
+        while other.l1_cache.get('api_key:hash-1') is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert other.get('hash-1') == (False, None)
+
+    def test_expired_key_is_not_cached(self, l2_cache):
+        key_cache = APIKeyCache()
+
+        key_cache.set('hash-1', make_key(days=-1))
+
+        assert key_cache.get('hash-1') == (False, None)
+
+
+class TestAPIKeyUsageTracker:
+    def test_uses_coalesce_per_key(self, tracker):
+        first = timezone.now()
+        tracker.record('key-1', first)
+        tracker.record('key-1', first + timedelta(seconds=5))
+        tracker.record('key-2', first)
+
+        pending = tracker.pending(['key-1', 'key-2', 'key-3'])
+
+        assert set(pending) == {'key-1', 'key-2'}
+        assert pending['key-1'] == first + timedelta(seconds=5)
+
+    def test_valkey_outage_reports_failure(self):
+        tracker = APIKeyUsageTracker()
+        tracker._client = MagicMock(hset=MagicMock(side_effect=ConnectionError('down')))
+
+        assert tracker.record('key-1') is False
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_one_bulk_update(self, tracker, prisma):
+        for i in range(3):
+            tracker.record(f'key-{i}')
+        db = prisma
+        db.execute_raw.return_value = 3
+
+        assert await flush_api_key_usage(db, tracker) == 3
+
+        db.execute_raw.assert_awaited_once()
+        rows = json.loads(db.execute_raw.await_args.args[1])
+        assert {row['id'] for row in rows} == {'key-0', 'key-1', 'key-2'}
+        assert tracker.pending(['key-0']) == {}
+        assert await flush_api_key_usage(db, tracker) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, tracker, prisma):
+        tracker.record('key-1')
+        db = prisma
+        db.execute_raw = AsyncMock(side_effect=RuntimeError('db down'))
+
+        with pytest.raises(RuntimeError):
+            await flush_api_key_usage(db, tracker)
+
+        tracker.record('key-2')
+        db.execute_raw = AsyncMock(return_value=1)
+        assert await flush_api_key_usage(db, tracker) == 1
+        assert json.loads(db.execute_raw.await_args.args[1])[0]['id'] == 'key-1'
+        assert await flush_api_key_usage(db, tracker) == 1
+
+
+class TestValidateAPIKey:
+    @pytest.fixture
+    def service(self, l2_cache, tracker):
+        from apps.core.api_key_auth import APIKeyService
+
+        with patch.object(api_key_cache, '_api_key_cache', APIKeyCache()), \
+                patch.object(api_key_cache, '_usage_tracker', tracker):
+            yield APIKeyService
+
+    @pytest.fixture
+    def db(self, prisma):
+        prisma.apikey.update = AsyncMock()
+        with patch('apps.core.api_key_auth.get_prisma', return_value=prisma):
+            yield prisma
+
+    @pytest.mark.asyncio
+    async def test_repeated_validation_skips_database(self, service, db, tracker):
+        plain_key = 'a' * 64
+        api_key = make_key(key_hash=service.hash_api_key(plain_key))
+        db.apikey.find_first = AsyncMock(return_value=api_key)
+
+        first = await service.validate_api_key(plain_key)
+        second = await service.validate_api_key(plain_key)
+
+        assert first.id == second.id == 'key-1'
+        assert second.last_used_at is not None
+        db.apikey.find_first.assert_awaited_once()
+        db.apikey.update.assert_not_awaited()
+        assert 'key-1' in tracker.pending(['key-1'])
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_is_negatively_cached(self, service, db):
+        db.apikey.find_first = AsyncMock(return_value=None)
+
+        assert await service.validate_api_key('bad-key') is None
+        assert await service.validate_api_key('bad-key') is None
+
+        db.apikey.find_first.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_revoke_invalidates_cached_key(self, service, db):
+        plain_key = 'b' * 64
+        key_hash = service.hash_api_key(plain_key)
+        db.apikey.find_first = AsyncMock(return_value=make_key(key_hash=key_hash))
+        await service.validate_api_key(plain_key)
+
+        db.apikey.update = AsyncMock(return_value=make_key(key_hash=key_hash, is_active=False))
+        await service.revoke_api_key('key-1')
+        db.apikey.find_first = AsyncMock(return_value=None)
+
+        assert await service.validate_api_key(plain_key) is None
+        db.apikey.find_first.assert_awaited_once()
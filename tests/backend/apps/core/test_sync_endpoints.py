@@ -35,7 +35,7 @@ def authenticated_request(request_factory):
 @pytest.fixture
 def mock_db():
     """Create a mock Prisma database."""
-    with patch('apps.core.sync_views.Prisma') as mock_prisma:
+    with patch('apps.core.sync_views.get_prisma') as mock_prisma:
         db_instance = MagicMock()
         mock_prisma.return_value = db_instance
         db_instance.is_connected.return_value = True
@@ -264,7 +264,7 @@ class TestSyncEndpointsIntegration:
         )
         request.clerk_user_id = 'test_user_123'
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             # Simulate database connection error
             mock_prisma.return_value.connect.side_effect = Exception('DB Error')
             
@@ -301,7 +301,7 @@ class TestSyncBatchConflictDetection:
         request.clerk_user_id = 'test_user_123'
         request.user_profile = Mock(id='test_user_123')
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             db_instance = MagicMock()
             mock_prisma.return_value = db_instance
             db_instance.is_connected.return_value = True
@@ -351,7 +351,7 @@ class TestSyncBatchConflictDetection:
         request.clerk_user_id = 'test_user_123'
         request.user_profile = Mock(id='test_user_123')
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             db_instance = MagicMock()
             mock_prisma.return_value = db_instance
             db_instance.is_connected.return_value = True
@@ -443,7 +443,7 @@ class TestResolveConflict:
         )
         request.clerk_user_id = 'test_user_123'
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             db_instance = MagicMock()
             mock_prisma.return_value = db_instance
             db_instance.is_connected.return_value = True
@@ -482,7 +482,7 @@ class TestResolveConflict:
         )
         request.clerk_user_id = 'test_user_123'
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             db_instance = MagicMock()
             mock_prisma.return_value = db_instance
             db_instance.is_connected.return_value = True
@@ -532,7 +532,7 @@ class TestResolveConflict:
         )
         request.clerk_user_id = 'test_user_123'
         
-        with patch('apps.core.sync_views.Prisma') as mock_prisma:
+        with patch('apps.core.sync_views.get_prisma') as mock_prisma:
             db_instance = MagicMock()
             mock_prisma.return_value = db_instance
             db_instance.is_connected.return_value = True
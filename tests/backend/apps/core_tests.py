@@ -1,6 +1,7 @@
 """Unit tests for core utilities."""
 import base64
 import json
+import time
 from unittest.mock import Mock, patch, MagicMock
 from django.test import TestCase, override_settings
 from django.core.cache import cache
@@ -295,8 +296,30 @@ class CacheManagerTests(TestCase):
         self.assertEqual(result, fresh_value)
         # Should call fetch function
         fetch_func.assert_called_once()
-        # Should cache the value
-        self.assertEqual(cache.get(key), fresh_value)
+        # Should cache the value (stored with its freshness deadline)
+        self.assertEqual(cache.get(key)['value'], fresh_value)
+        self.assertEqual(CacheManager.get_or_set(key, fetch_func, 60), fresh_value)
+        fetch_func.assert_called_once()
+        
+    def test_concurrent_stale_reads_start_one_refresh(self):
+        """Test get_or_refresh refreshes a stale key once across calls."""
+        from infrastructure.cache_manager import CacheStampedeGuard
+        
+        key = 'test_key'
+        cache.set(key, {
+            CacheStampedeGuard.ENVELOPE_MARKER: 1,
+            'value': 'stale',
+            'fresh_until': time.time() - 10,
+            'delta': 0.0,
+        }, 300)
+        executor = Mock()
+        
+        with patch('apps.core.cache._stampede_guard.executor', executor):
+            first = CacheManager.get_or_refresh(key, Mock(return_value='fresh'), 60, stale_ttl=120)
+            second = CacheManager.get_or_refresh(key, Mock(return_value='fresh'), 60, stale_ttl=120)
+        
+        self.assertEqual((first, second), ('stale', 'stale'))
+        executor.submit.assert_called_once()
         
     def test_invalidate_removes_key(self):
         """Test invalidate removes cache key."""
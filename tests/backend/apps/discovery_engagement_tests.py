@@ -0,0 +1,224 @@
+"""
+Tests for engagement event ingestion into StoryStatsDaily.
+
+Valkey is replaced with fakeredis, and Prisma with a fake that applies
+APPLY_SQL's offset check and upsert, so batching, redelivery after a crash
+and offset races can be checked without external services.
+"""
+import json
+import pytest
+from datetime import datetime, timezone
+
+import redis
+
+from apps.discovery import engagement
+from apps.discovery.engagement import (
+    APPLY_SQL,
+    LIKE,
+    OFFSET_SQL,
+    READ,
+    SAVE,
+    WHISPER,
+    EngagementStream,
+    OffsetConflict,
+    aggregate,
+    consume_engagement_events,
+    stream_id_date,
+)
+
+
+DAY_1 = int(datetime(2026, 10, 16, 23, 59, tzinfo=timezone.utc).timestamp() * 1000)
+DAY_2 = DAY_1 + 120000
+
+
+class FakeStatsDb:
+    """Applies APPLY_SQL to in-memory StoryStatsDaily rows and offsets."""
+
+    def __init__(self):
+        self.offsets = {}
+        self.stats = {}
+        self.fail_next_apply = False
+
+    async def query_raw(self, sql, *args):
+        if sql == OFFSET_SQL:
+            stream = args[0]
+            return [{'last_id': self.offsets[stream]}] if stream in self.offsets else []
+        assert sql == APPLY_SQL
+        rows, stream, expected, new_last_id = args
+        if self.fail_next_apply:
+            self.fail_next_apply = False
+            raise Exception('DB down')
+        if self.offsets.get(stream, expected) != expected:
+            return [{'advanced': 0, 'applied': 0}]
+        self.offsets[stream] = new_last_id
+        rows = json.loads(rows)
+        for row in rows:
+            counts = self.stats.setdefault((row['story_id'], row['date']), {
+                'reads': 0, 'saves': 0, 'likes': 0, 'whispers': 0
+            })
+            for counter in counts:
+                counts[counter] += row[counter]
+        return [{'advanced': 1, 'applied': len(rows)}]
+
+
+@pytest.fixture(autouse=True)
+def changed_stories(monkeypatch):
+    marked = []
+    monkeypatch.setattr(engagement, 'mark_stories_changed', lambda story_ids: marked.extend(sorted(story_ids)))
+    return marked
+
+
+@pytest.fixture
+def stream(valkey):
+    stream = EngagementStream()
+    stream._client = valkey
+    return stream
+
+
+def entries(stream):
+    return stream.client.xrange(EngagementStream.KEY)
+
+
+def pending(stream):
+    return stream.client.xpending(EngagementStream.KEY, EngagementStream.GROUP)['pending']
+
+
+def story_total(db, story_id, counter):
+    """A story's count over every day, as events are dated by the stream clock."""
+    return sum(counts[counter] for (row_story_id, _), counts in db.stats.items() if row_story_id == story_id)
+
+
+class TestEmit:
+    def test_events_are_added_to_the_stream(self, stream):
+        assert stream.emit(LIKE, 'story-1') is True
+        assert stream.emit(LIKE, 'story-1') is True
+
+        assert [fields for _, fields in entries(stream)] == [{'k': LIKE, 's': 'story-1'}] * 2
+
+    def test_reads_and_saves_count_once_per_reader_and_day(self, stream):
+        assert stream.emit(READ, 'story-1', 'reader-1') is True
+        assert stream.emit(READ, 'story-1', 'reader-1') is False
+        assert stream.emit(READ, 'story-1', 'reader-2') is True
+        assert stream.emit(SAVE, 'story-1', 'reader-1') is True
+        # Anonymous reads are not deduplicated
+        assert stream.emit(READ, 'story-1') is True
+        assert stream.emit(READ, 'story-1') is True
+
+        assert len(entries(stream)) == 5
+
+    def test_valkey_outage_never_raises(self, stream):
+        class BrokenValkey:
+            def xadd(self, *args, **kwargs):
+                raise redis.ConnectionError('down')
+
+        stream._client = BrokenValkey()
+
+        assert stream.emit(WHISPER, 'story-1') is False
+
+    def test_events_without_a_story_are_ignored(self, stream, monkeypatch):
+        monkeypatch.setattr(engagement, '_engagement_stream', stream)
+
+        engagement.emit_engagement(WHISPER, None)
+
+        assert entries(stream) == []
+
+
+class TestAggregate:
+    def test_events_are_summed_per_story_and_day(self):
+        entries = [
+            (f'{DAY_1}-0', {'k': READ, 's': 'story-1'}),
+            (f'{DAY_1}-1', {'k': READ, 's': 'story-1'}),
+            (f'{DAY_1}-2', {'k': LIKE, 's': 'story-1'}),
+            (f'{DAY_2}-0', {'k': READ, 's': 'story-1'}),
+            (f'{DAY_2}-1', {'k': SAVE, 's': 'story-2'}),
+            # Trimmed or malformed entries are skipped
+            (f'{DAY_2}-2', {}),
+            (f'{DAY_2}-3', {'k': 'share', 's': 'story-2'}),
+        ]
+
+        rows = aggregate(entries)
+
+        assert rows == [
+            {'story_id': 'story-1', 'date': '2026-10-16', 'reads': 2, 'saves': 0, 'likes': 1, 'whispers': 0},
+            {'story_id': 'story-1', 'date': '2026-10-17', 'reads': 1, 'saves': 0, 'likes': 0, 'whispers': 0},
+            {'story_id': 'story-2', 'date': '2026-10-17', 'reads': 0, 'saves': 1, 'likes': 0, 'whispers': 0},
+        ]
+
+    def test_day_comes_from_the_stream_id(self):
+        assert stream_id_date(f'{DAY_1}-5') == '2026-10-16'
+        assert stream_id_date(f'{DAY_2}-0') == '2026-10-17'
+
+
+class TestConsume:
+    @pytest.mark.asyncio
+    async def test_events_are_counted_in_batches(self, stream, changed_stories):
+        for _ in range(5):
+            stream.emit(READ, 'story-1')
+        stream.emit(WHISPER, 'story-2')
+        db = FakeStatsDb()
+
+        counted = await consume_engagement_events(db, stream, batch_size=2, max_batches=10)
+
+        assert counted == 6
+        assert story_total(db, 'story-1', 'reads') == 5
+        assert story_total(db, 'story-2', 'whispers') == 1
+        assert db.offsets[EngagementStream.KEY] == entries(stream)[-1][0]
+        assert pending(stream) == 0
+        # Counted stories are queued for the analytics rollup refresh
+        assert set(changed_stories) == {'story-1', 'story-2'}
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_redelivered(self, stream):
+        stream.emit(LIKE, 'story-1')
+        db = FakeStatsDb()
+        db.fail_next_apply = True
+
+        with pytest.raises(Exception):
+            await consume_engagement_events(db, stream)
+        stream.emit(LIKE, 'story-1')
+        counted = await consume_engagement_events(db, stream)
+
+        assert counted == 2
+        assert story_total(db, 'story-1', 'likes') == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_applied_but_not_acked_is_not_counted_twice(self, stream):
+        for _ in range(3):
+            stream.emit(SAVE, 'story-1')
+        db = FakeStatsDb()
+
+        # Crash between the upsert committing and XACK
+        ack = stream.ack
+        stream.ack = lambda stream_ids: (_ for _ in ()).throw(redis.ConnectionError('down'))
+        with pytest.raises(redis.ConnectionError):
+            await consume_engagement_events(db, stream)
+        stream.ack = ack
+        assert pending(stream) == 3
+
+        stream.emit(SAVE, 'story-1')
+        counted = await consume_engagement_events(db, stream)
+
+        assert counted == 1
+        assert story_total(db, 'story-1', 'saves') == 4
+        assert pending(stream) == 0
+
+    @pytest.mark.asyncio
+    async def test_lost_offset_race_applies_nothing(self, stream):
+        stream.emit(READ, 'story-1')
+        db = FakeStatsDb()
+        db.offsets[EngagementStream.KEY] = '0-0'
+
+        original = db.query_raw
+
+        async def query_raw(sql, *args):
+            if sql == APPLY_SQL:
+                # Another consumer advances the offset first
+                db.offsets[EngagementStream.KEY] = '1-0'
+            return await original(sql, *args)
+
+        db.query_raw = query_raw
+
+        with pytest.raises(OffsetConflict):
+            await consume_engagement_events(db, stream)
+        assert db.stats == {}
+        assert pending(stream) == 1
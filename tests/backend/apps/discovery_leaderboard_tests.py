@@ -0,0 +1,208 @@
+"""Tests for the trending leaderboard."""
+import pytest
+import redis
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from apps.discovery.discovery_service import DiscoveryService
+from apps.discovery.leaderboard import (
+    TrendingLeaderboard,
+    decode_cursor,
+    encode_cursor,
+)
+from infrastructure.content_filter_utils import MAX_FEED_BATCHES, FeedVisibility
+
+
+class FakeSortedSetClient:
+    """In-memory stand-in for the Valkey commands used by the leaderboard."""
+
+    def __init__(self):
+        self.strings = {}
+        self.zsets = {}
+        self.expiries = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, seconds):
+        self.expiries[key] = seconds
+
+    def incr(self, key):
+        self.strings[key] = int(self.strings.get(key, 0)) + 1
+        return self.strings[key]
+
+    def set(self, key, value, ex=None):
+        self.strings[key] = value
+        self.expiries[key] = ex
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def exists(self, key):
+        return int(key in self.zsets or key in self.strings)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        members = sorted(
+            self.zsets.get(key, {}).items(),
+            key=lambda item: (item[1], item[0]),
+            reverse=True
+        )
+        return members[start:end + 1]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def zadd(self, key, mapping):
+        self.commands.append(lambda: self.client.zadd(key, mapping))
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: self.client.expire(key, seconds))
+
+    def execute(self):
+        for command in self.commands:
+            command()
+
+
+@pytest.fixture
+def leaderboard():
+    board = TrendingLeaderboard(redis_url='redis://unused', snapshot_ttl=600)
+    board._client = FakeSortedSetClient()
+    return board
+
+
+ENTRIES = [
+    ('story-a', 10.0, ['fantasy']),
+    ('story-b', 30.0, ['fantasy', 'romance']),
+    ('story-c', 20.0, []),
+    ('story-d', 0.0, ['romance']),
+]
+
+
+class TestTrendingLeaderboard:
+    """Tests for TrendingLeaderboard snapshots."""
+
+    def test_no_snapshot_returns_none(self, leaderboard):
+        """Readers should see no leaderboard before the first publish."""
+        assert leaderboard.get_range(0, 10) == (None, [])
+
+    def test_global_ranking(self, leaderboard):
+        """The global leaderboard should be ordered by score descending."""
+        version = leaderboard.publish(ENTRIES)
+
+        read_version, entries = leaderboard.get_range(0, 10)
+
+        assert read_version == version
+        assert [story_id for story_id, _ in entries] == ['story-b', 'story-c', 'story-a', 'story-d']
+
+    def test_per_tag_ranking(self, leaderboard):
+        """Per-tag leaderboards should only contain tagged stories."""
+        leaderboard.publish(ENTRIES)
+
+        _, fantasy = leaderboard.get_range(0, 10, tag_slug='fantasy')
+        _, romance = leaderboard.get_range(0, 10, tag_slug='romance')
+
+        assert [story_id for story_id, _ in fantasy] == ['story-b', 'story-a']
+        assert [story_id for story_id, _ in romance] == ['story-b', 'story-d']
+
+    def test_range_pagination(self, leaderboard):
+        """Offsets should page through the snapshot without overlap."""
+        leaderboard.publish(ENTRIES)
+
+        _, first = leaderboard.get_range(0, 2)
+        _, second = leaderboard.get_range(2, 2)
+
+        assert [s for s, _ in first] == ['story-b', 'story-c']
+        assert [s for s, _ in second] == ['story-a', 'story-d']
+
+    def test_cursor_keeps_reading_its_snapshot(self, leaderboard):
+        """A cursor should read the snapshot it started on after a republish."""
+        old_version = leaderboard.publish(ENTRIES)
+        leaderboard.publish([('story-z', 99.0, [])])
+        assert leaderboard.current_version() != old_version
+
+        read_version, entries = leaderboard.get_range(0, 10, version=old_version)
+
+        assert read_version == old_version
+        assert entries[0][0] == 'story-b'
+
+    def test_expired_snapshot_falls_back_to_current(self, leaderboard):
+        """An expired cursor snapshot should continue on the current one."""
+        version = leaderboard.publish(ENTRIES)
+
+        read_version, entries = leaderboard.get_range(0, 10, version='expired')
+
+        assert read_version == version
+        assert len(entries) == 4
+
+    def test_snapshot_keys_expire(self, leaderboard):
+        """Every snapshot key should carry the snapshot TTL."""
+        leaderboard.publish(ENTRIES)
+
+        client = leaderboard._client
+        assert all(client.expiries.get(key) == 600 for key in client.zsets)
+        assert client.expiries[leaderboard.current_version_key] == 600
+
+    def test_valkey_errors_degrade(self, leaderboard):
+        """Valkey failures should read as a missing leaderboard."""
+        class BrokenClient:
+            def get(self, key):
+                raise redis.ConnectionError('down')
+
+            def incr(self, key):
+                raise redis.ConnectionError('down')
+
+            def pipeline(self, transaction=True):
+                raise redis.ConnectionError('down')
+
+        leaderboard._client = BrokenClient()
+
+        assert leaderboard.publish(ENTRIES) is None
+        assert leaderboard.current_version() is None
+        assert leaderboard.get_range(0, 10) == (None, [])
+
+
+class TestTrendingPage:
+    """Tests for trending pages read from the leaderboard."""
+
+    @pytest.fixture
+    def db(self, prisma):
+        async def find_many(where, include):
+            return [
+                SimpleNamespace(id=story_id, author_id='hidden' if story_id != 'story-070' else 'author')
+                for story_id in where['id']['in']
+            ]
+
+        prisma.story.find_many = AsyncMock(side_effect=find_many)
+        return prisma
+
+    @pytest.mark.asyncio
+    async def test_mostly_hidden_page_is_short_after_max_batches(self, leaderboard, db):
+        version = leaderboard.publish([(f'story-{i:03d}', 1000.0 - i, []) for i in range(200)])
+        visibility = FeedVisibility(frozenset({'hidden'}))
+
+        with patch('apps.discovery.discovery_service.get_trending_leaderboard', return_value=leaderboard), \
+                patch('apps.discovery.discovery_service.get_prisma', return_value=db):
+            stories, cursor = await DiscoveryService.get_trending_page(page_size=2, visibility=visibility)
+            rest, _ = await DiscoveryService.get_trending_page(page_size=2, cursor=cursor, visibility=visibility)
+
+        assert stories == []
+        assert db.story.find_many.await_count == 2 * MAX_FEED_BATCHES
+        assert decode_cursor(cursor) == (version, 20 * MAX_FEED_BATCHES)
+        assert [story.id for story in rest] == ['story-070']
+
+
+class TestLeaderboardCursor:
+    """Tests for leaderboard pagination cursors."""
+
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor('42', 40)) == ('42', 40)
+
+    def test_missing_or_malformed_cursor(self):
+        assert decode_cursor(None) == (None, 0)
+        assert decode_cursor('not-a-cursor') == (None, 0)
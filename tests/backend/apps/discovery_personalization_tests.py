@@ -0,0 +1,203 @@
+"""Tests for vectorized For You scoring."""
+import math
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from apps.discovery.personalization import PersonalizationEngine
+
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_story(story_id, author_id, tag_ids, trending=0.0, days_old=None):
+    return {
+        'id': story_id,
+        'author_id': author_id,
+        'tags': [{'tag_id': tag_id, 'name': tag_id} for tag_id in tag_ids],
+        'trending_score': trending,
+        'published_at': NOW - timedelta(days=days_old, hours=1) if days_old is not None else None,
+    }
+
+
+def reference_score(story, tag_scores, author_scores):
+    """Per-story formula used before vectorization."""
+    interest = sum(tag_scores.get(t['tag_id'], 0) for t in story['tags'])
+    interest += author_scores.get(story['author_id'], 0)
+    if story['published_at']:
+        freshness = math.exp(-0.1 * (NOW - story['published_at']).days)
+    else:
+        freshness = 0
+    return 0.5 * interest + 0.3 * story['trending_score'] + 0.2 * freshness
+
+
+class TestScoreCandidates:
+    """Tests for PersonalizationEngine.score_candidates."""
+
+    def test_matches_per_story_formula(self):
+        """Vectorized scores should equal the per-story weighted formula."""
+        engine = PersonalizationEngine()
+        tag_scores = {'fantasy': 4.0, 'romance': 1.5}
+        author_scores = {'author-1': 3.0}
+        candidates = [
+            make_story('s1', 'author-1', ['fantasy', 'romance'], trending=10.0, days_old=0),
+            make_story('s2', 'author-2', ['scifi'], trending=2.5, days_old=3),
+            make_story('s3', 'author-1', [], trending=0.0, days_old=None),
+            make_story('s4', 'author-3', ['romance'], trending=7.0, days_old=30),
+        ]
+
+        scores = engine.score_candidates(candidates, tag_scores, author_scores, now=NOW)
+
+        expected = [reference_score(s, tag_scores, author_scores) for s in candidates]
+        np.testing.assert_allclose(scores, expected)
+
+    def test_repeated_and_missing_tags(self):
+        """A tag listed twice should count once, and untagged stories last still get scores."""
+        engine = PersonalizationEngine()
+        tag_scores = {'fantasy': 4.0}
+        candidates = [
+            make_story('s1', 'author-1', ['fantasy', 'fantasy']),
+            make_story('s2', 'author-2', []),
+        ]
+
+        scores = engine.score_candidates(candidates, tag_scores, {}, now=NOW)
+
+        np.testing.assert_allclose(scores, [2.0, 0.0])
+
+    def test_empty_candidates(self):
+        """No candidates should produce an empty score array."""
+        engine = PersonalizationEngine()
+
+        assert engine.score_candidates([], {}, {}).shape == (0,)
+
+    def test_rank_candidates_is_stable(self):
+        """Equal scores should keep candidate order."""
+        engine = PersonalizationEngine()
+        candidates = [
+            make_story('low', 'a', [], trending=1.0),
+            make_story('tie-1', 'a', [], trending=5.0),
+            make_story('tie-2', 'a', [], trending=5.0),
+        ]
+
+        ranked = engine.rank_candidates(candidates, {}, {}, limit=2)
+
+        assert [s['id'] for s in ranked] == ['tie-1', 'tie-2']
+
+
+class FakeModel:
+    def __init__(self, find_many_result):
+        self.find_many_result = find_many_result
+        self.find_many_calls = 0
+
+    async def find_many(self, **kwargs):
+        self.find_many_calls += 1
+        return self.find_many_result
+
+
+class FakeDB:
+    def __init__(self, interests, stories):
+        self.userinterest = FakeModel(interests)
+        self.story = FakeModel(stories)
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+
+def make_story_row(story_id, author_id, tag_id):
+    return SimpleNamespace(
+        id=story_id,
+        slug=story_id,
+        title=story_id,
+        blurb='',
+        cover_key=None,
+        author_id=author_id,
+        published=True,
+        published_at=NOW,
+        created_at=NOW,
+        updated_at=NOW,
+        tags=[SimpleNamespace(tag=SimpleNamespace(id=tag_id, name=tag_id))],
+        stats=[],
+    )
+
+
+@pytest.fixture
+def feed_cache():
+    feed_cache = LocMemCache('for-you-tests', {})
+    feed_cache.clear()
+    with patch('apps.discovery.personalization.cache', feed_cache):
+        yield feed_cache
+
+
+class TestGetForYouFeed:
+    """Tests for the cached For You feed."""
+
+    def make_db(self):
+        interests = [
+            SimpleNamespace(tag_id='fantasy', author_id=None, score=5.0),
+            SimpleNamespace(tag_id='romance', author_id=None, score=1.0),
+            SimpleNamespace(tag_id=None, author_id='author-2', score=2.0),
+        ]
+        stories = [
+            make_story_row('romance-story', 'author-1', 'romance'),
+            make_story_row('fantasy-story', 'author-1', 'fantasy'),
+            make_story_row('blocked-later', 'author-3', 'fantasy'),
+        ]
+        return FakeDB(interests, stories)
+
+    @pytest.mark.asyncio
+    async def test_interests_loaded_once_and_ranking_cached(self, feed_cache):
+        """A feed load should query interests once and reuse the cached ranking."""
+        db = self.make_db()
+        engine = PersonalizationEngine()
+
+        with patch('apps.discovery.personalization.get_prisma', return_value=db):
+            first = await engine.get_for_you_feed('user-1', [], limit=2)
+            second = await engine.get_for_you_feed('user-1', [], limit=2)
+
+        assert [s['id'] for s in first] == ['fantasy-story', 'blocked-later']
+        assert second == first
+        assert db.userinterest.find_many_calls == 1
+        assert db.story.find_many_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_ranking_excludes_new_blocks(self, feed_cache):
+        """Authors blocked after the ranking was cached should be filtered."""
+        db = self.make_db()
+        engine = PersonalizationEngine()
+
+        with patch('apps.discovery.personalization.get_prisma', return_value=db):
+            await engine.get_for_you_feed('user-1', [])
+            feed = await engine.get_for_you_feed('user-1', ['author-3'])
+
+        assert 'blocked-later' not in [s['id'] for s in feed]
+
+    @pytest.mark.asyncio
+    async def test_invalidate_feed_cache(self, feed_cache):
+        """Invalidation should force the next load to re-score."""
+        db = self.make_db()
+        engine = PersonalizationEngine()
+
+        with patch('apps.discovery.personalization.get_prisma', return_value=db):
+            await engine.get_for_you_feed('user-1', [])
+            PersonalizationEngine.invalidate_feed_cache('user-1')
+            await engine.get_for_you_feed('user-1', [])
+
+        assert db.userinterest.find_many_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_cold_start_returns_none(self, feed_cache):
+        """Users with too few interests should fall back to trending."""
+        db = FakeDB([SimpleNamespace(tag_id='fantasy', author_id=None, score=1.0)], [])
+        engine = PersonalizationEngine()
+
+        with patch('apps.discovery.personalization.get_prisma', return_value=db):
+            assert await engine.get_for_you_feed('user-1', []) is None
+
+        assert db.story.find_many_calls == 0
@@ -0,0 +1,201 @@
+"""
+Tests for the streaming GDPR data export.
+
+S3 is moto's in-memory stand-in, so the multipart upload and the resulting
+ZIP archive are checked end to end; Prisma is replaced with in-memory tables
+that honour the id keyset filters the export pages with.
+"""
+import io
+import json
+import os
+import zipfile
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import boto3
+from django.conf import settings
+from moto import mock_aws
+from moto.s3 import models as moto_s3_models
+
+from apps.gdpr import data_export_service
+from apps.gdpr.data_export_service import DataExportService
+from infrastructure import s3_multipart
+
+
+NOW = datetime(2026, 10, 16, 12, 0)
+BUCKET = 'test-data-exports'
+
+
+def matches(row, where):
+    for field, value in where.items():
+        if field == 'id' and isinstance(value, dict):
+            if not row.id > value['gt']:
+                return False
+        elif field == 'story':
+            if row.story_author_id != value['is']['author_id']:
+                return False
+        elif getattr(row, field) != value:
+            return False
+    return True
+
+
+class FakeTable:
+    """A Prisma model delegate over in-memory rows."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.find_many = AsyncMock(side_effect=self._find_many)
+
+    async def _find_many(self, where, order, take):
+        assert order == {'id': 'asc'}
+        return sorted((row for row in self.rows if matches(row, where)), key=lambda row: row.id)[:take]
+
+
+def story(story_id, author_id='user-1'):
+    return SimpleNamespace(
+        id=story_id, author_id=author_id, slug=story_id, title=story_id.title(), blurb='',
+        cover_key=None, published=True, published_at=NOW, created_at=NOW, updated_at=NOW
+    )
+
+
+def chapter(chapter_id, author_id='user-1', content='Once upon a time'):
+    return SimpleNamespace(
+        id=chapter_id, story_id='story-1', story_author_id=author_id, chapter_number=1,
+        title=chapter_id, content=content, published=True, published_at=None,
+        created_at=NOW, updated_at=NOW
+    )
+
+
+def follow(follow_id, follower_id, following_id):
+    return SimpleNamespace(id=follow_id, follower_id=follower_id, following_id=following_id, created_at=NOW)
+
+
+def make_db(stories=(), chapters=(), follows=()):
+    db = MagicMock()
+    db.connect = AsyncMock()
+    db.disconnect = AsyncMock()
+    db.story = FakeTable(stories)
+    db.chapter = FakeTable(chapters)
+    db.follow = FakeTable(follows)
+    for model in ('whisper', 'whisperlike', 'readingprogress', 'bookmark', 'highlight',
+                  'notification', 'userconsent'):
+        setattr(db, model, FakeTable())
+    db.userprofile.find_unique = AsyncMock(return_value=SimpleNamespace(
+        id='user-1', clerk_user_id='clerk-1', handle='reader', display_name='Reader', bio='',
+        avatar_key=None, age_verified=False, age_verified_at=None, created_at=NOW, updated_at=NOW
+    ))
+
+    request = SimpleNamespace(
+        id='export-1', user_id='user-1', status='PENDING', requested_at=NOW,
+        completed_at=None, download_url=None, expires_at=None, error_message=None
+    )
+    db.dataexportrequest.find_unique = AsyncMock(return_value=request)
+    db.progress = []
+
+    async def update(where, data):
+        if 'progress' in data:
+            db.progress.append((data['progress'], data['records_exported']))
+        for field, value in data.items():
+            setattr(request, field, value)
+        return SimpleNamespace(**vars(request))
+
+    db.dataexportrequest.update = AsyncMock(side_effect=update)
+    return db
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def service_for(s3, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_EXPORT_BUCKET', BUCKET, raising=False)
+    monkeypatch.setattr(settings, 'DATA_EXPORT_BATCH_SIZE', 2, raising=False)
+    monkeypatch.setattr(settings, 'DATA_EXPORT_CONCURRENCY', 4, raising=False)
+
+    def service_for(db):
+        monkeypatch.setattr(data_export_service, 'get_prisma', lambda: db)
+        return DataExportService(s3_client=s3)
+
+    return service_for
+
+
+def read_archive(s3, key='exports/user-1/export-1.zip'):
+    body = s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+    return zipfile.ZipFile(io.BytesIO(body))
+
+
+def ndjson(archive, name):
+    return [json.loads(line) for line in archive.read(name).decode().splitlines()]
+
+
+class TestGenerateExport:
+    @pytest.mark.asyncio
+    async def test_sections_are_written_as_ndjson_members(self, s3, service_for):
+        db = make_db(
+            stories=[story(f'story-{i}') for i in (3, 1, 2)] + [story('story-9', author_id='user-2')],
+            chapters=[chapter('chapter-1'), chapter('chapter-2', author_id='user-2')],
+            follows=[follow('f1', 'user-1', 'user-2'), follow('f2', 'user-3', 'user-1')],
+        )
+
+        result = await service_for(db).generate_export('export-1')
+
+        assert result['status'] == 'COMPLETED'
+        archive = read_archive(s3)
+        assert json.loads(archive.read('export_info.json'))['format_version'] == '2.0'
+        assert json.loads(archive.read('profile.json'))['handle'] == 'reader'
+        assert [row['id'] for row in ndjson(archive, 'stories.ndjson')] == ['story-1', 'story-2', 'story-3']
+        assert [row['id'] for row in ndjson(archive, 'chapters.ndjson')] == ['chapter-1']
+        assert ndjson(archive, 'following.ndjson')[0]['user_id'] == 'user-2'
+        assert ndjson(archive, 'followers.ndjson')[0]['user_id'] == 'user-3'
+        assert archive.read('whispers.ndjson') == b''
+
+        # Stories were read in keyset pages of two
+        pages = [call.kwargs['where'].get('id') for call in db.story.find_many.await_args_list]
+        assert pages == [None, {'gt': 'story-2'}]
+
+    @pytest.mark.asyncio
+    async def test_progress_is_reported_per_section(self, s3, service_for):
+        db = make_db(stories=[story('story-1')], follows=[follow('f1', 'user-1', 'user-2')])
+
+        await service_for(db).generate_export('export-1')
+
+        percentages = [progress for progress, _ in db.progress]
+        assert percentages == sorted(percentages)
+        assert percentages[0] == 0 and percentages[-1] == 100
+        assert db.progress[-1] == (100, 2)
+
+    @pytest.mark.asyncio
+    async def test_large_export_is_uploaded_in_parts(self, s3, service_for, monkeypatch):
+        monkeypatch.setattr(moto_s3_models, 'S3_UPLOAD_PART_MIN_SIZE', 1024)
+        monkeypatch.setattr(s3_multipart, 'MIN_PART_SIZE', 1024)
+        monkeypatch.setattr(settings, 'S3_MULTIPART_PART_SIZE', 16 * 1024, raising=False)
+        db = make_db(chapters=[chapter(f'chapter-{i:02d}', content=os.urandom(4096).hex()) for i in range(20)])
+        upload_part = s3.upload_part
+        parts = []
+        monkeypatch.setattr(s3, 'upload_part', lambda **kwargs: parts.append(kwargs['PartNumber']) or upload_part(**kwargs))
+
+        await service_for(db).generate_export('export-1')
+
+        assert len(parts) > 1
+        assert len(ndjson(read_archive(s3), 'chapters.ndjson')) == 20
+
+    @pytest.mark.asyncio
+    async def test_failed_section_aborts_the_upload(self, s3, service_for):
+        db = make_db(stories=[story('story-1')])
+        db.highlight.find_many = AsyncMock(side_effect=Exception('DB down'))
+
+        with pytest.raises(Exception, match='DB down'):
+            await service_for(db).generate_export('export-1')
+
+        request = db.dataexportrequest.find_unique.return_value
+        assert request.status == 'FAILED'
+        assert request.error_message == 'DB down'
+        assert 'Contents' not in s3.list_objects_v2(Bucket=BUCKET)
+        assert 'Uploads' not in s3.list_multipart_uploads(Bucket=BUCKET)
@@ -0,0 +1,156 @@
+"""
+Tests for the keyword content filters and the single-pass ModerationEngine.
+
+These run without a database: the filters and the pipeline only inspect text.
+"""
+
+from unittest.mock import patch
+
+from apps.moderation.content_filters import (
+    ContentFilterPipeline,
+    HateSpeechDetector,
+    ModerationEngine,
+    ProfanityFilter,
+    SpamDetector,
+    normalize_for_matching,
+)
+
+
+class TestNormalizeForMatching:
+    """Tests for leetspeak and homoglyph normalization."""
+
+    def test_leetspeak(self):
+        assert normalize_for_matching('Sh1t $p4m') == 'shit spam'
+
+    def test_homoglyphs(self):
+        # Cyrillic 'ѕ' and 'і', Greek 'ο'
+        assert normalize_for_matching('ѕhіt bοok') == 'shit book'
+
+    def test_zero_width_and_fullwidth(self):
+        assert normalize_for_matching('da​mn ｄａｍｎ') == 'damn damn'
+
+
+class TestModerationEngine:
+    """Tests for the compiled keyword matcher."""
+
+    def test_reports_every_category_in_one_scan(self):
+        engine = ModerationEngine({
+            'profanity': {'damn'},
+            'spam': {'buy now'},
+            'hate_speech': {'inferior'},
+        })
+
+        scan = engine.scan('Damn, buy now before the inferior copy sells out')
+
+        assert scan.terms('profanity') == ['damn']
+        assert scan.terms('spam') == ['buy now']
+        assert scan.terms('hate_speech') == ['inferior']
+
+    def test_overlapping_and_prefix_keywords(self):
+        engine = ModerationEngine({'a': {'ab', 'abcd'}, 'b': {'bcd'}})
+
+        scan = engine.scan('abcd')
+
+        assert sorted(scan.terms('a')) == ['ab', 'abcd']
+        assert scan.terms('b') == ['bcd']
+
+    def test_whole_word_categories(self):
+        engine = ModerationEngine(
+            {'profanity': {'ass'}, 'spam': {'ass'}},
+            whole_word_categories=('profanity',)
+        )
+
+        scan = engine.scan('a classic assassin, you ass')
+
+        assert scan.terms('profanity') == ['ass']
+        assert len(scan.terms('spam')) == 4
+
+    def test_same_keyword_in_several_categories(self):
+        engine = ModerationEngine({'profanity': {'scum'}, 'hate_speech': {'scum'}})
+
+        scan = engine.scan('scum')
+
+        assert scan.terms('profanity') == ['scum']
+        assert scan.terms('hate_speech') == ['scum']
+
+    def test_empty_inputs(self):
+        assert ModerationEngine({}).scan('anything').hits == {}
+        assert ModerationEngine({'spam': {'x'}}).scan('').terms('spam') == []
+
+
+class TestFilters:
+    """Tests for the individual filters on top of the engine."""
+
+    def test_profanity_obfuscated(self):
+        result = ProfanityFilter().check('what the sh1t')
+
+        assert result.detected is True
+        assert result.matched_terms == ['shit']
+        assert result.severity == 'high'
+
+    def test_profanity_whole_words_only(self):
+        assert ProfanityFilter().check('a classic assessment').detected is False
+
+    def test_profanity_whitelist(self):
+        profanity_filter = ProfanityFilter(whitelist={'damn'}, sensitivity='STRICT')
+
+        assert profanity_filter.check('damn').detected is False
+
+    def test_spam_custom_keywords(self):
+        detector = SpamDetector(custom_keywords={'Crypto Giveaway', 'free money'}, sensitivity='STRICT')
+
+        result = detector.check('Join the crypto giveaway for free money, buy now')
+
+        assert result.detected is True
+        assert 'promotional_content' in result.matched_terms
+
+    def test_hate_patterns_counted_once_each(self):
+        result = HateSpeechDetector().check('kill all of them. kill all of them.')
+
+        assert result.matched_terms.count('hate_pattern') == 1
+
+    def test_overlapping_hate_patterns_all_count(self):
+        # "kill all jews" and "all jews are" overlap on "all jews"
+        result = HateSpeechDetector().check('kill all jews are vile')
+
+        assert result.matched_terms.count('hate_pattern') == 2
+        assert result.confidence == 0.8
+        assert result.detected is True
+
+
+class TestContentFilterPipeline:
+    """Tests for the single-scan pipeline."""
+
+    def test_scans_content_once(self):
+        pipeline = ContentFilterPipeline()
+
+        with patch.object(pipeline.engine, 'scan', wraps=pipeline.engine.scan) as scan:
+            pipeline.filter_content('clean text', 'story')
+
+        assert scan.call_count == 1
+
+    def test_custom_blacklists_share_the_engine(self):
+        pipeline = ContentFilterPipeline(
+            profanity_config={'custom_words': {'frak'}, 'sensitivity': 'STRICT'},
+            hate_speech_config={'custom_keywords': {'grox'}, 'sensitivity': 'STRICT'},
+        )
+
+        result = pipeline.filter_content('fr4k the gr0x', 'whisper')
+
+        assert result['flags'] == ['profanity', 'hate_speech']
+        assert 'create_high_priority_report' in result['auto_actions']
+
+    def test_clean_content(self):
+        result = ContentFilterPipeline().filter_content('A quiet story about cats.', 'story')
+
+        assert result == {'allowed': True, 'flags': [], 'auto_actions': [], 'details': {}}
+
+    def test_deferred_url_reputation(self):
+        pipeline = ContentFilterPipeline(url_validator_config={'api_key': 'test-key'})
+
+        with patch('apps.moderation.url_validator.requests.post') as post:
+            result = pipeline.filter_content('see https://unknown-site.org/page', 'story', check_url_reputation=False)
+
+        post.assert_not_called()
+        assert result['allowed'] is True
+        assert result['deferred_urls'] == ['https://unknown-site.org/page']
@@ -0,0 +1,163 @@
+"""
+Tests for the content fingerprint index.
+
+The database is replaced with an in-memory ContentFingerprint table, so
+these check the signatures, the index probes, and candidate verification.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+from apps.moderation.content_fingerprint import (
+    LSH_BANDS,
+    ContentFingerprintIndex,
+    exact_hash,
+    fingerprint,
+    hamming_distance,
+)
+
+
+ORIGINAL = "Check out my amazing new story about dragons and knights, the link is in my bio"
+EDITED = "check out my AMAZING new story about dragons and knights!! the link is in my profile bio"
+UNRELATED = "I really enjoyed the third chapter, the twist with the lighthouse keeper was unexpected"
+
+
+def row(fp, content_id, user_id, content_type='whisper', created_at=0):
+    return SimpleNamespace(
+        id=content_id,
+        content_type=content_type,
+        content_id=content_id,
+        user_id=user_id,
+        exact_hash=fp.exact_hash,
+        simhash=fp.simhash,
+        lsh_buckets=fp.lsh_buckets,
+        created_at=created_at,
+    )
+
+
+def table(rows):
+    """find_many over rows, honouring the filters and orderings the index uses."""
+    def matches(candidate, where):
+        for field, condition in where.items():
+            if field == 'NOT':
+                if matches(candidate, condition):
+                    return False
+            elif not isinstance(condition, dict):
+                if getattr(candidate, field) != condition:
+                    return False
+            elif 'not' in condition:
+                if getattr(candidate, field) == condition['not']:
+                    return False
+            elif 'in' in condition:
+                if getattr(candidate, field) not in condition['in']:
+                    return False
+            elif not set(getattr(candidate, field)) & set(condition['has_some']):
+                return False
+        return True
+
+    async def find_many(where, take, order):
+        found = [r for r in rows if matches(r, where)]
+        for ordering in reversed([order] if isinstance(order, dict) else order):
+            (field, direction), = ordering.items()
+            found.sort(key=lambda r: getattr(r, field), reverse=direction == 'desc')
+        return found[:take]
+
+    return AsyncMock(side_effect=find_many)
+
+
+class TestFingerprint:
+    def test_exact_hash_ignores_case_punctuation_and_markup(self):
+        assert exact_hash('<p>Hello,   World!</p>') == exact_hash('hello world')
+
+    def test_short_text_is_not_fingerprinted(self):
+        assert fingerprint('thanks!') is None
+
+    def test_near_duplicate_is_close(self):
+        a, b, c = fingerprint(ORIGINAL), fingerprint(EDITED), fingerprint(UNRELATED)
+
+        assert a.exact_hash != b.exact_hash
+        assert set(a.lsh_buckets) & set(b.lsh_buckets)
+        assert hamming_distance(a.simhash, b.simhash) < hamming_distance(a.simhash, c.simhash)
+        assert not set(a.lsh_buckets) & set(c.lsh_buckets)
+
+    def test_signature_shape(self):
+        fp = fingerprint(ORIGINAL)
+
+        assert len(fp.lsh_buckets) == LSH_BANDS
+        assert -(1 << 63) <= fp.simhash < (1 << 63)
+        assert fingerprint(ORIGINAL) == fp
+
+
+class TestContentFingerprintIndex:
+    @pytest.fixture
+    def db(self):
+        db = Mock()
+        db.contentfingerprint.upsert = AsyncMock()
+        db.contentfingerprint.delete_many = AsyncMock()
+        db.contentfingerprint.find_many = AsyncMock(return_value=[])
+        return db
+
+    @pytest.mark.asyncio
+    async def test_index_content_upserts(self, db):
+        await ContentFingerprintIndex(db).index_content('whisper', 'w1', 'u1', ORIGINAL)
+
+        kwargs = db.contentfingerprint.upsert.await_args.kwargs
+        assert kwargs['where'] == {'content_type_content_id': {'content_type': 'whisper', 'content_id': 'w1'}}
+        assert kwargs['data']['create']['exact_hash'] == exact_hash(ORIGINAL)
+
+    @pytest.mark.asyncio
+    async def test_short_content_removes_fingerprint(self, db):
+        assert await ContentFingerprintIndex(db).index_content('whisper', 'w1', 'u1', 'ok') is None
+
+        db.contentfingerprint.upsert.assert_not_awaited()
+        db.contentfingerprint.delete_many.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_find_duplicates(self, db):
+        fp = fingerprint(ORIGINAL)
+        db.contentfingerprint.find_many = table([
+            row(fingerprint(EDITED), 'near', 'u2'),
+            row(fp, 'exact', 'u3'),
+            row(fingerprint(UNRELATED), 'unrelated', 'u4'),
+            row(fp, 'own', 'u1'),
+        ])
+
+        matches = await ContentFingerprintIndex(db).find_duplicates([fp], exclude_user_id='u1')
+
+        assert [m.content_id for m in matches] == ['exact', 'near']
+        assert matches[0].exact and not matches[1].exact
+
+    @pytest.mark.asyncio
+    async def test_exact_copies_are_not_crowded_out_by_lsh_candidates(self, db):
+        fp = fingerprint(ORIGINAL)
+        near = [row(fingerprint(EDITED), f'near-{i}', 'u2', created_at=i) for i in range(5)]
+        db.contentfingerprint.find_many = table(near + [row(fp, 'exact', 'u3', created_at=10)])
+
+        matches = await ContentFingerprintIndex(db).find_duplicates([fp], limit=3)
+
+        assert [m.content_id for m in matches] == ['exact', 'near-0', 'near-1']
+
+    @pytest.mark.asyncio
+    async def test_lsh_probe_is_skipped_when_exact_copies_fill_the_limit(self, db):
+        fp = fingerprint(ORIGINAL)
+        db.contentfingerprint.find_many = table([row(fp, f'exact-{i}', 'u2', created_at=i) for i in range(3)])
+
+        matches = await ContentFingerprintIndex(db).find_duplicates([fp], limit=2)
+
+        assert [m.content_id for m in matches] == ['exact-0', 'exact-1']
+        db.contentfingerprint.find_many.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cross_account_duplicates(self, db):
+        fp = fingerprint(ORIGINAL)
+        db.contentfingerprint.find_many = table([row(fp, 'mine', 'u1'), row(fp, 'theirs', 'u2')])
+
+        matches = await ContentFingerprintIndex(db).find_cross_account_duplicates('u1')
+
+        assert [(m.content_id, m.user_id) for m in matches] == [('theirs', 'u2')]
+
+    @pytest.mark.asyncio
+    async def test_no_fingerprints_skips_probe(self, db):
+        assert await ContentFingerprintIndex(db).find_cross_account_duplicates('u1') == []
+        assert db.contentfingerprint.find_many.await_count == 1
@@ -38,7 +38,7 @@ async def test_fetch_filter_configs():
         MockFilterConfig('HATE_SPEECH', 'PERMISSIVE', False)
     ]
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_many = AsyncMock(return_value=mock_configs)
@@ -66,7 +66,7 @@ async def test_fetch_filter_config_found():
         blacklist=['badword1', 'badword2']
     )
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=mock_config)
@@ -87,7 +87,7 @@ async def test_fetch_filter_config_not_found():
     """Test fetching a non-existent filter configuration."""
     from apps.moderation.views import fetch_filter_config
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=None)
@@ -105,7 +105,7 @@ async def test_update_filter_configuration_sensitivity():
     existing_config = MockFilterConfig('PROFANITY', 'MODERATE', True)
     updated_config = MockFilterConfig('PROFANITY', 'STRICT', True)
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=existing_config)
@@ -137,7 +137,7 @@ async def test_update_filter_configuration_whitelist():
         whitelist=['scunthorpe', 'penistone']
     )
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=existing_config)
@@ -159,7 +159,7 @@ async def test_update_filter_configuration_enabled():
     existing_config = MockFilterConfig('SPAM', 'MODERATE', True)
     updated_config = MockFilterConfig('SPAM', 'MODERATE', False)
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=existing_config)
@@ -177,7 +177,7 @@ async def test_update_filter_configuration_not_found():
     """Test updating a non-existent filter configuration."""
     from apps.moderation.views import update_filter_configuration
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=None)
@@ -202,7 +202,7 @@ async def test_update_filter_configuration_multiple_fields():
         blacklist=['slur1', 'slur2']
     )
     
-    with patch('apps.moderation.views.Prisma') as MockPrisma:
+    with patch('apps.moderation.views.get_prisma') as MockPrisma:
         mock_db = AsyncMock()
         MockPrisma.return_value = mock_db
         mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=existing_config)
@@ -0,0 +1,104 @@
+"""Tests for the per-process, versioned filter pipeline cache."""
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from django.core.cache.backends.locmem import LocMemCache
+
+from apps.moderation import filter_config_service, filter_pipeline_cache
+from apps.moderation.filter_config_service import FilterConfigService
+from apps.moderation.filter_pipeline_cache import (
+    PIPELINE_VERSION_KEY,
+    bump_config_version,
+    reset_pipeline_cache,
+)
+
+
+def make_config(blacklist=None):
+    config = Mock()
+    config.enabled = True
+    config.sensitivity = 'STRICT'
+    config.whitelist = []
+    config.blacklist = blacklist or []
+    return config
+
+
+@pytest.fixture
+def version_cache(settings):
+    settings.FILTER_PIPELINE_VERSION_CHECK_INTERVAL = 0
+    store = LocMemCache('filter-pipeline-tests', {})
+    store.clear()
+    reset_pipeline_cache()
+    with patch.object(filter_pipeline_cache, 'cache', store):
+        yield store
+    reset_pipeline_cache()
+
+
+@pytest.fixture
+def mock_db():
+    db = Mock()
+    db.contentfilterconfig.find_unique = AsyncMock(return_value=make_config())
+    return db
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reused_without_queries(version_cache, mock_db):
+    """A second call with an unchanged version should not touch the database."""
+    service = FilterConfigService(mock_db)
+
+    first = await service.get_pipeline()
+    second = await service.get_pipeline()
+
+    assert first is second
+    assert mock_db.contentfilterconfig.find_unique.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_version_bump_rebuilds(version_cache, mock_db):
+    """A new version should make every process rebuild lazily."""
+    service = FilterConfigService(mock_db)
+    first = await service.get_pipeline()
+
+    mock_db.contentfilterconfig.find_unique = AsyncMock(return_value=make_config(['frak']))
+    bump_config_version()
+    second = await service.get_pipeline()
+
+    assert second is not first
+    assert second.filter_content('frak', 'whisper')['flags']
+
+
+@pytest.mark.asyncio
+async def test_create_or_update_config_bumps_version(version_cache, mock_db):
+    """Saving a config should publish a new version."""
+    mock_db.contentfilterconfig.upsert = AsyncMock(return_value=Mock(
+        id='config-1', filter_type='SPAM', sensitivity='STRICT', enabled=True,
+        whitelist=[], blacklist=[], updated_at=None
+    ))
+    service = FilterConfigService(mock_db)
+    await service.get_pipeline()
+    version = version_cache.get(PIPELINE_VERSION_KEY)
+
+    await service.create_or_update_config('SPAM', 'STRICT', True)
+
+    assert version_cache.get(PIPELINE_VERSION_KEY) != version
+
+
+@pytest.mark.asyncio
+async def test_check_interval_skips_version_reads(version_cache, mock_db, settings):
+    """Within the check interval the cached pipeline is returned without reading Valkey."""
+    settings.FILTER_PIPELINE_VERSION_CHECK_INTERVAL = 60
+    service = FilterConfigService(mock_db)
+    first = await service.get_pipeline()
+
+    with patch.object(filter_config_service, 'get_config_version') as get_version:
+        assert await service.get_pipeline() is first
+
+    get_version.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_valkey_outage_keeps_cached_pipeline(version_cache, mock_db):
+    """If the version cannot be read the last compiled pipeline is kept."""
+    service = FilterConfigService(mock_db)
+    first = await service.get_pipeline()
+
+    with patch.object(version_cache, 'get', side_effect=ConnectionError('down')):
+        assert await service.get_pipeline() is first
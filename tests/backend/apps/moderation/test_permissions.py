@@ -120,7 +120,7 @@ def test_require_moderator_role_decorator_no_moderator_role():
     
     with patch('apps.moderation.permissions.get_user_moderator_role',
                return_value=AsyncMock(return_value=None)):
-        with patch('asyncio.run', return_value=None):
+        with patch('apps.moderation.permissions.run_async', return_value=None):
             response = test_view(request)
             assert response.status_code == status.HTTP_403_FORBIDDEN
             assert 'Moderator access required' in str(response.data)
@@ -134,7 +134,7 @@ def test_require_moderator_role_decorator_wrong_role():
     
     request = MockRequest(user_profile_id='user123')
     
-    with patch('asyncio.run', return_value=MockModeratorRole('MODERATOR')):
+    with patch('apps.moderation.permissions.run_async', return_value=MockModeratorRole('MODERATOR')):
         response = test_view(request)
         assert response.status_code == status.HTTP_403_FORBIDDEN
         assert 'Insufficient permissions' in str(response.data)
@@ -148,7 +148,7 @@ def test_require_moderator_role_decorator_success():
     
     request = MockRequest(user_profile_id='user123')
     
-    with patch('asyncio.run', return_value=MockModeratorRole('ADMINISTRATOR')):
+    with patch('apps.moderation.permissions.run_async', return_value=MockModeratorRole('ADMINISTRATOR')):
         response = test_view(request)
         assert response.status_code == status.HTTP_200_OK
         assert response.data == {'success': True}
@@ -163,12 +163,12 @@ def test_require_administrator_decorator():
     request = MockRequest(user_profile_id='user123')
     
     # Test with non-admin role
-    with patch('asyncio.run', return_value=MockModeratorRole('MODERATOR')):
+    with patch('apps.moderation.permissions.run_async', return_value=MockModeratorRole('MODERATOR')):
         response = test_view(request)
         assert response.status_code == status.HTTP_403_FORBIDDEN
     
     # Test with admin role
-    with patch('asyncio.run', return_value=MockModeratorRole('ADMINISTRATOR')):
+    with patch('apps.moderation.permissions.run_async', return_value=MockModeratorRole('ADMINISTRATOR')):
         response = test_view(request)
         assert response.status_code == status.HTTP_200_OK
 
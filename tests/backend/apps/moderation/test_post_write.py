@@ -0,0 +1,262 @@
+"""
+Tests for the post-write moderation stage.
+
+Valkey is replaced with fakeredis and the database with mocks, so
+queueing, batching, backpressure and retries can be checked without
+external services.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from apps.moderation.post_write import (
+    PostWriteJob,
+    PostWriteModerationQueue,
+    PostWriteModerationStage,
+    merge_filter_results,
+    schedule_post_write_moderation,
+)
+
+
+@pytest.fixture
+def queue(valkey):
+    queue = PostWriteModerationQueue(max_pending=3)
+    queue._client = valkey
+    return queue
+
+
+@pytest.fixture
+def stage(queue, settings):
+    settings.MODERATION_STAGE_ENABLED = True
+    settings.MODERATION_STAGE_BATCH_SIZE = 2
+    settings.MODERATION_STAGE_MAX_ATTEMPTS = 3
+    return PostWriteModerationStage(queue)
+
+
+def make_job(content_id='w1', **kwargs):
+    kwargs.setdefault('flags', ['profanity'])
+    return PostWriteJob(content_type='whisper', content_id=content_id, **kwargs)
+
+
+class TestMergeFilterResults:
+    def test_union_of_fields(self):
+        merged = merge_filter_results(
+            {'flags': ['spam'], 'auto_actions': [], 'details': {'spam': {}}, 'deferred_urls': ['http://a']},
+            None,
+            {'flags': ['spam', 'hate_speech'], 'auto_actions': ['create_high_priority_report'],
+             'details': {'hate_speech': {}}, 'deferred_urls': ['http://a', 'http://b']},
+        )
+
+        assert merged['flags'] == ['spam', 'hate_speech']
+        assert merged['auto_actions'] == ['create_high_priority_report']
+        assert set(merged['details']) == {'spam', 'hate_speech'}
+        assert merged['deferred_urls'] == ['http://a', 'http://b']
+
+
+class TestSchedule:
+    def test_enqueues_and_starts_one_drain(self, stage):
+        with patch.object(stage, '_kick') as kick, patch.object(stage, 'run_inline') as run_inline:
+            stage.schedule(make_job('w1'))
+            stage.schedule(make_job('w2'))
+
+        assert stage.queue.pending() == 2
+        kick.assert_called_once()
+        run_inline.assert_not_called()
+
+    def test_job_without_work_is_skipped(self, stage):
+        with patch.object(stage, 'run_inline') as run_inline:
+            stage.schedule(make_job(flags=[]))
+
+        assert stage.queue.pending() == 0
+        run_inline.assert_not_called()
+
+    def test_full_queue_runs_inline(self, stage):
+        with patch.object(stage, '_kick'), patch.object(stage, 'run_inline') as run_inline:
+            for i in range(4):
+                stage.schedule(make_job(f'w{i}'))
+
+        assert stage.queue.pending() == 3
+        run_inline.assert_called_once()
+        assert run_inline.call_args[0][0].content_id == 'w3'
+
+    def test_valkey_outage_runs_inline(self, stage):
+        stage.queue._client = Mock(llen=Mock(side_effect=ConnectionError('down')))
+
+        with patch.object(stage, 'run_inline') as run_inline:
+            stage.schedule(make_job())
+
+        run_inline.assert_called_once()
+
+    def test_disabled_stage_runs_inline(self, stage, settings):
+        settings.MODERATION_STAGE_ENABLED = False
+
+        with patch.object(stage, 'run_inline') as run_inline:
+            stage.schedule(make_job())
+
+        run_inline.assert_called_once()
+        assert stage.queue.pending() == 0
+
+
+class TestDrain:
+    def test_processes_in_batches_and_marks_completed(self, stage):
+        for i in range(3):
+            stage.queue.enqueue(make_job(f'w{i}'))
+
+        with patch.object(stage, 'process_batch', AsyncMock(return_value=[])) as process_batch:
+            assert stage.drain() == 3
+
+        assert [len(call.args[0]) for call in process_batch.await_args_list] == [2, 1]
+        assert stage.queue.completed(['whisper:w0', 'whisper:w2']) == [True, True]
+
+    def test_batch_is_held_in_processing_until_done(self, stage):
+        for i in range(2):
+            stage.queue.enqueue(make_job(f'w{i}'))
+        client = stage.queue.client
+
+        async def process_batch(jobs):
+            assert client.llen(stage.queue.queue_key) == 0
+            assert client.llen(stage.queue.processing_key()) == 2
+            return []
+
+        with patch.object(stage, 'process_batch', process_batch):
+            assert stage.drain() == 2
+
+        assert client.llen(stage.queue.processing_key()) == 0
+
+    def test_jobs_of_a_stopped_worker_are_requeued(self, stage, valkey):
+        for i in range(3):
+            stage.queue.enqueue(make_job(f'w{i}'))
+        crashed = PostWriteModerationQueue(worker_id='crashed')
+        crashed._client = valkey
+        # Killed mid-batch, and its heartbeat has since expired
+        assert len(crashed.pop_batch(2)) == 2
+        valkey.delete(f'{PostWriteModerationQueue.KEY_PREFIX}:worker:crashed')
+
+        with patch.object(stage, 'process_batch', AsyncMock(return_value=[])) as process_batch:
+            assert stage.drain() == 3
+
+        ids = [job.content_id for call in process_batch.await_args_list for job in call.args[0]]
+        assert ids == ['w0', 'w1', 'w2']
+        assert valkey.llen(crashed.processing_key()) == 0
+
+    def test_live_worker_jobs_are_left_alone(self, stage, valkey):
+        stage.queue.enqueue(make_job('w1'))
+        busy = PostWriteModerationQueue(worker_id='busy')
+        busy._client = valkey
+        busy.pop_batch(1)
+
+        with patch.object(stage, 'process_batch', AsyncMock(return_value=[])) as process_batch:
+            assert stage.drain() == 0
+
+        process_batch.assert_not_awaited()
+        assert valkey.llen(busy.processing_key()) == 1
+
+    def test_skips_completed_jobs(self, stage):
+        stage.queue.mark_completed(['whisper:w1'])
+        stage.queue.enqueue(make_job('w1'))
+
+        with patch.object(stage, 'process_batch', AsyncMock(return_value=[])) as process_batch:
+            assert stage.drain() == 0
+
+        process_batch.assert_not_awaited()
+
+    def test_each_edit_is_processed_once(self, stage):
+        with patch('apps.moderation.post_write.get_post_write_stage', return_value=stage), \
+                patch.object(stage, '_kick'), \
+                patch.object(stage, 'process_batch', AsyncMock(return_value=[])) as process_batch:
+            schedule_post_write_moderation('chapter', 'c1', fingerprint=True)
+            stage.drain()
+            # Two edits, the second delivered twice
+            for version in ('2026-10-16T12:00:00', '2026-10-16T12:05:00', '2026-10-16T12:05:00'):
+                schedule_post_write_moderation('chapter', 'c1', fingerprint=True, version=version)
+                stage.drain()
+
+        jobs = [call.args[0][0] for call in process_batch.await_args_list]
+        assert [job.job_id for job in jobs] == [
+            'chapter:c1', 'chapter:c1@2026-10-16T12:00:00', 'chapter:c1@2026-10-16T12:05:00'
+        ]
+
+    def test_failed_jobs_are_retried_with_backoff(self, stage):
+        job = make_job('w1')
+        stage.queue.enqueue(job)
+
+        with patch.object(stage, 'process_batch', AsyncMock(return_value=[job])), \
+                patch('apps.moderation.tasks.requeue_post_write_job.apply_async') as requeue:
+            stage.drain()
+
+        assert requeue.call_args.kwargs['countdown'] == 60
+        assert PostWriteJob.from_json(requeue.call_args.kwargs['args'][0]).attempts == 1
+        assert stage.queue.completed(['whisper:w1']) == [False]
+
+    def test_gives_up_after_max_attempts(self, stage):
+        job = make_job('w1', attempts=2)
+
+        with patch('apps.moderation.tasks.requeue_post_write_job.apply_async') as requeue:
+            stage._retry(job)
+
+        requeue.assert_not_called()
+
+
+class TestProcessJob:
+    @pytest.fixture
+    def integration(self):
+        integration = Mock()
+        integration.config_service.log_automated_flag = AsyncMock()
+        integration.handle_auto_actions = AsyncMock()
+        return integration
+
+    @pytest.fixture
+    def db(self):
+        db = Mock()
+        db.automatedflag.find_first = AsyncMock(return_value=None)
+        return db
+
+    @pytest.mark.asyncio
+    async def test_logs_flags_once(self, stage, db, integration):
+        db.automatedflag.find_first = AsyncMock(side_effect=[None, Mock()])
+        job = make_job(flags=['profanity', 'spam'], details={'profanity': {'confidence': 1.0}})
+
+        await stage.process_job(job, db, integration)
+
+        integration.config_service.log_automated_flag.assert_awaited_once_with(
+            content_type='whisper', content_id='w1', flag_type='profanity', confidence=1.0
+        )
+
+    @pytest.mark.asyncio
+    async def test_malicious_url_creates_report(self, stage, db, integration):
+        url_result = Mock(is_safe=False, malicious_urls=['http://bad'], total_urls=1,
+                          details={'http://bad': 'MALWARE'})
+        job = make_job(flags=[], urls=['http://bad'])
+
+        with patch.object(stage, '_check_url_reputation', AsyncMock(return_value=url_result)):
+            await stage.process_job(job, db, integration)
+
+        assert integration.config_service.log_automated_flag.await_args.kwargs['flag_type'] == 'malicious_url'
+        kwargs = integration.handle_auto_actions.await_args.kwargs
+        assert kwargs['auto_actions'] == ['create_high_priority_report']
+        assert kwargs['filter_details']['malicious_url']['malicious_urls'] == ['http://bad']
+
+    @pytest.mark.asyncio
+    async def test_content_copied_by_other_accounts_is_flagged_as_spam(self, stage, db, integration):
+        from apps.moderation.content_fingerprint import DuplicateMatch
+
+        db.whisper.find_unique = AsyncMock(return_value=Mock(
+            user_id='u1', content='Follow my page for free coins, limited offer', deleted_at=None
+        ))
+        index = Mock()
+        index.index_content = AsyncMock(return_value=Mock())
+        index.find_duplicates = AsyncMock(return_value=[
+            DuplicateMatch('whisper', 'w2', 'u2', True, 0),
+            DuplicateMatch('whisper', 'w3', 'u3', False, 4),
+        ])
+        job = make_job(flags=[], fingerprint=True)
+
+        with patch('apps.moderation.content_fingerprint.ContentFingerprintIndex', return_value=index):
+            await stage.process_job(job, db, integration)
+
+        index.index_content.assert_awaited_once_with(
+            'whisper', 'w1', 'u1', 'Follow my page for free coins, limited offer'
+        )
+        kwargs = integration.config_service.log_automated_flag.await_args.kwargs
+        assert kwargs['flag_type'] == 'spam'
+        assert kwargs['confidence'] == 1.0
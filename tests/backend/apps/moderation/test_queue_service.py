@@ -0,0 +1,176 @@
+"""
+Tests for set-based moderation queue scoring and the materialized queue.
+
+Prisma is replaced with AsyncMocks and Valkey with fakeredis, so the number
+of database round trips and the page order can be checked without external
+services.
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from apps.moderation import queue_service as queue_module
+from apps.moderation.priority_queue import ModerationPriorityQueue, decode_cursor, sort_key
+from apps.moderation.queue_service import ModerationQueueService
+
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def make_report(report_id, reporter_id='r1', hours_old=1, **content):
+    return SimpleNamespace(
+        id=report_id,
+        reporter_id=reporter_id,
+        reporter=SimpleNamespace(handle=f'handle-{reporter_id}'),
+        story_id=content.get('story_id'),
+        chapter_id=content.get('chapter_id'),
+        whisper_id=content.get('whisper_id'),
+        reported_user_id=content.get('reported_user_id'),
+        reason='reason',
+        status='PENDING',
+        created_at=NOW - timedelta(hours=hours_old),
+    )
+
+
+def make_db(reports, resolved=(), valid=()):
+    db = Mock()
+    db.report.find_many = AsyncMock(return_value=reports)
+    db.report.group_by = AsyncMock(side_effect=[
+        [{'reporter_id': r, '_count': {'_all': n}} for r, n in resolved],
+        [{'reporter_id': r, '_count': {'_all': n}} for r, n in valid],
+    ])
+    return db
+
+
+@pytest.fixture
+def priority_queue(valkey):
+    queue = ModerationPriorityQueue()
+    queue._client = valkey
+    with patch.object(queue_module, 'get_priority_queue', return_value=queue):
+        yield queue
+
+
+class TestGetQueue:
+    @pytest.mark.asyncio
+    async def test_constant_round_trips(self):
+        """Scoring should take one fetch and two grouped queries, whatever the backlog size."""
+        reports = [make_report(f'rep-{i}', reporter_id=f'r{i % 7}', story_id=f's{i % 5}') for i in range(50)]
+        db = make_db(reports)
+
+        queue = await ModerationQueueService(db).get_queue()
+
+        assert len(queue) == 50
+        assert db.report.find_many.await_count == 1
+        assert db.report.group_by.await_count == 2
+        db.report.count.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_priority_factors(self):
+        """Duplicates, reporter accuracy, user reports and age all contribute."""
+        reports = [
+            make_report('dup-1', reporter_id='good', story_id='s1', hours_old=0),
+            make_report('dup-2', reporter_id='new', story_id='s1', hours_old=0),
+            make_report('user', reporter_id='bad', reported_user_id='u1', hours_old=0),
+            make_report('old', reporter_id='new', whisper_id='w1', hours_old=100),
+        ]
+        db = make_db(reports, resolved=[('good', 4), ('bad', 2)], valid=[('good', 3)])
+
+        scores = {e['id']: e['priority_score'] for e in await ModerationQueueService(db).get_queue()}
+
+        assert scores['dup-1'] == pytest.approx(10 + 0.75 * 20, abs=0.1)
+        assert scores['dup-2'] == pytest.approx(10 + 0.5 * 20, abs=0.1)
+        assert scores['user'] == pytest.approx(30, abs=0.1)
+        assert scores['old'] == pytest.approx(10 + 100, abs=0.1)
+
+    @pytest.mark.asyncio
+    async def test_sorted_by_priority_then_age(self):
+        reports = [
+            make_report('young', whisper_id='w1', hours_old=1),
+            make_report('older', whisper_id='w2', hours_old=60),
+            make_report('oldest', whisper_id='w3', hours_old=80),
+        ]
+
+        queue = await ModerationQueueService(make_db(reports)).get_queue()
+
+        assert [e['id'] for e in queue] == ['oldest', 'older', 'young']
+
+
+class TestMaterializedQueue:
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(self, priority_queue):
+        reports = [make_report(f'rep-{i}', whisper_id=f'w{i}', hours_old=i) for i in range(5)]
+        service = ModerationQueueService(make_db(reports))
+
+        first = await service.get_queue_page(page_size=2)
+        second = await service.get_queue_page(cursor=first['next_cursor'], page_size=2)
+        third = await service.get_queue_page(cursor=second['next_cursor'], page_size=2)
+
+        ids = [e['id'] for page in (first, second, third) for e in page['reports']]
+        assert ids == ['rep-4', 'rep-3', 'rep-2', 'rep-1', 'rep-0']
+        assert first['count'] == 5
+        assert third['next_cursor'] is None
+
+    @pytest.mark.asyncio
+    async def test_created_report_rescored_with_duplicates(self, priority_queue):
+        existing = make_report('a', story_id='s1', hours_old=0)
+        db = make_db([existing])
+        service = ModerationQueueService(db)
+        await service.rebuild_queue()
+
+        new = make_report('b', story_id='s1', hours_old=0)
+        db.report.find_many = AsyncMock(return_value=[existing, new])
+        db.report.group_by = AsyncMock(side_effect=[[], []])
+        await service.on_report_created(new)
+
+        page = await service.get_queue_page(page_size=10)
+        assert {e['id'] for e in page['reports']} == {'a', 'b'}
+        assert all(e['priority_score'] >= 20 for e in page['reports'])
+        assert priority_queue.count() == 2
+
+    @pytest.mark.asyncio
+    async def test_resolved_report_removed(self, priority_queue):
+        reports = [make_report('a', story_id='s1'), make_report('b', story_id='s1')]
+        db = make_db(reports)
+        service = ModerationQueueService(db)
+        await service.rebuild_queue()
+
+        db.report.find_many = AsyncMock(side_effect=[[], [reports[1]]])
+        db.report.group_by = AsyncMock(side_effect=[[], []])
+        await service.on_report_resolved(reports[0])
+
+        page = await service.get_queue_page(page_size=10)
+        assert [e['id'] for e in page['reports']] == ['b']
+        assert priority_queue.count() == 1
+
+    @pytest.mark.asyncio
+    async def test_valkey_outage_falls_back_to_live_page(self):
+        broken = ModerationPriorityQueue()
+        broken._client = Mock(exists=Mock(side_effect=ConnectionError('down')))
+        reports = [make_report(f'rep-{i}', whisper_id=f'w{i}', hours_old=i) for i in range(3)]
+
+        with patch.object(queue_module, 'get_priority_queue', return_value=broken):
+            page = await ModerationQueueService(make_db(reports)).get_queue_page(page_size=2)
+
+        assert [e['id'] for e in page['reports']] == ['rep-2', 'rep-1']
+        assert page['count'] == 3
+        assert page['next_cursor'] is not None
+
+
+class TestSortKey:
+    def test_orders_priority_desc_then_oldest(self):
+        created_old = (NOW - timedelta(hours=2)).isoformat()
+        created_new = NOW.isoformat()
+
+        keys = sorted([
+            sort_key(10.0, created_new, 'a'),
+            sort_key(50.5, created_new, 'b'),
+            sort_key(10.0, created_old, 'c'),
+        ])
+
+        assert [key.rsplit(':', 1)[1] for key in keys] == ['b', 'c', 'a']
+
+    def test_malformed_cursor(self):
+        assert decode_cursor('not base64!') is None
+        assert decode_cursor(None) is None
@@ -5,11 +5,18 @@ Tests the PushNotificationService for device token registration,
 notification sending, and integration with FCM and APNs.
 """
 
-import pytest
-from unittest.mock import AsyncMock, Mock, patch
+import json
+import logging
+import threading
+import time
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
 
-from apps.notifications.push_service import PushNotificationService
+import httpx
+import pytest
+
+from apps.notifications.push_service import PushNotificationService, PushTarget
 
 
 @pytest.mark.asyncio
@@ -222,6 +229,20 @@ class TestGetUserDevices:
             assert len(result) == 0
 
 
+def make_device(device_id, token, platform):
+    return {
+        'id': device_id,
+        'token': token,
+        'platform': platform,
+        'app_version': '1.0.0',
+        'last_used_at': datetime.now().isoformat()
+    }
+
+
+def sent_to_all(tokens, payload):
+    return [('sent', None, False)] * len(tokens)
+
+
 @pytest.mark.asyncio
 @pytest.mark.django_db
 class TestSendNotification:
@@ -247,17 +268,10 @@ class TestSendNotification:
         """Test sending notification to Android device."""
         service = PushNotificationService()
         
-        mock_device = {
-            'id': 'device1',
-            'token': 'fcm_token',
-            'platform': 'android',
-            'app_version': '1.0.0',
-            'last_used_at': datetime.now().isoformat()
-        }
-        
-        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=[mock_device]), \
-             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, return_value=True), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock):
+        with patch.object(service, 'get_user_devices', new_callable=AsyncMock,
+                          return_value=[make_device('device1', 'fcm_token', 'android')]), \
+             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=sent_to_all), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock):
             
             result = await service.send_notification(
                 user_id='user123',
@@ -274,17 +288,10 @@ class TestSendNotification:
         """Test sending notification to iOS device."""
         service = PushNotificationService()
         
-        mock_device = {
-            'id': 'device1',
-            'token': 'apns_token',
-            'platform': 'ios',
-            'app_version': '1.0.0',
-            'last_used_at': datetime.now().isoformat()
-        }
-        
-        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=[mock_device]), \
-             patch.object(service, '_send_to_apns', new_callable=AsyncMock, return_value=True), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock):
+        with patch.object(service, 'get_user_devices', new_callable=AsyncMock,
+                          return_value=[make_device('device1', 'apns_token', 'ios')]), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock, return_value=('sent', None, False)), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock):
             
             result = await service.send_notification(
                 user_id='user123',
@@ -301,26 +308,15 @@ class TestSendNotification:
         service = PushNotificationService()
         
         mock_devices = [
-            {
-                'id': 'device1',
-                'token': 'token1',
-                'platform': 'android',
-                'app_version': '1.0.0',
-                'last_used_at': datetime.now().isoformat()
-            },
-            {
-                'id': 'device2',
-                'token': 'token2',
-                'platform': 'ios',
-                'app_version': '1.0.0',
-                'last_used_at': datetime.now().isoformat()
-            }
+            make_device('device1', 'token1', 'android'),
+            make_device('device2', 'token2', 'ios'),
         ]
         
         with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=mock_devices), \
-             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, return_value=True), \
-             patch.object(service, '_send_to_apns', new_callable=AsyncMock, return_value=False), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock):
+             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=sent_to_all), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock,
+                          return_value=('failed', 'APNs status 403', False)), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock):
             
             result = await service.send_notification(
                 user_id='user123',
@@ -331,6 +327,27 @@ class TestSendNotification:
             assert result['total_devices'] == 2
             assert result['sent'] == 1
             assert result['failed'] == 1
+    
+    async def test_android_devices_share_multicast_requests(self):
+        """Test that Android tokens are sent in FCM multicast batches."""
+        service = PushNotificationService()
+        service.fcm_batch_size = 2
+        
+        mock_devices = [make_device(f'device{i}', f'token{i}', 'android') for i in range(5)]
+        
+        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=mock_devices), \
+             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=sent_to_all) as mock_send, \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock):
+            
+            result = await service.send_notification(
+                user_id='user123',
+                title='Test',
+                body='Message'
+            )
+            
+            assert result['sent'] == 5
+            batches = sorted(call.args[0] for call in mock_send.call_args_list)
+            assert batches == [['token0', 'token1'], ['token2', 'token3'], ['token4']]
 
 
 @pytest.mark.asyncio
@@ -339,49 +356,56 @@ class TestFCMIntegration:
     """Test cases for FCM integration."""
     
     async def test_send_to_fcm_success(self):
-        """Test successful FCM notification."""
-        service = PushNotificationService()
-        service.fcm_server_key = 'test_key'
-        
+        """Test successful FCM multicast notification."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {'success': 1}
-        
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
-            
-            result = await service._send_to_fcm(
-                token='fcm_token',
-                payload={'title': 'Test', 'body': 'Message'}
-            )
-            
-            assert result is True
-    
-    async def test_send_to_fcm_invalid_token(self):
-        """Test FCM with invalid token."""
-        service = PushNotificationService()
+        mock_response.json.return_value = {'success': 2, 'results': [{'message_id': '1'}, {'message_id': '2'}]}
+        client = Mock()
+        client.post = AsyncMock(return_value=mock_response)
+        service = PushNotificationService(http_client=client)
         service.fcm_server_key = 'test_key'
-        from apps.notifications.push_service import InvalidTokenException
         
+        result = await service._send_to_fcm(
+            tokens=['token1', 'token2'],
+            payload={'title': 'Test', 'body': 'Message'}
+        )
+        
+        assert result == [('sent', None, False), ('sent', None, False)]
+        assert client.post.call_args[1]['json']['registration_ids'] == ['token1', 'token2']
+    
+    async def test_send_to_fcm_per_token_errors(self):
+        """Test FCM invalid and transient per-token errors."""
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
-            'success': 0,
-            'results': [{'error': 'InvalidRegistration'}]
+            'success': 1,
+            'results': [{'error': 'InvalidRegistration'}, {'error': 'Unavailable'}, {'message_id': '3'}]
         }
+        client = Mock()
+        client.post = AsyncMock(return_value=mock_response)
+        service = PushNotificationService(http_client=client)
+        service.fcm_server_key = 'test_key'
         
-        with patch('httpx.AsyncClient') as mock_client, \
-             patch.object(service, '_handle_invalid_token', new_callable=AsyncMock) as mock_handle:
-            
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
-            
-            with pytest.raises(InvalidTokenException):
-                await service._send_to_fcm(
-                    token='invalid_token',
-                    payload={'title': 'Test', 'body': 'Message'}
-                )
-
-            mock_handle.assert_called_once_with('invalid_token')
+        result = await service._send_to_fcm(['invalid', 'busy', 'ok'], {'title': 'Test', 'body': 'Message'})
+        
+        assert result == [
+            ('invalid_token', 'InvalidRegistration', False),
+            ('failed', 'Unavailable', True),
+            ('sent', None, False),
+        ]
+    
+    async def test_send_to_fcm_server_error_is_retryable(self):
+        """Test FCM 5xx responses are retryable for every token."""
+        mock_response = Mock()
+        mock_response.status_code = 503
+        client = Mock()
+        client.post = AsyncMock(return_value=mock_response)
+        service = PushNotificationService(http_client=client)
+        service.fcm_server_key = 'test_key'
+        
+        result = await service._send_to_fcm(['token1', 'token2'], {'title': 'Test', 'body': 'Message'})
+        
+        assert all(retryable for _, _, retryable in result)
     
     async def test_send_to_fcm_no_server_key(self):
         """Test FCM without server key configured."""
@@ -389,11 +413,11 @@ class TestFCMIntegration:
         service.fcm_server_key = None
         
         result = await service._send_to_fcm(
-            token='fcm_token',
+            tokens=['fcm_token'],
             payload={'title': 'Test', 'body': 'Message'}
         )
         
-        assert result is False
+        assert result == [('failed', 'FCM_SERVER_KEY not configured', False)]
 
 
 @pytest.mark.asyncio
@@ -401,50 +425,47 @@ class TestFCMIntegration:
 class TestAPNsIntegration:
     """Test cases for APNs integration."""
     
-    async def test_send_to_apns_success(self):
-        """Test successful APNs notification."""
-        service = PushNotificationService()
+    def make_service(self, status_code, text=''):
+        mock_response = Mock()
+        mock_response.status_code = status_code
+        mock_response.text = text
+        client = Mock()
+        client.post = AsyncMock(return_value=mock_response)
+        service = PushNotificationService(http_client=client)
         service.apns_key_id = 'key123'
         service.apns_team_id = 'team123'
         service.apns_bundle_id = 'com.example.app'
+        return service
+    
+    async def test_send_to_apns_success(self):
+        """Test successful APNs notification."""
+        service = self.make_service(200)
         
-        mock_response = Mock()
-        mock_response.status_code = 200
+        result = await service._send_to_apns(
+            token='apns_token',
+            payload={'title': 'Test', 'body': 'Message'}
+        )
         
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
+        assert result == ('sent', None, False)
+    
+    async def test_send_to_apns_invalid_token(self):
+        """Test APNs 400/410 responses mark the token invalid."""
+        for status_code in (400, 410):
+            service = self.make_service(status_code, 'BadDeviceToken')
             
-            result = await service._send_to_apns(
-                token='apns_token',
-                payload={'title': 'Test', 'body': 'Message'}
-            )
+            status, _, retryable = await service._send_to_apns('invalid_token', {'title': 'Test', 'body': 'Message'})
             
-            assert result is True
+            assert status == 'invalid_token'
+            assert retryable is False
     
-    async def test_send_to_apns_invalid_token(self):
-        """Test APNs with invalid token."""
-        service = PushNotificationService()
-        service.apns_key_id = 'key123'
-        service.apns_team_id = 'team123'
-        service.apns_bundle_id = 'com.example.app'
-        from apps.notifications.push_service import InvalidTokenException
+    async def test_send_to_apns_server_error_is_retryable(self):
+        """Test APNs 5xx responses are retryable."""
+        service = self.make_service(503, 'ServiceUnavailable')
         
-        mock_response = Mock()
-        mock_response.status_code = 400
-        mock_response.text = 'BadDeviceToken'
+        status, _, retryable = await service._send_to_apns('apns_token', {'title': 'Test', 'body': 'Message'})
         
-        with patch('httpx.AsyncClient') as mock_client, \
-             patch.object(service, '_handle_invalid_token', new_callable=AsyncMock) as mock_handle:
-            
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
-            
-            with pytest.raises(InvalidTokenException):
-                await service._send_to_apns(
-                    token='invalid_token',
-                    payload={'title': 'Test', 'body': 'Message'}
-                )
-
-            mock_handle.assert_called_once_with('invalid_token')
+        assert status == 'failed'
+        assert retryable is True
     
     async def test_send_to_apns_incomplete_config(self):
         """Test APNs without complete configuration."""
@@ -453,12 +474,13 @@ class TestAPNsIntegration:
         service.apns_team_id = None
         service.apns_bundle_id = None
         
-        result = await service._send_to_apns(
+        status, _, retryable = await service._send_to_apns(
             token='apns_token',
             payload={'title': 'Test', 'body': 'Message'}
         )
         
-        assert result is False
+        assert status == 'failed'
+        assert retryable is False
 
 
 @pytest.mark.asyncio
@@ -466,187 +488,123 @@ class TestAPNsIntegration:
 class TestNotificationLogging:
     """Test cases for notification logging."""
     
-    async def test_log_notification_success(self):
-        """Test logging successful notification."""
+    async def test_log_notifications_is_one_insert(self):
+        """Test delivery logs are written with one create_many call."""
         service = PushNotificationService()
         
         with patch.object(service, '_ensure_connected', new_callable=AsyncMock), \
-             patch('prisma.actions.PushNotificationLogActions.create', new_callable=AsyncMock) as mock_create:
+             patch('prisma.actions.PushNotificationLogActions.create_many', new_callable=AsyncMock) as mock_create:
             
-            await service._log_notification(
-                device_token_id='device123',
-                payload={'title': 'Test', 'body': 'Message'},
-                status='sent',
-                notification_id='notif123'
-            )
+            await service._log_notifications([
+                {'device_token_id': 'device1', 'payload': '{}', 'status': 'sent', 'error_message': None},
+                {'device_token_id': 'device2', 'payload': '{}', 'status': 'failed', 'error_message': 'Timeout'},
+            ])
             
             mock_create.assert_called_once()
-            call_args = mock_create.call_args[1]['data']
-            assert call_args['device_token_id'] == 'device123'
-            assert call_args['status'] == 'sent'
-            assert call_args['notification_id'] == 'notif123'
+            rows = mock_create.call_args[1]['data']
+            assert [row['status'] for row in rows] == ['sent', 'failed']
+            assert rows[1]['error_message'] == 'Timeout'
     
-    async def test_log_notification_failure(self):
-        """Test logging failed notification."""
+    async def test_log_notifications_failure_is_swallowed(self, caplog):
+        """Test a logging failure does not fail delivery."""
         service = PushNotificationService()
         
         with patch.object(service, '_ensure_connected', new_callable=AsyncMock), \
-             patch('prisma.actions.PushNotificationLogActions.create', new_callable=AsyncMock) as mock_create:
+             patch('prisma.actions.PushNotificationLogActions.create_many', new_callable=AsyncMock,
+                   side_effect=Exception('DB down')) as mock_create, \
+             caplog.at_level(logging.ERROR, logger='apps.notifications.push_service'):
             
-            await service._log_notification(
-                device_token_id='device123',
-                payload={'title': 'Test', 'body': 'Message'},
-                status='failed',
-                error_message='Connection timeout'
-            )
+            await service._log_notifications([
+                {'device_token_id': 'device1', 'payload': '{}', 'status': 'sent', 'error_message': None}
+            ])
             
-            mock_create.assert_called_once()
-            call_args = mock_create.call_args[1]['data']
-            assert call_args['status'] == 'failed'
-            assert call_args['error_message'] == 'Connection timeout'
-
+            mock_create.assert_awaited_once()
+            assert 'Error logging notifications: DB down' in caplog.text
 
 
 @pytest.mark.asyncio
 @pytest.mark.django_db
 class TestRetryLogic:
-    """Test cases for notification retry logic with exponential backoff."""
+    """Test cases for delayed retries of transient failures."""
     
-    async def test_send_with_retry_success_first_attempt(self):
-        """Test successful send on first attempt (no retry needed)."""
+    async def test_transient_failure_schedules_retry_without_sleeping(self):
+        """Test a transient failure is queued with the first backoff delay."""
         service = PushNotificationService()
         
-        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock, return_value=True):
-            
-            result = await service._send_with_retry(
-                token='fcm_token',
-                platform='android',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
-            
-            assert result is True
-            # Should only call once, no retries
-            service._send_to_fcm.assert_called_once()
-    
-    async def test_send_with_retry_success_after_failures(self):
-        """Test successful send after initial failures with exponential backoff."""
-        service = PushNotificationService()
-        
-        # Fail twice, then succeed
-        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock) as mock_send, \
+        with patch.object(service, 'get_user_devices', new_callable=AsyncMock,
+                          return_value=[make_device('device1', 'token1', 'ios')]), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock,
+                          return_value=('failed', 'APNs status 503', True)), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log, \
+             patch('apps.notifications.tasks.retry_push_delivery.apply_async') as mock_retry, \
              patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
             
-            mock_send.side_effect = [False, False, True]
+            result = await service.send_notification(user_id='user123', title='Test', body='Message')
             
-            result = await service._send_with_retry(
-                token='fcm_token',
-                platform='android',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
-            
-            assert result is True
-            assert mock_send.call_count == 3
-            
-            # Verify exponential backoff delays
-            assert mock_sleep.call_count == 2
-            mock_sleep.assert_any_call(1)  # First retry delay
-            mock_sleep.assert_any_call(2)  # Second retry delay
+            assert result['results'][0]['retry_scheduled'] is True
+            mock_retry.assert_called_once()
+            assert mock_retry.call_args[1]['args'][0] == ['device1']
+            assert mock_retry.call_args[1]['args'][2] == 2
+            assert mock_retry.call_args[1]['countdown'] == 1
+            mock_sleep.assert_not_called()
+            # Logged once the outcome is final
+            assert mock_log.call_args[0][0] == []
     
-    async def test_send_with_retry_all_attempts_fail(self):
-        """Test all retry attempts fail."""
+    async def test_backoff_delays_follow_attempts(self):
+        """Test each retry is delayed by the next exponential backoff step."""
         service = PushNotificationService()
         
-        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock, return_value=False), \
-             patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
-            
-            result = await service._send_with_retry(
-                token='fcm_token',
-                platform='android',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
-            
-            assert result is False
-            assert service._send_to_fcm.call_count == 5  # max_retries
-            
-            # Verify exponential backoff delays (4 delays for 5 attempts)
-            assert mock_sleep.call_count == 4
-            mock_sleep.assert_any_call(1)
-            mock_sleep.assert_any_call(2)
-            mock_sleep.assert_any_call(4)
-            mock_sleep.assert_any_call(8)
+        with patch('apps.notifications.tasks.retry_push_delivery.apply_async') as mock_retry:
+            for attempt in range(1, 5):
+                service._schedule_retry(['device1'], {'title': 'Test', 'body': 'Message'}, attempt)
+        
+        assert [call[1]['countdown'] for call in mock_retry.call_args_list] == [1, 2, 4, 8]
     
-    async def test_send_with_retry_stops_on_invalid_token(self):
-        """Test retry stops when token is marked as invalid."""
+    async def test_last_attempt_is_logged_as_failed(self):
+        """Test no retry is scheduled after max_retries attempts."""
         service = PushNotificationService()
+        target = PushTarget('device1', 'token1', 'android', 'user123')
         
-        from apps.notifications.push_service import InvalidTokenException
-        
-        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock) as mock_send, \
-             patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
-            
-            # First attempt raises InvalidTokenException
-            mock_send.side_effect = InvalidTokenException("Token is invalid")
+        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock,
+                          return_value=[('failed', 'Unavailable', True)]), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log, \
+             patch('apps.notifications.tasks.retry_push_delivery.apply_async') as mock_retry:
             
-            result = await service._send_with_retry(
-                token='fcm_token',
-                platform='android',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
+            results = await service.deliver([target], {'title': 'Test', 'body': 'Message'}, attempt=service.max_retries)
             
-            assert result is False
-            # Should only attempt once before stopping
-            assert mock_send.call_count == 1
-            # Should not sleep/retry
-            assert mock_sleep.call_count == 0
+            assert results[0].status == 'failed'
+            mock_retry.assert_not_called()
+            assert mock_log.call_args[0][0][0]['error_message'] == 'Unavailable'
     
-    async def test_send_with_retry_exponential_backoff_delays(self):
-        """Test that exponential backoff uses correct delay sequence."""
+    async def test_unscheduled_retry_is_logged_as_failed(self):
+        """Test a broker outage turns a retryable failure into a final one."""
         service = PushNotificationService()
+        target = PushTarget('device1', 'token1', 'android', 'user123')
         
-        with patch.object(service, '_send_to_apns', new_callable=AsyncMock, return_value=False), \
-             patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=Exception('Timeout')), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log, \
+             patch('apps.notifications.tasks.retry_push_delivery.apply_async', side_effect=Exception('Broker down')):
             
-            await service._send_with_retry(
-                token='apns_token',
-                platform='ios',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
+            results = await service.deliver([target], {'title': 'Test', 'body': 'Message'})
             
-            # Verify the exact sequence of delays: 1, 2, 4, 8
-            expected_delays = [1, 2, 4, 8]
-            actual_delays = [call[0][0] for call in mock_sleep.call_args_list]
-            assert actual_delays == expected_delays
+            assert results[0].retry_scheduled is False
+            assert mock_log.call_args[0][0][0]['status'] == 'failed'
     
-    async def test_send_with_retry_network_error_triggers_retry(self):
-        """Test that network errors trigger retry with exponential backoff."""
+    async def test_retry_delivery_skips_deactivated_devices(self):
+        """Test retries reload devices and only deliver to active ones."""
         service = PushNotificationService()
+        device = Mock(id='device1', token='token1', platform='ios', user_id='user123')
         
-        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock) as mock_send, \
-             patch.object(service, '_ensure_connected', new_callable=AsyncMock), \
-             patch('asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
-            
-            # Raise network error twice, then succeed
-            mock_send.side_effect = [
-                Exception("Network error"),
-                Exception("Timeout"),
-                True
-            ]
+        with patch.object(service, '_ensure_connected', new_callable=AsyncMock), \
+             patch('prisma.actions.DeviceTokenActions.find_many', new_callable=AsyncMock, return_value=[device]) as mock_find, \
+             patch.object(service, 'deliver', new_callable=AsyncMock, return_value=[]) as mock_deliver:
             
-            result = await service._send_with_retry(
-                token='fcm_token',
-                platform='android',
-                payload={'title': 'Test', 'body': 'Message'},
-                device_id='device123'
-            )
+            await service.retry_delivery(['device1', 'device2'], {'title': 'Test', 'body': 'Message'}, 3)
             
-            assert result is True
-            assert mock_send.call_count == 3
-            assert mock_sleep.call_count == 2
+            assert mock_find.call_args[1]['where']['is_active'] is True
+            targets = mock_deliver.call_args[0][0]
+            assert targets == [PushTarget('device1', 'token1', 'ios', 'user123')]
+            assert mock_deliver.call_args[0][2] == 3
 
 
 @pytest.mark.asyncio
@@ -654,52 +612,27 @@ class TestRetryLogic:
 class TestInvalidTokenHandling:
     """Test cases for invalid token handling."""
     
-    async def test_fcm_invalid_registration_triggers_invalid_token_handler(self):
-        """Test that FCM InvalidRegistration error triggers invalid token handler."""
-        service = PushNotificationService()
-        service.fcm_server_key = 'test_key'
-        
-        from apps.notifications.push_service import InvalidTokenException
-        
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'success': 0,
-            'results': [{'error': 'InvalidRegistration'}]
-        }
-        
-        with patch('httpx.AsyncClient') as mock_client, \
-             patch.object(service, '_handle_invalid_token', new_callable=AsyncMock) as mock_handle:
-            
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
-            
-            with pytest.raises(InvalidTokenException):
-                await service._send_to_fcm('invalid_token', {'title': 'Test', 'body': 'Message'})
-            
-            mock_handle.assert_called_once_with('invalid_token')
-    
-    async def test_apns_bad_device_token_triggers_invalid_token_handler(self):
-        """Test that APNs 400/410 status triggers invalid token handler."""
+    async def test_invalid_tokens_are_deactivated_in_one_update(self):
+        """Test invalid FCM and APNs tokens are deactivated together and not retried."""
         service = PushNotificationService()
-        service.apns_key_id = 'key123'
-        service.apns_team_id = 'team123'
-        service.apns_bundle_id = 'com.example.app'
-        
-        from apps.notifications.push_service import InvalidTokenException
-        
-        mock_response = Mock()
-        mock_response.status_code = 410
-        mock_response.text = 'Unregistered'
+        targets = [
+            PushTarget('device1', 'fcm_bad', 'android', 'user123'),
+            PushTarget('device2', 'apns_bad', 'ios', 'user123'),
+        ]
         
-        with patch('httpx.AsyncClient') as mock_client, \
-             patch.object(service, '_handle_invalid_token', new_callable=AsyncMock) as mock_handle:
+        with patch.object(service, '_send_to_fcm', new_callable=AsyncMock,
+                          return_value=[('invalid_token', 'NotRegistered', False)]), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock,
+                          return_value=('invalid_token', 'APNs status 410', False)), \
+             patch.object(service, '_deactivate_tokens', new_callable=AsyncMock) as mock_deactivate, \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log, \
+             patch('apps.notifications.tasks.retry_push_delivery.apply_async') as mock_retry:
             
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
+            await service.deliver(targets, {'title': 'Test', 'body': 'Message'})
             
-            with pytest.raises(InvalidTokenException):
-                await service._send_to_apns('invalid_token', {'title': 'Test', 'body': 'Message'})
-            
-            mock_handle.assert_called_once_with('invalid_token')
+            mock_deactivate.assert_called_once_with(['fcm_bad', 'apns_bad'])
+            mock_retry.assert_not_called()
+            assert [row['status'] for row in mock_log.call_args[0][0]] == ['invalid_token', 'invalid_token']
 
 
 @pytest.mark.asyncio
@@ -707,76 +640,20 @@ class TestInvalidTokenHandling:
 class TestDeliveryStatusTracking:
     """Test cases for delivery status tracking."""
     
-    async def test_notification_log_tracks_sent_status(self):
-        """Test that successful notifications are logged with 'sent' status."""
+    async def test_notification_log_tracks_statuses(self):
+        """Test that each device's outcome is logged once, in one batch."""
         service = PushNotificationService()
         
-        mock_device = {
-            'id': 'device1',
-            'token': 'fcm_token',
-            'platform': 'android',
-            'app_version': '1.0.0',
-            'last_used_at': datetime.now().isoformat()
-        }
-        
-        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=[mock_device]), \
-             patch.object(service, '_send_with_retry', new_callable=AsyncMock, return_value=True), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock) as mock_log:
-            
-            await service.send_notification(
-                user_id='user123',
-                title='Test',
-                body='Message'
-            )
-            
-            # Verify notification was logged with 'sent' status
-            mock_log.assert_called_once()
-            log_call = mock_log.call_args
-            assert log_call[1]['status'] == 'sent'
-            assert log_call[1]['device_token_id'] == 'device1'
-    
-    async def test_notification_log_tracks_failed_status(self):
-        """Test that failed notifications are logged with 'failed' status."""
-        service = PushNotificationService()
-        
-        mock_device = {
-            'id': 'device1',
-            'token': 'fcm_token',
-            'platform': 'android',
-            'app_version': '1.0.0',
-            'last_used_at': datetime.now().isoformat()
-        }
-        
-        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=[mock_device]), \
-             patch.object(service, '_send_with_retry', new_callable=AsyncMock, return_value=False), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock) as mock_log:
-            
-            await service.send_notification(
-                user_id='user123',
-                title='Test',
-                body='Message'
-            )
-            
-            # Verify notification was logged with 'failed' status
-            mock_log.assert_called_once()
-            log_call = mock_log.call_args
-            assert log_call[1]['status'] == 'failed'
-    
-    async def test_notification_log_includes_error_message(self):
-        """Test that failed notifications include error message in log."""
-        service = PushNotificationService()
-        
-        mock_device = {
-            'id': 'device1',
-            'token': 'fcm_token',
-            'platform': 'android',
-            'app_version': '1.0.0',
-            'last_used_at': datetime.now().isoformat()
-        }
+        mock_devices = [
+            make_device('device1', 'token1', 'android'),
+            make_device('device2', 'token2', 'ios'),
+        ]
         
-        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=[mock_device]), \
-             patch.object(service, '_send_with_retry', new_callable=AsyncMock, side_effect=Exception("Network timeout")), \
-             patch.object(service, '_log_notification', new_callable=AsyncMock) as mock_log:
+        with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=mock_devices), \
+             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=sent_to_all), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock,
+                          return_value=('failed', 'APNs status 403', False)), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log:
             
             await service.send_notification(
                 user_id='user123',
@@ -784,46 +661,27 @@ class TestDeliveryStatusTracking:
                 body='Message'
             )
             
-            # Verify error message was logged
             mock_log.assert_called_once()
-            log_call = mock_log.call_args
-            assert log_call[1]['status'] == 'failed'
-            assert 'Network timeout' in log_call[1]['error_message']
+            rows = {row['device_token_id']: row for row in mock_log.call_args[0][0]}
+            assert rows['device1']['status'] == 'sent'
+            assert rows['device2']['status'] == 'failed'
+            assert rows['device2']['error_message'] == 'APNs status 403'
     
     async def test_send_notification_returns_delivery_summary(self):
         """Test that send_notification returns comprehensive delivery summary."""
         service = PushNotificationService()
         
         mock_devices = [
-            {
-                'id': 'device1',
-                'token': 'token1',
-                'platform': 'android',
-                'app_version': '1.0.0',
-                'last_used_at': datetime.now().isoformat()
-            },
-            {
-                'id': 'device2',
-                'token': 'token2',
-                'platform': 'ios',
-                'app_version': '1.0.0',
-                'last_used_at': datetime.now().isoformat()
-            },
-            {
-                'id': 'device3',
-                'token': 'token3',
-                'platform': 'android',
-                'app_version': '1.0.0',
-                'last_used_at': datetime.now().isoformat()
-            }
+            make_device('device1', 'token1', 'android'),
+            make_device('device2', 'token2', 'ios'),
+            make_device('device3', 'token3', 'android'),
         ]
         
         with patch.object(service, 'get_user_devices', new_callable=AsyncMock, return_value=mock_devices), \
-             patch.object(service, '_send_with_retry', new_callable=AsyncMock) as mock_send, \
-             patch.object(service, '_log_notification', new_callable=AsyncMock):
-            
-            # First succeeds, second fails, third succeeds
-            mock_send.side_effect = [True, False, True]
+             patch.object(service, '_send_to_fcm', new_callable=AsyncMock, side_effect=sent_to_all), \
+             patch.object(service, '_send_to_apns', new_callable=AsyncMock,
+                          return_value=('failed', 'APNs status 403', False)), \
+             patch.object(service, '_log_notifications', new_callable=AsyncMock):
             
             result = await service.send_notification(
                 user_id='user123',
@@ -838,7 +696,116 @@ class TestDeliveryStatusTracking:
             assert result['failed'] == 1
             assert len(result['results']) == 3
             
-            # Verify individual results
+            # Results keep device order
             assert result['results'][0]['status'] == 'sent'
             assert result['results'][1]['status'] == 'failed'
             assert result['results'][2]['status'] == 'sent'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Local FCM (legacy multicast) and APNs stand-in.
+    
+    Tokens starting with 'bad' are rejected as invalid, tokens starting
+    with 'flaky' fail transiently; APNs requests take APNS_DELAY seconds.
+    """
+    
+    APNS_DELAY = 0.2
+    requests = []
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _reply(self, status_code, body=None):
+        data = json.dumps(body or {}).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StandInHandler.requests.append(self.path)
+        if self.path == '/fcm/send':
+            results = []
+            for token in body['registration_ids']:
+                if token.startswith('bad'):
+                    results.append({'error': 'NotRegistered'})
+                elif token.startswith('flaky'):
+                    results.append({'error': 'Unavailable'})
+                else:
+                    results.append({'message_id': f'msg-{token}'})
+            success = sum(1 for result in results if 'message_id' in result)
+            self._reply(200, {'success': success, 'failure': len(results) - success, 'results': results})
+        elif self.path.startswith('/3/device/'):
+            time.sleep(self.APNS_DELAY)
+            token = self.path.rsplit('/', 1)[-1]
+            if token.startswith('bad'):
+                self._reply(410, {'reason': 'Unregistered'})
+            elif token.startswith('flaky'):
+                self._reply(503, {'reason': 'ServiceUnavailable'})
+            else:
+                self._reply(200)
+        else:
+            self._reply(404)
+
+
+@pytest.fixture
+def stand_in_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StandInHandler.requests = []
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestDeliveryAgainstStandIn:
+    """End-to-end delivery against a local FCM/APNs stand-in server."""
+    
+    async def test_concurrent_batched_delivery(self, stand_in_url):
+        """Test one pass over mixed devices: multicast, concurrency, invalid and retried tokens."""
+        async with httpx.AsyncClient() as client:
+            service = PushNotificationService(http_client=client)
+            service.fcm_url = f'{stand_in_url}/fcm/send'
+            service.apns_url = stand_in_url
+            service.fcm_server_key = 'test_key'
+            service.apns_key_id = 'key123'
+            service.apns_team_id = 'team123'
+            service.apns_bundle_id = 'com.example.app'
+            
+            targets = [PushTarget(f'android{i}', f'fcm{i}', 'android', 'user123') for i in range(6)]
+            targets += [PushTarget(f'ios{i}', f'apns{i}', 'ios', 'user123') for i in range(8)]
+            targets += [
+                PushTarget('android-bad', 'bad-fcm', 'android', 'user123'),
+                PushTarget('ios-bad', 'bad-apns', 'ios', 'user123'),
+                PushTarget('ios-flaky', 'flaky-apns', 'ios', 'user123'),
+            ]
+            
+            with patch.object(service, '_deactivate_tokens', new_callable=AsyncMock) as mock_deactivate, \
+                 patch.object(service, '_log_notifications', new_callable=AsyncMock) as mock_log, \
+                 patch('apps.notifications.tasks.retry_push_delivery.apply_async') as mock_retry:
+                
+                started = time.monotonic()
+                results = await service.deliver(targets, {'title': 'Test', 'body': 'Message'})
+                elapsed = time.monotonic() - started
+        
+        statuses = {result.target.device_id: result.status for result in results}
+        assert [statuses[f'android{i}'] for i in range(6)] == ['sent'] * 6
+        assert [statuses[f'ios{i}'] for i in range(8)] == ['sent'] * 8
+        assert statuses['android-bad'] == statuses['ios-bad'] == 'invalid_token'
+        assert statuses['ios-flaky'] == 'failed'
+        
+        # All 7 Android tokens in one multicast request
+        assert StandInHandler.requests.count('/fcm/send') == 1
+        # 10 APNs requests of 0.2s each ran concurrently
+        assert elapsed < 10 * StandInHandler.APNS_DELAY / 2
+        
+        mock_deactivate.assert_called_once()
+        assert sorted(mock_deactivate.call_args[0][0]) == ['bad-apns', 'bad-fcm']
+        assert mock_retry.call_args[1]['args'][0] == ['ios-flaky']
+        assert len(mock_log.call_args[0][0]) == len(targets) - 1
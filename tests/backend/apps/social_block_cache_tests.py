@@ -0,0 +1,140 @@
+"""Tests for the cached per-user blocked set."""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from apps.social import block_cache, utils
+from apps.social.block_cache import BlockedUserCache
+
+
+class FakeSetClient:
+    """In-memory stand-in for the Valkey set commands used by BlockedUserCache."""
+
+    def __init__(self):
+        self.sets = {}
+        self.expiries = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def expire(self, key, seconds):
+        self.expiries[key] = seconds
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def cache():
+    cache = BlockedUserCache(ttl=60)
+    cache._client = FakeSetClient()
+    with patch.object(block_cache, '_blocked_user_cache', cache):
+        yield cache
+
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    db.connect = AsyncMock()
+    db.disconnect = AsyncMock()
+    db.block.find_many = AsyncMock(return_value=[
+        SimpleNamespace(blocked_id='user-2'),
+        SimpleNamespace(blocked_id='user-3'),
+    ])
+    with patch.object(utils, 'get_prisma', return_value=db):
+        yield db
+
+
+class TestBlockedUserCache:
+    def test_miss_then_hit(self, cache):
+        assert cache.get('user-1') is None
+
+        cache.set('user-1', ['user-2'])
+
+        assert cache.get('user-1') == frozenset({'user-2'})
+        assert cache._client.expiries['social:blocked:user-1'] == 60
+
+    def test_empty_set_is_cached(self, cache):
+        cache.set('user-1', [])
+
+        assert cache.get('user-1') == frozenset()
+
+    def test_invalidate(self, cache):
+        cache.set('user-1', ['user-2'])
+
+        cache.invalidate('user-1')
+
+        assert cache.get('user-1') is None
+
+    def test_valkey_outage_is_a_miss(self):
+        cache = BlockedUserCache()
+        cache._client = MagicMock(smembers=MagicMock(side_effect=ConnectionError('down')))
+
+        assert cache.get('user-1') is None
+
+
+class TestGetBlockedUserIds:
+    @pytest.mark.asyncio
+    async def test_database_read_once(self, cache, db):
+        first = await utils.get_blocked_user_ids('user-1')
+        second = await utils.get_blocked_user_ids('user-1')
+
+        assert first == second == frozenset({'user-2', 'user-3'})
+        db.block.find_many.assert_awaited_once()
+
+    def test_sync_hit_skips_event_loop(self, cache):
+        cache.set('user-1', ['user-2'])
+
+        with patch.object(utils, 'run_async') as run_async:
+            assert utils.sync_get_blocked_user_ids('user-1') == frozenset({'user-2'})
+
+        run_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_database_error_is_not_cached(self, cache, db):
+        db.block.find_many = AsyncMock(side_effect=RuntimeError('db down'))
+
+        assert await utils.get_blocked_user_ids('user-1') == frozenset()
+        assert cache.get('user-1') is None
+
+    @pytest.mark.asyncio
+    async def test_block_and_unblock_invalidate(self, cache, db):
+        from apps.social import views
+
+        cache.set('user-1', [])
+        db.userprofile.find_unique = AsyncMock(return_value=SimpleNamespace(id='user-2'))
+        db.block.find_first = AsyncMock(return_value=None)
+        db.query_raw = AsyncMock(return_value=[])
+        db.block.create = AsyncMock(return_value=SimpleNamespace(id='block-1'))
+
+        with patch.object(views, 'get_prisma', return_value=db):
+            await views.block_user('user-1', 'user-2')
+            assert cache.get('user-1') is None
+
+            cache.set('user-1', ['user-2'])
+            db.block.find_first = AsyncMock(return_value=SimpleNamespace(id='block-1'))
+            db.block.delete = AsyncMock()
+            await views.unblock_user('user-1', 'user-2')
+
+        assert cache.get('user-1') is None
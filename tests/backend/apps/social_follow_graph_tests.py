@@ -0,0 +1,281 @@
+"""
+Tests for the follow graph.
+
+Valkey is replaced with an in-memory sorted-set store and the Follow table
+with a list-backed fake that understands the filters FollowGraph uses, so
+cached and database paging can be compared directly.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import NoScriptError
+
+from apps.social.follow_graph import (
+    FOLLOWERS,
+    FOLLOWING,
+    FOLLOW_SQL,
+    FollowGraph,
+    FollowGraphCache,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+class FakeZSetClient:
+    """In-memory stand-in for the Valkey sorted-set commands used by FollowGraphCache."""
+
+    def __init__(self):
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, key):
+        return int(key in self.zsets)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.zsets.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrange(self, key, start, end):
+        return sorted(self.zsets.get(key, {}), key=lambda m: (self.zsets[key][m], m))
+
+    def zmscore(self, key, members):
+        return [self.zsets.get(key, {}).get(member) for member in members]
+
+    def zrevrangebyscore(self, key, max, min, start=None, num=None, withscores=False):
+        def bound(value, default):
+            if value in ('+inf', '-inf'):
+                return float(value), False
+            value = str(value)
+            if value.startswith('('):
+                return float(value[1:]), True
+            return float(value), False
+
+        hi, hi_open = bound(max, None)
+        lo, lo_open = bound(min, None)
+        rows = [
+            (member, score) for member, score in self.zsets.get(key, {}).items()
+            if (score < hi or (not hi_open and score == hi)) and (score > lo or (not lo_open and score == lo))
+        ]
+        rows.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        if start is not None:
+            rows = rows[start:start + num]
+        return [(member, float(score)) for member, score in rows]
+
+    def evalsha(self, sha, numkeys, *args):
+        raise NoScriptError('no script')
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        for i, key in enumerate(keys):
+            if key in self.zsets:
+                self.zsets[key][argv[i + 1]] = int(argv[0])
+        return 1
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeFollowTable:
+    """List-backed Follow table supporting the find_many filters FollowGraph uses."""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.calls = 0
+
+    @staticmethod
+    def _matches(edge, where):
+        for field, condition in where.items():
+            if field == 'OR':
+                if not any(FakeFollowTable._matches(edge, option) for option in condition):
+                    return False
+                continue
+            value = getattr(edge, field)
+            if isinstance(condition, dict):
+                if 'lt' in condition and not value < condition['lt']:
+                    return False
+                if 'in' in condition and value not in condition['in']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def find_many(self, where, order=None, take=None):
+        self.calls += 1
+        rows = [edge for edge in self.edges if self._matches(edge, where)]
+        if order:
+            for clause in reversed(order):
+                (field, direction), = clause.items()
+                rows.sort(key=lambda edge: getattr(edge, field), reverse=direction == 'desc')
+        return rows[:take] if take is not None else rows
+
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_edges(owner, count, direction=FOLLOWERS, tie_every=3):
+    """Edges into (followers) or out of (following) owner, with timestamp ties."""
+    edges = []
+    for i in range(count):
+        created_at = BASE + timedelta(milliseconds=(i // tie_every) * 1000)
+        other = f'user-{i:03d}'
+        follower, following = (other, owner) if direction == FOLLOWERS else (owner, other)
+        edges.append(SimpleNamespace(follower_id=follower, following_id=following, created_at=created_at))
+    return edges
+
+
+@pytest.fixture
+def cache():
+    cache = FollowGraphCache(ttl=60)
+    cache._client = FakeZSetClient()
+    return cache
+
+
+def make_db(edges):
+    db = MagicMock()
+    db.follow = FakeFollowTable(edges)
+    db.query_raw = AsyncMock()
+    return db
+
+
+async def read_all(graph, direction, owner, count, page_size):
+    ids, cursor = [], None
+    while True:
+        page, cursor = await graph.page(direction, owner, count, cursor, page_size)
+        ids.extend(page)
+        if cursor is None:
+            return ids
+
+
+class TestCursor:
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor(1700000000000, 'user-1')) == (1700000000000, 'user-1')
+
+    def test_malformed_cursor_starts_over(self):
+        assert decode_cursor('not-a-cursor') is None
+
+
+class TestPaging:
+    @pytest.mark.asyncio
+    async def test_cached_list_is_loaded_once(self, cache):
+        db = make_db(make_edges('author', 25))
+        graph = FollowGraph(db, cache=cache, max_cached=100)
+
+        ids = await read_all(graph, FOLLOWERS, 'author', 25, page_size=4)
+
+        assert len(ids) == len(set(ids)) == 25
+        assert db.follow.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_and_database_pages_agree(self, cache):
+        edges = make_edges('author', 25)
+        cached = FollowGraph(make_db(edges), cache=cache, max_cached=100)
+        uncached = FollowGraph(make_db(edges), cache=cache, max_cached=10)
+
+        from_cache = await read_all(cached, FOLLOWERS, 'author', 25, page_size=4)
+        from_db = await read_all(uncached, FOLLOWERS, 'author', 25, page_size=4)
+
+        assert from_cache == from_db
+        assert from_cache[0] == 'user-024'
+
+    @pytest.mark.asyncio
+    async def test_empty_list_is_cached(self, cache):
+        db = make_db([])
+        graph = FollowGraph(db, cache=cache)
+
+        assert await graph.page(FOLLOWING, 'loner', 0) == ([], None)
+        assert await graph.page(FOLLOWING, 'loner', 0) == ([], None)
+        assert db.follow.calls == 1
+
+
+class TestWrites:
+    @pytest.mark.asyncio
+    async def test_follow_is_one_statement_and_updates_cached_lists(self, cache):
+        db = make_db(make_edges('author', 2))
+        graph = FollowGraph(db, cache=cache)
+        await graph.page(FOLLOWERS, 'author', 2)
+        db.query_raw = AsyncMock(return_value=[{'inserted': 1}])
+
+        follow = await graph.follow('fan', 'author')
+
+        assert follow['follower_id'] == 'fan'
+        db.query_raw.assert_awaited_once()
+        assert db.query_raw.await_args.args[0] == FOLLOW_SQL
+        ids, _ = await graph.page(FOLLOWERS, 'author', 3)
+        assert ids[0] == 'fan'
+        # The fan's own following list was never cached, so it is not created partially
+        assert not cache.client.exists('social:following:fan')
+
+    @pytest.mark.asyncio
+    async def test_duplicate_follow(self, cache):
+        db = make_db([])
+        db.query_raw = AsyncMock(return_value=[{'inserted': 0}])
+
+        assert await FollowGraph(db, cache=cache).follow('fan', 'author') is None
+
+    @pytest.mark.asyncio
+    async def test_unfollow_removes_from_cached_lists(self, cache):
+        db = make_db(make_edges('author', 3))
+        graph = FollowGraph(db, cache=cache)
+        await graph.page(FOLLOWERS, 'author', 3)
+        db.query_raw = AsyncMock(return_value=[{'follower_id': 'user-001', 'following_id': 'author'}])
+
+        assert await graph.unfollow('user-001', 'author') is True
+
+        ids, _ = await graph.page(FOLLOWERS, 'author', 2)
+        assert 'user-001' not in ids
+
+
+class TestIsFollowingMany:
+    @pytest.mark.asyncio
+    async def test_uses_cached_following_list(self, cache):
+        db = make_db(make_edges('viewer', 5, direction=FOLLOWING))
+        graph = FollowGraph(db, cache=cache)
+        await graph.following_ids('viewer')
+        calls = db.follow.calls
+
+        followed = await graph.is_following_many('viewer', ['user-001', 'user-004', 'stranger'])
+
+        assert followed == {'user-001', 'user-004'}
+        assert db.follow.calls == calls
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_one_query(self, cache):
+        db = make_db(make_edges('viewer', 5, direction=FOLLOWING))
+
+        followed = await FollowGraph(db, cache=cache).is_following_many('viewer', ['user-002', 'stranger'])
+
+        assert followed == {'user-002'}
+        assert db.follow.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_anonymous_viewer(self, cache):
+        db = make_db([])
+
+        assert await FollowGraph(db, cache=cache).is_following_many(None, ['user-1']) == set()
+        assert db.follow.calls == 0
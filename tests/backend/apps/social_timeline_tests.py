@@ -0,0 +1,255 @@
+"""
+Tests for the home timeline.
+
+Valkey is replaced with an in-memory sorted-set store; the follow graph,
+fan-out-on-read author set and database reads are stubbed so fan-out and
+the merged read path can be checked in isolation.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import NoScriptError
+
+from apps.social.timeline import (
+    CHAPTER,
+    WHISPER,
+    HomeTimeline,
+    TimelineCache,
+    TimelineEntry,
+)
+from infrastructure.content_filter_utils import FeedVisibility
+
+
+class FakeZSetClient:
+    """In-memory stand-in for the Valkey sorted-set commands used by TimelineCache."""
+
+    def __init__(self):
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, key):
+        return int(key in self.zsets)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.zsets.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrevrangebyscore(self, key, max, min, start=None, num=None, withscores=False):
+        def bound(value):
+            if value in ('+inf', '-inf'):
+                return float(value), False
+            value = str(value)
+            if value.startswith('('):
+                return float(value[1:]), True
+            return float(value), False
+
+        hi, hi_open = bound(max)
+        lo, lo_open = bound(min)
+        rows = [
+            (member, score) for member, score in self.zsets.get(key, {}).items()
+            if (score < hi or (not hi_open and score == hi)) and (score > lo or (not lo_open and score == lo))
+        ]
+        rows.sort(key=lambda row: (row[1], row[0]), reverse=True)
+        if start is not None:
+            rows = rows[start:start + num]
+        return [(member, float(score)) for member, score in rows]
+
+    def evalsha(self, sha, numkeys, *args):
+        raise NoScriptError('no script')
+
+    def eval(self, script, numkeys, *args):
+        keys, (millis, member, cap) = args[:numkeys], args[numkeys:]
+        for key in keys:
+            if key in self.zsets:
+                zset = self.zsets[key]
+                zset[member] = int(millis)
+                # Trim the oldest entries, never the score 0 marker
+                for old in sorted(zset, key=lambda m: (zset[m], m))[1:][:max(len(zset) - 1 - cap, 0)]:
+                    del zset[old]
+        return 1
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def cache():
+    cache = TimelineCache(ttl=60, max_length=5)
+    cache._client = FakeZSetClient()
+    return cache
+
+
+def entry(n, author='author', content_type=CHAPTER):
+    return TimelineEntry(content_type, f'{content_type}-{n:03d}', author, 1700000000000 + n * 1000)
+
+
+def patch_graph(followers=(), following=()):
+    graph = MagicMock()
+
+    async def follower_batches(user_id, batch_size):
+        followers_list = list(followers)
+        for start in range(0, len(followers_list), batch_size):
+            yield followers_list[start:start + batch_size]
+
+    graph.follower_batches = follower_batches
+    graph.following_ids = AsyncMock(return_value=set(following))
+    return patch('apps.social.timeline.FollowGraph', return_value=graph)
+
+
+def patch_fanout_on_read(author_ids=()):
+    return patch(
+        'apps.social.timeline.get_fanout_on_read_author_ids',
+        AsyncMock(return_value=frozenset(author_ids))
+    )
+
+
+class TestTimelineCache:
+    def test_add_only_updates_cached_timelines_and_trims(self, cache):
+        key = cache.timeline_key('reader')
+        cache.store(key, [])
+
+        for n in range(8):
+            cache.add([key, cache.timeline_key('absent')], entry(n))
+
+        page, = cache.page_many([key], None, 10)
+        assert [e.content_id for e in page] == [f'chapter-{n:03d}' for n in range(7, 2, -1)]
+        assert not cache.client.exists(cache.timeline_key('absent'))
+
+    def test_cursor_continues_within_timestamp_ties(self, cache):
+        key = cache.timeline_key('reader')
+        tied = [TimelineEntry(CHAPTER, f'c{n}', 'author', 1700000000000) for n in range(4)]
+        cache.store(key, tied)
+
+        first, = cache.page_many([key], None, 2)
+        last = first[-1]
+        rest, = cache.page_many([key], (last.millis, last.member), 10)
+
+        assert [e.content_id for e in first + rest] == ['c3', 'c2', 'c1', 'c0']
+
+    def test_missing_key_is_none(self, cache):
+        assert cache.page_many([cache.timeline_key('nobody')], None, 5) == [None]
+
+
+class TestFanOut:
+    @pytest.mark.asyncio
+    async def test_fans_out_to_cached_follower_timelines(self, cache):
+        db = MagicMock()
+        db.userprofile.find_unique = AsyncMock(return_value=SimpleNamespace(follower_count=3))
+        for user_id in ('fan-1', 'fan-2'):
+            cache.store(cache.timeline_key(user_id), [])
+        cache.store(cache.outbox_key('author'), [])
+
+        with patch_graph(followers=['fan-1', 'fan-2', 'fan-3']):
+            fanned_out = await HomeTimeline(db, cache=cache).fan_out(entry(1))
+
+        assert fanned_out == 3
+        for key in (cache.timeline_key('fan-1'), cache.timeline_key('fan-2'), cache.outbox_key('author')):
+            page, = cache.page_many([key], None, 5)
+            assert [e.content_id for e in page] == ['chapter-001']
+        assert not cache.client.exists(cache.timeline_key('fan-3'))
+
+    @pytest.mark.asyncio
+    async def test_large_author_only_writes_outbox(self, cache):
+        db = MagicMock()
+        db.userprofile.find_unique = AsyncMock(return_value=SimpleNamespace(follower_count=50000))
+        cache.store(cache.timeline_key('fan-1'), [])
+        cache.store(cache.outbox_key('author'), [])
+
+        with patch_graph(followers=['fan-1']):
+            timeline = HomeTimeline(db, cache=cache)
+            timeline.max_followers = 10
+            fanned_out = await timeline.fan_out(entry(1))
+
+        assert fanned_out == 0
+        assert cache.page_many([cache.timeline_key('fan-1')], None, 5) == [[]]
+        page, = cache.page_many([cache.outbox_key('author')], None, 5)
+        assert [e.content_id for e in page] == ['chapter-001']
+
+
+class TestPage:
+    @pytest.mark.asyncio
+    async def test_merges_outboxes_of_fanout_on_read_authors(self, cache):
+        cache.store(cache.timeline_key('reader'), [entry(1, 'small'), entry(3, 'small', WHISPER)])
+        cache.store(cache.outbox_key('big'), [entry(2, 'big'), entry(4, 'big')])
+        timeline = HomeTimeline(MagicMock(), cache=cache)
+        timeline._hydrate = AsyncMock(side_effect=lambda entries: entries)
+
+        with patch_graph(following=['small', 'big']), patch_fanout_on_read(['big']):
+            visibility = FeedVisibility(frozenset(), frozenset(), 'reader')
+            first, cursor = await timeline.page('reader', None, 3, visibility)
+            rest, end = await timeline.page('reader', cursor, 3, visibility)
+
+        assert [e.content_id for e in first] == ['chapter-004', 'whisper-003', 'chapter-002']
+        assert [e.content_id for e in rest] == ['chapter-001']
+        assert end is None
+
+    @pytest.mark.asyncio
+    async def test_hidden_authors_are_dropped(self, cache):
+        cache.store(cache.timeline_key('reader'), [entry(1, 'friend'), entry(2, 'blocked')])
+        timeline = HomeTimeline(MagicMock(), cache=cache)
+        timeline._hydrate = AsyncMock(side_effect=lambda entries: entries)
+
+        with patch_graph(following=['friend', 'blocked']), patch_fanout_on_read():
+            visibility = FeedVisibility(frozenset({'blocked'}), frozenset(), 'reader')
+            items, cursor = await timeline.page('reader', None, 5, visibility)
+
+        assert [e.author_id for e in items] == ['friend']
+        assert cursor is None
+
+    @pytest.mark.asyncio
+    async def test_missing_timeline_is_built_from_database(self, cache):
+        timeline = HomeTimeline(MagicMock(), cache=cache)
+        timeline._recent_entries = AsyncMock(return_value=[entry(1, 'friend'), entry(2, 'friend')])
+        timeline._hydrate = AsyncMock(side_effect=lambda entries: entries)
+
+        with patch_graph(following=['friend']), patch_fanout_on_read():
+            visibility = FeedVisibility(frozenset(), frozenset(), 'reader')
+            items, _ = await timeline.page('reader', None, 5, visibility)
+            await timeline.page('reader', None, 5, visibility)
+
+        assert [e.content_id for e in items] == ['chapter-002', 'chapter-001']
+        timeline._recent_entries.assert_awaited_once_with({'friend'})
+
+    @pytest.mark.asyncio
+    async def test_rebuild_only_reads_chapters_of_published_stories(self):
+        db = MagicMock()
+        db.chapter.find_many = AsyncMock(return_value=[])
+        db.whisper.find_many = AsyncMock(return_value=[])
+
+        await HomeTimeline(db, cache=TimelineCache())._recent_entries({'friend'})
+
+        story_filter = db.chapter.find_many.await_args.kwargs['where']['story']['is']
+        assert story_filter == {'author_id': {'in': ['friend']}, 'published': True, 'deleted_at': None}
+
+    @pytest.mark.asyncio
+    async def test_chapters_of_unpublished_stories_are_skipped(self, cache):
+        def chapter(chapter_id, published):
+            return SimpleNamespace(id=chapter_id, story=SimpleNamespace(published=published, deleted_at=None))
+
+        db = MagicMock()
+        db.chapter.find_many = AsyncMock(return_value=[chapter('chapter-001', True), chapter('chapter-002', False)])
+
+        items = await HomeTimeline(db, cache=cache)._hydrate([entry(1, 'friend'), entry(2, 'friend')])
+
+        assert [item['item'].id for item in items] == ['chapter-001']
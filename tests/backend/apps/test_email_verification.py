@@ -13,7 +13,7 @@ class TestEmailVerificationService:
     """Test cases for EmailVerificationService."""
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     @patch('apps.users.email_verification.service.resend.Emails.send')
     async def test_create_verification_success(self, mock_send, mock_prisma_class):
         """Test successful verification creation and email sending."""
@@ -45,7 +45,7 @@ class TestEmailVerificationService:
         assert token in call_args['html']
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_verify_token_success(self, mock_prisma_class):
         """Test successful token verification."""
         # Setup mocks
@@ -70,7 +70,7 @@ class TestEmailVerificationService:
         mock_db.emailverification.update.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_verify_token_expired(self, mock_prisma_class):
         """Test verification with expired token."""
         # Setup mocks
@@ -93,7 +93,7 @@ class TestEmailVerificationService:
         assert user_id is None
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_verify_token_not_found(self, mock_prisma_class):
         """Test verification with non-existent token."""
         # Setup mocks
@@ -109,7 +109,7 @@ class TestEmailVerificationService:
         assert user_id is None
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_is_email_verified_true(self, mock_prisma_class):
         """Test checking verification status for verified user."""
         # Setup mocks
@@ -129,7 +129,7 @@ class TestEmailVerificationService:
         assert is_verified is True
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_is_email_verified_false(self, mock_prisma_class):
         """Test checking verification status for unverified user."""
         # Setup mocks
@@ -145,7 +145,7 @@ class TestEmailVerificationService:
         assert is_verified is False
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     @patch('apps.users.email_verification.service.resend.Emails.send')
     async def test_resend_verification_success(self, mock_send, mock_prisma_class):
         """Test resending verification email."""
@@ -173,7 +173,7 @@ class TestEmailVerificationService:
         mock_send.assert_called_once()
     
     @pytest.mark.asyncio
-    @patch('apps.users.email_verification.service.Prisma')
+    @patch('apps.users.email_verification.service.get_prisma')
     async def test_resend_verification_already_verified(self, mock_prisma_class):
         """Test resending verification when already verified."""
         # Setup mocks
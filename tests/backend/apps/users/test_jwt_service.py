@@ -601,6 +601,78 @@ class TestTokenVerification(TestCase):
         
         assert "audience" in str(exc_info.value).lower()
 
+    @patch('apps.users.jwt_service.requests.get')
+    def test_verified_token_is_cached_until_cleared(self, mock_get):
+        """Test repeat verification of a valid token skips signature checks"""
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.backends import default_backend
+        import time
+
+        # Generate RSA key pair
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=2048,
+            backend=default_backend()
+        )
+        public_numbers = private_key.public_key().public_numbers()
+
+        import base64
+        def int_to_base64(num):
+            num_bytes = num.to_bytes((num.bit_length() + 7) // 8, byteorder='big')
+            return base64.urlsafe_b64encode(num_bytes).decode('utf-8').rstrip('=')
+
+        jwk = {
+            'kid': 'test-key-id',
+            'kty': 'RSA',
+            'use': 'sig',
+            'alg': 'RS256',
+            'n': int_to_base64(public_numbers.n),
+            'e': int_to_base64(public_numbers.e)
+        }
+
+        # Mock JWKS response
+        mock_response = Mock()
+        mock_response.json.return_value = {'keys': [jwk]}
+        mock_response.raise_for_status = Mock()
+        mock_get.return_value = mock_response
+
+        from django.conf import settings
+        payload = {
+            'sub': 'user_123',
+            'exp': int(time.time()) + 3600,
+            'iat': int(time.time()),
+            'aud': settings.CLERK_PUBLISHABLE_KEY
+        }
+
+        private_pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+
+        token = pyjwt.encode(
+            payload,
+            private_pem,
+            algorithm='RS256',
+            headers={'kid': 'test-key-id'}
+        )
+
+        with patch('apps.users.jwt_service.jwt.decode', wraps=pyjwt.decode) as mock_decode:
+            first = JWTVerificationService.verify_token(token)
+            second = JWTVerificationService.verify_token(token)
+            assert mock_decode.call_count == 1
+
+            # Mutating a returned payload must not affect the cache
+            second['sub'] = 'tampered'
+            assert JWTVerificationService.verify_token(token)['sub'] == 'user_123'
+
+            JWTVerificationService.clear_verified_token_cache()
+            JWTVerificationService.verify_token(token)
+            assert mock_decode.call_count == 2
+
+        assert first['sub'] == 'user_123'
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
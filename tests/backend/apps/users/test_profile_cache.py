@@ -0,0 +1,123 @@
+"""
+Unit tests for the authenticated profile cache.
+
+Tests L1/L2 lookups, invalidation and the cached middleware profile
+resolution path.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from django.core.cache import cache
+
+from apps.users.profile_cache import (
+    ProfileCache,
+    get_profile_cache,
+    invalidate_cached_profile,
+    reset_profile_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty profile caches."""
+    cache.clear()
+    reset_profile_cache()
+    yield
+    cache.clear()
+    reset_profile_cache()
+
+
+def make_profile(clerk_user_id='user_abc'):
+    return SimpleNamespace(id='profile-1', clerk_user_id=clerk_user_id, handle='reader')
+
+
+class TestProfileCache:
+    """Test ProfileCache layers."""
+
+    def test_miss_returns_none(self):
+        """Unknown users should miss both layers."""
+        assert ProfileCache().get('user_abc') is None
+
+    def test_set_then_get_from_l1(self):
+        """A cached profile should be served from process memory."""
+        profile_cache = ProfileCache()
+        profile = make_profile()
+
+        profile_cache.set('user_abc', profile)
+
+        assert profile_cache.get('user_abc') is profile
+        assert profile_cache.get_stats()['l1_hits'] == 1
+
+    def test_l2_hit_populates_l1(self):
+        """A profile cached by another worker should be loaded from Valkey."""
+        writer = ProfileCache()
+        reader = ProfileCache()
+
+        writer.set('user_abc', make_profile())
+        profile = reader.get('user_abc')
+
+        assert profile.clerk_user_id == 'user_abc'
+        assert reader.get_stats()['l2_hits'] == 1
+        reader.get('user_abc')
+        assert reader.get_stats()['l1_hits'] == 1
+
+    def test_none_is_not_cached(self):
+        """Failed profile lookups should not be cached."""
+        profile_cache = ProfileCache()
+
+        profile_cache.set('user_abc', None)
+
+        assert profile_cache.get('user_abc') is None
+
+    def test_invalidate_clears_both_layers(self):
+        """Invalidation should drop L1 and L2 entries."""
+        profile_cache = get_profile_cache()
+        profile_cache.set('user_abc', make_profile())
+
+        invalidate_cached_profile('user_abc')
+
+        assert profile_cache.get('user_abc') is None
+        assert ProfileCache().get('user_abc') is None
+
+    def test_l2_errors_are_swallowed(self):
+        """A Valkey outage should degrade to a cache miss."""
+        profile_cache = ProfileCache()
+
+        with patch('apps.users.profile_cache.cache.get', side_effect=ConnectionError('down')):
+            assert profile_cache.get('user_abc') is None
+
+        assert profile_cache.get_stats()['l2_errors'] == 1
+
+
+class TestCachedProfileResolution:
+    """Test get_or_create_profile_sync caching."""
+
+    def test_profile_loaded_once(self):
+        """Repeat authentications should not hit the database."""
+        from apps.users.middleware import get_or_create_profile_sync
+
+        profile = make_profile()
+        with patch(
+            'apps.users.middleware.get_or_create_profile',
+            new=AsyncMock(return_value=profile)
+        ) as mock_lookup:
+            assert get_or_create_profile_sync('user_abc') is profile
+            assert get_or_create_profile_sync('user_abc') is profile
+
+        assert mock_lookup.await_count == 1
+
+    def test_profile_reloaded_after_invalidation(self):
+        """A profile update should force a fresh lookup."""
+        from apps.users.middleware import get_or_create_profile_sync
+
+        with patch(
+            'apps.users.middleware.get_or_create_profile',
+            new=AsyncMock(return_value=make_profile())
+        ) as mock_lookup:
+            get_or_create_profile_sync('user_abc')
+            invalidate_cached_profile('user_abc')
+            get_or_create_profile_sync('user_abc')
+
+        assert mock_lookup.await_count == 2
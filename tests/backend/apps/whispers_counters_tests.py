@@ -0,0 +1,236 @@
+"""
+Tests for whisper like and reply counters.
+
+Valkey is replaced with fakeredis and Prisma with an in-memory Whisper and
+WhisperLike table that each counter statement updates as Postgres would,
+so the counters themselves can be checked through inline updates,
+buffering of hot whispers, bulk flushing and reconciliation.
+"""
+import json
+import pytest
+from types import SimpleNamespace
+
+import redis
+
+from apps.whispers.counters import (
+    DELETE_SQL,
+    FLUSH_SQL,
+    INCREMENT_REPLIES_SQL,
+    LIKE_SQL,
+    LIKES,
+    RECOUNT_SQL,
+    REPLIES,
+    UNLIKE_SQL,
+    WhisperCounterBuffer,
+    WhisperCounters,
+    flush_whisper_counters,
+    reconcile_whisper_counters,
+)
+
+
+class FakeWhisperDb:
+    """Whisper and WhisperLike rows, updated the way each counter statement does."""
+
+    def __init__(self, *whispers):
+        self.whispers = {whisper.id: whisper for whisper in whispers}
+        self.likes = set()
+        self.fail_flush = False
+        self.on_flush = None
+
+    async def query_raw(self, sql, *args):
+        if sql == LIKE_SQL:
+            _, user_id, whisper_id, _, buffered = args
+            if (user_id, whisper_id) in self.likes:
+                return [{'inserted': 0}]
+            self.likes.add((user_id, whisper_id))
+            if not buffered:
+                self.whispers[whisper_id].like_count += 1
+            return [{'inserted': 1}]
+
+        if sql == UNLIKE_SQL:
+            user_id, whisper_id, buffered = args
+            if (user_id, whisper_id) not in self.likes:
+                return [{'deleted': 0}]
+            self.likes.remove((user_id, whisper_id))
+            if not buffered:
+                whisper = self.whispers[whisper_id]
+                whisper.like_count = max(whisper.like_count - 1, 0)
+            return [{'deleted': 1}]
+
+        assert sql == DELETE_SQL
+        whisper_id, deleted_at = args
+        whisper = self.whispers[whisper_id]
+        if whisper.deleted_at:
+            return [{'deleted': 0}]
+        whisper.deleted_at = deleted_at
+        parent = self.whispers.get(whisper.parent_id)
+        if parent:
+            parent.reply_count = max(parent.reply_count - 1, 0)
+        return [{'deleted': 1}]
+
+    async def execute_raw(self, sql, *args):
+        if sql == INCREMENT_REPLIES_SQL:
+            self.whispers[args[0]].reply_count += 1
+            return 1
+
+        if sql == FLUSH_SQL:
+            if self.fail_flush:
+                raise Exception('DB down')
+            if self.on_flush:
+                self.on_flush()
+            rows = [row for row in json.loads(args[0]) if row['id'] in self.whispers]
+            for row in rows:
+                whisper = self.whispers[row['id']]
+                whisper.like_count = max(whisper.like_count + row['likes'], 0)
+                whisper.reply_count = max(whisper.reply_count + row['replies'], 0)
+            return len(rows)
+
+        assert sql == RECOUNT_SQL
+        pending = set(json.loads(args[0]))
+        corrected = 0
+        for whisper in self.whispers.values():
+            likes = sum(1 for _, whisper_id in self.likes if whisper_id == whisper.id)
+            replies = sum(
+                1 for reply in self.whispers.values()
+                if reply.parent_id == whisper.id and not reply.deleted_at
+            )
+            if whisper.id in pending or (whisper.like_count, whisper.reply_count) == (likes, replies):
+                continue
+            whisper.like_count, whisper.reply_count = likes, replies
+            corrected += 1
+        return corrected
+
+
+class BrokenValkey:
+    def hincrby(self, key, field, amount):
+        raise redis.ConnectionError('down')
+
+
+@pytest.fixture
+def buffer(valkey):
+    buffer = WhisperCounterBuffer()
+    buffer._client = valkey
+    return buffer
+
+
+def make_whisper(whisper_id='whisper-1', like_count=0, reply_count=0, parent_id=None):
+    return SimpleNamespace(
+        id=whisper_id, parent_id=parent_id, like_count=like_count,
+        reply_count=reply_count, deleted_at=None
+    )
+
+
+class TestLikes:
+    @pytest.mark.asyncio
+    async def test_likes_and_unlikes_are_counted_once_per_user(self, buffer):
+        whisper = make_whisper()
+        counters = WhisperCounters(FakeWhisperDb(whisper), buffer=buffer)
+
+        like = await counters.like('user-1', whisper)
+        await counters.like('user-2', whisper)
+
+        assert like['whisper_id'] == 'whisper-1'
+        assert await counters.like('user-1', whisper) is None
+        assert whisper.like_count == 2
+        assert await counters.unlike('user-1', whisper) is True
+        assert await counters.unlike('user-1', whisper) is False
+        assert whisper.like_count == 1
+        assert buffer.claim() == {}
+
+    @pytest.mark.asyncio
+    async def test_hot_whisper_likes_are_buffered_until_flushed(self, buffer):
+        whisper = make_whisper(like_count=100)
+        db = FakeWhisperDb(whisper)
+        counters = WhisperCounters(db, buffer=buffer)
+        counters.buffer_threshold = 100
+
+        await counters.like('user-1', whisper)
+        await counters.like('user-2', whisper)
+        await counters.unlike('user-1', whisper)
+
+        assert whisper.like_count == 100
+        assert await flush_whisper_counters(db, buffer=buffer) == 1
+        assert whisper.like_count == 101
+
+
+class TestReplies:
+    @pytest.mark.asyncio
+    async def test_replies_are_counted_and_uncounted_on_delete(self, buffer):
+        parent = make_whisper('parent')
+        replies = [make_whisper(f'reply-{i}', parent_id='parent') for i in range(2)]
+        counters = WhisperCounters(FakeWhisperDb(parent, *replies), buffer=buffer)
+
+        for _ in replies:
+            await counters.count_reply(parent)
+        assert await counters.delete('reply-0') is True
+        assert await counters.delete('reply-0') is False
+
+        assert parent.reply_count == 1
+
+    @pytest.mark.asyncio
+    async def test_hot_whisper_replies_fall_back_to_the_row_without_valkey(self):
+        buffer = WhisperCounterBuffer()
+        buffer._client = BrokenValkey()
+        parent = make_whisper(reply_count=50)
+        counters = WhisperCounters(FakeWhisperDb(parent), buffer=buffer)
+        counters.buffer_threshold = 10
+
+        await counters.count_reply(parent)
+
+        assert parent.reply_count == 51
+
+
+class TestFlush:
+    @pytest.mark.asyncio
+    async def test_deltas_are_merged_per_whisper_and_acked(self, buffer):
+        first, second = make_whisper('whisper-1', 10, 4), make_whisper('whisper-2', 7)
+        for _ in range(3):
+            buffer.record('whisper-1', LIKES, 1)
+        buffer.record('whisper-1', REPLIES, 1)
+        buffer.record('whisper-2', LIKES, 1)
+        buffer.record('whisper-2', LIKES, -1)
+        db = FakeWhisperDb(first, second)
+
+        flushed = await flush_whisper_counters(db, buffer=buffer)
+
+        assert flushed == 1
+        assert (first.like_count, first.reply_count) == (13, 5)
+        assert second.like_count == 7
+        assert buffer.claim() == {}
+        assert await flush_whisper_counters(db, buffer=buffer) == 0
+        assert first.like_count == 13
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, buffer):
+        whisper = make_whisper(like_count=5)
+        buffer.record('whisper-1', LIKES, 2)
+        db = FakeWhisperDb(whisper)
+        db.fail_flush = True
+
+        with pytest.raises(Exception):
+            await flush_whisper_counters(db, buffer=buffer)
+        buffer.record('whisper-1', LIKES, 1)
+
+        db.fail_flush = False
+        await flush_whisper_counters(db, buffer=buffer)
+        assert whisper.like_count == 7
+        # The like recorded during the failed flush goes out next time
+        await flush_whisper_counters(db, buffer=buffer)
+        assert whisper.like_count == 8
+
+    @pytest.mark.asyncio
+    async def test_reconcile_repairs_drift_but_skips_pending_whispers(self, buffer):
+        drifted, hot = make_whisper('whisper-1', like_count=5), make_whisper('whisper-2', like_count=9)
+        reply = make_whisper('reply-1', parent_id='whisper-1')
+        db = FakeWhisperDb(drifted, hot, reply)
+        db.likes = {('user-1', 'whisper-1'), ('user-2', 'whisper-1'), ('user-1', 'whisper-2')}
+        buffer.record('whisper-1', LIKES, 1)
+        # A like on a hot whisper arrives mid-reconciliation
+        db.on_flush = lambda: buffer.record('whisper-2', LIKES, 1)
+
+        corrected = await reconcile_whisper_counters(db, buffer=buffer)
+
+        assert corrected == 1
+        assert (drifted.like_count, drifted.reply_count) == (2, 1)
+        assert hot.like_count == 9
+        assert buffer.whisper_ids() == {'whisper-2'}
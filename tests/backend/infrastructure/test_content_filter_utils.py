@@ -0,0 +1,148 @@
+"""
+Tests for post-fetch feed filtering.
+
+Feeds are simulated by an in-memory list paged the way Prisma pages with
+cursor={'id': ...}, skip=1, so pagination across hidden rows can be checked
+without a database.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from infrastructure import content_filter_utils
+from infrastructure.content_filter_utils import FeedVisibility, fetch_visible_page
+
+
+def make_feed(authors):
+    return [SimpleNamespace(id=f'row-{i}', author_id=author) for i, author in enumerate(authors)]
+
+
+class FakeFeed:
+    def __init__(self, rows):
+        self.rows = rows
+        self.takes = []
+
+    async def fetch(self, after_id, take):
+        self.takes.append(take)
+        start = 0
+        if after_id:
+            start = next(i for i, row in enumerate(self.rows) if row.id == after_id) + 1
+        return self.rows[start:start + take]
+
+
+async def read_all(feed, page_size, visibility):
+    pages, cursor = [], None
+    while True:
+        page, cursor = await fetch_visible_page(
+            feed.fetch, page_size, visibility, lambda row: row.author_id, cursor=cursor
+        )
+        pages.append([row.id for row in page])
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def viewer_sets(monkeypatch):
+    """Stub the cached blocked and shadowban sets and moderator roles."""
+    def viewer_sets(blocked=(), shadowbanned=(), moderators=()):
+        role = AsyncMock(side_effect=lambda user_id: SimpleNamespace(role='MODERATOR') if user_id in moderators else None)
+        monkeypatch.setattr(content_filter_utils, 'get_blocked_user_ids', AsyncMock(return_value=frozenset(blocked)))
+        monkeypatch.setattr(content_filter_utils, 'get_shadowbanned_user_ids', AsyncMock(return_value=frozenset(shadowbanned)))
+        monkeypatch.setattr(content_filter_utils, 'get_user_moderator_role', role)
+        return role
+
+    return viewer_sets
+
+
+class TestFeedVisibility:
+    def test_viewer_sees_own_shadowbanned_content(self):
+        visibility = FeedVisibility({'blocked'}, {'banned', 'viewer'}, viewer_id='viewer')
+
+        assert not visibility.is_visible('blocked')
+        assert not visibility.is_visible('banned')
+        assert visibility.is_visible('viewer')
+        assert visibility.is_visible('someone')
+        assert len(visibility) == 2
+
+    @pytest.mark.asyncio
+    async def test_moderators_see_shadowbanned_content(self, viewer_sets):
+        role = viewer_sets(blocked={'blocked'}, shadowbanned={'banned'}, moderators={'mod'})
+
+        moderator = await FeedVisibility.for_viewer('mod')
+        reader = await FeedVisibility.for_viewer('reader')
+        anonymous = await FeedVisibility.for_viewer(None)
+
+        assert moderator.is_visible('banned')
+        assert not moderator.is_visible('blocked')
+        assert not reader.is_visible('banned')
+        assert not anonymous.is_visible('banned')
+        # Looked up once per viewer, never for anonymous viewers
+        assert [call.args[0] for call in role.await_args_list] == ['mod', 'reader']
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_is_shared_only_by_viewers_hiding_the_same_authors(self, viewer_sets):
+        viewer_sets(shadowbanned={'banned'}, moderators={'mod'})
+
+        anonymous = await FeedVisibility.for_viewer(None)
+        reader = await FeedVisibility.for_viewer('reader')
+        moderator = await FeedVisibility.for_viewer('mod')
+
+        assert reader.fingerprint == anonymous.fingerprint != ''
+        assert moderator.fingerprint == ''
+        assert FeedVisibility({'blocked'}, {'banned'}).fingerprint != anonymous.fingerprint
+        assert FeedVisibility({'a', 'b'}).fingerprint == FeedVisibility({'b', 'a'}).fingerprint
+
+    @pytest.mark.asyncio
+    async def test_role_is_not_looked_up_without_other_shadowbans(self, viewer_sets):
+        role = viewer_sets(shadowbanned={'viewer'})
+
+        visibility = await FeedVisibility.for_viewer('viewer')
+
+        assert len(visibility) == 0
+        role.assert_not_awaited()
+
+
+class TestFetchVisiblePage:
+    @pytest.mark.asyncio
+    async def test_nothing_hidden_reads_one_batch(self):
+        feed = FakeFeed(make_feed(['a'] * 10))
+
+        page, cursor = await fetch_visible_page(feed.fetch, 3, FeedVisibility(), lambda row: row.author_id)
+
+        assert [row.id for row in page] == ['row-0', 'row-1', 'row-2']
+        assert cursor == 'row-2'
+        assert feed.takes == [4]
+
+    @pytest.mark.asyncio
+    async def test_hidden_rows_are_replaced(self):
+        feed = FakeFeed(make_feed(['a', 'x', 'b', 'x', 'c', 'd', 'e']))
+
+        page, cursor = await fetch_visible_page(
+            feed.fetch, 3, FeedVisibility({'x'}), lambda row: row.author_id
+        )
+
+        assert [row.author_id for row in page] == ['a', 'b', 'c']
+        assert cursor == 'row-4'
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_every_visible_row_once(self):
+        authors = ['a', 'x', 'x', 'b', 'y', 'c', 'x', 'x', 'x', 'x', 'x', 'd', 'e', 'y']
+        feed = FakeFeed(make_feed(authors))
+        visibility = FeedVisibility({'x', 'y'})
+
+        pages = await read_all(feed, 2, visibility)
+
+        visible = [row.id for row in feed.rows if visibility.is_visible(row.author_id)]
+        assert [row_id for page in pages for row_id in page] == visible
+
+    @pytest.mark.asyncio
+    async def test_mostly_hidden_feed_returns_short_page_with_cursor(self):
+        feed = FakeFeed(make_feed(['x'] * 50 + ['a']))
+
+        page, cursor = await fetch_visible_page(
+            feed.fetch, 2, FeedVisibility({'x'}), lambda row: row.author_id
+        )
+
+        assert page == []
+        assert cursor is not None
+        assert len(feed.takes) == 3
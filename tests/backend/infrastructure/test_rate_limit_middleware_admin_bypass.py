@@ -5,12 +5,23 @@ This test verifies that users with ModeratorRole bypass rate limiting.
 """
 
 import pytest
+from datetime import datetime, timedelta
 from django.test import RequestFactory
 from django.http import JsonResponse
+from infrastructure.models import RateLimitResult
 from infrastructure.rate_limit_middleware import RateLimitMiddleware
 from unittest.mock import Mock, patch
 
 
+def allowed_result():
+    return RateLimitResult(
+        allowed=True,
+        limit=100,
+        remaining=100,
+        reset_at=datetime.now() + timedelta(seconds=60)
+    )
+
+
 class TestRateLimitMiddlewareAdminBypass:
     """Test admin bypass logic in RateLimitMiddleware"""
     
@@ -112,8 +123,8 @@ class TestRateLimitMiddlewareAdminBypass:
             # Should return False on error (fail closed)
             assert result is False
     
-    def test_admin_bypass_in_allow_request(self, middleware, request_factory):
-        """Test that admin users bypass rate limiting in allow_request call"""
+    def test_admin_bypass_in_check_request(self, middleware, request_factory):
+        """Test that admin users bypass rate limiting in check_request call"""
         request = request_factory.get('/api/test')
         
         # Mock user profile
@@ -124,15 +135,15 @@ class TestRateLimitMiddlewareAdminBypass:
         # Mock admin check to return True
         with patch.object(middleware, '_is_admin_user', return_value=True):
             # Mock rate limiter to verify is_admin is passed correctly
-            with patch.object(middleware.rate_limiter, 'allow_request', return_value=True) as mock_allow:
+            with patch.object(middleware.rate_limiter, 'check_request', return_value=allowed_result()) as mock_check:
                 middleware(request)
                 
-                # Verify allow_request was called with is_admin=True
-                mock_allow.assert_called_once()
-                call_args = mock_allow.call_args
+                # Verify check_request was called with is_admin=True
+                mock_check.assert_called_once()
+                call_args = mock_check.call_args
                 assert call_args[0][1] is True  # Second argument should be is_admin=True
     
-    def test_non_admin_no_bypass_in_allow_request(self, middleware, request_factory):
+    def test_non_admin_no_bypass_in_check_request(self, middleware, request_factory):
         """Test that non-admin users don't bypass rate limiting"""
         request = request_factory.get('/api/test')
         
@@ -144,10 +155,10 @@ class TestRateLimitMiddlewareAdminBypass:
         # Mock admin check to return False
         with patch.object(middleware, '_is_admin_user', return_value=False):
             # Mock rate limiter to verify is_admin is passed correctly
-            with patch.object(middleware.rate_limiter, 'allow_request', return_value=True) as mock_allow:
+            with patch.object(middleware.rate_limiter, 'check_request', return_value=allowed_result()) as mock_check:
                 middleware(request)
                 
-                # Verify allow_request was called with is_admin=False
-                mock_allow.assert_called_once()
-                call_args = mock_allow.call_args
+                # Verify check_request was called with is_admin=False
+                mock_check.assert_called_once()
+                call_args = mock_check.call_args
                 assert call_args[0][1] is False  # Second argument should be is_admin=False
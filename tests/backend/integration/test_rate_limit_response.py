@@ -54,7 +54,7 @@ class TestRateLimitResponseHandling:
             retry_after=60
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result):
             response = middleware.process_request(mock_request)
             
             # Verify 429 status code
@@ -79,7 +79,7 @@ class TestRateLimitResponseHandling:
             retry_after=60
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result):
             response = middleware.process_request(mock_request)
             
             # Verify Retry-After header
@@ -103,7 +103,7 @@ class TestRateLimitResponseHandling:
             reset_at=datetime.now() + timedelta(seconds=60)
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result):
             # Process request (should be allowed)
             request_response = middleware.process_request(mock_request)
             assert request_response is None  # Request allowed
@@ -144,7 +144,7 @@ class TestRateLimitResponseHandling:
             reset_at=reset_time
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result):
             # Process request
             middleware.process_request(mock_request)
             
@@ -182,7 +182,7 @@ class TestRateLimitResponseHandling:
             reset_at=datetime.now() + timedelta(seconds=60)
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result_allowed):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result_allowed):
             # Process request
             request_response = middleware.process_request(mock_request)
             assert request_response is None  # Allowed
@@ -206,7 +206,7 @@ class TestRateLimitResponseHandling:
             retry_after=60
         )
         
-        with patch.object(RateLimitMiddleware._rate_limiter, 'check_user_limit', return_value=mock_result_blocked):
+        with patch.object(RateLimitMiddleware._rate_limiter, 'check_request', return_value=mock_result_blocked):
             # Process request
             request_response = middleware.process_request(mock_request)
             
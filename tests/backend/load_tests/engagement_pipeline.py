@@ -0,0 +1,130 @@
+"""
+Load test for the engagement ingestion pipeline (Valkey stream -> StoryStatsDaily)
+
+Producers emit like/whisper events for existing published stories as fast as
+they can, then the consumer drains the stream. The script reports emit and
+drain throughput and checks that StoryStatsDaily grew by exactly the number
+of events emitted. With --crash-rate, a share of batches fail after their
+upsert has committed but before XACK, to check that redelivered entries are
+not counted twice.
+
+Run from apps/backend against a Valkey and database you can write to:
+    python ../../tests/backend/load_tests/engagement_pipeline.py --events 200000 --producers 16
+
+Options:
+    --events N       Total events to emit (default 100000)
+    --producers N    Producer threads (default 8)
+    --stories N      Published stories to spread events over (default 100)
+    --batch-size N   Entries per consumer batch (default ENGAGEMENT_BATCH_SIZE)
+    --crash-rate F   Share of batches that fail before XACK (default 0)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.discovery import engagement  # noqa: E402
+from infrastructure.prisma_pool import get_prisma  # noqa: E402
+
+
+TOTALS_SQL = """
+    SELECT COALESCE(SUM(likes_count + whispers_count), 0)::int AS total
+    FROM "StoryStatsDaily"
+    WHERE story_id IN (SELECT value FROM json_array_elements_text($1::json))
+"""
+
+
+class CrashingStream(engagement.EngagementStream):
+    """Fails a share of acknowledgements, as if the worker died after committing."""
+
+    def __init__(self, crash_rate):
+        super().__init__()
+        self.crash_rate = crash_rate
+        self.crashes = 0
+
+    def ack(self, stream_ids):
+        if random.random() < self.crash_rate:
+            self.crashes += 1
+            raise ConnectionError('simulated crash before XACK')
+        super().ack(stream_ids)
+
+
+def produce(story_ids, count):
+    stream = engagement.EngagementStream()
+    for _ in range(count):
+        stream.emit(random.choice([engagement.LIKE, engagement.WHISPER]), random.choice(story_ids))
+
+
+async def main(args):
+    db = get_prisma()
+    await db.connect()
+    try:
+        stories = await db.story.find_many(
+            where={'published': True, 'deleted_at': None},
+            take=args.stories
+        )
+        story_ids = [story.id for story in stories]
+        if not story_ids:
+            print('No published stories to count events against')
+            return 1
+
+        stream = CrashingStream(args.crash_rate)
+        # Start from a drained stream so only this run's events are counted
+        await engagement.consume_engagement_events(db, engagement.EngagementStream(), max_batches=10**6)
+        before = (await db.query_raw(TOTALS_SQL, json.dumps(story_ids)))[0]['total']
+
+        per_producer = args.events // args.producers
+        emitted = per_producer * args.producers
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.producers) as pool:
+            for future in [pool.submit(produce, story_ids, per_producer) for _ in range(args.producers)]:
+                future.result()
+        emit_seconds = time.perf_counter() - started
+        print(f'Emitted {emitted} events in {emit_seconds:.2f}s ({emitted / emit_seconds:,.0f}/s)')
+
+        started = time.perf_counter()
+        counted = 0
+        while True:
+            try:
+                drained = await engagement.consume_engagement_events(
+                    db, stream, batch_size=args.batch_size, max_batches=10**6
+                )
+            except ConnectionError:
+                continue
+            counted += drained
+            if not drained:
+                break
+        drain_seconds = time.perf_counter() - started
+        print(f'Counted {counted} events in {drain_seconds:.2f}s ({counted / drain_seconds:,.0f}/s), '
+              f'{stream.crashes} simulated crashes')
+
+        after = (await db.query_raw(TOTALS_SQL, json.dumps(story_ids)))[0]['total']
+        if after - before != emitted:
+            print(f'MISMATCH: StoryStatsDaily grew by {after - before}, expected {emitted}')
+            return 1
+        print('StoryStatsDaily matches the events emitted')
+        return 0
+    finally:
+        await db.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--producers', type=int, default=8)
+    parser.add_argument('--stories', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--crash-rate', type=float, default=0.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,165 @@
+"""
+Benchmark for the L1 LRUCache.
+
+Measures get/set throughput of the sharded, monotonic-clock LRUCache
+against the previous single-lock implementation (datetime expiry and a
+full scan for tag invalidation) at 1, 8 and 32 threads, using a 90/10
+get/set mix over a key space larger than the cache. Run with
+``pytest -m benchmark -s`` to see the table. Timings are reported rather
+than asserted, since they vary too much between machines and runs.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pytest
+
+from infrastructure.cache_manager import LRUCache
+from infrastructure.models import CacheEntry
+
+
+THREAD_COUNTS = [1, 8, 32]
+
+OPERATIONS = 200_000
+KEY_SPACE = 5_000
+CACHE_SIZE = 4_096
+
+
+class LegacyLRUCache:
+    """LRUCache as it was before sharding: one lock, datetime expiry."""
+
+    def __init__(self, max_size=1000, default_ttl=60):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.cache:
+                self.misses += 1
+                return None
+            entry = self.cache[key]
+            age = (datetime.now() - entry.created_at).total_seconds()
+            if age > entry.ttl:
+                del self.cache[key]
+                self.misses += 1
+                return None
+            self.cache.move_to_end(key)
+            entry.access_count += 1
+            self.hits += 1
+            return entry.value
+
+    def set(self, key, value, ttl=None, tags=None):
+        with self.lock:
+            entry = CacheEntry(
+                key=key,
+                value=value,
+                ttl=ttl if ttl is not None else self.default_ttl,
+                tags=tags or [],
+                created_at=datetime.now(),
+                access_count=0
+            )
+            if key in self.cache:
+                self.cache[key] = entry
+                self.cache.move_to_end(key)
+            else:
+                if len(self.cache) >= self.max_size:
+                    self.cache.popitem(last=False)
+                self.cache[key] = entry
+
+    def delete_by_tags(self, tags):
+        with self.lock:
+            tag_set = set(tags)
+            keys = [k for k, e in self.cache.items() if any(t in tag_set for t in e.tags)]
+            for key in keys:
+                del self.cache[key]
+            return len(keys)
+
+
+def make_workload(seed, count):
+    rng = random.Random(seed)
+    keys = [f"story:{i}" for i in range(KEY_SPACE)]
+    return [(rng.random() < 0.9, rng.choice(keys)) for _ in range(count)]
+
+
+def run_threads(cache, threads):
+    """Run OPERATIONS get/set calls split across threads; return ops/second."""
+    per_thread = OPERATIONS // threads
+    workloads = [make_workload(i, per_thread) for i in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(workload):
+        barrier.wait()
+        for is_get, key in workload:
+            if is_get:
+                cache.get(key)
+            else:
+                cache.set(key, {'id': key}, tags=[key.split(':')[0]])
+
+    pool = [threading.Thread(target=worker, args=(w,)) for w in workloads]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+def prefill(cache):
+    for i in range(CACHE_SIZE):
+        cache.set(f"story:{i}", {'id': i}, tags=["story", f"author:{i % 50}"])
+
+
+@pytest.mark.benchmark
+@pytest.mark.performance
+class TestL1CacheBenchmark:
+    """Benchmark legacy vs sharded L1 cache throughput."""
+
+    @pytest.mark.parametrize('threads', THREAD_COUNTS)
+    def test_get_set_throughput(self, threads):
+        """Report legacy vs sharded throughput."""
+        legacy = LegacyLRUCache(max_size=CACHE_SIZE)
+        sharded = LRUCache(max_size=CACHE_SIZE)
+        prefill(legacy)
+        prefill(sharded)
+
+        legacy_ops = run_threads(legacy, threads)
+        sharded_ops = run_threads(sharded, threads)
+
+        print(
+            f"\n{threads:>3} threads: legacy {legacy_ops / 1000:8.1f}k ops/s, "
+            f"sharded {sharded_ops / 1000:8.1f}k ops/s, "
+            f"speedup {sharded_ops / legacy_ops:4.2f}x"
+        )
+
+    def test_tag_invalidation(self):
+        """Tag invalidation should only touch the tagged keys."""
+        # Leave headroom so uneven shard fill evicts nothing before comparing
+        legacy = LegacyLRUCache(max_size=CACHE_SIZE * 2)
+        sharded = LRUCache(max_size=CACHE_SIZE * 2)
+        prefill(legacy)
+        prefill(sharded)
+
+        start = time.perf_counter()
+        legacy_deleted = legacy.delete_by_tags(["author:7"])
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sharded_deleted = sharded.delete_by_tags(["author:7"])
+        sharded_time = time.perf_counter() - start
+
+        print(
+            f"\ntag invalidation of {sharded_deleted} keys in {CACHE_SIZE}: "
+            f"legacy {legacy_time * 1e6:8.1f} us, indexed {sharded_time * 1e6:8.1f} us"
+        )
+
+        assert sharded_deleted == legacy_deleted
+        assert all(sharded.get(f"story:{i}") is None for i in range(7, CACHE_SIZE, 50))
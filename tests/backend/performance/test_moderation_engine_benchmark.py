@@ -0,0 +1,114 @@
+"""
+Benchmark for the single-pass moderation engine.
+
+Runs ContentFilterPipeline keyword checks over 100 KB chapter bodies and
+compares them with the previous filters, which tokenized the text for
+profanity, ran one substring search per spam and hate keyword, and one
+regex search per hate pattern. Run with ``pytest -m benchmark -s`` to see
+the table. Timings are reported rather than asserted, since they vary too
+much between machines and runs; test_same_verdicts checks correctness.
+"""
+
+import random
+import re
+import time
+
+import pytest
+
+from apps.moderation.content_filters import (
+    ContentFilterPipeline,
+    HateSpeechDetector,
+    ProfanityFilter,
+    SpamDetector,
+)
+
+
+CHAPTER_BYTES = 100_000
+CHAPTERS = 20
+
+WORDS = (
+    'the night was quiet and the river ran past the old mill where she had '
+    'studied the maps for hours before the storm broke over the hills and '
+    'everyone in the village waited for news from the capital classic '
+    'assessment damnation scrapbook winner'
+).split()
+
+
+def legacy_keyword_checks(content):
+    """The keyword work the filters did before the shared engine, in one function."""
+    normalized = content.lower()
+
+    profanity = [
+        word for word in re.findall(r'\b\w+\b', normalized)
+        if word in ProfanityFilter.DEFAULT_PROFANITY_LIST
+    ]
+    spam = [kw for kw in SpamDetector.PROMOTIONAL_KEYWORDS if kw in normalized]
+    hate = [kw for kw in HateSpeechDetector.HATE_KEYWORDS if kw in normalized]
+    patterns = [
+        p for p in HateSpeechDetector.HATE_PATTERNS
+        if re.compile(p, re.IGNORECASE).search(content)
+    ]
+    caps = sum(1 for c in content if c.isupper())
+    return profanity, spam, hate, patterns, caps
+
+
+def engine_keyword_checks(pipeline, content):
+    scan = pipeline.engine.scan(content)
+    patterns = {m.lastgroup for m in pipeline.hate_speech_detector.combined_pattern.finditer(content)}
+    caps = sum(1 for c in content if c.isupper())
+    return scan, patterns, caps
+
+
+def make_chapter(seed):
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < CHAPTER_BYTES:
+        word = rng.choice(WORDS)
+        if rng.random() < 0.001:
+            word = rng.choice(['damn', 'sh1t', 'buy now', 'inferior'])
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)
+
+
+@pytest.mark.benchmark
+@pytest.mark.performance
+class TestModerationEngineBenchmark:
+    """Benchmark legacy per-keyword scanning vs the compiled engine."""
+
+    def test_chapter_throughput(self):
+        """Report legacy vs engine keyword scanning throughput."""
+        chapters = [make_chapter(i) for i in range(CHAPTERS)]
+        pipeline = ContentFilterPipeline()
+
+        start = time.perf_counter()
+        for chapter in chapters:
+            legacy_keyword_checks(chapter)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for chapter in chapters:
+            engine_keyword_checks(pipeline, chapter)
+        engine_time = time.perf_counter() - start
+
+        megabytes = CHAPTERS * CHAPTER_BYTES / 1e6
+        print(
+            f"\n{CHAPTERS} x {CHAPTER_BYTES // 1000} KB chapters: "
+            f"legacy {megabytes / legacy_time:6.1f} MB/s, "
+            f"engine {megabytes / engine_time:6.1f} MB/s, "
+            f"speedup {legacy_time / engine_time:4.2f}x"
+        )
+
+    def test_same_verdicts(self):
+        """The engine should flag the same plain-text chapters as before."""
+        pipeline = ContentFilterPipeline()
+
+        for seed in range(5):
+            chapter = make_chapter(seed).replace('sh1t', 'shit')
+            profanity, spam, hate, _, _ = legacy_keyword_checks(chapter)
+            scan = pipeline.engine.scan(chapter)
+
+            assert sorted(scan.terms('profanity')) == sorted(profanity)
+            assert sorted(scan.distinct_terms('spam')) == sorted(spam)
+            assert sorted(scan.distinct_terms('hate_speech')) == sorted(hate)
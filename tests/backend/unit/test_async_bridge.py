@@ -0,0 +1,172 @@
+"""
+Unit tests for the shared sync-to-async bridge.
+
+Tests loop reuse, bounded concurrency, timeouts, error propagation,
+re-entrant calls and stats reporting.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from infrastructure.async_bridge import (
+    AsyncBridge,
+    get_async_bridge_stats,
+    reset_async_bridge,
+)
+
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+@pytest.fixture
+def bridge():
+    """Create a bridge and shut it down after the test."""
+    bridge = AsyncBridge(max_concurrency=2, default_timeout=5.0)
+    yield bridge
+    bridge.shutdown()
+
+
+class TestAsyncBridge:
+    """Test AsyncBridge execution."""
+
+    def test_starts_lazily(self, bridge):
+        """Creating the bridge should not start a loop thread."""
+        assert bridge.get_stats()['running'] is False
+
+    def test_run_returns_result(self, bridge):
+        """run() should return the coroutine's result."""
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        assert bridge.run(add(1, 2)) == 3
+
+    def test_reuses_one_loop(self, bridge):
+        """Every call should run on the same long-lived loop and thread."""
+        async def current():
+            return asyncio.get_running_loop(), threading.current_thread()
+
+        first = bridge.run(current())
+        second = bridge.run(current())
+
+        assert first == second
+        assert first[1] is not threading.current_thread()
+
+    def test_propagates_exceptions(self, bridge):
+        """Exceptions raised by the coroutine should reach the caller."""
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            bridge.run(fail())
+
+        assert bridge.get_stats()['failed'] == 1
+
+    def test_timeout_cancels_coroutine(self, bridge):
+        """A timed-out call should raise and cancel the running task."""
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            bridge.run(slow(), timeout=0.05)
+
+        assert cancelled.wait(1.0)
+        assert bridge.get_stats()['timed_out'] == 1
+
+    def test_concurrency_is_bounded(self, bridge):
+        """No more than max_concurrency coroutines should run at once."""
+        async def work():
+            await asyncio.sleep(0.02)
+
+        futures = [bridge.submit(work()) for _ in range(8)]
+        for future in futures:
+            future.result(timeout=5)
+
+        stats = bridge.get_stats()
+        assert stats['completed'] == 8
+        assert stats['peak_in_flight'] == 2
+        assert stats['in_flight'] == 0
+
+    def test_concurrent_callers_from_threads(self, bridge):
+        """Calls from several request threads should all complete."""
+        results = []
+
+        async def echo(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        def caller(value):
+            results.append(bridge.run(echo(value)))
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == list(range(10))
+
+    def test_copies_caller_context(self, bridge):
+        """Context variables set by the caller should be visible to the coroutine."""
+        async def read():
+            return request_id.get()
+
+        token = request_id.set('req-123')
+        try:
+            assert bridge.run(read()) == 'req-123'
+        finally:
+            request_id.reset(token)
+
+    def test_reentrant_call_does_not_deadlock(self, bridge):
+        """Sync code running on the bridge loop should be able to call run()."""
+        async def inner():
+            return 'inner'
+
+        async def outer():
+            return bridge.run(inner())
+
+        start = time.monotonic()
+        assert bridge.run(outer()) == 'inner'
+        assert time.monotonic() - start < 5
+        assert bridge.get_stats()['reentrant_calls'] == 1
+
+    def test_shutdown_and_restart(self, bridge):
+        """The bridge should start a fresh loop after shutdown."""
+        async def current():
+            return asyncio.get_running_loop()
+
+        first = bridge.run(current())
+        bridge.shutdown()
+        assert first.is_closed()
+
+        second = bridge.run(current())
+        assert second is not first
+
+    def test_reset_after_fork_drops_loop(self, bridge):
+        """A forked child should start its own loop."""
+        async def current():
+            return asyncio.get_running_loop()
+
+        parent_loop = bridge.run(current())
+        bridge._reset_after_fork()
+
+        assert bridge.get_stats()['submitted'] == 0
+        assert bridge.run(current()) is not parent_loop
+        parent_loop.call_soon_threadsafe(parent_loop.stop)
+
+
+def test_bridge_stats_empty_before_first_use():
+    """Monitoring should not create the bridge as a side effect."""
+    reset_async_bridge()
+
+    assert get_async_bridge_stats() == {}
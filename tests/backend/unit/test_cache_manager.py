@@ -17,10 +17,29 @@ from unittest.mock import Mock, patch, MagicMock
 
 import pytest
 
-from infrastructure.cache_manager import LRUCache, CacheManager
+from infrastructure.cache_manager import (
+    CacheManager,
+    CacheStampedeGuard,
+    LRUCache,
+    SingleFlight,
+    decode_payload,
+    dumps_value,
+    encode_payload,
+    get_invalidation_listener,
+    loads_value,
+    reset_invalidation_listeners,
+)
 from infrastructure.models import CacheEntry, CacheStats
 
 
+@pytest.fixture(autouse=True)
+def invalidation_listeners():
+    """Give every test its own process-wide invalidation listener."""
+    reset_invalidation_listeners()
+    yield
+    reset_invalidation_listeners()
+
+
 class TestLRUCache:
     """Test cases for LRU cache implementation."""
     
@@ -172,6 +191,78 @@ class TestLRUCache:
         assert stats.hit_rate == 2/3
         assert stats.size == 2
         assert stats.max_size == 10
+    
+    def test_expiry_uses_monotonic_clock(self):
+        """Test that wall clock changes do not affect expiry."""
+        cache = LRUCache(max_size=10, default_ttl=60)
+        
+        with patch('infrastructure.cache_manager.time.monotonic', return_value=1000.0):
+            cache.set("key1", "value1")
+        
+        with patch('infrastructure.cache_manager.time.monotonic', return_value=1059.0):
+            assert cache.get("key1") == "value1"
+        
+        with patch('infrastructure.cache_manager.time.monotonic', return_value=1060.0):
+            assert cache.get("key1") is None
+    
+    def test_tag_index_follows_overwrites_and_evictions(self):
+        """Test that tag invalidation only removes keys still carrying the tag."""
+        cache = LRUCache(max_size=2, default_ttl=60)
+        
+        cache.set("user:1", "data1", tags=["user"])
+        cache.set("user:1", "data1b", tags=["profile"])  # Overwrite drops the old tag
+        cache.set("user:2", "data2", tags=["user"])
+        cache.set("user:3", "data3", tags=["user"])  # Evicts user:1
+        
+        assert cache.delete_by_tags(["user"]) == 2
+        assert cache.delete_by_tags(["profile"]) == 0
+        assert len(cache) == 0
+    
+    def test_byte_limit_evicts_lru_entries(self):
+        """Test that the byte budget evicts least recently used entries."""
+        value = "x" * 1000
+        cache = LRUCache(max_size=100, default_ttl=60, max_bytes=3500, shards=1)
+        
+        for i in range(5):
+            cache.set(f"key{i}", value)
+        
+        assert len(cache) == 3
+        assert cache.size_bytes <= 3500
+        assert cache.get("key0") is None
+        assert cache.get("key4") == value
+        assert cache.get_stats().evictions == 2
+    
+    def test_value_larger_than_budget_not_cached(self):
+        """Test that a value larger than the byte budget is not cached."""
+        cache = LRUCache(max_size=100, default_ttl=60, max_bytes=500, shards=1)
+        
+        cache.set("small", "x")
+        cache.set("big", "x" * 1000)
+        
+        assert cache.get("big") is None
+        assert cache.get("small") == "x"
+    
+    def test_sharded_cache_concurrent_access(self):
+        """Test that sharded caches keep exact totals under concurrent access."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        cache = LRUCache(max_size=8192, default_ttl=60)
+        assert len(cache._shards) == 16
+        
+        def worker(thread_id):
+            for i in range(500):
+                key = f"t{thread_id}:{i}"
+                cache.set(key, i, tags=[f"thread:{thread_id}"])
+                assert cache.get(key) == i
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(worker, range(8)))
+        
+        stats = cache.get_stats()
+        assert stats.size == 4000
+        assert stats.hits == 4000
+        assert cache.delete_by_tags(["thread:3"]) == 500
+        assert len(cache) == 3500
 
 
 class TestCacheManager:
@@ -235,8 +326,7 @@ class TestCacheManager:
     def test_get_from_l2_populates_l1(self, cache_manager, mock_redis):
         """Test getting value from L2 populates L1."""
         # Mock Redis to return a value
-        mock_redis.get.return_value = json.dumps("value1").encode()
-        mock_redis.ttl.return_value = 60
+        mock_redis.get.return_value = encode_payload("value1", 60)
         
         # Get should check L1 (miss), then L2 (hit)
         result = cache_manager.get("key1")
@@ -244,6 +334,35 @@ class TestCacheManager:
         assert result == "value1"
         # L1 should now have the value
         assert cache_manager.l1_cache.get("key1") == "value1"
+        # The TTL comes from the payload, not a second round trip
+        mock_redis.ttl.assert_not_called()
+    
+    def test_get_reads_legacy_json_values(self, cache_manager, mock_redis):
+        """Test that values written as plain JSON are still readable."""
+        mock_redis.get.return_value = json.dumps({"id": 1}).encode()
+        
+        assert cache_manager.get("key1") == {"id": 1}
+    
+    def test_payload_carries_remaining_ttl(self):
+        """Test that decoded payloads report the remaining TTL."""
+        with patch('infrastructure.cache_manager.time.time', return_value=1000.0):
+            data = encode_payload({"id": 1}, 300)
+        
+        with patch('infrastructure.cache_manager.time.time', return_value=1100.0):
+            assert decode_payload(data, 60) == ({"id": 1}, 200)
+    
+    def test_non_string_keys_serialize_like_json(self):
+        """Test that int keys and oversized ints are cached as json.dumps would."""
+        assert loads_value(dumps_value({1: "a", "b": [2]})) == {"1": "a", "b": [2]}
+        assert loads_value(dumps_value({"big": 2 ** 70})) == {"big": 2 ** 70}
+    
+    def test_set_many_with_int_keys_reaches_l2(self, cache_manager, mock_redis):
+        """Test that values with non-string dict keys are still written to L2."""
+        cache_manager.set_many({"counts": {1: 10, 2: 20}}, ttl=60)
+        
+        pipe = mock_redis.pipeline.return_value
+        data = pipe.set.call_args[0][1]
+        assert decode_payload(data, 60)[0] == {"1": 10, "2": 20}
     
     def test_get_miss_both_layers(self, cache_manager):
         """Test cache miss in both layers."""
@@ -258,9 +377,45 @@ class TestCacheManager:
         # L1 should have the value
         assert cache_manager.l1_cache.get("key1") == "value1"
         
-        # Redis should have been called
-        mock_redis.setex.assert_called_once()
-        mock_redis.sadd.assert_called_once()
+        # Redis should have been called in one pipeline
+        pipe = mock_redis.pipeline.return_value
+        pipe.set.assert_called_once()
+        assert pipe.set.call_args[1] == {'ex': 60}
+        pipe.sadd.assert_called_once_with("cache:tag:tag1", "key1")
+        pipe.execute.assert_called_once()
+        mock_redis.setex.assert_not_called()
+    
+    def test_set_many_single_round_trip(self, cache_manager, mock_redis):
+        """Test that set_many writes every key and tag in one pipeline."""
+        cache_manager.set_many({"key1": 1, "key2": 2, "key3": 3}, ttl=60, tags=["tag1", "tag2"])
+        
+        pipe = mock_redis.pipeline.return_value
+        assert pipe.set.call_count == 3
+        assert pipe.sadd.call_count == 2
+        pipe.sadd.assert_any_call("cache:tag:tag1", "key1", "key2", "key3")
+        pipe.execute.assert_called_once()
+        assert cache_manager.l1_cache.get("key2") == 2
+    
+    def test_get_many_single_mget(self, cache_manager, mock_redis):
+        """Test that get_many fetches all L1 misses with one MGET."""
+        cache_manager.l1_cache.set("key1", "value1")
+        mock_redis.mget.return_value = [encode_payload("value2", 60), None]
+        
+        result = cache_manager.get_many(["key1", "key2", "key3"])
+        
+        assert result == {"key1": "value1", "key2": "value2"}
+        mock_redis.mget.assert_called_once_with(["cache:data:key2", "cache:data:key3"])
+        mock_redis.get.assert_not_called()
+        assert cache_manager.l1_cache.get("key2") == "value2"
+    
+    def test_invalidate_many(self, cache_manager, mock_redis):
+        """Test that invalidate_many deletes every key with one DEL."""
+        cache_manager.set_many({"key1": 1, "key2": 2}, ttl=60)
+        
+        cache_manager.invalidate_many(["key1", "key2"])
+        
+        assert cache_manager.l1_cache.get("key1") is None
+        mock_redis.delete.assert_called_once_with("cache:data:key1", "cache:data:key2")
     
     def test_invalidate_both_layers(self, cache_manager, mock_redis):
         """Test invalidating entry in both layers."""
@@ -283,7 +438,8 @@ class TestCacheManager:
         cache_manager.set("key2", "value2", ttl=60, tags=["tag1"])
         
         # Mock Redis to return keys for the tag
-        mock_redis.smembers.return_value = {b"key1", b"key2"}
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [{b"key1", b"key2"}]
         
         # Invalidate by tag
         cache_manager.invalidate_by_tags(["tag1"])
@@ -293,8 +449,55 @@ class TestCacheManager:
         assert cache_manager.l1_cache.get("key2") is None
         
         # Redis should have been called
-        mock_redis.smembers.assert_called()
-        assert mock_redis.delete.call_count >= 1
+        pipe.smembers.assert_called_once_with("cache:tag:tag1")
+        deleted = set(mock_redis.delete.call_args[0])
+        assert deleted == {"cache:data:key1", "cache:data:key2", "cache:tag:tag1"}
+    
+    def test_invalidation_broadcast_to_other_instances(self, mock_redis):
+        """Test that invalidations reach the L1 of other instances."""
+        with patch('infrastructure.cache_manager.redis.from_url', return_value=mock_redis):
+            local = CacheManager(l1_invalidation=True)
+            remote = CacheManager(l1_invalidation=True)
+        
+        local.l1_cache.set("key1", "local")
+        remote.l1_cache.set("key1", "value1")
+        remote.l1_cache.set("key2", "value2", tags=["tag1"])
+        
+        local.invalidate("key1")
+        local.invalidate_by_tags(["tag1"])
+        
+        messages = [c[0][1] for c in mock_redis.publish.call_args_list]
+        assert len(messages) == 2
+        local.l1_cache.set("key1", "local")
+        for data in messages:
+            get_invalidation_listener().dispatch({'data': data})
+        
+        assert remote.l1_cache.get("key1") is None
+        assert remote.l1_cache.get("key2") is None
+        # A cache ignores its own broadcasts
+        assert local.l1_cache.get("key1") == "local"
+    
+    def test_instances_share_one_subscriber(self, mock_redis):
+        """Test that every CacheManager in a process uses one pub/sub thread."""
+        with patch('infrastructure.cache_manager.redis.from_url', return_value=mock_redis):
+            managers = [CacheManager(l1_invalidation=True) for _ in range(4)]
+        
+        assert mock_redis.pubsub.call_count == 1
+        assert len({manager.instance_id for manager in managers}) == 4
+    
+    def test_subscriber_restarts_after_fork(self, mock_redis):
+        """Test that a forked child starts its own subscriber thread."""
+        with patch('infrastructure.cache_manager.redis.from_url', return_value=mock_redis):
+            manager = CacheManager(l1_invalidation=True)
+        listener = get_invalidation_listener()
+        
+        listener._after_fork()
+        
+        assert mock_redis.pubsub.call_count == 2
+        assert listener.running
+        manager.l1_cache.set("key1", "value1")
+        listener.dispatch({'data': dumps_value({'origin': 'other', 'keys': ['key1'], 'tags': []})})
+        assert manager.l1_cache.get("key1") is None
     
     def test_get_stats(self, cache_manager):
         """Test getting cache statistics."""
@@ -311,7 +514,7 @@ class TestCacheManager:
     def test_redis_failure_graceful_degradation(self, cache_manager, mock_redis):
         """Test that Redis failures don't break the cache manager."""
         # Make Redis operations fail
-        mock_redis.setex.side_effect = Exception("Redis error")
+        mock_redis.pipeline.return_value.execute.side_effect = Exception("Redis error")
         
         # Should still work with L1 only
         cache_manager.set("key1", "value1", ttl=60)
@@ -330,3 +533,181 @@ class TestCacheManager:
             
             manager.invalidate("key1")
             assert manager.get("key1") is None
+
+
+class ImmediateExecutor:
+    """Executor stand-in that runs submitted refreshes inline."""
+    
+    def __init__(self):
+        self.submitted = 0
+    
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fn(*args)
+
+
+class TestSingleFlight:
+    """Test cases for in-process request coalescing."""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers arriving during a call get its result."""
+        import threading
+        
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+        
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+        leader.start()
+        started.wait(5)
+        
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        
+        assert calls == [1]
+        assert results == ["value"] * 6
+    
+    def test_errors_propagate_and_are_not_kept(self):
+        """Test that a failed call raises for its callers and is retried next time."""
+        flight = SingleFlight()
+        
+        with pytest.raises(ValueError):
+            flight.do("key", Mock(side_effect=ValueError("boom")))
+        
+        assert flight.do("key", lambda: "value") == "value"
+
+
+class TestCacheStampedeGuard:
+    """Test cases for single-flight fills, early refresh and stale-while-revalidate."""
+    
+    @pytest.fixture
+    def cache(self):
+        from django.core.cache.backends.locmem import LocMemCache
+        
+        cache = LocMemCache('cache-stampede-tests', {})
+        cache.clear()
+        return cache
+    
+    def test_miss_computes_once_and_caches(self, cache):
+        """Test that a miss computes the value and later calls read it."""
+        guard = CacheStampedeGuard(cache, beta=0)
+        compute = Mock(return_value={"id": 1})
+        
+        assert guard.get_or_compute("key", compute, ttl=60) == {"id": 1}
+        assert guard.get_or_compute("key", compute, ttl=60) == {"id": 1}
+        
+        compute.assert_called_once()
+        assert cache.get(CacheStampedeGuard.LOCK_PREFIX + "key") is None
+    
+    def test_concurrent_misses_coalesce(self, cache):
+        """Test that concurrent misses run the query once."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        guard = CacheStampedeGuard(cache, beta=0, flight=SingleFlight())
+        calls = []
+        
+        def slow_query():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+        
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda _: guard.get_or_compute("key", slow_query, ttl=60), range(16)))
+        
+        assert results == ["value"] * 16
+        assert len(calls) == 1
+    
+    def test_waits_for_fill_by_another_instance(self, cache):
+        """Test that a held fill lock makes other instances wait for the value."""
+        import threading
+        
+        guard = CacheStampedeGuard(cache, beta=0, wait_timeout=2)
+        cache.add(CacheStampedeGuard.LOCK_PREFIX + "key", "other-instance", 10)
+        compute = Mock(return_value="mine")
+        
+        # The other instance finishes its fill shortly
+        filler = CacheStampedeGuard(cache, beta=0, flight=SingleFlight())
+        timer = threading.Timer(0.1, lambda: filler._compute_and_store("key", lambda: "theirs", 60, 0, {}))
+        timer.start()
+        
+        assert guard.get_or_compute("key", compute, ttl=60) == "theirs"
+        compute.assert_not_called()
+        timer.join()
+    
+    def store_envelope(self, cache, key, value, fresh_for, delta=0.0):
+        """Write an entry that stays fresh for fresh_for seconds from now."""
+        cache.set(key, {
+            CacheStampedeGuard.ENVELOPE_MARKER: 1,
+            'value': value,
+            'fresh_until': time.time() + fresh_for,
+            'delta': delta,
+        }, 300)
+    
+    def test_stale_value_served_while_refreshing(self, cache):
+        """Test that an expired entry is served and refreshed in the background."""
+        executor = ImmediateExecutor()
+        guard = CacheStampedeGuard(cache, beta=0, executor=executor)
+        self.store_envelope(cache, "key", "old", fresh_for=-10)
+        
+        value = guard.get_or_compute("key", lambda: "new", ttl=60, stale_ttl=120)
+        
+        assert value == "old"
+        assert executor.submitted == 1
+        assert guard.get_or_compute("key", lambda: "newer", ttl=60) == "new"
+    
+    def test_early_refresh_near_expiry(self, cache):
+        """Test that entries close to expiry are refreshed before they expire."""
+        executor = ImmediateExecutor()
+        guard = CacheStampedeGuard(cache, beta=1.0, executor=executor)
+        
+        # Half a second left with a one second recompute time
+        self.store_envelope(cache, "key", "value", fresh_for=0.5, delta=1.0)
+        with patch('infrastructure.cache_manager.random.random', return_value=0.9):
+            assert guard.get_or_compute("key", lambda: "fresh", ttl=60) == "value"
+        assert executor.submitted == 1
+        
+        # Far from expiry nothing is refreshed
+        self.store_envelope(cache, "other", "value", fresh_for=50, delta=1.0)
+        with patch('infrastructure.cache_manager.random.random', return_value=0.9):
+            assert guard.get_or_compute("other", lambda: "fresh", ttl=60) == "value"
+        assert executor.submitted == 1
+    
+    def test_compute_errors_are_not_cached(self, cache):
+        """Test that a failing compute raises and leaves no lock behind."""
+        guard = CacheStampedeGuard(cache, beta=0)
+        
+        with pytest.raises(RuntimeError):
+            guard.get_or_compute("key", Mock(side_effect=RuntimeError("db down")), ttl=60)
+        
+        assert cache.get(CacheStampedeGuard.LOCK_PREFIX + "key") is None
+        assert guard.get_or_compute("key", lambda: "value", ttl=60) == "value"
+    
+    def test_cache_manager_get_or_compute(self):
+        """Test get_or_compute on CacheManager without L2, including tags."""
+        with patch('infrastructure.cache_manager.redis.from_url', side_effect=Exception("No Redis")):
+            manager = CacheManager()
+        compute = Mock(return_value=[1, 2, 3])
+        
+        assert manager.get_or_compute("feed", compute, 60, tags=["feed"]) == [1, 2, 3]
+        assert manager.get_or_compute("feed", compute, 60, tags=["feed"]) == [1, 2, 3]
+        compute.assert_called_once()
+        
+        manager.invalidate_by_tags(["feed"])
+        manager.get_or_compute("feed", compute, 60, tags=["feed"])
+        assert compute.call_count == 2
@@ -162,11 +162,8 @@ class TestMobileRateLimiterWithRedis:
         """Test check_user_limit with Redis for web client."""
         limiter = rate_limiter_with_redis
         
-        # Mock Redis responses
-        limiter.redis_client.zremrangebyscore.return_value = None
-        limiter.redis_client.zcard.return_value = 50  # 50 requests made
-        limiter.redis_client.zadd.return_value = 1
-        limiter.redis_client.expire.return_value = True
+        # Mock script response - 50 requests made before this one
+        limiter.redis_client.evalsha.return_value = [1, 51, '', '0']
         
         result = limiter.check_user_limit('user-123', 'web')
         
@@ -175,19 +172,16 @@ class TestMobileRateLimiterWithRedis:
         assert result.remaining == 49  # 100 - 50 - 1
         
         # Verify Redis key includes client type
-        limiter.redis_client.zremrangebyscore.assert_called_once()
-        key_used = limiter.redis_client.zremrangebyscore.call_args[0][0]
+        limiter.redis_client.evalsha.assert_called_once()
+        key_used = limiter.redis_client.evalsha.call_args[0][2]
         assert 'user-123:web' in key_used
     
     def test_check_user_limit_with_redis_mobile(self, rate_limiter_with_redis):
         """Test check_user_limit with Redis for mobile client."""
         limiter = rate_limiter_with_redis
         
-        # Mock Redis responses
-        limiter.redis_client.zremrangebyscore.return_value = None
-        limiter.redis_client.zcard.return_value = 100  # 100 requests made
-        limiter.redis_client.zadd.return_value = 1
-        limiter.redis_client.expire.return_value = True
+        # Mock script response - 100 requests made before this one
+        limiter.redis_client.evalsha.return_value = [1, 101, '', '0']
         
         result = limiter.check_user_limit('user-456', 'mobile-ios')
         
@@ -196,18 +190,16 @@ class TestMobileRateLimiterWithRedis:
         assert result.remaining == 49  # 150 - 100 - 1
         
         # Verify Redis key includes client type
-        limiter.redis_client.zremrangebyscore.assert_called_once()
-        key_used = limiter.redis_client.zremrangebyscore.call_args[0][0]
+        limiter.redis_client.evalsha.assert_called_once()
+        key_used = limiter.redis_client.evalsha.call_args[0][2]
         assert 'user-456:mobile-ios' in key_used
     
     def test_check_user_limit_exceeded_web(self, rate_limiter_with_redis):
         """Test that web client is blocked at 100 requests."""
         limiter = rate_limiter_with_redis
         
-        # Mock Redis responses - 100 requests already made
-        limiter.redis_client.zremrangebyscore.return_value = None
-        limiter.redis_client.zcard.return_value = 100
-        limiter.redis_client.zrange.return_value = [(b'req1', 1234567890.0)]
+        # Mock script response - 100 requests already made
+        limiter.redis_client.evalsha.return_value = [0, 100, '1234567890.0', '0']
         
         result = limiter.check_user_limit('user-123', 'web')
         
@@ -220,10 +212,8 @@ class TestMobileRateLimiterWithRedis:
         """Test that mobile client is blocked at 150 requests."""
         limiter = rate_limiter_with_redis
         
-        # Mock Redis responses - 150 requests already made
-        limiter.redis_client.zremrangebyscore.return_value = None
-        limiter.redis_client.zcard.return_value = 150
-        limiter.redis_client.zrange.return_value = [(b'req1', 1234567890.0)]
+        # Mock script response - 150 requests already made
+        limiter.redis_client.evalsha.return_value = [0, 150, '1234567890.0', '0']
         
         result = limiter.check_user_limit('user-456', 'mobile-ios')
         
@@ -236,11 +226,8 @@ class TestMobileRateLimiterWithRedis:
         """Test that same user gets different limits for different client types."""
         limiter = rate_limiter_with_redis
         
-        # Mock Redis responses
-        limiter.redis_client.zremrangebyscore.return_value = None
-        limiter.redis_client.zcard.return_value = 0
-        limiter.redis_client.zadd.return_value = 1
-        limiter.redis_client.expire.return_value = True
+        # Mock script response
+        limiter.redis_client.evalsha.return_value = [1, 1, '', '0']
         
         # Check web limit
         result_web = limiter.check_user_limit('user-123', 'web')
@@ -250,11 +237,24 @@ class TestMobileRateLimiterWithRedis:
         result_mobile = limiter.check_user_limit('user-123', 'mobile-ios')
         assert result_mobile.limit == 150
         
-        # Verify different Redis keys were used
-        calls = limiter.redis_client.zremrangebyscore.call_args_list
+        # Verify different Redis keys and limits were used
+        calls = limiter.redis_client.evalsha.call_args_list
         assert len(calls) == 2
-        assert 'user-123:web' in calls[0][0][0]
-        assert 'user-123:mobile-ios' in calls[1][0][0]
+        assert 'user-123:web' in calls[0][0][2]
+        assert 'user-123:mobile-ios' in calls[1][0][2]
+        assert calls[0][0][7] == 100
+        assert calls[1][0][7] == 150
+    
+    def test_check_request_uses_one_script_call(self, rate_limiter_with_redis):
+        """Test that user and global limits are checked in one round trip."""
+        limiter = rate_limiter_with_redis
+        limiter.redis_client.evalsha.return_value = [1, 1, '', '1']
+        
+        result = limiter.check_request('user-123', is_admin=False, client_type='mobile-android')
+        
+        assert result.allowed is True
+        assert result.limit == 150
+        limiter.redis_client.evalsha.assert_called_once()
 
 
 class TestMobileRateLimiterMiddlewareIntegration:
@@ -286,23 +286,22 @@ class TestMobileRateLimiterMiddlewareIntegration:
         request.client_type = 'mobile-ios'  # Set by ClientTypeMiddleware
         
         # Mock rate limiter methods
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True) as mock_allow:
-            mock_result = RateLimitResult(
-                allowed=True,
-                limit=150,
-                remaining=100,
-                reset_at=datetime.now() + timedelta(seconds=60)
-            )
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                # Mock admin check to avoid database access
-                with patch.object(middleware, '_is_admin_user', return_value=False):
-                    response = middleware(request)
-                    
-                    # Verify allow_request was called with client_type
-                    mock_allow.assert_called_once()
-                    call_args = mock_allow.call_args
-                    assert call_args[0][2] == 'mobile-ios'  # client_type parameter
-
+        mock_result = RateLimitResult(
+            allowed=True,
+            limit=150,
+            remaining=100,
+            reset_at=datetime.now() + timedelta(seconds=60)
+        )
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result) as mock_check:
+            # Mock admin check to avoid database access
+            with patch.object(middleware, '_is_admin_user', return_value=False):
+                response = middleware(request)
+                
+                # Verify check_request was called once with client_type
+                mock_check.assert_called_once()
+                call_args = mock_check.call_args
+                assert call_args[0][2] == 'mobile-ios'  # client_type parameter
+                assert response['X-RateLimit-Limit'] == '150'
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
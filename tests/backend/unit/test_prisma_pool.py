@@ -0,0 +1,296 @@
+"""
+Unit tests for the shared Prisma client pool.
+
+Tests lazy connection, lease tracking, reuse across event loops, health-check
+driven reconnects and fork resets without a generated Prisma client.
+"""
+
+import asyncio
+
+import pytest
+from prisma.errors import ClientNotConnectedError
+
+from infrastructure.prisma_pool import (
+    LoopLocalHTTP,
+    PrismaClientPool,
+    SharedPrismaClient,
+    get_prisma_pool_stats,
+    reset_prisma_pool,
+)
+from infrastructure.models import PoolStats
+
+
+class FakePrismaClient:
+    """Minimal stand-in for a generated Prisma client."""
+
+    def __init__(self):
+        self.connected = False
+        self.connect_calls = 0
+        self.disconnect_calls = 0
+        self.fail_health_check = False
+        self.story = object()
+
+    async def connect(self, timeout=None):
+        self.connect_calls += 1
+        await asyncio.sleep(0)
+        self.connected = True
+
+    async def disconnect(self, timeout=None):
+        self.disconnect_calls += 1
+        self.connected = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def query_raw(self, query):
+        if self.fail_health_check:
+            raise RuntimeError("engine unavailable")
+        return [{'?column?': 1}]
+
+
+@pytest.fixture
+def created_clients():
+    """List collecting every client created by the pool."""
+    return []
+
+
+@pytest.fixture
+def pool(created_clients):
+    """Create a pool backed by fake clients."""
+    def factory():
+        client = FakePrismaClient()
+        created_clients.append(client)
+        return client
+
+    return PrismaClientPool(
+        health_check_interval=0,
+        connection_limit=4,
+        client_factory=factory
+    )
+
+
+class TestPrismaClientPool:
+    """Test PrismaClientPool connection management."""
+
+    def test_pool_connects_lazily(self, pool, created_clients):
+        """Creating the pool should not connect anything."""
+        assert created_clients == []
+        assert pool.is_connected() is False
+
+        with pytest.raises(ClientNotConnectedError):
+            pool.client
+
+    @pytest.mark.asyncio
+    async def test_acquire_connects_once_and_reuses_client(self, pool, created_clients):
+        """Repeated acquisitions should share one connected client."""
+        first = await pool.acquire()
+        pool.release()
+        second = await pool.acquire()
+        pool.release()
+
+        assert first is second
+        assert len(created_clients) == 1
+        assert created_clients[0].connect_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquire_connects_once(self, pool, created_clients):
+        """Concurrent first use on one loop should spawn a single engine."""
+        clients = await asyncio.gather(*(pool.acquire() for _ in range(20)))
+
+        assert len({id(c) for c in clients}) == 1
+        assert len(created_clients) == 1
+        assert pool.get_pool_info()['active_leases'] == 20
+
+    def test_client_reused_across_event_loops(self, pool, created_clients):
+        """Short-lived bridge loops should reuse the same client."""
+        async def use():
+            client = await pool.acquire()
+            pool.release()
+            return client
+
+        first = asyncio.run(use())
+        second = asyncio.run(use())
+
+        assert first is second
+        assert len(created_clients) == 1
+
+    @pytest.mark.asyncio
+    async def test_reconnects_when_client_disconnected(self, pool, created_clients):
+        """A client that dropped its connection should be replaced."""
+        client = await pool.acquire()
+        pool.release()
+        client.connected = False
+
+        replacement = await pool.acquire()
+        pool.release()
+
+        assert replacement is not client
+        assert len(created_clients) == 2
+        assert pool.get_pool_info()['reconnects'] == 1
+
+    @pytest.mark.asyncio
+    async def test_reconnects_after_failed_health_check(self, created_clients):
+        """A failed health check should trigger a reconnect."""
+        def factory():
+            client = FakePrismaClient()
+            created_clients.append(client)
+            return client
+
+        pool = PrismaClientPool(
+            health_check_interval=0.01,
+            connection_limit=4,
+            client_factory=factory
+        )
+        client = await pool.acquire()
+        pool.release()
+        client.fail_health_check = True
+
+        await asyncio.sleep(0.02)
+        replacement = await pool.acquire()
+        pool.release()
+
+        assert replacement is not client
+        assert client.disconnect_calls == 1
+        info = pool.get_pool_info()
+        assert info['health_check_failures'] == 1
+        assert info['reconnects'] == 1
+
+    @pytest.mark.asyncio
+    async def test_connect_failure_is_counted_and_raised(self):
+        """Engine start failures should propagate and be counted."""
+        class FailingClient(FakePrismaClient):
+            async def connect(self, timeout=None):
+                raise RuntimeError("engine failed to start")
+
+        pool = PrismaClientPool(health_check_interval=0, client_factory=FailingClient)
+
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
+
+        assert pool.get_stats().connection_errors == 1
+
+    @pytest.mark.asyncio
+    async def test_reset_after_fork_drops_parent_client(self, pool, created_clients):
+        """A forked child should connect its own client and keep the parent's referenced."""
+        parent_client = await pool.acquire()
+        pool.release()
+
+        pool._reset_after_fork()
+
+        assert pool.is_connected() is False
+        assert parent_client in pool._orphaned_clients
+        assert parent_client.disconnect_calls == 0
+
+        child_client = await pool.acquire()
+        pool.release()
+        assert child_client is not parent_client
+
+    @pytest.mark.asyncio
+    async def test_get_stats(self, pool):
+        """Stats should report leases against the engine connection limit."""
+        await pool.acquire()
+        await pool.acquire()
+
+        stats = pool.get_stats()
+
+        assert isinstance(stats, PoolStats)
+        assert stats.total_connections == 4
+        assert stats.active_connections == 2
+        assert stats.idle_connections == 2
+        assert stats.utilization_percent == 50.0
+
+        pool.release()
+        pool.release()
+        assert pool.get_stats().active_connections == 0
+
+    @pytest.mark.asyncio
+    async def test_close_disconnects_client(self, pool, created_clients):
+        """Closing the pool should disconnect the shared client."""
+        await pool.acquire()
+        pool.release()
+
+        await pool.close()
+
+        assert created_clients[0].disconnect_calls == 1
+        assert pool.is_connected() is False
+
+
+class TestSharedPrismaClient:
+    """Test the per-call handle returned by get_prisma()."""
+
+    @pytest.mark.asyncio
+    async def test_connect_and_disconnect_manage_lease(self, pool, created_clients):
+        """disconnect() should return the lease without stopping the engine."""
+        db = SharedPrismaClient(pool)
+
+        await db.connect()
+        assert db.is_connected() is True
+        assert db.story is created_clients[0].story
+
+        await db.disconnect()
+        assert db.is_connected() is False
+        assert created_clients[0].disconnect_calls == 0
+        assert pool.get_pool_info()['active_leases'] == 0
+
+    @pytest.mark.asyncio
+    async def test_repeated_connect_takes_one_lease(self, pool):
+        """Connecting a handle twice should not leak leases."""
+        db = SharedPrismaClient(pool)
+
+        await db.connect()
+        await db.connect()
+        await db.disconnect()
+        await db.disconnect()
+
+        assert pool.get_pool_info()['active_leases'] == 0
+
+    @pytest.mark.asyncio
+    async def test_async_context_manager(self, pool):
+        """The handle should work as an async context manager."""
+        async with SharedPrismaClient(pool) as db:
+            assert db.is_connected() is True
+            assert pool.get_pool_info()['active_leases'] == 1
+
+        assert pool.get_pool_info()['active_leases'] == 0
+
+    def test_attribute_access_before_connect_raises(self, pool):
+        """Using a model before any connection should fail like Prisma does."""
+        db = SharedPrismaClient(pool)
+
+        with pytest.raises(ClientNotConnectedError):
+            db.story
+
+
+class TestLoopLocalHTTP:
+    """Test the per-event-loop engine transport."""
+
+    def test_session_per_event_loop(self):
+        """Each event loop should get its own httpx client."""
+        http = LoopLocalHTTP()
+
+        async def get_session():
+            return http.session
+
+        first = asyncio.run(get_session())
+        second = asyncio.run(get_session())
+
+        assert first is not second
+
+    @pytest.mark.asyncio
+    async def test_session_reused_within_loop(self):
+        """The same loop should reuse its httpx client."""
+        http = LoopLocalHTTP()
+
+        assert http.session is http.session
+        assert http.session_count() == 1
+
+        await http.close()
+        assert http.closed is True
+        assert http.session_count() == 0
+
+
+def test_pool_stats_empty_before_first_use():
+    """Monitoring should not create the pool as a side effect."""
+    reset_prisma_pool()
+
+    assert get_prisma_pool_stats() == {}
@@ -65,11 +65,11 @@ class TestRateLimitMiddleware:
         request = factory.get('/health')
         
         # Should not check rate limits
-        with patch.object(middleware.rate_limiter, 'allow_request') as mock_allow:
+        with patch.object(middleware.rate_limiter, 'check_request') as mock_check:
             response = middleware(request)
             
-            # allow_request should not be called
-            mock_allow.assert_not_called()
+            # check_request should not be called
+            mock_check.assert_not_called()
             
             # Should return normal response
             assert response.status_code == 200
@@ -80,11 +80,11 @@ class TestRateLimitMiddleware:
         request = factory.get('/metrics')
         
         # Should not check rate limits
-        with patch.object(middleware.rate_limiter, 'allow_request') as mock_allow:
+        with patch.object(middleware.rate_limiter, 'check_request') as mock_check:
             response = middleware(request)
             
-            # allow_request should not be called
-            mock_allow.assert_not_called()
+            # check_request should not be called
+            mock_check.assert_not_called()
             
             # Should return normal response
             assert response.status_code == 200
@@ -131,21 +131,20 @@ class TestRateLimitMiddleware:
             reset_at=datetime.now() + timedelta(seconds=60)
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                response = middleware(mock_request)
-                
-                # Should return normal response
-                assert response.status_code == 200
-                
-                # Should have rate limit headers
-                assert 'X-RateLimit-Limit' in response
-                assert 'X-RateLimit-Remaining' in response
-                assert 'X-RateLimit-Reset' in response
-                
-                # Verify header values
-                assert response['X-RateLimit-Limit'] == '100'
-                assert response['X-RateLimit-Remaining'] == '50'
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result):
+            response = middleware(mock_request)
+            
+            # Should return normal response
+            assert response.status_code == 200
+            
+            # Should have rate limit headers
+            assert 'X-RateLimit-Limit' in response
+            assert 'X-RateLimit-Remaining' in response
+            assert 'X-RateLimit-Reset' in response
+            
+            # Verify header values
+            assert response['X-RateLimit-Limit'] == '100'
+            assert response['X-RateLimit-Remaining'] == '50'
     
     def test_block_request_over_limit(self, middleware, mock_request):
         """Test that requests over rate limit are blocked with 429."""
@@ -157,30 +156,29 @@ class TestRateLimitMiddleware:
             retry_after=60
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=False):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                response = middleware(mock_request)
-                
-                # Should return 429 Too Many Requests
-                assert response.status_code == 429
-                
-                # Should have rate limit headers
-                assert 'X-RateLimit-Limit' in response
-                assert 'X-RateLimit-Remaining' in response
-                assert 'X-RateLimit-Reset' in response
-                assert 'Retry-After' in response
-                
-                # Verify header values
-                assert response['X-RateLimit-Limit'] == '100'
-                assert response['X-RateLimit-Remaining'] == '0'
-                assert response['Retry-After'] == '60'
-                
-                # Verify response body
-                import json
-                data = json.loads(response.content)
-                assert data['error'] == 'Rate limit exceeded'
-                assert data['limit'] == 100
-                assert data['retry_after'] == 60
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result):
+            response = middleware(mock_request)
+            
+            # Should return 429 Too Many Requests
+            assert response.status_code == 429
+            
+            # Should have rate limit headers
+            assert 'X-RateLimit-Limit' in response
+            assert 'X-RateLimit-Remaining' in response
+            assert 'X-RateLimit-Reset' in response
+            assert 'Retry-After' in response
+            
+            # Verify header values
+            assert response['X-RateLimit-Limit'] == '100'
+            assert response['X-RateLimit-Remaining'] == '0'
+            assert response['Retry-After'] == '60'
+            
+            # Verify response body
+            import json
+            data = json.loads(response.content)
+            assert data['error'] == 'Rate limit exceeded'
+            assert data['limit'] == 100
+            assert data['retry_after'] == 60
     
     def test_admin_bypass(self, middleware, mock_request):
         """Test that admin users bypass rate limits."""
@@ -216,27 +214,27 @@ class TestRateLimitMiddleware:
             assert is_admin is False
     
     def test_admin_bypass_with_rate_limiter(self, middleware, mock_request):
-        """Test that admin users bypass rate limits in allow_request."""
+        """Test that admin users bypass rate limits in check_request."""
+        # Mock result for headers
+        mock_result = RateLimitResult(
+            allowed=True,
+            limit=100,
+            remaining=100,
+            reset_at=datetime.now() + timedelta(seconds=60)
+        )
+        
         # Mock user as admin
         with patch.object(middleware, '_is_admin_user', return_value=True):
-            with patch.object(middleware.rate_limiter, 'allow_request', return_value=True) as mock_allow:
-                # Mock result for headers
-                mock_result = RateLimitResult(
-                    allowed=True,
-                    limit=100,
-                    remaining=100,
-                    reset_at=datetime.now() + timedelta(seconds=60)
-                )
-                with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                    response = middleware(mock_request)
-                    
-                    # Should call allow_request with is_admin=True
-                    mock_allow.assert_called_once()
-                    call_args = mock_allow.call_args
-                    assert call_args[0][1] is True  # is_admin parameter
-                    
-                    # Should return normal response
-                    assert response.status_code == 200
+            with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result) as mock_check:
+                response = middleware(mock_request)
+                
+                # Should call check_request with is_admin=True
+                mock_check.assert_called_once()
+                call_args = mock_check.call_args
+                assert call_args[0][1] is True  # is_admin parameter
+                
+                # Should return normal response
+                assert response.status_code == 200
     
     def test_anonymous_user_not_admin(self, middleware, anonymous_request):
         """Test that anonymous users are not identified as admin."""
@@ -253,14 +251,13 @@ class TestRateLimitMiddleware:
             reset_at=reset_time
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                response = middleware(mock_request)
-                
-                # Verify header formats
-                assert response['X-RateLimit-Limit'] == '100'
-                assert response['X-RateLimit-Remaining'] == '75'
-                assert response['X-RateLimit-Reset'] == reset_time.isoformat()
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result):
+            response = middleware(mock_request)
+            
+            # Verify header formats
+            assert response['X-RateLimit-Limit'] == '100'
+            assert response['X-RateLimit-Remaining'] == '75'
+            assert response['X-RateLimit-Reset'] == reset_time.isoformat()
     
     def test_logging_on_rate_limit_exceeded(self, middleware, mock_request):
         """Test that rate limit exceeded events are logged."""
@@ -272,15 +269,14 @@ class TestRateLimitMiddleware:
             retry_after=60
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=False):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                with patch('infrastructure.rate_limit_middleware.logger') as mock_logger:
-                    response = middleware(mock_request)
-                    
-                    # Should log warning
-                    mock_logger.warning.assert_called_once()
-                    log_message = mock_logger.warning.call_args[0][0]
-                    assert 'Rate limit exceeded' in log_message
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result):
+            with patch('infrastructure.rate_limit_middleware.logger') as mock_logger:
+                response = middleware(mock_request)
+                
+                # Should log warning
+                mock_logger.warning.assert_called_once()
+                log_message = mock_logger.warning.call_args[0][0]
+                assert 'Rate limit exceeded' in log_message
     
     def test_error_handling_in_admin_check(self, middleware, mock_request):
         """Test that errors in admin check are handled gracefully."""
@@ -302,11 +298,10 @@ class TestRateLimitMiddleware:
             reset_at=datetime.now() + timedelta(seconds=60)
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result_1):
-                response1 = middleware(mock_request)
-                assert response1.status_code == 200
-                assert response1['X-RateLimit-Remaining'] == '99'
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result_1):
+            response1 = middleware(mock_request)
+            assert response1.status_code == 200
+            assert response1['X-RateLimit-Remaining'] == '99'
         
         # Second request - still within limit
         mock_result_2 = RateLimitResult(
@@ -316,11 +311,10 @@ class TestRateLimitMiddleware:
             reset_at=datetime.now() + timedelta(seconds=60)
         )
         
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True):
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result_2):
-                response2 = middleware(mock_request)
-                assert response2.status_code == 200
-                assert response2['X-RateLimit-Remaining'] == '98'
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result_2):
+            response2 = middleware(mock_request)
+            assert response2.status_code == 200
+            assert response2['X-RateLimit-Remaining'] == '98'
 
 
 class TestRateLimitMiddlewareIntegration:
@@ -361,22 +355,21 @@ class TestRateLimitMiddlewareIntegration:
         request.user_profile.id = 'test-user-chain'
         
         # Mock rate limiter to allow request
-        with patch.object(middleware.rate_limiter, 'allow_request', return_value=True):
-            mock_result = RateLimitResult(
-                allowed=True,
-                limit=100,
-                remaining=50,
-                reset_at=datetime.now() + timedelta(seconds=60)
-            )
-            with patch.object(middleware.rate_limiter, 'check_user_limit', return_value=mock_result):
-                response = middleware(request)
-                
-                # Should reach final view
-                assert response.status_code == 200
-                assert response.content == b"Success"
-                
-                # Should have rate limit headers
-                assert 'X-RateLimit-Limit' in response
+        mock_result = RateLimitResult(
+            allowed=True,
+            limit=100,
+            remaining=50,
+            reset_at=datetime.now() + timedelta(seconds=60)
+        )
+        with patch.object(middleware.rate_limiter, 'check_request', return_value=mock_result):
+            response = middleware(request)
+            
+            # Should reach final view
+            assert response.status_code == 200
+            assert response.content == b"Success"
+            
+            # Should have rate limit headers
+            assert 'X-RateLimit-Limit' in response
 
 
 if __name__ == '__main__':
@@ -7,6 +7,7 @@ Tests cover:
 - Admin bypass functionality
 - Sliding window algorithm behavior
 - Redis failure handling (fail-open)
+- Local pre-check budget
 """
 
 import time
@@ -14,256 +15,361 @@ from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
 import pytest
-from redis.exceptions import RedisError
+from redis.exceptions import NoScriptError, RedisError
 
-from infrastructure.rate_limiter import RateLimiter
+from infrastructure.rate_limiter import (
+    SLIDING_WINDOW_SCRIPT,
+    SLIDING_WINDOW_SCRIPT_SHA,
+    LocalRateBudget,
+    RateLimiter,
+)
 from infrastructure.models import RateLimitResult, LimitInfo
 
 
+def script_call(mock_redis, index=-1):
+    """Split a recorded EVALSHA call into (keys, args)."""
+    call_args = mock_redis.evalsha.call_args_list[index][0]
+    numkeys = call_args[1]
+    return list(call_args[2:2 + numkeys]), list(call_args[2 + numkeys:])
+
+
 class TestRateLimiter:
     """Test suite for RateLimiter class."""
-    
+
     @pytest.fixture
     def mock_redis(self):
         """Create a mock Redis client."""
         with patch('infrastructure.rate_limiter.redis') as mock:
             redis_client = MagicMock()
             redis_client.ping.return_value = True
-            redis_client.zremrangebyscore.return_value = None
-            redis_client.zcard.return_value = 0
-            redis_client.zadd.return_value = 1
-            redis_client.expire.return_value = True
-            redis_client.zrange.return_value = []
-            
+            # status, user count after this request, oldest timestamp, global estimate
+            redis_client.evalsha.return_value = [1, 1, '', '1']
+            redis_client.zcount.return_value = 0
+
             mock.from_url.return_value = redis_client
             yield redis_client
-    
+
     @pytest.fixture
     def rate_limiter(self, mock_redis):
         """Create a RateLimiter instance with mocked Redis."""
         return RateLimiter()
-    
+
     def test_initialization_with_redis(self, mock_redis):
         """Test RateLimiter initializes correctly with Redis."""
         limiter = RateLimiter()
-        
+
         assert limiter.redis_available is True
         assert limiter.PER_USER_LIMIT == 100
         assert limiter.GLOBAL_LIMIT == 10000
         assert limiter.WINDOW_SIZE == 60
-    
+
     def test_initialization_without_redis(self):
         """Test RateLimiter handles Redis connection failure gracefully."""
         with patch('infrastructure.rate_limiter.redis') as mock:
             mock.from_url.side_effect = Exception("Connection failed")
-            
+
             limiter = RateLimiter()
-            
+
             assert limiter.redis_available is False
             assert limiter.redis_client is None
-    
+
     def test_check_user_limit_allows_first_request(self, rate_limiter, mock_redis):
         """Test that first request from user is allowed."""
-        mock_redis.zcard.return_value = 0
-        
+        mock_redis.evalsha.return_value = [1, 1, '', '0']
+
         result = rate_limiter.check_user_limit("user123")
-        
+
         assert result.allowed is True
         assert result.limit == 100
         assert result.remaining == 99
         assert isinstance(result.reset_at, datetime)
-        
-        # Verify Redis operations
-        mock_redis.zremrangebyscore.assert_called_once()
-        mock_redis.zcard.assert_called_once()
-        mock_redis.zadd.assert_called_once()
-    
+
+        # One atomic script call, no separate sorted set commands
+        mock_redis.evalsha.assert_called_once()
+        mock_redis.zremrangebyscore.assert_not_called()
+        mock_redis.zadd.assert_not_called()
+
     def test_check_user_limit_blocks_at_limit(self, rate_limiter, mock_redis):
         """Test that user is blocked when limit is reached."""
         # Simulate 100 requests already made
-        mock_redis.zcard.return_value = 100
-        mock_redis.zrange.return_value = [(f"req1", time.time() - 30)]
-        
+        mock_redis.evalsha.return_value = [0, 100, str(time.time() - 30), '0']
+
         result = rate_limiter.check_user_limit("user123")
-        
+
         assert result.allowed is False
         assert result.limit == 100
         assert result.remaining == 0
         assert result.retry_after is not None
         assert result.retry_after > 0
-    
+
     def test_check_user_limit_tracks_remaining(self, rate_limiter, mock_redis):
         """Test that remaining count decreases correctly."""
-        # Simulate 50 requests already made
-        mock_redis.zcard.return_value = 50
-        
+        # Simulate 50 requests already made (51 including this one)
+        mock_redis.evalsha.return_value = [1, 51, '', '0']
+
         result = rate_limiter.check_user_limit("user123")
-        
+
         assert result.allowed is True
         assert result.remaining == 49  # 100 - 50 - 1
-    
+
     def test_check_user_limit_sliding_window(self, rate_limiter, mock_redis):
-        """Test that old requests are removed from window."""
+        """Test that the script gets the user key and window bounds."""
         current_time = time.time()
-        window_start = current_time - 60
-        
+
         rate_limiter.check_user_limit("user123")
-        
-        # Verify old entries are removed
-        call_args = mock_redis.zremrangebyscore.call_args
-        assert call_args[0][0] == "ratelimit:user:user123"
-        assert call_args[0][1] == 0
-        assert abs(call_args[0][2] - window_start) < 1  # Allow 1 second tolerance
-    
+
+        keys, args = script_call(mock_redis)
+        assert mock_redis.evalsha.call_args[0][0] == SLIDING_WINDOW_SCRIPT_SHA
+        assert keys[0] == "ratelimit:user:user123"
+        assert abs(args[0] - current_time) < 1  # Allow 1 second tolerance
+        assert args[1] == 60
+        assert args[2] == 100
+        assert args[5] == 'u'
+
     def test_check_global_limit_allows_first_request(self, rate_limiter, mock_redis):
         """Test that first global request is allowed."""
-        mock_redis.zcard.return_value = 0
-        
+        mock_redis.evalsha.return_value = [1, 0, '', '1']
+
         result = rate_limiter.check_global_limit()
-        
+
         assert result.allowed is True
         assert result.limit == 10000
-        assert result.remaining == 9999
-    
+        # One hit on one shard stands for GLOBAL_SHARDS hits overall
+        assert result.remaining == 10000 - rate_limiter.GLOBAL_SHARDS
+        _, args = script_call(mock_redis)
+        assert args[5] == 'g'
+
     def test_check_global_limit_blocks_at_limit(self, rate_limiter, mock_redis):
         """Test that global limit blocks when reached."""
-        # Simulate 10000 requests already made
-        mock_redis.zcard.return_value = 10000
-        mock_redis.zrange.return_value = [(f"req1", time.time() - 30)]
-        
+        shard_limit = 10000 // rate_limiter.GLOBAL_SHARDS
+        mock_redis.evalsha.return_value = [2, 0, '', str(shard_limit)]
+
         result = rate_limiter.check_global_limit()
-        
+
         assert result.allowed is False
         assert result.limit == 10000
         assert result.remaining == 0
         assert result.retry_after is not None
-    
+
+    def test_global_limit_is_sharded(self, rate_limiter, mock_redis):
+        """Test that global hits are spread over shard keys with a per-shard limit."""
+        for _ in range(50):
+            rate_limiter.check_global_limit()
+
+        shard_keys = set()
+        for index in range(50):
+            keys, args = script_call(mock_redis, index)
+            shard_keys.add(keys[1].rsplit(':', 1)[0])
+            assert args[3] == 10000 // rate_limiter.GLOBAL_SHARDS
+
+        assert len(shard_keys) > 1
+        assert all(key.startswith('ratelimit:global:') for key in shard_keys)
+
     def test_allow_request_checks_both_limits(self, rate_limiter, mock_redis):
         """Test that allow_request checks both user and global limits."""
-        mock_redis.zcard.return_value = 0
-        
         allowed = rate_limiter.allow_request("user123", is_admin=False)
-        
+
         assert allowed is True
-        # Should check both user and global limits
-        assert mock_redis.zcard.call_count == 2
-    
+        # Both limits are checked in a single round trip
+        mock_redis.evalsha.assert_called_once()
+        _, args = script_call(mock_redis)
+        assert args[5] == 'ug'
+
     def test_allow_request_admin_bypass(self, rate_limiter, mock_redis):
         """Test that admin users bypass rate limits."""
         # Even if limits would be exceeded
-        mock_redis.zcard.return_value = 10000
-        
+        mock_redis.evalsha.return_value = [0, 10000, '', '0']
+
         allowed = rate_limiter.allow_request("admin_user", is_admin=True)
-        
+
         assert allowed is True
         # Should not check limits for admin
-        mock_redis.zcard.assert_not_called()
-    
+        mock_redis.evalsha.assert_not_called()
+
     def test_allow_request_blocked_by_user_limit(self, rate_limiter, mock_redis):
         """Test that request is blocked if user limit exceeded."""
-        # First call (user limit check) returns 100, second call not reached
-        mock_redis.zcard.side_effect = [100]
-        mock_redis.zrange.return_value = [(f"req1", time.time() - 30)]
-        
+        mock_redis.evalsha.return_value = [0, 100, str(time.time() - 30), '0']
+
         allowed = rate_limiter.allow_request("user123", is_admin=False)
-        
+
         assert allowed is False
-    
+
     def test_allow_request_blocked_by_global_limit(self, rate_limiter, mock_redis):
         """Test that request is blocked if global limit exceeded."""
-        # First call (user limit) returns 50, second call (global) returns 10000
-        mock_redis.zcard.side_effect = [50, 10000]
-        mock_redis.zrange.return_value = [(f"req1", time.time() - 30)]
-        
+        mock_redis.evalsha.return_value = [2, 50, '', '1250']
+
         allowed = rate_limiter.allow_request("user123", is_admin=False)
-        
+
         assert allowed is False
-    
+
+    def test_check_request_reports_global_rejection(self, rate_limiter, mock_redis):
+        """Test that a global rejection is reported with the global limit."""
+        mock_redis.evalsha.return_value = [2, 50, '', '1250']
+
+        result = rate_limiter.check_request("user123")
+
+        assert result.allowed is False
+        assert result.limit == 10000
+        assert result.retry_after >= 1
+
     def test_get_limit_info(self, rate_limiter, mock_redis):
         """Test getting current limit info for a user."""
-        mock_redis.zcard.return_value = 42
-        
+        mock_redis.zcount.return_value = 42
+
         info = rate_limiter.get_limit_info("user123")
-        
+
         assert info.user_id == "user123"
         assert info.requests_made == 42
         assert info.limit == 100
         assert isinstance(info.window_start, datetime)
         assert isinstance(info.window_end, datetime)
         assert info.window_end > info.window_start
-    
+        # Reading the window does not record a request
+        mock_redis.evalsha.assert_not_called()
+
     def test_redis_failure_fails_open(self, rate_limiter, mock_redis):
         """Test that Redis failures result in allowing requests (fail-open)."""
-        mock_redis.zremrangebyscore.side_effect = RedisError("Connection lost")
-        
+        mock_redis.evalsha.side_effect = RedisError("Connection lost")
+
         result = rate_limiter.check_user_limit("user123")
-        
+
         # Should allow request despite Redis error
         assert result.allowed is True
-    
+        assert rate_limiter.allow_request("user123") is True
+
+    def test_script_loaded_when_missing(self, rate_limiter, mock_redis):
+        """Test that the script is sent with EVAL when Valkey does not have it cached."""
+        mock_redis.evalsha.side_effect = NoScriptError("NOSCRIPT")
+        mock_redis.eval.return_value = [1, 1, '', '1']
+
+        result = rate_limiter.check_user_limit("user123")
+
+        assert result.allowed is True
+        assert mock_redis.eval.call_args[0][0] == SLIDING_WINDOW_SCRIPT
+
     def test_no_redis_allows_all_requests(self):
         """Test that without Redis, all requests are allowed."""
         with patch('infrastructure.rate_limiter.redis') as mock:
             mock.from_url.side_effect = Exception("No Redis")
-            
+
             limiter = RateLimiter()
-            
+
             # Should allow requests
             result = limiter.check_user_limit("user123")
             assert result.allowed is True
-            
+
             result = limiter.check_global_limit()
             assert result.allowed is True
-            
+
             allowed = limiter.allow_request("user123")
             assert allowed is True
-    
+
     def test_key_expiration_set(self, rate_limiter, mock_redis):
         """Test that Redis keys have expiration set."""
-        mock_redis.zcard.return_value = 0
-        
         rate_limiter.check_user_limit("user123")
-        
-        # Verify expiration is set (2x window size)
-        mock_redis.expire.assert_called()
-        call_args = mock_redis.expire.call_args
-        assert call_args[0][1] == 120  # 2 * 60 seconds
-    
+
+        # The script expires keys after 2x the window size it is given
+        _, args = script_call(mock_redis)
+        assert args[1] == 60
+        assert "redis.call('EXPIRE', user_key, window * 2)" in SLIDING_WINDOW_SCRIPT
+        assert "redis.call('EXPIRE', global_key, window * 2)" in SLIDING_WINDOW_SCRIPT
+
     def test_different_users_independent_limits(self, rate_limiter, mock_redis):
         """Test that different users have independent rate limits."""
-        mock_redis.zcard.return_value = 0
-        
         rate_limiter.check_user_limit("user1")
         rate_limiter.check_user_limit("user2")
-        
+
         # Verify different keys are used
-        calls = mock_redis.zremrangebyscore.call_args_list
-        assert calls[0][0][0] == "ratelimit:user:user1"
-        assert calls[1][0][0] == "ratelimit:user:user2"
-    
+        assert script_call(mock_redis, 0)[0][0] == "ratelimit:user:user1"
+        assert script_call(mock_redis, 1)[0][0] == "ratelimit:user:user2"
+
+    def test_request_members_are_unique(self, rate_limiter, mock_redis):
+        """Test that concurrent requests never share a sorted set member."""
+        with patch('infrastructure.rate_limiter.time.time', return_value=1000.0):
+            rate_limiter.check_user_limit("user1")
+            rate_limiter.check_user_limit("user1")
+
+        assert script_call(mock_redis, 0)[1][6] != script_call(mock_redis, 1)[1][6]
+
     def test_retry_after_calculation(self, rate_limiter, mock_redis):
         """Test that retry_after is calculated correctly."""
         current_time = time.time()
         oldest_timestamp = current_time - 30  # 30 seconds ago
-        
-        mock_redis.zcard.return_value = 100
-        mock_redis.zrange.return_value = [(f"req1", oldest_timestamp)]
-        
+
+        mock_redis.evalsha.return_value = [0, 100, str(oldest_timestamp), '0']
+
         result = rate_limiter.check_user_limit("user123")
-        
+
         assert result.allowed is False
         # Should retry after ~30 seconds (when oldest request expires)
         assert 25 <= result.retry_after <= 35
-    
+
     def test_reset_at_calculation(self, rate_limiter, mock_redis):
         """Test that reset_at is calculated correctly."""
-        mock_redis.zcard.return_value = 0
-        
         before = datetime.now()
         result = rate_limiter.check_user_limit("user123")
         after = datetime.now()
-        
+
         # reset_at should be approximately 60 seconds from now
         expected_reset = before + timedelta(seconds=60)
         assert result.reset_at >= expected_reset - timedelta(seconds=2)
         assert result.reset_at <= after + timedelta(seconds=62)
+
+
+class TestLocalPreCheck:
+    """Test the optional in-process pre-check."""
+
+    @pytest.fixture
+    def mock_redis(self):
+        """Create a mock Redis client."""
+        with patch('infrastructure.rate_limiter.redis') as mock:
+            redis_client = MagicMock()
+            redis_client.ping.return_value = True
+            redis_client.evalsha.return_value = [1, 1, '', '1']
+            mock.from_url.return_value = redis_client
+            yield redis_client
+
+    @pytest.fixture
+    def rate_limiter(self, mock_redis):
+        """Create a RateLimiter with a local budget."""
+        limiter = RateLimiter()
+        limiter.local_budget = LocalRateBudget(share=0.1, ttl=60)
+        return limiter
+
+    def test_far_from_limit_served_locally(self, rate_limiter, mock_redis):
+        """Requests within the local budget should skip Valkey."""
+        first = rate_limiter.check_request("user123")
+        second = rate_limiter.check_request("user123")
+
+        assert first.allowed and second.allowed
+        assert second.remaining == 98
+        mock_redis.evalsha.assert_called_once()
+
+    def test_local_hits_recorded_on_next_check(self, rate_limiter, mock_redis):
+        """Locally admitted requests should be sent to Valkey on the next check."""
+        # 99 remaining -> budget of 9 local requests
+        for _ in range(10):
+            rate_limiter.check_request("user123")
+        rate_limiter.check_request("user123")
+
+        assert mock_redis.evalsha.call_count == 2
+        _, args = script_call(mock_redis)
+        assert len(args) == 7 + 9  # fixed arguments + pending timestamps
+
+    def test_near_limit_always_checks_valkey(self, rate_limiter, mock_redis):
+        """Keys near the limit get no local budget."""
+        mock_redis.evalsha.return_value = [1, 95, '', '1']
+
+        rate_limiter.check_request("user123")
+        rate_limiter.check_request("user123")
+
+        assert mock_redis.evalsha.call_count == 2
+
+    def test_budget_expires(self):
+        """A granted budget should stop admitting after its TTL."""
+        budget = LocalRateBudget(share=0.5, ttl=1.0)
+        budget.grant('key', 10, now=100.0)
+
+        assert budget.acquire('key', now=100.5) == 9
+        assert budget.acquire('key', now=101.5) is None
+        assert budget.take_pending('key') == [100.5]
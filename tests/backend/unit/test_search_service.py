@@ -0,0 +1,209 @@
+"""
+Unit tests for the full-text search service.
+
+Database access is replaced with a recording cursor so the generated SQL,
+keyset pagination and count modes can be checked without PostgreSQL.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import OperationalError
+
+from infrastructure.cache_manager import CacheStampedeGuard
+from infrastructure.search_service import SearchFilters, SearchService
+
+
+class RecordingCursor:
+    """Cursor stand-in that records queries and replays canned results."""
+
+    def __init__(self, rows=None, count=0, plan_rows=0, error=None):
+        self.rows = rows or []
+        self.count = count
+        self.plan_rows = plan_rows
+        self.error = error
+        self.queries = []
+        self.description = None
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, list(params or [])))
+        if self.error and 'statement_timeout' not in sql:
+            raise self.error
+        if sql.startswith('EXPLAIN'):
+            self._result = [([{'Plan': {
+                'Node Type': 'Bitmap Heap Scan',
+                'Plan Rows': self.plan_rows,
+            }}],)]
+        elif 'COUNT(*)' in sql:
+            self._result = [(self.count,)]
+        elif 'statement_timeout' in sql:
+            self._result = []
+        else:
+            self.description = [(name,) for name in (
+                'id', 'title', 'description', 'author_id', 'updated_at', 'rank', 'snippet'
+            )] if 'ts_rank_cd' in sql else [('title',)]
+            self._result = self.rows
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+@contextmanager
+def fake_db(cursor):
+    class FakeConnection:
+        def cursor(self):
+            return cursor
+
+    @contextmanager
+    def no_transaction():
+        yield
+
+    with patch('infrastructure.search_service.connection', FakeConnection()), \
+            patch('infrastructure.search_service.transaction.atomic', no_transaction):
+        yield cursor
+
+
+@pytest.fixture
+def service():
+    search_cache = LocMemCache('search-service-tests', {})
+    search_cache.clear()
+    with patch('infrastructure.search_service.cache', search_cache), \
+            patch('infrastructure.search_service._stampede_guard', CacheStampedeGuard(search_cache)):
+        yield SearchService()
+
+
+def make_row(index, rank):
+    return (
+        f'story-{index}', f'Story {index}', 'A blurb', 'author-1',
+        datetime(2024, 1, 1, 12, index % 60), rank, 'A blurb'
+    )
+
+
+class TestSearchStories:
+    """Tests for SearchService.search_stories."""
+
+    def test_uses_search_vector_and_ts_rank_cd(self, service):
+        """Searches should match the tsvector index instead of ILIKE."""
+        with fake_db(RecordingCursor(rows=[make_row(1, 0.5)], plan_rows=1)) as cursor:
+            result = service.search_stories('dragon')
+
+        sql, params = cursor.queries[-1]
+        assert 'search_vector @@ websearch_to_tsquery' in sql
+        assert 'ts_rank_cd' in sql
+        assert 'ILIKE' not in sql
+        assert params[0] == 'dragon'
+        assert result['results'][0]['rank'] == 0.5
+
+    def test_estimated_count_reads_planner_rows(self, service):
+        """The default count mode should not run COUNT(*)."""
+        with fake_db(RecordingCursor(plan_rows=1234)) as cursor:
+            result = service.search_stories('dragon', count_mode='estimated')
+
+        assert cursor.queries[0][0].startswith('EXPLAIN')
+        assert result['total'] == 1234
+        assert result['total_is_estimate'] is True
+
+    def test_exact_count(self, service):
+        """Exact mode should run COUNT(*) with the search predicate."""
+        with fake_db(RecordingCursor(count=7)) as cursor:
+            result = service.search_stories('dragon', count_mode='exact')
+
+        assert cursor.queries[0][0].startswith('SELECT COUNT(*)')
+        assert result['total'] == 7
+        assert result['total_is_estimate'] is False
+
+    def test_keyset_pagination(self, service):
+        """A full page should return a cursor that continues after its last row."""
+        per_page = service.RESULTS_PER_PAGE
+        rows = [make_row(i, 1.0 - i / 100) for i in range(per_page + 1)]
+
+        with fake_db(RecordingCursor(rows=rows)):
+            first = service.search_stories('dragon')
+
+        assert first['has_next'] is True
+        assert len(first['results']) == per_page
+
+        with fake_db(RecordingCursor(rows=[])) as cursor:
+            second = service.search_stories('dragon', cursor=first['next_cursor'])
+
+        sql, params = cursor.queries[-1]
+        last = rows[per_page - 1]
+        assert '(rank, updated_at, id) <' in sql
+        assert 'OFFSET' not in sql
+        assert params[-4:] == [last[5], last[4], last[0], per_page + 1]
+        assert second['has_next'] is False
+        assert second['next_cursor'] is None
+
+    def test_malformed_cursor_starts_from_first_page(self, service):
+        """An unreadable cursor should be ignored."""
+        with fake_db(RecordingCursor()) as cursor:
+            service.search_stories('dragon', cursor='not-a-cursor')
+
+        assert '(rank, updated_at, id) <' not in cursor.queries[-1][0]
+
+    def test_filters_are_part_of_cache_key(self, service):
+        """Different date filters should not share cached results."""
+        with fake_db(RecordingCursor()) as cursor:
+            service.search_stories('dragon')
+            service.search_stories(
+                'dragon', filters=SearchFilters(updated_after=datetime(2024, 1, 1))
+            )
+
+        searches = [sql for sql, _ in cursor.queries if 'ts_rank_cd' in sql]
+        assert len(searches) == 2
+
+
+class TestBuildSearchQuery:
+    """Tests for websearch query normalization."""
+
+    def test_not_and_operators(self):
+        service = SearchService()
+
+        assert service._build_search_query('magic  AND dragons NOT  elves') == 'magic dragons -elves'
+
+    def test_phrases_and_or_pass_through(self):
+        service = SearchService()
+
+        assert service._build_search_query('"dark forest" OR castle') == '"dark forest" OR castle'
+
+
+class TestAutocomplete:
+    """Tests for trigram autocomplete."""
+
+    def test_prefix_and_similarity_query(self, service):
+        """Autocomplete should use an escaped prefix and trigram similarity under a timeout."""
+        with fake_db(RecordingCursor(rows=[('Dragon Tales',)])) as cursor:
+            suggestions = service.autocomplete('Dra_g', limit=5)
+
+        timeout_sql, timeout_params = cursor.queries[0]
+        sql, params = cursor.queries[1]
+        assert 'statement_timeout' in timeout_sql
+        assert timeout_params == [service.AUTOCOMPLETE_TIMEOUT_MS]
+        assert 'similarity' in sql
+        assert params == ['dra\\_g%', 'dra_g', 'dra\\_g%', 'dra_g', 5]
+        assert suggestions == ['Dragon Tales']
+
+    def test_timeout_returns_no_suggestions(self, service):
+        """A query cancelled by the statement timeout should degrade to no suggestions."""
+        error = OperationalError('canceling statement due to statement timeout')
+        with fake_db(RecordingCursor(error=error)):
+            assert service.autocomplete('dragon') == []
+
+        with fake_db(RecordingCursor(rows=[('Dragon Tales',)])):
+            assert service.autocomplete('dragon') == ['Dragon Tales']
+
+    def test_blank_query(self, service):
+        assert service.autocomplete('   ') == []
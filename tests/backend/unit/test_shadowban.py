@@ -8,7 +8,15 @@ Requirements: 5.12
 import pytest
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
-from apps.moderation.shadowban import ShadowbanService
+from apps.moderation.shadowban import ShadowbanService, get_shadowbanned_user_ids, reset_shadowban_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_shadowban_cache():
+    """Each test starts with an empty process-local shadowban set."""
+    reset_shadowban_cache()
+    yield
+    reset_shadowban_cache()
 
 
 @pytest.fixture
@@ -55,7 +63,7 @@ class TestShadowban:
         mock_db.shadowban.create = AsyncMock(return_value=mock_shadowban)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.apply_shadowban(
                 user_id=user_id,
                 applied_by=applied_by,
@@ -95,7 +103,7 @@ class TestShadowban:
         mock_db.shadowban.find_first = AsyncMock(return_value=mock_shadowban)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.check_shadowban(user_id)
         
         # Assert
@@ -115,7 +123,7 @@ class TestShadowban:
         mock_db.shadowban.find_first = AsyncMock(return_value=None)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.check_shadowban(user_id)
         
         # Assert
@@ -139,7 +147,7 @@ class TestShadowban:
         mock_db.shadowban.find_first = AsyncMock(return_value=mock_shadowban)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.is_shadowbanned(user_id)
         
         # Assert
@@ -157,7 +165,7 @@ class TestShadowban:
         mock_db.shadowban.find_first = AsyncMock(return_value=None)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.is_shadowbanned(user_id)
         
         # Assert
@@ -175,7 +183,7 @@ class TestShadowban:
         mock_db.shadowban.update_many = AsyncMock(return_value=1)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.remove_shadowban(user_id, removed_by)
         
         # Assert
@@ -194,7 +202,7 @@ class TestShadowban:
         mock_db.shadowban.update_many = AsyncMock(return_value=0)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.remove_shadowban(user_id, removed_by)
         
         # Assert
@@ -216,7 +224,7 @@ class TestShadowban:
         mock_db.shadowban.find_many = AsyncMock(return_value=[])
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.filter_shadowbanned_content(
                 content_list,
                 requesting_user_id='user-3'
@@ -247,7 +255,7 @@ class TestShadowban:
         mock_db.moderatorrole.find_first = AsyncMock(return_value=None)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.filter_shadowbanned_content(
                 content_list,
                 requesting_user_id='user-1'
@@ -278,7 +286,7 @@ class TestShadowban:
         mock_db.moderatorrole.find_first = AsyncMock(return_value=None)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.filter_shadowbanned_content(
                 content_list,
                 requesting_user_id='user-2'  # Shadowbanned user viewing their own content
@@ -311,7 +319,7 @@ class TestShadowban:
         mock_db.moderatorrole.find_first = AsyncMock(return_value=mock_moderator_role)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.filter_shadowbanned_content(
                 content_list,
                 requesting_user_id='moderator-1'
@@ -340,7 +348,7 @@ class TestShadowban:
         mock_db.moderatorrole.find_first = AsyncMock(return_value=None)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.filter_shadowbanned_content(
                 content_list,
                 requesting_user_id='user-3'
@@ -378,7 +386,7 @@ class TestShadowban:
         mock_db.shadowban.find_many = AsyncMock(return_value=mock_shadowbans)
         
         # Act
-        with patch('apps.moderation.shadowban.Prisma', return_value=mock_db):
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
             result = await shadowban_service.get_shadowban_history(user_id)
         
         # Assert
@@ -387,3 +395,36 @@ class TestShadowban:
         assert result[0]['is_active'] is False
         assert result[1]['id'] == "shadowban-2"
         assert result[1]['is_active'] is True
+    
+    @pytest.mark.asyncio
+    async def test_shadowban_set_is_cached(self, shadowban_service, mock_db):
+        """
+        Test that filtering reuses the process-local shadowban set.
+        """
+        content_list = [{'id': '1', 'user_id': 'user-1', 'content': 'Test 1'}]
+        mock_db.shadowban.find_many = AsyncMock(return_value=[])
+        
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
+            await shadowban_service.filter_shadowbanned_content(content_list, 'user-3')
+            await shadowban_service.filter_shadowbanned_content(content_list, 'user-3')
+        
+        mock_db.shadowban.find_many.assert_awaited_once()
+        mock_db.moderatorrole.find_first.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_apply_shadowban_refreshes_cached_set(self, shadowban_service, mock_db):
+        """
+        Test that applying a shadowban is visible to this process immediately.
+        """
+        mock_shadowban = MagicMock()
+        mock_shadowban.user_id = 'user-2'
+        mock_db.shadowban.find_many = AsyncMock(return_value=[])
+        mock_db.shadowban.update_many = AsyncMock(return_value=0)
+        mock_db.shadowban.create = AsyncMock(return_value=mock_shadowban)
+        
+        with patch('apps.moderation.shadowban.get_prisma', return_value=mock_db):
+            assert await get_shadowbanned_user_ids() == frozenset()
+            await shadowban_service.apply_shadowban('user-2', 'admin-1', 'spam')
+            mock_db.shadowban.find_many = AsyncMock(return_value=[mock_shadowban])
+            
+            assert await get_shadowbanned_user_ids() == frozenset({'user-2'})
@@ -19,6 +19,7 @@ import os
 # Add the backend directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../apps/backend'))
 
+from apps.moderation.content_fingerprint import fingerprint
 from apps.security.suspicious_activity_detector import SuspiciousActivityDetector
 
 
@@ -40,12 +41,13 @@ class TestSuspiciousActivityDetector:
         db = MagicMock()
         db.connect = AsyncMock()
         db.disconnect = AsyncMock()
+        db.contentfingerprint.find_many = AsyncMock(return_value=[])
         return db
     
     @pytest.mark.asyncio
     async def test_no_suspicious_activity(self, detector, mock_db):
         """Test that normal user activity returns no flags."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Mock normal activity
             mock_db.userconsent.find_many = AsyncMock(return_value=[
                 MagicMock(user_id='user1'),
@@ -67,7 +69,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_multiple_accounts_same_ip(self, detector, mock_db):
         """Test detection of multiple accounts from same IP."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Mock 5 accounts from same IP (exceeds limit of 3)
             mock_db.userconsent.find_many = AsyncMock(return_value=[
                 MagicMock(user_id='user1'),
@@ -92,7 +94,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_rapid_content_creation(self, detector, mock_db):
         """Test detection of rapid content creation."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Mock 25 content items in last hour (exceeds limit of 20)
             mock_db.userconsent.find_many = AsyncMock(return_value=[
                 MagicMock(user_id='user1')
@@ -113,19 +115,20 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_duplicate_content_detection(self, detector, mock_db):
         """Test detection of duplicate content across accounts."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
-            # Mock user whispers
-            user_whispers = [
-                MagicMock(content='This is duplicate content', user_id='user1')
-            ]
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
+            fp = fingerprint('This is duplicate content')
             
-            # Mock other user's whispers with same content
-            other_whispers = [
-                MagicMock(content='This is duplicate content', user_id='user2')
+            # Mock the user's fingerprints
+            user_fingerprints = [
+                MagicMock(exact_hash=fp.exact_hash, simhash=fp.simhash,
+                          lsh_buckets=fp.lsh_buckets, user_id='user1')
             ]
             
-            # Mock for bot behavior check (empty list)
-            bot_check_whispers = []
+            # Mock the index probe: another user's whisper with the same content
+            other_fingerprints = [
+                MagicMock(content_type='whisper', content_id='w2', exact_hash=fp.exact_hash,
+                          simhash=fp.simhash, lsh_buckets=fp.lsh_buckets, user_id='user2')
+            ]
             
             mock_db.userconsent.find_many = AsyncMock(return_value=[
                 MagicMock(user_id='user1')
@@ -133,11 +136,11 @@ class TestSuspiciousActivityDetector:
             mock_db.story.count = AsyncMock(return_value=0)
             mock_db.chapter.count = AsyncMock(return_value=0)
             mock_db.whisper.count = AsyncMock(return_value=0)
-            mock_db.whisper.find_many = AsyncMock(side_effect=[
-                user_whispers,  # First call for user's whispers (duplicate check)
-                other_whispers,  # Second call for other users' whispers (duplicate check)
-                bot_check_whispers  # Third call for bot behavior check
+            mock_db.contentfingerprint.find_many = AsyncMock(side_effect=[
+                user_fingerprints,  # User's recent fingerprints
+                other_fingerprints  # Single probe of the fingerprint index
             ])
+            mock_db.whisper.find_many = AsyncMock(return_value=[])  # Bot behavior check
             mock_db.userprofile.find_unique = AsyncMock(return_value=MagicMock(
                 created_at=datetime.now(timezone.utc) - timedelta(days=30)
             ))
@@ -146,11 +149,13 @@ class TestSuspiciousActivityDetector:
             flags = await detector.check_user_activity('user1', '192.168.1.1')
             
             assert 'duplicate_content' in flags
+            probe = mock_db.contentfingerprint.find_many.await_args_list[1].kwargs['where']
+            assert probe['user_id'] == {'not': 'user1'}
     
     @pytest.mark.asyncio
     async def test_bot_behavior_quick_first_post(self, detector, mock_db):
         """Test detection of bot behavior - quick first post after account creation."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             account_created = datetime.now(timezone.utc) - timedelta(days=1)
             first_post = account_created + timedelta(seconds=30)  # 30 seconds after creation
             
@@ -175,7 +180,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_bot_behavior_regular_intervals(self, detector, mock_db):
         """Test detection of bot behavior - too regular posting intervals."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Create whispers with exactly 60 second intervals (too regular)
             base_time = datetime.now(timezone.utc)
             regular_whispers = [
@@ -205,7 +210,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_bot_behavior_duplicate_content(self, detector, mock_db):
         """Test detection of bot behavior - high ratio of duplicate content."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Create whispers where 80% are identical
             duplicate_whispers = [
                 MagicMock(
@@ -234,7 +239,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_multiple_flags(self, detector, mock_db):
         """Test that multiple suspicious patterns can be detected simultaneously."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             # Mock multiple violations
             mock_db.userconsent.find_many = AsyncMock(return_value=[
                 MagicMock(user_id=f'user{i}') for i in range(5)
@@ -265,7 +270,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_activity_summary(self, detector, mock_db):
         """Test generation of activity summary."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             account_created = datetime.now(timezone.utc) - timedelta(days=10)
             
             mock_db.userprofile.find_unique = AsyncMock(return_value=MagicMock(
@@ -287,7 +292,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_activity_summary_nonexistent_user(self, detector, mock_db):
         """Test activity summary for nonexistent user."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             mock_db.userprofile.find_unique = AsyncMock(return_value=None)
             
             summary = await detector.get_activity_summary('nonexistent')
@@ -334,7 +339,7 @@ class TestSuspiciousActivityDetector:
     @pytest.mark.asyncio
     async def test_no_ip_address_provided(self, detector, mock_db):
         """Test that IP-based checks are skipped when no IP provided."""
-        with patch('apps.security.suspicious_activity_detector.Prisma', return_value=mock_db):
+        with patch('apps.security.suspicious_activity_detector.get_prisma', return_value=mock_db):
             mock_db.story.count = AsyncMock(return_value=0)
             mock_db.chapter.count = AsyncMock(return_value=0)
             mock_db.whisper.count = AsyncMock(return_value=0)